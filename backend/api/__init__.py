@@ -72,6 +72,7 @@ from .inventario import router as inventario_router
 from .contaduria_retenciones import router as contaduria_retenciones_router
 from .tesoreria_parajes import router as tesoreria_parajes_router
 from .tesoreria_import import router as tesoreria_import_router
+from .jobs import router as jobs_router
 
 api_router = APIRouter()
 
@@ -149,6 +150,7 @@ api_router.include_router(ordenes_pago_router, prefix="/contaduria/ordenes-pago"
 api_router.include_router(contaduria_retenciones_router, prefix="/contaduria/retenciones", tags=["Contaduria - Retenciones"])
 api_router.include_router(tesoreria_parajes_router, prefix="/tesoreria/parajes", tags=["Tesoreria - Parajes"])
 api_router.include_router(tesoreria_import_router, prefix="/tesoreria/import", tags=["Tesoreria - Importadores"])
+api_router.include_router(jobs_router, prefix="/jobs", tags=["Jobs"])
 
 # WebSockets
 from .ws import router as ws_router
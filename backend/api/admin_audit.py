@@ -8,6 +8,8 @@ GET    /api/admin/audit-logs/distinct/{field} - valores únicos
 DELETE /api/admin/audit-logs/cleanup      - purga manual (older_than_days)
 GET    /api/admin/settings/debug_mode     - estado del flag
 PUT    /api/admin/settings/debug_mode     - toggle (invalida cache)
+GET    /api/admin/queries/rutas           - peores rutas por queries/request (N+1)
+DELETE /api/admin/queries/rutas           - reinicia el acumulado
 """
 from datetime import datetime, timedelta, timezone
 from typing import Optional, List
@@ -17,6 +19,7 @@ from sqlalchemy import select, func, desc, and_, distinct, delete, case
 
 from core.database import get_db
 from core.audit_helpers import require_super_admin, invalidate_debug_mode_cache
+from core import perfil_queries
 from models.audit_log import AuditLog
 from models.user import User
 from models.municipio import Municipio
@@ -489,6 +492,27 @@ async def consola_resumen(
     )
 
 
+# ============================================================
+# Perfil de queries por ruta (core/perfil_queries.py)
+# ============================================================
+@router.get("/queries/rutas")
+async def queries_por_ruta(
+    limit: int = Query(20, ge=1, le=200),
+    orden: str = Query("queries", regex="^(queries|tiempo)$"),
+    _: User = Depends(require_super_admin),
+):
+    """Rutas con más queries (o más tiempo de BD) por request desde que
+    arrancó esta instancia, con la última sentencia repetida (N+1) vista."""
+    return perfil_queries.peores_rutas(limit=limit, orden=orden)
+
+
+@router.delete("/queries/rutas")
+async def reiniciar_queries_por_ruta(_: User = Depends(require_super_admin)):
+    """Vacía el acumulado (p. ej. para medir de nuevo después de un fix)."""
+    perfil_queries.reiniciar_rutas()
+    return {"ok": True}
+
+
 # ============================================================
 # Setting debug_mode
 # ============================================================
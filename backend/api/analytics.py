@@ -5,7 +5,7 @@ Endpoints de analytics avanzados para el Dashboard.
 - Distancia promedio de empleados
 - Cobertura por zonas
 """
-from fastapi import APIRouter, Depends, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_, case
 from datetime import datetime, timedelta
@@ -13,6 +13,7 @@ from typing import List, Optional
 from math import radians, cos, sin, asin, sqrt
 
 from core.database import get_db
+from core.respuestas import respuesta_json
 from core.security import require_roles
 from models.reclamo import Reclamo
 from models.user import User
@@ -22,6 +23,7 @@ from models.empleado import Empleado
 from models.configuracion import Configuracion
 from models.municipio import Municipio
 from models.enums import EstadoReclamo, RolUsuario
+from services.mapa_tiles import Bbox, Capa, agregar
 
 from core.tenancy import get_effective_municipio_id  # noqa: E402
 
@@ -47,66 +49,72 @@ async def get_heatmap_data(
     dias: int = Query(30, description="Últimos N días"),
     categoria_id: Optional[int] = None,
     dependencia_id: Optional[int] = None,
+    bbox: Optional[str] = Query(None, description="oeste,sur,este,norte (toBBoxString de Leaflet). Sin él: toda la extensión de los datos"),
+    zoom: Optional[int] = Query(None, ge=0, le=22, description="Zoom del mapa. Sin él: el más fino que entre en el límite de tiles"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(require_roles(["admin", "supervisor"]))
 ):
     """
-    Obtiene coordenadas de reclamos para el mapa de calor.
-    Retorna puntos con latitud, longitud e intensidad (cantidad de reclamos cercanos).
+    Obtiene los puntos del mapa de calor agregados por celda (services/mapa_tiles).
+    Cada punto es el centroide de una celda con su intensidad sumada (cantidad
+    de reclamos ponderada por estado y prioridad); en zoom alto, los reclamos
+    sueltos de los tiles poco densos.
     """
     municipio_id = get_effective_municipio_id(request, current_user)
     fecha_inicio = datetime.utcnow() - timedelta(days=dias)
+    try:
+        area = Bbox.parsear(bbox) if bbox else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    query = select(
-        Reclamo.latitud,
-        Reclamo.longitud,
-        Reclamo.estado,
-        Reclamo.prioridad,
-        Categoria.nombre.label('categoria')
-    ).join(Categoria, Reclamo.categoria_id == Categoria.id).where(
-        and_(
-            Reclamo.latitud.isnot(None),
-            Reclamo.longitud.isnot(None),
-            Reclamo.created_at >= fecha_inicio,
-            Reclamo.municipio_id == municipio_id
-        )
-    )
-
+    condiciones = [Reclamo.created_at >= fecha_inicio]
     if categoria_id:
-        query = query.where(Reclamo.categoria_id == categoria_id)
+        condiciones.append(Reclamo.categoria_id == categoria_id)
     if dependencia_id:
-        query = query.where(Reclamo.municipio_dependencia_id == dependencia_id)
-
-    result = await db.execute(query)
-    reclamos = result.all()
-
-    # Calcular intensidad basada en densidad de puntos cercanos
-    points = []
-    for r in reclamos:
-        # Intensidad base según estado y prioridad
-        intensidad = 1.0
-        if r.estado == EstadoReclamo.NUEVO:
-            intensidad = 1.5
-        elif r.estado == EstadoReclamo.EN_CURSO:
-            intensidad = 1.2
-
-        # Ajustar por prioridad (1 = más urgente)
+        condiciones.append(Reclamo.municipio_dependencia_id == dependencia_id)
+
+    # Intensidad base según estado, ajustada por prioridad (1 = más urgente)
+    peso = case(
+        (Reclamo.estado == EstadoReclamo.NUEVO, 1.5),
+        (Reclamo.estado == EstadoReclamo.EN_CURSO, 1.2),
+        else_=1.0,
+    ) * case(
+        (Reclamo.prioridad > 0, (6 - Reclamo.prioridad) / 5.0),
+        else_=1.0,
+    )
+
+    def punto(r) -> dict:
+        intensidad = 1.5 if r.estado == EstadoReclamo.NUEVO else 1.2 if r.estado == EstadoReclamo.EN_CURSO else 1.0
         if r.prioridad:
             intensidad *= (6 - r.prioridad) / 5
-
-        points.append({
+        return {
             "lat": r.latitud,
             "lng": r.longitud,
             "intensidad": round(intensidad, 2),
+            "cantidad": 1,
             "estado": r.estado.value if r.estado else "nuevo",
-            "categoria": r.categoria
-        })
+            "categoria": r.categoria,
+        }
+
+    capa = Capa(
+        nombre="heatmap",
+        municipio_id=municipio_id,
+        filtros=(dias, categoria_id, dependencia_id),
+        condiciones=condiciones,
+        peso=peso,
+        columnas_punto=(Reclamo.estado, Reclamo.prioridad, Categoria.nombre.label("categoria")),
+        punto=punto,
+        joins=((Categoria, Reclamo.categoria_id == Categoria.id),),
+    )
+    resultado = await agregar(db, capa, zoom, area)
 
-    return {
-        "puntos": points,
-        "total": len(points),
+    return respuesta_json({
+        # Los clusters van como puntos de calor con su intensidad sumada
+        "puntos": resultado["puntos"] + resultado["clusters"],
+        "total": resultado["total"],
+        "zoom": resultado["zoom"],
         "periodo_dias": dias
-    }
+    })
 
 
 @router.get("/clusters")
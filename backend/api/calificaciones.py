@@ -1,5 +1,5 @@
 """API de calificaciones de vecinos"""
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from sqlalchemy.orm import selectinload
@@ -9,9 +9,11 @@ from datetime import datetime
 
 from core.database import get_db
 from core.security import get_current_user, require_roles
+from core.tenancy import get_effective_municipio_id
 from models import User, Reclamo
 from models.calificacion import Calificacion
 from models.enums import EstadoReclamo
+from services import calificaciones_stats
 
 router = APIRouter()
 
@@ -123,98 +125,39 @@ async def get_calificacion_reclamo(
 
 @router.get("/estadisticas", response_model=EstadisticasCalificaciones)
 async def get_estadisticas_calificaciones(
+    request: Request,
     empleado_id: Optional[int] = None,
     categoria_id: Optional[int] = None,
-    dias: int = 30,
+    dias: int = Query(30, ge=1, le=3650),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(require_roles(["admin", "supervisor"]))
 ):
-    """Obtener estadísticas de calificaciones"""
-    from datetime import timedelta
-
-    fecha_desde = datetime.utcnow() - timedelta(days=dias)
-
-    # Query base
-    query = select(Calificacion).where(Calificacion.created_at >= fecha_desde)
-
-    # Filtros
-    if categoria_id:
-        query = query.join(Reclamo)
-        # TODO: Migrar filtro empleado_id a dependencia_id
-        # if empleado_id:
-        #     query = query.where(Reclamo.municipio_dependencia_id == dependencia_id)
-        if categoria_id:
-            query = query.where(Reclamo.categoria_id == categoria_id)
-
-    result = await db.execute(query)
-    calificaciones = result.scalars().all()
-
-    if not calificaciones:
-        return EstadisticasCalificaciones(
-            total_calificaciones=0,
-            promedio_general=0,
-            promedio_tiempo_respuesta=0,
-            promedio_calidad_trabajo=0,
-            promedio_atencion=0,
-            distribucion={1: 0, 2: 0, 3: 0, 4: 0, 5: 0},
-            tags_frecuentes=[]
-        )
+    """Obtener estadísticas de calificaciones del municipio.
 
-    # Calcular promedios
-    total = len(calificaciones)
-    promedio_general = sum(c.puntuacion for c in calificaciones) / total
-
-    tiempos = [c.tiempo_respuesta for c in calificaciones if c.tiempo_respuesta]
-    calidades = [c.calidad_trabajo for c in calificaciones if c.calidad_trabajo]
-    atenciones = [c.atencion for c in calificaciones if c.atencion]
-
-    promedio_tiempo = sum(tiempos) / len(tiempos) if tiempos else 0
-    promedio_calidad = sum(calidades) / len(calidades) if calidades else 0
-    promedio_atencion = sum(atenciones) / len(atenciones) if atenciones else 0
-
-    # Distribución
-    distribucion = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
-    for c in calificaciones:
-        distribucion[c.puntuacion] += 1
-
-    # Tags frecuentes
-    all_tags = []
-    for c in calificaciones:
-        if c.tags:
-            all_tags.extend(c.tags.split(","))
-
-    tag_count = {}
-    for tag in all_tags:
-        tag = tag.strip()
-        tag_count[tag] = tag_count.get(tag, 0) + 1
-
-    tags_frecuentes = [
-        {"tag": tag, "count": count}
-        for tag, count in sorted(tag_count.items(), key=lambda x: -x[1])[:10]
-    ]
-
-    return EstadisticasCalificaciones(
-        total_calificaciones=total,
-        promedio_general=round(promedio_general, 2),
-        promedio_tiempo_respuesta=round(promedio_tiempo, 2),
-        promedio_calidad_trabajo=round(promedio_calidad, 2),
-        promedio_atencion=round(promedio_atencion, 2),
-        distribucion=distribucion,
-        tags_frecuentes=tags_frecuentes
+    Agregadas en SQL; ventanas de más de una semana salen del rollup
+    diario (services/calificaciones_stats).
+    """
+    municipio_id = get_effective_municipio_id(request, current_user)
+    stats = await calificaciones_stats.estadisticas(
+        db, municipio_id, dias, categoria_id=categoria_id, empleado_id=empleado_id
     )
+    return EstadisticasCalificaciones(**stats)
 
 
 @router.get("/ranking-empleados")
 async def get_ranking_empleados(
-    dias: int = 30,
+    request: Request,
+    dias: int = Query(30, ge=1, le=3650),
+    minimo: int = Query(1, ge=1),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(require_roles(["admin", "supervisor"]))
 ):
-    """Obtener ranking de empleados por calificación
-    TODO: Migrar a dependencia cuando se implemente asignación por IA
+    """Ranking de empleados por calificación (empleado asignado al reclamo).
+
+    `minimo` descarta empleados con menos calificaciones en la ventana.
     """
-    # Por ahora retorna lista vacía ya que no hay empleado_id en reclamos
-    ranking = []
+    municipio_id = get_effective_municipio_id(request, current_user)
+    ranking = await calificaciones_stats.ranking_empleados(db, municipio_id, dias, minimo=minimo)
 
     return {
         "periodo_dias": dias,
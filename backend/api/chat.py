@@ -11,6 +11,7 @@ from sqlalchemy.orm import selectinload
 from typing import Optional
 from datetime import datetime, timedelta
 
+from core.config import settings
 from core.security import get_current_user, require_roles
 from core.database import get_db
 from models.categoria_reclamo import CategoriaReclamo as Categoria
@@ -24,6 +25,8 @@ from models.municipio import Municipio
 from models.enums import EstadoReclamo
 from services import chat_service
 from services.chat_session import get_landing_storage, get_user_storage
+from services.consultas_cache import consultas_cache
+from services.sql_sandbox import SqlRechazado, preparar_sql, sql_sandbox
 import json
 import re
 import os
@@ -2214,95 +2217,38 @@ JOIN categorias_tramite ct ON t.categoria_tramite_id = ct.id
 WHERE t.municipio_id = {municipio_id} AND t.activo = 1
 """
 
-FORBIDDEN_SQL_PATTERNS = [
-    r'\b(INSERT|UPDATE|DELETE|DROP|CREATE|ALTER|TRUNCATE|GRANT|REVOKE)\b',
-    r'\b(EXEC|EXECUTE|CALL)\b',
-    r'--',  # Comentarios SQL
-    r';.*;',  # Múltiples statements
-    r'\bINTO\b\s+\bOUTFILE\b',
-    r'\bLOAD_FILE\b',
-]
-
-
-def validate_sql_query(sql: str) -> tuple[bool, str]:
-    """Valida que el SQL sea seguro (solo SELECT, sin patrones peligrosos)"""
-    sql_upper = sql.upper().strip()
-
-    # Debe empezar con SELECT
-    if not sql_upper.startswith('SELECT'):
-        return False, "Solo se permiten consultas SELECT"
-
-    # Verificar patrones prohibidos
-    for pattern in FORBIDDEN_SQL_PATTERNS:
-        if re.search(pattern, sql_upper, re.IGNORECASE):
-            return False, f"Patrón no permitido detectado"
-
-    # Verificar que no haya múltiples statements
-    if sql.count(';') > 1:
-        return False, "Solo se permite una consulta"
-
-    return True, "OK"
-
-
 async def execute_dynamic_sql(
-    db: AsyncSession,
     sql: str,
     municipio_id: int,
     page: int = 1,
     page_size: int = 2000,
     sin_limite: bool = False
 ) -> dict:
-    """Ejecuta SQL dinámico de forma segura con paginación opcional"""
-    from sqlalchemy import text
-    import re as regex
-
-    # Validar SQL
-    is_valid, error = validate_sql_query(sql)
-    if not is_valid:
-        return {"error": error, "data": [], "sql": sql, "total": 0}
-
-    # Reemplazar placeholder de municipio_id
-    sql_base = sql.replace("{municipio_id}", str(municipio_id))
-
-    # Fix automático: la IA a veces genera "categorias" en vez de "categorias_reclamo"
-    import re as _re
-    sql_base = _re.sub(
-        r'\bcategorias\b(?!_reclamo|_tramite|_reclamo_sugeridas)',
-        'categorias_reclamo',
-        sql_base,
-    )
-
-    # Detectar si el usuario especificó un LIMIT explícito
-    limit_match = regex.search(r'\s+LIMIT\s+(\d+)', sql_base, flags=regex.IGNORECASE)
-    user_limit = int(limit_match.group(1)) if limit_match else None
+    """Ejecuta SQL dinámico en el sandbox (services/sql_sandbox) con paginación opcional"""
+    try:
+        consulta = preparar_sql(sql, municipio_id)
+    except SqlRechazado as e:
+        return {"error": str(e), "data": [], "sql": sql, "total": 0}
 
-    # Remover LIMIT existente para hacer COUNT o para ejecutar sin límite
-    sql_sin_limit = regex.sub(r'\s+LIMIT\s+\d+(\s+OFFSET\s+\d+)?', '', sql_base, flags=regex.IGNORECASE)
-    sql_sin_limit = sql_sin_limit.rstrip(';')
+    user_limit = consulta.limite
 
     try:
         # Si sin_limite=True, ejecutar sin paginación (para cards, list, timeline)
+        # hasta el tope de filas del sandbox
         if sin_limite and not user_limit:
-            print(f"[DYNAMIC SQL] Executing WITHOUT LIMIT: {sql_sin_limit[:500]}...")
-            result = await db.execute(text(sql_sin_limit))
-            rows = result.fetchall()
-            columns = result.keys()
-            data = [dict(zip(columns, row)) for row in rows]
-
-            for row in data:
-                for key, value in row.items():
-                    if isinstance(value, datetime):
-                        row[key] = value.strftime('%d/%m/%y %H:%M')
-
-            print(f"[DYNAMIC SQL] Got {len(data)} rows (sin limite)")
+            print(f"[DYNAMIC SQL] Executing WITHOUT LIMIT: {consulta.sql[:500]}...")
+            result = await sql_sandbox.ejecutar(consulta, settings.SQL_SANDBOX_MAX_FILAS, consulta.offset)
+            data = result.filas
+            print(f"[DYNAMIC SQL] Got {len(data)} rows (sin limite, truncado={result.truncado})")
             return {
                 "data": data,
                 "total": len(data),
-                "sql": sql_sin_limit,
-                "sql_base": sql_sin_limit,
+                "sql": result.sql,
+                "sql_base": consulta.sql,
                 "page": 1,
                 "page_size": len(data),
-                "user_limit": None
+                "user_limit": None,
+                "truncado": result.truncado,
             }
 
         # Si el usuario pidió un LIMIT específico, respetarlo
@@ -2312,30 +2258,17 @@ async def execute_dynamic_sql(
         if user_limit and user_limit <= 20:
             total = user_limit
         else:
-            count_sql = f"SELECT COUNT(*) as total FROM ({sql_sin_limit}) as subquery"
-            print(f"[DYNAMIC SQL] Count: {count_sql[:150]}...")
-            try:
-                count_result = await db.execute(text(count_sql))
-                total = count_result.scalar() or 0
-            except Exception as count_err:
-                print(f"[DYNAMIC SQL] Count failed, using fallback: {count_err}")
-                total = None
-
-        # Segundo: Query paginada
-        offset = (page - 1) * effective_page_size
-        sql_paginado = f"{sql_sin_limit} LIMIT {effective_page_size} OFFSET {offset}"
-
-        print(f"[DYNAMIC SQL] Executing: {sql_paginado[:200]}...")
-        result = await db.execute(text(sql_paginado))
-        rows = result.fetchall()
-        columns = result.keys()
-
-        data = [dict(zip(columns, row)) for row in rows]
+            total = await sql_sandbox.contar(consulta)
+            if total is not None and user_limit:
+                total = min(total, user_limit)
 
-        for row in data:
-            for key, value in row.items():
-                if isinstance(value, datetime):
-                    row[key] = value.strftime('%d/%m/%y %H:%M')
+        # Segundo: Query paginada (sin pasarse del LIMIT del usuario)
+        offset = (page - 1) * effective_page_size
+        limite = effective_page_size
+        if user_limit:
+            limite = max(0, min(limite, user_limit - offset))
+        result = await sql_sandbox.ejecutar(consulta, limite, consulta.offset + offset)
+        data = result.filas
 
         if total is None:
             total = len(data) if len(data) < page_size else len(data) + 1
@@ -2344,8 +2277,8 @@ async def execute_dynamic_sql(
         return {
             "data": data,
             "total": total if total else len(data),
-            "sql": sql_paginado,
-            "sql_base": sql_sin_limit,
+            "sql": result.sql,
+            "sql_base": consulta.sql,
             "page": page,
             "page_size": effective_page_size,
             "user_limit": user_limit
@@ -2353,7 +2286,7 @@ async def execute_dynamic_sql(
 
     except Exception as e:
         print(f"[DYNAMIC SQL] Error: {e}")
-        return {"error": str(e), "data": [], "sql": sql_base, "total": 0}
+        return {"error": str(e), "data": [], "sql": consulta.sql, "total": 0}
 
 
 def build_sql_generator_prompt(municipio_id: int, schema: str = None) -> str:
@@ -2898,7 +2831,7 @@ async def consulta_gerencial(
     page_size = request.page_size
     # Si el formato muestra todos los datos, traer sin límite
     sin_limite = formato in ['cards', 'list', 'timeline', 'wizard', 'ranking', 'tabs', 'dashboard']
-    result = await execute_dynamic_sql(db, sql_query, municipio_id, page, page_size, sin_limite=sin_limite)
+    result = await execute_dynamic_sql(sql_query, municipio_id, page, page_size, sin_limite=sin_limite)
 
     if result.get('error'):
         print(f"[CONSULTA] Error SQL: {result['error']}")
@@ -3564,6 +3497,34 @@ async def listar_consultas_guardadas(
     ]
 
 
+@router.get("/consultas-guardadas/estadisticas")
+async def estadisticas_consultas_guardadas(
+    current_user: User = Depends(require_roles(["admin", "supervisor"])),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Hits/misses de la cache y tiempos de ejecución de cada consulta guardada
+    del municipio (contadores de este proceso desde el último arranque).
+    """
+    result = await db.execute(
+        select(ConsultaGuardada.id, ConsultaGuardada.nombre, ConsultaGuardada.veces_ejecutada)
+        .where(
+            ConsultaGuardada.municipio_id == current_user.municipio_id,
+            ConsultaGuardada.activo == True,
+        )
+        .order_by(ConsultaGuardada.veces_ejecutada.desc())
+    )
+    return [
+        {
+            "id": consulta_id,
+            "nombre": nombre,
+            "veces_ejecutada": veces or 0,
+            **consultas_cache.estadisticas(consulta_id),
+        }
+        for consulta_id, nombre, veces in result.all()
+    ]
+
+
 @router.post("/consultas-guardadas", response_model=ConsultaGuardadaResponse)
 async def crear_consulta_guardada(
     request: ConsultaGuardadaCreate,
@@ -3685,6 +3646,7 @@ async def eliminar_consulta_guardada(
 
     consulta.activo = False
     await db.commit()
+    consultas_cache.invalidar(consulta.id)
 
     return {"message": "Consulta eliminada"}
 
@@ -3692,12 +3654,17 @@ async def eliminar_consulta_guardada(
 @router.post("/consultas-guardadas/{consulta_id}/ejecutar", response_model=ConsultaResponse)
 async def ejecutar_consulta_guardada(
     consulta_id: int,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=2000),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Ejecuta una consulta guardada y devuelve los resultados.
     Incrementa el contador de ejecuciones.
+
+    El resultado sale de services/consultas_cache: se materializa una vez y
+    las páginas siguientes se sirven desde memoria.
     """
     if current_user.rol not in ['admin', 'supervisor', 'empleado', 'super_admin']:
         raise HTTPException(status_code=403, detail="Sin permisos")
@@ -3722,36 +3689,49 @@ async def ejecutar_consulta_guardada(
 
     # Si tiene SQL guardado, ejecutarlo directamente
     if consulta.sql_query:
-        result_sql = await execute_dynamic_sql(db, consulta.sql_query, current_user.municipio_id)
-
-        if result_sql.get('error'):
+        try:
+            resultado = await consultas_cache.obtener(consulta.id, current_user.municipio_id, consulta.sql_query)
+        except Exception as e:
             return ConsultaResponse(
-                response=f"<p style='color:#ef4444'>Error: {result_sql['error']}</p>",
-                sql_ejecutado=result_sql.get('sql'),
+                response=f"<p style='color:#ef4444'>Error: {str(e)}</p>",
+                sql_ejecutado=consulta.sql_query,
                 datos_crudos=None
             )
 
-        datos = result_sql.get('data', [])
-
-        # Formatear respuesta
-        if datos:
-            format_prompt = build_response_with_data_prompt(consulta.pregunta_original, datos, consulta.nombre, len(datos))
-            format_messages = [
-                {"role": "system", "content": format_prompt},
-                {"role": "user", "content": f"Formateá estos datos para: {consulta.pregunta_original}"}
-            ]
-            formatted = await chat_service.chat(format_messages, max_tokens=1500)
-
+        if not resultado.filas:
             return ConsultaResponse(
-                response=formatted or f"<p>Se encontraron {len(datos)} registros.</p>",
-                sql_ejecutado=result_sql.get('sql'),
-                datos_crudos=datos[:20]
+                response="<p>No se encontraron datos.</p>",
+                sql_ejecutado=resultado.sql,
+                datos_crudos=[],
+                total_registros=0,
+                page=page,
+                page_size=page_size,
             )
 
+        if page == 1:
+            # El formateo con la IA se hace una vez por resultado materializado
+            if resultado.respuesta is None:
+                datos = resultado.filas
+                format_prompt = build_response_with_data_prompt(consulta.pregunta_original, datos, consulta.nombre, len(datos))
+                format_messages = [
+                    {"role": "system", "content": format_prompt},
+                    {"role": "user", "content": f"Formateá estos datos para: {consulta.pregunta_original}"}
+                ]
+                formatted = await chat_service.chat(format_messages, max_tokens=1500)
+                if formatted:
+                    resultado.respuesta = formatted
+            respuesta = resultado.respuesta or f"<p>Se encontraron {resultado.total} registros.</p>"
+        else:
+            total_paginas = -(-resultado.total // page_size)
+            respuesta = f"<p>Página {page} de {total_paginas} ({resultado.total} registros)</p>"
+
         return ConsultaResponse(
-            response="<p>No se encontraron datos.</p>",
-            sql_ejecutado=result_sql.get('sql'),
-            datos_crudos=[]
+            response=respuesta,
+            sql_ejecutado=resultado.sql,
+            datos_crudos=resultado.pagina(page, page_size),
+            total_registros=resultado.total,
+            page=page,
+            page_size=page_size,
         )
 
     # Si no tiene SQL, regenerarlo con la IA
@@ -3781,13 +3761,15 @@ async def ejecutar_consulta_guardada(
             consulta.sql_query = sql_query
             await db.commit()
 
-            result_sql = await execute_dynamic_sql(db, sql_query, current_user.municipio_id)
-            datos = result_sql.get('data', [])
+            resultado = await consultas_cache.obtener(consulta.id, current_user.municipio_id, sql_query)
 
             return ConsultaResponse(
-                response=f"<p>Consulta ejecutada: {len(datos)} registros</p>",
-                sql_ejecutado=sql_query,
-                datos_crudos=datos[:20]
+                response=f"<p>Consulta ejecutada: {resultado.total} registros</p>",
+                sql_ejecutado=resultado.sql,
+                datos_crudos=resultado.pagina(page, page_size),
+                total_registros=resultado.total,
+                page=page,
+                page_size=page_size,
             )
     except Exception as e:
         return ConsultaResponse(
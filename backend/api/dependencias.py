@@ -17,6 +17,7 @@ import logging
 
 from core.database import get_db
 from core.security import get_current_user
+from services.jobs import encolar_job, job_encolado_response
 from models import (
     User,
     Dependencia,
@@ -882,13 +883,14 @@ Responde SOLO con JSON válido: {{"<dependencia_id>": [<lista de IDs>]}}"""
     return result or {}
 
 
-@router.post("/municipio/categorias/auto-asignar")
+@router.post("/municipio/categorias/auto-asignar", status_code=202)
 async def auto_asignar_categorias_ia(
     data: AutoAsignarCategoriasRequest,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Usa IA para asignar categorías de reclamos a dependencias automáticamente."""
+    """Usa IA para asignar categorías de reclamos a dependencias automáticamente.
+    Corre como job en segundo plano (ver `/api/jobs/{job_id}`)."""
     if current_user.rol not in ["admin", "supervisor"]:
         raise HTTPException(status_code=403, detail="No tiene permisos")
 
@@ -905,10 +907,29 @@ async def auto_asignar_categorias_ia(
     categorias_dict = [{"id": c.id, "nombre": c.nombre} for c in data.categorias]
     dependencias_dict = [{"id": d.id, "nombre": d.nombre, "descripcion": d.descripcion} for d in data.dependencias]
 
-    asignaciones_ia = await asignar_con_ia(categorias_dict, dependencias_dict, "categorias")
+    job = await encolar_job(
+        db, "dependencias.auto_asignar_categorias_ia",
+        {"municipio_id": municipio_id, "categorias": categorias_dict, "dependencias": dependencias_dict},
+        municipio_id=municipio_id, usuario_id=current_user.id,
+    )
+    return job_encolado_response(job)
+
+
+async def job_auto_asignar_categorias_ia(
+    db: AsyncSession,
+    ctx,
+    municipio_id: int,
+    categorias: List[dict],
+    dependencias: List[dict],
+) -> dict:
+    """Handler del job `dependencias.auto_asignar_categorias_ia`. La llamada
+    al LLM sola puede tardar decenas de segundos con muchas categorías."""
+    await ctx.progreso(5, "Consultando a la IA")
+    asignaciones_ia = await asignar_con_ia(categorias, dependencias, "categorias")
 
     if not asignaciones_ia:
         raise HTTPException(status_code=500, detail="La IA no pudo generar asignaciones")
+    await ctx.progreso(80, "Guardando asignaciones")
 
     await db.execute(delete(MunicipioDependenciaCategoria).where(MunicipioDependenciaCategoria.municipio_id == municipio_id))
 
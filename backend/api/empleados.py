@@ -8,10 +8,10 @@ from core.database import get_db
 from core.security import get_current_user, require_roles, get_password_hash
 from models.empleado import Empleado
 from models.empleado_horario import EmpleadoHorario
-from models.tramite import Solicitud, EstadoSolicitud
 from models.reclamo import Reclamo
 from models.categoria_reclamo import CategoriaReclamo as Categoria
 from models.user import User
+from services.disponibilidad import carga_pendiente
 from schemas.empleado import EmpleadoCreate, EmpleadoUpdate, EmpleadoResponse, EmpleadoDisponibilidad, HorarioSimple
 
 router = APIRouter()
@@ -97,22 +97,12 @@ async def get_empleados_disponibilidad(
     result = await db.execute(query)
     empleados = result.scalars().all()
 
-    # Estados pendientes para trámites (solicitudes)
-    estados_pendientes_tramites = [
-        EstadoSolicitud.RECIBIDO,
-        EstadoSolicitud.EN_CURSO
-    ]
-    # Estados pendientes para reclamos (strings en minúscula)
-    estados_pendientes_reclamos = ['pendiente', 'en_progreso', 'asignado']
+    # Reclamos activos + OTs abiertas por empleado (queries agrupadas, no por fila)
+    carga = await carga_pendiente(db, current_user.municipio_id)
 
     resultado = []
     for emp in empleados:
-        # TODO: Migrar a dependencia cuando se implemente IA
-        # Por ahora, la carga se calcula sin filtro de empleado
-        carga_tramites = 0  # Pendiente: filtrar por dependencia asignada
-        carga_reclamos = 0  # Pendiente: filtrar por dependencia asignada
-
-        carga_actual = carga_tramites + carga_reclamos
+        carga_actual = carga.get(emp.id, 0)
         disponibilidad = max(0, emp.capacidad_maxima - carga_actual)
         porcentaje = (carga_actual / emp.capacidad_maxima * 100) if emp.capacidad_maxima > 0 else 0
 
@@ -4,7 +4,7 @@ Endpoints para puntos, badges, leaderboard y recompensas
 """
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select
 from typing import Optional, List
 from datetime import datetime
 import secrets
@@ -15,7 +15,7 @@ from models.user import User
 from models.zona import Zona
 from models.enums import RolUsuario
 from models.gamificacion import (
-    PuntosUsuario, BadgeUsuario, HistorialPuntos,
+    BadgeUsuario, HistorialPuntos,
     RecompensaDisponible, RecompensaCanjeada,
     TipoBadge, BADGES_CONFIG
 )
@@ -26,6 +26,7 @@ from schemas.gamificacion import (
     CanjearRecompensaRequest, AccionGamificacionResponse
 )
 from services.gamificacion_service import GamificacionService
+from services.gamificacion_ranking import ranking
 
 router = APIRouter()
 
@@ -129,16 +130,18 @@ async def get_leaderboard(
     zona_id: Optional[int] = Query(None, description="Filtrar por zona"),
     periodo: str = Query("mes", description="Período: 'mes' o 'total'"),
     limite: int = Query(10, ge=1, le=100),
+    offset: int = Query(0, ge=0, description="Para paginar: posición inicial (0 = primero)"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Obtiene el leaderboard de usuarios"""
+    """Obtiene una página del leaderboard de usuarios"""
     usuarios = await GamificacionService.get_leaderboard(
         db,
         current_user.municipio_id,
         zona_id=zona_id,
         limite=limite,
-        periodo=periodo
+        periodo=periodo,
+        offset=offset,
     )
 
     zona_nombre = None
@@ -163,43 +166,10 @@ async def get_mi_posicion(
     current_user: User = Depends(get_current_user)
 ):
     """Obtiene la posición del usuario actual en el leaderboard"""
-    leaderboard = await GamificacionService.get_leaderboard(
-        db, current_user.municipio_id, limite=100, periodo=periodo
+    return await GamificacionService.get_posicion(
+        db, current_user.id, current_user.municipio_id, periodo
     )
 
-    mi_posicion = next(
-        (item for item in leaderboard if item["user_id"] == current_user.id),
-        None
-    )
-
-    if mi_posicion:
-        return mi_posicion
-    else:
-        # Usuario no está en el top 100, calcular su posición real
-        puntos = await GamificacionService.get_or_create_puntos_usuario(
-            db, current_user.id, current_user.municipio_id
-        )
-
-        # Contar cuántos usuarios tienen más puntos
-        puntos_campo = PuntosUsuario.puntos_mes_actual if periodo == "mes" else PuntosUsuario.puntos_totales
-        result = await db.execute(
-            select(func.count(PuntosUsuario.id)).where(
-                PuntosUsuario.municipio_id == current_user.municipio_id,
-                puntos_campo > (puntos.puntos_mes_actual if periodo == "mes" else puntos.puntos_totales)
-            )
-        )
-        usuarios_arriba = result.scalar() or 0
-
-        return {
-            "posicion": usuarios_arriba + 1,
-            "user_id": current_user.id,
-            "nombre": f"{current_user.nombre} {current_user.apellido[:1]}.",
-            "puntos": puntos.puntos_mes_actual if periodo == "mes" else puntos.puntos_totales,
-            "puntos_totales": puntos.puntos_totales,
-            "reclamos": puntos.reclamos_totales,
-            "badges": 0  # TODO: contar badges
-        }
-
 
 # ========== HISTORIAL ==========
 
@@ -306,6 +276,7 @@ async def canjear_recompensa(
 
     # Descontar puntos
     puntos.puntos_totales -= recompensa.puntos_requeridos
+    await ranking.registrar(puntos)
 
     # Descontar stock
     if recompensa.stock is not None:
@@ -472,8 +443,14 @@ async def resetear_puntos_mes(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(require_roles([RolUsuario.ADMIN]))
 ):
-    """Resetea los puntos mensuales y guarda el leaderboard (ejecutar a fin de mes)"""
-    await GamificacionService.resetear_puntos_mensuales(
+    """Resetea los puntos mensuales y guarda el leaderboard.
+
+    Normalmente lo hace la tarea programada el día 1; si el mes ya se cerró
+    no vuelve a resetear.
+    """
+    cerrado = await GamificacionService.resetear_puntos_mensuales(
         db, current_user.municipio_id
     )
+    if not cerrado:
+        return {"mensaje": "El mes anterior ya estaba cerrado; no se resetearon puntos"}
     return {"mensaje": "Puntos mensuales reseteados y leaderboard guardado"}
@@ -14,11 +14,10 @@ Dos endpoints:
 Uso típico del frontend:
     fetch('/api/geocoding/search?q=San+Martín+1234&viewbox=...&bounded=1')
 
-No se cachea por ahora. Nominatim recomienda ≤1 request/seg — el frontend ya
-hace debounce de 400ms, así que en el caso peor (un usuario escribiendo muy
-rápido) está en el límite. Si se vuelve un problema podemos:
- - Cachear por query en Redis por unos minutos
- - Meter rate limiting explícito
+Todo pasa por `services.geocoding.geocoder`: LRU en memoria + cache en BD
+(`geocoding_cache`, sobrevive a deploys), coalescing de consultas idénticas
+en vuelo y un token bucket que respeta el 1 req/s de Nominatim con un solo
+cliente HTTP compartido.
 """
 
 from fastapi import APIRouter, HTTPException, Query
@@ -26,47 +25,11 @@ from fastapi.responses import JSONResponse
 import httpx
 import math
 import re
-import time
 import unicodedata
-from typing import Any
-
-router = APIRouter()
-
-NOMINATIM_BASE = "https://nominatim.openstreetmap.org"
-OVERPASS_BASE = "https://overpass-api.de/api/interpreter"
-
-# User-Agent requerido oficialmente por la policy de uso de Nominatim.
-# Sin esto pueden bloquearnos.
-USER_AGENT = "MunicipalidadReclamosApp/1.0 (sugerenciasMun)"
-
-# Cache en memoria {cache_key: (timestamp, data)}. TTL de 10 minutos. El
-# objetivo es no pegarle a Nominatim por cada tecla cuando el usuario escribe
-# "cocha", "cochab", "cochaba", etc — muchas van a compartir resultados, o al
-# menos las idénticas repetidas caen en el cache. Nominatim tiene policy de
-# 1 req/seg y si la violamos nos banean (429). Sin este cache, escribir rápido
-# 6 letras = 6 requests → ban temporal.
-_cache: dict[str, tuple[float, Any]] = {}
-CACHE_TTL_SEC = 600  # 10 minutos
 
+from services.geocoding import geocoder
 
-def _cache_get(key: str) -> Any | None:
-    entry = _cache.get(key)
-    if not entry:
-        return None
-    ts, data = entry
-    if time.time() - ts > CACHE_TTL_SEC:
-        _cache.pop(key, None)
-        return None
-    return data
-
-
-def _cache_set(key: str, data: Any) -> None:
-    _cache[key] = (time.time(), data)
-    # Limpieza lazy: si el cache crece mucho, borrar las 20 entradas más viejas
-    if len(_cache) > 500:
-        oldest = sorted(_cache.items(), key=lambda kv: kv[1][0])[:20]
-        for k, _ in oldest:
-            _cache.pop(k, None)
+router = APIRouter()
 
 
 @router.get("/search")
@@ -92,7 +55,6 @@ async def geocoding_search(
     de error haría que el usuario no sepa que hay un problema de red.
     """
     params: dict[str, str | int] = {
-        "format": "json",
         "q": q,
         "countrycodes": countrycodes,
         "limit": limit,
@@ -109,33 +71,14 @@ async def geocoding_search(
     if country:
         params["country"] = country
 
-    # Cache key estable para esta combinación de parámetros
-    cache_key = "search:" + "&".join(f"{k}={v}" for k, v in sorted(params.items()))
-    cached = _cache_get(cache_key)
-    if cached is not None:
-        return JSONResponse(content=cached)
-
     try:
-        async with httpx.AsyncClient(timeout=8.0) as client:
-            response = await client.get(
-                f"{NOMINATIM_BASE}/search",
-                params=params,
-                headers={
-                    "User-Agent": USER_AGENT,
-                    "Accept-Language": "es",
-                },
-            )
-            response.raise_for_status()
-            data = response.json()
-            _cache_set(cache_key, data)
-            return JSONResponse(content=data)
+        return JSONResponse(content=await geocoder.search(params))
     except httpx.TimeoutException:
         raise HTTPException(status_code=504, detail="Timeout contactando Nominatim")
     except httpx.HTTPStatusError as exc:
         # Si Nominatim nos rate-limita (429), devolvemos array vacío en lugar
         # de 502. Así el frontend simplemente muestra "sin resultados" en vez
-        # de un error raro. El cache ayuda a que la próxima request con la
-        # misma query no vuelva a pegarle.
+        # de un error raro. Los errores no se cachean.
         if exc.response.status_code == 429:
             return JSONResponse(content=[])
         raise HTTPException(
@@ -204,11 +147,31 @@ async def geocoding_intersection(
     n1 = _street_regex(calle1)
     n2 = _street_regex(calle2)
 
-    cache_key = f"intersection:{n1}|{n2}|{bbox}"
-    cached = _cache_get(cache_key)
-    if cached is not None:
-        return JSONResponse(content=cached)
+    try:
+        result = await geocoder.resolver(
+            "intersection",
+            {"calle1": n1, "calle2": n2, "bbox": bbox},
+            lambda: _resolver_interseccion(calle1, calle2, n1, n2, bbox, lat, lon),
+        )
+        return JSONResponse(content=result)
+    except HTTPException:
+        raise
+    except httpx.TimeoutException:
+        raise HTTPException(status_code=504, detail="Timeout contactando Overpass")
+    except httpx.HTTPStatusError as exc:
+        raise HTTPException(
+            status_code=502,
+            detail=f"Overpass devolvió {exc.response.status_code}",
+        )
+    except httpx.RequestError as exc:
+        raise HTTPException(status_code=502, detail=f"Error contactando Overpass: {exc}")
 
+
+async def _resolver_interseccion(
+    calle1: str, calle2: str, n1: str, n2: str, bbox: str, lat: float, lon: float,
+) -> dict:
+    """Las dos queries Overpass de /intersection (sin cache: lo pone el
+    endpoint a traves de geocoder.resolver)."""
     # Query 1: nodos compartidos (intersección directa en OSM)
     query_shared = (
         "[out:json][timeout:20];"
@@ -219,103 +182,71 @@ async def geocoding_intersection(
         "node.na.nb;"
         "out;"
     )
+    elements = (await geocoder.overpass(query_shared)).get("elements", [])
 
-    try:
-        async with httpx.AsyncClient(timeout=25.0) as client:
-            resp = await client.post(
-                OVERPASS_BASE,
-                content=query_shared,
-                headers={"User-Agent": USER_AGENT, "Content-Type": "text/plain"},
-            )
-            resp.raise_for_status()
-            elements = resp.json().get("elements", [])
-
-            if elements:
-                # Tomar el nodo más cercano al centro del municipio
-                best = min(
-                    elements,
-                    key=lambda n: (n.get("lat", 0) - lat) ** 2 + (n.get("lon", 0) - lon) ** 2,
-                )
-                result = {
-                    "lat": float(best["lat"]),
-                    "lon": float(best["lon"]),
-                    "display_name": f"{calle1.strip()} y {calle2.strip()}",
-                    "fuente": "overpass_shared_node",
-                }
-                _cache_set(cache_key, result)
-                return JSONResponse(content=result)
-
-            # Fallback: traer geometrías y calcular el punto medio entre los
-            # dos puntos más cercanos de cada calle.
-            query_geom = (
-                "[out:json][timeout:25];"
-                f'(way["highway"]["name"~"{n1}",i]({bbox});); out geom;'
-                f'(way["highway"]["name"~"{n2}",i]({bbox});); out geom;'
-            )
-            resp2 = await client.post(
-                OVERPASS_BASE,
-                content=query_geom,
-                headers={"User-Agent": USER_AGENT, "Content-Type": "text/plain"},
-            )
-            resp2.raise_for_status()
-            data2 = resp2.json().get("elements", [])
-
-            # Separar puntos por nombre matcheado
-            puntos_a: list[tuple[float, float]] = []
-            puntos_b: list[tuple[float, float]] = []
-            re1 = re.compile(n1, re.IGNORECASE)
-            re2 = re.compile(n2, re.IGNORECASE)
-            for el in data2:
-                if el.get("type") != "way":
-                    continue
-                nombre = _strip_accents(el.get("tags", {}).get("name", "").lower())
-                geom = el.get("geometry", []) or []
-                pts = [(g["lat"], g["lon"]) for g in geom if "lat" in g and "lon" in g]
-                if re1.match(nombre):
-                    puntos_a.extend(pts)
-                if re2.match(nombre):
-                    puntos_b.extend(pts)
-
-            if not puntos_a or not puntos_b:
-                raise HTTPException(
-                    status_code=404,
-                    detail="No se encontraron las calles en el área del municipio",
-                )
-
-            # Buscar el par (a, b) más cercano entre las dos calles
-            mejor_par: tuple[tuple[float, float], tuple[float, float]] | None = None
-            mejor_dist = float("inf")
-            for a in puntos_a:
-                for b in puntos_b:
-                    d = (a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2
-                    if d < mejor_dist:
-                        mejor_dist = d
-                        mejor_par = (a, b)
-
-            if mejor_par is None:
-                raise HTTPException(status_code=404, detail="Sin intersección detectable")
-
-            mid_lat = (mejor_par[0][0] + mejor_par[1][0]) / 2
-            mid_lon = (mejor_par[0][1] + mejor_par[1][1]) / 2
-            result = {
-                "lat": mid_lat,
-                "lon": mid_lon,
-                "display_name": f"{calle1.strip()} y {calle2.strip()}",
-                "fuente": "overpass_closest_pair",
-            }
-            _cache_set(cache_key, result)
-            return JSONResponse(content=result)
-    except HTTPException:
-        raise
-    except httpx.TimeoutException:
-        raise HTTPException(status_code=504, detail="Timeout contactando Overpass")
-    except httpx.HTTPStatusError as exc:
+    if elements:
+        # Tomar el nodo más cercano al centro del municipio
+        best = min(
+            elements,
+            key=lambda n: (n.get("lat", 0) - lat) ** 2 + (n.get("lon", 0) - lon) ** 2,
+        )
+        return {
+            "lat": float(best["lat"]),
+            "lon": float(best["lon"]),
+            "display_name": f"{calle1.strip()} y {calle2.strip()}",
+            "fuente": "overpass_shared_node",
+        }
+
+    # Fallback: traer geometrías y calcular el punto medio entre los
+    # dos puntos más cercanos de cada calle.
+    query_geom = (
+        "[out:json][timeout:25];"
+        f'(way["highway"]["name"~"{n1}",i]({bbox});); out geom;'
+        f'(way["highway"]["name"~"{n2}",i]({bbox});); out geom;'
+    )
+    data2 = (await geocoder.overpass(query_geom)).get("elements", [])
+
+    # Separar puntos por nombre matcheado
+    puntos_a: list[tuple[float, float]] = []
+    puntos_b: list[tuple[float, float]] = []
+    re1 = re.compile(n1, re.IGNORECASE)
+    re2 = re.compile(n2, re.IGNORECASE)
+    for el in data2:
+        if el.get("type") != "way":
+            continue
+        nombre = _strip_accents(el.get("tags", {}).get("name", "").lower())
+        geom = el.get("geometry", []) or []
+        pts = [(g["lat"], g["lon"]) for g in geom if "lat" in g and "lon" in g]
+        if re1.match(nombre):
+            puntos_a.extend(pts)
+        if re2.match(nombre):
+            puntos_b.extend(pts)
+
+    if not puntos_a or not puntos_b:
         raise HTTPException(
-            status_code=502,
-            detail=f"Overpass devolvió {exc.response.status_code}",
+            status_code=404,
+            detail="No se encontraron las calles en el área del municipio",
         )
-    except httpx.RequestError as exc:
-        raise HTTPException(status_code=502, detail=f"Error contactando Overpass: {exc}")
+
+    # Buscar el par (a, b) más cercano entre las dos calles
+    mejor_par: tuple[tuple[float, float], tuple[float, float]] | None = None
+    mejor_dist = float("inf")
+    for a in puntos_a:
+        for b in puntos_b:
+            d = (a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2
+            if d < mejor_dist:
+                mejor_dist = d
+                mejor_par = (a, b)
+
+    if mejor_par is None:
+        raise HTTPException(status_code=404, detail="Sin intersección detectable")
+
+    return {
+        "lat": (mejor_par[0][0] + mejor_par[1][0]) / 2,
+        "lon": (mejor_par[0][1] + mejor_par[1][1]) / 2,
+        "display_name": f"{calle1.strip()} y {calle2.strip()}",
+        "fuente": "overpass_closest_pair",
+    }
 
 
 @router.get("/reverse")
@@ -329,22 +260,7 @@ async def geocoding_reverse(
     convertirlas a una dirección humana.
     """
     try:
-        async with httpx.AsyncClient(timeout=8.0) as client:
-            response = await client.get(
-                f"{NOMINATIM_BASE}/reverse",
-                params={
-                    "format": "json",
-                    "lat": lat,
-                    "lon": lon,
-                    "addressdetails": 1,
-                },
-                headers={
-                    "User-Agent": USER_AGENT,
-                    "Accept-Language": "es",
-                },
-            )
-            response.raise_for_status()
-            return JSONResponse(content=response.json())
+        return JSONResponse(content=await geocoder.reverse(lat, lon))
     except httpx.TimeoutException:
         raise HTTPException(status_code=504, detail="Timeout contactando Nominatim")
     except httpx.HTTPStatusError as exc:
@@ -0,0 +1,101 @@
+"""Estado, listado y cancelacion de jobs en segundo plano.
+
+- GET  /jobs               ultimos jobs del usuario actual
+- GET  /jobs/{id}          polling de progreso / resultado
+- POST /jobs/{id}/cancelar pide cancelar (pendiente: inmediato; en curso:
+                           el handler corta en su proximo reporte de avance)
+
+Los jobs publicos (usuario_id NULL, ej. crear-demo) se consultan sin login:
+el id aleatorio del job funciona como token.
+"""
+from datetime import datetime
+from typing import Any, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.database import get_db
+from core.security import get_current_user, get_current_user_optional
+from models.background_job import BackgroundJob, EstadoJob, ESTADOS_FINALES
+from models.enums import RolUsuario
+from models.user import User
+from services.jobs import cancelar_job
+
+router = APIRouter()
+
+
+class JobResponse(BaseModel):
+    id: str
+    tipo: str
+    estado: EstadoJob
+    progreso: int
+    mensaje: Optional[str] = None
+    resultado: Optional[Any] = None
+    error: Optional[str] = None
+    cancelacion_solicitada: bool = False
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+def _puede_ver(job: BackgroundJob, user: Optional[User]) -> bool:
+    if job.usuario_id is None:
+        return True
+    if user is None:
+        return False
+    if job.usuario_id == user.id:
+        return True
+    # Admin del mismo municipio (o superadmin sin municipio)
+    return user.rol == RolUsuario.ADMIN and (
+        user.municipio_id is None or user.municipio_id == job.municipio_id
+    )
+
+
+async def _get_job(db: AsyncSession, job_id: str, user: Optional[User]) -> BackgroundJob:
+    job = (await db.execute(select(BackgroundJob).where(BackgroundJob.id == job_id))).scalar_one_or_none()
+    if not job or not _puede_ver(job, user):
+        raise HTTPException(status_code=404, detail="Job no encontrado")
+    return job
+
+
+@router.get("", response_model=List[JobResponse])
+async def listar_mis_jobs(
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    result = await db.execute(
+        select(BackgroundJob)
+        .where(BackgroundJob.usuario_id == current_user.id)
+        .order_by(BackgroundJob.created_at.desc())
+        .limit(limit)
+    )
+    return result.scalars().all()
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: Optional[User] = Depends(get_current_user_optional),
+):
+    return await _get_job(db, job_id, current_user)
+
+
+@router.post("/{job_id}/cancelar", response_model=JobResponse)
+async def cancelar(
+    job_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: Optional[User] = Depends(get_current_user_optional),
+):
+    job = await _get_job(db, job_id, current_user)
+    if job.estado in ESTADOS_FINALES:
+        raise HTTPException(status_code=409, detail=f"El job ya terminó ({job.estado.value})")
+    await cancelar_job(db, job)
+    await db.refresh(job)
+    return job
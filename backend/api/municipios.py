@@ -6,7 +6,6 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, text
 from typing import Optional, List
 from pydantic import BaseModel
-from math import radians, cos, sin, asin, sqrt
 import cloudinary
 import cloudinary.uploader
 
@@ -18,6 +17,7 @@ from models.user import User
 from models.enums import RolUsuario
 from services.categorias_default import crear_categorias_default
 from services.email_service import email_service, EmailTemplates
+from services import municipio_locator
 import secrets
 
 router = APIRouter()
@@ -104,21 +104,18 @@ class MunicipioUpdate(BaseModel):
 class MunicipioCercano(MunicipioPublic):
     """Municipio con distancia calculada"""
     distancia_km: float
+    # Dentro de sus limites (si los tiene cargados) o de su radio de cobertura
+    en_cobertura: bool = False
 
 
 # ============ Funciones auxiliares ============
 
-def haversine(lon1: float, lat1: float, lon2: float, lat2: float) -> float:
-    """
-    Calcula la distancia en km entre dos puntos usando la formula de Haversine.
-    """
-    lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
-    dlon = lon2 - lon1
-    dlat = lat2 - lat1
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * asin(sqrt(a))
-    r = 6371  # Radio de la Tierra en km
-    return c * r
+def _cercano(r: municipio_locator.Resultado) -> MunicipioCercano:
+    return MunicipioCercano(
+        **r.municipio.datos,
+        distancia_km=round(r.distancia_km, 2),
+        en_cobertura=r.en_cobertura,
+    )
 
 
 # ============ Endpoints PUBLICOS (sin autenticacion) ============
@@ -143,63 +140,40 @@ async def listar_municipios_publico(
 
 @router.get("/public/cercano", response_model=Optional[MunicipioCercano])
 async def buscar_municipio_cercano(
-    lat: float = Query(..., description="Latitud del usuario"),
-    lng: float = Query(..., description="Longitud del usuario"),
+    lat: float = Query(..., ge=-90, le=90, description="Latitud del usuario"),
+    lng: float = Query(..., ge=-180, le=180, description="Longitud del usuario"),
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Busca el municipio mas cercano a las coordenadas dadas (endpoint PUBLICO).
-    Retorna el municipio si el usuario esta dentro de su radio de cobertura.
+    Busca el municipio del punto (endpoint PUBLICO).
+    Si algun municipio cercano tiene limites cargados y los contiene, ese;
+    si no, el de centroide mas cercano, aunque quede fuera de su radio
+    (`en_cobertura` lo indica). Sale del indice en memoria de
+    services/municipio_locator: sin queries mientras este vigente.
     """
-    query = select(Municipio).where(Municipio.activo == True)
-    result = await db.execute(query)
-    municipios = result.scalars().all()
-
-    if not municipios:
-        return None
-
-    # Encontrar el municipio mas cercano
-    mejor_municipio = None
-    menor_distancia = float('inf')
-
-    for muni in municipios:
-        distancia = haversine(lng, lat, muni.longitud, muni.latitud)
-        if distancia < menor_distancia:
-            menor_distancia = distancia
-            mejor_municipio = muni
-
-    # Verificar si esta dentro del radio de cobertura
-    if mejor_municipio and menor_distancia <= mejor_municipio.radio_km:
-        return MunicipioCercano(
-            id=mejor_municipio.id,
-            nombre=mejor_municipio.nombre,
-            codigo=mejor_municipio.codigo,
-            latitud=mejor_municipio.latitud,
-            longitud=mejor_municipio.longitud,
-            radio_km=mejor_municipio.radio_km,
-            logo_url=mejor_municipio.logo_url,
-            color_primario=mejor_municipio.color_primario,
-            activo=mejor_municipio.activo,
-            distancia_km=round(menor_distancia, 2)
-        )
+    indice = await municipio_locator.obtener_indice(db)
+    resultado = indice.localizar(lat, lng)
+    return _cercano(resultado) if resultado else None
 
-    # Si no hay municipio dentro del radio, retornar el mas cercano de todas formas
-    # pero indicando la distancia
-    if mejor_municipio:
-        return MunicipioCercano(
-            id=mejor_municipio.id,
-            nombre=mejor_municipio.nombre,
-            codigo=mejor_municipio.codigo,
-            latitud=mejor_municipio.latitud,
-            longitud=mejor_municipio.longitud,
-            radio_km=mejor_municipio.radio_km,
-            logo_url=mejor_municipio.logo_url,
-            color_primario=mejor_municipio.color_primario,
-            activo=mejor_municipio.activo,
-            distancia_km=round(menor_distancia, 2)
-        )
 
-    return None
+@router.get("/public/cercanos", response_model=List[MunicipioCercano])
+async def buscar_municipios_cercanos(
+    lat: float = Query(..., ge=-90, le=90, description="Latitud del usuario"),
+    lng: float = Query(..., ge=-180, le=180, description="Longitud del usuario"),
+    k: int = Query(5, ge=1, le=50, description="Cantidad maxima de municipios"),
+    radio_km: Optional[float] = Query(None, gt=0, le=2000, description="Solo los que esten a menos de radio_km"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Los k municipios mas cercanos al punto (endpoint PUBLICO), ordenados por
+    distancia. Con `radio_km`, solo los que tienen el centroide dentro.
+    """
+    indice = await municipio_locator.obtener_indice(db)
+    if radio_km is not None:
+        resultados = indice.en_radio(lat, lng, radio_km)[:k]
+    else:
+        resultados = indice.k_cercanos(lat, lng, k)
+    return [_cercano(r) for r in resultados]
 
 
 @router.get("/public/{codigo}", response_model=MunicipioDetalle)
@@ -534,7 +508,7 @@ def _normalizar_codigo(nombre: str) -> str:
     return s
 
 
-@router.post("/crear-demo", response_model=MunicipioDemoResponse)
+@router.post("/crear-demo", status_code=202)
 async def crear_municipio_demo(
     data: MunicipioDemoCreate,
     db: AsyncSession = Depends(get_db),
@@ -553,11 +527,12 @@ async def crear_municipio_demo(
       - 4 reclamos de ejemplo en distintos estados
       - 1 solicitud de trámite de ejemplo
 
-    La redirección devuelta (`redirect_path`) apunta a la landing del muni
-    con los botones de quick-login ya funcionales.
+    El seed tarda bastante (turnero + tasas + tesorería), así que corre como
+    job en segundo plano: devuelve `job_id` y el frontend hace polling a
+    `/api/jobs/{job_id}`. El `resultado` del job es `MunicipioDemoResponse`
+    (con `redirect_path` a la landing del muni y los quick-login listos).
     """
-    from services.categorias_default import crear_categorias_default
-    from services.seed_demo import seed_demo_completo
+    from services.jobs import encolar_job, job_encolado_response
 
     nombre_limpio = (data.nombre or "").strip()
     if len(nombre_limpio) < 3:
@@ -565,13 +540,31 @@ async def crear_municipio_demo(
             status_code=400,
             detail="El nombre del municipio debe tener al menos 3 caracteres",
         )
+    if not _normalizar_codigo(nombre_limpio):
+        raise HTTPException(status_code=400, detail="Nombre inválido")
+
+    job = await encolar_job(db, "municipio.crear_demo", data.model_dump())
+    return job_encolado_response(job)
+
+
+async def job_crear_demo(
+    db: AsyncSession,
+    ctx,
+    nombre: str,
+    lat: Optional[float] = None,
+    lng: Optional[float] = None,
+    provincia: Optional[str] = None,
+) -> dict:
+    """Handler del job `municipio.crear_demo` (ver services/jobs.py)."""
+    from services.seed_demo import seed_demo_completo
+
+    data = MunicipioDemoCreate(nombre=nombre, lat=lat, lng=lng, provincia=provincia)
+    nombre_limpio = data.nombre.strip()
 
     # Normalizar código. Si ya existe, sufijar con -2, -3... hasta encontrar
     # uno libre. Así el prospecto puede tipear "Pergamino" dos veces y se
     # crean demos separados sin choque.
     base_codigo = _normalizar_codigo(nombre_limpio)
-    if not base_codigo:
-        raise HTTPException(status_code=400, detail="Nombre inválido")
     codigo = base_codigo
     suffix = 1
     while True:
@@ -581,6 +574,8 @@ async def crear_municipio_demo(
         suffix += 1
         codigo = f"{base_codigo}-{suffix}"
 
+    await ctx.progreso(5, "Ubicando el municipio")
+
     # 1. Coordenadas del municipio. Si el autocomplete oficial ya las trajo
     # (tabla municipios_argentina), se usan directo. Si no, fallback al
     # geocoding por Nominatim (best-effort, default CABA).
@@ -589,23 +584,11 @@ async def crear_municipio_demo(
         lat, lng = data.lat, data.lng
     else:
         try:
-            import httpx
-            async with httpx.AsyncClient(timeout=5.0) as hc:
-                r = await hc.get(
-                    "https://nominatim.openstreetmap.org/search",
-                    params={
-                        "q": f"{nombre_limpio}, Argentina",
-                        "format": "json",
-                        "limit": 1,
-                        "countrycodes": "ar",
-                    },
-                    headers={"User-Agent": "Munify/1.0 (demo creator)"},
-                )
-                if r.status_code == 200:
-                    geo = r.json()
-                    if geo:
-                        lat = float(geo[0]["lat"])
-                        lng = float(geo[0]["lon"])
+            from services.geocoding import geocoder
+            geo = await geocoder.search({"q": f"{nombre_limpio}, Argentina", "limit": 1, "countrycodes": "ar"})
+            if geo:
+                lat = float(geo[0]["lat"])
+                lng = float(geo[0]["lon"])
         except Exception:
             # Silenciamos el error — el fallback de CABA ya está asignado
             pass
@@ -626,6 +609,8 @@ async def crear_municipio_demo(
     db.add(municipio)
     await db.flush()
 
+    await ctx.progreso(15, "Creando categorías")
+
     # 2. Sembrar categorías default (10 reclamo + 10 trámite)
     await crear_categorias_default(db, municipio.id)
     await db.flush()
@@ -635,9 +620,11 @@ async def crear_municipio_demo(
     # nacen mapeados a su dependencia correcta (ver seed_demo.py). Ya no se
     # corre un seed extra de 10+10 al azar (scripts/seed_10_demos.py): rompía
     # la coherencia dependencia↔categoría con asignaciones random.
-    seed_info = await seed_demo_completo(db, municipio.id, codigo)
+    await ctx.progreso(25, "Cargando dependencias, trámites y reclamos de ejemplo")
+    await seed_demo_completo(db, municipio.id, codigo)
 
     await db.commit()
+    await ctx.progreso(55, "Armando el turnero", forzar=True, cancelable=False)
 
     # 4. Turnero (best-effort): agenda, horarios y turnos de ejemplo sobre
     # los trámites ya creados en el paso 3.
@@ -650,6 +637,8 @@ async def crear_municipio_demo(
         print(f"[CREAR DEMO] Seed de turnero fallo (best-effort): {e}")
         await db.rollback()
 
+    await ctx.progreso(70, "Cargando tasas", forzar=True, cancelable=False)
+
     # 5. Seed de tasas (best-effort): partidas + deudas ficticias para el demo
     # del Boton de Pago GIRE. Requiere seed_tipos_tasa.py ya corrido (global).
     try:
@@ -658,6 +647,8 @@ async def crear_municipio_demo(
     except Exception as e:
         print(f"[CREAR DEMO] Seed de tasas fallo (best-effort): {e}")
 
+    await ctx.progreso(80, "Cargando tesorería", forzar=True, cancelable=False)
+
     # 6. Seed Tesoreria (best-effort): activa el modulo + carga catalogos
     # (15 tipos concepto, 300 conceptos, 10 tipos empleado), 5 cajas/fondos
     # (Tesoro+Copa+FOFINDE+FODEMEP+FOMEP), 5 parajes con poligonos demo,
@@ -684,7 +675,7 @@ async def crear_municipio_demo(
         nombre=municipio.nombre,
         codigo=municipio.codigo,
         redirect_path=f"/demo/listo?muni={municipio.codigo}",
-    )
+    ).model_dump()
 
 
 @router.post("", response_model=MunicipioCreateResponse)
@@ -808,7 +799,7 @@ async def eliminar_municipio(
     return {"message": "Municipio desactivado correctamente"}
 
 
-@router.delete("/demo/{codigo}")
+@router.delete("/demo/{codigo}", status_code=202)
 async def eliminar_municipio_demo(
     codigo: str,
     db: AsyncSession = Depends(get_db),
@@ -817,7 +808,11 @@ async def eliminar_municipio_demo(
     Elimina un municipio demo (hard delete con cascade).
     Endpoint PÚBLICO — solo borra munis que tengan usuarios @demo.com.
     No permite borrar municipios "reales" (producción).
+
+    Las validaciones corren en el request; el borrado en sí es un job en
+    segundo plano (devuelve `job_id`, ver `/api/jobs/{job_id}`).
     """
+    from services.jobs import encolar_job, job_encolado_response
     from sqlalchemy import func as sqla_func
     query = select(Municipio).where(
         sqla_func.lower(Municipio.codigo) == sqla_func.lower(codigo)
@@ -848,7 +843,19 @@ async def eliminar_municipio_demo(
             detail="Solo se pueden eliminar municipios de demo",
         )
 
-    muni_id = municipio.id
+    job = await encolar_job(
+        db, "municipio.eliminar_demo", {"municipio_id": municipio.id, "codigo": codigo},
+    )
+    return job_encolado_response(job)
+
+
+async def job_eliminar_demo(db: AsyncSession, ctx, municipio_id: int, codigo: str) -> dict:
+    """Handler del job `municipio.eliminar_demo` (ver services/jobs.py).
+
+    Son ~60 DELETEs (varios con JOIN) en una sola transacción: en un demo
+    con tesorería cargada tarda más que el timeout del proxy.
+    """
+    muni_id = municipio_id
     await db.execute(text("SET FOREIGN_KEY_CHECKS = 0"))
 
     # Primero borrar tablas intermedias sin municipio_id via JOIN
@@ -882,6 +889,9 @@ async def eliminar_municipio_demo(
             await db.execute(text(join_sql), {"mid": muni_id})
         except Exception:
             pass
+    # cancelable=False: con FOREIGN_KEY_CHECKS=0 en la conexion no queremos
+    # cortar a mitad; sólo se puede cancelar mientras está pendiente.
+    await ctx.progreso(30, "Tablas intermedias borradas", cancelable=False)
 
     # Cascade delete de todas las tablas con municipio_id
     tables_with_muni = [
@@ -906,11 +916,12 @@ async def eliminar_municipio_demo(
         "gasto_proyectos", "gastos", "contactos", "ordenes_pago",
         "salesbot_configs", "configuraciones",
     ]
-    for t in tables_with_muni:
+    for i, t in enumerate(tables_with_muni):
         try:
             await db.execute(text(f"DELETE FROM {t} WHERE municipio_id = :mid"), {"mid": muni_id})
         except Exception:
             pass
+        await ctx.progreso(30 + 65 * (i + 1) // len(tables_with_muni), f"Borrando {t}", cancelable=False)
 
     # Usuarios
     await db.execute(text("DELETE FROM usuarios WHERE municipio_id = :mid"), {"mid": muni_id})
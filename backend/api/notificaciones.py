@@ -1,42 +1,66 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
-from typing import List
+from sqlalchemy import select, update, func
+from typing import List, Optional
 
 from core.database import get_db
-from core.security import get_current_user
+from core.pagination import apply_keyset, fetch_keyset_page
+from core.security import get_current_user, require_roles
 from models.notificacion import Notificacion
 from models.user import User
 from schemas.notificacion import NotificacionResponse
+from services import outbox
 
 router = APIRouter()
 
 @router.get("", response_model=List[NotificacionResponse])
 async def get_notificaciones(
+    response: Response,
     leidas: bool = None,
+    cursor: Optional[str] = Query(None, description="Cursor keyset (header X-Next-Cursor)"),
+    limit: int = Query(50, ge=1, le=200),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
+    """Notificaciones del usuario, más nuevas primero.
+
+    Antes devolvía el historial completo (crece para siempre). Ahora corta
+    en `limit` y expone `X-Next-Cursor` para pedir las anteriores. El header
+    `X-Unread-Count` evita que la campanita tenga que llamar a `/count`.
+    """
     query = select(Notificacion).where(Notificacion.usuario_id == current_user.id)
     if leidas is not None:
         query = query.where(Notificacion.leida == leidas)
-    query = query.order_by(Notificacion.created_at.desc())
-    result = await db.execute(query)
-    return result.scalars().all()
+    query = apply_keyset(query, Notificacion.created_at, Notificacion.id, cursor)
+    items = await fetch_keyset_page(db, query, limit, response)
+
+    if not cursor:
+        no_leidas = await _count_no_leidas(db, current_user.id)
+        response.headers["X-Unread-Count"] = str(no_leidas)
+        expose = response.headers.get("Access-Control-Expose-Headers")
+        response.headers["Access-Control-Expose-Headers"] = (
+            f"{expose}, X-Unread-Count" if expose else "X-Unread-Count"
+        )
+    return items
+
+
+async def _count_no_leidas(db: AsyncSession, usuario_id: int) -> int:
+    """COUNT resuelto sólo con el índice `(usuario_id, leida)`."""
+    result = await db.execute(
+        select(func.count())
+        .select_from(Notificacion)
+        .where(Notificacion.usuario_id == usuario_id)
+        .where(Notificacion.leida == False)  # noqa: E712
+    )
+    return result.scalar() or 0
+
 
 @router.get("/count")
 async def get_notificaciones_count(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    from sqlalchemy import func
-    result = await db.execute(
-        select(func.count(Notificacion.id))
-        .where(Notificacion.usuario_id == current_user.id)
-        .where(Notificacion.leida == False)
-    )
-    count = result.scalar()
-    return {"count": count}
+    return {"count": await _count_no_leidas(db, current_user.id)}
 
 @router.put("/{notificacion_id}/leer")
 async def marcar_leida(
@@ -70,3 +94,22 @@ async def marcar_todas_leidas(
     )
     await db.commit()
     return {"message": "Todas las notificaciones marcadas como leídas"}
+
+
+@router.get("/outbox/metricas")
+async def metricas_outbox(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_roles(["admin"])),
+):
+    """Pendientes, reintentos, dead letter y lag del outbox, por handler."""
+    return await outbox.metricas(db)
+
+
+@router.post("/outbox/reintentar")
+async def reintentar_outbox(
+    ids: Optional[List[int]] = Query(None, description="Eventos a reintentar (todos los fallidos si se omite)"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_roles(["admin"])),
+):
+    """Vuelve a encolar eventos del outbox que agotaron sus reintentos."""
+    return {"reencolados": await outbox.reintentar_fallidos(db, ids)}
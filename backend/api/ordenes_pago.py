@@ -22,6 +22,8 @@ from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.database import get_db
+from core.pagination import set_next_cursor
+from core.respuestas import respuesta_json
 from core.security import get_current_user
 from core.tenancy import get_effective_municipio_id
 from services.factura_upload import subir_factura
@@ -35,7 +37,10 @@ from schemas.orden_pago import (
     OrdenPagoCreate, OrdenPagoUpdate, OrdenPagoResponse,
     AnularRequest, PagarOPRequest, CambiarEtapaRequest,
 )
+from services import cuenta_corriente
 from services.op_pdf_generator import build_op_pdf
+from services.render_pool import render_pool
+from services.tesoreria_nombres import resolver_nombres
 
 router = APIRouter()
 
@@ -85,34 +90,60 @@ async def _siguiente_numero(db: AsyncSession, municipio_id: int) -> str:
     return f"{prefix}{seq:04d}"
 
 
+async def _enrich_many(db: AsyncSession, ops: List[OrdenPago]) -> List[OrdenPagoResponse]:
+    """Arma las responses de una pagina de OPs con 4 queries fijas (no N+1)."""
+    if not ops:
+        return []
+    nombres = await resolver_nombres(
+        db,
+        contacto_ids=[op.destino_contacto_id for op in ops],
+        dependencia_ids=[op.destino_dependencia_id for op in ops],
+        caja_ids=[op.caja_id for op in ops],
+        usuario_ids=[op.creador_id for op in ops] + [op.autorizado_por_id for op in ops],
+    )
+    out: List[OrdenPagoResponse] = []
+    for op in ops:
+        resp = OrdenPagoResponse.model_validate(op)
+        resp.contacto_nombre = nombres.contacto(op.destino_contacto_id)
+        resp.dependencia_nombre = nombres.dependencia(op.destino_dependencia_id)
+        resp.caja_nombre = nombres.caja(op.caja_id)
+        resp.creador_nombre = nombres.usuario(op.creador_id)
+        resp.autorizado_por_nombre = nombres.usuario(op.autorizado_por_id)
+        out.append(resp)
+    return out
+
+
+# Columnas de la OP que van tal cual en OrdenPagoResponse
+_COLUMNAS_LISTADO = [c for c in OrdenPago.__table__.c if c.key in OrdenPagoResponse.model_fields]
+
+
+async def _listado_rapido(db: AsyncSession, filas) -> List[dict]:
+    """Fast path de list_ops (hasta 5000 OPs): los mismos campos que
+    OrdenPagoResponse armados desde las filas, sin hidratar el ORM ni validar
+    con Pydantic. Los nombres se resuelven igual que en `_enrich_many`."""
+    if not filas:
+        return []
+    nombres = await resolver_nombres(
+        db,
+        contacto_ids=[f["destino_contacto_id"] for f in filas],
+        dependencia_ids=[f["destino_dependencia_id"] for f in filas],
+        caja_ids=[f["caja_id"] for f in filas],
+        usuario_ids=[f["creador_id"] for f in filas] + [f["autorizado_por_id"] for f in filas],
+    )
+    out: List[dict] = []
+    for f in filas:
+        d = dict(f)
+        d["contacto_nombre"] = nombres.contacto(f["destino_contacto_id"])
+        d["dependencia_nombre"] = nombres.dependencia(f["destino_dependencia_id"])
+        d["caja_nombre"] = nombres.caja(f["caja_id"])
+        d["creador_nombre"] = nombres.usuario(f["creador_id"])
+        d["autorizado_por_nombre"] = nombres.usuario(f["autorizado_por_id"])
+        out.append(d)
+    return out
+
+
 async def _enrich(db: AsyncSession, op: OrdenPago) -> OrdenPagoResponse:
-    resp = OrdenPagoResponse.model_validate(op)
-    if op.destino_contacto_id:
-        c = (await db.execute(select(Contacto).where(Contacto.id == op.destino_contacto_id))).scalar_one_or_none()
-        if c:
-            resp.contacto_nombre = f"{c.nombre} {c.apellido or ''}".strip()
-    if op.destino_dependencia_id:
-        from models import MunicipioDependencia
-        md = (await db.execute(
-            select(MunicipioDependencia)
-            .options(selectinload(MunicipioDependencia.dependencia))
-            .where(MunicipioDependencia.id == op.destino_dependencia_id)
-        )).scalar_one_or_none()
-        if md and md.dependencia:
-            resp.dependencia_nombre = md.dependencia.nombre
-    if op.caja_id:
-        caja = (await db.execute(select(TesoreriaCaja).where(TesoreriaCaja.id == op.caja_id))).scalar_one_or_none()
-        if caja:
-            resp.caja_nombre = caja.nombre
-    if op.creador_id:
-        u = (await db.execute(select(User).where(User.id == op.creador_id))).scalar_one_or_none()
-        if u:
-            resp.creador_nombre = f"{u.nombre or ''} {u.apellido or ''}".strip() or u.email
-    if op.autorizado_por_id:
-        u = (await db.execute(select(User).where(User.id == op.autorizado_por_id))).scalar_one_or_none()
-        if u:
-            resp.autorizado_por_nombre = f"{u.nombre or ''} {u.apellido or ''}".strip() or u.email
-    return resp
+    return (await _enrich_many(db, [op]))[0]
 
 
 # ============================================================
@@ -163,8 +194,8 @@ async def list_ops(
     response.headers["Access-Control-Expose-Headers"] = "X-Total-Count"
 
     q = q.order_by(OrdenPago.fecha_emision.desc(), OrdenPago.id.desc()).offset(skip).limit(limit)
-    items = list((await db.execute(q)).scalars().all())
-    return [await _enrich(db, op) for op in items]
+    filas = (await db.execute(q.with_only_columns(*_COLUMNAS_LISTADO))).mappings().all()
+    return respuesta_json(await _listado_rapido(db, filas), response)
 
 
 @router.post("", response_model=OrdenPagoResponse, status_code=201)
@@ -572,7 +603,8 @@ async def descargar_op_pdf(
     secretario = op.secretario_nombre or muni.secretario_nombre or ""
     intendente = op.intendente_nombre or muni.intendente_nombre or ""
 
-    pdf_bytes = build_op_pdf(
+    pdf_bytes = await render_pool.ejecutar(
+        build_op_pdf,
         muni_nombre=muni.nombre,
         muni_direccion=muni.direccion or "",
         muni_telefono=muni.telefono or "",
@@ -610,17 +642,23 @@ async def descargar_op_pdf(
 async def cuenta_corriente_contacto(
     contacto_id: int,
     request: Request,
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Cursor keyset (header X-Next-Cursor de la pagina anterior)"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Cuenta corriente de un contacto (proveedor o beneficiario): todas las
-    OPs emitidas a su nombre + totales agregados.
+    """Cuenta corriente de un contacto (proveedor o beneficiario): OPs
+    emitidas a su nombre (paginadas, mas nueva primero) + totales agregados.
 
-    Totales:
+    Totales (precalculados en contacto_cuenta_corriente, ver
+    services/cuenta_corriente):
       - facturado: suma de OPs no anuladas.
       - pagado: suma de OPs pagadas.
       - pendiente: suma de OPs pendientes o autorizadas (saldo a pagar).
       - devengado: suma de OPs en etapa contable 'devengado' pero aun no pagadas.
+
+    Si hay mas OPs, el cursor de la siguiente pagina viene en X-Next-Cursor.
     """
     _require_admin(current_user)
     municipio_id = get_effective_municipio_id(request, current_user)
@@ -631,47 +669,8 @@ async def cuenta_corriente_contacto(
     if not contacto:
         raise HTTPException(404, "Contacto no encontrado")
 
-    rows = (await db.execute(
-        select(OrdenPago)
-        .where(
-            OrdenPago.municipio_id == municipio_id,
-            OrdenPago.destino_tipo == "contacto",
-            OrdenPago.destino_contacto_id == contacto_id,
-        )
-        .order_by(OrdenPago.fecha_emision.desc(), OrdenPago.id.desc())
-    )).scalars().all()
-
-    facturado = Decimal(0)
-    pagado = Decimal(0)
-    pendiente = Decimal(0)
-    devengado_no_pagado = Decimal(0)
-    items = []
-    for op in rows:
-        monto = Decimal(op.monto_pesos or 0)
-        estado_v = op.estado.value if hasattr(op.estado, "value") else str(op.estado)
-        etapa_v = op.etapa_contable.value if hasattr(op.etapa_contable, "value") else str(op.etapa_contable)
-        if estado_v != "anulada":
-            facturado += monto
-        if estado_v == "pagada":
-            pagado += monto
-        elif estado_v in ("pendiente", "autorizada"):
-            pendiente += monto
-            if etapa_v == "devengado":
-                devengado_no_pagado += monto
-        items.append({
-            "id": op.id,
-            "numero": op.numero,
-            "fecha_emision": op.fecha_emision.isoformat() if op.fecha_emision else None,
-            "fecha_vencimiento": op.fecha_vencimiento.isoformat() if op.fecha_vencimiento else None,
-            "fecha_pago": op.fecha_pago.isoformat() if op.fecha_pago else None,
-            "concepto": op.concepto,
-            "monto_pesos": str(monto),
-            "estado": estado_v,
-            "etapa_contable": etapa_v,
-            "nro_factura": op.nro_factura,
-            "gasto_id": op.gasto_id,
-        })
-
+    ops, siguiente = await cuenta_corriente.pagina_ops(db, municipio_id, contacto_id, limit, cursor)
+    set_next_cursor(response, siguiente)
     return {
         "contacto": {
             "id": contacto.id,
@@ -679,17 +678,38 @@ async def cuenta_corriente_contacto(
             "dni": contacto.dni,
             "tipo": contacto.tipo.value if hasattr(contacto.tipo, "value") else str(contacto.tipo) if contacto.tipo else None,
         },
-        "totales": {
-            "facturado": str(facturado),
-            "pagado": str(pagado),
-            "pendiente": str(pendiente),
-            "devengado_no_pagado": str(devengado_no_pagado),
-            "cantidad_ops": len([i for i in items if i["estado"] != "anulada"]),
-        },
-        "ops": items,
+        "totales": await cuenta_corriente.totales(db, contacto_id),
+        "ops": ops,
     }
 
 
+@router.get("/contacto/{contacto_id}/cuenta-corriente/movimientos")
+async def movimientos_cuenta_corriente(
+    contacto_id: int,
+    request: Request,
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Cursor keyset (header X-Next-Cursor de la pagina anterior)"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Libro mayor del contacto: OPs, gastos directos, movimientos de caja y
+    retenciones con debe/haber y saldo acumulado (saldo > 0 = el muni le
+    debe al contacto). Mas nuevo primero, paginado por cursor."""
+    _require_admin(current_user)
+    municipio_id = get_effective_municipio_id(request, current_user)
+
+    existe = (await db.execute(
+        select(Contacto.id).where(Contacto.id == contacto_id, Contacto.municipio_id == municipio_id)
+    )).scalar_one_or_none()
+    if not existe:
+        raise HTTPException(404, "Contacto no encontrado")
+
+    items, siguiente = await cuenta_corriente.movimientos(db, municipio_id, contacto_id, limit, cursor)
+    set_next_cursor(response, siguiente)
+    return items
+
+
 @router.get("/transparencia/export")
 async def export_transparencia(
     request: Request,
@@ -890,7 +910,7 @@ async def reportes(
         .order_by(OrdenPago.fecha_vencimiento.asc())
         .limit(20)
     )).scalars().all()
-    vencidas = [await _enrich(db, op) for op in vencidas_rows]
+    vencidas = await _enrich_many(db, list(vencidas_rows))
 
     # Proximas a vencer
     proximas_rows = (await db.execute(
@@ -905,7 +925,7 @@ async def reportes(
         .order_by(OrdenPago.fecha_vencimiento.asc())
         .limit(20)
     )).scalars().all()
-    proximas = [await _enrich(db, op) for op in proximas_rows]
+    proximas = await _enrich_many(db, list(proximas_rows))
 
     # Top beneficiarios (contactos + dependencias separados, mes actual,
     # solo OPs autorizadas o pagadas)
@@ -36,18 +36,18 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from core.database import get_db
-from core.security import get_current_user
+from core.security import get_current_user, require_roles
 from core.config import settings
 from models.user import User
 from models.enums import RolUsuario
 from models.pago_sesion import (
     PagoSesion,
     EstadoSesionPago,
-    EstadoImputacion,
     MedioPagoGateway,
 )
-from models.tasas import Deuda, EstadoDeuda, Pago, MedioPago as MedioPagoTasa, Partida
+from models.tasas import Deuda, EstadoDeuda, Partida
 from services.pagos import get_provider, get_provider_para_muni
+from services.pagos.confirmacion import aprobar_sesion, marcar_deuda_pagada
 
 
 router = APIRouter(prefix="/pagos", tags=["Pagos"])
@@ -108,23 +108,6 @@ def _generar_session_id() -> str:
     return f"PB-{token_hex(7).upper()}"
 
 
-async def _generar_cut_unico(db: AsyncSession, intentos: int = 6) -> str:
-    """Genera un CUT corto (CUT-A3F2B1) garantizando unicidad en DB.
-
-    Colision practicamente imposible con 6 chars hex (16M combinaciones), pero
-    reintentamos igual si el UNIQUE INDEX rechaza. Si despues de N intentos
-    no lo logramos, caemos a un CUT largo con timestamp para no fallar.
-    """
-    from sqlalchemy import exists as _exists, select as _select
-    for _ in range(intentos):
-        candidato = f"CUT-{token_hex(3).upper()}"
-        q = await db.execute(_select(PagoSesion.id).where(PagoSesion.codigo_cut_qr == candidato))
-        if q.scalar_one_or_none() is None:
-            return candidato
-    # Fallback — larguisimo, pero garantizado unico
-    return f"CUT-{token_hex(6).upper()}"
-
-
 # ============================================================
 # 1. Crear sesion de pago (desde Munify)
 # ============================================================
@@ -533,11 +516,7 @@ async def confirmar_pago(
     db: AsyncSession = Depends(get_db),
 ):
     """El vecino eligio medio de pago y confirmo en el checkout externo."""
-    q = await db.execute(
-        select(PagoSesion)
-        .options(selectinload(PagoSesion.deuda))
-        .where(PagoSesion.id == session_id)
-    )
+    q = await db.execute(select(PagoSesion).where(PagoSesion.id == session_id))
     sesion = q.scalar_one_or_none()
     if not sesion:
         raise HTTPException(status_code=404, detail="Sesion no encontrada")
@@ -549,48 +528,13 @@ async def confirmar_pago(
         raise HTTPException(status_code=400, detail=f"Sesion {sesion.estado.value}")
 
     # En un provider real acá haríamos POST al provider y esperaríamos webhook.
-    # Como es mock, simulamos el camino feliz: marcamos aprobado directo.
-    sesion.estado = EstadoSesionPago.APPROVED
-    sesion.medio_pago = body.medio_pago
-    sesion.completed_at = datetime.utcnow()
-    sesion.metadatos = (sesion.metadatos or {}) | {
+    # Como es mock, simulamos el camino feliz: marcamos aprobado directo, por
+    # el mismo path que el worker de webhooks (sesion + CUT + Deuda/Pago).
+    await aprobar_sesion(db, sesion, body.medio_pago, {
         "medio_detalle": body.metadatos or {},
         "simulado": True,
-    }
-
-    # Generar CUT (Codigo Unico de Tramite) si aun no lo tiene —
-    # el operador de ventanilla lo escanea para verificar el pago.
-    if not sesion.codigo_cut_qr:
-        sesion.codigo_cut_qr = await _generar_cut_unico(db)
-
-    # Marcar pendiente de imputacion contable. Contaduria despues lo pasa
-    # a 'imputado' cuando carga el asiento en el sistema tributario (RAFAM).
-    if sesion.imputacion_estado is None:
-        sesion.imputacion_estado = EstadoImputacion.PENDIENTE
-
-    # Marcar la deuda como pagada + crear registro de Pago
-    if sesion.deuda:
-        sesion.deuda.estado = EstadoDeuda.PAGADA
-        sesion.deuda.fecha_pago = datetime.utcnow()
-        sesion.deuda.pago_externo_id = sesion.external_id
-
-        # Mapear el medio del gateway al medio de pago de Tasas
-        medio_tasa_map = {
-            MedioPagoGateway.TARJETA: MedioPagoTasa.TARJETA_CREDITO,
-            MedioPagoGateway.QR: MedioPagoTasa.QR,
-            MedioPagoGateway.EFECTIVO_CUPON: MedioPagoTasa.RAPIPAGO,
-            MedioPagoGateway.TRANSFERENCIA: MedioPagoTasa.TRANSFERENCIA,
-            MedioPagoGateway.DEBITO_AUTOMATICO: MedioPagoTasa.DEBITO_AUTOMATICO,
-        }
-        db.add(Pago(
-            deuda_id=sesion.deuda.id,
-            usuario_id=sesion.vecino_user_id,
-            monto=sesion.monto,
-            medio=medio_tasa_map.get(body.medio_pago, MedioPagoTasa.TARJETA_CREDITO),
-            pago_externo_id=sesion.external_id,
-            estado="confirmado",
-            payload_externo=sesion.metadatos,
-        ))
+    })
+    await marcar_deuda_pagada(db, sesion)
 
     # Si era pago de un tramite: registrar el evento y, si estaba en
     # PENDIENTE_PAGO (cobro al inicio), pasar la solicitud a RECIBIDO ahora
@@ -764,63 +708,28 @@ async def cancelar_sesion(session_id: str, db: AsyncSession = Depends(get_db)):
 #
 # MP llama a este endpoint cuando un pago cambia de estado. El body es
 # como `{"action": "payment.updated", "data": {"id": "12345"}}`.
-# Validamos firma (cuando el provider la manda), registramos el evento en
-# bitacora, y si es `approved` ejecutamos el mismo path que /confirmar.
+# Registramos el evento en bitacora y respondemos; el worker de
+# services/pagos/webhook_worker.py valida la firma (cuando el provider la
+# manda), consulta el estado y si es `approved` marca la deuda pagada.
 #
-# Endpoint abierto (sin auth): la seguridad viene de la firma + idempotencia.
+# Endpoint abierto (sin auth): la seguridad viene de la firma + idempotencia
+# (y de que el estado real siempre se consulta al provider).
 # ============================================================
 
-import hashlib
-import hmac as _hmac
 from fastapi import Request
-from models.municipio_proveedor_pago import MunicipioProveedorPago, PROVEEDOR_MERCADOPAGO
 from models.pago_webhook_evento import PagoWebhookEvento
-
-
-async def _validar_firma_mercadopago(
-    raw_body: bytes,
-    signature_header: str,
-    request_id: str,
-    data_id: str,
-    webhook_secret: str,
-) -> bool:
-    """Valida la firma HMAC-SHA256 del webhook de MP.
-
-    MP envia el header `x-signature: ts=<ts>,v1=<hash>` donde el hash
-    se calcula sobre `id:<data_id>;request-id:<req_id>;ts:<ts>;`.
-    Si el muni no tiene webhook_secret configurado, saltamos validacion
-    (pero marcamos firma_ok=false y loguea warning).
-    """
-    if not webhook_secret or not signature_header:
-        return False
-    try:
-        parts = dict(
-            p.strip().split("=", 1) for p in signature_header.split(",") if "=" in p
-        )
-        ts = parts.get("ts", "")
-        v1 = parts.get("v1", "")
-        if not ts or not v1:
-            return False
-        manifest = f"id:{data_id};request-id:{request_id};ts:{ts};"
-        calc = _hmac.new(
-            webhook_secret.encode(),
-            manifest.encode(),
-            hashlib.sha256,
-        ).hexdigest()
-        return _hmac.compare_digest(calc, v1)
-    except Exception:
-        return False
+from services.pagos.webhook_worker import webhook_pool, metricas as metricas_webhooks
 
 
 @router.post("/webhook/mercadopago")
 async def webhook_mercadopago(request: Request, db: AsyncSession = Depends(get_db)):
     """Recibe notificacion de MP.
 
-    Devolvemos 200 rapido siempre (MP reintenta si no). El procesamiento
-    real queda registrado en `pago_webhook_eventos` y, si es 'approved',
-    propaga al mismo path de confirmar_pago.
+    Solo persiste el evento en `pago_webhook_eventos` y responde 200 (MP
+    reintenta si tardamos). Resolver la sesion, validar la firma, consultar
+    el estado real y marcar la deuda lo hace el pool de
+    services/pagos/webhook_worker.py, con reintentos y backoff.
     """
-    raw_body = await request.body()
     try:
         body = await request.json()
     except Exception:
@@ -833,115 +742,37 @@ async def webhook_mercadopago(request: Request, db: AsyncSession = Depends(get_d
         logger.warning("Webhook MP sin data.id — body: %s", body)
         return {"received": True}
 
-    # Registrar en bitacora (idempotente por UNIQUE provider+external+evento)
-    firma_header = request.headers.get("x-signature", "")
-    request_id = request.headers.get("x-request-id", "")
-
-    # Buscar la sesion por external_reference (el preference_id lo
-    # almacenamos en external_id cuando creamos la sesion). MP a veces
-    # manda payment_id, que no es preference_id — en ese caso buscamos
-    # por pago completo con /v1/payments/{id} y obtenemos el external_reference.
-    sesion: Optional[PagoSesion] = None
-    external_ref: Optional[str] = None
-
-    # Por ahora: si el evento es payment.updated, consultamos MP para
-    # obtener el external_reference real (que es nuestro sesion_id).
-    # Esto requiere tener credenciales validas para el muni en cuestion.
-    # Como no sabemos el muni hasta resolver la sesion, buscamos por
-    # external_id primero (preference_id) y sino ignoramos silenciosamente.
-
-    q = await db.execute(
-        select(PagoSesion).where(PagoSesion.external_id == data_id)
-    )
-    sesion = q.scalar_one_or_none()
-
-    # Validar firma si tenemos el muni
-    firma_ok = False
-    if sesion:
-        cfg_q = await db.execute(
-            select(MunicipioProveedorPago).where(
-                MunicipioProveedorPago.municipio_id == sesion.municipio_id,
-                MunicipioProveedorPago.proveedor == PROVEEDOR_MERCADOPAGO,
-                MunicipioProveedorPago.activo == True,  # noqa: E712
-            )
-        )
-        cfg = cfg_q.scalar_one_or_none()
-        if cfg and cfg.webhook_secret:
-            firma_ok = await _validar_firma_mercadopago(
-                raw_body, firma_header, request_id, data_id, cfg.webhook_secret
-            )
-
-    # Persistir el evento (unique key dedupea reentregas de MP)
+    # Persistir el evento (unique key dedupea reentregas de MP). Los headers
+    # de firma se guardan para que el worker la valide.
     evt = PagoWebhookEvento(
         provider="mercadopago",
         external_id=data_id,
         evento=evento,
-        session_id=sesion.id if sesion else None,
         payload=body,
-        firma_ok=firma_ok,
+        firma_ok=False,
+        firma_header=request.headers.get("x-signature", "")[:255] or None,
+        request_id=request.headers.get("x-request-id", "")[:100] or None,
     )
     db.add(evt)
     try:
         await db.commit()
     except Exception as e:
-        # UNIQUE constraint — evento ya procesado, responder 200 y salir
+        # UNIQUE constraint — evento ya recibido, responder 200 y salir
         await db.rollback()
-        logger.info("Webhook MP duplicado ignorado: %s %s %s -> %s", evento, data_id, sesion and sesion.id, e)
+        logger.info("Webhook MP duplicado ignorado: %s %s -> %s", evento, data_id, e)
         return {"received": True, "duplicate": True}
 
-    # Si no teniamos sesion, no hay mas nada que hacer — el evento queda
-    # en bitacora para inspeccion manual.
-    if not sesion:
-        return {"received": True, "session_resolved": False}
-
-    # Consultar estado real en MP (el payload del webhook no lo trae)
-    provider = await get_provider_para_muni(db, sesion.municipio_id)
-    try:
-        estado_ext = await provider.consultar_estado(data_id)
-    except Exception as e:
-        evt.error = str(e)[:500]
-        await db.commit()
-        logger.error("Webhook MP no pudo consultar estado: %s", e)
-        return {"received": True, "error": "consulta_estado_fallo"}
-
-    if estado_ext.aprobado and sesion.estado != EstadoSesionPago.APPROVED:
-        # Ejecutar el mismo path que /confirmar (marcar deuda pagada + pago)
-        sesion.estado = EstadoSesionPago.APPROVED
-        sesion.medio_pago = estado_ext.medio_pago or sesion.medio_pago
-        sesion.completed_at = datetime.utcnow()
-        sesion.metadatos = (sesion.metadatos or {}) | {"webhook": evento, "mp_payload": estado_ext.payload_raw or {}}
-        if not sesion.codigo_cut_qr:
-            sesion.codigo_cut_qr = await _generar_cut_unico(db)
-        if sesion.imputacion_estado is None:
-            sesion.imputacion_estado = EstadoImputacion.PENDIENTE
-        if sesion.deuda_id:
-            dq = await db.execute(select(Deuda).where(Deuda.id == sesion.deuda_id))
-            deuda = dq.scalar_one_or_none()
-            if deuda and deuda.estado != EstadoDeuda.PAGADA:
-                deuda.estado = EstadoDeuda.PAGADA
-                deuda.fecha_pago = datetime.utcnow()
-                deuda.pago_externo_id = sesion.external_id
-                medio_tasa_map = {
-                    MedioPagoGateway.TARJETA: MedioPagoTasa.TARJETA_CREDITO,
-                    MedioPagoGateway.QR: MedioPagoTasa.QR,
-                    MedioPagoGateway.EFECTIVO_CUPON: MedioPagoTasa.RAPIPAGO,
-                    MedioPagoGateway.TRANSFERENCIA: MedioPagoTasa.TRANSFERENCIA,
-                    MedioPagoGateway.DEBITO_AUTOMATICO: MedioPagoTasa.DEBITO_AUTOMATICO,
-                }
-                db.add(Pago(
-                    deuda_id=deuda.id,
-                    usuario_id=sesion.vecino_user_id,
-                    monto=sesion.monto,
-                    medio=medio_tasa_map.get(sesion.medio_pago, MedioPagoTasa.TARJETA_CREDITO) if sesion.medio_pago else MedioPagoTasa.TARJETA_CREDITO,
-                    pago_externo_id=sesion.external_id,
-                    estado="confirmado",
-                    payload_externo=sesion.metadatos,
-                ))
+    webhook_pool.notificar()
+    return {"received": True, "evento_id": evt.id}
 
-    evt.procesado_at = datetime.utcnow()
-    await db.commit()
 
-    return {"received": True, "procesado": True, "session_id": sesion.id}
+@router.get("/webhook/metricas")
+async def metricas_webhook(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_roles(["admin"])),
+):
+    """Lag y reintentos de la cola de webhooks de pago."""
+    return await metricas_webhooks(db)
 
 
 # ============================================================
@@ -16,9 +16,13 @@ from models.empleado import Empleado
 from models.municipio_dependencia import MunicipioDependencia
 from models.user import User
 from models.enums import RolUsuario, EstadoReclamo
+from services.disponibilidad import calcular_disponibilidad
 
 router = APIRouter()
 
+# Tope de días para calcular la ocupación (el calendario pide semana o mes)
+MAX_DIAS_OCUPACION = 42
+
 
 # ============ Schemas ============
 
@@ -110,6 +114,15 @@ class AusenciaPlanificacion(BaseModel):
         from_attributes = True
 
 
+class OcupacionDia(BaseModel):
+    empleado_id: int
+    fecha: str
+    minutos_jornada: int
+    minutos_ocupados: int
+    minutos_libres: int
+    ausencia: Optional[str] = None
+
+
 class PlanificacionSemanalResponse(BaseModel):
     semana_inicio: str
     semana_fin: str
@@ -117,6 +130,7 @@ class PlanificacionSemanalResponse(BaseModel):
     tareas: List[TareaReclamo]
     ausencias: List[AusenciaPlanificacion]
     sin_asignar: List[TareaReclamo]
+    ocupacion: List[OcupacionDia] = []
 
 
 from core.tenancy import resolve_municipio_id as get_effective_municipio_id  # noqa: E402
@@ -259,7 +273,7 @@ async def get_planificacion_semanal(
     # 3. Obtener ausencias del personal en el rango
     ausencias_response = []
     try:
-        from models.empleado_gestion import EmpleadoAusencia
+        from models.empleado_ausencia import EmpleadoAusencia
 
         query_ausencias = select(EmpleadoAusencia).where(
             or_(
@@ -344,13 +358,32 @@ async def get_planificacion_semanal(
         for r in sin_asignar
     ]
 
+    # 5. Ocupación por empleado y día (jornada - ausencias - reclamos/OTs)
+    ocupacion_response = []
+    if timedelta(0) <= fecha_f - fecha_ini <= timedelta(days=MAX_DIAS_OCUPACION):
+        disponibilidad = await calcular_disponibilidad(db, municipio_id, fecha_ini, fecha_f)
+        for fecha, dia_muni in disponibilidad.items():
+            for emp in empleados_response:
+                dia = dia_muni.dias.get(emp.id)
+                if dia is None:
+                    continue
+                ocupacion_response.append(OcupacionDia(
+                    empleado_id=emp.id,
+                    fecha=fecha.isoformat(),
+                    minutos_jornada=dia.minutos_jornada,
+                    minutos_ocupados=dia.minutos_ocupados,
+                    minutos_libres=dia.minutos_libres,
+                    ausencia=dia.ausencia,
+                ))
+
     return PlanificacionSemanalResponse(
         semana_inicio=fecha_inicio,
         semana_fin=fecha_fin,
         empleados=empleados_response,
         tareas=tareas_response,
         ausencias=ausencias_response,
-        sin_asignar=sin_asignar_response
+        sin_asignar=sin_asignar_response,
+        ocupacion=ocupacion_response,
     )
 
 
@@ -11,12 +11,14 @@ import httpx
 from core.database import get_db
 from core.rate_limit import limiter, LIMITS
 from core.config import settings
+from core.respuestas import respuesta_json
 from models import Reclamo, Zona
 from models.categoria_reclamo import CategoriaReclamo as Categoria
 from models.categoria_tramite import CategoriaTramite
 from models.municipio import Municipio
 from models.calificacion import Calificacion
 from models.enums import EstadoReclamo
+from services.mapa_tiles import Bbox, Capa, agregar
 from services.ia_service import clasificar_reclamo, CATEGORY_KEYWORDS
 
 router = APIRouter()
@@ -271,49 +273,52 @@ async def get_reclamos_mapa_publico(
     estado: Optional[str] = None,
     categoria_id: Optional[int] = None,
     dias: int = Query(30, ge=1, le=365),
+    municipio_id: Optional[int] = Query(None, description="Filtrar por municipio (sin él: toda la plataforma)"),
+    bbox: Optional[str] = Query(None, description="oeste,sur,este,norte (toBBoxString de Leaflet). Sin él: toda la extensión de los datos"),
+    zoom: Optional[int] = Query(None, ge=0, le=22, description="Zoom del mapa. Sin él: el más fino que entre en el límite de tiles"),
     db: AsyncSession = Depends(get_db)
 ):
-    """Obtener reclamos para mostrar en mapa público - SIN AUTENTICACIÓN"""
-    fecha_desde = datetime.utcnow() - timedelta(days=dias)
+    """Obtener reclamos para mostrar en mapa público - SIN AUTENTICACIÓN
 
-    query = (
-        select(Reclamo)
-        .where(
-            Reclamo.created_at >= fecha_desde,
-            Reclamo.latitud.isnot(None),
-            Reclamo.longitud.isnot(None)
-        )
-        .options(selectinload(Reclamo.categoria))
-    )
+    Agregado por celdas según bbox + zoom (services/mapa_tiles): `clusters`
+    con centroide y cantidad, y `puntos` con el detalle solo en zoom alto.
+    """
+    fecha_desde = datetime.utcnow() - timedelta(days=dias)
+    try:
+        area = Bbox.parsear(bbox) if bbox else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
+    condiciones = [Reclamo.created_at >= fecha_desde]
+    estado_enum = None
     if estado:
         try:
             estado_enum = EstadoReclamo(estado)
-            query = query.where(Reclamo.estado == estado_enum)
+            condiciones.append(Reclamo.estado == estado_enum)
         except ValueError:
             pass
 
     if categoria_id:
-        query = query.where(Reclamo.categoria_id == categoria_id)
-
-    result = await db.execute(query)
-    reclamos = result.scalars().all()
-
-    return {
-        "total": len(reclamos),
-        "puntos": [
-            {
-                "id": r.id,
-                "lat": r.latitud,
-                "lng": r.longitud,
-                "titulo": r.titulo,
-                "categoria": r.categoria.nombre,
-                "estado": r.estado.value,
-                "color": _get_color_estado(r.estado)
-            }
-            for r in reclamos
-        ]
-    }
+        condiciones.append(Reclamo.categoria_id == categoria_id)
+
+    capa = Capa(
+        nombre="mapa",
+        municipio_id=municipio_id,
+        filtros=(estado_enum, categoria_id, dias),
+        condiciones=condiciones,
+        columnas_punto=(Reclamo.id, Reclamo.titulo, Categoria.nombre.label("categoria"), Reclamo.estado),
+        punto=lambda r: {
+            "id": r.id,
+            "lat": r.latitud,
+            "lng": r.longitud,
+            "titulo": r.titulo,
+            "categoria": r.categoria,
+            "estado": r.estado.value,
+            "color": _get_color_estado(r.estado)
+        },
+        joins=((Categoria, Reclamo.categoria_id == Categoria.id),),
+    )
+    return respuesta_json(await agregar(db, capa, zoom, area))
 
 
 def _get_color_estado(estado: EstadoReclamo) -> str:
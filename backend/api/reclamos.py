@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Request, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Request, Response, BackgroundTasks
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from sqlalchemy.orm import selectinload
@@ -7,12 +7,12 @@ from pydantic import BaseModel
 from datetime import datetime, timezone, timedelta
 import cloudinary
 import cloudinary.uploader
-import asyncio
 import logging
 
 from core.database import get_db
 from core.security import get_current_user, get_current_user_optional, require_roles
 from core.config import settings
+from core.pagination import apply_keyset, decode_payload, encode_payload, fetch_keyset_page, set_next_cursor
 from models.reclamo import Reclamo
 from models.historial import HistorialReclamo
 from models.documento import Documento
@@ -26,7 +26,8 @@ from schemas.reclamo import (
     ReclamoAsignar, ReclamoRechazar, ReclamoResolver, ReclamoComentario
 )
 from schemas.historial import HistorialResponse
-from services.gamificacion_service import GamificacionService
+from services.outbox import publicar
+from services.reclamo_busqueda import buscar_ids
 
 router = APIRouter()
 
@@ -237,123 +238,6 @@ async def enviar_notificacion_push(
             traceback.print_exc()
 
 
-async def enviar_notificacion_dependencia(
-    reclamo_id: int,
-    municipio_dependencia_id: int,
-    categoria_nombre: str = None
-):
-    """
-    Envía notificación a los supervisores de la dependencia asignada.
-    Usa su propia sesión de DB para evitar problemas con tasks async.
-    """
-    from core.database import AsyncSessionLocal
-    async with AsyncSessionLocal() as new_db:
-        try:
-            # Recargar el reclamo en la nueva sesión
-            result = await new_db.execute(
-                select(Reclamo).where(Reclamo.id == reclamo_id)
-            )
-            reclamo = result.scalar_one_or_none()
-            if not reclamo:
-                print(f"[PUSH] Reclamo #{reclamo_id} no encontrado", flush=True)
-                return
-
-            from services.push_service import notificar_dependencia_reclamo_nuevo
-            count = await notificar_dependencia_reclamo_nuevo(new_db, reclamo, categoria_nombre)
-            print(f"[PUSH] Notificacion enviada a dependencia: {count} usuarios", flush=True)
-        except Exception as e:
-            print(f"[PUSH] Error notificando dependencia: {e}", flush=True)
-            import traceback
-            traceback.print_exc()
-
-
-async def enviar_email_reclamo_creado(
-    reclamo_id: int,
-    usuario_id: int,
-    usuario_email: str,
-    reclamo_titulo: str,
-    categoria_nombre: str = None,
-    reclamo_descripcion: str = None,
-    creador_nombre: str = None
-):
-    """
-    Envía email al vecino confirmando la creación del reclamo.
-    Registra el intento en el historial del reclamo.
-    """
-    # Crear nueva sesión para operaciones en background
-    from core.database import AsyncSessionLocal
-    async with AsyncSessionLocal() as new_db:
-        try:
-            from services.email_service import email_service, EmailTemplates
-
-            # Solo enviar si el usuario tiene email
-            if not usuario_email:
-                print(f"[EMAIL] Usuario sin email, no se envía", flush=True)
-                # Registrar en historial
-                historial = HistorialReclamo(
-                    reclamo_id=reclamo_id,
-                    usuario_id=usuario_id,
-                    accion="email_fallido",
-                    comentario="❌ No se envió email de confirmación: usuario sin email configurado"
-                )
-                new_db.add(historial)
-                await new_db.commit()
-                return
-
-            # Generar HTML del email
-            html_content = EmailTemplates.reclamo_creado(
-                reclamo_titulo=reclamo_titulo,
-                reclamo_id=reclamo_id,
-                categoria=categoria_nombre or "Sin categoría",
-                descripcion=reclamo_descripcion,
-                creador_nombre=creador_nombre
-            )
-
-            # Enviar email
-            success = await email_service.send_email(
-                to_email=usuario_email,
-                subject=f"Reclamo #{reclamo_id} generado exitosamente",
-                body_html=html_content,
-                body_text=f"Su reclamo #{reclamo_id} '{reclamo_titulo}' fue generado exitosamente. Le notificaremos cuando haya actualizaciones."
-            )
-
-            # Registrar resultado en historial
-            if success:
-                print(f"[EMAIL] Email enviado a {usuario_email}", flush=True)
-                historial = HistorialReclamo(
-                    reclamo_id=reclamo_id,
-                    usuario_id=usuario_id,
-                    accion="email_enviado",
-                    comentario=f"✅ Email de confirmación enviado a {usuario_email}"
-                )
-            else:
-                print(f"[EMAIL] No se pudo enviar email (SMTP no configurado)", flush=True)
-                historial = HistorialReclamo(
-                    reclamo_id=reclamo_id,
-                    usuario_id=usuario_id,
-                    accion="email_fallido",
-                    comentario=f"⚠️ No se pudo enviar email a {usuario_email} (SMTP no configurado o credenciales inválidas)"
-                )
-
-            new_db.add(historial)
-            await new_db.commit()
-
-        except Exception as e:
-            print(f"[EMAIL] Error enviando email: {e}", flush=True)
-            # Registrar error en historial
-            try:
-                historial = HistorialReclamo(
-                    reclamo_id=reclamo_id,
-                    usuario_id=usuario_id,
-                    accion="email_fallido",
-                    comentario=f"❌ Error al enviar email a {usuario_email}: {str(e)[:100]}"
-                )
-                new_db.add(historial)
-                await new_db.commit()
-            except:
-                pass  # Si falla el registro del error, no hacer nada
-
-
 from core.tenancy import resolve_municipio_id as get_effective_municipio_id  # noqa: E402
 
 # Configurar Cloudinary
@@ -375,6 +259,7 @@ def get_reclamos_query():
 
 @router.get("", response_model=List[ReclamoResponse])
 async def get_reclamos(
+    response: Response,
     request: Request,
     estado: Optional[EstadoReclamo] = None,
     categoria_id: Optional[int] = None,
@@ -398,28 +283,22 @@ async def get_reclamos(
             "(confirmado_vecino=false) siguen visibles porque requieren atención."
         ),
     ),
-    skip: int = Query(0, ge=0, description="Número de registros a saltar"),
+    cursor: Optional[str] = Query(
+        None,
+        description=(
+            "Cursor opaco de paginación keyset (header X-Next-Cursor de la "
+            "página anterior). Si viene, se ignora `skip`."
+        ),
+    ),
+    skip: int = Query(0, ge=0, description="Número de registros a saltar (fallback si no hay cursor)"),
     limit: int = Query(20, ge=1, le=100, description="Número de registros a retornar"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    from models.categoria_reclamo import CategoriaReclamo as Categoria
-    from models.zona import Zona
-    from sqlalchemy import or_, cast, String
-    from sqlalchemy.orm import joinedload
-
-    # Si hay búsqueda, usar JOINs para poder filtrar en tablas relacionadas
-    if search and search.strip():
-        query = select(Reclamo).options(
-            selectinload(Reclamo.categoria),
-            selectinload(Reclamo.zona),
-            selectinload(Reclamo.barrio),
-            selectinload(Reclamo.creador),
-            selectinload(Reclamo.dependencia_asignada).selectinload(MunicipioDependencia.dependencia),
-            selectinload(Reclamo.documentos)
-        ).join(Reclamo.creador).outerjoin(Reclamo.categoria).outerjoin(Reclamo.zona).outerjoin(Reclamo.dependencia_asignada)
-    else:
-        query = get_reclamos_query()
+    buscando = bool(search and search.strip())
+    # Con búsqueda armamos primero sólo los filtros (sin eager loads) para
+    # intersectar con los ids del buscador; la página se hidrata después.
+    query = select(Reclamo) if buscando else get_reclamos_query()
 
     # Filtrar por municipio (usa header para admins, o municipio del usuario)
     municipio_id = get_effective_municipio_id(request, current_user)
@@ -465,36 +344,36 @@ async def get_reclamos(
             # Sin empleado vinculado no hay "mis tareas": lista vacía explícita
             query = query.where(Reclamo.id == None)  # noqa: E711
 
-    # Búsqueda en todos los campos
-    if search and search.strip():
-        search_term = f"%{search.strip().lower()}%"
-        query = query.where(
-            or_(
-                # Campos del reclamo
-                func.lower(Reclamo.titulo).like(search_term),
-                func.lower(Reclamo.descripcion).like(search_term),
-                func.lower(Reclamo.direccion).like(search_term),
-                func.lower(Reclamo.referencia).like(search_term),
-                func.lower(Reclamo.resolucion).like(search_term),
-                cast(Reclamo.id, String).like(search_term),
-                # Creador
-                func.lower(User.nombre).like(search_term),
-                func.lower(User.apellido).like(search_term),
-                func.lower(User.email).like(search_term),
-                User.telefono.like(search_term),
-                User.dni.like(search_term),
-                # Categoría
-                func.lower(Categoria.nombre).like(search_term),
-                # Zona
-                func.lower(Zona.nombre).like(search_term),
-                func.lower(Zona.codigo).like(search_term),
-            )
-        )
-
-    query = query.order_by(Reclamo.created_at.desc())
-    query = query.offset(skip).limit(limit)
-    result = await db.execute(query)
-    return result.unique().scalars().all()
+    # Búsqueda: ids rankeados desde el índice FULLTEXT (services/reclamo_busqueda).
+    # Rol y filtros van dentro del ranking, antes de su tope.
+    if buscando:
+        ordenados = await buscar_ids(db, municipio_id, search, filtros=[query.whereclause])
+        if not ordenados:
+            return []
+        # Keyset sobre el ranking: el cursor es el último id devuelto (y su
+        # posición, por si ese reclamo dejó de matchear entre página y página)
+        inicio = skip
+        if cursor:
+            pos = decode_payload(cursor)
+            try:
+                ultimo, inicio = int(pos["b"]), int(pos["p"]) + 1
+            except (KeyError, TypeError, ValueError):
+                raise HTTPException(status_code=400, detail="Cursor de paginación inválido")
+            if ultimo in ordenados:
+                inicio = ordenados.index(ultimo) + 1
+        pagina_ids = ordenados[inicio:inicio + limit]
+        if not pagina_ids:
+            return []
+        if inicio + limit < len(ordenados):
+            set_next_cursor(response, encode_payload({"b": pagina_ids[-1], "p": inicio + len(pagina_ids) - 1}))
+        result = await db.execute(get_reclamos_query().where(Reclamo.id.in_(pagina_ids)))
+        por_id = {r.id: r for r in result.scalars().all()}
+        return [por_id[rid] for rid in pagina_ids if rid in por_id]
+
+    query = apply_keyset(query, Reclamo.created_at, Reclamo.id, cursor)
+    if not cursor and skip:
+        query = query.offset(skip)
+    return await fetch_keyset_page(db, query, limit, response, unique=True)
 
 @router.get("/mis-reclamos", response_model=List[ReclamoResponse])
 async def get_mis_reclamos(
@@ -580,17 +459,15 @@ async def cambiar_estado_reclamo_drag(
     )
     db.add(historial)
 
-    await db.commit()
+    # Push y websocket via outbox: se graban con el cambio de estado
+    publicar(db, "reclamo.estado_cambiado", {
+        "reclamo_id": reclamo.id,
+        "creador_id": reclamo.creador_id,
+        "estado_anterior": estado_anterior.value,
+        "estado_nuevo": estado_enum.value,
+    }, municipio_id=reclamo.municipio_id)
 
-    # Notificaciones en background (no bloquean respuesta)
-    if estado_enum in [EstadoReclamo.RESUELTO, EstadoReclamo.FINALIZADO]:
-        # await enviar_notificacion_whatsapp(db, reclamo, 'reclamo_resuelto', current_user.municipio_id)
-        asyncio.create_task(enviar_notificacion_push(db, reclamo, 'reclamo_resuelto'))
-    else:
-        # await enviar_notificacion_whatsapp(db, reclamo, 'cambio_estado', current_user.municipio_id)
-        asyncio.create_task(enviar_notificacion_push(db, reclamo, 'cambio_estado',
-                                  estado_anterior=estado_anterior.value,
-                                  estado_nuevo=estado_enum.value))
+    await db.commit()
 
     result = await db.execute(get_reclamos_query().where(Reclamo.id == reclamo_id))
     return result.scalar_one()
@@ -1257,62 +1134,23 @@ async def create_reclamo(
     )
     db.add(historial)
 
+    # Push al vecino y a la dependencia, email de confirmación, gamificación
+    # y websocket: van al outbox en la misma transacción que el reclamo, así
+    # no se pierden si el proceso se reinicia ni demoran la respuesta.
+    from models.categoria_reclamo import CategoriaReclamo
+    categoria_nombre = (await db.execute(
+        select(CategoriaReclamo.nombre).where(CategoriaReclamo.id == data.categoria_id)
+    )).scalar_one_or_none()
+    publicar(db, "reclamo.creado", {
+        "reclamo_id": reclamo.id,
+        "usuario_id": current_user.id,
+        "creador_id": reclamo.creador_id,
+        "categoria_nombre": categoria_nombre,
+    }, municipio_id=reclamo.municipio_id)
+
     await db.commit()
     print(f"✅ Reclamo #{reclamo.id} creado exitosamente en BD", flush=True)
 
-    # Gamificación: otorgar puntos por crear reclamo
-    try:
-        print(f"🎮 Procesando gamificación...", flush=True)
-        puntos, badges = await GamificacionService.procesar_reclamo_creado(
-            db, reclamo, current_user
-        )
-        print(f"✅ Gamificación procesada: {puntos} puntos, {len(badges)} badges", flush=True)
-    except Exception as e:
-        print(f"⚠️ Error en gamificación: {e}", flush=True)
-        # No fallar si hay error en gamificación
-        pass
-
-    # Obtener nombre de categoría para las notificaciones
-    categoria_nombre = None
-    try:
-        from models.categoria_reclamo import CategoriaReclamo as Categoria
-        cat_result = await db.execute(
-            select(Categoria).where(Categoria.id == data.categoria_id)
-        )
-        cat = cat_result.scalar_one_or_none()
-        if cat:
-            categoria_nombre = cat.nombre
-    except Exception as e:
-        print(f"⚠️ Error obteniendo categoría: {e}", flush=True)
-
-    # Notificaciones en background (no bloquean respuesta)
-    # await enviar_notificacion_whatsapp(db, reclamo, 'reclamo_recibido', current_user.municipio_id)
-
-    # 1. Notificar al vecino (push + in-app)
-    asyncio.create_task(enviar_notificacion_push(
-        reclamo_id=reclamo.id,
-        tipo_notificacion='reclamo_recibido'
-    ))
-
-    # 2. Notificar a la dependencia asignada (push + in-app)
-    if reclamo.municipio_dependencia_id:
-        asyncio.create_task(enviar_notificacion_dependencia(
-            reclamo_id=reclamo.id,
-            municipio_dependencia_id=reclamo.municipio_dependencia_id,
-            categoria_nombre=categoria_nombre
-        ))
-
-    # 3. Enviar email al vecino
-    asyncio.create_task(enviar_email_reclamo_creado(
-        reclamo_id=reclamo.id,
-        usuario_id=current_user.id,
-        usuario_email=current_user.email,
-        reclamo_titulo=reclamo.titulo,
-        categoria_nombre=categoria_nombre,
-        reclamo_descripcion=reclamo.descripcion,
-        creador_nombre=f"{current_user.nombre} {current_user.apellido}".strip()
-    ))
-
     # Recargar con relaciones
     print(f"🔄 Recargando reclamo con relaciones...", flush=True)
     result = await db.execute(get_reclamos_query().where(Reclamo.id == reclamo.id))
@@ -1459,50 +1297,16 @@ async def asignar_reclamo(
     )
     db.add(historial)
 
-    await db.commit()
-
-    # Guardar IDs antes de cerrar la sesión para usar en background tasks
-    reclamo_id_for_push = reclamo.id
-    dependencia_id_for_push = data.dependencia_id
-    creador_id_for_push = reclamo.creador_id
-
-    # Buscar usuarios de la dependencia para notificarles
-    dependencia_users_result = await db.execute(
-        select(User).where(User.municipio_dependencia_id == data.dependencia_id)
-    )
-    dependencia_users = dependencia_users_result.scalars().all()
-    dependencia_user_ids = [u.id for u in dependencia_users]
-
-    # Enviar notificaciones en background con nueva sesión
-    async def enviar_push_asignacion():
-        from core.database import AsyncSessionLocal
-        from services.push_service import send_push_to_user
-        try:
-            async with AsyncSessionLocal() as new_db:
-                # Notificar al vecino
-                await send_push_to_user(
-                    new_db,
-                    creador_id_for_push,
-                    "Reclamo Asignado",
-                    f"Tu reclamo #{reclamo_id_for_push} fue asignado a {dependencia_nombre}.",
-                    f"/reclamos/{reclamo_id_for_push}",
-                    data={"tipo": "reclamo_asignado", "reclamo_id": reclamo_id_for_push}
-                )
-                # Notificar a los usuarios de la dependencia
-                for user_id in dependencia_user_ids:
-                    await send_push_to_user(
-                        new_db,
-                        user_id,
-                        "Nuevo Reclamo Asignado",
-                        f"Se asignó el reclamo #{reclamo_id_for_push} a tu dependencia.",
-                        f"/reclamos/{reclamo_id_for_push}",
-                        data={"tipo": "asignacion_empleado", "reclamo_id": reclamo_id_for_push}
-                    )
-                print(f"[PUSH] Notificaciones de asignación enviadas para reclamo #{reclamo_id_for_push}", flush=True)
-        except Exception as e:
-            print(f"[PUSH] Error en background task: {e}", flush=True)
+    # Push al vecino y a los usuarios de la dependencia (outbox)
+    publicar(db, "reclamo.recibido", {
+        "reclamo_id": reclamo.id,
+        "creador_id": reclamo.creador_id,
+        "dependencia_id": data.dependencia_id,
+        "dependencia_nombre": dependencia_nombre,
+        "estado_nuevo": EstadoReclamo.RECIBIDO.value,
+    }, municipio_id=reclamo.municipio_id)
 
-    asyncio.create_task(enviar_push_asignacion())
+    await db.commit()
 
     result = await db.execute(get_reclamos_query().where(Reclamo.id == reclamo_id))
     return result.scalar_one()
@@ -1541,32 +1345,14 @@ async def iniciar_reclamo(
     )
     db.add(historial)
 
-    await db.commit()
-
-    # Guardar datos para notificación en background
-    reclamo_id_for_push = reclamo.id
-    creador_id_for_push = reclamo.creador_id
-    estado_anterior_str = estado_anterior.value
-
-    # Notificación al vecino en background con nueva sesión
-    async def enviar_push_inicio():
-        from core.database import AsyncSessionLocal
-        from services.push_service import send_push_to_user
-        try:
-            async with AsyncSessionLocal() as new_db:
-                await send_push_to_user(
-                    new_db,
-                    creador_id_for_push,
-                    "Trabajo Iniciado",
-                    f"El empleado comenzó a trabajar en tu reclamo #{reclamo_id_for_push}.",
-                    f"/gestion/reclamos/{reclamo_id_for_push}",
-                    data={"tipo": "cambio_estado", "reclamo_id": reclamo_id_for_push}
-                )
-                print(f"[PUSH] Notificación de inicio enviada para reclamo #{reclamo_id_for_push}", flush=True)
-        except Exception as e:
-            print(f"[PUSH] Error en background task inicio: {e}", flush=True)
+    publicar(db, "reclamo.iniciado", {
+        "reclamo_id": reclamo.id,
+        "creador_id": reclamo.creador_id,
+        "estado_anterior": estado_anterior.value,
+        "estado_nuevo": EstadoReclamo.EN_CURSO.value,
+    }, municipio_id=reclamo.municipio_id)
 
-    asyncio.create_task(enviar_push_inicio())
+    await db.commit()
 
     result = await db.execute(get_reclamos_query().where(Reclamo.id == reclamo_id))
     return result.scalar_one()
@@ -1584,8 +1370,6 @@ async def resolver_reclamo(
     - Admin/Supervisor: resuelve directamente
     """
     from datetime import datetime
-    from services.notificacion_service import NotificacionService
-    from models.empleado import Empleado
 
     result = await db.execute(select(Reclamo).where(Reclamo.id == reclamo_id))
     reclamo = result.scalar_one_or_none()
@@ -1618,39 +1402,17 @@ async def resolver_reclamo(
         )
         db.add(historial)
 
-        await db.commit()
-
-        # Usar el nombre del usuario directamente (funciona para dependencia y empleado)
-        empleado_nombre = f"{current_user.nombre} {current_user.apellido or ''}".strip()
-
-        # Notificar a supervisores (in-app + WhatsApp)
-        mensaje_supervisor = NotificacionService.generar_mensaje_pendiente_confirmacion(
-            reclamo_id=reclamo.id,
-            titulo_reclamo=reclamo.titulo,
-            empleado_nombre=empleado_nombre,
-            resolucion=data.resolucion
-        )
+        # Supervisores y vecino (in-app + WhatsApp) via outbox
+        publicar(db, "reclamo.pendiente_confirmacion", {
+            "reclamo_id": reclamo.id,
+            "creador_id": reclamo.creador_id,
+            "municipio_id": current_user.municipio_id,
+            "empleado_nombre": f"{current_user.nombre} {current_user.apellido or ''}".strip(),
+            "resolucion": data.resolucion,
+            "estado_nuevo": EstadoReclamo.PENDIENTE_CONFIRMACION.value,
+        }, municipio_id=reclamo.municipio_id)
 
-        await NotificacionService.notificar_supervisores(
-            db=db,
-            municipio_id=current_user.municipio_id,
-            titulo="Trabajo pendiente de confirmación",
-            mensaje=mensaje_supervisor,
-            tipo="warning",
-            reclamo_id=reclamo.id,
-            enviar_whatsapp=True
-        )
-
-        # Notificar al vecino que está en revisión
-        await NotificacionService.notificar_vecino(
-            db=db,
-            reclamo=reclamo,
-            titulo="Tu reclamo está en revisión",
-            mensaje=f"El trabajo sobre tu reclamo #{reclamo.id} ha sido completado y está siendo revisado por un supervisor.",
-            tipo="info",
-            tipo_whatsapp="cambio_estado",
-            enviar_whatsapp=True
-        )
+        await db.commit()
 
     else:
         # Admin/Supervisor finaliza directamente
@@ -1667,37 +1429,14 @@ async def resolver_reclamo(
         )
         db.add(historial)
 
-        await db.commit()
+        # Puntos al creador, push y websocket via outbox
+        publicar(db, "reclamo.finalizado", {
+            "reclamo_id": reclamo.id,
+            "creador_id": reclamo.creador_id,
+            "estado_nuevo": EstadoReclamo.FINALIZADO.value,
+        }, municipio_id=reclamo.municipio_id)
 
-        # Gamificación: otorgar puntos al creador por reclamo resuelto
-        try:
-            await GamificacionService.procesar_reclamo_resuelto(db, reclamo)
-        except Exception as e:
-            pass
-
-        # Guardar datos para notificación
-        reclamo_id_for_push = reclamo.id
-        creador_id_for_push = reclamo.creador_id
-
-        # Notificación al vecino en background con nueva sesión
-        async def enviar_push_resuelto():
-            from core.database import AsyncSessionLocal
-            from services.push_service import send_push_to_user
-            try:
-                async with AsyncSessionLocal() as new_db:
-                    await send_push_to_user(
-                        new_db,
-                        creador_id_for_push,
-                        "Reclamo Resuelto",
-                        f"Tu reclamo #{reclamo_id_for_push} ha sido resuelto. ¡Gracias por tu paciencia!",
-                        f"/gestion/reclamos/{reclamo_id_for_push}",
-                        data={"tipo": "reclamo_resuelto", "reclamo_id": reclamo_id_for_push}
-                    )
-                    print(f"[PUSH] Notificación de resuelto enviada para reclamo #{reclamo_id_for_push}", flush=True)
-            except Exception as e:
-                print(f"[PUSH] Error en background task resuelto: {e}", flush=True)
-
-        asyncio.create_task(enviar_push_resuelto())
+        await db.commit()
 
     result = await db.execute(get_reclamos_query().where(Reclamo.id == reclamo_id))
     return result.scalar_one()
@@ -1716,13 +1455,8 @@ async def confirmar_reclamo(
     Cambia el estado a RESUELTO y notifica al vecino con link de calificación.
     """
     from datetime import datetime
-    from services.notificacion_service import NotificacionService
 
-    result = await db.execute(
-        select(Reclamo).options(
-            selectinload(Reclamo.creador)
-        ).where(Reclamo.id == reclamo_id)
-    )
+    result = await db.execute(select(Reclamo).where(Reclamo.id == reclamo_id))
     reclamo = result.scalar_one_or_none()
     if not reclamo:
         raise HTTPException(status_code=404, detail="Reclamo no encontrado")
@@ -1747,36 +1481,14 @@ async def confirmar_reclamo(
     )
     db.add(historial)
 
-    await db.commit()
-
-    # Gamificación: otorgar puntos al creador por reclamo resuelto
-    try:
-        await GamificacionService.procesar_reclamo_resuelto(db, reclamo)
-    except Exception as e:
-        pass
-
-    # Notificar al vecino con link de calificación
-    link_calificacion = NotificacionService.generar_link_calificacion(reclamo.id)
-    user = reclamo.creador
+    # Puntos al creador y aviso al vecino con link de calificación (outbox)
+    publicar(db, "reclamo.confirmado", {
+        "reclamo_id": reclamo.id,
+        "creador_id": reclamo.creador_id,
+        "estado_nuevo": EstadoReclamo.RESUELTO.value,
+    }, municipio_id=reclamo.municipio_id)
 
-    if user and not user.es_anonimo:
-        mensaje_resuelto = NotificacionService.generar_mensaje_resuelto(
-            nombre_usuario=user.nombre,
-            reclamo_id=reclamo.id,
-            titulo_reclamo=reclamo.titulo,
-            descripcion=reclamo.descripcion,
-            incluir_link_calificacion=True
-        )
-
-        await NotificacionService.notificar_vecino(
-            db=db,
-            reclamo=reclamo,
-            titulo="¡Tu reclamo fue resuelto!",
-            mensaje=mensaje_resuelto,
-            tipo="success",
-            tipo_whatsapp="reclamo_resuelto",
-            enviar_whatsapp=True
-        )
+    await db.commit()
 
     result = await db.execute(get_reclamos_query().where(Reclamo.id == reclamo_id))
     return result.scalar_one()
@@ -1919,6 +1631,7 @@ async def agregar_comentario(
         await notificar_comentario_vecino_a_dependencia(
             db, reclamo, data.comentario, autor_nombre
         )
+        await db.commit()
     else:
         # Admin/Supervisor comenta → notificar al vecino
         await enviar_notificacion_push(
@@ -2542,6 +2255,7 @@ async def confirmar_reclamo_vecino(
                 reclamo_id=reclamo.id,
                 enviar_whatsapp=True,
             )
+            await db.commit()
         except Exception as e:
             logging.error(f"Error notificando rechazo vecino reclamo {reclamo.id}: {e}")
 
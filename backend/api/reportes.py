@@ -1,31 +1,23 @@
 """
 API de Reportes - Generación de reportes PDF
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, extract
-from datetime import datetime, date, timedelta
-from typing import Optional
-from calendar import monthrange
+from sqlalchemy import select
 
 from core.database import get_db
 from core.security import require_roles
 from models.municipio import Municipio
-from models.reclamo import Reclamo
-from models.categoria_reclamo import CategoriaReclamo as Categoria
-from models.zona import Zona
-from models.empleado import Empleado
-from models.calificacion import Calificacion
 from models.user import User
-from models.enums import RolUsuario, EstadoReclamo
-from services.pdf_report import generate_executive_report
+from models.enums import RolUsuario
+from services import reportes_mensuales
 
 router = APIRouter()
 
 
 @router.get("/ejecutivo")
 async def generar_reporte_ejecutivo(
+    request: Request,
     mes: int = Query(..., ge=1, le=12, description="Mes del reporte (1-12)"),
     anio: int = Query(..., ge=2020, le=2100, description="Año del reporte"),
     db: AsyncSession = Depends(get_db),
@@ -34,6 +26,9 @@ async def generar_reporte_ejecutivo(
     """
     Genera un reporte ejecutivo mensual en PDF.
     Solo admin y supervisor pueden generar reportes.
+
+    Las métricas salen del snapshot mensual (services/reportes_mensuales) y
+    el PDF se cachea por ETag: con If-None-Match vigente contesta 304.
     """
     # Obtener municipio del usuario
     municipio_id = current_user.municipio_id
@@ -46,229 +41,15 @@ async def generar_reporte_ejecutivo(
     if not municipio:
         raise HTTPException(status_code=404, detail="Municipio no encontrado")
 
-    # Calcular rango de fechas del mes
-    _, last_day = monthrange(anio, mes)
-    fecha_inicio = date(anio, mes, 1)
-    fecha_fin = date(anio, mes, last_day)
-
-    # Construir queries base
-    base_filter = and_(
-        Reclamo.municipio_id == municipio_id,
-        func.date(Reclamo.created_at) >= fecha_inicio,
-        func.date(Reclamo.created_at) <= fecha_fin,
-    )
-
-    # === ESTADISTICAS GENERALES ===
-    # Total reclamos
-    result = await db.execute(
-        select(func.count(Reclamo.id)).where(base_filter)
-    )
-    total_reclamos = result.scalar() or 0
-
-    # Resueltos (estado nuevo FINALIZADO + legacy RESUELTO)
-    ESTADOS_RESUELTOS = [EstadoReclamo.FINALIZADO, EstadoReclamo.RESUELTO]
-    result = await db.execute(
-        select(func.count(Reclamo.id)).where(
-            and_(base_filter, Reclamo.estado.in_(ESTADOS_RESUELTOS))
-        )
-    )
-    resueltos = result.scalar() or 0
-
-    # Pendientes (nuevo + asignado + en_curso)
-    result = await db.execute(
-        select(func.count(Reclamo.id)).where(
-            and_(
-                base_filter,
-                Reclamo.estado.in_([EstadoReclamo.NUEVO, EstadoReclamo.ASIGNADO, EstadoReclamo.EN_CURSO])
-            )
-        )
-    )
-    pendientes = result.scalar() or 0
-
-    estadisticas = {
-        "total": total_reclamos,
-        "resueltos": resueltos,
-        "pendientes": pendientes,
-    }
-
-    # === RECLAMOS POR ESTADO ===
-    result = await db.execute(
-        select(Reclamo.estado, func.count(Reclamo.id))
-        .where(base_filter)
-        .group_by(Reclamo.estado)
-    )
-    reclamos_por_estado = {}
-    for estado, count in result.all():
-        estado_label = {
-            EstadoReclamo.RECIBIDO: "Recibido",
-            EstadoReclamo.EN_CURSO: "En Curso",
-            EstadoReclamo.FINALIZADO: "Finalizado",
-            EstadoReclamo.POSPUESTO: "Pospuesto",
-            EstadoReclamo.RECHAZADO: "Rechazado",
-            # Legacy
-            EstadoReclamo.NUEVO: "Nuevo",
-            EstadoReclamo.ASIGNADO: "Asignado",
-            EstadoReclamo.EN_PROCESO: "En Proceso",
-            EstadoReclamo.PENDIENTE_CONFIRMACION: "Pend. Confirmación",
-            EstadoReclamo.RESUELTO: "Resuelto",
-        }.get(estado, str(estado))
-        reclamos_por_estado[estado_label] = count
-
-    # === RECLAMOS POR CATEGORIA ===
-    result = await db.execute(
-        select(Categoria.nombre, func.count(Reclamo.id))
-        .join(Reclamo, Reclamo.categoria_id == Categoria.id)
-        .where(base_filter)
-        .group_by(Categoria.nombre)
-    )
-    reclamos_por_categoria = {nombre: count for nombre, count in result.all()}
-
-    # === RECLAMOS POR ZONA ===
-    result = await db.execute(
-        select(Zona.nombre, func.count(Reclamo.id))
-        .join(Reclamo, Reclamo.zona_id == Zona.id)
-        .where(base_filter)
-        .group_by(Zona.nombre)
-    )
-    reclamos_por_zona = {nombre: count for nombre, count in result.all()}
+    snapshot = await reportes_mensuales.obtener_snapshot(db, municipio_id, anio, mes)
+    etag = reportes_mensuales.etag(municipio, snapshot)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if reportes_mensuales.etag_coincide(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
 
-    # === TENDENCIA MENSUAL (ultimos 6 meses) ===
-    tendencia_mensual = {}
-    for i in range(5, -1, -1):
-        fecha_mes = fecha_inicio - timedelta(days=30 * i)
-        mes_label = fecha_mes.strftime("%b %Y")
-        _, ultimo_dia = monthrange(fecha_mes.year, fecha_mes.month)
-        mes_inicio = date(fecha_mes.year, fecha_mes.month, 1)
-        mes_fin = date(fecha_mes.year, fecha_mes.month, ultimo_dia)
-
-        result = await db.execute(
-            select(func.count(Reclamo.id)).where(
-                and_(
-                    Reclamo.municipio_id == municipio_id,
-                    func.date(Reclamo.created_at) >= mes_inicio,
-                    func.date(Reclamo.created_at) <= mes_fin,
-                )
-            )
-        )
-        tendencia_mensual[mes_label] = result.scalar() or 0
-
-    # === TOP EMPLEADOS (resueltos por empleado asignado en el mes) ===
-    result = await db.execute(
-        select(
-            Empleado.nombre,
-            Empleado.apellido,
-            func.count(Reclamo.id).label("resueltos"),
-            func.avg(func.timestampdiff(
-                func.literal_column('HOUR'), Reclamo.created_at, Reclamo.fecha_resolucion
-            )).label("tiempo_prom"),
-            func.avg(Calificacion.puntuacion).label("calif"),
-        )
-        .join(Reclamo, Reclamo.empleado_id == Empleado.id)
-        .outerjoin(Calificacion, Calificacion.reclamo_id == Reclamo.id)
-        .where(and_(base_filter, Reclamo.estado.in_(ESTADOS_RESUELTOS)))
-        .group_by(Empleado.id, Empleado.nombre, Empleado.apellido)
-        .order_by(func.count(Reclamo.id).desc())
-        .limit(5)
-    )
-    top_empleados = [
-        {
-            "nombre": f"{nombre} {(apellido or '')[:1]}.".strip(),
-            "resueltos": int(cant),
-            "tiempo_promedio": float(t_prom or 0),
-            "calificacion": float(calif or 0),
-        }
-        for nombre, apellido, cant, t_prom, calif in result.all()
-    ]
-
-    # === METRICAS SLA (real) ===
-    # % de resueltos del mes dentro del tiempo estimado de su categoría
-    # (CategoriaReclamo.tiempo_resolucion_estimado, en horas; default 48).
-    result = await db.execute(
-        select(Reclamo.created_at, Reclamo.fecha_resolucion, Categoria.tiempo_resolucion_estimado)
-        .join(Categoria, Categoria.id == Reclamo.categoria_id)
-        .where(and_(
-            base_filter,
-            Reclamo.estado.in_(ESTADOS_RESUELTOS),
-            Reclamo.fecha_resolucion.isnot(None),
-        ))
-    )
-    filas_sla = result.all()
-    if filas_sla:
-        en_tiempo = sum(
-            1 for creado, resuelto, limite_hs in filas_sla
-            if (resuelto.replace(tzinfo=None) - creado.replace(tzinfo=None)).total_seconds() / 3600
-            <= (limite_hs or 48)
-        )
-        sla_cumplimiento = round(en_tiempo / len(filas_sla) * 100, 1)
-    else:
-        sla_cumplimiento = 0
-
-    # Tiempo promedio de resolucion (en horas)
-    result = await db.execute(
-        select(
-            func.avg(
-                func.timestampdiff(
-                    func.literal_column('HOUR'),
-                    Reclamo.created_at,
-                    Reclamo.fecha_resolucion
-                )
-            )
-        ).where(
-            and_(
-                base_filter,
-                Reclamo.estado.in_(ESTADOS_RESUELTOS),
-                Reclamo.fecha_resolucion.isnot(None)
-            )
-        )
-    )
-    tiempo_promedio = result.scalar() or 0
-
-    # Calificacion promedio general
-    result = await db.execute(
-        select(func.avg(Calificacion.puntuacion))
-        .join(Reclamo, Reclamo.id == Calificacion.reclamo_id)
-        .where(
-            and_(
-                Reclamo.municipio_id == municipio_id,
-                func.date(Reclamo.created_at) >= fecha_inicio,
-                func.date(Reclamo.created_at) <= fecha_fin,
-            )
-        )
-    )
-    # Sin calificaciones = 0 honesto (nada de defaults inventados)
-    calificacion_promedio = result.scalar() or 0
-
-    # === GENERAR PDF ===
-    meses_nombres = [
-        "", "Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio",
-        "Julio", "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre"
-    ]
-    periodo = f"{meses_nombres[mes]} {anio}"
-
-    pdf_buffer = generate_executive_report(
-        municipio_nombre=municipio.nombre.replace("Municipalidad de ", ""),
-        municipio_codigo=municipio.codigo,
-        color_primario=municipio.color_primario or "#3b82f6",
-        periodo=periodo,
-        estadisticas=estadisticas,
-        reclamos_por_categoria=reclamos_por_categoria,
-        reclamos_por_zona=reclamos_por_zona,
-        reclamos_por_estado=reclamos_por_estado,
-        tendencia_mensual=tendencia_mensual,
-        top_empleados=top_empleados,
-        sla_cumplimiento=sla_cumplimiento,
-        tiempo_promedio_resolucion=float(tiempo_promedio or 0),
-        calificacion_promedio=float(calificacion_promedio or 0),
-        logo_url=municipio.logo_url,
-    )
+    pdf = await reportes_mensuales.renderizar(municipio, snapshot, etag)
 
     # Nombre del archivo
     filename = f"reporte_{municipio.codigo}_{anio}_{mes:02d}.pdf"
-
-    return StreamingResponse(
-        pdf_buffer,
-        media_type="application/pdf",
-        headers={
-            "Content-Disposition": f"attachment; filename={filename}"
-        }
-    )
+    headers["Content-Disposition"] = f"attachment; filename={filename}"
+    return Response(content=pdf, media_type="application/pdf", headers=headers)
@@ -23,6 +23,7 @@ from pydantic import BaseModel
 from core.database import get_db
 from core.security import get_current_user
 from models.user import User
+from services.jobs import encolar_job, job_encolado_response
 from models.enums import RolUsuario
 from models.tasas import TipoTasa, Partida, Deuda, EstadoDeuda, EstadoPartida
 from schemas.tasas import (
@@ -421,7 +422,7 @@ def _parse_fecha(v) -> Optional[date_cls]:
         return None
 
 
-@router.post("/importar-padron/confirmar")
+@router.post("/importar-padron/confirmar", status_code=202)
 async def importar_padron_confirmar(
     body: ImportPadronConfirmRequest,
     db: AsyncSession = Depends(get_db),
@@ -429,29 +430,52 @@ async def importar_padron_confirmar(
 ):
     """Paso 3: con los mappings ya revisados por el admin, baja el padron y
     crea las Partidas + Deudas en la DB. Upserts por (muni + tipo + identificador)
-    para que re-ejecutar la import no duplique."""
+    para que re-ejecutar la import no duplique.
+
+    Un padron real son decenas de miles de partidas: corre como job en
+    segundo plano y el resumen queda en `/api/jobs/{job_id}`."""
     _require_admin(current_user)
+    if not current_user.municipio_id:
+        raise HTTPException(status_code=400, detail="Usuario sin municipio asignado")
 
+    job = await encolar_job(
+        db, "tasas.importar_padron",
+        {"municipio_id": current_user.municipio_id, **body.model_dump()},
+        municipio_id=current_user.municipio_id, usuario_id=current_user.id,
+    )
+    return job_encolado_response(job)
+
+
+async def job_importar_padron(
+    db: AsyncSession,
+    ctx,
+    municipio_id: int,
+    url: str,
+    mappings: List[dict],
+) -> dict:
+    """Handler del job `tasas.importar_padron` (ver services/jobs.py)."""
+    await ctx.progreso(2, "Descargando padrón")
     try:
-        padron = await fetch_padron(body.url)
+        padron = await fetch_padron(url)
     except PadronInvalido as e:
         raise HTTPException(status_code=400, detail=str(e))
 
     # Indexar mappings: codigo_local → tipo_tasa_codigo
-    map_dict = {m.codigo_local: m.tipo_tasa_codigo for m in body.mappings}
+    map_dict = {m["codigo_local"]: m.get("tipo_tasa_codigo") for m in mappings}
 
     # Cargar tipos canonicos
     tipos_q = await db.execute(select(TipoTasa))
     tipos_por_codigo: dict[str, TipoTasa] = {t.codigo: t for t in tipos_q.scalars().all()}
 
-    municipio_id = current_user.municipio_id
     partidas_creadas = 0
     partidas_actualizadas = 0
     deudas_creadas = 0
     tasas_saltadas = 0
     errores: list[str] = []
 
-    for tasa in padron.get("tasas", []):
+    tasas_padron = padron.get("tasas", [])
+    for n_tasa, tasa in enumerate(tasas_padron):
+        await ctx.progreso(5 + 90 * n_tasa // max(len(tasas_padron), 1), f"Importando tasa {n_tasa + 1}/{len(tasas_padron)}")
         codigo_local = tasa.get("codigo_local") or tasa.get("codigo") or ""
         tipo_codigo = map_dict.get(codigo_local)
 
@@ -19,7 +19,12 @@ from models.gasto import EstadoGastoCuota
 from schemas.tesoreria_extra import (
     PagoProgramadoCreate, PagoProgramadoUpdate, PagoProgramadoResponse,
     EjecutarPagoRequest, EjecutarPagoResponse, PremioAplicado,
-    EjecutarMasivoRequest, EjecutarMasivoResponse, EjecutarMasivoItem,
+    EjecutarMasivoRequest, EjecutarMasivoResponse, EjecutarMasivoItem, EjecutarMasivoLote,
+)
+from services.jobs import encolar_job, job_encolado_response
+from services.tesoreria_nombres import resolver_nombres
+from services.tesoreria_pagos_masivos import (
+    calcular_proximo_pago as _calcular_proximo_pago, ejecutar_pagos_masivo as _ejecutar_masivo,
 )
 
 router = APIRouter()
@@ -30,31 +35,6 @@ def _require_admin(user: User):
         raise HTTPException(403, "Sin permisos")
 
 
-def _add_dias(d: date, dias: int) -> date:
-    return d + timedelta(days=dias)
-
-
-def _calcular_proximo_pago(actual: date, frecuencia: FrecuenciaPago, dia_del_mes: int) -> date:
-    """Avanza al siguiente periodo segun frecuencia."""
-    if frecuencia == FrecuenciaPago.SEMANAL:
-        return _add_dias(actual, 7)
-    if frecuencia == FrecuenciaPago.QUINCENAL:
-        return _add_dias(actual, 14)
-    if frecuencia == FrecuenciaPago.MENSUAL:
-        meses = 1
-    elif frecuencia == FrecuenciaPago.BIMESTRAL:
-        meses = 2
-    elif frecuencia == FrecuenciaPago.TRIMESTRAL:
-        meses = 3
-    else:  # ANUAL
-        meses = 12
-    total = actual.month - 1 + meses
-    year = actual.year + total // 12
-    month = total % 12 + 1
-    last_day = monthrange(year, month)[1]
-    return date(year, month, min(dia_del_mes, last_day))
-
-
 def _proximo_dia_semana(desde: date, dia_semana: int) -> date:
     """Devuelve el proximo dia_semana >= desde. 0=lunes..6=domingo."""
     actual_dow = desde.weekday()
@@ -81,15 +61,7 @@ def _calcular_fecha_inicio_premio(hoy: date, frecuencia: FrecuenciaPago, dia_sem
 
 async def _enrich(db: AsyncSession, pp: TesoreriaPagoProgramado) -> PagoProgramadoResponse:
     """Enrich de UN solo PagoProgramado. Para listas usar _enrich_bulk (evita N+1)."""
-    resp = PagoProgramadoResponse.model_validate(pp)
-    c = (await db.execute(select(Contacto).where(Contacto.id == pp.contacto_id))).scalar_one_or_none()
-    if c:
-        resp.contacto_nombre = f"{c.nombre} {c.apellido or ''}".strip()
-    if pp.caja_id:
-        caja = (await db.execute(select(TesoreriaCaja).where(TesoreriaCaja.id == pp.caja_id))).scalar_one_or_none()
-        if caja:
-            resp.caja_nombre = caja.nombre
-    return resp
+    return (await _enrich_bulk(db, [pp]))[0]
 
 
 async def _enrich_bulk(
@@ -98,29 +70,16 @@ async def _enrich_bulk(
     """Enrich de varios pagos programados en 2 queries fijas (no N+1)."""
     if not pagos:
         return []
-    contacto_ids = {p.contacto_id for p in pagos if p.contacto_id}
-    caja_ids = {p.caja_id for p in pagos if p.caja_id}
-
-    contactos_map: dict[int, str] = {}
-    if contacto_ids:
-        rows = (await db.execute(
-            select(Contacto.id, Contacto.nombre, Contacto.apellido).where(Contacto.id.in_(contacto_ids))
-        )).all()
-        contactos_map = {cid: f"{nom} {ape or ''}".strip() for cid, nom, ape in rows}
-
-    cajas_map: dict[int, str] = {}
-    if caja_ids:
-        rows = (await db.execute(
-            select(TesoreriaCaja.id, TesoreriaCaja.nombre).where(TesoreriaCaja.id.in_(caja_ids))
-        )).all()
-        cajas_map = {cid: nom for cid, nom in rows}
-
+    nombres = await resolver_nombres(
+        db,
+        contacto_ids=[p.contacto_id for p in pagos],
+        caja_ids=[p.caja_id for p in pagos],
+    )
     out: list[PagoProgramadoResponse] = []
     for p in pagos:
         resp = PagoProgramadoResponse.model_validate(p)
-        resp.contacto_nombre = contactos_map.get(p.contacto_id)
-        if p.caja_id:
-            resp.caja_nombre = cajas_map.get(p.caja_id)
+        resp.contacto_nombre = nombres.contacto(p.contacto_id)
+        resp.caja_nombre = nombres.caja(p.caja_id)
         out.append(resp)
     return out
 
@@ -552,7 +511,7 @@ async def ejecutar_pago(
     )
 
 
-@router.post("/ejecutar-masivo", response_model=EjecutarMasivoResponse)
+@router.post("/ejecutar-masivo", status_code=202)
 async def ejecutar_pagos_masivo(
     payload: EjecutarMasivoRequest,
     request: Request,
@@ -563,7 +522,12 @@ async def ejecutar_pagos_masivo(
     paga con sus valores POR DEFECTO: monto = monto_pesos del programado,
     fecha de impacto = su proximo_pago, sin premios. Equivale a llamar
     /ejecutar uno por uno con payload vacio, pero en una sola request y
-    una sola transaccion. Espeja el nucleo de ejecutar_pago (sin premios)."""
+    con INSERTs multi-fila. Espeja el nucleo de ejecutar_pago (sin premios).
+    `lote` = pagos por transaccion (default TESORERIA_MASIVO_LOTE).
+
+    Una liquidacion de sueldos son cientos/miles de pagos: corre como job en
+    segundo plano y el `EjecutarMasivoResponse` queda como resultado en
+    `/api/jobs/{job_id}`."""
     _require_admin(current_user)
     muni_id = get_effective_municipio_id(request, current_user)
 
@@ -571,89 +535,43 @@ async def ejecutar_pagos_masivo(
     if not ids:
         raise HTTPException(400, "Sin pagos para ejecutar")
 
-    pps = list((await db.execute(
-        select(TesoreriaPagoProgramado).where(
-            TesoreriaPagoProgramado.id.in_(ids),
-            TesoreriaPagoProgramado.municipio_id == muni_id,
-            TesoreriaPagoProgramado.activo.is_(True),
-        )
-    )).scalars().all())
-    pp_by_id = {p.id: p for p in pps}
-
-    items: list[EjecutarMasivoItem] = []
-    monto_total_acum = Decimal(0)
-    exitosos = 0
-    for pid in ids:
-        pp = pp_by_id.get(pid)
-        if not pp:
-            items.append(EjecutarMasivoItem(pago_id=pid, ok=False, error="No encontrado o inactivo"))
-            continue
-        fecha = pp.proximo_pago or date.today()
-
-        # Mismo claim atómico anti doble-ejecución que en /ejecutar
-        claim = await db.execute(
-            update(TesoreriaPagoProgramado)
-            .where(
-                TesoreriaPagoProgramado.id == pp.id,
-                or_(
-                    TesoreriaPagoProgramado.ultimo_pago.is_(None),
-                    TesoreriaPagoProgramado.ultimo_pago < fecha,
-                ),
-            )
-            .values(ultimo_pago=fecha)
-        )
-        if claim.rowcount == 0:
-            items.append(EjecutarMasivoItem(
-                pago_id=pid, ok=False,
-                error=f"Período ya pagado (último pago: {pp.ultimo_pago})",
-            ))
-            continue
+    job = await encolar_job(
+        db, "tesoreria.ejecutar_pagos_masivo",
+        {"municipio_id": muni_id, "creador_id": current_user.id, "pago_ids": ids, "lote": payload.lote},
+        municipio_id=muni_id, usuario_id=current_user.id,
+    )
+    return job_encolado_response(job)
 
-        monto = Decimal(str(pp.monto_pesos))
-        gasto = Gasto(
-            municipio_id=muni_id,
-            creador_id=current_user.id,
-            destino_tipo='contacto',
-            destino_contacto_id=pp.contacto_id,
-            destino_dependencia_id=None,
-            concepto=pp.concepto,
-            descripcion=pp.descripcion or None,
-            monto_pesos=monto,
-            fecha=fecha,
-            tipo_financiacion='contado',
-            forma_pago=pp.forma_pago,
-            caja_id=pp.caja_id,
-            pago_programado_id=pp.id,
-        )
-        db.add(gasto)
-        await db.flush()
-        db.add(GastoCuota(
-            gasto_id=gasto.id, numero=1, monto=monto,
-            fecha_vencimiento=fecha, fecha_pago=fecha, estado=EstadoGastoCuota.PAGADA,
-            forma_pago=pp.forma_pago,
-        ))
-        if pp.caja_id:
-            db.add(TesoreriaMovimientoCaja(
-                municipio_id=muni_id, caja_id=pp.caja_id, gasto_id=gasto.id,
-                tipo=TipoMovimientoCaja.EGRESO, monto=monto, fecha=fecha,
-                concepto=pp.concepto,
-            ))
-        # ultimo_pago ya quedó claimeado arriba
-        pp.proximo_pago = _calcular_proximo_pago(pp.proximo_pago, pp.frecuencia, pp.dia_del_mes)
-        if pp.fecha_fin and pp.proximo_pago > pp.fecha_fin:
-            pp.activo = False
-        items.append(EjecutarMasivoItem(pago_id=pid, ok=True, gasto_id=gasto.id))
-        monto_total_acum += monto
-        exitosos += 1
 
-    await db.commit()
+async def job_ejecutar_pagos_masivo(
+    db: AsyncSession,
+    ctx,
+    municipio_id: int,
+    creador_id: int,
+    pago_ids: List[int],
+    lote: Optional[int] = None,
+) -> dict:
+    """Handler del job `tesoreria.ejecutar_pagos_masivo` (ver services/jobs.py).
+    Devuelve `EjecutarMasivoResponse` como resultado del job.
+
+    El pago se hace por lotes con sentencias set-based (ver
+    services/tesoreria_pagos_masivos); `lotes` trae el detalle de cada uno."""
+
+    async def progreso(pct: int, mensaje: str, cancelable: bool) -> None:
+        await ctx.progreso(pct, mensaje, forzar=True, cancelable=cancelable)
+
+    res = await _ejecutar_masivo(db, municipio_id, creador_id, pago_ids, lote=lote, progreso=progreso)
     return EjecutarMasivoResponse(
-        total=len(ids),
-        exitosos=exitosos,
-        fallidos=len(ids) - exitosos,
-        monto_total=monto_total_acum,
-        items=items,
-    )
+        total=len(res.items),
+        exitosos=res.exitosos,
+        fallidos=len(res.items) - res.exitosos,
+        monto_total=res.monto_total,
+        items=[
+            EjecutarMasivoItem(pago_id=pid, ok=ok, gasto_id=gasto_id, error=error)
+            for pid, (ok, gasto_id, error) in res.items.items()
+        ],
+        lotes=[EjecutarMasivoLote(**l) for l in res.lotes],
+    ).model_dump()
 
 
 @router.post("/{pp_id}/omitir")
@@ -720,7 +638,6 @@ async def historial_pagos(
     if not desde:
         desde = date.today() - timedelta(days=90)
 
-    from models import Gasto, Contacto, TesoreriaCaja, TesoreriaPagoProgramado
     q = select(Gasto).where(
         Gasto.municipio_id == muni_id,
         Gasto.pago_programado_id.is_not(None),
@@ -856,7 +773,7 @@ async def reportes_sueldos(
         .order_by(TesoreriaPagoProgramado.proximo_pago.asc())
         .limit(50)
     )).scalars().all()
-    proximos_pagos = [await _enrich(db, p) for p in prox_rows]
+    proximos_pagos = await _enrich_bulk(db, list(prox_rows))
 
     # Cantidad por frecuencia
     frec_rows = (await db.execute(
@@ -5,6 +5,8 @@
                                          columnas=meses).
 - POST /tesoreria/import/kmz             actualiza lat/lon de contactos
                                          existentes haciendo match por nombre.
+- POST /tesoreria/import/kmz-barrios     carga los limites (poligonos) de los
+                                         barrios para el detector de barrios.
 
 Ambos endpoints requieren admin.
 """
@@ -23,8 +25,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from core.database import get_db
 from core.security import get_current_user
 from core.tenancy import get_effective_municipio_id
+from services.jobs import encolar_job, job_encolado_response
 from models import (
-    Contacto, Gasto, GastoCuota, User, RolUsuario,
+    Barrio, Contacto, Gasto, GastoCuota, User, RolUsuario,
     TipoContacto, DestinoGasto, TipoFinanciacion, FormaPago, EstadoGastoCuota,
 )
 
@@ -68,7 +71,7 @@ def _normalize(s: str) -> str:
 # Excel matriz importer
 # ============================================================
 
-@router.post("/excel-matriz")
+@router.post("/excel-matriz", status_code=202)
 async def importar_excel_matriz(
     request: Request,
     archivo: UploadFile = File(..., description="xlsx con formato del intendente"),
@@ -86,7 +89,9 @@ async def importar_excel_matriz(
       - Por cada celda con monto > 0: crea un Gasto (CONTADO) con concepto
         = nombre de la columna y fecha = primer dia del mes correspondiente.
 
-    Devuelve resumen { contactos_creados, gastos_creados, sheets_procesadas }.
+    Corre como job en segundo plano (un Excel anual son miles de gastos):
+    devuelve `job_id` y el resumen { contactos_creados, gastos_creados,
+    sheets_procesadas } queda como `resultado` en `/api/jobs/{job_id}`.
     """
     _require_admin(current_user)
     municipio_id = get_effective_municipio_id(request, current_user)
@@ -95,10 +100,30 @@ async def importar_excel_matriz(
 
     contenido = await archivo.read()
     try:
-        wb = openpyxl.load_workbook(BytesIO(contenido), data_only=True, read_only=True)
+        openpyxl.load_workbook(BytesIO(contenido), data_only=True, read_only=True).close()
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Excel invalido: {e}")
 
+    job = await encolar_job(
+        db, "tesoreria.importar_excel_matriz",
+        {"municipio_id": municipio_id, "creador_id": current_user.id, "anio": anio},
+        municipio_id=municipio_id, usuario_id=current_user.id, archivo=contenido,
+    )
+    return job_encolado_response(job)
+
+
+async def job_importar_excel_matriz(
+    db: AsyncSession,
+    ctx,
+    municipio_id: int,
+    creador_id: int,
+    anio: int,
+    archivo: bytes,
+) -> dict:
+    """Handler del job `tesoreria.importar_excel_matriz` (ver services/jobs.py).
+    Todo en una transaccion: si se cancela no queda nada a medias."""
+    wb = openpyxl.load_workbook(BytesIO(archivo), data_only=True, read_only=True)
+
     contactos_creados = 0
     contactos_actualizados = 0
     gastos_creados = 0
@@ -114,7 +139,10 @@ async def importar_excel_matriz(
         for c in res.scalars().all()
     }
 
-    for sheet_name in wb.sheetnames:
+    for n_sheet, sheet_name in enumerate(wb.sheetnames):
+        await ctx.progreso(
+            100 * n_sheet // max(len(wb.sheetnames), 1), f"Procesando hoja {sheet_name}",
+        )
         key = _normalize(sheet_name)
         if key not in SHEET_TO_TIPO:
             sheets_ignoradas.append(sheet_name)
@@ -249,7 +277,7 @@ async def importar_excel_matriz(
 
                 gasto = Gasto(
                     municipio_id=municipio_id,
-                    creador_id=current_user.id,
+                    creador_id=creador_id,
                     destino_tipo=DestinoGasto.CONTACTO,
                     destino_contacto_id=contacto.id,
                     concepto=concepto,
@@ -292,6 +320,25 @@ async def importar_excel_matriz(
 KML_NS = "{http://www.opengis.net/kml/2.2}"
 
 
+def _leer_kml(contenido: bytes) -> ET.Element:
+    """Raiz del primer .kml dentro del KMZ (400 si no es un KMZ valido)."""
+    try:
+        with ZipFile(BytesIO(contenido)) as zf:
+            kml_names = [n for n in zf.namelist() if n.lower().endswith(".kml")]
+            if not kml_names:
+                raise HTTPException(status_code=400, detail="KMZ sin archivo .kml adentro")
+            kml_data = zf.read(kml_names[0])
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"KMZ invalido: {e}")
+
+    try:
+        return ET.fromstring(kml_data)
+    except ET.ParseError as e:
+        raise HTTPException(status_code=400, detail=f"KML invalido: {e}")
+
+
 @router.post("/kmz")
 async def importar_kmz(
     request: Request,
@@ -312,22 +359,7 @@ async def importar_kmz(
     if not municipio_id:
         raise HTTPException(status_code=400, detail="Municipio no resuelto")
 
-    contenido = await archivo.read()
-    try:
-        with ZipFile(BytesIO(contenido)) as zf:
-            kml_names = [n for n in zf.namelist() if n.lower().endswith(".kml")]
-            if not kml_names:
-                raise HTTPException(status_code=400, detail="KMZ sin archivo .kml adentro")
-            kml_data = zf.read(kml_names[0])
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"KMZ invalido: {e}")
-
-    try:
-        root = ET.fromstring(kml_data)
-    except ET.ParseError as e:
-        raise HTTPException(status_code=400, detail=f"KML invalido: {e}")
+    root = _leer_kml(await archivo.read())
 
     # Cargar contactos del muni para matching
     res = await db.execute(
@@ -374,3 +406,56 @@ async def importar_kmz(
         "actualizados": actualizados,
         "no_matcheados": no_matcheados,
     }
+
+
+@router.post("/kmz-barrios")
+async def importar_kmz_barrios(
+    request: Request,
+    archivo: UploadFile = File(..., description="KMZ con un poligono por barrio"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Importa los limites de los barrios desde un KMZ.
+
+    Cada <Placemark> con <Polygon> se matchea por nombre (o alias) contra los
+    barrios del municipio y le guarda el poligono; los que no existen se
+    crean. Con el poligono, services/barrio_detector asigna el reclamo por
+    point-in-polygon en vez de por el centroide mas cercano.
+    """
+    from services.barrio_detector import centroide, normalizar_texto, poligonos_desde_kml
+
+    _require_admin(current_user)
+    municipio_id = get_effective_municipio_id(request, current_user)
+    if not municipio_id:
+        raise HTTPException(status_code=400, detail="Municipio no resuelto")
+
+    poligonos = poligonos_desde_kml(_leer_kml(await archivo.read()), KML_NS)
+
+    res = await db.execute(select(Barrio).where(Barrio.municipio_id == municipio_id))
+    by_name: Dict[str, Barrio] = {}
+    for b in res.scalars().all():
+        for nombre in [b.nombre, *(b.aliases or [])]:
+            by_name.setdefault(normalizar_texto(nombre), b)
+
+    actualizados = 0
+    creados: List[str] = []
+    for nombre, polys in poligonos.items():
+        lat, lon = centroide(polys)
+        barrio = by_name.get(normalizar_texto(nombre))
+        if barrio is None:
+            barrio = Barrio(municipio_id=municipio_id, nombre=nombre, tipo="kmz")
+            db.add(barrio)
+            creados.append(nombre)
+        else:
+            actualizados += 1
+        barrio.poligono = polys
+        barrio.validado = True
+        if barrio.latitud is None or barrio.longitud is None:
+            barrio.latitud, barrio.longitud = lat, lon
+
+    await db.commit()
+    return {
+        "ok": True,
+        "actualizados": actualizados,
+        "creados": creados,
+    }
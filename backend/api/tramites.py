@@ -13,7 +13,7 @@ Reglas de negocio:
 - Una solicitud no puede pasar de `recibido` → `en_curso` si quedan documentos
   obligatorios sin verificar (ver `validar_transicion_a_en_curso`).
 """
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_
 from sqlalchemy.exc import IntegrityError
@@ -30,6 +30,8 @@ import secrets
 from core.database import get_db
 from core.security import get_current_user, get_current_user_optional, require_roles, get_password_hash
 from core.config import settings
+from core.pagination import apply_keyset, fetch_keyset_page
+from services.outbox import publicar
 from models.tramite import Tramite, Solicitud, HistorialSolicitud, EstadoSolicitud
 from models.tramite_documento_requerido import TramiteDocumentoRequerido
 from models.categoria_tramite import CategoriaTramite
@@ -65,22 +67,6 @@ router = APIRouter()
 from core.tenancy import get_effective_municipio_id, resolve_municipio_id  # noqa: E402
 
 
-async def enviar_notificacion_solicitud(db, solicitud, tramite_nombre=None):
-    try:
-        from services.push_service import notificar_solicitud_recibida
-        await notificar_solicitud_recibida(db, solicitud, tramite_nombre)
-    except Exception as e:
-        logger.warning(f"[PUSH] Error notificando solicitud: {e}")
-
-
-async def enviar_notificacion_supervisores_solicitud(db, solicitud, tramite_nombre=None):
-    try:
-        from services.push_service import notificar_dependencia_solicitud_nueva
-        await notificar_dependencia_solicitud_nueva(db, solicitud, tramite_nombre)
-    except Exception as e:
-        logger.warning(f"[PUSH] Error notificando supervisores: {e}")
-
-
 async def enviar_email_solicitud_creada(db, solicitud, usuario, tramite_nombre=None):
     try:
         from services.email_service import email_service, EmailTemplates
@@ -1037,6 +1023,15 @@ async def crear_solicitud(
         comentario=historial_comentario,
     )
     db.add(historial)
+
+    # Notificar al vecino y a la dependencia via outbox (se graba con la
+    # solicitud). Si el tramite cobra al inicio, `notificar_solicitud_recibida`
+    # genera el cupon y manda el link al checkout en la notificacion.
+    publicar(db, "solicitud.creada", {
+        "solicitud_id": solicitud.id,
+        "tramite_nombre": tramite.nombre,
+    }, municipio_id=municipio_id)
+
     await db.commit()
 
     # Re-querear para evitar lazy-load en pydantic post-commit
@@ -1051,21 +1046,7 @@ async def crear_solicitud(
         )
         .where(Solicitud.id == solicitud.id)
     )
-    solicitud_full = result.scalar_one()
-
-    # Notificar al vecino y a la dependencia. Si el tramite cobra al inicio,
-    # `notificar_solicitud_recibida` genera el cupon automaticamente y
-    # incluye el link al checkout en la notificacion.
-    try:
-        await enviar_notificacion_solicitud(db, solicitud_full, tramite.nombre)
-    except Exception as e:
-        logger.warning(f"[NOTIF] Error notificando vecino: {e}")
-    try:
-        await enviar_notificacion_supervisores_solicitud(db, solicitud_full, tramite.nombre)
-    except Exception as e:
-        logger.warning(f"[NOTIF] Error notificando supervisores: {e}")
-
-    return solicitud_full
+    return result.scalar_one()
 
 
 @router.put("/solicitudes/detalle/{solicitud_id}", response_model=SolicitudResponse)
@@ -2015,6 +1996,7 @@ async def conteo_solicitudes_por_categoria(
 
 @router.get("/gestion/solicitudes", response_model=List[SolicitudGestionResponse])
 async def listar_solicitudes_gestion(
+    response: Response,
     municipio_id: int = Query(...),
     estado: Optional[EstadoSolicitud] = Query(None),
     tramite_id: Optional[int] = Query(None),
@@ -2022,12 +2004,17 @@ async def listar_solicitudes_gestion(
     municipio_dependencia_id: Optional[int] = Query(None),
     sin_asignar: bool = Query(False),
     search: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="Cursor keyset (header X-Next-Cursor). Si viene, se ignora `skip`."),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     current_user: User = Depends(require_roles([RolUsuario.ADMIN, RolUsuario.SUPERVISOR])),
     db: AsyncSession = Depends(get_db),
 ):
-    """Lista solicitudes para gestión con paginación y filtros."""
+    """Lista solicitudes para gestión con paginación y filtros.
+
+    Paginación keyset por `(created_at, id)` vía `cursor`; `skip` queda como
+    fallback para clientes viejos.
+    """
     from models.municipio_dependencia import MunicipioDependencia
 
     query = select(Solicitud).where(Solicitud.municipio_id == municipio_id)
@@ -2057,10 +2044,11 @@ async def listar_solicitudes_gestion(
     query = query.options(
         selectinload(Solicitud.tramite).selectinload(Tramite.categoria_tramite),
         selectinload(Solicitud.dependencia_asignada).selectinload(MunicipioDependencia.dependencia),
-    ).order_by(Solicitud.created_at.desc(), Solicitud.prioridad).offset(skip).limit(limit)
-
-    result = await db.execute(query)
-    return result.scalars().all()
+    )
+    query = apply_keyset(query, Solicitud.created_at, Solicitud.id, cursor)
+    if not cursor and skip:
+        query = query.offset(skip)
+    return await fetch_keyset_page(db, query, limit, response)
 
 
 # ============================================================
@@ -6,7 +6,6 @@ from fastapi import APIRouter, Depends
 from pydantic import BaseModel
 from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import or_, and_
 from sqlalchemy.orm import selectinload
 
 from core.database import get_db
@@ -15,10 +14,10 @@ from models.user import User
 from models.enums import RolUsuario
 from models.reclamo import Reclamo
 from models.tramite import Solicitud, EstadoSolicitud
-from models.tasas import Partida, Deuda, EstadoDeuda, EstadoPartida, TipoTasa
 from models.calificacion import Calificacion
 from models.documento_solicitud import DocumentoSolicitud
 from models.tramite_documento_requerido import TramiteDocumentoRequerido
+from services.tasas_resumen import obtener_resumen
 
 
 router = APIRouter(prefix="/vecino", tags=["Vecino"])
@@ -39,7 +38,7 @@ async def resumen_badges(
     """Devuelve contadores cross-modulo para mostrar al vecino en sidebar.
 
     Se llama una vez al loguear + se refresca periódicamente (frontend decide).
-    Rápido — solo 3 COUNTs paralelos.
+    Rápido — 2 COUNTs indexados + 1 lectura por PK del resumen de tasas.
     """
     # Solo tiene sentido para vecinos. Admin/supervisor recibe 0s.
     if current_user.rol != RolUsuario.VECINO or not current_user.municipio_id:
@@ -78,23 +77,9 @@ async def resumen_badges(
     )
     tramites_count = tram_q.scalar() or 0
 
-    # Tasas pendientes — partidas del vecino (por user_id o dni) con deudas
-    # pendientes/vencidas.
-    partida_match = [Partida.titular_user_id == current_user.id]
-    if current_user.dni:
-        partida_match.append(Partida.titular_dni == current_user.dni)
-
-    tasas_q = await db.execute(
-        select(func.count(Deuda.id))
-        .join(Partida, Deuda.partida_id == Partida.id)
-        .where(
-            Partida.municipio_id == current_user.municipio_id,
-            or_(*partida_match),
-            Partida.estado == EstadoPartida.ACTIVA,
-            Deuda.estado.in_([EstadoDeuda.PENDIENTE, EstadoDeuda.VENCIDA]),
-        )
-    )
-    tasas_count = tasas_q.scalar() or 0
+    # Tasas pendientes (pendientes + vencidas): resumen precalculado, 1 PK read
+    resumen = await obtener_resumen(db, current_user)
+    tasas_count = (resumen.pendientes + resumen.vencidas) if resumen else 0
 
     return ResumenBadges(
         reclamos_pendientes=reclamos_count,
@@ -130,25 +115,12 @@ async def recomendaciones_vecino(
     recs: list[Recomendacion] = []
     ahora = datetime.utcnow()
 
-    # --- TASAS ---
-    partida_match = [Partida.titular_user_id == current_user.id]
-    if current_user.dni:
-        partida_match.append(Partida.titular_dni == current_user.dni)
-
-    partida_filter = and_(
-        Partida.municipio_id == current_user.municipio_id,
-        or_(*partida_match),
-        Partida.estado == EstadoPartida.ACTIVA,
-    )
+    # --- TASAS --- (resumen precalculado por services/tasas_resumen)
+    resumen = await obtener_resumen(db, current_user)
 
     # Deudas vencidas (urgente)
-    vencidas_q = await db.execute(
-        select(func.count(Deuda.id), func.coalesce(func.sum(Deuda.importe), 0))
-        .join(Partida, Deuda.partida_id == Partida.id)
-        .where(partida_filter, Deuda.estado == EstadoDeuda.VENCIDA)
-    )
-    vencidas_row = vencidas_q.one()
-    cant_vencidas, monto_vencidas = vencidas_row[0], float(vencidas_row[1])
+    cant_vencidas = resumen.vencidas if resumen else 0
+    monto_vencidas = float(resumen.monto_vencido) if resumen else 0.0
     if cant_vencidas > 0:
         recs.append(Recomendacion(
             tipo="tasas", icono="AlertTriangle", color="#ef4444",
@@ -160,17 +132,7 @@ async def recomendaciones_vecino(
         ))
 
     # Deudas próximas a vencer (dentro de 7 días)
-    proximas_q = await db.execute(
-        select(func.count(Deuda.id))
-        .join(Partida, Deuda.partida_id == Partida.id)
-        .where(
-            partida_filter,
-            Deuda.estado == EstadoDeuda.PENDIENTE,
-            Deuda.fecha_vencimiento <= (ahora + timedelta(days=7)).date(),
-            Deuda.fecha_vencimiento >= ahora.date(),
-        )
-    )
-    cant_proximas = proximas_q.scalar() or 0
+    cant_proximas = resumen.proximas_7d if resumen else 0
     if cant_proximas > 0:
         recs.append(Recomendacion(
             tipo="tasas", icono="Clock", color="#f59e0b",
@@ -182,10 +144,7 @@ async def recomendaciones_vecino(
         ))
 
     # Sin tasas asociadas (nunca reclamó partidas)
-    partidas_q = await db.execute(
-        select(func.count(Partida.id)).where(partida_filter)
-    )
-    cant_partidas = partidas_q.scalar() or 0
+    cant_partidas = resumen.partidas if resumen else 0
     if cant_partidas == 0:
         recs.append(Recomendacion(
             tipo="tasas", icono="Search", color="#6366f1",
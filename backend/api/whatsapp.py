@@ -2,13 +2,15 @@
 API para integración con WhatsApp Business API.
 Permite recibir reclamos vía WhatsApp y enviar notificaciones.
 Incluye configuración persistente por municipio.
+
+El webhook sólo encola; el chatbot de abajo lo corre el pool de
+services/whatsapp/ingesta.py, y todo envío sale por services/whatsapp/envio.py.
 """
 from fastapi import APIRouter, Request, HTTPException, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from typing import Optional, List
 import json
-import httpx
 import re
 import os
 from datetime import datetime, timedelta
@@ -26,6 +28,9 @@ from models import User, Reclamo, Zona, Notificacion, Empleado
 from models.categoria_reclamo import CategoriaReclamo as Categoria
 from models.enums import EstadoReclamo, RolUsuario
 from models.whatsapp_config import WhatsAppConfig, WhatsAppLog, WhatsAppProvider
+from models.whatsapp_mensaje import WhatsAppConversacion
+from services.whatsapp import ingesta_pool, registrar_webhook, sender
+from services.whatsapp import metricas as metricas_ingesta
 from schemas.whatsapp import (
     WhatsAppConfigCreate, WhatsAppConfigUpdate, WhatsAppConfigResponse, WhatsAppConfigPublic,
     WhatsAppTestMessage, WhatsAppTestResponse, WhatsAppLogResponse, WhatsAppStats
@@ -66,23 +71,9 @@ def formatear_telefono_argentina(telefono: str) -> str:
     # Si no matchea ningún patrón, agregar 54
     return f"54{telefono_limpio}"
 
-# Estado de conversación por usuario (en memoria - considerar Redis para producción)
-conversation_states = {}
-
-
-class ConversationState:
-    """Estado de una conversación en curso"""
-    def __init__(self, phone: str):
-        self.phone = phone
-        self.step = "inicio"
-        self.data = {
-            "titulo": None,
-            "descripcion": None,
-            "categoria_id": None,
-            "direccion": None,
-            "latitud": None,
-            "longitud": None,
-        }
+# Estado de conversación por usuario: fila de whatsapp_conversaciones
+# (step + data), compartida entre workers e instancias.
+ConversationState = WhatsAppConversacion
 
 
 # ===========================================
@@ -466,26 +457,40 @@ async def receive_webhook(
     request: Request,
     db: AsyncSession = Depends(get_db)
 ):
-    """Recibe mensajes de WhatsApp y los procesa."""
+    """Recibe mensajes de WhatsApp y los encola.
+
+    Sólo persiste (dedupe por id de mensaje de Meta) y responde: el chatbot
+    lo corre el pool de services/whatsapp/ingesta.py. Si no se pudo
+    persistir devolvemos 500 para que Meta reentregue.
+    """
     try:
         body = await request.json()
+    except Exception:
+        return {"status": "ok"}
 
-        if "entry" not in body:
-            return {"status": "ok"}
+    if "entry" not in body:
+        return {"status": "ok"}
 
-        for entry in body.get("entry", []):
-            for change in entry.get("changes", []):
-                value = change.get("value", {})
-                messages = value.get("messages", [])
+    try:
+        resultado = await registrar_webhook(db, body)
+    except Exception as e:
+        print(f"Error encolando webhook de WhatsApp: {e}", flush=True)
+        raise HTTPException(status_code=500, detail="No se pudo encolar el mensaje")
 
-                for message in messages:
-                    await process_message(message, db)
+    if resultado["nuevos"]:
+        ingesta_pool.notificar()
+    return {"status": "ok", **resultado}
 
-        return {"status": "ok"}
 
-    except Exception as e:
-        print(f"Error procesando webhook: {e}")
-        return {"status": "error", "message": str(e)}
+@router.get("/ingesta/metricas")
+async def get_metricas_ingesta(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Lag, reintentos y envíos en cola de la ingesta de WhatsApp"""
+    if current_user.rol != RolUsuario.ADMIN:
+        raise HTTPException(status_code=403, detail="Solo administradores")
+    return await metricas_ingesta(db)
 
 
 # ===========================================
@@ -709,12 +714,7 @@ async def send_whatsapp_message_with_config(
     db.add(log)
 
     try:
-        message_id = None
-
-        if config.provider == WhatsAppProvider.META:
-            message_id = await send_via_meta(config, telefono_formateado, message)
-        elif config.provider == WhatsAppProvider.TWILIO:
-            message_id = await send_via_twilio(config, telefono_formateado, message)
+        message_id = await sender.enviar(config, telefono_formateado, message)
 
         log.enviado = True
         log.message_id = message_id
@@ -728,97 +728,10 @@ async def send_whatsapp_message_with_config(
         raise
 
 
-async def send_via_meta(config: WhatsAppConfig, to: str, message: str) -> Optional[str]:
-    """Envía mensaje via Meta Cloud API"""
-    # Usar config de DB o fallback a variables de entorno
-    phone_number_id = config.meta_phone_number_id or WHATSAPP_PHONE_NUMBER_ID
-    access_token = config.meta_access_token or WHATSAPP_ACCESS_TOKEN
-
-    if not phone_number_id or not access_token:
-        raise ValueError("Configuración de Meta incompleta. Configure en DB o variables de entorno.")
-
-    url = f"https://graph.facebook.com/v22.0/{phone_number_id}/messages"
-
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Content-Type": "application/json",
-    }
-
-    payload = {
-        "messaging_product": "whatsapp",
-        "to": to,
-        "type": "text",
-        "text": {"body": message}
-    }
-
-    async with httpx.AsyncClient() as client:
-        response = await client.post(url, headers=headers, json=payload)
-
-        if response.status_code != 200:
-            error_data = response.json() if response.text else {}
-            raise ValueError(f"Error de Meta API: {error_data}")
-
-        data = response.json()
-        return data.get("messages", [{}])[0].get("id")
-
-
-async def send_via_twilio(config: WhatsAppConfig, to: str, message: str) -> Optional[str]:
-    """Envía mensaje via Twilio"""
-    if not config.twilio_account_sid or not config.twilio_auth_token or not config.twilio_phone_number:
-        raise ValueError("Configuración de Twilio incompleta")
-
-    url = f"https://api.twilio.com/2010-04-01/Accounts/{config.twilio_account_sid}/Messages.json"
-
-    # Asegurar formato de número WhatsApp
-    to_whatsapp = to if to.startswith("whatsapp:") else f"whatsapp:{to}"
-    from_whatsapp = config.twilio_phone_number if config.twilio_phone_number.startswith("whatsapp:") else f"whatsapp:{config.twilio_phone_number}"
-
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            url,
-            auth=(config.twilio_account_sid, config.twilio_auth_token),
-            data={
-                "To": to_whatsapp,
-                "From": from_whatsapp,
-                "Body": message
-            }
-        )
-
-        if response.status_code not in [200, 201]:
-            error_data = response.json() if response.text else {}
-            raise ValueError(f"Error de Twilio: {error_data}")
-
-        data = response.json()
-        return data.get("sid")
-
-
 async def send_whatsapp_message(to: str, message: str):
     """Envía un mensaje de WhatsApp usando variables de entorno (fallback sin config de DB)"""
-    if not WHATSAPP_PHONE_NUMBER_ID or not WHATSAPP_ACCESS_TOKEN:
-        print(f"[WhatsApp Mock] To: {to}\nMessage: {message}\n")
-        return
-
-    url = f"https://graph.facebook.com/v22.0/{WHATSAPP_PHONE_NUMBER_ID}/messages"
-
-    headers = {
-        "Authorization": f"Bearer {WHATSAPP_ACCESS_TOKEN}",
-        "Content-Type": "application/json",
-    }
-
-    payload = {
-        "messaging_product": "whatsapp",
-        "to": to,
-        "type": "text",
-        "text": {"body": message}
-    }
-
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, headers=headers, json=payload)
-            if response.status_code != 200:
-                print(f"Error enviando WhatsApp: {response.text}")
-            else:
-                print(f"[WhatsApp] Mensaje enviado a {to}")
+        await sender.enviar(None, to, message)
     except Exception as e:
         print(f"Error enviando WhatsApp: {e}")
 
@@ -827,20 +740,15 @@ async def send_whatsapp_message(to: str, message: str):
 # FLUJO DE CONVERSACIÓN (CHATBOT)
 # ===========================================
 
-async def process_message(message: dict, db: AsyncSession):
-    """Procesa un mensaje individual de WhatsApp"""
+async def process_message(message: dict, db: AsyncSession, state: ConversationState):
+    """Procesa un mensaje individual de WhatsApp (lo llama el worker de
+    ingesta con la conversación ya tomada)"""
     msg_type = message.get("type")
     phone = message.get("from")
 
     if not phone:
         return
 
-    # Obtener o crear estado de conversación
-    if phone not in conversation_states:
-        conversation_states[phone] = ConversationState(phone)
-
-    state = conversation_states[phone]
-
     # Procesar según tipo de mensaje
     if msg_type == "text":
         text = message.get("text", {}).get("body", "").strip()
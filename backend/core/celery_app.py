@@ -9,7 +9,7 @@ celery_app = Celery(
     "reclamos",
     broker=settings.REDIS_URL,
     backend=settings.REDIS_URL,
-    include=["tasks.email_tasks"]
+    include=["tasks.email_tasks", "tasks.job_tasks"]
 )
 
 # Configuración
@@ -28,3 +28,20 @@ celery_app.conf.update(
 # Configuración de reintentos
 celery_app.conf.task_default_retry_delay = 60  # 1 minuto entre reintentos
 celery_app.conf.task_max_retries = 3
+
+
+# Runtime async compartido (core/worker_runtime.py): un loop de larga vida
+# por proceso worker, con engine de BD, cliente HTTP y SMTP reusables.
+from celery.signals import worker_process_init, worker_process_shutdown  # noqa: E402
+
+
+@worker_process_init.connect
+def _init_async_runtime(**kwargs):
+    from core.worker_runtime import init_worker_runtime
+    init_worker_runtime()
+
+
+@worker_process_shutdown.connect
+def _shutdown_async_runtime(**kwargs):
+    from core.worker_runtime import shutdown_worker_runtime
+    shutdown_worker_runtime()
@@ -0,0 +1,133 @@
+"""
+Compresión gzip/brotli de las responses, en streaming.
+
+Los listados grandes (OPs, mapa, heatmap) pesan varios MB de JSON y sobre
+3G la transferencia domina el tiempo de respuesta; comprimidos bajan ~10x.
+A diferencia del GZipMiddleware de Starlette:
+
+- negocia brotli si el cliente lo acepta y el paquete está instalado
+  (opcional: sin él se ofrece solo gzip);
+- comprime solo tipos de texto: PDFs, imágenes y planillas ya vienen
+  comprimidos, y los streams SSE no pueden esperar al buffer del compresor;
+- las respuestas de un solo bloque menores a `minimo_bytes` salen tal cual,
+  porque comprimirlas cuesta más de lo que ahorra. Las de varios bloques
+  (StreamingResponse) se comprimen bloque a bloque sin juntarlas en memoria.
+"""
+import zlib
+from typing import Callable, Dict, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # opcional
+    brotli = None
+
+TIPOS_COMPRIMIBLES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+)
+TIPOS_EXCLUIDOS = ("text/event-stream",)
+
+
+def elegir_codificacion(accept_encoding: str, con_brotli: bool = brotli is not None) -> Optional[str]:
+    """"br", "gzip" o None según el header Accept-Encoding (respeta q=0)."""
+    pesos: Dict[str, float] = {}
+    for parte in accept_encoding.lower().split(","):
+        nombre, _, params = parte.partition(";")
+        nombre = nombre.strip()
+        if not nombre:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        pesos[nombre] = q
+
+    comodin = pesos.get("*", 0.0)
+    if con_brotli and pesos.get("br", comodin) > 0:
+        return "br"
+    if pesos.get("gzip", comodin) > 0:
+        return "gzip"
+    return None
+
+
+def es_comprimible(headers: Headers) -> bool:
+    if "content-encoding" in headers:
+        return False
+    tipo = headers.get("content-type", "").lower()
+    return tipo.startswith(TIPOS_COMPRIMIBLES) and not tipo.startswith(TIPOS_EXCLUIDOS)
+
+
+def nuevo_compresor(codificacion: str, nivel_gzip: int, calidad_brotli: int) -> Tuple[Callable, Callable]:
+    """(procesar(bytes) -> bytes, terminar() -> bytes) para la codificación pedida."""
+    if codificacion == "br":
+        compresor = brotli.Compressor(quality=calidad_brotli)
+        return compresor.process, compresor.finish
+    # wbits 16+: formato gzip (header + CRC), no zlib crudo
+    compresor = zlib.compressobj(nivel_gzip, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compresor.compress, compresor.flush
+
+
+class CompresionMiddleware:
+
+    def __init__(self, app: ASGIApp, minimo_bytes: int = 1024, nivel_gzip: int = 6, calidad_brotli: int = 4):
+        self.app = app
+        self.minimo_bytes = minimo_bytes
+        self.nivel_gzip = nivel_gzip
+        self.calidad_brotli = calidad_brotli
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        codificacion = elegir_codificacion(Headers(scope=scope).get("accept-encoding", ""))
+        if codificacion is None:
+            await self.app(scope, receive, send)
+            return
+
+        inicio: Optional[Message] = None
+        # None: todavía no se decidió (se decide con el primer bloque del body)
+        compresor: Optional[Tuple[Callable, Callable]] = None
+        comprimir: Optional[bool] = None
+
+        async def enviar(message: Message) -> None:
+            nonlocal inicio, compresor, comprimir
+            if message["type"] == "http.response.start":
+                # Se retiene hasta ver el primer bloque: recién ahí se sabe el tamaño
+                inicio = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            cuerpo = message.get("body", b"")
+            hay_mas = message.get("more_body", False)
+            if comprimir is None:
+                headers = MutableHeaders(raw=list(inicio["headers"]))
+                comprimir = es_comprimible(headers) and (hay_mas or len(cuerpo) >= max(self.minimo_bytes, 1))
+                if comprimir:
+                    compresor = nuevo_compresor(codificacion, self.nivel_gzip, self.calidad_brotli)
+                    del headers["content-length"]
+                    headers["content-encoding"] = codificacion
+                    headers.add_vary_header("Accept-Encoding")
+                    inicio["headers"] = headers.raw
+                await send(inicio)
+
+            if not comprimir:
+                await send(message)
+                return
+            procesar, terminar = compresor
+            datos = procesar(cuerpo)
+            if not hay_mas:
+                datos += terminar()
+            await send({"type": "http.response.body", "body": datos, "more_body": hay_mas})
+
+        await self.app(scope, receive, enviar)
@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
-from typing import List
+from typing import Dict, List
 
 class Settings(BaseSettings):
     DATABASE_URL: str
@@ -59,6 +59,156 @@ class Settings(BaseSettings):
     # Redis / Celery
     REDIS_URL: str = "redis://localhost:6379/0"
 
+    # Executor de jobs en segundo plano (services/jobs.py):
+    # "local" = asyncio en el mismo proceso (dev/tests/1 instancia),
+    # "celery" = worker de Celery (tasks/job_tasks.py).
+    JOBS_EXECUTOR: str = "local"
+    # Latido de los jobs en curso y tras cuanto silencio se dan por muertos
+    # (el barrido "jobs.huerfanos" los pasa a error).
+    JOBS_HEARTBEAT_S: int = 30
+    JOBS_LEASE_S: int = 300
+
+    # Scheduler in-process (core/scheduler.py): tareas periodicas como el
+    # barrido de vencimientos de tasas. Con varias instancias corre solo en
+    # la que tiene el lock de lider.
+    SCHEDULER_ENABLED: bool = True
+
+    # Worker de webhooks de pago (services/pagos/webhook_worker.py): el
+    # endpoint solo persiste el evento y este pool lo procesa. Reintentos
+    # con backoff exponencial base*2^(n-1) (tope BACKOFF_MAX) hasta
+    # MAX_INTENTOS; despues el evento queda fallido para revision manual.
+    PAGOS_WEBHOOK_WORKERS: int = 2
+    PAGOS_WEBHOOK_MAX_INTENTOS: int = 8
+    PAGOS_WEBHOOK_BACKOFF_BASE_S: int = 15
+    PAGOS_WEBHOOK_BACKOFF_MAX_S: int = 3600
+    PAGOS_WEBHOOK_TIMEOUT_S: int = 20
+
+    # Outbox de efectos de reclamos/solicitudes (services/outbox/): los
+    # endpoints graban el evento en la misma transaccion y este dispatcher
+    # lo ejecuta. Reintentos base*2^(n-1) (tope BACKOFF_MAX) hasta
+    # MAX_INTENTOS; despues queda en dead letter (fallido_at). CONCURRENCIA
+    # limita los envios simultaneos por handler en cada instancia (JSON en
+    # el env: {"email": 2, ...}); los que no figuran usan la DEFAULT.
+    OUTBOX_WORKERS: int = 2
+    OUTBOX_LOTE: int = 20
+    OUTBOX_POLL_S: float = 5.0
+    OUTBOX_MAX_INTENTOS: int = 6
+    OUTBOX_BACKOFF_BASE_S: int = 10
+    OUTBOX_BACKOFF_MAX_S: int = 1800
+    OUTBOX_TIMEOUT_S: int = 30
+    OUTBOX_CONCURRENCIA: Dict[str, int] = {"email": 2, "whatsapp": 4, "push": 8}
+    OUTBOX_CONCURRENCIA_DEFAULT: int = 4
+
+    # Ranking de gamificacion (services/gamificacion_ranking.py):
+    # "redis" = sorted set compartido (produccion con varias instancias),
+    # "memoria" = por proceso, se reconstruye desde la DB cada TTL.
+    RANKING_BACKEND: str = "memoria"
+    RANKING_MEMORIA_TTL_S: int = 300
+
+    # Pago masivo de la agenda de tesoreria (services/tesoreria_pagos_masivos):
+    # pagos por transaccion. 0 = todo en una sola transaccion.
+    TESORERIA_MASIVO_LOTE: int = 500
+
+    # Geocoding (services/geocoding): Nominatim pide <= 1 req/s por cliente.
+    # Cache en BD con TTL (mas corto para resultados vacios) + LRU en memoria.
+    GEOCODING_RPS: float = 1.0
+    GEOCODING_TIMEOUT_S: float = 10.0
+    GEOCODING_CACHE_TTL_S: int = 30 * 86400
+    GEOCODING_CACHE_TTL_VACIO_S: int = 86400
+    GEOCODING_LRU_SIZE: int = 2000
+
+    # Detector de barrios (services/barrio_detector): indice por municipio
+    # en memoria. Se invalida al guardar barrios en este proceso; el TTL
+    # cubre los cambios hechos desde otras instancias.
+    BARRIOS_INDICE_TTL_S: int = 600
+    BARRIOS_GRILLA_GRADOS: float = 0.01
+
+    # Localizador de municipios (services/municipio_locator): KD-tree en
+    # memoria sobre los centroides de los municipios activos. Se reconstruye
+    # al guardar municipios en este proceso; el TTL cubre las otras
+    # instancias. CANDIDATOS_POLIGONO = centroides mas cercanos contra los
+    # que se prueba el limite (limites_geojson) cuando el municipio lo tiene.
+    MUNICIPIOS_INDICE_TTL_S: int = 600
+    MUNICIPIOS_CANDIDATOS_POLIGONO: int = 8
+
+    # WhatsApp entrante (services/whatsapp/ingesta.py): el webhook encola y
+    # estos workers corren el chatbot, una conversacion por worker a la vez.
+    # Un mensaje que falla frena su conversacion con backoff
+    # base*2^(n-1) (tope BACKOFF_MAX) hasta MAX_INTENTOS y despues se saltea.
+    WHATSAPP_INGESTA_WORKERS: int = 4
+    WHATSAPP_INGESTA_MAX_INTENTOS: int = 5
+    WHATSAPP_INGESTA_BACKOFF_BASE_S: int = 2
+    WHATSAPP_INGESTA_BACKOFF_MAX_S: int = 300
+    WHATSAPP_INGESTA_TIMEOUT_S: int = 60
+    # Envio (services/whatsapp/envio.py): cliente HTTP compartido y rate
+    # limit por numero de origen (Meta corta con 429 por encima del cupo).
+    WHATSAPP_ENVIO_RPS_POR_NUMERO: float = 20.0
+    WHATSAPP_HTTP_TIMEOUT_S: float = 15.0
+
+    # Disponibilidad de empleados (services/disponibilidad.py): cache por
+    # (municipio, fecha). Se invalida al cambiar asignaciones, ausencias u
+    # horarios en este proceso; el TTL cubre las otras instancias.
+    DISPONIBILIDAD_CACHE_TTL_S: int = 120
+    # Jornada de quien no tiene horario cargado (Lun-Vie)
+    DISPONIBILIDAD_JORNADA_DEFAULT: str = "09:00-18:00"
+    # Optimizador de asignaciones (services/asignacion_optimizer.py)
+    ASIGNACION_MAX_RECLAMOS: int = 5000
+    ASIGNACION_CANDIDATOS: int = 25          # empleados más baratos por clase de reclamo
+    ASIGNACION_EPSILON: float = 0.5          # paso de la subasta (puntos de costo)
+    ASIGNACION_SCIPY_MAX_CELDAS: int = 2_000_000
+
+    # PDFs (services/render_pool.py): procesos que renderizan con reportlab.
+    # 0 = en un thread del mismo proceso.
+    PDF_RENDER_WORKERS: int = 2
+    # Reporte ejecutivo mensual (services/reportes_mensuales.py): los meses
+    # cerrados quedan congelados; el mes en curso se recalcula pasado el TTL.
+    REPORTES_SNAPSHOT_TTL_S: int = 600
+    REPORTES_PDF_CACHE_SIZE: int = 100
+
+    # SQL generado por la IA (services/sql_sandbox.py): engine propio con
+    # pool chico para que las consultas analiticas no le saquen conexiones a
+    # la API. URL vacia = DATABASE_URL (idealmente un usuario de solo lectura
+    # o una replica).
+    SQL_SANDBOX_DATABASE_URL: str = ""
+    SQL_SANDBOX_POOL_SIZE: int = 2
+    SQL_SANDBOX_POOL_TIMEOUT_S: int = 5
+    SQL_SANDBOX_TIMEOUT_MS: int = 10000      # max_execution_time por sentencia
+    SQL_SANDBOX_MAX_FILAS: int = 5000
+    SQL_SANDBOX_COSTO_MAX: float = 1_000_000  # query_cost de EXPLAIN FORMAT=JSON
+    # Resultados de consultas guardadas (services/consultas_cache.py): se
+    # invalidan al cambiar las tablas que leen en este proceso; el TTL es la
+    # ventana de datos viejos tolerada. El scheduler precalcula las TOP mas
+    # ejecutadas cada REFRESCO_S.
+    CONSULTAS_CACHE_TTL_S: int = 600
+    CONSULTAS_CACHE_MAX_ENTRADAS: int = 200
+    CONSULTAS_REFRESCO_S: int = 300
+    CONSULTAS_REFRESCO_TOP: int = 20
+
+    # Compresión de responses (core/compresion.py). Brotli solo si el paquete
+    # está instalado; calidad 4 es el punto dulce para contenido dinámico.
+    COMPRESION_MIN_BYTES: int = 1024
+    COMPRESION_GZIP_NIVEL: int = 6
+    COMPRESION_BROTLI_CALIDAD: int = 4
+
+    # Perfil de queries por request (core/perfil_queries.py). Headers
+    # X-DB-*, warning en el log arriba de PRESUPUESTO queries o con una misma
+    # sentencia repetida N1_UMBRAL veces (N+1), y ranking en /admin/queries/rutas.
+    PERFIL_QUERIES_ENABLED: bool = True
+    PERFIL_QUERIES_HEADERS: bool = True
+    PERFIL_QUERIES_PRESUPUESTO: int = 30
+    PERFIL_QUERIES_N1_UMBRAL: int = 5
+
+    # Mapa público y heatmap agregados por tiles (services/mapa_tiles.py).
+    # Respuesta acotada a MAX_TILES x CELDAS_POR_TILE² clusters; puntos crudos
+    # desde ZOOM_PUNTOS en los tiles con hasta MAX_PUNTOS_TILE reclamos.
+    MAPA_CELDAS_POR_TILE: int = 8
+    MAPA_MAX_TILES: int = 64
+    MAPA_ZOOM_MAX: int = 18
+    MAPA_ZOOM_PUNTOS: int = 16
+    MAPA_MAX_PUNTOS_TILE: int = 100
+    MAPA_TILES_TTL_S: int = 300
+    MAPA_TILES_CACHE_MAX: int = 5000
+
     # Email SMTP
     SMTP_HOST: str = ""
     SMTP_PORT: int = 587
@@ -1,6 +1,7 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from .config import settings
+from .perfil_queries import instrumentar
 
 # Configuración del engine según el tipo de BD
 engine_kwargs = {
@@ -17,6 +18,9 @@ if not settings.DATABASE_URL.startswith("sqlite"):
 
 engine = create_async_engine(settings.DATABASE_URL, **engine_kwargs)
 
+# Conteo de queries/tiempo de BD por request (ver core/perfil_queries.py)
+instrumentar(engine)
+
 AsyncSessionLocal = async_sessionmaker(
     engine,
     class_=AsyncSession,
@@ -0,0 +1,167 @@
+"""
+Tablas derivadas mantenidas en el mismo flush que las origina.
+
+Varios servicios guardan una versión precalculada de datos que viven en otras
+tablas (documento de búsqueda de reclamos, resumen de deuda del vecino,
+rollup de calificaciones, snapshot de cuenta corriente). Todos necesitan lo
+mismo: ver qué objetos de ciertos modelos cambiaron en el flush y reescribir
+las filas derivadas en la misma transacción.
+
+Hay UN solo listener `after_flush` para todos: recorre new/dirty/deleted una
+vez, reparte los objetos entre las denormalizaciones registradas según su
+clase y sólo corre las que recibieron algo. Cada una se aplica dentro de su
+propio SAVEPOINT: si falla se loggea y se descarta sólo ese cambio derivado,
+no la transacción de negocio (la tabla derivada se puede reconstruir).
+
+    def _recolectar(cambios: Cambios) -> Optional[Set[int]]:
+        ...  # None/vacío = nada que hacer (no abre SAVEPOINT)
+
+    def _aplicar(connection, pendientes: Set[int]) -> None:
+        ...
+
+    registrar("mi_tabla", (Modelo, OtroModelo), _recolectar, _aplicar)
+
+Las caches en memoria del proceso (índices de barrios y municipios,
+disponibilidad, versiones de las consultas y del mapa) usan el mismo
+listener con `registrar_invalidacion`: lo recolectado en cada flush se
+acumula en la sesión y se aplica recién después del commit (un rollback lo
+descarta), así otra request no rearma la cache con datos sin commitear.
+
+    def _invalidar(pendientes: List[Set[int]]) -> None:
+        ...  # uno por flush de la transacción
+
+    registrar_invalidacion("mi_cache", (Modelo,), _recolectar, _invalidar)
+"""
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Set, Tuple, Type
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Cambios:
+    """Objetos del flush que le interesan a una denormalización."""
+    nuevos: List[Any] = field(default_factory=list)
+    modificados: List[Any] = field(default_factory=list)
+    borrados: List[Any] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.nuevos or self.modificados or self.borrados)
+
+    def todos(self) -> List[Any]:
+        return [*self.nuevos, *self.modificados, *self.borrados]
+
+    def de(self, modelo: Type) -> "Cambios":
+        """Sólo los objetos de `modelo`."""
+        return Cambios(
+            [o for o in self.nuevos if isinstance(o, modelo)],
+            [o for o in self.modificados if isinstance(o, modelo)],
+            [o for o in self.borrados if isinstance(o, modelo)],
+        )
+
+
+def cambio_alguno(obj: Any, atributos) -> bool:
+    """True si el flush cambió alguno de `atributos` del objeto."""
+    state = inspect(obj)
+    return any(state.attrs[a].history.has_changes() for a in atributos)
+
+
+def valores(obj: Any, atributo: str) -> Set:
+    """Valor actual y anterior (si cambió) de un atributo, sin nulos."""
+    hist = inspect(obj).attrs[atributo].history
+    return {v for v in (*hist.added, *hist.deleted, *hist.unchanged) if v}
+
+
+@dataclass
+class _Denormalizacion:
+    nombre: str
+    modelos: Tuple[Type, ...]
+    recolectar: Callable[[Cambios], Any]
+    aplicar: Callable[..., None]
+    # True: `aplicar(pendientes)` después del commit, fuera de la transacción
+    post_commit: bool = False
+
+
+_registradas: Dict[str, _Denormalizacion] = {}
+# session.info: {nombre: [pendiente por flush]} de las invalidaciones post-commit
+INFO_POST_COMMIT = "denormalizacion_post_commit"
+# clase -> denormalizaciones interesadas (resuelve herencia una vez por clase)
+_por_clase: Dict[Type, List[_Denormalizacion]] = {}
+
+
+def registrar(
+    nombre: str,
+    modelos: Tuple[Type, ...],
+    recolectar: Callable[[Cambios], Any],
+    aplicar: Callable[[Any, Any], None],
+) -> None:
+    """Registra (o reemplaza, por nombre) una tabla derivada."""
+    _registradas[nombre] = _Denormalizacion(nombre, tuple(modelos), recolectar, aplicar)
+    _por_clase.clear()
+
+
+def registrar_invalidacion(
+    nombre: str,
+    modelos: Tuple[Type, ...],
+    recolectar: Callable[[Cambios], Any],
+    invalidar: Callable[[List[Any]], None],
+) -> None:
+    """Registra (o reemplaza, por nombre) una cache que se invalida al commitear."""
+    _registradas[nombre] = _Denormalizacion(nombre, tuple(modelos), recolectar, invalidar, post_commit=True)
+    _por_clase.clear()
+
+
+def _interesadas(cls: Type) -> List[_Denormalizacion]:
+    dens = _por_clase.get(cls)
+    if dens is None:
+        dens = _por_clase[cls] = [d for d in _registradas.values() if issubclass(cls, d.modelos)]
+    return dens
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session: Session, flush_context) -> None:
+    if not _registradas:
+        return
+    cambios: Dict[str, Cambios] = {}
+    for objetos, lista in ((session.new, "nuevos"), (session.dirty, "modificados"), (session.deleted, "borrados")):
+        for obj in objetos:
+            for den in _interesadas(type(obj)):
+                getattr(cambios.setdefault(den.nombre, Cambios()), lista).append(obj)
+    if not cambios:
+        return
+
+    for nombre, c in cambios.items():
+        den = _registradas[nombre]
+        pendiente = den.recolectar(c)
+        if not pendiente:
+            continue
+        if den.post_commit:
+            session.info.setdefault(INFO_POST_COMMIT, {}).setdefault(nombre, []).append(pendiente)
+            continue
+        conn = session.connection()
+        try:
+            with conn.begin_nested():
+                den.aplicar(conn, pendiente)
+        except Exception as e:
+            logger.warning(f"[{nombre}] no se pudo actualizar la tabla derivada: {e}")
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    for nombre, pendientes in session.info.pop(INFO_POST_COMMIT, {}).items():
+        den = _registradas.get(nombre)
+        if den is None:
+            continue
+        try:
+            den.aplicar(pendientes)
+        except Exception as e:
+            logger.warning(f"[{nombre}] no se pudo invalidar la cache: {e}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session: Session) -> None:
+    session.info.pop(INFO_POST_COMMIT, None)
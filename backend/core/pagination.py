@@ -0,0 +1,123 @@
+"""
+Paginación keyset (cursor) para listados grandes.
+
+`offset(skip).limit(n)` obliga a la BD a recorrer y descartar `skip` filas
+en cada página: la página 50 del Kanban de reclamos cuesta 50 veces más
+que la primera. Con keyset la query arranca directo desde la última fila
+vista usando el índice `(created_at, id)`, así que cualquier página cuesta
+lo mismo.
+
+El cursor es opaco para el frontend: base64url de `{"c": created_at, "i": id}`
+de la última fila devuelta. Se manda en el header `X-Next-Cursor` para no
+romper los endpoints que ya devuelven una lista plana:
+
+    from core.pagination import apply_keyset, fetch_keyset_page
+
+    query = apply_keyset(query, Reclamo.created_at, Reclamo.id, cursor)
+    rows = await fetch_keyset_page(db, query, limit, response)
+
+Si no viene `cursor` el endpoint sigue aceptando `skip` (fallback offset).
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_payload(payload: Dict[str, Any]) -> str:
+    """Serializa una posición arbitraria (dict JSON) a un string opaco url-safe.
+    Para listados con otra clave de orden que `(created_at, id)`."""
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_payload(cursor: str) -> Dict[str, Any]:
+    """Inverso de `encode_payload`. Devuelve 400 si el cursor está corrupto."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor de paginación inválido")
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="Cursor de paginación inválido")
+    return payload
+
+
+def encode_cursor(created_at: Optional[datetime], row_id: int) -> str:
+    """Serializa la posición `(created_at, id)` a un string opaco url-safe."""
+    return encode_payload({"c": created_at.isoformat() if created_at else None, "i": row_id})
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    """Inverso de `encode_cursor`. Devuelve 400 si el cursor está corrupto."""
+    payload = decode_payload(cursor)
+    try:
+        created_at = datetime.fromisoformat(payload["c"]) if payload.get("c") else None
+        return created_at, int(payload["i"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor de paginación inválido")
+
+
+def apply_keyset(query: Select, created_col, id_col, cursor: Optional[str]) -> Select:
+    """
+    Agrega el predicado keyset y el orden `created_at DESC, id DESC`.
+
+    El orden se aplica siempre (con o sin cursor) para que la primera página
+    y las siguientes usen exactamente el mismo criterio de desempate. Filas
+    con `created_at` NULL quedan al final y se recorren sólo por id.
+    """
+    query = query.order_by(None).order_by(created_col.desc(), id_col.desc())
+    if not cursor:
+        return query
+
+    created_at, row_id = decode_cursor(cursor)
+    if created_at is None:
+        return query.where(and_(created_col.is_(None), id_col < row_id))
+    # Si la columna viene sin tz (MySQL DATETIME) comparamos naive.
+    created_at = created_at.replace(tzinfo=None)
+    return query.where(
+        or_(
+            created_col < created_at,
+            and_(created_col == created_at, id_col < row_id),
+            created_col.is_(None),
+        )
+    )
+
+
+async def fetch_keyset_page(
+    db: AsyncSession,
+    query: Select,
+    limit: int,
+    response: Optional[Response] = None,
+    created_attr: str = "created_at",
+    unique: bool = False,
+) -> List[Any]:
+    """
+    Ejecuta `query` pidiendo `limit + 1` filas para saber si hay página
+    siguiente sin un COUNT extra. Si la hay, setea `X-Next-Cursor` en el
+    response con la posición de la última fila devuelta.
+    """
+    result = await db.execute(query.limit(limit + 1))
+    if unique:
+        result = result.unique()
+    rows = list(result.scalars().all())
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if response is not None and has_more and rows:
+        last = rows[-1]
+        set_next_cursor(response, encode_cursor(getattr(last, created_attr), last.id))
+    return rows
+
+
+def set_next_cursor(response: Response, cursor: Optional[str]) -> None:
+    """Publica el cursor de la página siguiente (no-op si no hay más)."""
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+        response.headers["Access-Control-Expose-Headers"] = NEXT_CURSOR_HEADER
@@ -0,0 +1,222 @@
+"""
+Perfil de queries por request: cuántas sentencias, cuánto tiempo de BD y
+qué "formas" de SQL se repiten (N+1).
+
+- `instrumentar(engine)` cuelga before/after_cursor_execute del engine
+  (core/database.py lo hace con el engine de la app; los tests con el suyo).
+  Sin perfil activo el listener solo lee un contextvar: overhead ~0 para
+  workers, scheduler y tareas en background.
+- `medir()` abre un `PerfilQueries` en el contextvar. Los perfiles se anidan:
+  lo que se cuenta en uno interno suma también en los de afuera (así el
+  fixture `presupuesto_queries` de los tests ve las queries del request).
+- `perfil_queries_middleware` mide cada request /api/*, agrega headers
+  X-DB-Queries / X-DB-Tiempo-Ms / X-DB-N1, loggea los que pasan el
+  presupuesto o tienen N+1 y acumula por ruta (GET /admin/queries/rutas).
+
+Una "forma" es la sentencia normalizada: sin literales, con los IN (...)
+colapsados y los espacios compactados. La misma forma repetida
+settings.PERFIL_QUERIES_N1_UMBRAL veces o más en un request es sospechosa de
+N+1 (un SELECT por fila de un listado).
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+from fastapi import Request
+from sqlalchemy import event
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_perfil: ContextVar[Optional["PerfilQueries"]] = ContextVar("perfil_queries", default=None)
+
+_RE_STRING = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMERO = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM = r"(?:\?|%s|:\w+)"
+_RE_IN = re.compile(rf"\bIN\s*\((?:\s*{_PARAM}\s*,)*\s*{_PARAM}\s*\)", re.IGNORECASE)
+_RE_POSTCOMPILE = re.compile(r"\(__\[POSTCOMPILE_\w+\]\)")
+_RE_ESPACIOS = re.compile(r"\s+")
+
+
+def forma_sql(statement: str) -> str:
+    """SQL sin literales ni listas IN variables: agrupa las sentencias que solo
+    difieren en los parámetros."""
+    s = _RE_STRING.sub("?", statement)
+    s = _RE_POSTCOMPILE.sub("(?)", s)
+    s = _RE_NUMERO.sub("?", s)
+    s = _RE_IN.sub("IN (?)", s)
+    return _RE_ESPACIOS.sub(" ", s).strip()
+
+
+@dataclass
+class PerfilQueries:
+    queries: int = 0
+    tiempo_ms: float = 0.0
+    formas: Counter = field(default_factory=Counter)
+    padre: Optional["PerfilQueries"] = None
+    # Al salir de medir(): las tareas en background que heredaron el
+    # contextvar (audit log, create_task) ya no cuentan
+    cerrado: bool = False
+
+    def registrar(self, statement: str, ms: float) -> None:
+        forma = forma_sql(statement)
+        perfil = self
+        while perfil is not None:
+            perfil.queries += 1
+            perfil.tiempo_ms += ms
+            perfil.formas[forma] += 1
+            perfil = perfil.padre
+
+    def repetidas(self, umbral: Optional[int] = None) -> List[tuple]:
+        """[(forma, veces)] de las formas con >= umbral ejecuciones (N+1)."""
+        umbral = umbral or settings.PERFIL_QUERIES_N1_UMBRAL
+        return [(f, n) for f, n in self.formas.most_common() if n >= umbral]
+
+    def resumen(self, top: int = 5) -> str:
+        lineas = [f"{self.queries} queries, {self.tiempo_ms:.1f} ms"]
+        lineas += [f"  {n}x {f[:200]}" for f, n in self.formas.most_common(top)]
+        return "\n".join(lineas)
+
+
+def perfil_actual() -> Optional[PerfilQueries]:
+    return _perfil.get()
+
+
+@contextmanager
+def medir() -> Iterator[PerfilQueries]:
+    """Cuenta las queries ejecutadas dentro del bloque (y las suma al perfil
+    de afuera, si hay uno)."""
+    perfil = PerfilQueries(padre=_perfil.get())
+    token = _perfil.set(perfil)
+    try:
+        yield perfil
+    finally:
+        perfil.cerrado = True
+        _perfil.reset(token)
+
+
+# ============================================================
+# Listeners del engine
+# ============================================================
+
+def _antes(conn, cursor, statement, parameters, context, executemany) -> None:
+    perfil = _perfil.get()
+    if perfil is not None and not perfil.cerrado and context is not None:
+        # En el contexto de ejecución (uno por sentencia): si la sentencia
+        # falla no queda un inicio colgado en la conexión
+        context._perfil_t0 = time.perf_counter()
+
+
+def _despues(conn, cursor, statement, parameters, context, executemany) -> None:
+    t0 = getattr(context, "_perfil_t0", None)
+    if t0 is None:
+        return
+    ms = (time.perf_counter() - t0) * 1000
+    perfil = _perfil.get()
+    if perfil is not None and not perfil.cerrado:
+        perfil.registrar(statement, ms)
+
+
+def instrumentar(engine) -> None:
+    """Engancha el conteo al engine (AsyncEngine o Engine). Idempotente."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if not event.contains(sync_engine, "before_cursor_execute", _antes):
+        event.listen(sync_engine, "before_cursor_execute", _antes)
+        event.listen(sync_engine, "after_cursor_execute", _despues)
+
+
+# ============================================================
+# Acumulado por ruta
+# ============================================================
+
+@dataclass
+class EstadisticaRuta:
+    requests: int = 0
+    queries: int = 0
+    queries_max: int = 0
+    tiempo_ms: float = 0.0
+    requests_n1: int = 0
+    # Última forma repetida detectada (para saber por dónde empezar)
+    ultima_n1: Optional[str] = None
+
+
+_rutas: Dict[str, EstadisticaRuta] = {}
+
+
+def registrar_ruta(ruta: str, perfil: PerfilQueries) -> None:
+    est = _rutas.get(ruta)
+    if est is None:
+        est = _rutas[ruta] = EstadisticaRuta()
+    est.requests += 1
+    est.queries += perfil.queries
+    est.queries_max = max(est.queries_max, perfil.queries)
+    est.tiempo_ms += perfil.tiempo_ms
+    repetidas = perfil.repetidas()
+    if repetidas:
+        est.requests_n1 += 1
+        est.ultima_n1 = repetidas[0][0][:500]
+
+
+def peores_rutas(limit: int = 20, orden: str = "queries") -> List[Dict[str, Any]]:
+    """Rutas ordenadas de peor a mejor por queries (o tiempo de BD) por request."""
+    filas = []
+    for ruta, est in _rutas.items():
+        filas.append({
+            "ruta": ruta,
+            "requests": est.requests,
+            "queries_por_request": round(est.queries / est.requests, 2),
+            "queries_max": est.queries_max,
+            "tiempo_ms_por_request": round(est.tiempo_ms / est.requests, 2),
+            "requests_n1": est.requests_n1,
+            "ultima_n1": est.ultima_n1,
+        })
+    clave = "tiempo_ms_por_request" if orden == "tiempo" else "queries_por_request"
+    filas.sort(key=lambda f: (f[clave], f["queries_max"]), reverse=True)
+    return filas[:limit]
+
+
+def reiniciar_rutas() -> None:
+    _rutas.clear()
+
+
+# ============================================================
+# Middleware
+# ============================================================
+
+def _ruta(request: Request) -> str:
+    # El template ("/api/reclamos/{reclamo_id}"), no el path: si no, cada id
+    # sería una ruta distinta
+    route = request.scope.get("route")
+    return f"{request.method} {getattr(route, 'path', None) or '<sin ruta>'}"
+
+
+async def perfil_queries_middleware(request: Request, call_next):
+    if not settings.PERFIL_QUERIES_ENABLED or not request.url.path.startswith("/api"):
+        return await call_next(request)
+
+    with medir() as perfil:
+        response = await call_next(request)
+
+    ruta = _ruta(request)
+    registrar_ruta(ruta, perfil)
+    repetidas = perfil.repetidas()
+    if settings.PERFIL_QUERIES_HEADERS:
+        response.headers["X-DB-Queries"] = str(perfil.queries)
+        response.headers["X-DB-Tiempo-Ms"] = f"{perfil.tiempo_ms:.1f}"
+        if repetidas:
+            response.headers["X-DB-N1"] = str(len(repetidas))
+    if repetidas or perfil.queries > settings.PERFIL_QUERIES_PRESUPUESTO:
+        logger.warning(
+            "Queries %s: %d (%.1f ms) n1=%d | %s",
+            ruta, perfil.queries, perfil.tiempo_ms, len(repetidas),
+            "; ".join(f"{n}x {f[:160]}" for f, n in repetidas[:3]),
+            extra={"ruta": ruta, "db_queries": perfil.queries, "db_tiempo_ms": perfil.tiempo_ms,
+                   "db_n1": len(repetidas)},
+        )
+    return response
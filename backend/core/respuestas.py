@@ -0,0 +1,60 @@
+"""
+Serialización JSON rápida para las responses de la API.
+
+`OrjsonResponse` es la response_class por defecto de la app (main.py): las
+rutas con `response_model` siguen validando con Pydantic, pero el encode
+final lo hace orjson en lugar de `json.dumps`.
+
+Los listados más pesados (OPs, mapa público, heatmap) usan además el fast
+path: arman los dicts directo desde las tuplas de la query y devuelven
+`respuesta_json(...)`, que FastAPI no vuelve a validar ni a pasar por
+`jsonable_encoder`. Los tipos salen igual que en el modo JSON de Pydantic:
+Decimal como string, enums por valor y datetimes ISO 8601 (UTC con "Z").
+
+    filas = (await db.execute(query.with_only_columns(*columnas))).mappings().all()
+    return respuesta_json([dict(f) for f in filas], response)
+"""
+from decimal import Decimal
+from typing import Any, Optional
+
+import orjson
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+_OPCIONES = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+
+
+def _default(obj: Any) -> Any:
+    """Tipos que orjson no serializa solo (datetime, date, UUID y Enum sí)."""
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"{type(obj).__name__} no es serializable a JSON")
+
+
+def dumps(contenido: Any) -> bytes:
+    return orjson.dumps(contenido, default=_default, option=_OPCIONES)
+
+
+class OrjsonResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def respuesta_json(
+    contenido: Any,
+    response: Optional[Response] = None,
+    status_code: int = 200,
+) -> OrjsonResponse:
+    """
+    Response ya serializada (fast path, sin response_model).
+
+    Cuando la ruta devuelve una Response, FastAPI descarta los headers que se
+    hayan seteado en el `response` inyectado (X-Total-Count, X-Next-Cursor):
+    acá se copian.
+    """
+    headers = None
+    if response is not None:
+        headers = {k: v for k, v in response.headers.items() if k != "content-length"}
+    return OrjsonResponse(contenido, status_code=status_code, headers=headers)
@@ -0,0 +1,136 @@
+"""
+Scheduler in-process para tareas periódicas livianas.
+
+Corre dentro del proceso de la API (arranca en el lifespan de main.py). Con
+varias instancias (Cloud Run escala horizontal) sólo UNA ejecuta tareas:
+la que tiene el lock de líder, un `GET_LOCK` de MySQL tomado sobre una
+conexión dedicada que se mantiene abierta. Si esa instancia muere, MySQL
+suelta el lock al cerrarse la conexión y otra lo toma en el próximo tick.
+En SQLite (dev/tests) no hay competencia: la instancia siempre es líder.
+
+    from core.scheduler import scheduler
+    scheduler.registrar("tasas.vencimientos", 3600, tarea_vencimientos)
+
+Las tareas son `async def tarea() -> None` sin argumentos que abren su
+propia sesión. Una tarea que falla se loguea y se reintenta en el próximo
+intervalo; no frena a las demás.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from core.database import engine
+
+logger = logging.getLogger(__name__)
+
+LOCK_LIDER = "munify:scheduler"
+# Cada cuánto se revisa liderazgo y tareas vencidas
+TICK_SEGUNDOS = 60
+
+
+@dataclass
+class TareaProgramada:
+    nombre: str
+    intervalo: int  # segundos
+    fn: Callable[[], Awaitable[None]]
+    ultima_ejecucion: float = 0.0
+
+
+class Scheduler:
+    def __init__(self):
+        self._tareas: Dict[str, TareaProgramada] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._conn_lider: Optional[AsyncConnection] = None
+
+    def registrar(self, nombre: str, intervalo: int, fn: Callable[[], Awaitable[None]]) -> None:
+        self._tareas[nombre] = TareaProgramada(nombre, intervalo, fn)
+
+    @property
+    def es_lider(self) -> bool:
+        return self._conn_lider is not None or engine.dialect.name != "mysql"
+
+    async def _verificar_liderazgo(self) -> bool:
+        if engine.dialect.name != "mysql":
+            return True
+        if self._conn_lider is not None:
+            try:
+                await self._conn_lider.execute(text("SELECT 1"))
+                return True
+            except Exception as e:
+                # Conexión caída => MySQL ya soltó el lock
+                logger.warning(f"[scheduler] se perdió la conexión de líder: {e}")
+                await self._soltar_liderazgo()
+        conn = await engine.connect()
+        try:
+            got = (await conn.execute(text("SELECT GET_LOCK(:n, 0)"), {"n": LOCK_LIDER})).scalar()
+        except Exception:
+            await conn.close()
+            raise
+        if got == 1:
+            self._conn_lider = conn
+            # Tareas arrancan de cero: el líder anterior pudo morir a mitad de camino
+            for t in self._tareas.values():
+                t.ultima_ejecucion = 0.0
+            logger.info("[scheduler] esta instancia es líder")
+            return True
+        await conn.close()
+        return False
+
+    async def _soltar_liderazgo(self) -> None:
+        conn, self._conn_lider = self._conn_lider, None
+        if conn is None:
+            return
+        try:
+            await conn.execute(text("SELECT RELEASE_LOCK(:n)"), {"n": LOCK_LIDER})
+        except Exception:
+            pass
+        try:
+            await conn.close()
+        except Exception:
+            pass
+
+    async def _ejecutar_vencidas(self) -> None:
+        ahora = time.monotonic()
+        for t in self._tareas.values():
+            if t.ultima_ejecucion and ahora - t.ultima_ejecucion < t.intervalo:
+                continue
+            t.ultima_ejecucion = ahora
+            inicio = time.perf_counter()
+            try:
+                await t.fn()
+                logger.info(f"[scheduler] {t.nombre} OK en {time.perf_counter() - inicio:.1f}s")
+            except Exception:
+                logger.exception(f"[scheduler] {t.nombre} falló")
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                if await self._verificar_liderazgo():
+                    await self._ejecutar_vencidas()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"[scheduler] tick con error: {e}")
+            await asyncio.sleep(TICK_SEGUNDOS)
+
+    def start(self) -> None:
+        if self._task is None and self._tareas:
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._soltar_liderazgo()
+
+
+scheduler = Scheduler()
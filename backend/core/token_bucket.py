@@ -0,0 +1,36 @@
+"""Rate limit async por token bucket, para llamadas salientes a APIs
+externas (Nominatim, WhatsApp). Es por proceso.
+
+    bucket = TokenBucket(tasa=1.0)      # 1 req/s, sin ráfaga
+    await bucket.adquirir()             # espera su turno (FIFO)
+"""
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Rate limit async: `tasa` tokens/s, ráfaga de hasta `capacidad`.
+    El lock hace de cola FIFO: quien llega primero sale primero."""
+
+    def __init__(self, tasa: float, capacidad: float = 1.0):
+        self.tasa = tasa
+        self.capacidad = capacidad
+        self._tokens = capacidad
+        self._ultimo = time.monotonic()
+        self._lock = asyncio.Lock()
+        self.esperando = 0
+
+    async def adquirir(self) -> None:
+        self.esperando += 1
+        try:
+            async with self._lock:
+                while True:
+                    ahora = time.monotonic()
+                    self._tokens = min(self.capacidad, self._tokens + (ahora - self._ultimo) * self.tasa)
+                    self._ultimo = ahora
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    await asyncio.sleep((1 - self._tokens) / self.tasa)
+        finally:
+            self.esperando -= 1
@@ -0,0 +1,215 @@
+"""
+Runtime async de los workers de Celery.
+
+Antes cada tarea hacía `asyncio.new_event_loop()` + `loop.close()`. Todo
+recurso async queda atado al loop donde se creó, así que nada se podía
+reusar entre tareas: cada email abría una conexión SMTP nueva (EHLO +
+STARTTLS + AUTH), cada llamada HTTP un cliente nuevo, y las conexiones
+del pool de `core.database.engine` quedaban huérfanas en un loop cerrado.
+
+Ahora cada proceso worker tiene UN loop de larga vida corriendo en un
+thread propio, arrancado en `worker_process_init`. Las tareas (sincrónicas
+para Celery) le mandan la coroutine con `run_async()` y esperan el
+resultado. Sobre ese loop viven:
+
+  - el engine de `core.database` (pool normal, reusado entre tareas),
+  - `http_client()`: un `httpx.AsyncClient` compartido (keep-alive),
+  - `smtp_pool()`: una conexión SMTP que se reabre sola si el server la cortó.
+
+Funciona igual con `--pool=prefork` (un runtime por proceso hijo),
+`--pool=threads` y `--pool=solo`. Fuera de un worker (scripts, tests) el
+runtime se arranca solo en el primer `run_async()`.
+"""
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Optional
+
+import aiosmtplib
+import httpx
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Timeout por tarea al esperar el loop (Celery ya corta a task_time_limit)
+_TIMEOUT_TAREA = 600
+
+
+class SMTPPool:
+    """Una conexión SMTP por worker, serializada con un lock.
+
+    Reabre la conexión si el server la cerró por inactividad (la mayoría
+    corta a los ~5 min) o si un envío falla por desconexión.
+    """
+
+    def __init__(self):
+        self._smtp: Optional[aiosmtplib.SMTP] = None
+        self._lock = asyncio.Lock()
+
+    async def _conectar(self) -> aiosmtplib.SMTP:
+        smtp = aiosmtplib.SMTP(
+            hostname=settings.SMTP_HOST,
+            port=settings.SMTP_PORT,
+            start_tls=True,
+            timeout=30,
+        )
+        await smtp.connect()
+        if settings.SMTP_USER:
+            await smtp.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
+        return smtp
+
+    async def _asegurar(self) -> aiosmtplib.SMTP:
+        if self._smtp is not None and self._smtp.is_connected:
+            try:
+                await self._smtp.noop()
+                return self._smtp
+            except aiosmtplib.SMTPException:
+                pass
+        await self._cerrar_actual()
+        self._smtp = await self._conectar()
+        return self._smtp
+
+    async def _cerrar_actual(self) -> None:
+        if self._smtp is not None:
+            try:
+                await self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
+
+    async def send(self, message) -> None:
+        """Envía un mensaje; un reintento si la conexión estaba muerta."""
+        (error,) = await self.send_many([message])
+        if error is not None:
+            raise error
+
+    async def send_many(self, messages) -> list:
+        """Envía varios mensajes sobre la misma conexión. Devuelve una
+        lista paralela con None (ok) o la excepción de cada uno."""
+        errores: list = []
+        async with self._lock:
+            smtp = await self._asegurar()
+            for message in messages:
+                try:
+                    try:
+                        await smtp.send_message(message)
+                    except aiosmtplib.SMTPServerDisconnected:
+                        await self._cerrar_actual()
+                        smtp = await self._asegurar()
+                        await smtp.send_message(message)
+                    errores.append(None)
+                except Exception as e:
+                    errores.append(e)
+        return errores
+
+    async def close(self) -> None:
+        async with self._lock:
+            await self._cerrar_actual()
+
+
+class WorkerRuntime:
+    """Loop dedicado + recursos compartidos de un proceso worker."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._run, name="celery-async-runtime", daemon=True,
+        )
+        self._http: Optional[httpx.AsyncClient] = None
+        self._smtp: Optional[SMTPPool] = None
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def start(self) -> "WorkerRuntime":
+        self._thread.start()
+        return self
+
+    def submit(self, coro: Awaitable[Any]) -> Future:
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Awaitable[Any], timeout: Optional[float] = _TIMEOUT_TAREA) -> Any:
+        return self.submit(coro).result(timeout)
+
+    # Los recursos se crean adentro del loop (lazy) para quedar atados a él
+    def http_client(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                timeout=30.0,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            )
+        return self._http
+
+    def smtp_pool(self) -> SMTPPool:
+        if self._smtp is None:
+            self._smtp = SMTPPool()
+        return self._smtp
+
+    async def _cerrar_recursos(self) -> None:
+        from core.database import engine
+        if self._http is not None:
+            await self._http.aclose()
+        if self._smtp is not None:
+            await self._smtp.close()
+        await engine.dispose()
+
+    def stop(self) -> None:
+        try:
+            self.run(self._cerrar_recursos(), timeout=30)
+        except Exception as e:
+            logger.warning(f"[worker_runtime] error cerrando recursos: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=10)
+
+
+_runtime: Optional[WorkerRuntime] = None
+_runtime_lock = threading.Lock()
+
+
+def get_runtime() -> WorkerRuntime:
+    global _runtime
+    if _runtime is None:
+        with _runtime_lock:
+            if _runtime is None:
+                _runtime = WorkerRuntime().start()
+    return _runtime
+
+
+def init_worker_runtime() -> None:
+    """Llamar en `worker_process_init` (después del fork).
+
+    Descarta las conexiones heredadas del proceso padre sin cerrarlas (son
+    del padre) y arranca el loop del hijo.
+    """
+    global _runtime
+    from core.database import engine
+    engine.sync_engine.dispose(close=False)
+    with _runtime_lock:
+        _runtime = None
+    get_runtime()
+
+
+def shutdown_worker_runtime() -> None:
+    global _runtime
+    with _runtime_lock:
+        rt, _runtime = _runtime, None
+    if rt is not None:
+        rt.stop()
+
+
+def run_async(coro: Awaitable[Any]) -> Any:
+    """Ejecuta una coroutine en el loop del worker y devuelve su resultado."""
+    return get_runtime().run(coro)
+
+
+def http_client() -> httpx.AsyncClient:
+    """Cliente httpx compartido del worker. Sólo usar desde `run_async`."""
+    return get_runtime().http_client()
+
+
+def smtp_pool() -> SMTPPool:
+    """Conexión SMTP compartida del worker. Sólo usar desde `run_async`."""
+    return get_runtime().smtp_pool()
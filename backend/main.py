@@ -14,6 +14,9 @@ from core.database import init_db, close_db
 from core.config import settings
 from core.rate_limit import limiter, rate_limit_exceeded_handler
 from core.audit_middleware import audit_middleware
+from core.compresion import CompresionMiddleware
+from core.perfil_queries import perfil_queries_middleware
+from core.respuestas import OrjsonResponse
 from api import api_router
 
 # Inicializar Sentry si está configurado
@@ -44,8 +47,42 @@ async def lifespan(app: FastAPI):
     print(f"Inicializando base de datos...", flush=True)
     await init_db()
     print(f"Base de datos OK", flush=True)
+    if settings.SCHEDULER_ENABLED and settings.ENVIRONMENT != "testing":
+        from core.scheduler import scheduler
+        from services.tasas_resumen import tarea_vencimientos
+        from services.calificaciones_stats import tarea_rollup_calificaciones
+        from services.gamificacion_service import tarea_reset_mensual
+        from services.geocoding import tarea_purgar_cache
+        from services.consultas_cache import tarea_refrescar_consultas
+        from services.jobs import tarea_rescatar_huerfanos
+        scheduler.registrar("tasas.vencimientos", 3600, tarea_vencimientos)
+        scheduler.registrar("calificaciones.rollup", 6 * 3600, tarea_rollup_calificaciones)
+        scheduler.registrar("gamificacion.reset_mensual", 3600, tarea_reset_mensual)
+        scheduler.registrar("geocoding.purgar", 24 * 3600, tarea_purgar_cache)
+        scheduler.registrar("consultas.refrescar", settings.CONSULTAS_REFRESCO_S, tarea_refrescar_consultas)
+        scheduler.registrar("jobs.huerfanos", 60, tarea_rescatar_huerfanos)
+        scheduler.start()
+    from services.pagos.webhook_worker import webhook_pool
+    from services.whatsapp import ingesta_pool, sender as whatsapp_sender
+    from services.outbox import outbox_dispatcher
+    if settings.ENVIRONMENT != "testing":
+        webhook_pool.start()
+        ingesta_pool.start()
+        outbox_dispatcher.start()
     yield
     # Shutdown
+    from core.scheduler import scheduler
+    await scheduler.stop()
+    await webhook_pool.stop()
+    await ingesta_pool.stop()
+    await outbox_dispatcher.stop()
+    await whatsapp_sender.cerrar()
+    from services.geocoding import geocoder
+    await geocoder.cerrar()
+    from services.render_pool import render_pool
+    render_pool.cerrar()
+    from services.sql_sandbox import sql_sandbox
+    await sql_sandbox.cerrar()
     print("Cerrando conexiones de base de datos...", flush=True)
     await close_db()
     print("Cerrado OK", flush=True)
@@ -54,7 +91,8 @@ app = FastAPI(
     title="Sistema de Reclamos Municipales",
     description="API para gestión de reclamos vecinales",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=OrjsonResponse,
 )
 
 # Rate Limiting
@@ -106,6 +144,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compresión gzip/brotli de las responses de texto/JSON (ver core/compresion.py)
+app.add_middleware(
+    CompresionMiddleware,
+    minimo_bytes=settings.COMPRESION_MIN_BYTES,
+    nivel_gzip=settings.COMPRESION_GZIP_NIVEL,
+    calidad_brotli=settings.COMPRESION_BROTLI_CALIDAD,
+)
+
+# Perfil de queries: headers X-DB-*, detección de N+1 y ranking por ruta
+# (ver core/perfil_queries.py). Va antes del audit para quedar adentro: el
+# INSERT del audit log no cuenta para el request.
+app.middleware("http")(perfil_queries_middleware)
+
 # Audit middleware: loggea cada request /api/* a la tabla audit_logs
 # (en sesión separada y fire-and-forget — no bloquea el response).
 # También sigue imprimiendo la línea a stdout para los logs de Cloud Run.
@@ -21,7 +21,7 @@ from .documento import Documento
 from .configuracion import Configuracion
 from .notificacion import Notificacion
 from .sla import SLAConfig, SLAViolacion
-from .calificacion import Calificacion
+from .calificacion import Calificacion, CalificacionTag, CalificacionDiaria, CalificacionTagDiaria
 from .escalado import ConfiguracionEscalado, HistorialEscalado
 from .orden_trabajo import OrdenTrabajo, OrdenTrabajoReclamo, OrdenTrabajoTipo
 from .inventario import InventarioCategoria, InventarioItem, OrdenTrabajoRecurso
@@ -79,6 +79,9 @@ __all__ = [
     "SLAConfig",
     "SLAViolacion",
     "Calificacion",
+    "CalificacionTag",
+    "CalificacionDiaria",
+    "CalificacionTagDiaria",
     "ConfiguracionEscalado",
     "HistorialEscalado",
     "EstadoReclamo",
@@ -167,6 +170,7 @@ from .tasas import (
     EstadoDeuda,
     MedioPago,
     EstadoPago,
+    VecinoDeudaResumen,
 )
 
 __all__ += [
@@ -178,6 +182,7 @@ __all__ += [
     "EstadoPartida",
     "EstadoDeuda",
     "MedioPago",
+    "VecinoDeudaResumen",
     "EstadoPago",
 ]
 
@@ -226,7 +231,7 @@ from .tesoreria_extra import (
     TesoreriaPremio, TesoreriaConceptoLiquidacion,
 )
 from .paraje import TesoreriaParaje
-from .orden_pago import OrdenPago, EstadoOrdenPago, EtapaContable
+from .orden_pago import OrdenPago, EstadoOrdenPago, EtapaContable, ContactoCuentaCorriente
 from .retencion import ContaduriaRetencion
 from .tarjeta_credito import TarjetaCredito
 
@@ -256,8 +261,48 @@ __all__ += [
     "TesoreriaConceptoLiquidacion",
     "TesoreriaParaje",
     "OrdenPago",
+    "ContactoCuentaCorriente",
     "EstadoOrdenPago",
     "EtapaContable",
     "ContaduriaRetencion",
     "TarjetaCredito",
 ]
+
+# Búsqueda de reclamos (documento FULLTEXT denormalizado por reclamo)
+from .reclamo_busqueda import ReclamoBusqueda
+from .geocoding_cache import GeocodingCache
+
+__all__ += [
+    "ReclamoBusqueda",
+    "GeocodingCache",
+]
+
+# Snapshot mensual del reporte ejecutivo (ver services/reportes_mensuales.py)
+from .reporte_mensual import ReporteMensual
+
+__all__ += [
+    "ReporteMensual",
+]
+
+# Jobs en segundo plano (operaciones largas de admin, ver services/jobs.py)
+from .background_job import BackgroundJob, EstadoJob
+
+__all__ += [
+    "BackgroundJob",
+    "EstadoJob",
+]
+
+# Cola de mensajes entrantes de WhatsApp (ver services/whatsapp/ingesta.py)
+from .whatsapp_mensaje import WhatsAppConversacion, WhatsAppMensajeEntrante
+
+__all__ += [
+    "WhatsAppConversacion",
+    "WhatsAppMensajeEntrante",
+]
+
+# Outbox transaccional de notificaciones y efectos (ver services/outbox/)
+from .outbox_evento import OutboxEvento
+
+__all__ += [
+    "OutboxEvento",
+]
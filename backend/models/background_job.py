@@ -0,0 +1,77 @@
+"""Jobs en segundo plano para operaciones largas de admin.
+
+Crear un demo, borrar un demo, importar el Excel del intendente, confirmar
+un padron de tasas, auto-asignar categorias con IA o ejecutar un pago
+masivo tardan de segundos a minutos. Hacerlo dentro del request pega contra
+el timeout del proxy y bloquea un worker.
+
+El endpoint valida, crea una fila aca (estado=pendiente) y devuelve el id.
+El executor (services/jobs.py — in-process o Celery) la toma, va
+actualizando `progreso`/`mensaje` y al final deja `resultado` (lo mismo que
+antes devolvia el endpoint) o `error`. El frontend hace polling a
+GET /api/jobs/{id}.
+
+El id es aleatorio (no enumerable) porque `crear-demo` es publico: el id
+del job es la unica credencial para consultar su estado.
+"""
+from sqlalchemy import (
+    Column, Integer, String, Boolean, DateTime, ForeignKey, JSON, Index, LargeBinary,
+    Enum as SQLEnum,
+)
+from sqlalchemy.dialects.mysql import LONGBLOB
+from sqlalchemy.sql import func
+from core.database import Base
+import enum
+
+
+class EstadoJob(str, enum.Enum):
+    PENDIENTE = "pendiente"
+    EN_CURSO = "en_curso"
+    COMPLETADO = "completado"
+    ERROR = "error"
+    CANCELADO = "cancelado"
+
+
+ESTADOS_FINALES = (EstadoJob.COMPLETADO, EstadoJob.ERROR, EstadoJob.CANCELADO)
+
+
+class BackgroundJob(Base):
+    __tablename__ = "background_jobs"
+
+    id = Column(String(40), primary_key=True)
+
+    # Clave del handler registrado en services/jobs.HANDLERS
+    tipo = Column(String(60), nullable=False)
+
+    municipio_id = Column(Integer, ForeignKey("municipios.id", ondelete="SET NULL"), nullable=True, index=True)
+    # NULL = job publico (ej. crear-demo desde la landing)
+    usuario_id = Column(Integer, ForeignKey("usuarios.id", ondelete="SET NULL"), nullable=True, index=True)
+
+    estado = Column(
+        SQLEnum(EstadoJob, values_callable=lambda x: [e.value for e in x]),
+        default=EstadoJob.PENDIENTE,
+        nullable=False,
+    )
+    progreso = Column(Integer, nullable=False, default=0)   # 0..100
+    mensaje = Column(String(255), nullable=True)            # "Procesando hoja Empleados..."
+
+    # Kwargs del handler (JSON serializable) + archivo subido si aplica
+    params = Column(JSON, nullable=True)
+    archivo = Column(LargeBinary().with_variant(LONGBLOB, "mysql"), nullable=True)
+
+    resultado = Column(JSON, nullable=True)
+    error = Column(String(1000), nullable=True)
+
+    cancelacion_solicitada = Column(Boolean, nullable=False, default=False)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    # Latido del executor mientras corre el handler. Un job en_curso sin
+    # latido reciente quedo huerfano (worker caido) y lo cierra el barrido.
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_jobs_usuario_created", "usuario_id", "created_at"),
+        Index("ix_jobs_estado", "estado"),
+    )
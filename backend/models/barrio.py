@@ -3,7 +3,7 @@ Modelo de Barrio - Datos geográficos de barrios/localidades de un municipio.
 Se llenan automáticamente con IA al crear el municipio.
 Usado para métricas y análisis.
 """
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from core.database import Base
@@ -30,6 +30,13 @@ class Barrio(Base):
     tipo = Column(String(100), nullable=True)  # suburb, village, town, etc.
     importancia = Column(Float, nullable=True)  # Score de Nominatim
 
+    # Otros nombres con los que lo escriben los vecinos (["B° Norte", ...])
+    aliases = Column(JSON, nullable=True)
+
+    # Límite real del barrio (import KMZ): lista de polígonos, cada uno una
+    # lista de anillos [[lon, lat], ...] (el primero exterior, el resto huecos)
+    poligono = Column(JSON, nullable=True)
+
     # Estado de validación
     validado = Column(Boolean, default=False)  # True si Nominatim encontró coordenadas
 
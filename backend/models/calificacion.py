@@ -1,5 +1,5 @@
 """Modelo de calificaciones de vecinos"""
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, CheckConstraint
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, ForeignKey, CheckConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from core.database import Base
@@ -34,7 +34,75 @@ class Calificacion(Base):
     comentario = Column(Text, nullable=True)
 
     # Tags predefinidos que el usuario puede seleccionar
-    tags = Column(String(500), nullable=True)  # JSON: ["rapido", "profesional", "amable"]
+    tags = Column(String(500), nullable=True)  # separados por coma: "rapido,profesional,amable"
 
     # Timestamps
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+
+class CalificacionTag(Base):
+    """Un tag de una calificación (normalización de `Calificacion.tags`).
+
+    Permite contar tags con GROUP BY. La mantiene el listener de
+    services/calificaciones_stats al insertar la calificación.
+    """
+    __tablename__ = "calificacion_tags"
+
+    calificacion_id = Column(Integer, ForeignKey("calificaciones.id", ondelete="CASCADE"), primary_key=True)
+    tag = Column(String(60), primary_key=True)
+
+    __table_args__ = (
+        Index("ix_calificacion_tags_tag", "tag"),
+    )
+
+
+class CalificacionDiaria(Base):
+    """Rollup diario de calificaciones por municipio/categoría/empleado.
+
+    Tabla derivada (services/calificaciones_stats): sirve las estadísticas
+    y el ranking de ventanas largas sin leer calificaciones una por una.
+    Guarda sumas y conteos (no promedios) para poder sumar días.
+    """
+    __tablename__ = "calificaciones_diarias"
+
+    id = Column(Integer, primary_key=True)
+    municipio_id = Column(Integer, nullable=False)
+    fecha = Column(Date, nullable=False)
+    categoria_id = Column(Integer, nullable=True)
+    empleado_id = Column(Integer, nullable=True)
+
+    total = Column(Integer, nullable=False, default=0)
+    suma_puntuacion = Column(Integer, nullable=False, default=0)
+    estrellas_1 = Column(Integer, nullable=False, default=0)
+    estrellas_2 = Column(Integer, nullable=False, default=0)
+    estrellas_3 = Column(Integer, nullable=False, default=0)
+    estrellas_4 = Column(Integer, nullable=False, default=0)
+    estrellas_5 = Column(Integer, nullable=False, default=0)
+    # Aspectos opcionales: suma + cantidad de calificaciones que lo cargaron
+    suma_tiempo_respuesta = Column(Integer, nullable=False, default=0)
+    cant_tiempo_respuesta = Column(Integer, nullable=False, default=0)
+    suma_calidad_trabajo = Column(Integer, nullable=False, default=0)
+    cant_calidad_trabajo = Column(Integer, nullable=False, default=0)
+    suma_atencion = Column(Integer, nullable=False, default=0)
+    cant_atencion = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_calif_diarias_muni_fecha", "municipio_id", "fecha"),
+    )
+
+
+class CalificacionTagDiaria(Base):
+    """Rollup diario de tags (misma granularidad que CalificacionDiaria)."""
+    __tablename__ = "calificaciones_tags_diarias"
+
+    id = Column(Integer, primary_key=True)
+    municipio_id = Column(Integer, nullable=False)
+    fecha = Column(Date, nullable=False)
+    categoria_id = Column(Integer, nullable=True)
+    empleado_id = Column(Integer, nullable=True)
+    tag = Column(String(60), nullable=False)
+    cantidad = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_calif_tags_diarias_muni_fecha", "municipio_id", "fecha"),
+    )
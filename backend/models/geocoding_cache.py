@@ -0,0 +1,24 @@
+"""Cache persistente de geocoding (Nominatim / Overpass).
+
+Una fila por consulta normalizada (`clave` = sha256 de tipo + parámetros
+normalizados) con el JSON que devolvió el servicio externo. Sobrevive a
+los deploys, a diferencia del dict en memoria que tenía api/geocoding.
+
+Tabla derivada: la escribe y la lee `services/geocoding` (con un LRU en
+memoria adelante) y la purga de vencidas corre desde el scheduler.
+"""
+from sqlalchemy import Column, String, Text, DateTime, JSON
+from sqlalchemy.sql import func
+from core.database import Base
+
+
+class GeocodingCache(Base):
+    __tablename__ = "geocoding_cache"
+
+    clave = Column(String(64), primary_key=True)
+    tipo = Column(String(20), nullable=False)          # search | reverse | intersection
+    consulta = Column(Text, nullable=False)            # parámetros normalizados (para debug)
+    resultado = Column(JSON, nullable=True)
+    expira_at = Column(DateTime, nullable=False, index=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from core.database import Base
@@ -33,3 +33,10 @@ class Notificacion(Base):
 
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # Listado paginado por cursor (usuario, created_at DESC, id DESC)
+        Index("ix_notif_usuario_created", "usuario_id", "created_at", "id"),
+        # Badge de no leídas: COUNT resuelto desde el índice
+        Index("ix_notif_usuario_leida", "usuario_id", "leida"),
+    )
@@ -17,7 +17,7 @@ Numero correlativo: OP-{anio}-{seq4digits} por municipio. Empieza en
 import enum
 from sqlalchemy import (
     Column, Integer, String, Boolean, DateTime, Date, Text, Numeric, Enum, ForeignKey,
-    UniqueConstraint, JSON,
+    UniqueConstraint, JSON, Index,
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -54,6 +54,8 @@ class OrdenPago(Base):
     __tablename__ = "ordenes_pago"
     __table_args__ = (
         UniqueConstraint("municipio_id", "numero", name="uq_op_muni_numero"),
+        # Cuenta corriente del contacto: paginado por (fecha_emision, id)
+        Index("ix_op_contacto_fecha", "destino_contacto_id", "fecha_emision", "id"),
     )
 
     id = Column(Integer, primary_key=True, index=True)
@@ -160,3 +162,28 @@ class OrdenPago(Base):
 
     def __repr__(self):
         return f"<OrdenPago {self.numero} ${self.monto_pesos} {self.estado.value if hasattr(self.estado, 'value') else self.estado}>"
+
+
+class ContactoCuentaCorriente(Base):
+    """Totales precalculados de la cuenta corriente de un contacto (cabecera
+    de `/ordenes-pago/contacto/{id}/cuenta-corriente`).
+
+    Tabla derivada: la mantiene `services/cuenta_corriente` (listener
+    after_flush sobre OrdenPago). Si falta la fila se calcula al leer.
+    Mismos criterios que el endpoint: facturado = OPs no anuladas, pagado =
+    pagadas, pendiente = pendientes + autorizadas, devengado_no_pagado =
+    pendiente en etapa devengado.
+    """
+
+    __tablename__ = "contacto_cuenta_corriente"
+
+    contacto_id = Column(Integer, ForeignKey("contactos.id", ondelete="CASCADE"), primary_key=True, autoincrement=False)
+    municipio_id = Column(Integer, nullable=False, index=True)
+
+    facturado = Column(Numeric(15, 2), nullable=False, default=0)
+    pagado = Column(Numeric(15, 2), nullable=False, default=0)
+    pendiente = Column(Numeric(15, 2), nullable=False, default=0)
+    devengado_no_pagado = Column(Numeric(15, 2), nullable=False, default=0)
+    cantidad_ops = Column(Integer, nullable=False, default=0)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,6 +1,6 @@
 from sqlalchemy import (
     Column, Integer, String, Boolean, DateTime, Date, Time, Text, Float, Enum,
-    ForeignKey, JSON, UniqueConstraint,
+    ForeignKey, JSON, UniqueConstraint, Index,
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -28,6 +28,8 @@ class OrdenTrabajo(Base):
     __tablename__ = "ordenes_trabajo"
     __table_args__ = (
         UniqueConstraint("municipio_id", "numero", name="uq_ot_municipio_numero"),
+        # Trabajo programado por rango de fechas (services/disponibilidad.py)
+        Index("ix_ot_muni_programada", "municipio_id", "fecha_programada"),
     )
 
     id = Column(Integer, primary_key=True, index=True)
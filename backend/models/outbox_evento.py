@@ -0,0 +1,46 @@
+"""Outbox transaccional de efectos secundarios (notificaciones, emails, push,
+WhatsApp, gamificacion, websocket) de reclamos y solicitudes.
+
+El endpoint que cambia el dominio agrega las filas con
+`services.outbox.publicar()` ANTES de su `commit()`: o se graban el cambio
+y sus eventos juntos, o ninguno. Despues el dispatcher de
+services/outbox/dispatcher.py las toma con lease (`tomado_por` /
+`tomado_hasta`) y las ejecuta con reintentos (`intentos` /
+`proximo_intento_at`) hasta `fallido_at` (dead letter).
+
+Una fila por (evento, handler): si falla el email no se reenvia el push, y
+cada canal reintenta y se limita por separado.
+"""
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Index
+from sqlalchemy.sql import func
+from core.database import Base
+
+
+class OutboxEvento(Base):
+    __tablename__ = "outbox_eventos"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    # "reclamo.creado", "reclamo.estado_cambiado", "solicitud.creada", ...
+    tipo = Column(String(60), nullable=False)
+    # Canal que lo ejecuta: "push", "email", "in_app", "whatsapp", ...
+    handler = Column(String(30), nullable=False)
+    # Solo ids y datos chicos: el handler recarga lo que necesita
+    payload = Column(JSON, nullable=False)
+    municipio_id = Column(Integer, nullable=True, index=True)
+
+    # Cola de procesamiento (mismo esquema que pago_webhook_eventos)
+    intentos = Column(Integer, nullable=False, default=0, server_default="0")
+    proximo_intento_at = Column(DateTime(timezone=True), nullable=True)
+    tomado_por = Column(String(40), nullable=True)
+    tomado_hasta = Column(DateTime(timezone=True), nullable=True)
+    procesado_at = Column(DateTime(timezone=True), nullable=True)
+    # Agoto los reintentos: queda para inspeccion / reintento manual
+    fallido_at = Column(DateTime(timezone=True), nullable=True)
+    error = Column(String(500), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_outbox_pendientes", "procesado_at", "fallido_at", "proximo_intento_at"),
+    )
@@ -7,9 +7,13 @@ UN evento acá — se haya procesado bien o mal — para poder:
   2. Evitar procesar dos veces el mismo evento (UNIQUE en provider+external_id+evento).
   3. Re-procesar manualmente si algo fallo (procesado_at NULL => pendiente).
 
-El handler del webhook primero escribe acá y despues procesa — si el
-INSERT falla por unique constraint ya sabemos que el evento es duplicado
-y no hacemos nada.
+El handler del webhook SOLO escribe acá y responde 200 — si el INSERT
+falla por unique constraint ya sabemos que el evento es duplicado y no
+hacemos nada. El procesamiento (resolver sesion, validar firma, consultar
+estado al provider, marcar deuda pagada) lo hace el pool de
+services/pagos/webhook_worker.py, que toma los pendientes con un lease
+(`tomado_por`/`tomado_hasta`) y reintenta con backoff exponencial
+(`intentos`/`proximo_intento_at`) hasta `fallido_at`.
 """
 from sqlalchemy import (
     Column, Integer, String, Boolean, DateTime, ForeignKey, JSON,
@@ -46,6 +50,20 @@ class PagoWebhookEvento(Base):
     # Mensaje de error si el handler falló procesandolo.
     error = Column(String(500), nullable=True)
 
+    # Headers de firma tal cual llegaron: la validacion la hace el worker
+    # (necesita resolver la sesion y el webhook_secret del muni).
+    firma_header = Column(String(255), nullable=True)
+    request_id = Column(String(100), nullable=True)
+
+    # Cola de procesamiento. `intentos` se incrementa al tomar el evento
+    # (un worker que muere a mitad de camino cuenta como intento).
+    intentos = Column(Integer, nullable=False, default=0, server_default="0")
+    proximo_intento_at = Column(DateTime(timezone=True), nullable=True)
+    tomado_por = Column(String(40), nullable=True)
+    tomado_hasta = Column(DateTime(timezone=True), nullable=True)
+    # Agotó los reintentos: queda para inspeccion manual.
+    fallido_at = Column(DateTime(timezone=True), nullable=True)
+
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     sesion = relationship("PagoSesion", foreign_keys=[session_id])
@@ -53,4 +71,5 @@ class PagoWebhookEvento(Base):
     __table_args__ = (
         UniqueConstraint("provider", "external_id", "evento", name="uq_pwe_dedup"),
         Index("ix_pwe_provider_external", "provider", "external_id"),
+        Index("ix_pwe_pendientes", "procesado_at", "fallido_at", "proximo_intento_at"),
     )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Date, Time, Text, Float, Enum, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Date, Time, Text, Float, Enum, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from core.database import Base
@@ -91,3 +91,10 @@ class Reclamo(Base):
     documentos = relationship("Documento", back_populates="reclamo")
     calificacion = relationship("Calificacion", back_populates="reclamo", uselist=False)
     personas = relationship("ReclamoPersona", back_populates="reclamo", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # Paginación keyset del listado de gestión (core/pagination.py)
+        Index("ix_reclamos_muni_created", "municipio_id", "created_at", "id"),
+        # Trabajo programado por rango de fechas (services/disponibilidad.py)
+        Index("ix_reclamos_muni_programada", "municipio_id", "fecha_programada"),
+    )
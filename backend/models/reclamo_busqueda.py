@@ -0,0 +1,36 @@
+"""Documento de búsqueda denormalizado por reclamo.
+
+Una fila por reclamo con todo el texto buscable ya normalizado (título,
+descripción, dirección, vecino, categoría, zona) para que el buscador del
+Kanban resuelva con UN índice FULLTEXT en vez de 4 JOINs + 14 `LIKE '%x%'`.
+
+`ngramas` guarda los sufijos de los valores numéricos (DNI, teléfono,
+número de reclamo): buscar "5678" matchea el DNI 12345678 porque "5678" es
+prefijo de uno de sus sufijos, y FULLTEXT en modo boolean resuelve prefijos
+(`5678*`) desde el índice.
+
+Es una tabla derivada: se mantiene sola desde `services/reclamo_busqueda`
+(hook de core/denormalizacion) y se puede reconstruir entera con
+`scripts/migrate_reclamo_busqueda.py`. Por eso no lleva FKs.
+"""
+from sqlalchemy import Column, Integer, Text, DateTime, Index
+from sqlalchemy.sql import func
+from core.database import Base
+
+
+class ReclamoBusqueda(Base):
+    __tablename__ = "reclamo_busqueda"
+
+    reclamo_id = Column(Integer, primary_key=True, autoincrement=False)
+    municipio_id = Column(Integer, nullable=True, index=True)
+
+    documento = Column(Text, nullable=False, default="")
+    ngramas = Column(Text, nullable=False, default="")
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        # En MySQL crea FULLTEXT(documento, ngramas); en SQLite (tests) queda
+        # como índice común y el servicio cae a LIKE sobre estas 2 columnas.
+        Index("ft_reclamo_busqueda", "documento", "ngramas", mysql_prefix="FULLTEXT"),
+    )
@@ -0,0 +1,30 @@
+"""Snapshot mensual de métricas de reclamos por municipio.
+
+Lo que muestra el reporte ejecutivo (api/reportes) calculado en una sola
+pasada agregada sobre los reclamos creados en el mes. Un mes cerrado
+(`cerrado=True`) no se vuelve a calcular; el mes en curso se recalcula
+cuando el snapshot es más viejo que REPORTES_SNAPSHOT_TTL_S.
+
+Tabla derivada: la escribe y la lee `services/reportes_mensuales`.
+"""
+from sqlalchemy import Column, Integer, Boolean, DateTime, JSON, ForeignKey, UniqueConstraint
+from sqlalchemy.sql import func
+from core.database import Base
+
+
+class ReporteMensual(Base):
+    __tablename__ = "reportes_mensuales"
+
+    id = Column(Integer, primary_key=True, index=True)
+    municipio_id = Column(Integer, ForeignKey("municipios.id"), nullable=False)
+    anio = Column(Integer, nullable=False)
+    mes = Column(Integer, nullable=False)
+    metricas = Column(JSON, nullable=False)
+    cerrado = Column(Boolean, nullable=False, default=False)
+    calculado_at = Column(DateTime, nullable=False)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("municipio_id", "anio", "mes", name="uq_reportes_mensuales_muni_mes"),
+    )
@@ -238,3 +238,31 @@ class Pago(Base):
     deuda = relationship("Deuda", back_populates="pagos")
     usuario = relationship("User", foreign_keys=[usuario_id])
     operador = relationship("User", foreign_keys=[registrado_por_operador_id])
+
+
+class VecinoDeudaResumen(Base):
+    """Resumen precalculado de deuda por vecino (badges + recomendaciones).
+
+    Tabla derivada: la mantienen `services/tasas_resumen` (listener
+    after_flush sobre Deuda/Partida/User) y el barrido diario de
+    vencimientos. Sin fila == vecino sin partidas asociadas.
+
+    `proximas_7d` y la separación pendiente/vencida dependen de la fecha:
+    `calculado_para` dice para qué día son válidos los números.
+    """
+
+    __tablename__ = "tasas_vecino_resumen"
+
+    user_id = Column(Integer, ForeignKey("usuarios.id", ondelete="CASCADE"), primary_key=True, autoincrement=False)
+    municipio_id = Column(Integer, nullable=False, index=True)
+
+    partidas = Column(Integer, nullable=False, default=0)
+    pendientes = Column(Integer, nullable=False, default=0)
+    monto_pendiente = Column(Numeric(14, 2), nullable=False, default=0)
+    vencidas = Column(Integer, nullable=False, default=0)
+    monto_vencido = Column(Numeric(14, 2), nullable=False, default=0)
+    proximas_7d = Column(Integer, nullable=False, default=0)
+    proximo_vencimiento = Column(Date, nullable=True)
+
+    calculado_para = Column(Date, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Float, Enum, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Float, Enum, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from core.database import Base
@@ -209,6 +209,11 @@ class Solicitud(Base):
         cascade="all, delete-orphan",
     )
 
+    __table_args__ = (
+        # Paginación keyset del listado de gestión (core/pagination.py)
+        Index("ix_solicitudes_muni_created", "municipio_id", "created_at", "id"),
+    )
+
 
 class HistorialSolicitud(Base):
     """Historial de cambios en una solicitud"""
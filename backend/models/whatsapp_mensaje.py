@@ -0,0 +1,78 @@
+"""Cola de mensajes entrantes de WhatsApp + estado de cada conversación.
+
+`POST /whatsapp/webhook` sólo inserta acá y responde 200. El UNIQUE en
+(provider, message_id) descarta las reentregas de Meta (que reintenta si
+tardamos en contestar). El chatbot lo corre el pool de
+services/whatsapp/ingesta.py:
+
+  - `WhatsAppConversacion` (una fila por teléfono) es la unidad de orden:
+    un worker toma el lease de la conversación (`tomado_por`/`tomado_hasta`)
+    y procesa sus mensajes en orden de llegada. Conversaciones distintas van
+    en paralelo. También guarda el paso del bot (`step`/`data`), que antes
+    vivía en un dict en memoria y se perdía con cada deploy.
+  - `WhatsAppMensajeEntrante` guarda el payload crudo y el estado de
+    procesamiento (`intentos`, `proximo_intento_at`, `procesado_at`,
+    `fallido_at`), igual que los webhooks de pago.
+"""
+from sqlalchemy import Column, Integer, String, DateTime, JSON, UniqueConstraint, Index
+from sqlalchemy.ext.mutable import MutableDict
+from sqlalchemy.sql import func
+from core.database import Base
+
+
+def datos_iniciales() -> dict:
+    """Datos vacíos del reclamo que se arma paso a paso en el chat."""
+    return {
+        "titulo": None,
+        "descripcion": None,
+        "categoria_id": None,
+        "direccion": None,
+        "latitud": None,
+        "longitud": None,
+    }
+
+
+class WhatsAppConversacion(Base):
+    __tablename__ = "whatsapp_conversaciones"
+
+    telefono = Column(String(30), primary_key=True)
+
+    # Paso del chatbot ("inicio", "titulo", ..., "confirmar") y lo cargado.
+    # MutableDict: `data["titulo"] = ...` marca la fila como modificada.
+    step = Column(String(30), nullable=False, default="inicio")
+    data = Column(MutableDict.as_mutable(JSON), nullable=False, default=datos_iniciales)
+
+    # Lease del worker que está procesando la conversación
+    tomado_por = Column(String(40), nullable=True)
+    tomado_hasta = Column(DateTime(timezone=True), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class WhatsAppMensajeEntrante(Base):
+    __tablename__ = "whatsapp_mensajes_entrantes"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    provider = Column(String(20), nullable=False, default="meta")
+    message_id = Column(String(128), nullable=False)   # "wamid...." de Meta
+    telefono = Column(String(30), nullable=False)
+    tipo = Column(String(20), nullable=True)           # text / location / image ...
+    payload = Column(JSON, nullable=True)
+
+    intentos = Column(Integer, nullable=False, default=0, server_default="0")
+    proximo_intento_at = Column(DateTime(timezone=True), nullable=True)
+    procesado_at = Column(DateTime(timezone=True), nullable=True)
+    # Agotó los reintentos: se saltea para no trabar la conversación
+    fallido_at = Column(DateTime(timezone=True), nullable=True)
+    error = Column(String(500), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("provider", "message_id", name="uq_wme_dedup"),
+        # Siguiente mensaje pendiente de una conversación
+        Index("ix_wme_telefono_pendientes", "telefono", "procesado_at", "id"),
+        Index("ix_wme_pendientes", "procesado_at", "fallido_at", "proximo_intento_at"),
+    )
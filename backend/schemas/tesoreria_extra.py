@@ -113,6 +113,8 @@ class EjecutarMasivoRequest(BaseModel):
     programados a ejecutar de una. Cada uno se paga con sus valores POR
     DEFECTO: monto del programado, fecha = su proximo_pago, sin premios."""
     pago_ids: List[int] = []
+    # Pagos por transaccion (None = settings.TESORERIA_MASIVO_LOTE, 0 = una sola)
+    lote: Optional[int] = Field(None, ge=0)
 
 
 class EjecutarMasivoItem(BaseModel):
@@ -122,12 +124,24 @@ class EjecutarMasivoItem(BaseModel):
     error: Optional[str] = None
 
 
+class EjecutarMasivoLote(BaseModel):
+    """Resultado de una transaccion del pago masivo."""
+    numero: int
+    pagos: int
+    exitosos: int
+    fallidos: int
+    monto: Decimal
+    ms: int
+    error: Optional[str] = None
+
+
 class EjecutarMasivoResponse(BaseModel):
     total: int
     exitosos: int
     fallidos: int
     monto_total: Decimal
     items: List[EjecutarMasivoItem] = []
+    lotes: List[EjecutarMasivoLote] = []
 
 
 # ============================================================
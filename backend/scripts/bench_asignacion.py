@@ -0,0 +1,95 @@
+"""Benchmark del optimizador de asignaciones: 2k reclamos x 300 empleados.
+
+Arma en memoria (sin BD) un municipio sintético: 20 categorías, 15 zonas,
+empleados con 2 categorías y cupo de 4 a 8 tareas, reclamos repartidos
+alrededor de las zonas con prioridad y SLA consumido al azar. Mide:
+
+  - antes: el greedy de /turnos/optimizar-asignaciones (cada reclamo, en
+    orden, contra todos los empleados con cupo).
+  - despues: services.asignacion_optimizer.resolver (costos por clase +
+    subasta, o scipy si está instalado).
+
+Compara tiempo, costo total del plan (menor es mejor) y reclamos asignados.
+
+Ejecutar desde backend/:  python scripts/bench_asignacion.py [RECLAMOS] [EMPLEADOS]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.asignacion_optimizer import Recurso, Tarea, desglose, resolver
+
+
+def _escenario(reclamos: int, empleados: int, semilla: int = 1):
+    rnd = random.Random(semilla)
+    zonas = {z: (-34.6 + rnd.random() * 0.1, -58.4 + rnd.random() * 0.1) for z in range(15)}
+    recursos = []
+    for j in range(empleados):
+        z = rnd.randrange(15)
+        recursos.append(Recurso(
+            j, f"Empleado {j}", categoria_ids=set(rnd.sample(range(20), 2)), zona_id=z,
+            latitud=zonas[z][0], longitud=zonas[z][1], cupo=rnd.choice([4, 6, 8]),
+            ocupacion=rnd.random() * 0.5, carga=rnd.random() * 0.5,
+        ))
+    tareas = []
+    for i in range(reclamos):
+        z = rnd.randrange(15)
+        tareas.append(Tarea(
+            i, f"Reclamo {i}", categoria_id=rnd.randrange(20), prioridad=rnd.randint(1, 5), zona_id=z,
+            latitud=zonas[z][0] + rnd.random() * 0.02, longitud=zonas[z][1] + rnd.random() * 0.02,
+            urgencia=rnd.random() * 2,
+        ))
+    return tareas, recursos
+
+
+def _greedy(tareas, recursos):
+    """El reparto viejo: primero el más prioritario, se queda con el mejor libre."""
+    cupos = [r.cupo for r in recursos]
+    elegidos = []
+    for t in sorted(tareas, key=lambda t: t.prioridad):
+        mejor, mejor_costo = None, None
+        for j, r in enumerate(recursos):
+            if cupos[j]:
+                c = sum(desglose(t, r).values())
+                if mejor_costo is None or c < mejor_costo:
+                    mejor, mejor_costo = j, c
+        if mejor is not None:
+            cupos[mejor] -= 1
+        elegidos.append((t, mejor))
+    return elegidos
+
+
+def _costo(pares, recursos) -> float:
+    return sum(
+        t.costo_no_asignar if j is None else sum(desglose(t, recursos[j]).values())
+        for t, j in pares
+    )
+
+
+def bench(reclamos: int, empleados: int):
+    tareas, recursos = _escenario(reclamos, empleados)
+    print(f"reclamos: {reclamos}  empleados: {empleados}  cupo total: {sum(r.cupo for r in recursos)}")
+
+    t0 = time.perf_counter()
+    antes = _greedy(tareas, recursos)
+    dt_antes = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    elegidos, solver = resolver(tareas, recursos)
+    dt_despues = time.perf_counter() - t0
+    despues = list(zip(tareas, elegidos))
+
+    for nombre, pares, dt in (("greedy", antes, dt_antes), (f"optimizador ({solver})", despues, dt_despues)):
+        asignados = sum(j is not None for _, j in pares)
+        print(f"  {nombre:<22} {dt * 1000:8.1f} ms  costo {_costo(pares, recursos):10.1f}  asignados {asignados}")
+    print(f"  speedup: x{dt_antes / dt_despues:.1f}")
+
+
+if __name__ == "__main__":
+    bench(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 2000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 300,
+    )
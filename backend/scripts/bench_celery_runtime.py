@@ -0,0 +1,86 @@
+"""Benchmark del runtime de tareas: loop nuevo por tarea vs loop compartido.
+
+Simula N tareas de Celery que hacen lo típico de una tarea real (una
+query a la BD + un request HTTP) y mide tareas/segundo con:
+
+  - antes: `asyncio.new_event_loop()` por tarea. Como los recursos async no
+    sobreviven al cierre del loop, cada tarea crea (y descarta) su engine y
+    su cliente HTTP — que es lo que pasaba en la práctica.
+  - despues: `core.worker_runtime.run_async()`: loop de larga vida, engine
+    con pool y `httpx.AsyncClient` con keep-alive compartidos.
+
+No necesita broker: llama a las funciones de la tarea en el mismo proceso,
+igual que lo haría un worker con `--pool=solo`.
+
+Ejecutar desde backend/:
+    python scripts/bench_celery_runtime.py [N] [URL]
+URL default: http://localhost:8001/health (levantar el backend antes), o
+"-" para medir sólo BD.
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from core.config import settings
+from core.database import AsyncSessionLocal
+from core.worker_runtime import http_client, run_async, shutdown_worker_runtime
+
+
+def _loop_por_tarea(coro):
+    """El `run_async` viejo de tasks/email_tasks.py."""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+async def _tarea_antes(url):
+    engine = create_async_engine(settings.DATABASE_URL)
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        if url:
+            async with httpx.AsyncClient(timeout=10) as client:
+                await client.get(url)
+    finally:
+        await engine.dispose()
+
+
+async def _tarea_despues(url):
+    async with AsyncSessionLocal() as db:
+        await db.execute(text("SELECT 1"))
+    if url:
+        await http_client().get(url)
+
+
+def _medir(nombre, fn, n):
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    dt = time.perf_counter() - t0
+    print(f"  {nombre:<28} {n} tareas en {dt:6.2f}s  -> {n / dt:8.1f} tareas/s")
+    return n / dt
+
+
+def main(n, url):
+    print(f"BD: {settings.DATABASE_URL.split('@')[-1]}  HTTP: {url or '(sin HTTP)'}")
+    antes = _medir("loop nuevo por tarea", lambda: _loop_por_tarea(_tarea_antes(url)), n)
+    # Calentamiento: abre el pool y la conexión HTTP fuera de la medición
+    run_async(_tarea_despues(url))
+    despues = _medir("loop compartido del worker", lambda: run_async(_tarea_despues(url)), n)
+    print(f"  speedup: x{despues / antes:.1f}")
+    shutdown_worker_runtime()
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    url = sys.argv[2] if len(sys.argv) > 2 else "http://localhost:8001/health"
+    main(n, None if url == "-" else url)
@@ -0,0 +1,163 @@
+"""Benchmark del motor de disponibilidad: 500 empleados x 1 semana.
+
+Crea un municipio de prueba con N empleados (horario Lun-Vie 08:00-16:00,
+~10% con una ausencia aprobada) y 3 reclamos programados por empleado y día
+hábil, y mide:
+
+  - antes: de a un empleado y día (horarios, ausencias y reclamos con una
+    query cada uno), como lo armaban los endpoints de turnos.
+  - despues: services.disponibilidad.calcular_disponibilidad en frío
+    (cantidad fija de queries para toda la semana) y con la cache caliente.
+
+Al final borra todo lo creado.
+
+Ejecutar desde backend/:  python scripts/bench_disponibilidad.py [N]
+"""
+import asyncio
+import os
+import sys
+import time
+from datetime import date, time as hora, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, event, insert, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from core.config import settings
+import models  # noqa: F401
+from models import (
+    CategoriaReclamo, Empleado, EmpleadoAusencia, EmpleadoHorario, Municipio, Reclamo, RolUsuario, User,
+)
+from models.enums import EstadoReclamo
+from services import disponibilidad
+from services.disponibilidad import (
+    ESTADOS_RECLAMO_PROGRAMADO, calcular_disponibilidad, minutos, restar, total, unir,
+)
+
+LUNES = date(2026, 3, 2)
+DOMINGO = LUNES + timedelta(days=6)
+
+
+async def _seed(db: AsyncSession, n: int):
+    muni = Municipio(nombre="Bench Turnos", codigo=f"bench-turnos-{int(time.time())}", latitud=-34.6, longitud=-58.4)
+    db.add(muni)
+    await db.flush()
+    admin = User(
+        email=f"bench.turnos.{muni.id}@test.com", password_hash="x",
+        nombre="Bench", apellido="Turnos", rol=RolUsuario.ADMIN, municipio_id=muni.id,
+    )
+    categoria = CategoriaReclamo(municipio_id=muni.id, nombre="Bench")
+    db.add_all([admin, categoria])
+    await db.flush()
+    await db.execute(insert(Empleado), [
+        {"municipio_id": muni.id, "nombre": f"Empleado {i}", "activo": True} for i in range(n)
+    ])
+    ids = (await db.execute(
+        select(Empleado.id).where(Empleado.municipio_id == muni.id).order_by(Empleado.id)
+    )).scalars().all()
+    await db.execute(insert(EmpleadoHorario), [
+        {"empleado_id": eid, "dia_semana": d, "hora_entrada": hora(8), "hora_salida": hora(16), "activo": True}
+        for eid in ids for d in range(5)
+    ])
+    await db.execute(insert(EmpleadoAusencia), [
+        {"empleado_id": eid, "tipo": "licencia", "fecha_inicio": LUNES + timedelta(days=1),
+         "fecha_fin": LUNES + timedelta(days=2), "aprobado": True}
+        for eid in ids[::10]
+    ])
+    await db.execute(insert(Reclamo), [
+        {
+            "municipio_id": muni.id, "creador_id": admin.id, "categoria_id": categoria.id,
+            "titulo": f"Tarea {eid}-{d}-{k}", "descripcion": "bench", "direccion": "Calle 1",
+            "estado": EstadoReclamo.ASIGNADO.value, "empleado_id": eid,
+            "fecha_programada": LUNES + timedelta(days=d),
+            "hora_inicio": hora(9 + 2 * k), "hora_fin": hora(10 + 2 * k),
+        }
+        for eid in ids for d in range(5) for k in range(3)
+    ])
+    await db.commit()
+    return muni.id, list(ids)
+
+
+async def _antes(db: AsyncSession, ids):
+    """De a un empleado y día: 3 queries por celda de la grilla."""
+    libres = 0
+    for eid in ids:
+        fecha = LUNES
+        while fecha <= DOMINGO:
+            horarios = (await db.execute(
+                select(EmpleadoHorario).where(
+                    EmpleadoHorario.empleado_id == eid, EmpleadoHorario.dia_semana == fecha.weekday(),
+                    EmpleadoHorario.activo == True,
+                )
+            )).scalars().all()
+            ausente = (await db.execute(
+                select(EmpleadoAusencia.id).where(
+                    EmpleadoAusencia.empleado_id == eid, EmpleadoAusencia.aprobado == True,
+                    EmpleadoAusencia.fecha_inicio <= fecha, EmpleadoAusencia.fecha_fin >= fecha,
+                )
+            )).first()
+            tareas = (await db.execute(
+                select(Reclamo).where(
+                    Reclamo.empleado_id == eid, Reclamo.fecha_programada == fecha,
+                    Reclamo.estado.in_(ESTADOS_RECLAMO_PROGRAMADO),
+                )
+            )).scalars().all()
+            jornada = [] if ausente else unir((minutos(h.hora_entrada), minutos(h.hora_salida)) for h in horarios)
+            ocupado = unir((minutos(t.hora_inicio), minutos(t.hora_fin)) for t in tareas if t.hora_inicio and t.hora_fin)
+            libres += total(restar(jornada, ocupado))
+            fecha += timedelta(days=1)
+    return libres
+
+
+async def _despues(db: AsyncSession, muni_id: int):
+    semana = await calcular_disponibilidad(db, muni_id, LUNES, DOMINGO)
+    return sum(d.minutos_libres for dia in semana.values() for d in dia.dias.values())
+
+
+async def _medir(nombre, engine, Session, fn):
+    queries = [0]
+
+    def contar(*args):
+        queries[0] += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", contar)
+    try:
+        async with Session() as db:
+            t0 = time.perf_counter()
+            libres = await fn(db)
+            dt = time.perf_counter() - t0
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", contar)
+    print(f"  {nombre:<22} {dt * 1000:9.1f} ms  {queries[0]:>6} queries  ({libres // 60} h libres)")
+    return dt
+
+
+async def bench(n: int):
+    engine = create_async_engine(settings.DATABASE_URL)
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    print(f"BD: {settings.DATABASE_URL.split('@')[-1]}  empleados: {n}  dias: 7")
+    async with Session() as db:
+        muni_id, ids = await _seed(db, n)
+    try:
+        antes = await _medir("de a uno", engine, Session, lambda db: _antes(db, ids))
+        disponibilidad.invalidar()
+        frio = await _medir("motor (cache fria)", engine, Session, lambda db: _despues(db, muni_id))
+        caliente = await _medir("motor (cache caliente)", engine, Session, lambda db: _despues(db, muni_id))
+        print(f"  speedup: x{antes / frio:.1f} (fria), x{antes / max(caliente, 1e-6):.0f} (caliente)")
+    finally:
+        async with Session() as db:
+            empleados = select(Empleado.id).where(Empleado.municipio_id == muni_id)
+            await db.execute(delete(Reclamo).where(Reclamo.municipio_id == muni_id))
+            await db.execute(delete(EmpleadoAusencia).where(EmpleadoAusencia.empleado_id.in_(empleados)))
+            await db.execute(delete(EmpleadoHorario).where(EmpleadoHorario.empleado_id.in_(empleados)))
+            await db.execute(delete(Empleado).where(Empleado.municipio_id == muni_id))
+            await db.execute(delete(CategoriaReclamo).where(CategoriaReclamo.municipio_id == muni_id))
+            await db.execute(delete(User).where(User.municipio_id == muni_id))
+            await db.execute(delete(Municipio).where(Municipio.id == muni_id))
+            await db.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(bench(int(sys.argv[1]) if len(sys.argv) > 1 else 500))
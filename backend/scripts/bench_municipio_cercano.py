@@ -0,0 +1,122 @@
+"""Benchmark del localizador de municipios (GET /municipios/public/cercano).
+
+Arma N municipios sintéticos repartidos por Argentina (sin BD; un tercio
+con límites cuadrados en limites_geojson) y compara, para una ráfaga de
+consultas con puntos al azar:
+
+  - lineal: lo que hacía el endpoint (haversine contra todos en Python;
+    sin contar el SELECT de todos los municipios que además hacía).
+  - indice: IndiceMunicipios.localizar (KD-tree + point-in-polygon).
+  - k=5 / radio 50 km: las consultas de /public/cercanos.
+
+Verifica que lineal e índice elijan el mismo municipio (para los puntos que
+no caen dentro de un límite) y reporta armado del índice, µs por consulta,
+p99 y consultas/s de un solo worker.
+
+Ejecutar desde backend/:  python scripts/bench_municipio_cercano.py [N] [consultas]
+"""
+import os
+import random
+import sys
+import time
+from math import asin, cos, radians, sin, sqrt
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.municipio_locator import IndiceMunicipios
+
+# Caja aproximada de Argentina continental
+SUR, NORTE, OESTE, ESTE = -55.0, -22.0, -73.0, -53.6
+# Lado del límite cuadrado de los municipios que lo tienen (~11 km)
+LADO_LIMITE = 0.1
+
+
+def _haversine(lon1: float, lat1: float, lon2: float, lat2: float) -> float:
+    lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
+    a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return 2 * asin(sqrt(a)) * 6371
+
+
+def _municipios(n: int):
+    r = random.Random(42)
+    munis = []
+    for i in range(n):
+        lat, lon = r.uniform(SUR, NORTE), r.uniform(OESTE, ESTE)
+        limites = None
+        if i % 3 == 0:
+            m = LADO_LIMITE / 2
+            limites = {"type": "Polygon", "coordinates": [[
+                [lon - m, lat - m], [lon + m, lat - m], [lon + m, lat + m], [lon - m, lat + m], [lon - m, lat - m],
+            ]]}
+        munis.append(SimpleNamespace(
+            id=i + 1, nombre=f"Municipio {i + 1}", codigo=f"muni-{i + 1}", latitud=lat, longitud=lon,
+            radio_km=r.choice([5.0, 10.0, 20.0]), logo_url=None, color_primario="#3B82F6", activo=True,
+            abm_en_sidebar=True, es_demo=False, limites_geojson=limites,
+        ))
+    return munis
+
+
+def _lineal(munis, lat: float, lng: float):
+    # Copia del loop que tenía el endpoint
+    mejor, menor = None, float("inf")
+    for muni in munis:
+        d = _haversine(lng, lat, muni.longitud, muni.latitud)
+        if d < menor:
+            menor, mejor = d, muni
+    return mejor, menor
+
+
+def _medir(fn, puntos):
+    tiempos = []
+    for lat, lng in puntos:
+        t0 = time.perf_counter()
+        fn(lat, lng)
+        tiempos.append(time.perf_counter() - t0)
+    tiempos.sort()
+    total = sum(tiempos)
+    return total / len(tiempos) * 1e6, tiempos[int(len(tiempos) * 0.99)] * 1e6, len(tiempos) / total
+
+
+def bench(n: int, consultas: int):
+    munis = _municipios(n)
+    r = random.Random(7)
+    puntos = [(r.uniform(SUR, NORTE), r.uniform(OESTE, ESTE)) for _ in range(consultas)]
+
+    t0 = time.perf_counter()
+    indice = IndiceMunicipios(munis)
+    armado_ms = (time.perf_counter() - t0) * 1000
+
+    # Mismo resultado que el loop lineal cuando el punto no cae en un límite
+    distintos = 0
+    for lat, lng in puntos[:2000]:
+        res = indice.localizar(lat, lng)
+        if not res.municipio.contiene(lat, lng) and res.municipio.id != _lineal(munis, lat, lng)[0].id:
+            distintos += 1
+    assert distintos == 0, f"{distintos} consultas con resultado distinto al lineal"
+
+    print("=" * 72)
+    print(f"{n} municipios ({indice.con_limites} con límites), índice armado en {armado_ms:.1f} ms")
+    print("=" * 72)
+    print(f"{'consulta':<28}{'µs/consulta':>14}{'p99 (µs)':>14}{'consultas/s':>16}")
+    print("-" * 72)
+    # El lineal es lento: con una muestra alcanza para el promedio
+    muestra = puntos[: max(consultas // 50, 200)]
+    filas = [
+        ("lineal (antes)", lambda la, lo: _lineal(munis, la, lo), muestra),
+        ("indice.localizar", indice.localizar, puntos),
+        ("indice.k_cercanos(k=5)", lambda la, lo: indice.k_cercanos(la, lo, 5), puntos),
+        ("indice.en_radio(50 km)", lambda la, lo: indice.en_radio(la, lo, 50.0), puntos),
+    ]
+    base = None
+    for nombre, fn, pts in filas:
+        media, p99, qps = _medir(fn, pts)
+        base = base or media
+        print(f"{nombre:<28}{media:>14.1f}{p99:>14.1f}{qps:>16,.0f}  ({base / media:.0f}x)")
+
+
+if __name__ == "__main__":
+    bench(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 2500,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 50_000,
+    )
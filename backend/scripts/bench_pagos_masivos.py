@@ -0,0 +1,161 @@
+"""Benchmark del pago masivo de la agenda: de a uno vs set-based, a 2k pagos.
+
+Crea un municipio de prueba con N empleados (contacto + pago programado
+mensual con caja) y mide:
+
+  - antes: el loop viejo de job_ejecutar_pagos_masivo (claim UPDATE +
+    Gasto + flush() + cuota + movimiento por pago, un solo commit).
+  - despues: services.tesoreria_pagos_masivos.ejecutar_pagos_masivo con
+    lote 0 (una transaccion) y con lote 500.
+
+Entre corridas borra los gastos generados y vuelve la agenda atras. Al
+final borra todo lo creado.
+
+Ejecutar desde backend/:  python scripts/bench_pagos_masivos.py [N]
+"""
+import asyncio
+import os
+import sys
+import time
+from datetime import date
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, insert, or_, select, update
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from core.config import settings
+import models  # noqa: F401
+from models import (
+    Contacto, FrecuenciaPago, Gasto, GastoCuota, Municipio, RolUsuario, TesoreriaCaja,
+    TesoreriaMovimientoCaja, TesoreriaPagoProgramado, TipoMovimientoCaja, User,
+)
+from models.gasto import EstadoGastoCuota
+from services.tesoreria_pagos_masivos import calcular_proximo_pago, ejecutar_pagos_masivo
+
+FECHA = date(2026, 1, 10)
+
+
+async def _seed(db: AsyncSession, n: int):
+    muni = Municipio(nombre="Bench Agenda", codigo=f"bench-agenda-{int(time.time())}", latitud=-34.6, longitud=-58.4)
+    db.add(muni)
+    await db.flush()
+    admin = User(
+        email=f"bench.agenda.{muni.id}@test.com", password_hash="x",
+        nombre="Bench", apellido="Agenda", rol=RolUsuario.ADMIN, municipio_id=muni.id,
+    )
+    caja = TesoreriaCaja(municipio_id=muni.id, nombre="Caja bench", saldo_inicial=0)
+    db.add_all([admin, caja])
+    await db.flush()
+    await db.execute(insert(Contacto), [
+        {"municipio_id": muni.id, "nombre": f"Empleado {i}"} for i in range(n)
+    ])
+    contactos = (await db.execute(
+        select(Contacto.id).where(Contacto.municipio_id == muni.id).order_by(Contacto.id)
+    )).scalars().all()
+    await db.execute(insert(TesoreriaPagoProgramado), [
+        {
+            "municipio_id": muni.id, "contacto_id": cid, "caja_id": caja.id, "concepto": f"Sueldo {i}",
+            "monto_pesos": Decimal("250000.00"), "frecuencia": FrecuenciaPago.MENSUAL, "dia_del_mes": 10,
+            "fecha_inicio": FECHA, "proximo_pago": FECHA,
+        }
+        for i, cid in enumerate(contactos)
+    ])
+    await db.commit()
+    ids = (await db.execute(
+        select(TesoreriaPagoProgramado.id).where(TesoreriaPagoProgramado.municipio_id == muni.id)
+        .order_by(TesoreriaPagoProgramado.id)
+    )).scalars().all()
+    return muni.id, admin.id, list(ids)
+
+
+async def _reset(db: AsyncSession, muni_id: int):
+    gastos = select(Gasto.id).where(Gasto.municipio_id == muni_id)
+    await db.execute(delete(TesoreriaMovimientoCaja).where(TesoreriaMovimientoCaja.municipio_id == muni_id))
+    await db.execute(delete(GastoCuota).where(GastoCuota.gasto_id.in_(gastos)))
+    await db.execute(delete(Gasto).where(Gasto.municipio_id == muni_id))
+    await db.execute(
+        update(TesoreriaPagoProgramado).where(TesoreriaPagoProgramado.municipio_id == muni_id)
+        .values(proximo_pago=FECHA, ultimo_pago=None, activo=True)
+    )
+    await db.commit()
+
+
+async def _antes(db: AsyncSession, muni_id: int, creador_id: int, ids):
+    """El loop de a uno que tenia api/tesoreria_agenda (sin progreso)."""
+    pps = (await db.execute(
+        select(TesoreriaPagoProgramado).where(TesoreriaPagoProgramado.id.in_(ids))
+    )).scalars().all()
+    for pp in pps:
+        fecha = pp.proximo_pago
+        claim = await db.execute(
+            update(TesoreriaPagoProgramado)
+            .where(
+                TesoreriaPagoProgramado.id == pp.id,
+                or_(TesoreriaPagoProgramado.ultimo_pago.is_(None), TesoreriaPagoProgramado.ultimo_pago < fecha),
+            )
+            .values(ultimo_pago=fecha)
+        )
+        if claim.rowcount == 0:
+            continue
+        gasto = Gasto(
+            municipio_id=muni_id, creador_id=creador_id, destino_tipo="contacto",
+            destino_contacto_id=pp.contacto_id, concepto=pp.concepto, monto_pesos=pp.monto_pesos,
+            fecha=fecha, tipo_financiacion="contado", forma_pago=pp.forma_pago,
+            caja_id=pp.caja_id, pago_programado_id=pp.id,
+        )
+        db.add(gasto)
+        await db.flush()
+        db.add(GastoCuota(
+            gasto_id=gasto.id, numero=1, monto=pp.monto_pesos, fecha_vencimiento=fecha,
+            fecha_pago=fecha, estado=EstadoGastoCuota.PAGADA, forma_pago=pp.forma_pago,
+        ))
+        db.add(TesoreriaMovimientoCaja(
+            municipio_id=muni_id, caja_id=pp.caja_id, gasto_id=gasto.id,
+            tipo=TipoMovimientoCaja.EGRESO, monto=pp.monto_pesos, fecha=fecha, concepto=pp.concepto,
+        ))
+        pp.proximo_pago = calcular_proximo_pago(pp.proximo_pago, pp.frecuencia, pp.dia_del_mes)
+    await db.commit()
+
+
+async def _medir(nombre, Session, muni_id, fn):
+    async with Session() as db:
+        await _reset(db, muni_id)
+    async with Session() as db:
+        t0 = time.perf_counter()
+        await fn(db)
+        dt = time.perf_counter() - t0
+    async with Session() as db:
+        pagados = len((await db.execute(select(Gasto.id).where(Gasto.municipio_id == muni_id))).all())
+    print(f"  {nombre:<26} {pagados:>5} pagos en {dt:7.2f}s  -> {pagados / dt:8.0f} pagos/s")
+    return dt
+
+
+async def bench(n: int):
+    engine = create_async_engine(settings.DATABASE_URL)
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    print(f"BD: {settings.DATABASE_URL.split('@')[-1]}  pagos: {n}")
+    async with Session() as db:
+        muni_id, admin_id, ids = await _seed(db, n)
+    try:
+        antes = await _medir("de a uno", Session, muni_id, lambda db: _antes(db, muni_id, admin_id, ids))
+        una = await _medir("set-based (1 transaccion)", Session, muni_id,
+                           lambda db: ejecutar_pagos_masivo(db, muni_id, admin_id, ids, lote=0))
+        lotes = await _medir("set-based (lotes de 500)", Session, muni_id,
+                             lambda db: ejecutar_pagos_masivo(db, muni_id, admin_id, ids, lote=500))
+        print(f"  speedup: x{antes / una:.1f} (1 transaccion), x{antes / lotes:.1f} (lotes)")
+    finally:
+        async with Session() as db:
+            await _reset(db, muni_id)
+            await db.execute(delete(TesoreriaPagoProgramado).where(TesoreriaPagoProgramado.municipio_id == muni_id))
+            await db.execute(delete(Contacto).where(Contacto.municipio_id == muni_id))
+            await db.execute(delete(TesoreriaCaja).where(TesoreriaCaja.municipio_id == muni_id))
+            await db.execute(delete(User).where(User.municipio_id == muni_id))
+            await db.execute(delete(Municipio).where(Municipio.id == muni_id))
+            await db.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(bench(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
@@ -0,0 +1,121 @@
+"""Benchmark del buscador de reclamos: FULLTEXT vs LIKE '%x%' a 200k docs.
+
+Inserta N documentos sinteticos en `reclamo_busqueda` bajo un municipio
+ficticio (id negativo, no choca con datos reales), mide:
+
+  - LIKE: 14 predicados `LIKE '%term%'` en OR sobre el texto (equivalente
+    al scan que hacia get_reclamos, sin contar los JOINs que hacia encima).
+  - FULLTEXT: `buscar_ids()` (MATCH ... AGAINST IN BOOLEAN MODE).
+
+y borra todo al final. Requiere MySQL (en SQLite no hay FULLTEXT).
+
+Ejecutar desde backend/:  python scripts/bench_reclamo_busqueda.py [N]
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, insert, or_, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from core.config import settings
+from core.database import Base
+from models.reclamo_busqueda import ReclamoBusqueda
+from services.reclamo_busqueda import buscar_ids, construir_documento
+
+MUNI_BENCH = -999
+ID_BASE = 900_000_000
+LOTE = 5000
+
+PALABRAS = (
+    "luminaria quemada bache profundo arbol caido poda basura contenedor "
+    "vereda rota cloaca desborde agua perdida semaforo roto plaza juegos "
+    "ruido molestia animal suelto calle anegada zanja limpieza escombros"
+).split()
+CALLES = ["san martin", "belgrano", "rivadavia", "mitre", "sarmiento", "moreno", "alem", "urquiza"]
+NOMBRES = ["juan", "maria", "carlos", "ana", "pedro", "lucia", "jorge", "sofia", "diego", "laura"]
+APELLIDOS = ["gomez", "perez", "rodriguez", "fernandez", "lopez", "diaz", "martinez", "garcia"]
+CATEGORIAS = ["alumbrado", "bacheo", "arbolado", "residuos", "cloacas", "transito"]
+
+BUSQUEDAS = ["luminaria", "san martin 1200", "gomez", "345678", "bache vereda", "sofia diaz"]
+
+
+def _doc(i: int) -> dict:
+    r = random.Random(i)
+    rid = ID_BASE + i
+    documento, ngramas = construir_documento(
+        rid,
+        titulo=" ".join(r.sample(PALABRAS, 3)),
+        descripcion=" ".join(r.choices(PALABRAS, k=25)),
+        direccion=f"{r.choice(CALLES)} {r.randint(1, 4000)}",
+        nombre=r.choice(NOMBRES), apellido=r.choice(APELLIDOS),
+        email=f"vecino{i}@mail.com",
+        telefono=f"11{r.randint(10000000, 99999999)}",
+        dni=str(r.randint(10000000, 45000000)),
+        categoria=r.choice(CATEGORIAS),
+    )
+    return {"reclamo_id": rid, "municipio_id": MUNI_BENCH, "documento": documento, "ngramas": ngramas}
+
+
+async def _timeit(fn, repeticiones=5):
+    tiempos = []
+    n = 0
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        n = await fn()
+        tiempos.append(time.perf_counter() - t0)
+    return min(tiempos), sum(tiempos) / len(tiempos), n
+
+
+async def bench(n: int):
+    engine = create_async_engine(settings.DATABASE_URL)
+    if engine.dialect.name != "mysql":
+        print("Este benchmark requiere MySQL (FULLTEXT).")
+        return
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: Base.metadata.create_all(c, tables=[ReclamoBusqueda.__table__]))
+
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with Session() as db:
+        await db.execute(delete(ReclamoBusqueda).where(ReclamoBusqueda.municipio_id == MUNI_BENCH))
+        print(f"Insertando {n} documentos...")
+        t0 = time.perf_counter()
+        for i in range(0, n, LOTE):
+            await db.execute(insert(ReclamoBusqueda), [_doc(j) for j in range(i, min(i + LOTE, n))])
+        await db.commit()
+        print(f"  {time.perf_counter() - t0:.1f}s")
+
+        print("=" * 64)
+        print(f"{'busqueda':<20}{'LIKE min/avg (ms)':>22}{'FULLTEXT min/avg (ms)':>22}")
+        print("=" * 64)
+        for termino in BUSQUEDAS:
+            like = f"%{termino}%"
+
+            async def _like(like=like):
+                q = select(ReclamoBusqueda.reclamo_id).where(
+                    ReclamoBusqueda.municipio_id == MUNI_BENCH,
+                    or_(*([ReclamoBusqueda.documento.like(like)] * 12 + [ReclamoBusqueda.ngramas.like(like)] * 2)),
+                ).order_by(ReclamoBusqueda.reclamo_id.desc()).limit(20)
+                return len((await db.execute(q)).all())
+
+            async def _ft(termino=termino):
+                return len(await buscar_ids(db, MUNI_BENCH, termino))
+
+            l_min, l_avg, _ = await _timeit(_like)
+            f_min, f_avg, hits = await _timeit(_ft)
+            print(
+                f"{termino:<20}{l_min * 1000:>10.1f}/{l_avg * 1000:<11.1f}"
+                f"{f_min * 1000:>10.1f}/{f_avg * 1000:<11.1f} ({hits} hits)"
+            )
+
+        await db.execute(delete(ReclamoBusqueda).where(ReclamoBusqueda.municipio_id == MUNI_BENCH))
+        await db.commit()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(bench(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000))
@@ -0,0 +1,125 @@
+"""Benchmark de serialización del listado de OPs: 10k filas.
+
+Arma N OPs sintéticas (sin BD) y mide el armado + encode de la response:
+
+  - pydantic + json: lo que hacía list_ops (model_validate por fila, la
+    validación del response_model de FastAPI y json.dumps).
+  - pydantic + orjson: lo mismo con OrjsonResponse como response_class.
+  - fast path: dicts desde las filas + core.respuestas.dumps (lo que hace
+    list_ops ahora).
+
+y los bytes que viajan sin comprimir, con gzip y con brotli (si está
+instalado), con el tiempo de compresión de cada uno.
+
+Ejecutar desde backend/:  python scripts/bench_serializacion.py [N]
+"""
+import gzip
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import TypeAdapter
+
+from core.config import settings
+from core.respuestas import dumps
+from models.orden_pago import EstadoOrdenPago, EtapaContable
+from schemas.orden_pago import OrdenPagoResponse
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+CONCEPTOS = ["Servicio de poda", "Reparación luminarias", "Combustible", "Materiales bacheo", "Honorarios"]
+PROVEEDORES = ["Ferretería Norte", "Estación YPF Centro", "Podas del Sur SRL", "Luz y Fuerza", "Juan Pérez"]
+
+
+def _fila(i: int) -> dict:
+    r = random.Random(i)
+    emision = date(2026, 1, 1) + timedelta(days=r.randint(0, 300))
+    creado = datetime(2026, 1, 1, 9) + timedelta(minutes=r.randint(0, 400_000))
+    monto = Decimal(r.randint(10_000, 5_000_000)) / 100
+    return {
+        "id": i + 1, "municipio_id": 1, "numero": f"OP-2026-{i + 1:05d}",
+        "destino_tipo": "contacto", "destino_contacto_id": r.randint(1, 400), "destino_dependencia_id": None,
+        "concepto": r.choice(CONCEPTOS), "descripcion": "Según factura adjunta" if i % 3 else None,
+        "monto_pesos": monto, "retenciones": [{"id": 1, "nombre": "Ganancias", "porcentaje": 2.0, "monto": float(monto) * 0.02}] if i % 4 == 0 else None,
+        "monto_neto": monto, "caja_id": r.randint(1, 5),
+        "fecha_emision": emision, "fecha_vencimiento": emision + timedelta(days=30),
+        "nro_factura": f"A-0001-{r.randint(1, 99999999):08d}", "factura_url": None,
+        "codigo_imputacion": "3.4.9", "imputacion_descripcion": "Otros servicios",
+        "tipo_pago": "transferencia", "nro_comprobante_pago": None, "cuenta_destino": None,
+        "contaduria_nombre": None, "secretario_nombre": None, "intendente_nombre": None, "notas": None,
+        "estado": r.choice(list(EstadoOrdenPago)), "etapa_contable": r.choice(list(EtapaContable)),
+        "fecha_autorizacion": creado, "fecha_pago": None, "fecha_anulacion": None, "fecha_devengado": None,
+        "creador_id": 1, "autorizado_por_id": 2, "anulado_por_id": None, "gasto_id": None, "motivo_anulacion": None,
+        "created_at": creado, "updated_at": creado,
+        "contacto_nombre": r.choice(PROVEEDORES), "dependencia_nombre": None, "caja_nombre": "Caja principal",
+        "creador_nombre": "Contadora Gómez", "autorizado_por_nombre": "Secretario López",
+    }
+
+
+def _timeit(fn, repeticiones=5):
+    tiempos = []
+    resultado = None
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        resultado = fn()
+        tiempos.append(time.perf_counter() - t0)
+    return min(tiempos), resultado
+
+
+def bench(n: int):
+    filas = [_fila(i) for i in range(n)]
+    objetos = [SimpleNamespace(**f) for f in filas]
+    adapter = TypeAdapter(List[OrdenPagoResponse])
+
+    def pydantic_json():
+        validadas = adapter.validate_python([OrdenPagoResponse.model_validate(o) for o in objetos])
+        contenido = adapter.dump_python(validadas, mode="json")
+        return json.dumps(contenido, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+    def pydantic_orjson():
+        validadas = adapter.validate_python([OrdenPagoResponse.model_validate(o) for o in objetos])
+        return dumps(adapter.dump_python(validadas, mode="json"))
+
+    def fast_path():
+        return dumps([dict(f) for f in filas])
+
+    print("=" * 64)
+    print(f"{f'{n} OPs':<30}{'encode (ms)':>14}{'bytes':>20}")
+    print("=" * 64)
+    cuerpo = b""
+    for nombre, fn in (("pydantic + json", pydantic_json), ("pydantic + orjson", pydantic_orjson), ("fast path", fast_path)):
+        segundos, cuerpo = _timeit(fn)
+        print(f"{nombre:<30}{segundos * 1000:>14.1f}{len(cuerpo):>20,}")
+
+    # Mismo contenido en las tres variantes (salvo orden de claves)
+    assert json.loads(pydantic_json()) == json.loads(cuerpo)
+
+    print("-" * 64)
+    print(f"{'en el cable':<30}{'comprimir (ms)':>14}{'bytes':>20}")
+    print("-" * 64)
+    compresores = [("gzip nivel %d" % settings.COMPRESION_GZIP_NIVEL,
+                    lambda: gzip.compress(cuerpo, compresslevel=settings.COMPRESION_GZIP_NIVEL))]
+    if brotli is not None:
+        compresores.append(("brotli calidad %d" % settings.COMPRESION_BROTLI_CALIDAD,
+                            lambda: brotli.compress(cuerpo, quality=settings.COMPRESION_BROTLI_CALIDAD)))
+    else:
+        print("(Brotli no instalado: solo gzip)")
+    print(f"{'sin comprimir':<30}{'-':>14}{len(cuerpo):>20,}")
+    for nombre, fn in compresores:
+        segundos, comprimido = _timeit(fn)
+        print(f"{nombre:<30}{segundos * 1000:>14.1f}{len(comprimido):>20,}  ({len(cuerpo) / len(comprimido):.1f}x)")
+
+
+if __name__ == "__main__":
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
@@ -0,0 +1,43 @@
+"""Crea la tabla `background_jobs` (framework de jobs en segundo plano).
+
+Si la tabla ya existia agrega `heartbeat_at` (latido del executor, lo usa el
+barrido de jobs huerfanos). Idempotente.
+
+Ejecutar desde backend/:
+    python scripts/migrate_background_jobs.py
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from core.config import settings
+from core.database import Base
+import models  # noqa: F401
+from models.background_job import BackgroundJob
+
+
+async def migrate():
+    engine = create_async_engine(settings.DATABASE_URL)
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            lambda c: Base.metadata.create_all(c, tables=[BackgroundJob.__table__])
+        )
+        print("  = background_jobs OK (create_all, IF NOT EXISTS)")
+        columnas = await conn.run_sync(
+            lambda c: {col["name"] for col in inspect(c).get_columns("background_jobs")}
+        )
+        if "heartbeat_at" not in columnas:
+            await conn.execute(text("ALTER TABLE background_jobs ADD COLUMN heartbeat_at DATETIME NULL"))
+            print("  + background_jobs.heartbeat_at")
+        else:
+            print("  = background_jobs.heartbeat_at ya existe")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -0,0 +1,38 @@
+"""Migración: columnas `aliases` y `poligono` (JSON) en `barrios`.
+
+Las usa el índice del detector de barrios (services/barrio_detector):
+aliases entran al autómata de nombres y poligono al point-in-polygon.
+Los polígonos se cargan con POST /tesoreria/import/kmz-barrios.
+
+Idempotente: chequea information_schema antes de cada ALTER.
+
+Ejecutar desde backend/:  python scripts/migrate_barrios_poligonos.py
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import text  # noqa: E402
+from core.database import engine  # noqa: E402
+
+COLUMNAS = ("aliases", "poligono")
+
+
+async def migrate():
+    async with engine.begin() as conn:
+        for columna in COLUMNAS:
+            existe = (await conn.execute(text(
+                "SELECT COUNT(*) FROM information_schema.columns "
+                "WHERE table_schema = DATABASE() AND table_name = 'barrios' AND column_name = :c"
+            ), {"c": columna})).scalar()
+            if existe:
+                print(f"SKIP: barrios.{columna} ya existe")
+                continue
+            await conn.execute(text(f"ALTER TABLE barrios ADD COLUMN {columna} JSON NULL"))
+            print(f"OK: barrios.{columna} creada")
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
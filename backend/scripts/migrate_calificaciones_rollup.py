@@ -0,0 +1,88 @@
+"""Crea `calificacion_tags` y los rollups diarios de calificaciones y los llena.
+
+- Índice por created_at en `calificaciones` (ventanas cortas de estadísticas).
+- `calificacion_tags`: normaliza el CSV de `Calificacion.tags`.
+- `calificaciones_diarias` / `calificaciones_tags_diarias`: backfill completo.
+
+Después de esto el listener de services/calificaciones_stats y la tarea
+"calificaciones.rollup" del scheduler los mantienen solos. Se puede volver
+a correr.
+
+Ejecutar desde backend/:
+    python scripts/migrate_calificaciones_rollup.py
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, insert, select, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from core.config import settings
+from core.database import Base
+import models  # noqa: F401
+from models.calificacion import (
+    Calificacion,
+    CalificacionDiaria,
+    CalificacionTag,
+    CalificacionTagDiaria,
+)
+from services.calificaciones_stats import parsear_tags, reconstruir_rollup
+
+LOTE = 5000
+
+
+async def migrate():
+    engine = create_async_engine(settings.DATABASE_URL)
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: Base.metadata.create_all(c, tables=[
+            CalificacionTag.__table__,
+            CalificacionDiaria.__table__,
+            CalificacionTagDiaria.__table__,
+        ]))
+        print("  = calificacion_tags / calificaciones_diarias / calificaciones_tags_diarias OK")
+
+        existe = (await conn.execute(text(
+            "SELECT COUNT(*) FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = 'calificaciones' "
+            "AND index_name = 'ix_calificaciones_created_at'"
+        ))).scalar()
+        if not existe:
+            await conn.execute(text(
+                "CREATE INDEX ix_calificaciones_created_at ON calificaciones (created_at)"
+            ))
+            print("  + índice ix_calificaciones_created_at")
+
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with Session() as db:
+        t0 = time.perf_counter()
+        await db.execute(delete(CalificacionTag))
+        ultimo, total = 0, 0
+        while True:
+            rows = (await db.execute(
+                select(Calificacion.id, Calificacion.tags)
+                .where(Calificacion.id > ultimo, Calificacion.tags.isnot(None))
+                .order_by(Calificacion.id)
+                .limit(LOTE)
+            )).all()
+            if not rows:
+                break
+            filas = [{"calificacion_id": cid, "tag": t} for cid, tags in rows for t in parsear_tags(tags)]
+            if filas:
+                await db.execute(insert(CalificacionTag), filas)
+            total += len(filas)
+            ultimo = rows[-1][0]
+        await db.commit()
+        print(f"  ~ {total} tags normalizados ({time.perf_counter() - t0:.1f}s)")
+
+        t0 = time.perf_counter()
+        await reconstruir_rollup(db)
+        print(f"  ~ rollup diario reconstruido ({time.perf_counter() - t0:.1f}s)")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -0,0 +1,61 @@
+"""Cuenta corriente de contactos (services/cuenta_corriente.py).
+
+  - ordenes_pago(destino_contacto_id, fecha_emision, id) -> OPs del contacto por keyset
+  - tabla contacto_cuenta_corriente (snapshot de totales) + llenado inicial
+
+Después el listener after_flush sobre OrdenPago mantiene los totales.
+Idempotente: chequea information_schema antes del CREATE INDEX y la tabla
+se crea con create_all (IF NOT EXISTS). Se puede volver a correr.
+
+Ejecutar desde backend/:  python scripts/migrate_cuenta_corriente.py
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from core.config import settings
+from core.database import Base
+import models  # noqa: F401
+from models.orden_pago import ContactoCuentaCorriente
+from services.cuenta_corriente import reconstruir
+
+
+async def _index_existe(conn, tabla, idx):
+    r = await conn.execute(text(
+        "SELECT COUNT(*) FROM information_schema.statistics "
+        "WHERE table_schema = DATABASE() AND table_name = :t AND index_name = :i"
+    ), {"t": tabla, "i": idx})
+    return (r.scalar() or 0) > 0
+
+
+async def migrate():
+    engine = create_async_engine(settings.DATABASE_URL)
+    async with engine.begin() as conn:
+        if await _index_existe(conn, "ordenes_pago", "ix_op_contacto_fecha"):
+            print("  = ix_op_contacto_fecha ya existe")
+        else:
+            print("  + ix_op_contacto_fecha ON ordenes_pago(destino_contacto_id, fecha_emision, id)")
+            await conn.execute(text(
+                "CREATE INDEX ix_op_contacto_fecha ON ordenes_pago(destino_contacto_id, fecha_emision, id)"
+            ))
+        await conn.run_sync(
+            lambda c: Base.metadata.create_all(c, tables=[ContactoCuentaCorriente.__table__])
+        )
+        print("  = contacto_cuenta_corriente OK (create_all, IF NOT EXISTS)")
+
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with Session() as db:
+        t0 = time.perf_counter()
+        total = await reconstruir(db)
+        print(f"  ~ {total} contactos con totales en {time.perf_counter() - t0:.1f}s")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -0,0 +1,44 @@
+"""Índices para el motor de disponibilidad (services/disponibilidad.py).
+
+El motor trae de una vez los reclamos y OTs programados de un municipio
+en un rango de fechas: (municipio_id, fecha_programada) en `reclamos` y
+`ordenes_trabajo`. Se puede volver a correr.
+
+Ejecutar desde backend/:
+    python scripts/migrate_disponibilidad_indices.py
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from core.config import settings
+
+INDICES = [
+    ("reclamos", "ix_reclamos_muni_programada", "municipio_id, fecha_programada"),
+    ("ordenes_trabajo", "ix_ot_muni_programada", "municipio_id, fecha_programada"),
+]
+
+
+async def migrate():
+    engine = create_async_engine(settings.DATABASE_URL)
+    async with engine.begin() as conn:
+        for tabla, indice, columnas in INDICES:
+            existe = (await conn.execute(text(
+                "SELECT COUNT(*) FROM information_schema.statistics "
+                "WHERE table_schema = DATABASE() AND table_name = :tabla AND index_name = :indice"
+            ), {"tabla": tabla, "indice": indice})).scalar()
+            if existe:
+                print(f"  = {indice} ya existe")
+                continue
+            await conn.execute(text(f"CREATE INDEX {indice} ON {tabla} ({columnas})"))
+            print(f"  + índice {indice}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
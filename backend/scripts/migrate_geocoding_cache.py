@@ -0,0 +1,36 @@
+"""Cache persistente de geocoding (services/geocoding).
+
+  - tabla geocoding_cache (clave sha256 de la consulta normalizada -> JSON
+    de Nominatim/Overpass, con expira_at indexado para la purga)
+
+Idempotente: create_all con IF NOT EXISTS. Se puede volver a correr.
+La purga de vencidos la hace el scheduler ("geocoding.purgar", diaria).
+
+Ejecutar desde backend/:  python scripts/migrate_geocoding_cache.py
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from core.config import settings
+from core.database import Base
+import models  # noqa: F401
+from models.geocoding_cache import GeocodingCache
+
+
+async def migrate():
+    engine = create_async_engine(settings.DATABASE_URL)
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            lambda c: Base.metadata.create_all(c, tables=[GeocodingCache.__table__])
+        )
+        print("  = geocoding_cache OK (create_all, IF NOT EXISTS)")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -0,0 +1,53 @@
+"""Indices compuestos para la paginacion keyset (core/pagination.py).
+
+  - reclamos(municipio_id, created_at, id)      -> GET /api/reclamos
+  - solicitudes(municipio_id, created_at, id)   -> GET /api/tramites/gestion/solicitudes
+  - notificaciones(usuario_id, created_at, id)  -> GET /api/notificaciones
+  - notificaciones(usuario_id, leida)           -> badge de no leidas
+
+Idempotente: chequea information_schema antes de cada CREATE INDEX.
+Ejecutar desde backend/:  python scripts/migrate_keyset_indexes.py
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy import text
+
+from core.config import settings
+
+
+INDICES = [
+    ("reclamos", "ix_reclamos_muni_created", "municipio_id, created_at, id"),
+    ("solicitudes", "ix_solicitudes_muni_created", "municipio_id, created_at, id"),
+    ("notificaciones", "ix_notif_usuario_created", "usuario_id, created_at, id"),
+    ("notificaciones", "ix_notif_usuario_leida", "usuario_id, leida"),
+]
+
+
+async def _index_existe(conn, tabla, idx):
+    r = await conn.execute(text(
+        "SELECT COUNT(*) FROM information_schema.statistics "
+        "WHERE table_schema = DATABASE() AND table_name = :t AND index_name = :i"
+    ), {"t": tabla, "i": idx})
+    return (r.scalar() or 0) > 0
+
+
+async def migrate():
+    engine = create_async_engine(settings.DATABASE_URL)
+    async with engine.begin() as conn:
+        for tabla, idx, cols in INDICES:
+            if await _index_existe(conn, tabla, idx):
+                print(f"  = {idx} ya existe")
+            else:
+                print(f"  + {idx} ON {tabla}({cols})")
+                await conn.execute(text(f"CREATE INDEX {idx} ON {tabla}({cols})"))
+    await engine.dispose()
+    print("OK")
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -0,0 +1,35 @@
+"""Crea la tabla del outbox transaccional (services/outbox/):
+
+  - outbox_eventos   un evento por (tipo, handler) con lease, reintentos y
+                     dead letter (fallido_at)
+
+Idempotente (create_all, IF NOT EXISTS). Las notificaciones que estaban en
+vuelo como tareas asyncio al momento del deploy no se recuperan.
+
+Ejecutar desde backend/:
+    python scripts/migrate_outbox.py
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from core.config import settings
+from core.database import Base
+import models  # noqa: F401
+from models.outbox_evento import OutboxEvento
+
+
+async def migrate():
+    engine = create_async_engine(settings.DATABASE_URL)
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: Base.metadata.create_all(c, tables=[OutboxEvento.__table__]))
+        print("  = outbox_eventos OK (create_all, IF NOT EXISTS)")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
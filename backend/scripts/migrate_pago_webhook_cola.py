@@ -0,0 +1,71 @@
+"""Migración: columnas de cola en `pago_webhook_eventos` (worker de webhooks).
+
+- firma_header / request_id: headers de firma para validar en el worker.
+- intentos / proximo_intento_at / tomado_por / tomado_hasta / fallido_at:
+  lease y backoff de services/pagos/webhook_worker.py.
+- Índice ix_pwe_pendientes para el SELECT ... SKIP LOCKED del worker.
+
+Los eventos viejos con procesado_at NULL (consultas al provider que
+fallaron antes de esta migración) los retoma el worker al arrancar; si
+siguen fallando terminan en fallido_at. Idempotente.
+
+Ejecutar desde backend/:
+    python scripts/migrate_pago_webhook_cola.py
+"""
+import asyncio
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import text  # noqa: E402
+from core.database import engine  # noqa: E402
+
+COLUMNAS = [
+    ("firma_header", "VARCHAR(255) NULL"),
+    ("request_id", "VARCHAR(100) NULL"),
+    ("intentos", "INT NOT NULL DEFAULT 0"),
+    ("proximo_intento_at", "DATETIME NULL"),
+    ("tomado_por", "VARCHAR(40) NULL"),
+    ("tomado_hasta", "DATETIME NULL"),
+    ("fallido_at", "DATETIME NULL"),
+]
+
+
+async def migrate():
+    async with engine.begin() as conn:
+        for nombre, ddl in COLUMNAS:
+            existe = (await conn.execute(text(
+                "SELECT COUNT(*) FROM information_schema.columns "
+                "WHERE table_schema = DATABASE() AND table_name = 'pago_webhook_eventos' "
+                "AND column_name = :c"
+            ), {"c": nombre})).scalar()
+            if existe:
+                print(f"SKIP: columna {nombre} ya existe")
+                continue
+            await conn.execute(text(f"ALTER TABLE pago_webhook_eventos ADD COLUMN {nombre} {ddl}"))
+            print(f"OK: columna {nombre}")
+
+        existe = (await conn.execute(text(
+            "SELECT COUNT(*) FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = 'pago_webhook_eventos' "
+            "AND index_name = 'ix_pwe_pendientes'"
+        ))).scalar()
+        if not existe:
+            await conn.execute(text(
+                "CREATE INDEX ix_pwe_pendientes ON pago_webhook_eventos "
+                "(procesado_at, fallido_at, proximo_intento_at)"
+            ))
+            print("OK: indice ix_pwe_pendientes")
+        else:
+            print("SKIP: indice ix_pwe_pendientes ya existe")
+
+        pendientes = (await conn.execute(text(
+            "SELECT COUNT(*) FROM pago_webhook_eventos WHERE procesado_at IS NULL"
+        ))).scalar()
+        print(f"Eventos pendientes que va a tomar el worker: {pendientes}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -0,0 +1,45 @@
+"""Crea `reclamo_busqueda` (FULLTEXT) y la llena con todos los reclamos.
+
+Despues de esto el listener de services/reclamo_busqueda la mantiene sola.
+Se puede volver a correr para reconstruir el indice completo (ej. despues
+de cambiar `construir_documento`).
+
+Ejecutar desde backend/:
+    python scripts/migrate_reclamo_busqueda.py            # todos los municipios
+    python scripts/migrate_reclamo_busqueda.py 48         # solo municipio 48
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from core.config import settings
+from core.database import Base
+import models  # noqa: F401
+from models.reclamo_busqueda import ReclamoBusqueda
+from services.reclamo_busqueda import reindexar_municipio
+
+
+async def migrate(municipio_id=None):
+    engine = create_async_engine(settings.DATABASE_URL)
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            lambda c: Base.metadata.create_all(c, tables=[ReclamoBusqueda.__table__])
+        )
+        print("  = reclamo_busqueda OK (create_all, IF NOT EXISTS)")
+
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    t0 = time.perf_counter()
+    async with Session() as db:
+        total = await reindexar_municipio(db, municipio_id)
+    print(f"  ~ {total} reclamos indexados en {time.perf_counter() - t0:.1f}s")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    muni = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    asyncio.run(migrate(muni))
@@ -0,0 +1,35 @@
+"""Snapshots del reporte ejecutivo mensual (services/reportes_mensuales).
+
+  - tabla reportes_mensuales (métricas JSON por municipio y mes, única por
+    (municipio_id, anio, mes); los meses cerrados no se recalculan)
+
+Idempotente: create_all con IF NOT EXISTS. Se puede volver a correr.
+
+Ejecutar desde backend/:  python scripts/migrate_reportes_mensuales.py
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from core.config import settings
+from core.database import Base
+import models  # noqa: F401
+from models.reporte_mensual import ReporteMensual
+
+
+async def migrate():
+    engine = create_async_engine(settings.DATABASE_URL)
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            lambda c: Base.metadata.create_all(c, tables=[ReporteMensual.__table__])
+        )
+        print("  = reportes_mensuales OK (create_all, IF NOT EXISTS)")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
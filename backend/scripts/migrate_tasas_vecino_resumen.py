@@ -0,0 +1,46 @@
+"""Crea `tasas_vecino_resumen`, vence las deudas atrasadas y llena los resúmenes.
+
+Después de esto el scheduler (tarea "tasas.vencimientos") y el listener de
+services/tasas_resumen los mantienen solos. Se puede volver a correr.
+
+Ejecutar desde backend/:
+    python scripts/migrate_tasas_vecino_resumen.py
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from core.config import settings
+from core.database import Base
+import models  # noqa: F401
+from models.tasas import VecinoDeudaResumen
+from services.tasas_resumen import barrer_vencimientos, recalcular_todos
+
+
+async def migrate():
+    engine = create_async_engine(settings.DATABASE_URL)
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            lambda c: Base.metadata.create_all(c, tables=[VecinoDeudaResumen.__table__])
+        )
+        print("  = tasas_vecino_resumen OK (create_all, IF NOT EXISTS)")
+
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with Session() as db:
+        t0 = time.perf_counter()
+        vencidas = await barrer_vencimientos(db)
+        print(f"  ~ {sum(vencidas.values())} deudas vencidas en {len(vencidas)} municipios "
+              f"({time.perf_counter() - t0:.1f}s)")
+        t0 = time.perf_counter()
+        total = await recalcular_todos(db)
+        print(f"  ~ {total} resúmenes de vecino en {time.perf_counter() - t0:.1f}s")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -0,0 +1,39 @@
+"""Crea las tablas de la ingesta de WhatsApp (services/whatsapp/ingesta.py):
+
+  - whatsapp_conversaciones       estado del chatbot + lease por teléfono
+  - whatsapp_mensajes_entrantes   cola de mensajes (UNIQUE provider+message_id)
+
+Idempotente (create_all, IF NOT EXISTS). Las conversaciones en curso al
+momento del deploy vivían en memoria: los vecinos arrancan de nuevo con "hola".
+
+Ejecutar desde backend/:
+    python scripts/migrate_whatsapp_ingesta.py
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from core.config import settings
+from core.database import Base
+import models  # noqa: F401
+from models.whatsapp_mensaje import WhatsAppConversacion, WhatsAppMensajeEntrante
+
+
+async def migrate():
+    engine = create_async_engine(settings.DATABASE_URL)
+    async with engine.begin() as conn:
+        await conn.run_sync(
+            lambda c: Base.metadata.create_all(
+                c, tables=[WhatsAppConversacion.__table__, WhatsAppMensajeEntrante.__table__]
+            )
+        )
+        print("  = whatsapp_conversaciones / whatsapp_mensajes_entrantes OK (create_all, IF NOT EXISTS)")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
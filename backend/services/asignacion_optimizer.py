@@ -0,0 +1,553 @@
+"""Optimizador de asignaciones reclamo -> empleado para un día.
+
+Antes `/turnos/optimizar-asignaciones` traía los reclamos `nuevo` de TODOS
+los municipios, recorría cada uno contra cada empleado con un score a mano
+(tocando `reclamo.categoria` en forma lazy por ítem) y descontaba un 11.1%
+fijo de ocupación por sugerencia: O(reclamos x empleados) y un reparto
+greedy que se quedaba con los mejores empleados para los primeros reclamos.
+
+Ahora el problema se resuelve como asignación de costo mínimo con cupos:
+
+  - Costo de un par (reclamo, empleado) = especialidad (categoría) +
+    distancia (coordenadas del reclamo vs centro de la zona del empleado,
+    o misma zona) + carga (ocupación del día y reclamos activos contra
+    `capacidad_maxima`).
+  - Dejar un reclamo sin asignar cuesta `costo_no_asignar`, que crece con
+    la prioridad y con lo consumido de su SLA de respuesta: si el cupo no
+    alcanza, quedan afuera los menos urgentes.
+  - Cupo de cada empleado = tareas de DURACION_TAREA_DEFAULT que entran en
+    sus huecos libres del día (services/disponibilidad.py).
+
+El costo se arma por CLASE de reclamo (categoría x celda de ubicación), no
+por par: los reclamos de una misma clase comparten el vector de costos
+contra los empleados y su lista de candidatos (los más baratos, con cupo
+suficiente para toda la clase).
+
+Solver: si scipy está instalado y la matriz expandida (reclamos x cupos)
+es chica, `linear_sum_assignment` (óptimo exacto). Si no, un algoritmo de
+subasta (Bertsekas) sobre los candidatos, en Python puro: queda a menos
+de settings.ASIGNACION_EPSILON por reclamo del óptimo. Si hay más reclamos
+que cupo, entran al problema los más urgentes (los demás quedan sin
+asignar): es la regla que espera un supervisor y evita la guerra de
+precios para descartar al resto.
+
+`aplicar_plan()` guarda el plan con un solo UPDATE (CASE por id) que sólo
+toca reclamos que sigan sin empleado.
+"""
+import heapq
+import logging
+import time as _time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timezone
+from math import cos, radians, sqrt
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import case, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from models.categoria_reclamo import CategoriaReclamo
+from models.enums import EstadoReclamo
+from models.reclamo import Reclamo
+from models.sla import SLAConfig
+from models.zona import Zona
+from services import consultas_cache, disponibilidad, mapa_tiles
+from services.disponibilidad import DIA_COMPLETO, DURACION_TAREA_DEFAULT, carga_pendiente, hhmm
+
+logger = logging.getLogger(__name__)
+
+# Pesos del costo (puntos). Un reclamo sin asignar cuesta más que cualquier
+# asignación razonable, así que se asigna siempre que haya cupo.
+COSTO_SIN_CATEGORIA = 60.0       # el empleado atiende otras categorías
+COSTO_SIN_ESPECIALIDAD = 30.0    # el empleado no tiene categorías cargadas
+COSTO_KM = 4.0
+COSTO_DISTANCIA_MAX = 40.0
+COSTO_UBICACION_DESCONOCIDA = 10.0
+COSTO_OCUPACION = 20.0           # por jornada del día ya ocupada (0..1)
+COSTO_CARGA = 10.0               # por capacidad_maxima ya tomada (0..1)
+NO_ASIGNAR_BASE = 150.0
+NO_ASIGNAR_PRIORIDAD = 10.0      # por nivel de prioridad (1 = más urgente)
+NO_ASIGNAR_SLA = 20.0            # por SLA de respuesta consumido (tope x3)
+
+# Celda para agrupar reclamos por ubicación (~1 km)
+CELDA_GRADOS = 0.01
+
+ESTADOS_PENDIENTES = [
+    EstadoReclamo.NUEVO,
+    EstadoReclamo.RECIBIDO,
+    EstadoReclamo.POSPUESTO,
+    EstadoReclamo.ASIGNADO,   # legacy: asignado a dependencia, sin empleado
+]
+
+
+@dataclass
+class Tarea:
+    reclamo_id: int
+    titulo: str
+    categoria_id: Optional[int]
+    categoria: Optional[str] = None
+    prioridad: int = 3
+    zona_id: Optional[int] = None
+    latitud: Optional[float] = None
+    longitud: Optional[float] = None
+    urgencia: float = 0.0            # fracción del SLA de respuesta consumida
+
+    @property
+    def costo_no_asignar(self) -> float:
+        return (
+            NO_ASIGNAR_BASE
+            + NO_ASIGNAR_PRIORIDAD * (6 - max(1, min(5, self.prioridad or 3)))
+            + NO_ASIGNAR_SLA * min(self.urgencia, 3.0)
+        )
+
+    @property
+    def clase(self) -> Tuple:
+        if self.latitud is not None and self.longitud is not None:
+            celda = (round(self.latitud / CELDA_GRADOS), round(self.longitud / CELDA_GRADOS))
+        else:
+            celda = None
+        return (self.categoria_id, self.zona_id, celda)
+
+
+@dataclass
+class Recurso:
+    empleado_id: int
+    nombre: str
+    especialidad: Optional[str] = None
+    categoria_ids: Set[int] = field(default_factory=set)
+    zona_id: Optional[int] = None
+    latitud: Optional[float] = None
+    longitud: Optional[float] = None
+    cupo: int = 0
+    ocupacion: float = 0.0           # jornada del día ya ocupada (0..1)
+    carga: float = 0.0               # capacidad_maxima ya tomada (0..1)
+    libres: List[Tuple[int, int]] = field(default_factory=list)
+
+
+@dataclass
+class Asignacion:
+    tarea: Tarea
+    recurso: Recurso
+    costo: float
+    desglose: Dict[str, float]
+    hora_inicio: Optional[str] = None
+    hora_fin: Optional[str] = None
+    # Minutos desde las 00:00; fin puede ser 1440 (turno noche hasta las 24)
+    minuto_inicio: Optional[int] = None
+    minuto_fin: Optional[int] = None
+
+    @property
+    def score(self) -> float:
+        """Ahorro frente a dejarlo sin asignar (más alto = mejor par)."""
+        return round(self.tarea.costo_no_asignar - self.costo, 1)
+
+
+@dataclass
+class Plan:
+    fecha: date
+    asignaciones: List[Asignacion]
+    sin_asignar: List[Tarea]
+    solver: str
+    ms: float
+
+    @property
+    def costo_total(self) -> float:
+        return round(
+            sum(a.costo for a in self.asignaciones) + sum(t.costo_no_asignar for t in self.sin_asignar), 1
+        )
+
+
+# ============================================================
+# Costos
+# ============================================================
+
+def _km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Distancia equirectangular: sobra precisión a escala de un municipio."""
+    x = radians(lon2 - lon1) * cos(radians((lat1 + lat2) / 2))
+    y = radians(lat2 - lat1)
+    return 6371.0 * sqrt(x * x + y * y)
+
+
+def _costo_ubicacion(tarea: Tarea, recurso: Recurso) -> float:
+    if tarea.latitud is not None and recurso.latitud is not None:
+        return min(COSTO_DISTANCIA_MAX, COSTO_KM * _km(tarea.latitud, tarea.longitud, recurso.latitud, recurso.longitud))
+    if tarea.zona_id is not None and recurso.zona_id is not None:
+        return 0.0 if tarea.zona_id == recurso.zona_id else COSTO_DISTANCIA_MAX / 2
+    return COSTO_UBICACION_DESCONOCIDA
+
+
+def _costo_especialidad(tarea: Tarea, recurso: Recurso) -> float:
+    if not recurso.categoria_ids:
+        return COSTO_SIN_ESPECIALIDAD
+    return 0.0 if tarea.categoria_id in recurso.categoria_ids else COSTO_SIN_CATEGORIA
+
+
+def desglose(tarea: Tarea, recurso: Recurso) -> Dict[str, float]:
+    return {
+        "especialidad": _costo_especialidad(tarea, recurso),
+        "distancia": round(_costo_ubicacion(tarea, recurso), 1),
+        "carga": round(COSTO_OCUPACION * recurso.ocupacion + COSTO_CARGA * recurso.carga, 1),
+    }
+
+
+def _vectores_por_clase(tareas: Sequence[Tarea], recursos: Sequence[Recurso]) -> Dict[Tuple, List[float]]:
+    """Costo de cada clase de reclamo contra todos los empleados.
+
+    Especialidad se calcula una vez por categoría, carga una vez por
+    empleado y ubicación una vez por celda: cada vector es una suma
+    elemento a elemento de tres listas.
+    """
+    carga = [COSTO_OCUPACION * r.ocupacion + COSTO_CARGA * r.carga for r in recursos]
+    por_categoria: Dict[Optional[int], List[float]] = {}
+    por_ubicacion: Dict[Tuple, List[float]] = {}
+    vectores: Dict[Tuple, List[float]] = {}
+    for tarea in tareas:
+        clase = tarea.clase
+        if clase in vectores:
+            continue
+        esp = por_categoria.get(tarea.categoria_id)
+        if esp is None:
+            esp = por_categoria[tarea.categoria_id] = [_costo_especialidad(tarea, r) for r in recursos]
+        ubicacion = clase[1:]
+        dist = por_ubicacion.get(ubicacion)
+        if dist is None:
+            dist = por_ubicacion[ubicacion] = [_costo_ubicacion(tarea, r) for r in recursos]
+        vectores[clase] = [a + b + c for a, b, c in zip(esp, dist, carga)]
+    return vectores
+
+
+def _candidatos(vector: List[float], recursos: Sequence[Recurso], demanda: int) -> List[int]:
+    """Empleados más baratos para una clase: al menos ASIGNACION_CANDIDATOS
+    y con cupo para el doble de la demanda de la clase."""
+    orden = sorted((j for j, r in enumerate(recursos) if r.cupo > 0), key=vector.__getitem__)
+    minimo = settings.ASIGNACION_CANDIDATOS
+    elegidos, cupo = [], 0
+    for j in orden:
+        elegidos.append(j)
+        cupo += recursos[j].cupo
+        if len(elegidos) >= minimo and cupo >= 2 * demanda:
+            break
+    return elegidos
+
+
+# ============================================================
+# Solvers
+# ============================================================
+
+def _subasta(
+    costos_no_asignar: List[float],
+    candidatos: List[List[int]],
+    costos: List[List[float]],
+    cupos: List[int],
+    epsilon: float,
+) -> List[Optional[int]]:
+    """Subasta directa con cupos (objetos "similares" de Bertsekas).
+
+    Cada empleado tiene `cupo` lugares, cada uno con su precio. Un reclamo
+    ofrece por el lugar más barato del empleado que más le conviene y, si
+    estaba ocupado, desplaza a quien lo tenía (que vuelve a la cola).
+    Dejarlo sin asignar vale 0 y no tiene precio. Cada oferta sube un
+    precio en >= epsilon, así que termina; con escalado de epsilon (se
+    arranca grueso y se refina conservando los precios) las guerras de
+    precios duran pocas rondas. El resultado queda a menos de epsilon por
+    reclamo del óptimo.
+    """
+    n = len(candidatos)
+    # heap por empleado de [precio, reclamo] (-1 = lugar libre)
+    lugares: List[List[List[float]]] = [[[0.0, -1] for _ in range(c)] for c in cupos]
+    asignado: List[Optional[int]] = [None] * n
+
+    def ofertar(cola: deque, paso: float) -> None:
+        while cola:
+            i = cola.popleft()
+            u = costos_no_asignar[i]
+            mejor_j, v1, v2 = None, 0.0, 0.0   # la opción "sin asignar" vale 0
+            for j, c in zip(candidatos[i], costos[i]):
+                v = u - c - lugares[j][0][0]
+                if v > v1:
+                    mejor_j, v1, v2 = j, v, v1
+                elif v > v2:
+                    v2 = v
+            if mejor_j is None:
+                asignado[i] = None
+                continue
+            heap = lugares[mejor_j]
+            precio, desplazado = heap[0]
+            heapq.heapreplace(heap, [precio + v1 - v2 + paso, i])
+            if desplazado >= 0:
+                asignado[desplazado] = None
+                cola.append(desplazado)
+            asignado[i] = mejor_j
+
+    def liberar_vacios() -> bool:
+        """Un lugar que nadie tomó no vale nada: precio 0."""
+        cambio = False
+        for heap in lugares:
+            vacios = [lugar for lugar in heap if lugar[1] < 0 and lugar[0] > 0]
+            for lugar in vacios:
+                lugar[0] = 0.0
+            if vacios:
+                heapq.heapify(heap)
+                cambio = True
+        return cambio
+
+    # El escalado sólo vale si se llenan todos los lugares: con cupo de sobra
+    # un lugar que quedó libre con precio viejo no es epsilon-óptimo, y ahí
+    # alcanza con una sola fase desde precios 0 (la competencia es poca).
+    if n < sum(cupos):
+        paso = epsilon
+    else:
+        paso = max(epsilon, max(costos_no_asignar, default=0.0) / 8)
+    while True:
+        for heap in lugares:
+            for lugar in heap:
+                lugar[1] = -1
+        ofertar(deque(range(n)), paso)
+        if paso <= epsilon:
+            break
+        liberar_vacios()
+        paso = max(epsilon, paso / 4)
+
+    # Lugares que quedaron libres con precio de una fase anterior: bajan a 0
+    # y los que quedaron afuera vuelven a ofertar, sin tocar al resto.
+    while liberar_vacios():
+        ofertar(deque(i for i in range(n) if asignado[i] is None), epsilon)
+    return asignado
+
+
+def _scipy(
+    costos_no_asignar: List[float],
+    candidatos: List[List[int]],
+    costos: List[List[float]],
+    cupos: List[int],
+) -> Optional[List[Optional[int]]]:
+    """Óptimo exacto con scipy sobre la matriz expandida; None si no aplica."""
+    try:
+        import numpy as np
+        from scipy.optimize import linear_sum_assignment
+    except ImportError:
+        return None
+    n = len(candidatos)
+    columnas: List[int] = []
+    for j, cupo in enumerate(cupos):
+        columnas.extend([j] * min(cupo, n))
+    if n * (len(columnas) + n) > settings.ASIGNACION_SCIPY_MAX_CELDAS:
+        return None
+    inicio_col: Dict[int, int] = {}
+    for col, j in enumerate(columnas):
+        inicio_col.setdefault(j, col)
+
+    prohibido = max(costos_no_asignar, default=0.0) * 10 + 1
+    matriz = np.full((n, len(columnas) + n), prohibido)
+    for i in range(n):
+        for j, c in zip(candidatos[i], costos[i]):
+            desde = inicio_col[j]
+            matriz[i, desde:desde + min(cupos[j], n)] = c
+    # Columnas "sin asignar": cualquiera sirve a cualquier reclamo
+    matriz[:, len(columnas):] = np.asarray(costos_no_asignar)[:, None]
+
+    filas, cols = linear_sum_assignment(matriz)
+    asignado: List[Optional[int]] = [None] * n
+    for i, col in zip(filas, cols):
+        if col < len(columnas) and matriz[i, col] < prohibido:
+            asignado[i] = columnas[col]
+    return asignado
+
+
+def resolver(tareas: Sequence[Tarea], recursos: Sequence[Recurso]) -> Tuple[List[Optional[int]], str]:
+    """Índice de recurso elegido para cada tarea (None = sin asignar) y solver usado."""
+    elegidos: List[Optional[int]] = [None] * len(tareas)
+    cupo_total = sum(r.cupo for r in recursos)
+    if not tareas or not cupo_total:
+        return elegidos, "vacio"
+
+    # Cualquier asignación cuesta menos que dejar un reclamo afuera, así que
+    # se llenan min(reclamos, cupo) lugares. Si no alcanza, entran los más
+    # urgentes: sin esto la subasta tendría que subir todos los precios hasta
+    # el costo de no asignar para descartar al resto.
+    indices = list(range(len(tareas)))
+    if len(tareas) > cupo_total:
+        indices = sorted(indices, key=lambda i: -tareas[i].costo_no_asignar)[:cupo_total]
+        indices.sort()
+    parcial, solver = _resolver([tareas[i] for i in indices], recursos)
+    for i, j in zip(indices, parcial):
+        elegidos[i] = j
+    return elegidos, solver
+
+
+def _resolver(tareas: Sequence[Tarea], recursos: Sequence[Recurso]) -> Tuple[List[Optional[int]], str]:
+    vectores = _vectores_por_clase(tareas, recursos)
+    demanda: Dict[Tuple, int] = {}
+    for t in tareas:
+        demanda[t.clase] = demanda.get(t.clase, 0) + 1
+    por_clase = {clase: _candidatos(vec, recursos, demanda[clase]) for clase, vec in vectores.items()}
+
+    candidatos = [por_clase[t.clase] for t in tareas]
+    costos = [[vectores[t.clase][j] for j in cand] for t, cand in zip(tareas, candidatos)]
+    no_asignar = [t.costo_no_asignar for t in tareas]
+    cupos = [r.cupo for r in recursos]
+
+    exacto = _scipy(no_asignar, candidatos, costos, cupos)
+    if exacto is not None:
+        return exacto, "scipy"
+    return _subasta(no_asignar, candidatos, costos, cupos, settings.ASIGNACION_EPSILON), "subasta"
+
+
+def _programar(asignaciones: List[Asignacion], duracion: int) -> None:
+    """Ubica las tareas de cada empleado en sus huecos libres, urgentes primero."""
+    por_recurso: Dict[int, List[Asignacion]] = {}
+    for a in asignaciones:
+        por_recurso.setdefault(a.recurso.empleado_id, []).append(a)
+    for lista in por_recurso.values():
+        lista.sort(key=lambda a: (a.tarea.prioridad or 3, -a.tarea.urgencia, a.tarea.reclamo_id))
+        huecos = iter(lista[0].recurso.libres)
+        inicio, fin = next(huecos, (0, 0))
+        for a in lista:
+            while fin - inicio < duracion:
+                siguiente = next(huecos, None)
+                if siguiente is None:
+                    break
+                inicio, fin = siguiente
+            if fin - inicio < duracion:
+                break
+            a.minuto_inicio, a.minuto_fin = inicio, inicio + duracion
+            a.hora_inicio, a.hora_fin = hhmm(inicio), hhmm(inicio + duracion)
+            inicio += duracion
+
+
+# ============================================================
+# Carga desde la BD
+# ============================================================
+
+def _sla_horas(configs: List[SLAConfig], categoria_id: Optional[int], prioridad: Optional[int]) -> int:
+    """Misma precedencia que api/sla.get_sla_for_reclamo, sin ir a la BD."""
+    for cat, prio in ((categoria_id, prioridad), (categoria_id, None), (None, None)):
+        for c in configs:
+            if c.categoria_id == cat and (c.prioridad == prio or (cat is None and prio is None)):
+                return c.tiempo_respuesta or 24
+    return 24
+
+
+async def cargar_tareas(db: AsyncSession, municipio_id: int, fecha: date) -> List[Tarea]:
+    """Reclamos sin empleado del municipio, sin fecha o para `fecha`, más urgentes primero."""
+    rows = (await db.execute(
+        select(
+            Reclamo.id, Reclamo.titulo, Reclamo.categoria_id, CategoriaReclamo.nombre, Reclamo.prioridad,
+            Reclamo.zona_id, Reclamo.latitud, Reclamo.longitud, Reclamo.created_at,
+        )
+        .outerjoin(CategoriaReclamo, CategoriaReclamo.id == Reclamo.categoria_id)
+        .where(
+            Reclamo.municipio_id == municipio_id,
+            Reclamo.empleado_id.is_(None),
+            Reclamo.estado.in_(ESTADOS_PENDIENTES),
+            or_(Reclamo.fecha_programada.is_(None), Reclamo.fecha_programada == fecha),
+        )
+        .order_by(Reclamo.prioridad.asc(), Reclamo.created_at.asc())
+        .limit(settings.ASIGNACION_MAX_RECLAMOS)
+    )).all()
+    configs = (await db.execute(
+        select(SLAConfig).where(SLAConfig.municipio_id == municipio_id, SLAConfig.activo == True)
+    )).scalars().all()
+
+    ahora = datetime.now(timezone.utc)
+    tareas = []
+    for r in rows:
+        creado = r.created_at
+        if creado is not None and creado.tzinfo is None:
+            creado = creado.replace(tzinfo=timezone.utc)
+        horas = (ahora - creado).total_seconds() / 3600 if creado else 0.0
+        tareas.append(Tarea(
+            reclamo_id=r.id, titulo=r.titulo, categoria_id=r.categoria_id, categoria=r.nombre,
+            prioridad=r.prioridad or 3, zona_id=r.zona_id, latitud=r.latitud, longitud=r.longitud,
+            urgencia=max(0.0, horas / _sla_horas(configs, r.categoria_id, r.prioridad)),
+        ))
+    return tareas
+
+
+async def cargar_recursos(db: AsyncSession, municipio_id: int, fecha: date, duracion: int) -> List[Recurso]:
+    """Empleados con huecos del día (motor de disponibilidad), ubicados en el centro de su zona."""
+    dia = await disponibilidad.disponibilidad_dia(db, municipio_id, fecha)
+    carga = await carga_pendiente(db, municipio_id)
+    zonas = {
+        z.id: (z.latitud_centro, z.longitud_centro)
+        for z in (await db.execute(
+            select(Zona.id, Zona.latitud_centro, Zona.longitud_centro).where(Zona.municipio_id == municipio_id)
+        )).all()
+    }
+    recursos = []
+    for emp, d in dia.filtrar():
+        lat, lon = zonas.get(emp.zona_id, (None, None))
+        recursos.append(Recurso(
+            empleado_id=emp.id,
+            nombre=emp.nombre,
+            especialidad=emp.especialidad,
+            categoria_ids=set(emp.categoria_ids),
+            zona_id=emp.zona_id,
+            latitud=lat,
+            longitud=lon,
+            cupo=sum((f - i) // duracion for i, f in d.libres),
+            ocupacion=d.ocupacion / 100,
+            carga=min(1.0, carga.get(emp.id, 0) / emp.capacidad_maxima) if emp.capacidad_maxima else 1.0,
+            libres=list(d.libres),
+        ))
+    return recursos
+
+
+async def armar_plan(
+    db: AsyncSession, municipio_id: int, fecha: date, duracion: int = DURACION_TAREA_DEFAULT,
+) -> Plan:
+    tareas = await cargar_tareas(db, municipio_id, fecha)
+    recursos = await cargar_recursos(db, municipio_id, fecha, duracion)
+
+    t0 = _time.perf_counter()
+    elegidos, solver = resolver(tareas, recursos)
+    asignaciones, sin_asignar = [], []
+    for tarea, j in zip(tareas, elegidos):
+        if j is None:
+            sin_asignar.append(tarea)
+            continue
+        recurso = recursos[j]
+        partes = desglose(tarea, recurso)
+        asignaciones.append(Asignacion(tarea, recurso, round(sum(partes.values()), 1), partes))
+    _programar(asignaciones, duracion)
+    ms = (_time.perf_counter() - t0) * 1000
+
+    asignaciones.sort(key=lambda a: (a.tarea.prioridad or 3, -a.tarea.urgencia))
+    return Plan(fecha=fecha, asignaciones=asignaciones, sin_asignar=sin_asignar, solver=solver, ms=round(ms, 1))
+
+
+def _hora(m: int) -> time:
+    """Minutos a `time`; el fin de día (24:00) queda en 23:59:59.999999."""
+    if m >= DIA_COMPLETO:
+        return time.max
+    return time(m // 60, m % 60)
+
+
+async def aplicar_plan(db: AsyncSession, municipio_id: int, plan: Plan) -> int:
+    """Guarda el plan en un solo UPDATE. Los reclamos que otro ya asignó
+    mientras tanto (empleado_id no nulo) no se pisan; los `nuevo` pasan a
+    `recibido`, como en la asignación manual. Devuelve cuántos se
+    actualizaron."""
+    filas = [a for a in plan.asignaciones if a.minuto_inicio is not None]
+    if not filas:
+        return 0
+    ids = [a.tarea.reclamo_id for a in filas]
+    result = await db.execute(
+        update(Reclamo)
+        .where(Reclamo.id.in_(ids), Reclamo.municipio_id == municipio_id, Reclamo.empleado_id.is_(None))
+        .values(
+            empleado_id=case({a.tarea.reclamo_id: a.recurso.empleado_id for a in filas}, value=Reclamo.id),
+            fecha_programada=plan.fecha,
+            hora_inicio=case({a.tarea.reclamo_id: _hora(a.minuto_inicio) for a in filas}, value=Reclamo.id),
+            hora_fin=case({a.tarea.reclamo_id: _hora(a.minuto_fin) for a in filas}, value=Reclamo.id),
+            estado=case((Reclamo.estado == EstadoReclamo.NUEVO, EstadoReclamo.RECIBIDO), else_=Reclamo.estado),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    # El UPDATE masivo no pasa por la invalidación post-commit de la sesión
+    disponibilidad.invalidar(municipio_id, [plan.fecha])
+    consultas_cache.invalidar(Reclamo.__tablename__, municipio_id)
+    mapa_tiles.invalidar_municipio(municipio_id)
+    return result.rowcount
@@ -2,12 +2,279 @@
 Servicio para detectar/matchear barrio desde una dirección.
 Cuando un vecino ingresa una dirección, extraemos el barrio y lo matcheamos
 con los barrios guardados del municipio.
+
+Antes cada reclamo traía todos los barrios del municipio, normalizaba cada
+nombre y probaba substrings uno por uno; sin match, buscaba el centroide
+más cercano (que asigna mal los reclamos cerca de los límites).
+
+Ahora se arma UNA vez por municipio un `IndiceBarrios` en memoria:
+
+- Autómata Aho-Corasick sobre nombres + aliases normalizados: una sola
+  pasada por la dirección, O(largo de la dirección), encuentra todos los
+  barrios mencionados.
+- Grilla de celdas (settings.BARRIOS_GRILLA_GRADOS) con los polígonos
+  importados del KMZ: un punto sólo se testea (point-in-polygon) contra
+  los barrios cuya bbox toca su celda.
+
+El índice se invalida cuando se guardan barrios del municipio (listener
+invalidación post-commit de core/denormalizacion) y, por las dudas, vence a los
+settings.BARRIOS_INDICE_TTL_S.
 """
-from typing import Optional, Tuple
+import logging
+import time
+from collections import deque
+from math import radians, cos, sin, asin, sqrt
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+
+from core.config import settings
+from core.denormalizacion import Cambios, registrar_invalidacion
 from models.barrio import Barrio
 
+logger = logging.getLogger(__name__)
+
+# Largo mínimo para aceptar un nombre pegado a otras letras (segunda pasada)
+_MIN_SUBSTRING = 5
+# Radio del fallback por centroide (barrios sin polígono)
+_RADIO_CENTROIDE_KM = 5.0
+
+
+# ============================================================
+# Aho-Corasick
+# ============================================================
+
+class AhoCorasick:
+    """Autómata de múltiples patrones: `buscar(texto)` devuelve todas las
+    ocurrencias (inicio, fin, valor) en una sola pasada."""
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._salida: List[List[Tuple[int, object]]] = [[]]
+
+    def agregar(self, patron: str, valor: object) -> None:
+        estado = 0
+        for ch in patron:
+            siguiente = self._goto[estado].get(ch)
+            if siguiente is None:
+                siguiente = len(self._goto)
+                self._goto[estado][ch] = siguiente
+                self._goto.append({})
+                self._fail.append(0)
+                self._salida.append([])
+            estado = siguiente
+        self._salida[estado].append((len(patron), valor))
+
+    def compilar(self) -> None:
+        """Calcula los links de falla (BFS). Llamar después de agregar todo."""
+        cola = deque(self._goto[0].values())
+        while cola:
+            estado = cola.popleft()
+            for ch, hijo in self._goto[estado].items():
+                cola.append(hijo)
+                f = self._fail[estado]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                destino = self._goto[f].get(ch, 0)
+                self._fail[hijo] = destino if destino != hijo else 0
+                self._salida[hijo] = self._salida[hijo] + self._salida[self._fail[hijo]]
+
+    def buscar(self, texto: str) -> Iterable[Tuple[int, int, object]]:
+        estado = 0
+        for i, ch in enumerate(texto):
+            while estado and ch not in self._goto[estado]:
+                estado = self._fail[estado]
+            estado = self._goto[estado].get(ch, 0)
+            for largo, valor in self._salida[estado]:
+                yield i - largo + 1, i + 1, valor
+
+
+# ============================================================
+# Geometría
+# ============================================================
+
+def _punto_en_anillo(lon: float, lat: float, anillo: List[List[float]]) -> bool:
+    """Ray casting (par/impar) contra un anillo [[lon, lat], ...]."""
+    dentro = False
+    j = len(anillo) - 1
+    for i in range(len(anillo)):
+        xi, yi = anillo[i][0], anillo[i][1]
+        xj, yj = anillo[j][0], anillo[j][1]
+        if (yi > lat) != (yj > lat) and lon < (xj - xi) * (lat - yi) / (yj - yi) + xi:
+            dentro = not dentro
+        j = i
+    return dentro
+
+
+def punto_en_poligono(lon: float, lat: float, poligono: List[List[List[float]]]) -> bool:
+    """Polígono = [exterior, hueco1, ...]: adentro del exterior y de ningún hueco."""
+    if not poligono or not _punto_en_anillo(lon, lat, poligono[0]):
+        return False
+    return not any(_punto_en_anillo(lon, lat, hueco) for hueco in poligono[1:])
+
+
+def _area(anillo: List[List[float]]) -> float:
+    """Área (en grados², sólo para comparar) por la fórmula del shoelace."""
+    return abs(sum(
+        anillo[i - 1][0] * anillo[i][1] - anillo[i][0] * anillo[i - 1][1]
+        for i in range(len(anillo))
+    )) / 2
+
+
+class _Zona:
+    __slots__ = ("barrio_id", "poligonos", "bbox", "area")
+
+    def __init__(self, barrio_id: int, poligonos: List[List[List[List[float]]]]):
+        self.barrio_id = barrio_id
+        self.poligonos = poligonos
+        puntos = [p for pol in poligonos for p in pol[0]]
+        self.bbox = (
+            min(p[0] for p in puntos), min(p[1] for p in puntos),
+            max(p[0] for p in puntos), max(p[1] for p in puntos),
+        )
+        self.area = sum(_area(pol[0]) for pol in poligonos)
+
+    def contiene(self, lon: float, lat: float) -> bool:
+        x0, y0, x1, y1 = self.bbox
+        if not (x0 <= lon <= x1 and y0 <= lat <= y1):
+            return False
+        return any(punto_en_poligono(lon, lat, pol) for pol in self.poligonos)
+
+
+def _poligonos_validos(valor) -> List[List[List[List[float]]]]:
+    """Acepta el JSON de Barrio.poligono; descarta anillos degenerados."""
+    if not valor:
+        return []
+    # Un solo polígono guardado sin la lista exterior
+    if valor and valor[0] and isinstance(valor[0][0][0], (int, float)):
+        valor = [valor]
+    return [pol for pol in valor if pol and len(pol[0]) >= 3]
+
+
+# ============================================================
+# Índice por municipio
+# ============================================================
+
+class IndiceBarrios:
+    """Barrios de un municipio precompilados para detectar por texto y por punto."""
+
+    def __init__(self, barrios: Iterable[Barrio], celda: Optional[float] = None):
+        self.celda = celda or settings.BARRIOS_GRILLA_GRADOS
+        self.automata = AhoCorasick()
+        self.grilla: Dict[Tuple[int, int], List[_Zona]] = {}
+        self.centroides: List[Tuple[int, float, float]] = []
+        self.cantidad = 0
+
+        for b in barrios:
+            self.cantidad += 1
+            nombres = {normalizar_texto(b.nombre)}
+            nombres.update(normalizar_texto(a) for a in (b.aliases or []) if a)
+            for nombre in nombres:
+                if nombre:
+                    self.automata.agregar(nombre, b.id)
+
+            poligonos = _poligonos_validos(b.poligono)
+            if poligonos:
+                self._indexar_zona(_Zona(b.id, poligonos))
+            elif b.validado and b.latitud is not None and b.longitud is not None:
+                self.centroides.append((b.id, b.latitud, b.longitud))
+        self.automata.compilar()
+
+    def _celda(self, lon: float, lat: float) -> Tuple[int, int]:
+        return int(lon // self.celda), int(lat // self.celda)
+
+    def _indexar_zona(self, zona: _Zona) -> None:
+        cx0, cy0 = self._celda(zona.bbox[0], zona.bbox[1])
+        cx1, cy1 = self._celda(zona.bbox[2], zona.bbox[3])
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                self.grilla.setdefault((cx, cy), []).append(zona)
+
+    def por_texto(self, direccion: str) -> Optional[int]:
+        """
+        Barrio mencionado en la dirección.
+
+        Primero los nombres como palabra completa ("Calle 123, Centro",
+        "Centro - Calle 123"); si no hay, nombres de 5+ letras pegados a
+        otras. Entre varios, gana el nombre más largo ("Villa Centro" le
+        gana a "Centro").
+        """
+        texto = normalizar_texto(direccion)
+        if not texto:
+            return None
+        mejor_palabra: Tuple[int, Optional[int]] = (0, None)
+        mejor_substring: Tuple[int, Optional[int]] = (0, None)
+        for inicio, fin, barrio_id in self.automata.buscar(texto):
+            largo = fin - inicio
+            borde_izq = inicio == 0 or not texto[inicio - 1].isalnum()
+            borde_der = fin == len(texto) or not texto[fin].isalnum()
+            if borde_izq and borde_der:
+                if largo > mejor_palabra[0]:
+                    mejor_palabra = (largo, barrio_id)
+            elif largo >= _MIN_SUBSTRING and largo > mejor_substring[0]:
+                mejor_substring = (largo, barrio_id)
+        return mejor_palabra[1] or mejor_substring[1]
+
+    def por_poligono(self, latitud: float, longitud: float) -> Optional[int]:
+        """Barrio cuyo polígono contiene el punto (el más chico si se superponen)."""
+        candidatos = [
+            z for z in self.grilla.get(self._celda(longitud, latitud), ())
+            if z.contiene(longitud, latitud)
+        ]
+        if not candidatos:
+            return None
+        return min(candidatos, key=lambda z: z.area).barrio_id
+
+    def por_centroide(self, latitud: float, longitud: float) -> Optional[int]:
+        """Centroide más cercano dentro de 5 km (barrios sin polígono)."""
+        mejor: Tuple[float, Optional[int]] = (_RADIO_CENTROIDE_KM, None)
+        for barrio_id, lat, lon in self.centroides:
+            distancia = calcular_distancia(latitud, longitud, lat, lon)
+            if distancia <= mejor[0]:
+                mejor = (distancia, barrio_id)
+        return mejor[1]
+
+
+_indices: Dict[int, Tuple[float, IndiceBarrios]] = {}
+
+
+async def obtener_indice(db: AsyncSession, municipio_id: int) -> IndiceBarrios:
+    """Índice del municipio desde la cache del proceso (lo arma si no está o venció)."""
+    entrada = _indices.get(municipio_id)
+    if entrada is not None and time.monotonic() < entrada[0]:
+        return entrada[1]
+    result = await db.execute(select(Barrio).where(Barrio.municipio_id == municipio_id))
+    indice = IndiceBarrios(result.scalars().all())
+    _indices[municipio_id] = (time.monotonic() + settings.BARRIOS_INDICE_TTL_S, indice)
+    return indice
+
+
+def invalidar_indice(municipio_id: Optional[int] = None) -> None:
+    """Descarta el índice de un municipio (o todos si es None)."""
+    if municipio_id is None:
+        _indices.clear()
+    else:
+        _indices.pop(municipio_id, None)
+
+
+def _recolectar(cambios: Cambios) -> Set[int]:
+    """Municipios con barrios tocados en el flush."""
+    return {b.municipio_id for b in cambios.todos() if b.municipio_id is not None}
+
+
+def _invalidar(pendientes: List[Set[int]]) -> None:
+    for municipio_id in set().union(*pendientes):
+        invalidar_indice(municipio_id)
+
+
+registrar_invalidacion("barrios_indice", (Barrio,), _recolectar, _invalidar)
+
+
+# ============================================================
+# Detección
+# ============================================================
 
 async def detectar_barrio_desde_direccion(
     db: AsyncSession,
@@ -17,11 +284,6 @@ async def detectar_barrio_desde_direccion(
     """
     Detecta el barrio de una dirección buscando coincidencias con los barrios guardados.
 
-    Estrategia:
-    1. Buscar coincidencia exacta del nombre del barrio en la dirección
-    2. Buscar coincidencia parcial (el barrio aparece en alguna parte de la dirección)
-    3. Si no hay match, retornar None
-
     Args:
         db: Sesión de base de datos
         municipio_id: ID del municipio
@@ -32,54 +294,8 @@ async def detectar_barrio_desde_direccion(
     """
     if not direccion or not municipio_id:
         return None
-
-    # Normalizar dirección (minúsculas, sin acentos comunes)
-    direccion_normalizada = normalizar_texto(direccion)
-
-    # Obtener todos los barrios del municipio
-    result = await db.execute(
-        select(Barrio)
-        .where(Barrio.municipio_id == municipio_id)
-        .order_by(func.length(Barrio.nombre).desc())  # Primero los nombres más largos
-    )
-    barrios = result.scalars().all()
-
-    if not barrios:
-        return None
-
-    # Buscar match
-    for barrio in barrios:
-        nombre_normalizado = normalizar_texto(barrio.nombre)
-
-        # Coincidencia exacta como palabra completa
-        if f" {nombre_normalizado} " in f" {direccion_normalizada} ":
-            return barrio.id
-
-        # El nombre del barrio aparece al final de la dirección
-        if direccion_normalizada.endswith(f" {nombre_normalizado}"):
-            return barrio.id
-
-        # El nombre del barrio aparece al principio
-        if direccion_normalizada.startswith(f"{nombre_normalizado} "):
-            return barrio.id
-
-        # Coincidencia con coma (ej: "Calle 123, Centro")
-        if f", {nombre_normalizado}" in direccion_normalizada:
-            return barrio.id
-
-        # Coincidencia con guion (ej: "Calle 123 - Centro")
-        if f"- {nombre_normalizado}" in direccion_normalizada:
-            return barrio.id
-
-    # Segunda pasada: buscar coincidencias parciales más flexibles
-    for barrio in barrios:
-        nombre_normalizado = normalizar_texto(barrio.nombre)
-
-        # Si el nombre del barrio tiene más de 4 caracteres, buscar como substring
-        if len(nombre_normalizado) > 4 and nombre_normalizado in direccion_normalizada:
-            return barrio.id
-
-    return None
+    indice = await obtener_indice(db, municipio_id)
+    return indice.por_texto(direccion)
 
 
 async def detectar_barrio_con_coordenadas(
@@ -89,7 +305,8 @@ async def detectar_barrio_con_coordenadas(
     longitud: float
 ) -> Optional[int]:
     """
-    Detecta el barrio más cercano a unas coordenadas dadas.
+    Detecta el barrio que contiene unas coordenadas (polígono) o, para
+    barrios sin polígono, el de centroide más cercano dentro de 5 km.
 
     Args:
         db: Sesión de base de datos
@@ -98,41 +315,12 @@ async def detectar_barrio_con_coordenadas(
         longitud: Longitud del punto
 
     Returns:
-        barrio_id del barrio más cercano con coordenadas, None si no hay
+        barrio_id, None si no hay
     """
     if not latitud or not longitud or not municipio_id:
         return None
-
-    # Obtener barrios con coordenadas válidas
-    result = await db.execute(
-        select(Barrio)
-        .where(
-            Barrio.municipio_id == municipio_id,
-            Barrio.latitud.isnot(None),
-            Barrio.longitud.isnot(None),
-            Barrio.validado == True
-        )
-    )
-    barrios = result.scalars().all()
-
-    if not barrios:
-        return None
-
-    # Encontrar el barrio más cercano
-    barrio_cercano = None
-    menor_distancia = float('inf')
-
-    for barrio in barrios:
-        distancia = calcular_distancia(latitud, longitud, barrio.latitud, barrio.longitud)
-        if distancia < menor_distancia:
-            menor_distancia = distancia
-            barrio_cercano = barrio
-
-    # Si hay un barrio dentro de 5km, retornarlo
-    if barrio_cercano and menor_distancia <= 5.0:
-        return barrio_cercano.id
-
-    return None
+    indice = await obtener_indice(db, municipio_id)
+    return indice.por_poligono(latitud, longitud) or indice.por_centroide(latitud, longitud)
 
 
 async def detectar_barrio(
@@ -146,8 +334,10 @@ async def detectar_barrio(
     Función principal que combina detección por texto y coordenadas.
 
     Estrategia:
-    1. Primero intenta detectar por texto de dirección (más preciso si hay match)
-    2. Si no hay match por texto y hay coordenadas, usa proximidad geográfica
+    1. Si hay coordenadas y caen dentro de un polígono, ese barrio (es el
+       dato más confiable: el vecino puede escribir mal el barrio)
+    2. Barrio mencionado en la dirección
+    3. Centroide más cercano dentro de 5 km
 
     Args:
         db: Sesión de base de datos
@@ -159,17 +349,82 @@ async def detectar_barrio(
     Returns:
         barrio_id si se detecta, None si no
     """
-    # Primero intentar por texto
-    barrio_id = await detectar_barrio_desde_direccion(db, municipio_id, direccion)
+    if not municipio_id:
+        return None
+    indice = await obtener_indice(db, municipio_id)
+    hay_coordenadas = bool(latitud and longitud)
 
-    if barrio_id:
-        return barrio_id
+    if hay_coordenadas:
+        barrio_id = indice.por_poligono(latitud, longitud)
+        if barrio_id:
+            return barrio_id
 
-    # Si hay coordenadas, intentar por proximidad
-    if latitud and longitud:
-        barrio_id = await detectar_barrio_con_coordenadas(db, municipio_id, latitud, longitud)
+    if direccion:
+        barrio_id = indice.por_texto(direccion)
+        if barrio_id:
+            return barrio_id
 
-    return barrio_id
+    if hay_coordenadas:
+        return indice.por_centroide(latitud, longitud)
+    return None
+
+
+# ============================================================
+# Import de polígonos (KMZ)
+# ============================================================
+
+def poligonos_desde_kml(root, ns: str) -> Dict[str, List[List[List[List[float]]]]]:
+    """
+    Extrae los polígonos de cada <Placemark> de un KML.
+
+    Args:
+        root: Elemento raíz del KML ya parseado
+        ns: Namespace KML ("{http://www.opengis.net/kml/2.2}")
+
+    Returns:
+        {nombre del placemark: [polígono, ...]}; cada polígono es
+        [exterior, huecos...] con anillos [[lon, lat], ...]
+    """
+    resultado: Dict[str, List[List[List[List[float]]]]] = {}
+    for placemark in root.iter(f"{ns}Placemark"):
+        name_el = placemark.find(f"{ns}name")
+        if name_el is None or not (name_el.text or "").strip():
+            continue
+        poligonos = []
+        for polygon in placemark.iter(f"{ns}Polygon"):
+            anillos = []
+            for tag in ("outerBoundaryIs", "innerBoundaryIs"):
+                for borde in polygon.findall(f"{ns}{tag}"):
+                    coords_el = borde.find(f".//{ns}coordinates")
+                    anillo = _parsear_coordenadas(coords_el.text if coords_el is not None else "")
+                    if len(anillo) >= 3:
+                        anillos.append(anillo)
+            if anillos:
+                poligonos.append(anillos)
+        if poligonos:
+            resultado.setdefault(name_el.text.strip(), []).extend(poligonos)
+    return resultado
+
+
+def _parsear_coordenadas(texto: str) -> List[List[float]]:
+    """"lon,lat[,alt] lon,lat[,alt] ..." -> [[lon, lat], ...]"""
+    puntos = []
+    for tupla in (texto or "").split():
+        partes = tupla.split(",")
+        try:
+            puntos.append([float(partes[0]), float(partes[1])])
+        except (ValueError, IndexError):
+            continue
+    return puntos
+
+
+def centroide(poligonos: List[List[List[List[float]]]]) -> Tuple[float, float]:
+    """(lat, lon) promedio de los vértices exteriores; alcanza para el marcador del mapa."""
+    puntos = [p for pol in poligonos for p in pol[0]]
+    return (
+        sum(p[1] for p in puntos) / len(puntos),
+        sum(p[0] for p in puntos) / len(puntos),
+    )
 
 
 def normalizar_texto(texto: str) -> str:
@@ -202,8 +457,6 @@ def calcular_distancia(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     """
     Calcula la distancia en km entre dos puntos usando la fórmula de Haversine.
     """
-    from math import radians, cos, sin, asin, sqrt
-
     lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
     dlon = lon2 - lon1
     dlat = lat2 - lat1
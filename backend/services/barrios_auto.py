@@ -2,7 +2,6 @@
 Servicio para cargar barrios automáticamente al crear un municipio.
 Usa IA (Gemini) para obtener los barrios y Nominatim para validar coordenadas.
 """
-import asyncio
 from typing import List
 from sqlalchemy.ext.asyncio import AsyncSession
 from models.barrio import Barrio
@@ -42,10 +41,7 @@ async def cargar_barrios_municipio(
     barrios_creados = 0
 
     for nombre_barrio in barrios_sugeridos:
-        # Rate limit: 1 request por segundo para Nominatim
-        await asyncio.sleep(1.0)
-
-        # Buscar coordenadas
+        # Buscar coordenadas (rate limit de Nominatim y cache en services/geocoding)
         coords = await obtener_coordenadas_nominatim(nombre_barrio, nombre_municipio, provincia)
 
         # Crear el barrio
@@ -3,11 +3,11 @@ Servicio para obtener barrios/localidades de un municipio.
 Usa IA (Gemini) para sugerir barrios y Nominatim para validar coordenadas.
 """
 import httpx
-import asyncio
 import json
 import re
 from typing import List, Dict, Optional
 from core.config import settings
+from services.geocoding import geocoder
 
 
 async def sugerir_barrios_con_ia(nombre_municipio: str, provincia: str = "Buenos Aires") -> List[str]:
@@ -91,33 +91,18 @@ async def obtener_coordenadas_nominatim(
     query = f"{lugar}, {municipio}, {provincia}, Argentina"
 
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(
-                "https://nominatim.openstreetmap.org/search",
-                params={
-                    "q": query,
-                    "format": "json",
-                    "limit": 1,
-                    "addressdetails": 1
-                },
-                headers={
-                    "User-Agent": "SugerenciasMun/1.0 (contacto@municipio.gob.ar)"
-                }
-            )
-
-            if response.status_code == 200:
-                data = response.json()
-                if data:
-                    result = data[0]
-                    return {
-                        "lat": float(result["lat"]),
-                        "lng": float(result["lon"]),
-                        "display_name": result.get("display_name", ""),
-                        "type": result.get("type", ""),
-                        "importance": result.get("importance", 0)
-                    }
-
-            return None
+        # Cache + rate limit de Nominatim en services/geocoding
+        data = await geocoder.search({"q": query, "limit": 1, "addressdetails": 1})
+        if data:
+            result = data[0]
+            return {
+                "lat": float(result["lat"]),
+                "lng": float(result["lon"]),
+                "display_name": result.get("display_name", ""),
+                "type": result.get("type", ""),
+                "importance": result.get("importance", 0)
+            }
+        return None
     except Exception as e:
         print(f"[NOMINATIM] Error buscando {lugar}: {e}")
         return None
@@ -149,9 +134,7 @@ async def buscar_barrios_municipio(
     resultados = []
 
     for barrio in barrios_sugeridos:
-        # Rate limit: 1 request por segundo para Nominatim
-        await asyncio.sleep(1.0)
-
+        # El rate limit de 1 req/s lo aplica el geocoder (y los cacheados no esperan)
         coords = await obtener_coordenadas_nominatim(barrio, nombre_municipio, provincia)
 
         if coords:
@@ -193,39 +176,24 @@ async def obtener_centro_municipio(
     query = f"{nombre_municipio}, {provincia}, Argentina"
 
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(
-                "https://nominatim.openstreetmap.org/search",
-                params={
-                    "q": query,
-                    "format": "json",
-                    "limit": 1,
-                    "polygon_geojson": 0
-                },
-                headers={
-                    "User-Agent": "SugerenciasMun/1.0 (contacto@municipio.gob.ar)"
-                }
-            )
+        data = await geocoder.search({"q": query, "limit": 1, "polygon_geojson": 0})
+        if data:
+            result = data[0]
+            boundingbox = result.get("boundingbox", [])
+
+            return {
+                "lat": float(result["lat"]),
+                "lng": float(result["lon"]),
+                "display_name": result.get("display_name", ""),
+                "bounds": {
+                    "minLat": float(boundingbox[0]) if len(boundingbox) > 0 else None,
+                    "maxLat": float(boundingbox[1]) if len(boundingbox) > 1 else None,
+                    "minLng": float(boundingbox[2]) if len(boundingbox) > 2 else None,
+                    "maxLng": float(boundingbox[3]) if len(boundingbox) > 3 else None,
+                } if boundingbox else None
+            }
 
-            if response.status_code == 200:
-                data = response.json()
-                if data:
-                    result = data[0]
-                    boundingbox = result.get("boundingbox", [])
-
-                    return {
-                        "lat": float(result["lat"]),
-                        "lng": float(result["lon"]),
-                        "display_name": result.get("display_name", ""),
-                        "bounds": {
-                            "minLat": float(boundingbox[0]) if len(boundingbox) > 0 else None,
-                            "maxLat": float(boundingbox[1]) if len(boundingbox) > 1 else None,
-                            "minLng": float(boundingbox[2]) if len(boundingbox) > 2 else None,
-                            "maxLng": float(boundingbox[3]) if len(boundingbox) > 3 else None,
-                        } if boundingbox else None
-                    }
-
-            return None
+        return None
     except Exception as e:
         print(f"[NOMINATIM] Error buscando municipio {nombre_municipio}: {e}")
         return None
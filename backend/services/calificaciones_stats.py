@@ -0,0 +1,385 @@
+"""
+Estadísticas de calificaciones agregadas en SQL + rollup diario.
+
+`/calificaciones/estadisticas` traía todas las calificaciones de la ventana
+a Python (sin filtrar por municipio) para sacar promedios, distribución y
+tags con comprensiones de listas. Ahora:
+
+- Ventanas cortas (hasta `DIAS_CRUDO`): un SELECT con SUM/COUNT/CASE sobre
+  `calificaciones` JOIN `reclamos` filtrado por municipio (índice por
+  created_at) + un GROUP BY sobre `calificacion_tags` para los tags.
+- Ventanas largas: las mismas sumas sobre `calificaciones_diarias` y
+  `calificaciones_tags_diarias` (una fila por municipio/día/categoría/
+  empleado), a granularidad de día.
+
+`/calificaciones/ranking-empleados` usa las mismas consultas agrupadas por
+`Reclamo.empleado_id`.
+
+Los rollups son tablas derivadas: la denormalización registrada abajo
+(core/denormalizacion) reconstruye el día afectado cuando se
+crea/borra una calificación o cambia el municipio/categoría/empleado de un
+reclamo calificado. `tarea_rollup_calificaciones` rehace los últimos días
+como red de seguridad y scripts/migrate_calificaciones_rollup.py hace el
+backfill completo.
+"""
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import case, delete, func, insert, inspect, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.denormalizacion import Cambios, cambio_alguno, registrar
+from models.calificacion import (
+    Calificacion,
+    CalificacionDiaria,
+    CalificacionTag,
+    CalificacionTagDiaria,
+)
+from models.empleado import Empleado
+from models.reclamo import Reclamo
+
+logger = logging.getLogger(__name__)
+
+# Hasta cuántos días se agrega directo sobre `calificaciones`
+DIAS_CRUDO = 7
+# Días que rehace la tarea programada
+DIAS_REFRESCO = 2
+TOP_TAGS = 10
+
+METRICAS = (
+    "total", "suma_puntuacion",
+    "estrellas_1", "estrellas_2", "estrellas_3", "estrellas_4", "estrellas_5",
+    "suma_tiempo_respuesta", "cant_tiempo_respuesta",
+    "suma_calidad_trabajo", "cant_calidad_trabajo",
+    "suma_atencion", "cant_atencion",
+)
+
+
+# ============================================================
+# Expresiones de agregación
+# ============================================================
+
+def _metricas_crudas() -> Dict[str, object]:
+    """Sumas/conteos sobre `calificaciones` (mismos nombres que el rollup)."""
+    c = Calificacion
+    exprs = {
+        "total": func.count(c.id),
+        "suma_puntuacion": func.coalesce(func.sum(c.puntuacion), 0),
+    }
+    for i in range(1, 6):
+        exprs[f"estrellas_{i}"] = func.coalesce(func.sum(case((c.puntuacion == i, 1), else_=0)), 0)
+    for aspecto in ("tiempo_respuesta", "calidad_trabajo", "atencion"):
+        col = getattr(c, aspecto)
+        exprs[f"suma_{aspecto}"] = func.coalesce(func.sum(col), 0)
+        exprs[f"cant_{aspecto}"] = func.count(col)
+    return exprs
+
+
+def _metricas_rollup() -> Dict[str, object]:
+    return {m: func.coalesce(func.sum(getattr(CalificacionDiaria, m)), 0) for m in METRICAS}
+
+
+def _usa_rollup(dias: int) -> bool:
+    return dias > DIAS_CRUDO
+
+
+def _filtrar(q, dims, municipio_id: int, categoria_id: Optional[int], empleado_id: Optional[int]):
+    """`dims` = tabla con municipio_id/categoria_id/empleado_id (Reclamo o rollup)."""
+    q = q.where(dims.municipio_id == municipio_id)
+    if categoria_id:
+        q = q.where(dims.categoria_id == categoria_id)
+    if empleado_id:
+        q = q.where(dims.empleado_id == empleado_id)
+    return q
+
+
+def _consulta_metricas(
+    municipio_id: int,
+    dias: int,
+    ahora: datetime,
+    categoria_id: Optional[int] = None,
+    empleado_id: Optional[int] = None,
+    por_empleado: bool = False,
+):
+    if _usa_rollup(dias):
+        d = CalificacionDiaria
+        exprs = _metricas_rollup()
+        dims = [d.empleado_id] if por_empleado else []
+        q = select(*dims, *(e.label(n) for n, e in exprs.items())).where(
+            d.fecha >= (ahora - timedelta(days=dias)).date()
+        )
+        q = _filtrar(q, d, municipio_id, categoria_id, empleado_id)
+    else:
+        exprs = _metricas_crudas()
+        dims = [Reclamo.empleado_id] if por_empleado else []
+        q = (
+            select(*dims, *(e.label(n) for n, e in exprs.items()))
+            .select_from(Calificacion)
+            .join(Reclamo, Reclamo.id == Calificacion.reclamo_id)
+            .where(Calificacion.created_at >= ahora - timedelta(days=dias))
+        )
+        q = _filtrar(q, Reclamo, municipio_id, categoria_id, empleado_id)
+    if por_empleado:
+        q = q.where(dims[0].isnot(None)).group_by(dims[0])
+    return q
+
+
+def _consulta_tags(
+    municipio_id: int,
+    dias: int,
+    ahora: datetime,
+    categoria_id: Optional[int] = None,
+    empleado_id: Optional[int] = None,
+):
+    if _usa_rollup(dias):
+        t = CalificacionTagDiaria
+        tag, cantidad = t.tag, func.sum(t.cantidad)
+        q = select(tag, cantidad.label("cantidad")).where(
+            t.fecha >= (ahora - timedelta(days=dias)).date()
+        )
+        q = _filtrar(q, t, municipio_id, categoria_id, empleado_id)
+    else:
+        tag, cantidad = CalificacionTag.tag, func.count()
+        q = (
+            select(tag, cantidad.label("cantidad"))
+            .join(Calificacion, Calificacion.id == CalificacionTag.calificacion_id)
+            .join(Reclamo, Reclamo.id == Calificacion.reclamo_id)
+            .where(Calificacion.created_at >= ahora - timedelta(days=dias))
+        )
+        q = _filtrar(q, Reclamo, municipio_id, categoria_id, empleado_id)
+    # Desempate estable por nombre de tag
+    return q.group_by(tag).order_by(cantidad.desc(), tag.asc()).limit(TOP_TAGS)
+
+
+def _promedio(suma, cantidad) -> float:
+    # MySQL devuelve SUM() como Decimal
+    return round(float(suma) / int(cantidad), 2) if cantidad else 0
+
+
+def _resumen(row) -> dict:
+    total = int(row.total or 0)
+    return {
+        "total_calificaciones": total,
+        "promedio_general": _promedio(row.suma_puntuacion, total),
+        "promedio_tiempo_respuesta": _promedio(row.suma_tiempo_respuesta, row.cant_tiempo_respuesta),
+        "promedio_calidad_trabajo": _promedio(row.suma_calidad_trabajo, row.cant_calidad_trabajo),
+        "promedio_atencion": _promedio(row.suma_atencion, row.cant_atencion),
+        "distribucion": {i: int(getattr(row, f"estrellas_{i}") or 0) for i in range(1, 6)},
+    }
+
+
+# ============================================================
+# Lecturas
+# ============================================================
+
+async def estadisticas(
+    db: AsyncSession,
+    municipio_id: int,
+    dias: int = 30,
+    categoria_id: Optional[int] = None,
+    empleado_id: Optional[int] = None,
+) -> dict:
+    """Promedios, distribución 1-5 y tags más frecuentes del municipio."""
+    ahora = datetime.utcnow()
+    row = (await db.execute(
+        _consulta_metricas(municipio_id, dias, ahora, categoria_id, empleado_id)
+    )).one()
+    resumen = _resumen(row)
+    if resumen["total_calificaciones"]:
+        tags = (await db.execute(
+            _consulta_tags(municipio_id, dias, ahora, categoria_id, empleado_id)
+        )).all()
+    else:
+        tags = []
+    resumen["tags_frecuentes"] = [{"tag": tag, "count": int(cant)} for tag, cant in tags]
+    return resumen
+
+
+async def ranking_empleados(
+    db: AsyncSession,
+    municipio_id: int,
+    dias: int = 30,
+    minimo: int = 1,
+) -> List[dict]:
+    """Empleados del municipio ordenados por promedio (desempata volumen)."""
+    ahora = datetime.utcnow()
+    rows = (await db.execute(
+        _consulta_metricas(municipio_id, dias, ahora, por_empleado=True)
+    )).all()
+    rows = [r for r in rows if (r.total or 0) >= minimo]
+    if not rows:
+        return []
+
+    nombres = {
+        eid: f"{nom} {ape or ''}".strip()
+        for eid, nom, ape in (await db.execute(
+            select(Empleado.id, Empleado.nombre, Empleado.apellido)
+            .where(Empleado.id.in_([r.empleado_id for r in rows]))
+        )).all()
+    }
+    ranking = []
+    for r in rows:
+        item = {"empleado_id": r.empleado_id, "nombre": nombres.get(r.empleado_id)}
+        item.update(_resumen(r))
+        ranking.append(item)
+    ranking.sort(key=lambda x: (-x["promedio_general"], -x["total_calificaciones"], x["empleado_id"]))
+    for posicion, item in enumerate(ranking, start=1):
+        item["posicion"] = posicion
+    return ranking
+
+
+# ============================================================
+# Rollup diario
+# ============================================================
+
+def _reconstruir_sync(
+    connection,
+    municipio_id: Optional[int] = None,
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+) -> None:
+    """Reescribe el rollup de [desde, hasta) (None = sin límite)."""
+    for tabla in (CalificacionDiaria, CalificacionTagDiaria):
+        q = delete(tabla)
+        if municipio_id is not None:
+            q = q.where(tabla.municipio_id == municipio_id)
+        if desde is not None:
+            q = q.where(tabla.fecha >= desde)
+        if hasta is not None:
+            q = q.where(tabla.fecha < hasta)
+        connection.execute(q)
+
+    def origen(q):
+        q = q.join(Reclamo, Reclamo.id == Calificacion.reclamo_id).where(Reclamo.municipio_id.isnot(None))
+        if municipio_id is not None:
+            q = q.where(Reclamo.municipio_id == municipio_id)
+        if desde is not None:
+            q = q.where(Calificacion.created_at >= datetime.combine(desde, time.min))
+        if hasta is not None:
+            q = q.where(Calificacion.created_at < datetime.combine(hasta, time.min))
+        return q
+
+    dims = (Reclamo.municipio_id, func.date(Calificacion.created_at), Reclamo.categoria_id, Reclamo.empleado_id)
+    columnas = ["municipio_id", "fecha", "categoria_id", "empleado_id"]
+    exprs = _metricas_crudas()
+    sel = origen(select(*dims, *exprs.values()).select_from(Calificacion)).group_by(*dims)
+    connection.execute(insert(CalificacionDiaria).from_select([*columnas, *exprs.keys()], sel))
+
+    sel_tags = origen(
+        select(*dims, CalificacionTag.tag, func.count())
+        .select_from(CalificacionTag)
+        .join(Calificacion, Calificacion.id == CalificacionTag.calificacion_id)
+    ).group_by(*dims, CalificacionTag.tag)
+    connection.execute(insert(CalificacionTagDiaria).from_select([*columnas, "tag", "cantidad"], sel_tags))
+
+
+async def reconstruir_rollup(
+    db: AsyncSession,
+    municipio_id: Optional[int] = None,
+    desde: Optional[date] = None,
+) -> None:
+    """Rehace el rollup desde `desde` (None = todo el historial)."""
+    await db.run_sync(lambda s: _reconstruir_sync(s.connection(), municipio_id, desde))
+    await db.commit()
+
+
+async def tarea_rollup_calificaciones() -> None:
+    """Red de seguridad del listener: rehace los últimos días. Corre desde
+    core/scheduler."""
+    from core.database import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        await reconstruir_rollup(db, desde=date.today() - timedelta(days=DIAS_REFRESCO))
+
+
+# ============================================================
+# Mantenimiento incremental (listener)
+# ============================================================
+
+def parsear_tags(tags: Optional[str]) -> List[str]:
+    """"rapido, amable,rapido" -> ["rapido", "amable"]"""
+    vistos: List[str] = []
+    for t in (tags or "").split(","):
+        t = t.strip()[:60]
+        if t and t not in vistos:
+            vistos.append(t)
+    return vistos
+
+
+def _dias_afectados(
+    connection,
+    calificacion_ids: Set[int],
+    reclamo_ids: Set[int],
+    municipios_previos: Dict[int, Set[int]],
+    borradas: Iterable[Calificacion],
+) -> Set[Tuple[int, date]]:
+    dias: Set[Tuple[int, date]] = set()
+    conds = []
+    if calificacion_ids:
+        conds.append(Calificacion.id.in_(list(calificacion_ids)))
+    if reclamo_ids:
+        conds.append(Calificacion.reclamo_id.in_(list(reclamo_ids)))
+    if conds:
+        for reclamo_id, muni, creado in connection.execute(
+            select(Calificacion.reclamo_id, Reclamo.municipio_id, Calificacion.created_at)
+            .join(Reclamo, Reclamo.id == Calificacion.reclamo_id)
+            .where(or_(*conds))
+        ).all():
+            if creado is None:
+                continue
+            for m in {muni, *municipios_previos.get(reclamo_id, ())}:
+                if m:
+                    dias.add((m, creado.date()))
+
+    borradas = [c for c in borradas if c.created_at is not None]
+    if borradas:
+        munis = dict(connection.execute(
+            select(Reclamo.id, Reclamo.municipio_id)
+            .where(Reclamo.id.in_([c.reclamo_id for c in borradas]))
+        ).all())
+        for c in borradas:
+            if munis.get(c.reclamo_id):
+                dias.add((munis[c.reclamo_id], c.created_at.date()))
+    return dias
+
+
+def _recolectar(cambios: Cambios) -> Optional[tuple]:
+    """Calificaciones nuevas/borradas y reclamos calificables que se movieron."""
+    califs = cambios.de(Calificacion)
+    reclamo_ids: Set[int] = set()
+    municipios_previos: Dict[int, Set[int]] = {}
+    for obj in cambios.de(Reclamo).modificados:
+        if obj.id is not None and cambio_alguno(obj, ("municipio_id", "categoria_id", "empleado_id")):
+            reclamo_ids.add(obj.id)
+            municipios_previos[obj.id] = set(inspect(obj).attrs["municipio_id"].history.deleted)
+
+    if not (califs.nuevos or califs.borrados or reclamo_ids):
+        return None
+    return califs.nuevos, califs.borrados, reclamo_ids, municipios_previos
+
+
+def _aplicar(connection, pendiente: tuple) -> None:
+    """Normaliza tags y rehace el rollup de los días afectados."""
+    nuevas, borradas, reclamo_ids, municipios_previos = pendiente
+    filas = [
+        {"calificacion_id": c.id, "tag": tag}
+        for c in nuevas for tag in parsear_tags(c.tags)
+    ]
+    if filas:
+        connection.execute(insert(CalificacionTag), filas)
+    if borradas:
+        connection.execute(delete(CalificacionTag).where(
+            CalificacionTag.calificacion_id.in_([c.id for c in borradas])
+        ))
+    dias = _dias_afectados(
+        connection, {c.id for c in nuevas}, reclamo_ids, municipios_previos, borradas
+    )
+    for muni, fecha in dias:
+        _reconstruir_sync(connection, muni, fecha, fecha + timedelta(days=1))
+
+
+# Si el rollup falla (ej. calificaciones_diarias sin migrar) la
+# calificación del vecino se guarda igual; tarea_rollup_calificaciones o
+# `reconstruir_rollup` rehacen los días faltantes.
+registrar("calificaciones_stats", (Calificacion, Reclamo), _recolectar, _aplicar)
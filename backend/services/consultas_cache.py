@@ -0,0 +1,262 @@
+"""Cache de resultados de consultas guardadas (widgets del panel de BI).
+
+Cada widget del panel ejecuta su consulta guardada al cargar, y las más
+usadas corren cientos de veces por día con el mismo resultado. Acá el
+resultado se materializa una vez (hasta SQL_SANDBOX_MAX_FILAS filas, sin
+COUNT ni OFFSET) y se pagina desde memoria.
+
+Clave: (consulta, municipio, hash del SQL). Una entrada vale mientras:
+  - la versión de datos de las tablas que lee no cambió: contadores por
+    (tabla, municipio) que se incrementan al commitear cambios por el ORM
+    en este proceso (invalidación post-commit de core/denormalizacion; las
+    tablas sin municipio_id incrementan para todos);
+  - y no pasó CONSULTAS_CACHE_TTL_S (cubre otras instancias y los UPDATE
+    masivos que no pasan por la sesión).
+
+El scheduler ("consultas.refrescar") precalcula las más ejecutadas antes de
+que venzan. Las estadísticas de hits/misses y tiempos son por proceso.
+"""
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+
+from core.config import settings
+from core.database import Base
+from core.denormalizacion import Cambios, registrar_invalidacion
+from services.sql_sandbox import SqlSandbox, preparar_sql, sql_sandbox
+
+Clave = Tuple[int, int, str]
+Version = Tuple[Tuple[str, int], ...]
+
+
+# ============================================================
+# Versión de datos por tabla
+# ============================================================
+
+_versiones: Dict[Tuple[str, Optional[int]], int] = {}
+
+
+def version_de(tablas: Set[str], municipio_id: int) -> Version:
+    return tuple(
+        (t, _versiones.get((t, municipio_id), 0) + _versiones.get((t, None), 0))
+        for t in sorted(tablas)
+    )
+
+
+def invalidar(tabla: str, municipio_id: Optional[int] = None) -> None:
+    """Nueva versión de datos de la tabla (municipio None = para todos)."""
+    clave = (tabla, municipio_id)
+    _versiones[clave] = _versiones.get(clave, 0) + 1
+
+
+def _recolectar(cambios: Cambios) -> Set[Tuple[str, Optional[int]]]:
+    return {
+        (obj.__tablename__, getattr(obj, "municipio_id", None) if obj.__tablename__ != "municipios" else None)
+        for obj in cambios.todos()
+    }
+
+
+def _invalidar(pendientes: List[Set[Tuple[str, Optional[int]]]]) -> None:
+    for tabla, municipio_id in set().union(*pendientes):
+        invalidar(tabla, municipio_id)
+
+
+registrar_invalidacion("consultas_cache", (Base,), _recolectar, _invalidar)
+
+
+# ============================================================
+# Cache
+# ============================================================
+
+@dataclass
+class ResultadoMaterializado:
+    columnas: List[str]
+    filas: List[Dict[str, Any]]
+    sql: str
+    truncado: bool
+    version: Version
+    ms: float
+    creado: float = field(default_factory=time.monotonic)
+    # HTML que arma la IA con los datos: se genera una vez por resultado
+    respuesta: Optional[str] = None
+
+    @property
+    def total(self) -> int:
+        return len(self.filas)
+
+    @property
+    def edad_s(self) -> float:
+        return time.monotonic() - self.creado
+
+    def pagina(self, page: int, page_size: int) -> List[Dict[str, Any]]:
+        desde = (max(page, 1) - 1) * page_size
+        return self.filas[desde:desde + page_size]
+
+
+@dataclass
+class EstadisticaConsulta:
+    hits: int = 0
+    misses: int = 0
+    coalescidas: int = 0
+    errores: int = 0
+    ejecuciones: int = 0
+    ms_total: float = 0.0
+    ms_max: float = 0.0
+    ms_ultima: float = 0.0
+
+    def registrar(self, ms: float) -> None:
+        self.ejecuciones += 1
+        self.ms_total += ms
+        self.ms_max = max(self.ms_max, ms)
+        self.ms_ultima = ms
+
+    def como_dict(self) -> Dict[str, Any]:
+        pedidos = self.hits + self.misses + self.coalescidas
+        return {
+            **self.__dict__,
+            "ms_promedio": round(self.ms_total / self.ejecuciones, 1) if self.ejecuciones else 0.0,
+            "hit_ratio": round((self.hits + self.coalescidas) / pedidos, 3) if pedidos else 0.0,
+        }
+
+
+class ConsultasCache:
+
+    def __init__(
+        self,
+        sandbox: Optional[SqlSandbox] = None,
+        ttl_s: Optional[int] = None,
+        max_entradas: Optional[int] = None,
+    ):
+        self.sandbox = sandbox or sql_sandbox
+        self.ttl_s = ttl_s if ttl_s is not None else settings.CONSULTAS_CACHE_TTL_S
+        self.max_entradas = max_entradas or settings.CONSULTAS_CACHE_MAX_ENTRADAS
+        self._entradas: "OrderedDict[Clave, ResultadoMaterializado]" = OrderedDict()
+        self._en_vuelo: Dict[Clave, asyncio.Future] = {}
+        self.stats: Dict[int, EstadisticaConsulta] = {}
+
+    @staticmethod
+    def clave(consulta_id: int, municipio_id: int, sql: str) -> Clave:
+        return consulta_id, municipio_id, hashlib.sha1(sql.encode()).hexdigest()[:16]
+
+    def _vigente(self, entrada: Optional[ResultadoMaterializado], version: Version, margen_s: float = 0) -> bool:
+        return entrada is not None and entrada.version == version and entrada.edad_s + margen_s < self.ttl_s
+
+    async def obtener(self, consulta_id: int, municipio_id: int, sql: str) -> ResultadoMaterializado:
+        """Resultado completo de la consulta guardada: de la cache o ejecutándola una vez."""
+        stats = self.stats.setdefault(consulta_id, EstadisticaConsulta())
+        preparada = preparar_sql(sql, municipio_id)
+        clave = self.clave(consulta_id, municipio_id, sql)
+        version = version_de(preparada.tablas, municipio_id)
+
+        entrada = self._entradas.get(clave)
+        if self._vigente(entrada, version):
+            self._entradas.move_to_end(clave)
+            stats.hits += 1
+            return entrada
+
+        en_vuelo = self._en_vuelo.get(clave)
+        if en_vuelo is not None:
+            stats.coalescidas += 1
+            return await asyncio.shield(en_vuelo)
+
+        stats.misses += 1
+        return await self._ejecutar(clave, preparada, version, stats)
+
+    async def _ejecutar(self, clave: Clave, preparada, version: Version, stats: EstadisticaConsulta) -> ResultadoMaterializado:
+        futuro = asyncio.get_running_loop().create_future()
+        self._en_vuelo[clave] = futuro
+        try:
+            limite = settings.SQL_SANDBOX_MAX_FILAS
+            if preparada.limite is not None:
+                limite = min(limite, preparada.limite)
+            t0 = time.perf_counter()
+            resultado = await self.sandbox.ejecutar(preparada, limite, preparada.offset)
+            ms = (time.perf_counter() - t0) * 1000
+            stats.registrar(ms)
+            entrada = ResultadoMaterializado(
+                columnas=resultado.columnas, filas=resultado.filas, sql=resultado.sql,
+                truncado=resultado.truncado, version=version, ms=ms,
+            )
+            self._guardar(clave, entrada)
+            futuro.set_result(entrada)
+            return entrada
+        except asyncio.CancelledError:
+            futuro.cancel()
+            raise
+        except Exception as e:
+            stats.errores += 1
+            futuro.set_exception(e)
+            # Si nadie más lo esperaba, evita el "exception never retrieved"
+            futuro.exception()
+            raise
+        finally:
+            self._en_vuelo.pop(clave, None)
+
+    def _guardar(self, clave: Clave, entrada: ResultadoMaterializado) -> None:
+        anterior = self._entradas.get(clave)
+        if anterior is not None and anterior.version == entrada.version and anterior.filas == entrada.filas:
+            # Mismos datos: se conserva la respuesta ya formateada
+            entrada.respuesta = anterior.respuesta
+        self._entradas[clave] = entrada
+        self._entradas.move_to_end(clave)
+        while len(self._entradas) > self.max_entradas:
+            self._entradas.popitem(last=False)
+
+    def invalidar(self, consulta_id: Optional[int] = None) -> None:
+        for clave in [c for c in self._entradas if consulta_id is None or c[0] == consulta_id]:
+            del self._entradas[clave]
+
+    def estadisticas(self, consulta_id: int) -> Dict[str, Any]:
+        datos = self.stats.get(consulta_id, EstadisticaConsulta()).como_dict()
+        entradas = [e for c, e in self._entradas.items() if c[0] == consulta_id]
+        datos["en_cache"] = bool(entradas)
+        datos["edad_cache_s"] = round(min(e.edad_s for e in entradas), 1) if entradas else None
+        return datos
+
+    async def refrescar_populares(self, session_factory=None, top: Optional[int] = None) -> int:
+        """Precalcula las consultas más ejecutadas que estén por vencer. Devuelve cuántas corrió."""
+        from models.consulta_guardada import ConsultaGuardada
+        if session_factory is None:
+            from core.database import AsyncSessionLocal as session_factory
+
+        async with session_factory() as db:
+            filas = (await db.execute(
+                select(ConsultaGuardada.id, ConsultaGuardada.municipio_id, ConsultaGuardada.sql_query)
+                .where(ConsultaGuardada.activo == True, ConsultaGuardada.sql_query.isnot(None))
+                .order_by(ConsultaGuardada.veces_ejecutada.desc())
+                .limit(top or settings.CONSULTAS_REFRESCO_TOP)
+            )).all()
+
+        corridas = 0
+        for consulta_id, municipio_id, sql in filas:
+            try:
+                preparada = preparar_sql(sql, municipio_id)
+            except ValueError:
+                continue
+            clave = self.clave(consulta_id, municipio_id, sql)
+            version = version_de(preparada.tablas, municipio_id)
+            # Se adelanta un intervalo para que el próximo pedido no la encuentre vencida
+            if clave in self._en_vuelo or self._vigente(
+                self._entradas.get(clave), version, margen_s=settings.CONSULTAS_REFRESCO_S,
+            ):
+                continue
+            stats = self.stats.setdefault(consulta_id, EstadisticaConsulta())
+            try:
+                await self._ejecutar(clave, preparada, version, stats)
+                corridas += 1
+            except Exception as e:
+                print(f"[CONSULTAS CACHE] Refresco de {consulta_id} falló: {e}")
+        return corridas
+
+
+consultas_cache = ConsultasCache()
+
+
+async def tarea_refrescar_consultas() -> None:
+    """Precalcula las consultas guardadas más usadas. Corre desde core/scheduler."""
+    await consultas_cache.refrescar_populares()
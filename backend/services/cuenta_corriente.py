@@ -0,0 +1,346 @@
+"""
+Cuenta corriente de contactos (proveedores / beneficiarios).
+
+`/ordenes-pago/contacto/{id}/cuenta-corriente` traía TODAS las OPs del
+contacto y sumaba facturado/pagado/pendiente en un loop de Python; a un
+proveedor con años de OPs le devolvía varios MB en una sola respuesta.
+Ahora:
+
+1. Totales (`totales`): una query con agregados condicionales
+   (SUM(CASE ...)) agrupada por contacto. Se guardan en
+   `contacto_cuenta_corriente`, que la denormalización sobre OrdenPago
+   (core/denormalizacion) reescribe en la misma transacción cuando una OP cambia de
+   estado, monto o destino. La cabecera es una lectura por PK; si falta la
+   fila se calcula en el momento.
+
+2. Libro mayor (`movimientos`): UNION ALL de
+     - OPs no anuladas                          -> debe  (monto bruto)
+     - gastos directos al contacto (sin OP)     -> debe  (monto)
+     - movimientos de caja de esos gastos       -> haber (egreso) / debe (ingreso)
+     - retenciones de OPs pagadas               -> haber (bruto - neto)
+   con el saldo acumulado calculado en la BD con una window function
+   (SUM(debe - haber) OVER (ORDER BY fecha, orden, ref_id)). Saldo > 0 ==
+   el municipio le debe al contacto. Se pagina por keyset sobre
+   (fecha, orden, ref_id), del más nuevo al más viejo, así que cada página
+   trae su saldo correcto sin recorrer el libro en Python.
+
+3. OPs del contacto (`pagina_ops`): la lista de siempre, pero paginada por
+   keyset (fecha_emision, id) sobre ix_op_contacto_fecha.
+"""
+import logging
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import Numeric, String, and_, case, delete, func, insert, literal, or_, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.denormalizacion import Cambios, cambio_alguno, registrar, valores
+from core.pagination import decode_payload, encode_payload
+from models.contacto import Contacto
+from models.gasto import Gasto
+from models.orden_pago import ContactoCuentaCorriente, EstadoOrdenPago, EtapaContable, OrdenPago
+from models.tesoreria_extra import TesoreriaMovimientoCaja, TipoMovimientoCaja
+
+logger = logging.getLogger(__name__)
+
+# Desempate entre movimientos del mismo día: primero el cargo, después los pagos
+ORDEN_TIPO = {"op": 1, "gasto": 2, "pago": 3, "retencion": 4}
+
+_MONTO = Numeric(15, 2)
+_CERO = Decimal("0.00")
+
+
+def _dec(valor: Any) -> Decimal:
+    """SUM de Numeric vuelve Decimal en MySQL y float en SQLite."""
+    return Decimal(str(valor or 0)).quantize(Decimal("0.01"))
+
+
+def _valor(enum_o_str) -> Optional[str]:
+    return enum_o_str.value if hasattr(enum_o_str, "value") else enum_o_str
+
+
+# ============================================================
+# Totales (agregado condicional + snapshot)
+# ============================================================
+
+def _select_totales():
+    no_anulada = OrdenPago.estado != EstadoOrdenPago.ANULADA
+    a_pagar = OrdenPago.estado.in_([EstadoOrdenPago.PENDIENTE, EstadoOrdenPago.AUTORIZADA])
+    monto = OrdenPago.monto_pesos
+
+    def suma(cond):
+        return func.coalesce(func.sum(case((cond, monto), else_=0)), 0)
+
+    return (
+        select(
+            Contacto.id,
+            Contacto.municipio_id,
+            suma(no_anulada),
+            suma(OrdenPago.estado == EstadoOrdenPago.PAGADA),
+            suma(a_pagar),
+            suma(and_(a_pagar, OrdenPago.etapa_contable == EtapaContable.DEVENGADO)),
+            func.count(case((no_anulada, OrdenPago.id))),
+        )
+        .select_from(Contacto)
+        .outerjoin(OrdenPago, and_(
+            OrdenPago.destino_contacto_id == Contacto.id,
+            OrdenPago.municipio_id == Contacto.municipio_id,
+            OrdenPago.destino_tipo == "contacto",
+        ))
+        .group_by(Contacto.id, Contacto.municipio_id)
+    )
+
+
+def _recalcular_sync(connection, contacto_ids: Set[int]) -> None:
+    """Reescribe el snapshot de esos contactos (DELETE + INSERT)."""
+    if not contacto_ids:
+        return
+    ids = list(contacto_ids)
+    connection.execute(delete(ContactoCuentaCorriente).where(ContactoCuentaCorriente.contacto_id.in_(ids)))
+    rows = connection.execute(_select_totales().where(Contacto.id.in_(ids))).all()
+    if rows:
+        connection.execute(insert(ContactoCuentaCorriente), [
+            {
+                "contacto_id": cid, "municipio_id": muni,
+                "facturado": _dec(fact), "pagado": _dec(pag), "pendiente": _dec(pend),
+                "devengado_no_pagado": _dec(dev), "cantidad_ops": cant or 0,
+            }
+            for cid, muni, fact, pag, pend, dev, cant in rows
+        ])
+
+
+def _totales_dict(fila: ContactoCuentaCorriente) -> Dict[str, Any]:
+    return {
+        "facturado": str(_dec(fila.facturado)),
+        "pagado": str(_dec(fila.pagado)),
+        "pendiente": str(_dec(fila.pendiente)),
+        "devengado_no_pagado": str(_dec(fila.devengado_no_pagado)),
+        "cantidad_ops": fila.cantidad_ops,
+    }
+
+
+async def totales(db: AsyncSession, contacto_id: int) -> Dict[str, Any]:
+    """Totales de la cabecera (1 lectura por PK; se calculan si falta la fila)."""
+    fila = await db.get(ContactoCuentaCorriente, contacto_id)
+    if fila is None:
+        await db.run_sync(lambda s: _recalcular_sync(s.connection(), {contacto_id}))
+        await db.commit()
+        fila = await db.get(ContactoCuentaCorriente, contacto_id)
+    if fila is None:
+        return {"facturado": "0.00", "pagado": "0.00", "pendiente": "0.00",
+                "devengado_no_pagado": "0.00", "cantidad_ops": 0}
+    return _totales_dict(fila)
+
+
+async def reconstruir(db: AsyncSession, municipio_id: Optional[int] = None, lote: int = 1000) -> int:
+    """Reescribe el snapshot de todos los contactos (o los de un municipio)."""
+    q = select(Contacto.id).order_by(Contacto.id)
+    if municipio_id is not None:
+        q = q.where(Contacto.municipio_id == municipio_id)
+    ids = list((await db.execute(q)).scalars().all())
+    for i in range(0, len(ids), lote):
+        chunk = set(ids[i:i + lote])
+        await db.run_sync(lambda s, chunk=chunk: _recalcular_sync(s.connection(), chunk))
+        await db.commit()
+    return len(ids)
+
+
+# ============================================================
+# Libro mayor con saldo acumulado
+# ============================================================
+
+def _libro(municipio_id: int, contacto_id: int):
+    """Subquery con todos los movimientos del contacto y su saldo acumulado."""
+    gastos_de_op = (
+        select(OrdenPago.gasto_id)
+        .where(OrdenPago.destino_contacto_id == contacto_id, OrdenPago.gasto_id.isnot(None))
+    )
+
+    def cols(tipo: str, ref_id, fecha, comprobante, concepto, debe, haber):
+        return (
+            literal(tipo, String(10)).label("tipo"),
+            literal(ORDEN_TIPO[tipo]).label("orden"),
+            ref_id.label("ref_id"),
+            fecha.label("fecha"),
+            comprobante.label("comprobante"),
+            concepto.label("concepto"),
+            debe.label("debe"),
+            haber.label("haber"),
+        )
+
+    cero = literal(_CERO, _MONTO)
+    ops = select(*cols(
+        "op", OrdenPago.id, OrdenPago.fecha_emision, OrdenPago.numero, OrdenPago.concepto,
+        OrdenPago.monto_pesos, cero,
+    )).where(
+        OrdenPago.municipio_id == municipio_id,
+        OrdenPago.destino_tipo == "contacto",
+        OrdenPago.destino_contacto_id == contacto_id,
+        OrdenPago.estado != EstadoOrdenPago.ANULADA,
+    )
+    gastos = select(*cols(
+        "gasto", Gasto.id, Gasto.fecha, Gasto.nro_factura, Gasto.concepto,
+        Gasto.monto_pesos, cero,
+    )).where(
+        Gasto.municipio_id == municipio_id,
+        Gasto.destino_contacto_id == contacto_id,
+        Gasto.activo == True,  # noqa: E712
+        Gasto.id.notin_(gastos_de_op),
+    )
+    es_egreso = TesoreriaMovimientoCaja.tipo == TipoMovimientoCaja.EGRESO
+    pagos = select(*cols(
+        "pago", TesoreriaMovimientoCaja.id, TesoreriaMovimientoCaja.fecha,
+        TesoreriaMovimientoCaja.ref_extracto, TesoreriaMovimientoCaja.concepto,
+        case((es_egreso, cero), else_=TesoreriaMovimientoCaja.monto),
+        case((es_egreso, TesoreriaMovimientoCaja.monto), else_=cero),
+    )).join(Gasto, Gasto.id == TesoreriaMovimientoCaja.gasto_id).where(
+        TesoreriaMovimientoCaja.municipio_id == municipio_id,
+        Gasto.destino_contacto_id == contacto_id,
+    )
+    retenciones = select(*cols(
+        "retencion", OrdenPago.id, Gasto.fecha, OrdenPago.numero, literal("Retenciones", String(150)),
+        cero, OrdenPago.monto_pesos - OrdenPago.monto_neto,
+    )).join(Gasto, Gasto.id == OrdenPago.gasto_id).where(
+        OrdenPago.municipio_id == municipio_id,
+        OrdenPago.destino_tipo == "contacto",
+        OrdenPago.destino_contacto_id == contacto_id,
+        OrdenPago.estado == EstadoOrdenPago.PAGADA,
+        OrdenPago.monto_neto < OrdenPago.monto_pesos,
+    )
+
+    u = union_all(ops, gastos, pagos, retenciones).subquery("cc_movs")
+    saldo = func.sum(u.c.debe - u.c.haber).over(order_by=(u.c.fecha, u.c.orden, u.c.ref_id))
+    return select(u, saldo.label("saldo")).subquery("cc_libro")
+
+
+def _keyset_desc(cols: Tuple, valores: Tuple):
+    """(a, b, c) < (va, vb, vc) expandido (MySQL no usa índices con row values)."""
+    conds = []
+    for i in range(len(cols)):
+        iguales = [cols[j] == valores[j] for j in range(i)]
+        conds.append(and_(*iguales, cols[i] < valores[i]))
+    return or_(*conds)
+
+
+def _posicion(cursor: str, claves: Tuple[str, ...]) -> Tuple:
+    """Decodifica un cursor {"f": fecha, ...enteros} en la tupla de orden."""
+    pos = decode_payload(cursor)
+    try:
+        return tuple(date.fromisoformat(pos[k]) if k == "f" else int(pos[k]) for k in claves)
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Cursor de paginación inválido")
+
+
+async def movimientos(
+    db: AsyncSession,
+    municipio_id: int,
+    contacto_id: int,
+    limite: int = 50,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Página del libro mayor (más nuevo primero) + cursor de la siguiente."""
+    libro = _libro(municipio_id, contacto_id)
+    orden = (libro.c.fecha, libro.c.orden, libro.c.ref_id)
+    q = select(libro).order_by(*(c.desc() for c in orden))
+    if cursor:
+        q = q.where(_keyset_desc(orden, _posicion(cursor, ("f", "o", "i"))))
+
+    rows = (await db.execute(q.limit(limite + 1))).all()
+    siguiente = None
+    if len(rows) > limite:
+        rows = rows[:limite]
+        ultimo = rows[-1]
+        siguiente = encode_payload({"f": _fecha(ultimo.fecha).isoformat(), "o": ultimo.orden, "i": ultimo.ref_id})
+
+    return [
+        {
+            "tipo": r.tipo,
+            "ref_id": r.ref_id,
+            "fecha": _fecha(r.fecha).isoformat() if r.fecha else None,
+            "comprobante": r.comprobante,
+            "concepto": r.concepto,
+            "debe": str(_dec(r.debe)),
+            "haber": str(_dec(r.haber)),
+            "saldo": str(_dec(r.saldo)),
+        }
+        for r in rows
+    ], siguiente
+
+
+def _fecha(valor) -> date:
+    # En SQLite el UNION pierde el tipo y la fecha vuelve como string
+    return date.fromisoformat(valor) if isinstance(valor, str) else valor
+
+
+# ============================================================
+# OPs del contacto (paginadas)
+# ============================================================
+
+async def pagina_ops(
+    db: AsyncSession,
+    municipio_id: int,
+    contacto_id: int,
+    limite: int = 100,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """OPs del contacto, más nueva primero, por keyset (fecha_emision, id)."""
+    orden = (OrdenPago.fecha_emision, OrdenPago.id)
+    q = (
+        select(OrdenPago)
+        .where(
+            OrdenPago.municipio_id == municipio_id,
+            OrdenPago.destino_tipo == "contacto",
+            OrdenPago.destino_contacto_id == contacto_id,
+        )
+        .order_by(OrdenPago.fecha_emision.desc(), OrdenPago.id.desc())
+    )
+    if cursor:
+        q = q.where(_keyset_desc(orden, _posicion(cursor, ("f", "i"))))
+
+    ops = list((await db.execute(q.limit(limite + 1))).scalars().all())
+    siguiente = None
+    if len(ops) > limite:
+        ops = ops[:limite]
+        siguiente = encode_payload({"f": ops[-1].fecha_emision.isoformat(), "i": ops[-1].id})
+
+    return [
+        {
+            "id": op.id,
+            "numero": op.numero,
+            "fecha_emision": op.fecha_emision.isoformat() if op.fecha_emision else None,
+            "fecha_vencimiento": op.fecha_vencimiento.isoformat() if op.fecha_vencimiento else None,
+            "fecha_pago": op.fecha_pago.isoformat() if op.fecha_pago else None,
+            "concepto": op.concepto,
+            "monto_pesos": str(Decimal(op.monto_pesos or 0)),
+            "estado": _valor(op.estado),
+            "etapa_contable": _valor(op.etapa_contable),
+            "nro_factura": op.nro_factura,
+            "gasto_id": op.gasto_id,
+        }
+        for op in ops
+    ], siguiente
+
+
+# ============================================================
+# Mantenimiento incremental (listener)
+# ============================================================
+
+_ATRIBUTOS_OP = ("estado", "etapa_contable", "monto_pesos", "destino_contacto_id", "destino_tipo", "municipio_id")
+
+
+def _recolectar(cambios: Cambios) -> Set[int]:
+    """Contactos (destino actual y anterior) de las OPs que cambiaron."""
+    contactos: Set[int] = set()
+    for obj in cambios.todos():
+        if obj in cambios.modificados and not cambio_alguno(obj, _ATRIBUTOS_OP):
+            continue
+        contactos |= valores(obj, "destino_contacto_id")
+    return contactos
+
+
+# Una OP que se aprueba o paga aunque falle el snapshot (ej.
+# contacto_cuenta_corriente sin migrar) queda guardada; `totales` calcula en
+# el momento si falta la fila y `reconstruir` la rehace.
+registrar("cuenta_corriente", (OrdenPago,), _recolectar, _recalcular_sync)
@@ -0,0 +1,559 @@
+"""Motor de disponibilidad de empleados: jornada - ausencias - trabajo programado.
+
+Antes cada endpoint lo calculaba a su manera: `/turnos/disponibilidad`
+traía todos los empleados activos (de todos los municipios), cargaba
+`empleado.categorias` fila por fila, asumía 09:00-18:00 para todos y no
+miraba las tareas (TODO); `/empleados/disponibilidad` dejaba la carga en 0
+y la planificación semanal leía las ausencias de un módulo inexistente.
+
+Ahora todo sale de `calcular_disponibilidad(db, municipio_id, desde, hasta)`,
+que para un rango de fechas hace una cantidad FIJA de queries (empleados,
+categorías, horarios, ausencias, reclamos, OTs y miembros de cuadrilla),
+sin importar cuántos empleados o días haya, y arma por empleado y día:
+
+  - `jornada`: intervalos de trabajo de `EmpleadoHorario` para ese día de
+    la semana (sin horarios cargados: `Empleado.hora_entrada/salida` o
+    settings.DISPONIBILIDAD_JORNADA_DEFAULT, de lunes a viernes).
+  - una ausencia APROBADA que cubra la fecha anula la jornada.
+  - `bloques`: reclamos y OTs programados (fecha + hora) del empleado; una
+    OT de cuadrilla ocupa a todos sus miembros activos.
+  - `libres` = jornada - bloques, con aritmética de intervalos en minutos.
+
+Los resultados se cachean por (municipio, fecha) en el proceso. La
+invalidación post-commit de abajo (core/denormalizacion) descarta las
+fechas tocadas cuando cambia
+una asignación (empleado/fecha/hora/estado de un reclamo u OT) y el
+municipio entero cuando cambian empleados, horarios o ausencias;
+settings.DISPONIBILIDAD_CACHE_TTL_S cubre lo hecho desde otras instancias.
+"""
+import logging
+import time as _time
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import func, inspect, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.denormalizacion import Cambios, registrar_invalidacion
+from models.categoria_reclamo import CategoriaReclamo
+from models.empleado import Empleado
+from models.empleado_ausencia import EmpleadoAusencia
+from models.empleado_categoria import empleado_categoria
+from models.empleado_cuadrilla import EmpleadoCuadrilla
+from models.empleado_horario import EmpleadoHorario
+from models.enums import EstadoOrdenTrabajo, EstadoReclamo
+from models.orden_trabajo import OrdenTrabajo
+from models.reclamo import Reclamo
+
+logger = logging.getLogger(__name__)
+
+# Intervalo [inicio, fin) en minutos desde las 00:00
+Intervalo = Tuple[int, int]
+
+DIA_COMPLETO = 24 * 60
+# Tarea programada sin hora de fin
+DURACION_TAREA_DEFAULT = 60
+# Hueco mínimo que se ofrece como slot
+SLOT_MINIMO = 30
+
+ESTADOS_RECLAMO_PROGRAMADO = [
+    EstadoReclamo.RECIBIDO,
+    EstadoReclamo.EN_CURSO,
+    EstadoReclamo.POSPUESTO,
+    EstadoReclamo.NUEVO,      # legacy
+    EstadoReclamo.ASIGNADO,   # legacy
+    EstadoReclamo.EN_PROCESO,  # legacy
+]
+ESTADOS_OT_PROGRAMADA = [
+    EstadoOrdenTrabajo.PENDIENTE,
+    EstadoOrdenTrabajo.ASIGNADA,
+    EstadoOrdenTrabajo.EN_CURSO,
+]
+
+
+# ============================================================
+# Aritmética de intervalos
+# ============================================================
+
+def minutos(t: time) -> int:
+    return t.hour * 60 + t.minute
+
+
+def hhmm(m: int) -> str:
+    if m >= DIA_COMPLETO:
+        return "24:00"
+    return f"{m // 60:02d}:{m % 60:02d}"
+
+
+def unir(intervalos: Iterable[Intervalo]) -> List[Intervalo]:
+    """Ordena y fusiona intervalos solapados o contiguos."""
+    resultado: List[Intervalo] = []
+    for inicio, fin in sorted(i for i in intervalos if i[1] > i[0]):
+        if resultado and inicio <= resultado[-1][1]:
+            if fin > resultado[-1][1]:
+                resultado[-1] = (resultado[-1][0], fin)
+        else:
+            resultado.append((inicio, fin))
+    return resultado
+
+
+def restar(base: Sequence[Intervalo], quitar: Sequence[Intervalo]) -> List[Intervalo]:
+    """`base` - `quitar`. Ambos deben venir de `unir()` (ordenados, disjuntos)."""
+    resultado: List[Intervalo] = []
+    j = 0
+    for inicio, fin in base:
+        cursor = inicio
+        while j < len(quitar) and quitar[j][1] <= cursor:
+            j += 1
+        k = j
+        while k < len(quitar) and quitar[k][0] < fin:
+            if quitar[k][0] > cursor:
+                resultado.append((cursor, quitar[k][0]))
+            cursor = max(cursor, quitar[k][1])
+            k += 1
+        if cursor < fin:
+            resultado.append((cursor, fin))
+    return resultado
+
+
+def intersectar(a: Sequence[Intervalo], b: Sequence[Intervalo]) -> List[Intervalo]:
+    """a ∩ b. Ambos deben venir de `unir()`."""
+    resultado: List[Intervalo] = []
+    i = j = 0
+    while i < len(a) and j < len(b):
+        inicio = max(a[i][0], b[j][0])
+        fin = min(a[i][1], b[j][1])
+        if inicio < fin:
+            resultado.append((inicio, fin))
+        if a[i][1] < b[j][1]:
+            i += 1
+        else:
+            j += 1
+    return resultado
+
+
+def total(intervalos: Iterable[Intervalo]) -> int:
+    return sum(fin - inicio for inicio, fin in intervalos)
+
+
+def _tramo(entrada: Optional[time], salida: Optional[time]) -> Optional[Intervalo]:
+    """Intervalo de una jornada; salida <= entrada (turno noche) corta a las 24:00."""
+    if entrada is None or salida is None:
+        return None
+    inicio, fin = minutos(entrada), minutos(salida)
+    if fin <= inicio:
+        fin = DIA_COMPLETO
+    return (inicio, fin)
+
+
+def _jornada_default() -> Intervalo:
+    entrada, salida = settings.DISPONIBILIDAD_JORNADA_DEFAULT.split("-")
+    return _tramo(
+        datetime.strptime(entrada.strip(), "%H:%M").time(),
+        datetime.strptime(salida.strip(), "%H:%M").time(),
+    )
+
+
+# ============================================================
+# Resultado
+# ============================================================
+
+@dataclass
+class EmpleadoInfo:
+    id: int
+    nombre: str
+    especialidad: Optional[str]
+    tipo: Optional[str]
+    zona_id: Optional[int]
+    capacidad_maxima: int
+    categoria_ids: Set[int] = field(default_factory=set)
+    categorias: List[str] = field(default_factory=list)
+
+
+@dataclass
+class Bloque:
+    tipo: str            # "reclamo" | "ot"
+    id: int
+    titulo: str
+    inicio: int
+    fin: int
+    estado: Optional[str] = None
+    prioridad: Optional[object] = None
+
+    @property
+    def hora_inicio(self) -> str:
+        return hhmm(self.inicio)
+
+    @property
+    def hora_fin(self) -> str:
+        return hhmm(self.fin)
+
+
+@dataclass
+class DiaEmpleado:
+    empleado_id: int
+    fecha: date
+    jornada: List[Intervalo]
+    ausencia: Optional[str] = None       # tipo de la ausencia aprobada
+    bloques: List[Bloque] = field(default_factory=list)
+    libres: List[Intervalo] = field(default_factory=list)
+    minutos_ocupados: int = 0            # bloques dentro de la jornada
+
+    @property
+    def minutos_jornada(self) -> int:
+        return total(self.jornada)
+
+    @property
+    def minutos_libres(self) -> int:
+        return total(self.libres)
+
+    @property
+    def ocupacion(self) -> float:
+        """Porcentaje de la jornada ocupado (0 sin jornada)."""
+        jornada = self.minutos_jornada
+        return round(self.minutos_ocupados * 100 / jornada, 1) if jornada else 0.0
+
+    def slots(self, minimo: int = SLOT_MINIMO) -> List[Intervalo]:
+        return [(i, f) for i, f in self.libres if f - i >= minimo]
+
+    def puede_recibir(self, duracion: int = DURACION_TAREA_DEFAULT) -> bool:
+        return any(f - i >= duracion for i, f in self.libres)
+
+
+@dataclass
+class DisponibilidadDia:
+    municipio_id: int
+    fecha: date
+    empleados: Dict[int, EmpleadoInfo]
+    dias: Dict[int, DiaEmpleado]
+
+    def filtrar(
+        self,
+        categoria_id: Optional[int] = None,
+        zona_id: Optional[int] = None,
+        tipo: Optional[str] = None,
+        empleado_ids: Optional[Iterable[int]] = None,
+    ) -> List[Tuple[EmpleadoInfo, DiaEmpleado]]:
+        ids = set(empleado_ids) if empleado_ids is not None else None
+        return [
+            (emp, self.dias[emp.id])
+            for emp in self.empleados.values()
+            if (categoria_id is None or categoria_id in emp.categoria_ids)
+            and (zona_id is None or emp.zona_id == zona_id)
+            and (tipo is None or emp.tipo == tipo)
+            and (ids is None or emp.id in ids)
+        ]
+
+
+# ============================================================
+# Cálculo (cantidad fija de queries por rango)
+# ============================================================
+
+def _fechas(desde: date, hasta: date) -> List[date]:
+    return [desde + timedelta(days=i) for i in range((hasta - desde).days + 1)]
+
+
+async def _construir(db: AsyncSession, municipio_id: int, desde: date, hasta: date) -> Dict[date, DisponibilidadDia]:
+    empleados_rows = (await db.execute(
+        select(
+            Empleado.id, Empleado.nombre, Empleado.apellido, Empleado.especialidad, Empleado.tipo,
+            Empleado.zona_id, Empleado.capacidad_maxima, Empleado.hora_entrada, Empleado.hora_salida,
+        )
+        .where(Empleado.municipio_id == municipio_id, Empleado.activo == True)
+        .order_by(Empleado.nombre, Empleado.id)
+    )).all()
+    empleados: Dict[int, EmpleadoInfo] = {}
+    fallback: Dict[int, Optional[Intervalo]] = {}
+    for row in empleados_rows:
+        empleados[row.id] = EmpleadoInfo(
+            id=row.id,
+            nombre=f"{row.nombre} {row.apellido or ''}".strip(),
+            especialidad=row.especialidad,
+            tipo=row.tipo,
+            zona_id=row.zona_id,
+            capacidad_maxima=row.capacidad_maxima or 10,
+        )
+        fallback[row.id] = _tramo(row.hora_entrada, row.hora_salida)
+
+    if not empleados:
+        return {f: DisponibilidadDia(municipio_id, f, {}, {}) for f in _fechas(desde, hasta)}
+
+    # Subquery en vez de IN (...ids...): no crece con la cantidad de empleados
+    ids_muni = select(Empleado.id).where(Empleado.municipio_id == municipio_id, Empleado.activo == True)
+
+    for emp_id, cat_id, cat_nombre in (await db.execute(
+        select(empleado_categoria.c.empleado_id, CategoriaReclamo.id, CategoriaReclamo.nombre)
+        .join(CategoriaReclamo, CategoriaReclamo.id == empleado_categoria.c.categoria_id)
+        .where(empleado_categoria.c.empleado_id.in_(ids_muni))
+    )).all():
+        emp = empleados.get(emp_id)
+        if emp is not None:
+            emp.categoria_ids.add(cat_id)
+            emp.categorias.append(cat_nombre)
+
+    # Horarios por (empleado, día de semana). Quien tiene alguna fila cargada
+    # sólo trabaja los días activos que figuran.
+    horarios: Dict[int, Dict[int, List[Intervalo]]] = {}
+    for h in (await db.execute(
+        select(EmpleadoHorario.empleado_id, EmpleadoHorario.dia_semana, EmpleadoHorario.hora_entrada,
+               EmpleadoHorario.hora_salida, EmpleadoHorario.activo)
+        .where(EmpleadoHorario.empleado_id.in_(ids_muni))
+    )).all():
+        por_dia = horarios.setdefault(h.empleado_id, {})
+        tramo = _tramo(h.hora_entrada, h.hora_salida)
+        if h.activo and tramo:
+            por_dia.setdefault(h.dia_semana, []).append(tramo)
+
+    ausencias = (await db.execute(
+        select(EmpleadoAusencia.empleado_id, EmpleadoAusencia.tipo,
+               EmpleadoAusencia.fecha_inicio, EmpleadoAusencia.fecha_fin)
+        .where(
+            EmpleadoAusencia.empleado_id.in_(ids_muni),
+            EmpleadoAusencia.aprobado == True,
+            EmpleadoAusencia.fecha_inicio <= hasta,
+            EmpleadoAusencia.fecha_fin >= desde,
+        )
+    )).all()
+
+    reclamos = (await db.execute(
+        select(Reclamo.id, Reclamo.titulo, Reclamo.empleado_id, Reclamo.fecha_programada,
+               Reclamo.hora_inicio, Reclamo.hora_fin, Reclamo.estado, Reclamo.prioridad)
+        .where(
+            Reclamo.municipio_id == municipio_id,
+            Reclamo.empleado_id.isnot(None),
+            Reclamo.fecha_programada >= desde,
+            Reclamo.fecha_programada <= hasta,
+            Reclamo.hora_inicio.isnot(None),
+            Reclamo.estado.in_(ESTADOS_RECLAMO_PROGRAMADO),
+        )
+    )).all()
+
+    ots = (await db.execute(
+        select(OrdenTrabajo.id, OrdenTrabajo.numero, OrdenTrabajo.titulo, OrdenTrabajo.empleado_id,
+               OrdenTrabajo.cuadrilla_id, OrdenTrabajo.fecha_programada, OrdenTrabajo.hora_inicio,
+               OrdenTrabajo.hora_fin, OrdenTrabajo.estado, OrdenTrabajo.prioridad)
+        .where(
+            OrdenTrabajo.municipio_id == municipio_id,
+            or_(OrdenTrabajo.empleado_id.isnot(None), OrdenTrabajo.cuadrilla_id.isnot(None)),
+            OrdenTrabajo.fecha_programada >= desde,
+            OrdenTrabajo.fecha_programada <= hasta,
+            OrdenTrabajo.hora_inicio.isnot(None),
+            OrdenTrabajo.estado.in_(ESTADOS_OT_PROGRAMADA),
+        )
+    )).all()
+
+    miembros: Dict[int, List[int]] = {}
+    cuadrillas = {ot.cuadrilla_id for ot in ots if ot.cuadrilla_id is not None}
+    if cuadrillas:
+        for cuadrilla_id, emp_id in (await db.execute(
+            select(EmpleadoCuadrilla.cuadrilla_id, EmpleadoCuadrilla.empleado_id)
+            .where(EmpleadoCuadrilla.cuadrilla_id.in_(cuadrillas), EmpleadoCuadrilla.activo == True)
+        )).all():
+            miembros.setdefault(cuadrilla_id, []).append(emp_id)
+
+    # Bloques por (empleado, fecha)
+    bloques: Dict[Tuple[int, date], List[Bloque]] = {}
+
+    def _agregar(emp_id: int, fecha: date, bloque: Bloque) -> None:
+        if emp_id in empleados:
+            bloques.setdefault((emp_id, fecha), []).append(bloque)
+
+    for r in reclamos:
+        inicio = minutos(r.hora_inicio)
+        fin = minutos(r.hora_fin) if r.hora_fin else inicio + DURACION_TAREA_DEFAULT
+        _agregar(r.empleado_id, r.fecha_programada, Bloque(
+            "reclamo", r.id, r.titulo, inicio, max(fin, inicio),
+            estado=getattr(r.estado, "value", r.estado), prioridad=r.prioridad,
+        ))
+    for ot in ots:
+        inicio = minutos(ot.hora_inicio)
+        fin = minutos(ot.hora_fin) if ot.hora_fin else inicio + DURACION_TAREA_DEFAULT
+        bloque = Bloque(
+            "ot", ot.id, f"{ot.numero} {ot.titulo}", inicio, max(fin, inicio),
+            estado=getattr(ot.estado, "value", ot.estado), prioridad=getattr(ot.prioridad, "value", ot.prioridad),
+        )
+        destinatarios = set(miembros.get(ot.cuadrilla_id, ()))
+        if ot.empleado_id is not None:
+            destinatarios.add(ot.empleado_id)
+        for emp_id in destinatarios:
+            _agregar(emp_id, ot.fecha_programada, bloque)
+
+    ausentes: Dict[Tuple[int, date], str] = {}
+    default = _jornada_default()
+    resultado: Dict[date, DisponibilidadDia] = {}
+    for fecha in _fechas(desde, hasta):
+        for a in ausencias:
+            if a.fecha_inicio <= fecha <= a.fecha_fin:
+                ausentes.setdefault((a.empleado_id, fecha), a.tipo)
+
+        dias: Dict[int, DiaEmpleado] = {}
+        for emp_id in empleados:
+            if emp_id in horarios:
+                jornada = unir(horarios[emp_id].get(fecha.weekday(), ()))
+            elif fecha.weekday() < 5:
+                jornada = [fallback[emp_id] or default]
+            else:
+                jornada = []
+            ausencia = ausentes.get((emp_id, fecha))
+            if ausencia:
+                jornada = []
+
+            dia_bloques = sorted(bloques.get((emp_id, fecha), ()), key=lambda b: (b.inicio, b.fin))
+            ocupado = unir((b.inicio, b.fin) for b in dia_bloques)
+            dias[emp_id] = DiaEmpleado(
+                empleado_id=emp_id,
+                fecha=fecha,
+                jornada=jornada,
+                ausencia=ausencia,
+                bloques=dia_bloques,
+                libres=restar(jornada, ocupado),
+                minutos_ocupados=total(intersectar(jornada, ocupado)),
+            )
+        resultado[fecha] = DisponibilidadDia(municipio_id, fecha, empleados, dias)
+    return resultado
+
+
+_cache: Dict[Tuple[int, date], Tuple[float, DisponibilidadDia]] = {}
+
+
+async def calcular_disponibilidad(
+    db: AsyncSession, municipio_id: int, desde: date, hasta: Optional[date] = None,
+) -> Dict[date, DisponibilidadDia]:
+    """Disponibilidad del municipio por fecha, de `desde` a `hasta` inclusive.
+
+    Las fechas en cache se reusan; las que faltan se calculan juntas (una
+    sola tanda de queries para el rango faltante).
+    """
+    hasta = hasta or desde
+    ahora = _time.monotonic()
+    resultado: Dict[date, DisponibilidadDia] = {}
+    faltantes: List[date] = []
+    for fecha in _fechas(desde, hasta):
+        entrada = _cache.get((municipio_id, fecha))
+        if entrada is not None and ahora < entrada[0]:
+            resultado[fecha] = entrada[1]
+        else:
+            faltantes.append(fecha)
+
+    if faltantes:
+        # De paso se descartan las entradas vencidas (fechas que nadie pidió más)
+        for clave in [c for c, (vence, _) in _cache.items() if vence <= ahora]:
+            _cache.pop(clave, None)
+        nuevos = await _construir(db, municipio_id, faltantes[0], faltantes[-1])
+        vence = _time.monotonic() + settings.DISPONIBILIDAD_CACHE_TTL_S
+        for fecha, dia in nuevos.items():
+            _cache[(municipio_id, fecha)] = (vence, dia)
+            resultado[fecha] = dia
+    return dict(sorted(resultado.items()))
+
+
+async def disponibilidad_dia(db: AsyncSession, municipio_id: int, fecha: date) -> DisponibilidadDia:
+    return (await calcular_disponibilidad(db, municipio_id, fecha))[fecha]
+
+
+async def carga_pendiente(db: AsyncSession, municipio_id: int) -> Dict[int, int]:
+    """Reclamos activos + OTs abiertas asignadas a cada empleado (2 queries).
+
+    Es la "carga" contra `Empleado.capacidad_maxima`, independiente de fechas.
+    """
+    carga: Dict[int, int] = {}
+    for emp_id, cantidad in (await db.execute(
+        select(Reclamo.empleado_id, func.count(Reclamo.id))
+        .where(
+            Reclamo.municipio_id == municipio_id,
+            Reclamo.empleado_id.isnot(None),
+            Reclamo.estado.in_(ESTADOS_RECLAMO_PROGRAMADO),
+        )
+        .group_by(Reclamo.empleado_id)
+    )).all():
+        carga[emp_id] = carga.get(emp_id, 0) + cantidad
+    for emp_id, cantidad in (await db.execute(
+        select(OrdenTrabajo.empleado_id, func.count(OrdenTrabajo.id))
+        .where(
+            OrdenTrabajo.municipio_id == municipio_id,
+            OrdenTrabajo.empleado_id.isnot(None),
+            OrdenTrabajo.estado.in_(ESTADOS_OT_PROGRAMADA),
+        )
+        .group_by(OrdenTrabajo.empleado_id)
+    )).all():
+        carga[emp_id] = carga.get(emp_id, 0) + cantidad
+    return carga
+
+
+def invalidar(municipio_id: Optional[int] = None, fechas: Optional[Iterable[date]] = None) -> None:
+    """Descarta la cache: todo, un municipio, o fechas puntuales de un municipio."""
+    if municipio_id is None:
+        _cache.clear()
+    elif fechas is None:
+        for clave in [c for c in _cache if c[0] == municipio_id]:
+            _cache.pop(clave, None)
+    else:
+        for fecha in fechas:
+            _cache.pop((municipio_id, fecha), None)
+
+
+# ============================================================
+# Invalidación por cambios de asignación
+# ============================================================
+
+# Columnas de reclamos/OTs que mueven la disponibilidad
+_CAMPOS_ASIGNACION = ("empleado_id", "cuadrilla_id", "fecha_programada", "hora_inicio", "hora_fin", "estado")
+# Municipio entero (None = todos): horarios y ausencias no tienen municipio_id
+_TODO = object()
+
+
+def _fechas_tocadas(obj, nuevo_o_borrado: bool) -> Optional[Set[date]]:
+    """Fechas (vieja y nueva) de un reclamo/OT si cambió su asignación."""
+    estado = inspect(obj)
+    if not nuevo_o_borrado:
+        cambio = any(
+            estado.attrs[c].history.has_changes()
+            for c in _CAMPOS_ASIGNACION if c in estado.attrs
+        )
+        if not cambio:
+            return None
+    historia = estado.attrs.fecha_programada.history
+    fechas = {f for f in (*historia.added, *historia.unchanged, *historia.deleted) if f}
+    if obj.fecha_programada:
+        fechas.add(obj.fecha_programada)
+    return fechas
+
+
+def _recolectar(cambios: Cambios) -> Dict[Optional[int], Any]:
+    """Qué invalidar: {municipio: fechas | _TODO}, None = todos los municipios."""
+    pendientes: Dict[Optional[int], Any] = {}
+    for coleccion, nuevo_o_borrado in (
+        (cambios.nuevos, True), (cambios.modificados, False), (cambios.borrados, True),
+    ):
+        for obj in coleccion:
+            if isinstance(obj, (Reclamo, OrdenTrabajo)):
+                if obj.municipio_id is None:
+                    continue
+                fechas = _fechas_tocadas(obj, nuevo_o_borrado)
+                if fechas:
+                    actual = pendientes.setdefault(obj.municipio_id, set())
+                    if actual is not _TODO:
+                        actual.update(fechas)
+            elif isinstance(obj, Empleado):
+                pendientes[obj.municipio_id] = _TODO
+            else:
+                pendientes[None] = _TODO
+    return pendientes
+
+
+def _invalidar(pendientes: List[Dict[Optional[int], Any]]) -> None:
+    if any(None in p for p in pendientes):
+        invalidar()
+        return
+    for p in pendientes:
+        for municipio_id, fechas in p.items():
+            invalidar(municipio_id, None if fechas is _TODO else fechas)
+
+
+registrar_invalidacion(
+    "disponibilidad",
+    (Reclamo, OrdenTrabajo, Empleado, EmpleadoHorario, EmpleadoAusencia, EmpleadoCuadrilla),
+    _recolectar, _invalidar,
+)
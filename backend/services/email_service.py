@@ -1,4 +1,5 @@
 """Servicio de envío de emails"""
+import asyncio
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
@@ -78,17 +79,54 @@ class EmailService:
         body_html: str,
         body_text: Optional[str] = None
     ) -> dict:
-        """Enviar email a múltiples destinatarios"""
+        """Enviar el mismo email a múltiples destinatarios.
+
+        Usa UNA conexión SMTP para todos (antes: login + quit por email) y
+        corre en un thread para no bloquear el event loop.
+        """
+        return await asyncio.to_thread(self._send_bulk_sync, to_emails, subject, body_html, body_text)
+
+    def _send_bulk_sync(
+        self,
+        to_emails: List[str],
+        subject: str,
+        body_html: str,
+        body_text: Optional[str] = None
+    ) -> dict:
         results = {"sent": 0, "failed": 0, "errors": []}
+        if not to_emails:
+            return results
 
-        for email in to_emails:
-            success = await self.send_email(email, subject, body_html, body_text)
-            if success:
-                results["sent"] += 1
-            else:
-                results["failed"] += 1
-                results["errors"].append(email)
+        server = self._get_connection()
+        if not server:
+            logger.warning(f"Emails no enviados (SMTP no configurado): {subject} -> {len(to_emails)} destinatarios")
+            results["failed"] = len(to_emails)
+            results["errors"] = list(to_emails)
+            return results
 
+        try:
+            for email in to_emails:
+                msg = MIMEMultipart('alternative')
+                msg['Subject'] = subject
+                msg['From'] = f"{self.from_name} <{self.from_email}>"
+                msg['To'] = email
+                if body_text:
+                    msg.attach(MIMEText(body_text, 'plain'))
+                msg.attach(MIMEText(body_html, 'html'))
+                try:
+                    server.sendmail(self.from_email, email, msg.as_string())
+                    results["sent"] += 1
+                except Exception as e:
+                    logger.error(f"Error enviando email a {email}: {e}")
+                    results["failed"] += 1
+                    results["errors"].append(email)
+        finally:
+            try:
+                server.quit()
+            except Exception:
+                pass
+
+        logger.info(f"Email masivo: {subject} -> {results['sent']} enviados, {results['failed']} fallidos")
         return results
 
 
@@ -0,0 +1,225 @@
+"""
+Ranking materializado de gamificación (sorted set por municipio y período).
+
+`/gamificacion/mi-posicion`, `/leaderboard` y el perfil recalculaban el
+top-100 (JOIN + GROUP BY sobre puntos_usuarios y badges) en cada request,
+y si el vecino no estaba en el top hacían un COUNT de todos los de arriba.
+Ahora hay un sorted set por (municipio, "mes"|"total"):
+
+    gamif:ranking:{municipio_id}:{periodo}  ->  {user_id: puntos}
+
+- `GamificacionService` escribe el puntaje ABSOLUTO del usuario cada vez que
+  cambian sus puntos (`registrar`), así una escritura perdida o de una
+  transacción que hizo rollback se corrige sola en la siguiente.
+- "Mi posición" es un ZREVRANK y una página del leaderboard un ZREVRANGE:
+  O(log n) (+ el tamaño de la página).
+- Si la clave no existe (Redis vacío, instancia recién levantada) se
+  reconstruye desde puntos_usuarios con un solo SELECT; el reset mensual
+  también la reconstruye de una vez.
+
+Backends (settings.RANKING_BACKEND):
+  "redis"   — ZSET compartido entre instancias (producción).
+  "memoria" — lista ordenada + bisect por proceso (dev/tests/1 instancia).
+              Se reconstruye cada RANKING_MEMORIA_TTL_S para no divergir
+              de lo que escriben otras instancias.
+
+Empates: a igual puntaje va primero el user_id más alto en los dos backends
+(en Redis el miembro es el user_id con ceros a la izquierda, y ZREVRANGE
+desempata por orden lexicográfico inverso).
+"""
+import bisect
+import logging
+import time
+from secrets import token_hex
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from models.gamificacion import PuntosUsuario
+
+logger = logging.getLogger(__name__)
+
+PERIODOS = ("mes", "total")
+# Miembros por ZADD al reconstruir
+LOTE_ZADD = 5000
+
+
+def _clave(municipio_id: int, periodo: str) -> str:
+    return f"gamif:ranking:{municipio_id}:{periodo}"
+
+
+class MemoriaRankingBackend:
+    """Sorted set en memoria: dict de puntajes + lista ordenada por
+    (-puntos, -user_id) para bisect."""
+
+    def __init__(self, ttl_s: Optional[float] = None):
+        self.ttl_s = ttl_s
+        self._puntos: Dict[str, Dict[int, int]] = {}
+        self._orden: Dict[str, List[Tuple[int, int]]] = {}
+        self._construida: Dict[str, float] = {}
+
+    async def existe(self, clave: str) -> bool:
+        t = self._construida.get(clave)
+        if t is None:
+            return False
+        return self.ttl_s is None or time.monotonic() - t < self.ttl_s
+
+    async def fijar(self, clave: str, user_id: int, puntos: int) -> None:
+        if clave not in self._puntos:
+            # Sin construir: la próxima lectura la arma completa desde la DB
+            return
+        actuales = self._puntos[clave]
+        orden = self._orden[clave]
+        previo = actuales.get(user_id)
+        if previo is not None:
+            i = bisect.bisect_left(orden, (-previo, -user_id))
+            del orden[i]
+        actuales[user_id] = puntos
+        bisect.insort(orden, (-puntos, -user_id))
+
+    async def posicion(self, clave: str, user_id: int) -> Optional[int]:
+        puntos = self._puntos.get(clave, {}).get(user_id)
+        if puntos is None:
+            return None
+        return bisect.bisect_left(self._orden[clave], (-puntos, -user_id))
+
+    async def puntaje(self, clave: str, user_id: int) -> Optional[int]:
+        return self._puntos.get(clave, {}).get(user_id)
+
+    async def rango(self, clave: str, inicio: int, cantidad: int) -> List[Tuple[int, int]]:
+        return [(-uid, -p) for p, uid in self._orden.get(clave, [])[inicio:inicio + cantidad]]
+
+    async def cantidad(self, clave: str) -> int:
+        return len(self._orden.get(clave, []))
+
+    async def reemplazar(self, clave: str, puntajes: Dict[int, int]) -> None:
+        self._puntos[clave] = dict(puntajes)
+        self._orden[clave] = sorted((-p, -uid) for uid, p in puntajes.items())
+        self._construida[clave] = time.monotonic()
+
+
+class RedisRankingBackend:
+    """ZSET de Redis (redis.asyncio). El miembro es el user_id con padding
+    para que el desempate lexicográfico coincida con el numérico."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self._cliente = None
+
+    def _r(self):
+        if self._cliente is None:
+            import redis.asyncio as aioredis
+            self._cliente = aioredis.from_url(self.url)
+        return self._cliente
+
+    @staticmethod
+    def _miembro(user_id: int) -> str:
+        return f"{user_id:010d}"
+
+    async def existe(self, clave: str) -> bool:
+        return bool(await self._r().exists(clave))
+
+    async def fijar(self, clave: str, user_id: int, puntos: int) -> None:
+        # Solo si la clave ya existe: ZADD crearía un set con un único
+        # miembro que taparía la reconstrucción
+        if await self._r().exists(clave):
+            await self._r().zadd(clave, {self._miembro(user_id): puntos})
+
+    async def posicion(self, clave: str, user_id: int) -> Optional[int]:
+        return await self._r().zrevrank(clave, self._miembro(user_id))
+
+    async def puntaje(self, clave: str, user_id: int) -> Optional[int]:
+        p = await self._r().zscore(clave, self._miembro(user_id))
+        return int(p) if p is not None else None
+
+    async def rango(self, clave: str, inicio: int, cantidad: int) -> List[Tuple[int, int]]:
+        filas = await self._r().zrevrange(clave, inicio, inicio + cantidad - 1, withscores=True)
+        return [(int(m), int(p)) for m, p in filas]
+
+    async def cantidad(self, clave: str) -> int:
+        return await self._r().zcard(clave)
+
+    async def reemplazar(self, clave: str, puntajes: Dict[int, int]) -> None:
+        """Arma el set en una clave temporal y la renombra (atómico para
+        los lectores)."""
+        r = self._r()
+        if not puntajes:
+            await r.delete(clave)
+            return
+        tmp = f"{clave}:tmp:{token_hex(4)}"
+        items = list(puntajes.items())
+        async with r.pipeline(transaction=False) as pipe:
+            for i in range(0, len(items), LOTE_ZADD):
+                pipe.zadd(tmp, {self._miembro(uid): p for uid, p in items[i:i + LOTE_ZADD]})
+            pipe.rename(tmp, clave)
+            await pipe.execute()
+
+
+def _crear_backend():
+    if settings.RANKING_BACKEND == "redis":
+        return RedisRankingBackend(settings.REDIS_URL)
+    return MemoriaRankingBackend(ttl_s=settings.RANKING_MEMORIA_TTL_S)
+
+
+class RankingGamificacion:
+    def __init__(self, backend=None):
+        self.backend = backend or _crear_backend()
+
+    async def registrar(self, puntos: PuntosUsuario) -> None:
+        """Puntaje absoluto del usuario en los dos períodos. No falla: si
+        el store no responde, el ranking se corrige en la próxima
+        reconstrucción."""
+        try:
+            await self.backend.fijar(_clave(puntos.municipio_id, "mes"), puntos.user_id, puntos.puntos_mes_actual)
+            await self.backend.fijar(_clave(puntos.municipio_id, "total"), puntos.user_id, puntos.puntos_totales)
+        except Exception as e:
+            logger.warning(f"[ranking] no se pudo actualizar user {puntos.user_id}: {e}")
+
+    async def reconstruir(self, db: AsyncSession, municipio_id: int) -> int:
+        """Rearma los dos rankings del municipio con un SELECT."""
+        rows = (await db.execute(
+            select(PuntosUsuario.user_id, PuntosUsuario.puntos_mes_actual, PuntosUsuario.puntos_totales)
+            .where(PuntosUsuario.municipio_id == municipio_id)
+        )).all()
+        await self.backend.reemplazar(_clave(municipio_id, "mes"), {uid: mes for uid, mes, _ in rows})
+        await self.backend.reemplazar(_clave(municipio_id, "total"), {uid: tot for uid, _, tot in rows})
+        return len(rows)
+
+    async def _asegurar(self, db: AsyncSession, municipio_id: int, periodo: str) -> str:
+        clave = _clave(municipio_id, periodo if periodo in PERIODOS else "total")
+        if not await self.backend.existe(clave):
+            await self.reconstruir(db, municipio_id)
+        return clave
+
+    async def top(
+        self,
+        db: AsyncSession,
+        municipio_id: int,
+        periodo: str = "mes",
+        limite: int = 10,
+        offset: int = 0,
+    ) -> List[Tuple[int, int, int]]:
+        """[(posicion, user_id, puntos)] de la página pedida."""
+        clave = await self._asegurar(db, municipio_id, periodo)
+        filas = await self.backend.rango(clave, offset, limite)
+        return [(offset + i + 1, uid, p) for i, (uid, p) in enumerate(filas)]
+
+    async def posicion(
+        self,
+        db: AsyncSession,
+        municipio_id: int,
+        user_id: int,
+        periodo: str = "mes",
+    ) -> Optional[int]:
+        """Posición 1-based del usuario, o None si no tiene puntos_usuarios."""
+        clave = await self._asegurar(db, municipio_id, periodo)
+        rank = await self.backend.posicion(clave, user_id)
+        return rank + 1 if rank is not None else None
+
+    async def total_participantes(self, db: AsyncSession, municipio_id: int) -> int:
+        return await self.backend.cantidad(await self._asegurar(db, municipio_id, "total"))
+
+
+ranking = RankingGamificacion()
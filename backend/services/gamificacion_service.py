@@ -3,7 +3,7 @@ Servicio de Gamificación
 Lógica de negocio para puntos, badges y leaderboard
 """
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_
+from sqlalchemy import select, func, insert, update
 from sqlalchemy.orm import selectinload
 from datetime import datetime, timedelta
 from typing import Optional, List, Tuple
@@ -15,6 +15,7 @@ from models.gamificacion import (
 from models.reclamo import Reclamo
 from models.user import User
 from models.categoria_reclamo import CategoriaReclamo as Categoria
+from services.gamificacion_ranking import ranking
 
 
 class GamificacionService:
@@ -44,6 +45,7 @@ class GamificacionService:
             )
             db.add(puntos)
             await db.flush()
+            await ranking.registrar(puntos)
 
         return puntos
 
@@ -120,6 +122,7 @@ class GamificacionService:
                 db.add(historial_badge)
 
         await db.flush()
+        await ranking.registrar(puntos_usuario)
         return puntos_base, nuevos_badges
 
     @staticmethod
@@ -272,56 +275,83 @@ class GamificacionService:
         municipio_id: int,
         zona_id: Optional[int] = None,
         limite: int = 10,
-        periodo: str = "mes"  # "mes", "semana", "total"
+        periodo: str = "mes",  # "mes", "semana", "total"
+        offset: int = 0,
     ) -> List[dict]:
-        """Obtiene el leaderboard de usuarios"""
-        # Construir query base
-        query = select(
-            PuntosUsuario.user_id,
-            User.nombre,
-            User.apellido,
-            PuntosUsuario.puntos_totales,
-            PuntosUsuario.puntos_mes_actual,
-            PuntosUsuario.reclamos_totales,
-            func.count(BadgeUsuario.id).label("badges_count")
-        ).join(
-            User, PuntosUsuario.user_id == User.id
-        ).outerjoin(
-            BadgeUsuario, and_(
-                BadgeUsuario.user_id == PuntosUsuario.user_id,
-                BadgeUsuario.municipio_id == PuntosUsuario.municipio_id
-            )
-        ).where(
-            PuntosUsuario.municipio_id == municipio_id
-        ).group_by(
-            PuntosUsuario.user_id,
-            User.nombre,
-            User.apellido,
-            PuntosUsuario.puntos_totales,
-            PuntosUsuario.puntos_mes_actual,
-            PuntosUsuario.reclamos_totales
-        )
+        """Obtiene una página del leaderboard de usuarios.
 
-        # Ordenar según período
-        if periodo == "mes":
-            query = query.order_by(PuntosUsuario.puntos_mes_actual.desc())
-        else:
-            query = query.order_by(PuntosUsuario.puntos_totales.desc())
+        El orden sale del ranking materializado (services/gamificacion_ranking);
+        acá solo se completan nombres y badges de los usuarios de la página.
+        """
+        pagina = await ranking.top(db, municipio_id, periodo, limite=limite, offset=offset)
+        return await GamificacionService._entradas_leaderboard(db, municipio_id, pagina, periodo)
+
+    @staticmethod
+    async def get_posicion(
+        db: AsyncSession,
+        user_id: int,
+        municipio_id: int,
+        periodo: str = "mes",
+    ) -> dict:
+        """Entrada de leaderboard del usuario (crea su registro de puntos si
+        no existe). La posición es un lookup en el ranking."""
+        await GamificacionService.get_or_create_puntos_usuario(db, user_id, municipio_id)
+        posicion = await ranking.posicion(db, municipio_id, user_id, periodo)
+        entradas = await GamificacionService._entradas_leaderboard(
+            db, municipio_id, [(posicion or 0, user_id, 0)], periodo
+        )
+        return entradas[0]
 
-        query = query.limit(limite)
-        result = await db.execute(query)
-        rows = result.fetchall()
+    @staticmethod
+    async def _entradas_leaderboard(
+        db: AsyncSession,
+        municipio_id: int,
+        pagina: List[Tuple[int, int, int]],
+        periodo: str,
+    ) -> List[dict]:
+        """[(posicion, user_id, puntos)] -> entradas con nombre, reclamos y
+        badges (2 queries con IN, sin importar el tamaño de la página)."""
+        if not pagina:
+            return []
+        user_ids = [uid for _, uid, _ in pagina]
+        result = await db.execute(
+            select(
+                PuntosUsuario.user_id,
+                User.nombre,
+                User.apellido,
+                PuntosUsuario.puntos_totales,
+                PuntosUsuario.puntos_mes_actual,
+                PuntosUsuario.reclamos_totales,
+            ).join(
+                User, PuntosUsuario.user_id == User.id
+            ).where(
+                PuntosUsuario.municipio_id == municipio_id,
+                PuntosUsuario.user_id.in_(user_ids),
+            )
+        )
+        filas = {row.user_id: row for row in result.all()}
+        result = await db.execute(
+            select(BadgeUsuario.user_id, func.count(BadgeUsuario.id)).where(
+                BadgeUsuario.municipio_id == municipio_id,
+                BadgeUsuario.user_id.in_(user_ids),
+            ).group_by(BadgeUsuario.user_id)
+        )
+        badges = dict(result.all())
 
         leaderboard = []
-        for idx, row in enumerate(rows, 1):
+        for posicion, user_id, _ in pagina:
+            row = filas.get(user_id)
+            if row is None:
+                continue
             leaderboard.append({
-                "posicion": idx,
-                "user_id": row.user_id,
-                "nombre": f"{row.nombre} {row.apellido[:1]}.",
+                "posicion": posicion,
+                "user_id": user_id,
+                "nombre": f"{row.nombre} {(row.apellido or '')[:1]}.",
+                # De la DB: el ranking puede ir un paso atrás si otra instancia escribió
                 "puntos": row.puntos_mes_actual if periodo == "mes" else row.puntos_totales,
                 "puntos_totales": row.puntos_totales,
                 "reclamos": row.reclamos_totales,
-                "badges": row.badges_count,
+                "badges": badges.get(user_id, 0),
             })
 
         return leaderboard
@@ -347,14 +377,8 @@ class GamificacionService:
         )
         badges = result.scalars().all()
 
-        # Obtener posición en leaderboard
-        leaderboard = await GamificacionService.get_leaderboard(
-            db, municipio_id, limite=100
-        )
-        posicion = next(
-            (item["posicion"] for item in leaderboard if item["user_id"] == user_id),
-            None
-        )
+        # Obtener posición en leaderboard (lookup en el ranking materializado)
+        posicion = await ranking.posicion(db, municipio_id, user_id, "mes")
 
         # Obtener historial reciente
         result = await db.execute(
@@ -500,55 +524,99 @@ class GamificacionService:
         return puntos, badges
 
     @staticmethod
-    async def resetear_puntos_mensuales(db: AsyncSession, municipio_id: int):
-        """Resetea los puntos mensuales y guarda el leaderboard del mes anterior"""
+    async def resetear_puntos_mensuales(db: AsyncSession, municipio_id: int) -> bool:
+        """Resetea los puntos mensuales y guarda el leaderboard del mes anterior.
+
+        Todo set-wise: un SELECT del top 10, INSERT multi-fila del histórico
+        y de los badges, un UPDATE del reset y la reconstrucción del ranking.
+        Idempotente por mes: si el histórico del mes ya existe devuelve False
+        sin tocar nada (lo corren la tarea programada y el admin a mano).
+        """
         ahora = datetime.utcnow()
         mes_anterior = ahora.month - 1 if ahora.month > 1 else 12
         anio = ahora.year if ahora.month > 1 else ahora.year - 1
 
-        # Obtener top 10 del mes anterior
-        result = await db.execute(
-            select(PuntosUsuario).where(
-                PuntosUsuario.municipio_id == municipio_id
-            ).order_by(PuntosUsuario.puntos_mes_actual.desc()).limit(10)
+        ya_cerrado = await db.execute(
+            select(LeaderboardMensual.id).where(
+                LeaderboardMensual.municipio_id == municipio_id,
+                LeaderboardMensual.zona_id.is_(None),
+                LeaderboardMensual.anio == anio,
+                LeaderboardMensual.mes == mes_anterior,
+            ).limit(1)
         )
-        top_usuarios = result.scalars().all()
+        if ya_cerrado.scalar_one_or_none() is not None:
+            return False
 
-        # Guardar en leaderboard histórico
-        for idx, usuario in enumerate(top_usuarios, 1):
-            leaderboard_entry = LeaderboardMensual(
-                municipio_id=municipio_id,
-                zona_id=None,
-                anio=anio,
-                mes=mes_anterior,
-                user_id=usuario.user_id,
-                posicion=idx,
-                puntos=usuario.puntos_mes_actual,
-                reclamos=usuario.reclamos_totales
-            )
-            db.add(leaderboard_entry)
+        # Top 10 del mes anterior (mismo desempate que el ranking)
+        result = await db.execute(
+            select(
+                PuntosUsuario.user_id,
+                PuntosUsuario.puntos_mes_actual,
+                PuntosUsuario.reclamos_totales,
+            ).where(
+                PuntosUsuario.municipio_id == municipio_id,
+                PuntosUsuario.puntos_mes_actual > 0,
+            ).order_by(
+                PuntosUsuario.puntos_mes_actual.desc(),
+                PuntosUsuario.user_id.desc(),
+            ).limit(10)
+        )
+        top_usuarios = result.all()
 
-            # Otorgar badge de top del mes
-            if idx == 1:
-                badge = BadgeUsuario(
-                    user_id=usuario.user_id,
-                    municipio_id=municipio_id,
-                    tipo_badge=TipoBadge.TOP_DEL_MES
-                )
-                db.add(badge)
-            elif idx <= 3:
-                badge = BadgeUsuario(
-                    user_id=usuario.user_id,
-                    municipio_id=municipio_id,
-                    tipo_badge=TipoBadge.TOP_3_MES
-                )
-                db.add(badge)
+        if top_usuarios:
+            # Guardar en leaderboard histórico
+            await db.execute(insert(LeaderboardMensual), [
+                {
+                    "municipio_id": municipio_id,
+                    "zona_id": None,
+                    "anio": anio,
+                    "mes": mes_anterior,
+                    "user_id": row.user_id,
+                    "posicion": idx,
+                    "puntos": row.puntos_mes_actual,
+                    "reclamos": row.reclamos_totales,
+                }
+                for idx, row in enumerate(top_usuarios, 1)
+            ])
+            # Otorgar badges de top del mes
+            await db.execute(insert(BadgeUsuario), [
+                {
+                    "user_id": row.user_id,
+                    "municipio_id": municipio_id,
+                    "tipo_badge": TipoBadge.TOP_DEL_MES if idx == 1 else TipoBadge.TOP_3_MES,
+                }
+                for idx, row in enumerate(top_usuarios[:3], 1)
+            ])
 
         # Resetear puntos mensuales
         await db.execute(
-            PuntosUsuario.__table__.update().where(
+            update(PuntosUsuario).where(
                 PuntosUsuario.municipio_id == municipio_id
-            ).values(puntos_mes_actual=0)
+            ).values(puntos_mes_actual=0).execution_options(synchronize_session=False)
         )
 
         await db.commit()
+        await ranking.reconstruir(db, municipio_id)
+        return True
+
+
+_ultimo_cierre: Optional[Tuple[int, int]] = None
+
+
+async def tarea_reset_mensual() -> None:
+    """Cierre del mes en todos los municipios con puntos. Corre desde
+    core/scheduler; fuera del día 1 no hace nada, y el cierre es idempotente
+    por municipio (si el líder cambia a mitad de día no se cierra dos veces)."""
+    global _ultimo_cierre
+    from core.database import AsyncSessionLocal
+
+    ahora = datetime.utcnow()
+    if ahora.day != 1 or _ultimo_cierre == (ahora.year, ahora.month):
+        return
+    async with AsyncSessionLocal() as db:
+        municipios = (await db.execute(
+            select(PuntosUsuario.municipio_id).distinct()
+        )).scalars().all()
+        for municipio_id in municipios:
+            await GamificacionService.resetear_puntos_mensuales(db, municipio_id)
+    _ultimo_cierre = (ahora.year, ahora.month)
@@ -0,0 +1,34 @@
+"""Geocoding (Nominatim / Overpass) con cache persistente y rate limit.
+
+Todo el que necesite geocodificar (api/geocoding, services/barrios_service,
+services/barrios_auto) pasa por el singleton `geocoder`:
+
+    from services.geocoding import geocoder
+    resultados = await geocoder.search({"q": "San Martín 100, Chacabuco", "limit": 1})
+
+Ver servicio.py para el camino LRU -> coalescing -> BD -> Nominatim.
+En tests se arma un `GeocodingService(provider=FakeGeocoder(), ...)`.
+"""
+from .provider import GeocoderProvider, NominatimProvider, USER_AGENT
+from .servicio import GeocodingService, LRU, TokenBucket, clave_cache, normalizar_texto
+
+geocoder = GeocodingService()
+
+
+async def tarea_purgar_cache() -> None:
+    """Borra las entradas vencidas de geocoding_cache. Corre desde core/scheduler."""
+    await geocoder.purgar_vencidos()
+
+
+__all__ = [
+    "GeocoderProvider",
+    "NominatimProvider",
+    "USER_AGENT",
+    "GeocodingService",
+    "LRU",
+    "TokenBucket",
+    "clave_cache",
+    "normalizar_texto",
+    "geocoder",
+    "tarea_purgar_cache",
+]
@@ -0,0 +1,49 @@
+"""Geocoder de pruebas con respuestas programadas — sin red.
+
+    fake = FakeGeocoder(demora_s=0.05)
+    fake.programar("San Martín 100", [{"lat": "-34.6", "lon": "-58.4", ...}])
+    fake.programar("Cochabamba", RuntimeError("503"))
+
+Las consultas sin guion devuelven [] (search) o {} (reverse/overpass).
+`llamadas` registra (endpoint, params) de cada request que llegó "a la
+red", para verificar cache, coalescing y rate limit.
+"""
+import asyncio
+import time
+from typing import Any, Dict, List, Tuple
+
+from .provider import GeocoderProvider
+
+
+class FakeGeocoder(GeocoderProvider):
+
+    def __init__(self, demora_s: float = 0.0):
+        self.demora_s = demora_s
+        self._guion: Dict[str, Any] = {}
+        self.llamadas: List[Tuple[str, Dict[str, Any]]] = []
+        self.instantes: List[float] = []
+
+    def programar(self, consulta: str, respuesta: Any) -> None:
+        """Respuesta para un `q` (search), "lat,lon" (reverse) o query Overpass.
+        Es el `q` tal cual llega a Nominatim: el servicio normaliza sólo la
+        clave de cache, no lo que manda."""
+        self._guion[consulta] = respuesta
+
+    async def _responder(self, clave: str, vacio: Any) -> Any:
+        self.instantes.append(time.monotonic())
+        if self.demora_s:
+            await asyncio.sleep(self.demora_s)
+        respuesta = self._guion.get(clave, vacio)
+        if isinstance(respuesta, BaseException):
+            raise respuesta
+        return respuesta
+
+    async def nominatim(self, endpoint: str, params: Dict[str, Any]) -> Any:
+        self.llamadas.append((endpoint, dict(params)))
+        if endpoint == "reverse":
+            return await self._responder(f"{params.get('lat')},{params.get('lon')}", {})
+        return await self._responder(str(params.get("q", "")), [])
+
+    async def overpass(self, query: str) -> Dict[str, Any]:
+        self.llamadas.append(("overpass", {"query": query}))
+        return await self._responder(query, {"elements": []})
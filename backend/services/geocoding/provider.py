@@ -0,0 +1,70 @@
+"""Contrato del geocoder externo + implementación real (Nominatim/Overpass).
+
+`NominatimProvider` usa UN `httpx.AsyncClient` compartido (keep-alive) en
+vez de abrir un cliente por consulta. No aplica rate limit ni cache: eso lo
+hace `GeocodingService` adelante.
+"""
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+import httpx
+
+from core.config import settings
+
+NOMINATIM_BASE = "https://nominatim.openstreetmap.org"
+OVERPASS_BASE = "https://overpass-api.de/api/interpreter"
+
+# User-Agent requerido oficialmente por la policy de uso de Nominatim.
+# Sin esto pueden bloquearnos.
+USER_AGENT = "MunicipalidadReclamosApp/1.0 (sugerenciasMun)"
+
+
+class GeocoderProvider(ABC):
+    """Lo que necesita GeocodingService del servicio externo."""
+
+    @abstractmethod
+    async def nominatim(self, endpoint: str, params: Dict[str, Any]) -> Any:
+        """GET /{endpoint} de Nominatim ("search" | "reverse"); JSON parseado."""
+
+    @abstractmethod
+    async def overpass(self, query: str) -> Dict[str, Any]:
+        """POST de una query Overpass QL; JSON parseado."""
+
+    async def cerrar(self) -> None:
+        """Libera conexiones (shutdown)."""
+
+
+class NominatimProvider(GeocoderProvider):
+
+    def __init__(self, nominatim_base: str = NOMINATIM_BASE, overpass_base: str = OVERPASS_BASE):
+        self.nominatim_base = nominatim_base
+        self.overpass_base = overpass_base
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=settings.GEOCODING_TIMEOUT_S,
+                headers={"User-Agent": USER_AGENT, "Accept-Language": "es"},
+            )
+        return self._client
+
+    async def nominatim(self, endpoint: str, params: Dict[str, Any]) -> Any:
+        response = await self._http().get(f"{self.nominatim_base}/{endpoint}", params=params)
+        response.raise_for_status()
+        return response.json()
+
+    async def overpass(self, query: str) -> Dict[str, Any]:
+        response = await self._http().post(
+            self.overpass_base,
+            content=query,
+            headers={"Content-Type": "text/plain"},
+            timeout=25.0,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def cerrar(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
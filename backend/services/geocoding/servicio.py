@@ -0,0 +1,249 @@
+"""Cache de dos niveles + cola con rate limit delante del geocoder externo.
+
+Camino de una consulta (`resolver`):
+
+  1. LRU en memoria por proceso (settings.GEOCODING_LRU_SIZE entradas,
+     desalojo O(1) con OrderedDict).
+  2. Si la misma consulta ya está en vuelo, se espera ESE resultado
+     (coalescing): diez vecinos escribiendo "San Martín 1" al mismo tiempo
+     son un solo request a Nominatim.
+  3. Tabla `geocoding_cache` (sobrevive a deploys y la comparten las
+     instancias). TTL settings.GEOCODING_CACHE_TTL_S, más corto para
+     resultados vacíos.
+  4. Nominatim, detrás de un token bucket (settings.GEOCODING_RPS, 1 req/s
+     por policy de OSM). Los pedidos esperan su turno en orden de llegada
+     en vez de salir todos juntos y ganarse un 429/ban.
+
+Los errores no se cachean. Si la BD del cache falla se sigue sin ella.
+El bucket es por proceso: con N instancias, bajar GEOCODING_RPS a 1/N.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import delete
+
+from core.config import settings
+from core.token_bucket import TokenBucket
+from models.geocoding_cache import GeocodingCache
+from .provider import GeocoderProvider, NominatimProvider
+
+logger = logging.getLogger(__name__)
+
+_MISS = object()
+# ~1 m: dos "reverse" desde el mismo lugar comparten cache
+_DECIMALES_COORD = 5
+
+
+def normalizar_texto(valor: str) -> str:
+    """NFKC + minúsculas + espacios colapsados. No quita tildes: Nominatim
+    las usa para rankear."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", valor).casefold()).strip()
+
+
+def clave_cache(tipo: str, params: Dict[str, Any]) -> Tuple[str, str]:
+    """(sha256, consulta normalizada) para un tipo + parámetros."""
+    normalizados = {}
+    for k, v in params.items():
+        if v is None:
+            continue
+        if isinstance(v, str):
+            v = normalizar_texto(v)
+        elif isinstance(v, float):
+            v = round(v, _DECIMALES_COORD)
+        normalizados[k] = v
+    consulta = f"{tipo}:" + json.dumps(normalizados, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(consulta.encode()).hexdigest(), consulta
+
+
+class LRU:
+    """Cache en memoria con TTL por entrada y desalojo del menos usado."""
+
+    def __init__(self, maximo: int):
+        self.maximo = maximo
+        self._datos: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, clave: str) -> Any:
+        entrada = self._datos.get(clave)
+        if entrada is None:
+            return _MISS
+        expira, valor = entrada
+        if time.monotonic() > expira:
+            del self._datos[clave]
+            return _MISS
+        self._datos.move_to_end(clave)
+        return valor
+
+    def set(self, clave: str, valor: Any, ttl_s: float) -> None:
+        self._datos[clave] = (time.monotonic() + ttl_s, valor)
+        self._datos.move_to_end(clave)
+        while len(self._datos) > self.maximo:
+            self._datos.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._datos)
+
+
+@dataclass
+class GeocodingStats:
+    lru: int = 0
+    coalescidas: int = 0
+    db: int = 0
+    red: int = 0
+    errores: int = 0
+
+
+class GeocodingService:
+
+    def __init__(
+        self,
+        provider: Optional[GeocoderProvider] = None,
+        session_factory=None,
+        rps: Optional[float] = None,
+        lru_size: Optional[int] = None,
+    ):
+        self._provider = provider
+        self._session_factory = session_factory
+        self.bucket = TokenBucket(rps or settings.GEOCODING_RPS)
+        self.lru = LRU(lru_size or settings.GEOCODING_LRU_SIZE)
+        self._en_vuelo: Dict[str, asyncio.Future] = {}
+        self.stats = GeocodingStats()
+
+    @property
+    def provider(self) -> GeocoderProvider:
+        if self._provider is None:
+            self._provider = NominatimProvider()
+        return self._provider
+
+    def _sesiones(self):
+        if self._session_factory is None:
+            from core.database import AsyncSessionLocal
+            self._session_factory = AsyncSessionLocal
+        return self._session_factory
+
+    # ---------------- API ----------------
+
+    async def search(self, params: Dict[str, Any]) -> Any:
+        """/search de Nominatim (los mismos params que acepta la API)."""
+        params = {"format": "json", **params}
+        return await self.resolver("search", params, lambda: self._nominatim("search", params))
+
+    async def reverse(self, lat: float, lon: float) -> Any:
+        params = {
+            "format": "json",
+            "lat": round(lat, _DECIMALES_COORD),
+            "lon": round(lon, _DECIMALES_COORD),
+            "addressdetails": 1,
+        }
+        return await self.resolver("reverse", params, lambda: self._nominatim("reverse", params))
+
+    async def overpass(self, query: str) -> Dict[str, Any]:
+        """Query Overpass directa (sin cache: el que llama cachea el
+        resultado final con `resolver`)."""
+        return await self.provider.overpass(query)
+
+    async def _nominatim(self, endpoint: str, params: Dict[str, Any]) -> Any:
+        await self.bucket.adquirir()
+        return await self.provider.nominatim(endpoint, params)
+
+    async def resolver(
+        self,
+        tipo: str,
+        params: Dict[str, Any],
+        obtener: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """LRU -> en vuelo -> BD -> `obtener()`. El resultado queda en los
+        dos niveles de cache."""
+        clave, consulta = clave_cache(tipo, params)
+        valor = self.lru.get(clave)
+        if valor is not _MISS:
+            self.stats.lru += 1
+            return valor
+
+        en_vuelo = self._en_vuelo.get(clave)
+        if en_vuelo is not None:
+            self.stats.coalescidas += 1
+            return await asyncio.shield(en_vuelo)
+
+        futuro = asyncio.get_running_loop().create_future()
+        self._en_vuelo[clave] = futuro
+        try:
+            valor = await self._leer_db(clave)
+            if valor is _MISS:
+                self.stats.red += 1
+                valor = await obtener()
+                ttl = self._ttl(valor)
+                await self._guardar_db(clave, tipo, consulta, valor, ttl)
+            else:
+                self.stats.db += 1
+                ttl = self._ttl(valor)
+            self.lru.set(clave, valor, ttl)
+            futuro.set_result(valor)
+            return valor
+        except asyncio.CancelledError:
+            futuro.cancel()
+            raise
+        except Exception as e:
+            self.stats.errores += 1
+            futuro.set_exception(e)
+            # Si nadie más lo esperaba, evita el "exception never retrieved"
+            futuro.exception()
+            raise
+        finally:
+            self._en_vuelo.pop(clave, None)
+
+    @staticmethod
+    def _ttl(valor: Any) -> int:
+        return settings.GEOCODING_CACHE_TTL_S if valor else settings.GEOCODING_CACHE_TTL_VACIO_S
+
+    # ---------------- Cache en BD ----------------
+
+    async def _leer_db(self, clave: str) -> Any:
+        try:
+            async with self._sesiones()() as db:
+                fila = await db.get(GeocodingCache, clave)
+        except Exception as e:
+            logger.warning(f"[geocoding] cache BD no disponible: {e}")
+            return _MISS
+        if fila is None or fila.expira_at <= datetime.utcnow():
+            return _MISS
+        return fila.resultado
+
+    async def _guardar_db(self, clave: str, tipo: str, consulta: str, valor: Any, ttl_s: int) -> None:
+        try:
+            async with self._sesiones()() as db:
+                await db.execute(delete(GeocodingCache).where(GeocodingCache.clave == clave))
+                db.add(GeocodingCache(
+                    clave=clave, tipo=tipo, consulta=consulta[:2000], resultado=valor,
+                    expira_at=datetime.utcnow() + timedelta(seconds=ttl_s),
+                ))
+                await db.commit()
+        except Exception as e:
+            # Otra instancia la insertó en paralelo, o la tabla no está migrada
+            logger.warning(f"[geocoding] no se pudo guardar en cache BD: {e}")
+
+    async def purgar_vencidos(self) -> int:
+        async with self._sesiones()() as db:
+            res = await db.execute(delete(GeocodingCache).where(GeocodingCache.expira_at <= datetime.utcnow()))
+            await db.commit()
+        return res.rowcount or 0
+
+    def metricas(self) -> Dict[str, Any]:
+        return {
+            **self.stats.__dict__,
+            "lru_entradas": len(self.lru),
+            "en_vuelo": len(self._en_vuelo),
+            "en_cola": self.bucket.esperando,
+        }
+
+    async def cerrar(self) -> None:
+        if self._provider is not None:
+            await self._provider.cerrar()
@@ -0,0 +1,312 @@
+"""
+Framework de jobs en segundo plano.
+
+Uso desde un endpoint:
+
+    from services.jobs import encolar_job, job_encolado_response
+
+    job = await encolar_job(db, "tasas.importar_padron", {"url": ..., ...},
+                            municipio_id=..., usuario_id=current_user.id)
+    return job_encolado_response(job)
+
+El handler es una coroutine `async def handler(db, ctx, **params)` que
+recibe su propia sesion de BD y un `JobContext` para reportar avance:
+
+    await ctx.progreso(40, "Procesando hoja Empleados")
+
+`ctx.progreso` tambien chequea si el usuario pidio cancelar: en ese caso
+levanta `JobCancelado`, el executor hace rollback de la sesion del handler
+y marca el job como cancelado. Lo que devuelva el handler se guarda como
+`resultado` (JSON) — es lo mismo que antes devolvia el endpoint sincrono.
+
+Los handlers se registran por ruta ("modulo:funcion") en `HANDLERS`, asi
+cualquier proceso (API o worker de Celery) los resuelve sin tener que
+importar todos los routers.
+
+Executors (`settings.JOBS_EXECUTOR`):
+  - "local"  (default): `asyncio.create_task` en el mismo proceso. Para dev,
+    tests y deploys de una sola instancia.
+  - "celery": `tasks.job_tasks.run_job_task.delay(job_id)`.
+
+Mientras el handler corre, el executor actualiza `heartbeat_at` cada
+`JOBS_HEARTBEAT_S`. Si el proceso muere (deploy, OOM) el job quedaria
+en_curso para siempre: `rescatar_huerfanos` (scheduler, "jobs.huerfanos")
+pasa a error los que llevan mas de `JOBS_LEASE_S` sin latido. No se
+re-encolan: el handler pudo haber commiteado parte del trabajo.
+"""
+import asyncio
+import importlib
+import logging
+import secrets
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.database import AsyncSessionLocal
+from models.background_job import BackgroundJob, EstadoJob
+
+logger = logging.getLogger(__name__)
+
+
+# tipo -> "modulo:funcion"
+HANDLERS: Dict[str, str] = {
+    "municipio.crear_demo": "api.municipios:job_crear_demo",
+    "municipio.eliminar_demo": "api.municipios:job_eliminar_demo",
+    "tesoreria.importar_excel_matriz": "api.tesoreria_import:job_importar_excel_matriz",
+    "tasas.importar_padron": "api.tasas:job_importar_padron",
+    "dependencias.auto_asignar_categorias_ia": "api.dependencias:job_auto_asignar_categorias_ia",
+    "tesoreria.ejecutar_pagos_masivo": "api.tesoreria_agenda:job_ejecutar_pagos_masivo",
+}
+
+# No escribir progreso mas seguido que esto (cada write es un UPDATE)
+_PROGRESO_MIN_INTERVALO = 1.0
+
+# Referencias fuertes a las tasks del executor local (si no, el GC de
+# asyncio las puede levantar a mitad de camino).
+_tareas_locales: Set[asyncio.Task] = set()
+
+
+class JobCancelado(Exception):
+    """El usuario pidio cancelar el job; el executor hace rollback."""
+
+
+def _ahora() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _resolver_handler(tipo: str) -> Callable[..., Awaitable[Any]]:
+    ruta = HANDLERS.get(tipo)
+    if not ruta:
+        raise ValueError(f"Tipo de job desconocido: {tipo}")
+    modulo, funcion = ruta.split(":")
+    return getattr(importlib.import_module(modulo), funcion)
+
+
+class JobContext:
+    """Handle que recibe el handler para reportar progreso y ver cancelacion.
+
+    Usa una sesion propia (corta) para que el progreso sea visible mientras
+    la transaccion del handler sigue abierta.
+    """
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self._ultimo_write = 0.0
+
+    async def progreso(
+        self,
+        pct: int,
+        mensaje: Optional[str] = None,
+        forzar: bool = False,
+        cancelable: bool = True,
+    ) -> None:
+        """Actualiza progreso/mensaje (throttled salvo `forzar`). Con
+        `cancelable=False` no corta aunque se haya pedido cancelar — para
+        usar despues de un commit parcial que no se puede deshacer."""
+        pct = max(0, min(100, int(pct)))
+        ahora = time.monotonic()
+        if not forzar and ahora - self._ultimo_write < _PROGRESO_MIN_INTERVALO:
+            return
+        self._ultimo_write = ahora
+        valores: Dict[str, Any] = {"progreso": pct, "heartbeat_at": _ahora()}
+        if mensaje is not None:
+            valores["mensaje"] = mensaje[:255]
+        async with AsyncSessionLocal() as s:
+            await s.execute(update(BackgroundJob).where(BackgroundJob.id == self.job_id).values(**valores))
+            cancelar = (await s.execute(
+                select(BackgroundJob.cancelacion_solicitada).where(BackgroundJob.id == self.job_id)
+            )).scalar()
+            await s.commit()
+        if cancelar and cancelable:
+            raise JobCancelado()
+
+    async def verificar_cancelacion(self) -> None:
+        """Chequeo explicito (sin escribir progreso)."""
+        async with AsyncSessionLocal() as s:
+            cancelar = (await s.execute(
+                select(BackgroundJob.cancelacion_solicitada).where(BackgroundJob.id == self.job_id)
+            )).scalar()
+        if cancelar:
+            raise JobCancelado()
+
+
+# ============================================================
+# Encolado
+# ============================================================
+
+async def encolar_job(
+    db: AsyncSession,
+    tipo: str,
+    params: Optional[Dict[str, Any]] = None,
+    *,
+    municipio_id: Optional[int] = None,
+    usuario_id: Optional[int] = None,
+    archivo: Optional[bytes] = None,
+) -> BackgroundJob:
+    """Crea el job (commit) y lo despacha al executor configurado."""
+    if tipo not in HANDLERS:
+        raise ValueError(f"Tipo de job desconocido: {tipo}")
+    job = BackgroundJob(
+        id=f"JOB-{secrets.token_urlsafe(18)}",
+        tipo=tipo,
+        municipio_id=municipio_id,
+        usuario_id=usuario_id,
+        estado=EstadoJob.PENDIENTE,
+        progreso=0,
+        params=jsonable_encoder(params or {}),
+        archivo=archivo,
+    )
+    db.add(job)
+    await db.commit()
+    _despachar(job.id)
+    return job
+
+
+def _despachar(job_id: str) -> None:
+    if settings.JOBS_EXECUTOR == "celery":
+        from tasks.job_tasks import run_job_task
+        run_job_task.delay(job_id)
+        return
+    task = asyncio.get_running_loop().create_task(ejecutar_job(job_id))
+    _tareas_locales.add(task)
+    task.add_done_callback(_tareas_locales.discard)
+
+
+def job_encolado_response(job: BackgroundJob) -> Dict[str, Any]:
+    """Respuesta estandar de un endpoint que encolo un job (HTTP 202)."""
+    return {
+        "job_id": job.id,
+        "tipo": job.tipo,
+        "estado": job.estado.value if isinstance(job.estado, EstadoJob) else job.estado,
+        "status_url": f"/api/jobs/{job.id}",
+    }
+
+
+async def cancelar_job(db: AsyncSession, job: BackgroundJob) -> None:
+    """Pendiente -> cancelado directo. En curso -> flag que el handler ve en
+    su proximo `ctx.progreso()`."""
+    if job.estado == EstadoJob.PENDIENTE:
+        job.estado = EstadoJob.CANCELADO
+        job.finished_at = _ahora()
+    job.cancelacion_solicitada = True
+    await db.commit()
+
+
+# ============================================================
+# Ejecucion (comun a los dos executors)
+# ============================================================
+
+async def _latir(job_id: str) -> None:
+    """Renueva `heartbeat_at` mientras el handler corre (se cancela al final)."""
+    while True:
+        await asyncio.sleep(settings.JOBS_HEARTBEAT_S)
+        try:
+            async with AsyncSessionLocal() as s:
+                await s.execute(
+                    update(BackgroundJob)
+                    .where(BackgroundJob.id == job_id, BackgroundJob.estado == EstadoJob.EN_CURSO)
+                    .values(heartbeat_at=_ahora())
+                )
+                await s.commit()
+        except Exception as e:
+            logger.warning(f"[jobs] no se pudo registrar el latido de {job_id}: {e}")
+
+
+async def _finalizar(job_id: str, **valores) -> None:
+    async with AsyncSessionLocal() as s:
+        await s.execute(
+            update(BackgroundJob)
+            .where(BackgroundJob.id == job_id)
+            .values(finished_at=_ahora(), archivo=None, **valores)
+        )
+        await s.commit()
+
+
+async def ejecutar_job(job_id: str) -> None:
+    """Toma el job (claim atomico pendiente -> en_curso) y corre el handler."""
+    async with AsyncSessionLocal() as s:
+        claim = await s.execute(
+            update(BackgroundJob)
+            .where(BackgroundJob.id == job_id, BackgroundJob.estado == EstadoJob.PENDIENTE)
+            .values(estado=EstadoJob.EN_CURSO, started_at=_ahora(), heartbeat_at=_ahora())
+        )
+        await s.commit()
+        if claim.rowcount == 0:
+            return  # ya lo tomo otro worker o fue cancelado
+        job = (await s.execute(select(BackgroundJob).where(BackgroundJob.id == job_id))).scalar_one()
+        tipo, params, archivo = job.tipo, dict(job.params or {}), job.archivo
+
+    ctx = JobContext(job_id)
+    latido = asyncio.create_task(_latir(job_id))
+    async with AsyncSessionLocal() as db:
+        try:
+            handler = _resolver_handler(tipo)
+            if archivo is not None:
+                params["archivo"] = archivo
+            resultado = await handler(db, ctx, **params)
+        except JobCancelado:
+            await db.rollback()
+            await _finalizar(job_id, estado=EstadoJob.CANCELADO, mensaje="Cancelado por el usuario")
+            logger.info(f"[jobs] {tipo} {job_id} cancelado")
+            return
+        except HTTPException as e:
+            await db.rollback()
+            await _finalizar(job_id, estado=EstadoJob.ERROR, error=str(e.detail)[:1000])
+            return
+        except Exception as e:
+            await db.rollback()
+            logger.exception(f"[jobs] {tipo} {job_id} fallo")
+            await _finalizar(job_id, estado=EstadoJob.ERROR, error=f"{type(e).__name__}: {e}"[:1000])
+            return
+        finally:
+            latido.cancel()
+
+    await _finalizar(
+        job_id,
+        estado=EstadoJob.COMPLETADO,
+        progreso=100,
+        resultado=jsonable_encoder(resultado),
+    )
+    logger.info(f"[jobs] {tipo} {job_id} completado")
+
+
+# ============================================================
+# Jobs huerfanos
+# ============================================================
+
+async def rescatar_huerfanos(db: AsyncSession, lease_s: Optional[int] = None) -> int:
+    """Pasa a error los jobs en_curso sin latido hace mas de `lease_s`.
+    Devuelve cuantos cerro."""
+    limite = _ahora() - timedelta(seconds=lease_s or settings.JOBS_LEASE_S)
+    result = await db.execute(
+        update(BackgroundJob)
+        .where(
+            BackgroundJob.estado == EstadoJob.EN_CURSO,
+            or_(
+                BackgroundJob.heartbeat_at < limite,
+                and_(BackgroundJob.heartbeat_at.is_(None), BackgroundJob.started_at < limite),
+            ),
+        )
+        .values(
+            estado=EstadoJob.ERROR,
+            error="El worker dejo de responder (job huerfano)",
+            finished_at=_ahora(),
+            archivo=None,
+        )
+    )
+    await db.commit()
+    if result.rowcount:
+        logger.warning(f"[jobs] {result.rowcount} job(s) huerfanos pasados a error")
+    return result.rowcount
+
+
+async def tarea_rescatar_huerfanos() -> None:
+    """Corre desde core/scheduler."""
+    async with AsyncSessionLocal() as db:
+        await rescatar_huerfanos(db)
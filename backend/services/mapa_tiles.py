@@ -0,0 +1,310 @@
+"""
+Agregación espacial por tiles para el mapa público y el heatmap.
+
+Antes `/portal-publico/mapa` y `/analytics/heatmap` devolvían todos los
+puntos: con decenas de miles de reclamos el navegador dibujaba un marker por
+fila y la API los serializaba en cada request. Ahora el mapa se pide por
+bbox + zoom y se responde con clusters (centroide + cantidad) por celda.
+
+Grilla: tiles de 360/2^zoom grados anclados en (-180, -90), cada uno
+partido en MAPA_CELDAS_POR_TILE x MAPA_CELDAS_POR_TILE celdas. Los índices
+de celda se calculan en SQL y se agrupa con un único GROUP BY para todos los
+tiles que faltan en la cache. Desde MAPA_ZOOM_PUNTOS los tiles con pocos
+reclamos (<= MAPA_MAX_PUNTOS_TILE) devuelven los puntos crudos.
+
+Tamaño acotado: si el bbox pide más de MAPA_MAX_TILES tiles se baja el
+zoom hasta que entren, así que la respuesta tiene a lo sumo
+MAX_TILES x CELDAS² clusters sin importar cuántos reclamos haya.
+
+Cache por tile (capa, municipio, filtros, zoom, x, y) en memoria del
+proceso: se invalida al commitear cambios en reclamos del municipio
+(invalidación post-commit de core/denormalizacion) y vence por TTL, que
+cubre otras instancias y la ventana móvil de `dias`.
+"""
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Float, Integer, and_, cast, func, or_, select, type_coerce
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.denormalizacion import registrar_invalidacion
+from models.reclamo import Reclamo
+
+Tile = Tuple[int, int]
+
+
+# ============================================================
+# Grilla
+# ============================================================
+
+@dataclass(frozen=True)
+class Bbox:
+    oeste: float
+    sur: float
+    este: float
+    norte: float
+
+    @classmethod
+    def parsear(cls, texto: str) -> "Bbox":
+        """"oeste,sur,este,norte" (el formato de `toBBoxString()` de Leaflet)."""
+        try:
+            oeste, sur, este, norte = (float(v) for v in texto.split(","))
+        except ValueError:
+            raise ValueError("bbox debe ser 'oeste,sur,este,norte'")
+        if not (-180 <= oeste <= este <= 180 and -90 <= sur <= norte <= 90):
+            raise ValueError("bbox fuera de rango")
+        return cls(oeste, sur, este, norte)
+
+
+def lado_tile(zoom: int) -> float:
+    return 360.0 / (2 ** zoom)
+
+
+def tiles_de(bbox: Bbox, zoom: int) -> List[Tile]:
+    lado = lado_tile(zoom)
+    # El borde este/norte exacto (180 / 90) cae en el último tile, no en uno extra
+    x_max, y_max = 2 ** zoom - 1, math.ceil(180 / lado) - 1
+    x0, x1 = int((bbox.oeste + 180) // lado), min(int((bbox.este + 180) // lado), x_max)
+    y0, y1 = int((bbox.sur + 90) // lado), min(int((bbox.norte + 90) // lado), y_max)
+    return [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+
+def ajustar_zoom(bbox: Bbox, zoom: int) -> int:
+    """El zoom más alto <= `zoom` con el que el bbox entra en MAPA_MAX_TILES."""
+    zoom = max(0, min(zoom, settings.MAPA_ZOOM_MAX))
+    while zoom > 0 and len(tiles_de(bbox, zoom)) > settings.MAPA_MAX_TILES:
+        zoom -= 1
+    return zoom
+
+
+def _rect(tile: Tile, zoom: int):
+    lado = lado_tile(zoom)
+    oeste, sur = tile[0] * lado - 180, tile[1] * lado - 90
+    return and_(
+        Reclamo.longitud >= oeste, Reclamo.longitud < oeste + lado,
+        Reclamo.latitud >= sur, Reclamo.latitud < sur + lado,
+    )
+
+
+def _indice(columna, origen: float, lado: float, dialecto: str):
+    """floor((columna - origen) / lado). En SQLite no siempre hay FLOOR, pero
+    el valor es >= 0 y ahí CAST trunca igual; en MySQL CAST redondea."""
+    valor = (columna - origen) / lado
+    if dialecto == "mysql":
+        return func.floor(valor)
+    return cast(valor, Integer)
+
+
+# ============================================================
+# Versión de datos por municipio
+# ============================================================
+
+_versiones: Dict[Optional[int], int] = {}
+
+
+def version_de(municipio_id: Optional[int]) -> int:
+    # municipio None (mapa de toda la plataforma) ve cualquier cambio
+    return _versiones.get(municipio_id, 0)
+
+
+def invalidar_municipio(municipio_id: Optional[int]) -> None:
+    """Nueva versión de los reclamos del municipio (y del mapa de toda la plataforma)."""
+    _versiones[municipio_id] = _versiones.get(municipio_id, 0) + 1
+    if municipio_id is not None:
+        _versiones[None] = _versiones.get(None, 0) + 1
+
+
+def _invalidar(pendientes: List[set]) -> None:
+    for municipio_id in set().union(*pendientes):
+        invalidar_municipio(municipio_id)
+
+
+registrar_invalidacion(
+    "mapa_tiles", (Reclamo,), lambda cambios: {r.municipio_id for r in cambios.todos()}, _invalidar,
+)
+
+
+# ============================================================
+# Capas
+# ============================================================
+
+@dataclass
+class Capa:
+    """Qué reclamos se dibujan y cómo: lo que cambia entre el mapa y el heatmap."""
+    nombre: str
+    municipio_id: Optional[int]
+    # Clave hashable de los filtros (para la cache); `condiciones` son los mismos en SQL
+    filtros: Tuple
+    condiciones: List[Any]
+    # Peso por fila para la intensidad del cluster (None: solo cantidad)
+    peso: Any = None
+    # Columnas de los puntos crudos (sin latitud/longitud, que se agregan
+    # siempre) y cómo se arma cada punto con la fila
+    columnas_punto: Sequence[Any] = ()
+    punto: Callable[[Any], Dict[str, Any]] = dict
+    joins: Sequence[Tuple[Any, Any]] = ()
+
+    def select(self, *columnas):
+        query = select(*columnas).select_from(Reclamo)
+        for destino, on in self.joins:
+            query = query.join(destino, on)
+        condiciones = list(self.condiciones)
+        if self.municipio_id is not None:
+            condiciones.append(Reclamo.municipio_id == self.municipio_id)
+        return query.where(
+            Reclamo.latitud.isnot(None), Reclamo.longitud.isnot(None), *condiciones,
+        )
+
+
+@dataclass
+class ContenidoTile:
+    clusters: List[Dict[str, Any]] = field(default_factory=list)
+    puntos: List[Dict[str, Any]] = field(default_factory=list)
+    total: int = 0
+
+
+@dataclass
+class _Entrada:
+    contenido: ContenidoTile
+    version: int
+    creado: float = field(default_factory=time.monotonic)
+
+
+class TileCache:
+
+    def __init__(self, max_entradas: Optional[int] = None, ttl_s: Optional[int] = None):
+        self.max_entradas = max_entradas or settings.MAPA_TILES_CACHE_MAX
+        self.ttl_s = ttl_s if ttl_s is not None else settings.MAPA_TILES_TTL_S
+        self._entradas: "OrderedDict[Tuple, _Entrada]" = OrderedDict()
+
+    def obtener(self, clave: Tuple, version: int) -> Optional[ContenidoTile]:
+        entrada = self._entradas.get(clave)
+        if entrada is None or entrada.version != version or time.monotonic() - entrada.creado >= self.ttl_s:
+            return None
+        self._entradas.move_to_end(clave)
+        return entrada.contenido
+
+    def guardar(self, clave: Tuple, contenido: ContenidoTile, version: int) -> None:
+        self._entradas[clave] = _Entrada(contenido, version)
+        self._entradas.move_to_end(clave)
+        while len(self._entradas) > self.max_entradas:
+            self._entradas.popitem(last=False)
+
+    def limpiar(self) -> None:
+        self._entradas.clear()
+
+
+tile_cache = TileCache()
+
+
+# ============================================================
+# Agregación
+# ============================================================
+
+async def _calcular_tiles(db: AsyncSession, capa: Capa, zoom: int, tiles: List[Tile]) -> Dict[Tile, ContenidoTile]:
+    """Una query agrupada para todos los tiles pedidos (+ una de puntos crudos en zoom alto)."""
+    n = settings.MAPA_CELDAS_POR_TILE
+    lado = lado_tile(zoom)
+    celda = lado / n
+    dialecto = db.get_bind().dialect.name
+    ix = _indice(Reclamo.longitud, -180.0, celda, dialecto).label("ix")
+    iy = _indice(Reclamo.latitud, -90.0, celda, dialecto).label("iy")
+
+    x0, x1 = min(t[0] for t in tiles), max(t[0] for t in tiles)
+    y0, y1 = min(t[1] for t in tiles), max(t[1] for t in tiles)
+    rect = and_(
+        Reclamo.longitud >= x0 * lado - 180, Reclamo.longitud < (x1 + 1) * lado - 180,
+        Reclamo.latitud >= y0 * lado - 90, Reclamo.latitud < (y1 + 1) * lado - 90,
+    )
+    columnas = [
+        ix, iy,
+        func.count().label("cantidad"),
+        type_coerce(func.avg(Reclamo.latitud), Float).label("lat"),
+        type_coerce(func.avg(Reclamo.longitud), Float).label("lng"),
+    ]
+    if capa.peso is not None:
+        columnas.append(type_coerce(func.sum(capa.peso), Float).label("peso"))
+    filas = (await db.execute(capa.select(*columnas).where(rect).group_by(ix, iy))).all()
+
+    pedidos = set(tiles)
+    contenidos: Dict[Tile, ContenidoTile] = {t: ContenidoTile() for t in tiles}
+    for fila in filas:
+        tile = (int(fila.ix) // n, int(fila.iy) // n)
+        if tile not in pedidos:
+            continue
+        contenido = contenidos[tile]
+        contenido.total += fila.cantidad
+        cluster = {"lat": round(fila.lat, 6), "lng": round(fila.lng, 6), "cantidad": fila.cantidad}
+        if capa.peso is not None:
+            cluster["intensidad"] = round(fila.peso or 0.0, 2)
+        contenido.clusters.append(cluster)
+
+    # Zoom alto: los tiles con pocos reclamos van con los puntos crudos
+    if zoom >= settings.MAPA_ZOOM_PUNTOS and capa.columnas_punto:
+        ralos = {t for t, c in contenidos.items() if 0 < c.total <= settings.MAPA_MAX_PUNTOS_TILE}
+        if ralos:
+            query = capa.select(*capa.columnas_punto, Reclamo.latitud, Reclamo.longitud).where(
+                or_(*(_rect(t, zoom) for t in ralos))
+            )
+            for t in ralos:
+                contenidos[t].clusters = []
+            for fila in (await db.execute(query)).all():
+                tile = (int((fila.longitud + 180) // lado), int((fila.latitud + 90) // lado))
+                if tile in ralos:
+                    contenidos[tile].puntos.append(capa.punto(fila))
+    return contenidos
+
+
+async def agregar(db: AsyncSession, capa: Capa, zoom: Optional[int], bbox: Optional[Bbox]) -> Dict[str, Any]:
+    """
+    Clusters (y puntos crudos en zoom alto) de la capa dentro del bbox.
+
+    Sin bbox se usa la extensión de los datos y, sin zoom, el más fino que
+    entre en MAPA_MAX_TILES: los clientes viejos que pedían "todo" reciben
+    la misma cobertura con tamaño acotado.
+    """
+    if bbox is None:
+        extension = (await db.execute(capa.select(
+            func.min(Reclamo.longitud), func.min(Reclamo.latitud),
+            func.max(Reclamo.longitud), func.max(Reclamo.latitud),
+        ))).one()
+        if extension[0] is None:
+            return {"zoom": zoom or 0, "total": 0, "clusters": [], "puntos": []}
+        bbox = Bbox(*(float(v) for v in extension))
+    zoom = ajustar_zoom(bbox, settings.MAPA_ZOOM_MAX if zoom is None else zoom)
+
+    version = version_de(capa.municipio_id)
+    base = (capa.nombre, capa.municipio_id, capa.filtros, zoom)
+    tiles = tiles_de(bbox, zoom)
+    contenidos: Dict[Tile, ContenidoTile] = {}
+    faltantes: List[Tile] = []
+    for tile in tiles:
+        contenido = tile_cache.obtener(base + tile, version)
+        if contenido is None:
+            faltantes.append(tile)
+        else:
+            contenidos[tile] = contenido
+
+    if faltantes:
+        calculados = await _calcular_tiles(db, capa, zoom, faltantes)
+        for tile, contenido in calculados.items():
+            tile_cache.guardar(base + tile, contenido, version)
+        contenidos.update(calculados)
+
+    clusters: List[Dict[str, Any]] = []
+    puntos: List[Dict[str, Any]] = []
+    total = 0
+    for tile in tiles:
+        contenido = contenidos[tile]
+        clusters.extend(contenido.clusters)
+        puntos.extend(contenido.puntos)
+        total += contenido.total
+    return {"zoom": zoom, "total": total, "clusters": clusters, "puntos": puntos}
+
+
+def invalidar() -> None:
+    tile_cache.limpiar()
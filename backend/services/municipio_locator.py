@@ -0,0 +1,304 @@
+"""
+Localizador de municipios: el más cercano a un punto, los k más cercanos y
+los que están dentro de un radio.
+
+`GET /municipios/public/cercano` corre en la landing para cada visitante
+anónimo y antes traía TODOS los municipios de la BD y calculaba haversine
+contra cada uno en Python. Ahora se arma UNA vez un `IndiceMunicipios` en
+memoria:
+
+- KD-tree sobre los centroides llevados a la esfera unitaria (x, y, z): la
+  distancia euclídea (cuerda) crece con la distancia sobre la superficie,
+  así que el vecino más cercano en 3D es el más cercano en km, sin los
+  problemas de lat/lon cerca del antimeridiano o de los polos. Consultas
+  de k vecinos y por radio en O(log n) promedio.
+- Si el municipio tiene `limites_geojson`, el punto se prueba
+  (point-in-polygon) contra los límites de los
+  settings.MUNICIPIOS_CANDIDATOS_POLIGONO centroides más cercanos: el
+  municipio que lo contiene gana aunque otro centroide quede más cerca.
+
+El índice se reconstruye cuando se guardan municipios (invalidación
+post-commit de core/denormalizacion) y, por las dudas, vence a los
+settings.MUNICIPIOS_INDICE_TTL_S (cambios desde otras instancias o
+borrados en bulk).
+"""
+import heapq
+import logging
+import time
+from dataclasses import dataclass, field
+from math import asin, cos, radians, sin, sqrt
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.denormalizacion import registrar_invalidacion
+from models.municipio import Municipio
+from services.barrio_detector import punto_en_poligono
+
+logger = logging.getLogger(__name__)
+
+RADIO_TIERRA_KM = 6371.0
+
+# Columnas que viajan en la respuesta pública (MunicipioPublic)
+CAMPOS_PUBLICOS = (
+    "id", "nombre", "codigo", "latitud", "longitud", "radio_km", "logo_url",
+    "color_primario", "activo", "abm_en_sidebar", "es_demo",
+)
+
+Punto3 = Tuple[float, float, float]
+
+
+def a_esfera(lat: float, lon: float) -> Punto3:
+    """(lat, lon) en grados -> punto sobre la esfera unitaria."""
+    la, lo = radians(lat), radians(lon)
+    return cos(la) * cos(lo), cos(la) * sin(lo), sin(la)
+
+
+def cuerda_a_km(cuerda2: float) -> float:
+    """Cuerda² sobre la esfera unitaria -> distancia sobre la superficie (km)."""
+    return 2 * RADIO_TIERRA_KM * asin(min(sqrt(cuerda2) / 2, 1.0))
+
+
+def km_a_cuerda2(km: float) -> float:
+    """Inversa de `cuerda_a_km` (para las consultas por radio)."""
+    angulo = min(km / RADIO_TIERRA_KM, 3.141592653589793)
+    return (2 * sin(angulo / 2)) ** 2
+
+
+# ============================================================
+# KD-tree
+# ============================================================
+
+class KDTree:
+    """KD-tree estático sobre puntos 3D. Los nodos son los índices de
+    `puntos`; cada uno guarda su eje de corte y sus dos hijos (-1 = vacío)."""
+
+    def __init__(self, puntos: Sequence[Punto3]):
+        self.puntos = list(puntos)
+        n = len(self.puntos)
+        self._eje = [0] * n
+        self._izq = [-1] * n
+        self._der = [-1] * n
+        self.raiz = self._armar(list(range(n)))
+
+    def _armar(self, idx: List[int]) -> int:
+        if not idx:
+            return -1
+        # Corte por el eje de mayor dispersión: los municipios de un país
+        # ocupan un casquete chico de la esfera, no un cubo
+        eje = max(range(3), key=lambda e: (
+            max(self.puntos[i][e] for i in idx) - min(self.puntos[i][e] for i in idx)
+        ))
+        idx.sort(key=lambda i: self.puntos[i][eje])
+        medio = len(idx) // 2
+        nodo = idx[medio]
+        self._eje[nodo] = eje
+        self._izq[nodo] = self._armar(idx[:medio])
+        self._der[nodo] = self._armar(idx[medio + 1:])
+        return nodo
+
+    def _d2(self, i: int, q: Punto3) -> float:
+        p = self.puntos[i]
+        return (p[0] - q[0]) ** 2 + (p[1] - q[1]) ** 2 + (p[2] - q[2]) ** 2
+
+    def k_cercanos(self, q: Punto3, k: int) -> List[Tuple[float, int]]:
+        """[(cuerda², índice)] de los k puntos más cercanos, del más cercano al más lejano."""
+        if k <= 0 or self.raiz < 0:
+            return []
+        heap: List[Tuple[float, int]] = []  # max-heap (-d², i)
+        pila = [self.raiz]
+        # Recorrido en profundidad con la rama cercana primero; la lejana se
+        # descarta si el plano de corte ya está más lejos que el k-ésimo
+        while pila:
+            nodo = pila.pop()
+            if nodo < 0:
+                continue
+            d2 = self._d2(nodo, q)
+            if len(heap) < k:
+                heapq.heappush(heap, (-d2, nodo))
+            elif d2 < -heap[0][0]:
+                heapq.heapreplace(heap, (-d2, nodo))
+            eje = self._eje[nodo]
+            diff = q[eje] - self.puntos[nodo][eje]
+            cerca, lejos = (self._izq[nodo], self._der[nodo]) if diff < 0 else (self._der[nodo], self._izq[nodo])
+            if lejos >= 0 and (len(heap) < k or diff * diff < -heap[0][0]):
+                pila.append(lejos)
+            pila.append(cerca)
+        return sorted((-d, i) for d, i in heap)
+
+    def en_radio(self, q: Punto3, cuerda2: float) -> List[Tuple[float, int]]:
+        """[(cuerda², índice)] de los puntos a cuerda² <= `cuerda2`, ordenados."""
+        encontrados = []
+        pila = [self.raiz]
+        while pila:
+            nodo = pila.pop()
+            if nodo < 0:
+                continue
+            d2 = self._d2(nodo, q)
+            if d2 <= cuerda2:
+                encontrados.append((d2, nodo))
+            diff = q[self._eje[nodo]] - self.puntos[nodo][self._eje[nodo]]
+            if diff < 0 or diff * diff <= cuerda2:
+                pila.append(self._izq[nodo])
+            if diff >= 0 or diff * diff <= cuerda2:
+                pila.append(self._der[nodo])
+        return sorted(encontrados)
+
+
+# ============================================================
+# Límites
+# ============================================================
+
+def poligonos_de_geojson(valor: Any) -> List[List[List[List[float]]]]:
+    """Polígonos [[exterior, huecos...], ...] con anillos [[lon, lat], ...].
+
+    Acepta Feature, Polygon, MultiPolygon o la lista de coordenadas sola
+    (mismo formato que Barrio.poligono). Lo que no entiende lo ignora: el
+    municipio queda sin límite y se resuelve por centroide.
+    """
+    if not valor:
+        return []
+    try:
+        if isinstance(valor, dict):
+            if valor.get("type") == "Feature":
+                return poligonos_de_geojson(valor.get("geometry"))
+            if valor.get("type") == "FeatureCollection":
+                return [p for f in valor.get("features") or [] for p in poligonos_de_geojson(f)]
+            coords = valor.get("coordinates")
+            if valor.get("type") == "Polygon":
+                coords = [coords]
+            elif valor.get("type") != "MultiPolygon":
+                return []
+        else:
+            coords = valor
+            # Un solo polígono guardado sin la lista exterior
+            if coords and coords[0] and isinstance(coords[0][0][0], (int, float)):
+                coords = [coords]
+        return [pol for pol in coords or [] if pol and len(pol[0]) >= 3]
+    except (TypeError, IndexError, KeyError, AttributeError):
+        return []
+
+
+@dataclass
+class EntradaMunicipio:
+    id: int
+    latitud: float
+    longitud: float
+    radio_km: float
+    datos: Dict[str, Any]
+    poligonos: List[List[List[List[float]]]] = field(default_factory=list)
+    bbox: Optional[Tuple[float, float, float, float]] = None
+
+    def contiene(self, lat: float, lon: float) -> bool:
+        if not self.poligonos:
+            return False
+        x0, y0, x1, y1 = self.bbox
+        if not (x0 <= lon <= x1 and y0 <= lat <= y1):
+            return False
+        return any(punto_en_poligono(lon, lat, pol) for pol in self.poligonos)
+
+
+@dataclass
+class Resultado:
+    municipio: EntradaMunicipio
+    distancia_km: float
+    # Dentro del límite (si lo tiene) o del radio de cobertura
+    en_cobertura: bool
+
+
+# ============================================================
+# Índice
+# ============================================================
+
+class IndiceMunicipios:
+    """Municipios activos precompilados para consultas por cercanía."""
+
+    def __init__(self, municipios: Iterable[Any]):
+        self.entradas: List[EntradaMunicipio] = []
+        for m in municipios:
+            if m.latitud is None or m.longitud is None:
+                continue
+            poligonos = poligonos_de_geojson(getattr(m, "limites_geojson", None))
+            bbox = None
+            if poligonos:
+                puntos = [p for pol in poligonos for p in pol[0]]
+                bbox = (
+                    min(p[0] for p in puntos), min(p[1] for p in puntos),
+                    max(p[0] for p in puntos), max(p[1] for p in puntos),
+                )
+            self.entradas.append(EntradaMunicipio(
+                id=m.id,
+                latitud=m.latitud,
+                longitud=m.longitud,
+                radio_km=m.radio_km if m.radio_km is not None else 10.0,
+                datos={c: getattr(m, c, None) for c in CAMPOS_PUBLICOS},
+                poligonos=poligonos,
+                bbox=bbox,
+            ))
+        self.arbol = KDTree([a_esfera(e.latitud, e.longitud) for e in self.entradas])
+        self.con_limites = sum(1 for e in self.entradas if e.poligonos)
+
+    def __len__(self) -> int:
+        return len(self.entradas)
+
+    def _resultado(self, cuerda2: float, i: int, lat: float, lon: float) -> Resultado:
+        e = self.entradas[i]
+        distancia = cuerda_a_km(cuerda2)
+        return Resultado(e, distancia, e.contiene(lat, lon) or distancia <= e.radio_km)
+
+    def k_cercanos(self, lat: float, lon: float, k: int = 1) -> List[Resultado]:
+        """Los k municipios de centroide más cercano, ordenados por distancia."""
+        return [
+            self._resultado(d2, i, lat, lon)
+            for d2, i in self.arbol.k_cercanos(a_esfera(lat, lon), k)
+        ]
+
+    def en_radio(self, lat: float, lon: float, radio_km: float) -> List[Resultado]:
+        """Municipios con centroide a <= radio_km, ordenados por distancia."""
+        return [
+            self._resultado(d2, i, lat, lon)
+            for d2, i in self.arbol.en_radio(a_esfera(lat, lon), km_a_cuerda2(radio_km))
+        ]
+
+    def localizar(self, lat: float, lon: float) -> Optional[Resultado]:
+        """El municipio del punto: el que lo contiene según sus límites (entre
+        los centroides más cercanos) o, si ninguno, el de centroide más cercano."""
+        k = settings.MUNICIPIOS_CANDIDATOS_POLIGONO if self.con_limites else 1
+        candidatos = self.k_cercanos(lat, lon, max(k, 1))
+        if not candidatos:
+            return None
+        for r in candidatos:
+            if r.municipio.poligonos and r.municipio.contiene(lat, lon):
+                return r
+        return candidatos[0]
+
+
+_indice: Optional[Tuple[float, IndiceMunicipios]] = None
+# Se incrementa en cada invalidación: un armado que empezó antes no se guarda
+_generacion = 0
+
+
+async def obtener_indice(db: AsyncSession) -> IndiceMunicipios:
+    """Índice desde la cache del proceso (lo arma si no está o venció)."""
+    global _indice
+    if _indice is not None and time.monotonic() < _indice[0]:
+        return _indice[1]
+    generacion = _generacion
+    result = await db.execute(select(Municipio).where(Municipio.activo == True))  # noqa: E712
+    indice = IndiceMunicipios(result.scalars().all())
+    if generacion == _generacion:
+        _indice = (time.monotonic() + settings.MUNICIPIOS_INDICE_TTL_S, indice)
+        logger.info("Índice de municipios: %d (%d con límites)", len(indice), indice.con_limites)
+    return indice
+
+
+def invalidar_indice() -> None:
+    global _indice, _generacion
+    _generacion += 1
+    _indice = None
+
+
+# Cualquier municipio tocado descarta el índice entero
+registrar_invalidacion("municipios_indice", (Municipio,), bool, lambda pendientes: invalidar_indice())
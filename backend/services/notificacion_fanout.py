@@ -0,0 +1,267 @@
+"""
+Fan-out de notificaciones a muchos usuarios (supervisores de un municipio).
+
+Antes cada evento ("llegó un reclamo", "comentó un vecino", "nuevo
+trámite") recorría los supervisores uno por uno: SELECT de preferencias,
+INSERT + COMMIT de la notificación, SELECT del creador, email con su propio
+login SMTP y SELECT de suscripciones push — ~6 round-trips por supervisor.
+
+`fan_out()` hace el mismo trabajo con una cantidad fija de queries sin
+importar cuántos destinatarios haya:
+
+  1. destinatarios ya resueltos con `resolver_destinatarios()` (1 SELECT)
+  2. notificaciones in-app: 1 INSERT multi-row
+  3. suscripciones push / config WhatsApp: 1 SELECT cada una
+  4. push, email y WhatsApp en paralelo (red, sin BD)
+  5. suscripciones vencidas: 1 UPDATE; logs WhatsApp: 1 INSERT multi-row
+
+`fan_out()` NO commitea: todo lo que escribe queda en la transacción del
+caller, que commitea cuando corresponde. En el outbox eso es junto con la
+marca de evento procesado, así un reintento del handler no duplica la
+campanita. Un endpoint que lo llame tiene que commitear después.
+
+Uso:
+
+    dest = await resolver_destinatarios(db, municipio_id, preferencia="reclamo_nuevo_supervisor")
+    await fan_out(db, dest, titulo=..., mensaje=..., reclamo_id=...,
+                  push=PushFanOut(...), email=EmailFanOut(...))
+"""
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.enums import RolUsuario
+from models.notificacion import Notificacion
+from models.user import DEFAULT_NOTIFICATION_PREFERENCES, User
+from models.whatsapp_config import WhatsAppConfig, WhatsAppLog
+
+logger = logging.getLogger(__name__)
+
+# Envíos WhatsApp en paralelo por evento
+WHATSAPP_CONCURRENCIA = 5
+
+
+@dataclass
+class Destinatario:
+    id: int
+    email: Optional[str]
+    telefono: Optional[str]
+
+
+@dataclass
+class PushFanOut:
+    title: str
+    body: str
+    url: Optional[str] = None
+    data: Optional[dict] = None
+
+
+@dataclass
+class EmailFanOut:
+    subject: str
+    body_html: str
+
+
+@dataclass
+class WhatsAppFanOut:
+    municipio_id: int
+    mensaje: str
+    tipo_mensaje: str
+
+
+@dataclass
+class FanOutResultado:
+    notificados: List[int] = field(default_factory=list)
+    push_enviados: int = 0
+    emails_enviados: int = 0
+    whatsapp_enviados: int = 0
+
+
+async def resolver_destinatarios(
+    db: AsyncSession,
+    municipio_id: int,
+    roles: Iterable[RolUsuario] = (RolUsuario.SUPERVISOR,),
+    preferencia: Optional[str] = None,
+) -> List[Destinatario]:
+    """Usuarios activos del municipio con esos roles, en un solo SELECT.
+
+    Si se pasa `preferencia`, descarta a quienes la tienen deshabilitada
+    (mismo criterio que `check_user_notification_preference`).
+    """
+    result = await db.execute(
+        select(User.id, User.email, User.telefono, User.notificacion_preferencias).where(
+            User.municipio_id == municipio_id,
+            User.rol.in_(list(roles)),
+            User.activo == True,
+        )
+    )
+    destinatarios = []
+    for uid, email, telefono, prefs in result.all():
+        if preferencia and not (prefs or DEFAULT_NOTIFICATION_PREFERENCES).get(preferencia, True):
+            continue
+        destinatarios.append(Destinatario(id=uid, email=email, telefono=telefono))
+    return destinatarios
+
+
+async def insertar_notificaciones(
+    db: AsyncSession,
+    usuario_ids: List[int],
+    titulo: str,
+    mensaje: str,
+    tipo: str = "info",
+    reclamo_id: Optional[int] = None,
+    solicitud_id: Optional[int] = None,
+    accion_url: Optional[str] = None,
+) -> None:
+    """Un INSERT multi-row con la notificación de la campanita para todos."""
+    if not usuario_ids:
+        return
+    await db.execute(insert(Notificacion), [
+        {
+            "usuario_id": uid,
+            "titulo": titulo,
+            "mensaje": mensaje,
+            "tipo": tipo,
+            "reclamo_id": reclamo_id,
+            "solicitud_id": solicitud_id,
+            "accion_url": accion_url,
+            "leida": False,
+        }
+        for uid in usuario_ids
+    ])
+
+
+async def _enviar_whatsapps(config: WhatsAppConfig, envios: List[Destinatario], mensaje: str) -> List[Dict[str, Any]]:
+    """Manda el mismo mensaje a todos (en paralelo). Devuelve una fila de
+    log por envío, lista para insertar."""
+    from api.whatsapp import formatear_telefono_argentina
+    from services.whatsapp import sender
+
+    sem = asyncio.Semaphore(WHATSAPP_CONCURRENCIA)
+
+    async def _uno(dest: Destinatario) -> Dict[str, Any]:
+        telefono = formatear_telefono_argentina(dest.telefono)
+        fila = {"telefono": telefono, "usuario_id": dest.id, "enviado": False, "message_id": None, "error": None}
+        async with sem:
+            try:
+                fila["message_id"] = await sender.enviar(config, telefono, mensaje)
+                fila["enviado"] = True
+            except Exception as e:
+                logger.error(f"Error enviando WhatsApp a usuario {dest.id}: {e}")
+                fila["error"] = str(e)[:500]
+        return fila
+
+    return list(await asyncio.gather(*(_uno(d) for d in envios)))
+
+
+async def fan_out(
+    db: AsyncSession,
+    destinatarios: List[Destinatario],
+    *,
+    titulo: str,
+    mensaje: str,
+    tipo: str = "info",
+    reclamo_id: Optional[int] = None,
+    solicitud_id: Optional[int] = None,
+    push: Optional[PushFanOut] = None,
+    email: Optional[EmailFanOut] = None,
+    whatsapp: Optional[WhatsAppFanOut] = None,
+    in_app: bool = True,
+) -> FanOutResultado:
+    """Notificación in-app + push/email/WhatsApp a todos los destinatarios.
+
+    `in_app=False` saltea la campanita (el outbox la manda por separado del
+    WhatsApp para reintentar cada canal por su lado). No commitea (ver
+    docstring del módulo). Un canal que falla no corta a los otros."""
+    from services.email_service import email_service
+    from services.push_service import (
+        build_push_payload, cargar_suscripciones, desactivar_suscripciones,
+        enviar_push_suscripciones,
+    )
+    from core.config import settings
+
+    resultado = FanOutResultado(notificados=[d.id for d in destinatarios])
+    if not destinatarios:
+        return resultado
+
+    # --- BD: todo lo que hay que leer/escribir antes de salir a la red ---
+    if in_app:
+        await insertar_notificaciones(
+            db, resultado.notificados, titulo, mensaje, tipo,
+            reclamo_id=reclamo_id, solicitud_id=solicitud_id,
+        )
+
+    subs: List[dict] = []
+    if push and settings.VAPID_PRIVATE_KEY and settings.VAPID_PUBLIC_KEY:
+        subs = await cargar_suscripciones(db, resultado.notificados)
+
+    wa_config = None
+    wa_envios = [d for d in destinatarios if d.telefono] if whatsapp else []
+    if wa_envios:
+        wa_config = (await db.execute(
+            select(WhatsAppConfig).where(WhatsAppConfig.municipio_id == whatsapp.municipio_id)
+        )).scalar_one_or_none()
+        if not wa_config or not wa_config.habilitado:
+            wa_config, wa_envios = None, []
+
+    # --- Red: los tres canales en paralelo ---
+    async def _push():
+        if not subs:
+            return 0, []
+        payload = build_push_payload(push.title, push.body, push.url, None, push.data)
+        return await enviar_push_suscripciones(subs, payload)
+
+    async def _email():
+        emails = [d.email for d in destinatarios if d.email] if email else []
+        if not emails:
+            return 0
+        r = await email_service.send_bulk_email(emails, email.subject, email.body_html)
+        return r["sent"]
+
+    async def _whatsapp():
+        if not wa_envios:
+            return []
+        return await _enviar_whatsapps(wa_config, wa_envios, whatsapp.mensaje)
+
+    push_r, email_r, wa_r = await asyncio.gather(
+        _push(), _email(), _whatsapp(), return_exceptions=True,
+    )
+
+    # --- BD: resultados de los envíos ---
+    if isinstance(push_r, BaseException):
+        logger.error(f"[fanout] push fallo: {push_r}")
+    else:
+        resultado.push_enviados, invalidas = push_r
+        if invalidas:
+            await desactivar_suscripciones(db, invalidas, commit=False)
+
+    if isinstance(email_r, BaseException):
+        logger.error(f"[fanout] email fallo: {email_r}")
+    else:
+        resultado.emails_enviados = email_r
+
+    if isinstance(wa_r, BaseException):
+        logger.error(f"[fanout] whatsapp fallo: {wa_r}")
+    elif wa_r:
+        await db.execute(insert(WhatsAppLog), [
+            {
+                **fila,
+                "config_id": wa_config.id,
+                "tipo_mensaje": whatsapp.tipo_mensaje,
+                "mensaje": whatsapp.mensaje[:500],
+                "reclamo_id": reclamo_id,
+            }
+            for fila in wa_r
+        ])
+        resultado.whatsapp_enviados = sum(1 for f in wa_r if f["enviado"])
+
+    logger.info(
+        f"[fanout] '{titulo}': {len(resultado.notificados)} notificados, "
+        f"{resultado.push_enviados} push, {resultado.emails_enviados} emails, "
+        f"{resultado.whatsapp_enviados} WhatsApp"
+    )
+    return resultado
@@ -147,52 +147,32 @@ class NotificacionService:
         mensaje: str,
         tipo: str = "info",
         reclamo_id: Optional[int] = None,
-        enviar_whatsapp: bool = True
+        enviar_whatsapp: bool = True,
+        enviar_inapp: bool = True
     ) -> List[int]:
         """
         Notifica a todos los supervisores y admins de un municipio.
-        Envía notificación in-app y opcionalmente WhatsApp.
+        Envía notificación in-app (salvo enviar_inapp=False) y opcionalmente WhatsApp.
         Retorna lista de IDs de usuarios notificados.
         """
-        # Buscar supervisores y admins del municipio
-        result = await db.execute(
-            select(User).where(
-                User.municipio_id == municipio_id,
-                User.activo == True,
-                User.rol.in_([RolUsuario.SUPERVISOR, RolUsuario.ADMIN])
-            )
-        )
-        supervisores = result.scalars().all()
+        from services.notificacion_fanout import WhatsAppFanOut, fan_out, resolver_destinatarios
 
-        notificados = []
-        for supervisor in supervisores:
-            # Notificación in-app
-            await NotificacionService.crear_notificacion_inapp(
-                db=db,
-                usuario_id=supervisor.id,
-                titulo=titulo,
+        # Supervisores y admins del municipio: 1 SELECT + 1 INSERT multi-row
+        # + WhatsApp en paralelo, sin importar cuántos sean
+        supervisores = await resolver_destinatarios(
+            db, municipio_id, roles=(RolUsuario.SUPERVISOR, RolUsuario.ADMIN)
+        )
+        resultado = await fan_out(
+            db, supervisores,
+            titulo=titulo, mensaje=mensaje, tipo=tipo, reclamo_id=reclamo_id,
+            whatsapp=WhatsAppFanOut(
+                municipio_id=municipio_id,
                 mensaje=mensaje,
-                tipo=tipo,
-                reclamo_id=reclamo_id
-            )
-            notificados.append(supervisor.id)
-
-            # WhatsApp si está habilitado y tiene teléfono
-            if enviar_whatsapp and supervisor.telefono:
-                try:
-                    await NotificacionService._enviar_whatsapp(
-                        db=db,
-                        municipio_id=municipio_id,
-                        telefono=supervisor.telefono,
-                        mensaje=mensaje,
-                        usuario_id=supervisor.id,
-                        reclamo_id=reclamo_id,
-                        tipo_mensaje="notificacion_supervisor"
-                    )
-                except Exception as e:
-                    print(f"Error enviando WhatsApp a supervisor {supervisor.id}: {e}")
-
-        return notificados
+                tipo_mensaje="notificacion_supervisor",
+            ) if enviar_whatsapp else None,
+            in_app=enviar_inapp,
+        )
+        return resultado.notificados
 
     @staticmethod
     async def notificar_vecino(
@@ -202,11 +182,12 @@ class NotificacionService:
         mensaje: str,
         tipo: str = "info",
         tipo_whatsapp: str = "cambio_estado",
-        enviar_whatsapp: bool = True
+        enviar_whatsapp: bool = True,
+        enviar_inapp: bool = True
     ):
         """
         Notifica al creador del reclamo.
-        Envía notificación in-app y opcionalmente WhatsApp.
+        Envía notificación in-app (salvo enviar_inapp=False) y opcionalmente WhatsApp.
         NO notifica a usuarios anónimos.
         """
         # Obtener el usuario creador
@@ -224,14 +205,15 @@ class NotificacionService:
             return
 
         # Notificación in-app
-        await NotificacionService.crear_notificacion_inapp(
-            db=db,
-            usuario_id=user.id,
-            titulo=titulo,
-            mensaje=mensaje,
-            tipo=tipo,
-            reclamo_id=reclamo.id
-        )
+        if enviar_inapp:
+            await NotificacionService.crear_notificacion_inapp(
+                db=db,
+                usuario_id=user.id,
+                titulo=titulo,
+                mensaje=mensaje,
+                tipo=tipo,
+                reclamo_id=reclamo.id
+            )
 
         # WhatsApp si está habilitado
         if enviar_whatsapp and user.telefono:
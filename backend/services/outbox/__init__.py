@@ -0,0 +1,33 @@
+"""Outbox transaccional de efectos secundarios de reclamos y solicitudes
+(dispatcher.py) y sus handlers por canal (handlers.py).
+
+    from services.outbox import publicar
+    publicar(db, "reclamo.creado", {"reclamo_id": reclamo.id, ...}, municipio_id=...)
+    await db.commit()   # el evento se graba con el reclamo y despierta al dispatcher
+
+En tests: `OutboxDispatcher(session_factory=TestSessionLocal).procesar_pendientes()`.
+"""
+from .dispatcher import (
+    HANDLERS,
+    HandlerNoRegistrado,
+    OutboxDispatcher,
+    maneja,
+    metricas,
+    outbox_dispatcher,
+    publicar,
+    reclamar_eventos,
+    reintentar_fallidos,
+)
+from . import handlers  # noqa: F401  registra los handlers de reclamos y solicitudes
+
+__all__ = [
+    "HANDLERS",
+    "HandlerNoRegistrado",
+    "OutboxDispatcher",
+    "maneja",
+    "metricas",
+    "outbox_dispatcher",
+    "publicar",
+    "reclamar_eventos",
+    "reintentar_fallidos",
+]
@@ -0,0 +1,399 @@
+"""Outbox transaccional: publicacion de eventos y dispatcher con reintentos.
+
+Los endpoints de reclamos y tramites disparaban push, emails, WhatsApp y
+gamificacion con `asyncio.create_task` despues del commit (si el proceso se
+reiniciaba, se perdian sin dejar rastro) o con awaits inline (cientos de ms
+en la respuesta al vecino). Ahora:
+
+  1. El endpoint llama a `publicar(db, tipo, payload)` antes de su
+     `commit()`: se agrega una `OutboxEvento` por cada handler registrado
+     para ese tipo, en la misma transaccion que el cambio de dominio.
+  2. Al commitear, un listener de Session despierta al dispatcher (si la
+     transaccion hace rollback, los eventos desaparecen con ella).
+  3. Cada worker toma un lote (SELECT ... FOR UPDATE SKIP LOCKED + lease,
+     igual que services/pagos/webhook_worker.py) y lo ejecuta en paralelo,
+     con un semaforo por handler: OUTBOX_CONCURRENCIA acota cuantos emails
+     o WhatsApp salen a la vez sin frenar al resto de los canales. Al pasar
+     el semaforo se renueva el lease con el token de la toma; cerrar o
+     reprogramar el evento tambien exige ese token, asi un evento que otro
+     worker retomo no se ejecuta dos veces desde aca.
+  4. Si el handler falla: backoff exponencial con jitter hasta
+     OUTBOX_MAX_INTENTOS; despues `fallido_at` (dead letter) y
+     `reintentar_fallidos()` para volver a encolarlos a mano.
+
+La entrega es al-menos-una-vez: un handler que cae despues de enviar
+(o un worker que muere con el lease tomado) se reintenta. Los handlers
+reciben solo el payload y recargan lo que necesitan en su sesion.
+
+Corre dentro del proceso de la API (lifespan de main.py). En dev/tests
+`procesar_pendientes()` hace una pasada sincronica:
+
+    from services.outbox import publicar, outbox_dispatcher
+    publicar(db, "reclamo.creado", {"reclamo_id": r.id}, municipio_id=r.municipio_id)
+    await db.commit()
+    ...
+    await OutboxDispatcher(session_factory=TestSessionLocal).procesar_pendientes()
+"""
+import asyncio
+import logging
+import random
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta
+from secrets import token_hex
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy import and_, case, event, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.database import AsyncSessionLocal
+from models.outbox_evento import OutboxEvento
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[AsyncSession, Dict[str, Any]], Awaitable[None]]
+
+# tipo de evento -> {nombre del handler: funcion}
+HANDLERS: Dict[str, Dict[str, Handler]] = {}
+
+_CLAVE_PUBLICADO = "outbox_publicado"
+
+
+class HandlerNoRegistrado(Exception):
+    """La fila apunta a un (tipo, handler) que ya no existe en el codigo."""
+
+
+def maneja(tipo: str, handler: str) -> Callable[[Handler], Handler]:
+    """Decorador: registra `fn` como el handler `handler` del evento `tipo`."""
+    def decorador(fn: Handler) -> Handler:
+        HANDLERS.setdefault(tipo, {})[handler] = fn
+        return fn
+    return decorador
+
+
+def publicar(
+    db: AsyncSession,
+    tipo: str,
+    payload: Dict[str, Any],
+    municipio_id: Optional[int] = None,
+) -> List[OutboxEvento]:
+    """Agrega el evento a la sesion, una fila por handler. No commitea: se
+    graba (o se descarta) con la transaccion del llamador."""
+    handlers = HANDLERS.get(tipo)
+    if not handlers:
+        raise ValueError(f"Evento de outbox sin handlers: {tipo}")
+    filas = [
+        OutboxEvento(tipo=tipo, handler=nombre, payload=payload, municipio_id=municipio_id)
+        for nombre in handlers
+    ]
+    db.add_all(filas)
+    db.info[_CLAVE_PUBLICADO] = True
+    return filas
+
+
+@event.listens_for(Session, "after_commit")
+def _despertar_al_commitear(session: Session) -> None:
+    if session.info.pop(_CLAVE_PUBLICADO, False):
+        outbox_dispatcher.notificar()
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_al_rollback(session: Session) -> None:
+    session.info.pop(_CLAVE_PUBLICADO, None)
+
+
+def _ahora() -> datetime:
+    return datetime.utcnow()
+
+
+def _naive(dt: Optional[datetime]) -> Optional[datetime]:
+    return dt.replace(tzinfo=None) if dt is not None and dt.tzinfo else dt
+
+
+def _lease() -> timedelta:
+    return timedelta(seconds=settings.OUTBOX_TIMEOUT_S + 60)
+
+
+def backoff_segundos(intentos: int) -> float:
+    """base * 2^(intentos-1) con tope, +-10% de jitter."""
+    base = settings.OUTBOX_BACKOFF_BASE_S * (2 ** max(intentos - 1, 0))
+    return min(base, settings.OUTBOX_BACKOFF_MAX_S) * random.uniform(0.9, 1.1)
+
+
+def limite_concurrencia(handler: str) -> int:
+    return max(settings.OUTBOX_CONCURRENCIA.get(handler, settings.OUTBOX_CONCURRENCIA_DEFAULT), 1)
+
+
+def _disponible(ahora: datetime):
+    evt = OutboxEvento
+    return and_(
+        evt.procesado_at.is_(None),
+        evt.fallido_at.is_(None),
+        or_(evt.proximo_intento_at.is_(None), evt.proximo_intento_at <= ahora),
+        or_(evt.tomado_hasta.is_(None), evt.tomado_hasta < ahora),
+    )
+
+
+async def reclamar_eventos(db: AsyncSession, worker_id: str, limite: int) -> List[OutboxEvento]:
+    """Toma hasta `limite` eventos pendientes para este worker.
+
+    Mismo protocolo que el worker de webhooks: candidatos con SKIP LOCKED,
+    UPDATE condicionado con un token unico por toma (en SQLite, sin SKIP
+    LOCKED, solo un worker gana cada fila) y re-SELECT por token.
+    """
+    ahora = _ahora()
+    token = f"{worker_id}:{token_hex(4)}"
+    candidatos = (await db.execute(
+        select(OutboxEvento.id)
+        .where(_disponible(ahora))
+        .order_by(OutboxEvento.id)
+        .limit(limite)
+        .with_for_update(skip_locked=True)
+    )).scalars().all()
+    if not candidatos:
+        await db.commit()
+        return []
+    await db.execute(
+        update(OutboxEvento)
+        .where(OutboxEvento.id.in_(candidatos), _disponible(ahora))
+        .values(
+            tomado_por=token,
+            tomado_hasta=ahora + _lease(),
+            intentos=OutboxEvento.intentos + 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    tomados = (await db.execute(
+        select(OutboxEvento)
+        .where(OutboxEvento.tomado_por == token)
+        .order_by(OutboxEvento.id)
+        .execution_options(populate_existing=True)
+    )).scalars().all()
+    await db.commit()
+    return list(tomados)
+
+
+async def _renovar_lease(db: AsyncSession, evento_id: int, token: str) -> bool:
+    """Extiende el lease al empezar a ejecutar el evento (el lote se toma de
+    una vez y los eventos pueden esperar el semaforo de su handler). False si
+    el lease ya vencio y otro worker lo retomo."""
+    result = await db.execute(
+        update(OutboxEvento)
+        .where(
+            OutboxEvento.id == evento_id,
+            OutboxEvento.tomado_por == token,
+            OutboxEvento.procesado_at.is_(None),
+        )
+        .values(tomado_hasta=_ahora() + _lease())
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount == 1
+
+
+async def _marcar_procesado(db: AsyncSession, evento_id: int, token: str) -> bool:
+    result = await db.execute(
+        update(OutboxEvento)
+        .where(OutboxEvento.id == evento_id, OutboxEvento.tomado_por == token)
+        .values(procesado_at=_ahora(), error=None, tomado_por=None, tomado_hasta=None)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount == 1
+
+
+async def _registrar_fallo(
+    db: AsyncSession, evento_id: int, token: str, intentos: int, error: BaseException,
+) -> bool:
+    """Programa el reintento (o manda a dead letter). Devuelve True si agotó.
+    Si el evento ya no es de esta toma no lo toca."""
+    ahora = _ahora()
+    valores = {
+        "error": (str(error) or type(error).__name__)[:500],
+        "tomado_por": None,
+        "tomado_hasta": None,
+    }
+    agotado = intentos >= settings.OUTBOX_MAX_INTENTOS
+    if agotado:
+        valores["fallido_at"] = ahora
+    else:
+        valores["proximo_intento_at"] = ahora + timedelta(seconds=backoff_segundos(intentos))
+    result = await db.execute(
+        update(OutboxEvento)
+        .where(OutboxEvento.id == evento_id, OutboxEvento.tomado_por == token)
+        .values(**valores)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return agotado and result.rowcount == 1
+
+
+async def reintentar_fallidos(db: AsyncSession, ids: Optional[Sequence[int]] = None) -> int:
+    """Saca de dead letter los eventos (todos o los `ids`) con intentos en 0."""
+    q = (
+        update(OutboxEvento)
+        .where(OutboxEvento.fallido_at.isnot(None), OutboxEvento.procesado_at.is_(None))
+        .values(fallido_at=None, proximo_intento_at=None, intentos=0)
+        .execution_options(synchronize_session=False)
+    )
+    if ids is not None:
+        q = q.where(OutboxEvento.id.in_(list(ids)))
+    n = (await db.execute(q)).rowcount
+    await db.commit()
+    if n:
+        outbox_dispatcher.notificar()
+    return n
+
+
+@dataclass
+class OutboxStats:
+    """Contadores del proceso (se reinician con la instancia)."""
+    procesados: int = 0
+    reintentos: int = 0
+    fallidos: int = 0
+    ultimo_lag_s: Optional[float] = None   # created_at -> procesado del ultimo evento OK
+
+
+class OutboxDispatcher:
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        lote: Optional[int] = None,
+        poll_s: Optional[float] = None,
+    ):
+        self.workers = workers if workers is not None else settings.OUTBOX_WORKERS
+        self.session_factory = session_factory
+        self.lote = lote if lote is not None else settings.OUTBOX_LOTE
+        self.poll_s = poll_s if poll_s is not None else settings.OUTBOX_POLL_S
+        self.stats = OutboxStats()
+        self._despertar = asyncio.Event()
+        self._semaforos: Dict[str, asyncio.Semaphore] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._id = token_hex(3)
+
+    def notificar(self) -> None:
+        """Despierta a los workers (lo llama el listener de after_commit)."""
+        self._despertar.set()
+
+    def _semaforo(self, handler: str) -> asyncio.Semaphore:
+        # Compartido entre los workers de la instancia
+        if handler not in self._semaforos:
+            self._semaforos[handler] = asyncio.Semaphore(limite_concurrencia(handler))
+        return self._semaforos[handler]
+
+    async def procesar_evento(self, evt: OutboxEvento) -> bool:
+        fn = HANDLERS.get(evt.tipo, {}).get(evt.handler)
+        token = evt.tomado_por
+        async with self._semaforo(evt.handler):
+            async with self.session_factory() as db:
+                if not await _renovar_lease(db, evt.id, token):
+                    logger.info("Outbox %s: lease vencido esperando turno, lo tiene otro worker", evt.id)
+                    return False
+                try:
+                    if fn is None:
+                        raise HandlerNoRegistrado(f"{evt.tipo}/{evt.handler}")
+                    await asyncio.wait_for(fn(db, dict(evt.payload or {})), timeout=settings.OUTBOX_TIMEOUT_S)
+                    if not await _marcar_procesado(db, evt.id, token):
+                        logger.warning("Outbox %s: procesado, pero la toma ya no era de este worker", evt.id)
+                except Exception as e:
+                    await db.rollback()
+                    agotado = await _registrar_fallo(db, evt.id, token, evt.intentos, e)
+                    if agotado:
+                        self.stats.fallidos += 1
+                        logger.error("Outbox %s (%s/%s) agotó reintentos: %s", evt.id, evt.tipo, evt.handler, e)
+                    else:
+                        self.stats.reintentos += 1
+                        logger.warning("Outbox %s (%s/%s) falló, se reintenta: %s", evt.id, evt.tipo, evt.handler, e)
+                    return False
+        self.stats.procesados += 1
+        if evt.created_at is not None:
+            self.stats.ultimo_lag_s = (_ahora() - _naive(evt.created_at)).total_seconds()
+        return True
+
+    async def _drenar(self, worker_id: str) -> int:
+        """Procesa lotes hasta que no quede nada disponible."""
+        total = 0
+        while True:
+            async with self.session_factory() as db:
+                eventos = await reclamar_eventos(db, worker_id, self.lote)
+            if not eventos:
+                return total
+            resultados = await asyncio.gather(*(self.procesar_evento(e) for e in eventos))
+            total += sum(resultados)
+
+    async def procesar_pendientes(self) -> int:
+        """Una pasada de todos los workers. Devuelve cuantos procesó OK."""
+        n = max(self.workers, 1)
+        resultados = await asyncio.gather(*(self._drenar(f"{self._id}-{i}") for i in range(n)))
+        return sum(resultados)
+
+    async def _loop(self, worker_id: str) -> None:
+        while True:
+            try:
+                await self._drenar(worker_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("[outbox %s] error: %s", worker_id, e)
+            try:
+                await asyncio.wait_for(self._despertar.wait(), timeout=self.poll_s)
+            except asyncio.TimeoutError:
+                pass
+            self._despertar.clear()
+
+    def start(self) -> None:
+        if self._tasks or self.workers <= 0:
+            return
+        loop = asyncio.get_running_loop()
+        self._tasks = [
+            loop.create_task(self._loop(f"{self._id}-{i}")) for i in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        for t in self._tasks:
+            try:
+                await t
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+
+async def metricas(db: AsyncSession, dispatcher: Optional[OutboxDispatcher] = None) -> dict:
+    """Estado de la cola por handler (global, todas las instancias) +
+    contadores locales."""
+    evt = OutboxEvento
+    pendiente = and_(evt.procesado_at.is_(None), evt.fallido_at.is_(None))
+    # CASE en vez de FILTER (WHERE ...): MySQL no lo soporta
+    filas = (await db.execute(
+        select(
+            evt.handler,
+            func.sum(case((pendiente, 1), else_=0)),
+            func.sum(case((and_(pendiente, evt.intentos > 0), 1), else_=0)),
+            func.sum(case((evt.fallido_at.isnot(None), 1), else_=0)),
+            func.min(case((pendiente, evt.created_at))),
+        ).group_by(evt.handler)
+    )).all()
+    ahora = _ahora()
+    handlers = {}
+    for handler, pendientes, en_reintento, fallidos, mas_viejo in filas:
+        lag = (ahora - _naive(mas_viejo)).total_seconds() if mas_viejo else 0.0
+        handlers[handler] = {
+            "pendientes": pendientes or 0,
+            "en_reintento": en_reintento or 0,
+            "fallidos": fallidos or 0,
+            "lag_segundos": round(max(lag, 0.0), 1),
+            "concurrencia": limite_concurrencia(handler),
+        }
+    return {
+        "pendientes": sum(h["pendientes"] for h in handlers.values()),
+        "fallidos": sum(h["fallidos"] for h in handlers.values()),
+        "handlers": handlers,
+        "proceso": asdict((dispatcher or outbox_dispatcher).stats),
+    }
+
+
+outbox_dispatcher = OutboxDispatcher()
@@ -0,0 +1,338 @@
+"""Handlers del outbox para los eventos de reclamos y solicitudes.
+
+Cada handler recibe su propia sesion y el payload (ids + datos chicos del
+momento del evento), recarga lo que necesita y levanta excepcion si hay que
+reintentar. Lo que escriben en la BD sin commitear (campanita, historial) se
+graba junto con la marca de procesado del evento.
+
+Canales: push, email, in_app (campanita), whatsapp, gamificacion y
+websocket. El de websocket solo llega a los clientes conectados a la
+instancia que procesa el evento (es best effort: el front igual refresca
+al abrir el reclamo).
+"""
+import logging
+from typing import Any, Dict
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from core.websocket import WSEvents, manager
+from models.enums import EstadoReclamo
+from models.historial import HistorialReclamo
+from models.reclamo import Reclamo
+from models.user import User
+from .dispatcher import maneja
+
+logger = logging.getLogger(__name__)
+
+ESTADOS_RESUELTO = (EstadoReclamo.RESUELTO.value, EstadoReclamo.FINALIZADO.value)
+
+
+async def _reclamo(db: AsyncSession, payload: Dict[str, Any], *relaciones) -> Reclamo:
+    q = select(Reclamo).where(Reclamo.id == payload["reclamo_id"])
+    if relaciones:
+        q = q.options(*(selectinload(r) for r in relaciones))
+    reclamo = (await db.execute(q)).scalar_one_or_none()
+    if reclamo is None:
+        # Lo pudieron borrar entre el commit y el envio: nada que hacer
+        logger.info("[outbox] reclamo #%s ya no existe", payload["reclamo_id"])
+    return reclamo
+
+
+# ============================================================
+# reclamo.creado
+# ============================================================
+
+@maneja("reclamo.creado", "push")
+async def push_reclamo_creado(db: AsyncSession, payload: Dict[str, Any]) -> None:
+    from services.push_service import notificar_dependencia_reclamo_nuevo, notificar_reclamo_recibido
+
+    reclamo = await _reclamo(db, payload)
+    if reclamo is None:
+        return
+    await notificar_reclamo_recibido(db, reclamo)
+    if reclamo.municipio_dependencia_id:
+        await notificar_dependencia_reclamo_nuevo(db, reclamo, payload.get("categoria_nombre"))
+
+
+@maneja("reclamo.creado", "email")
+async def email_reclamo_creado(db: AsyncSession, payload: Dict[str, Any]) -> None:
+    """Confirmacion al usuario que cargo el reclamo; deja el resultado en el
+    historial. Un envio fallido se reintenta (antes quedaba email_fallido)."""
+    from services.email_service import EmailTemplates, email_service
+
+    reclamo = await _reclamo(db, payload, Reclamo.categoria)
+    if reclamo is None:
+        return
+    usuario = await db.get(User, payload["usuario_id"])
+    if usuario is None or not usuario.email:
+        db.add(HistorialReclamo(
+            reclamo_id=reclamo.id,
+            usuario_id=payload["usuario_id"],
+            accion="email_fallido",
+            comentario="❌ No se envió email de confirmación: usuario sin email configurado",
+        ))
+        return
+
+    html_content = EmailTemplates.reclamo_creado(
+        reclamo_titulo=reclamo.titulo,
+        reclamo_id=reclamo.id,
+        categoria=reclamo.categoria.nombre if reclamo.categoria else "Sin categoría",
+        descripcion=reclamo.descripcion,
+        creador_nombre=f"{usuario.nombre} {usuario.apellido}".strip(),
+    )
+    enviado = await email_service.send_email(
+        to_email=usuario.email,
+        subject=f"Reclamo #{reclamo.id} generado exitosamente",
+        body_html=html_content,
+        body_text=(
+            f"Su reclamo #{reclamo.id} '{reclamo.titulo}' fue generado exitosamente. "
+            "Le notificaremos cuando haya actualizaciones."
+        ),
+    )
+    if not enviado:
+        raise RuntimeError(f"No se pudo enviar el email a {usuario.email}")
+    db.add(HistorialReclamo(
+        reclamo_id=reclamo.id,
+        usuario_id=usuario.id,
+        accion="email_enviado",
+        comentario=f"✅ Email de confirmación enviado a {usuario.email}",
+    ))
+
+
+@maneja("reclamo.creado", "gamificacion")
+async def gamificacion_reclamo_creado(db: AsyncSession, payload: Dict[str, Any]) -> None:
+    from services.gamificacion_service import GamificacionService
+
+    reclamo = await _reclamo(db, payload, Reclamo.documentos)
+    usuario = await db.get(User, payload["usuario_id"])
+    if reclamo is None or usuario is None:
+        return
+    await GamificacionService.procesar_reclamo_creado(db, reclamo, usuario)
+
+
+@maneja("reclamo.creado", "websocket")
+async def ws_reclamo_creado(db: AsyncSession, payload: Dict[str, Any]) -> None:
+    await manager.send_to_room("supervisores", {
+        "type": WSEvents.RECLAMO_CREADO,
+        "data": payload,
+    })
+
+
+# ============================================================
+# Cambios de estado
+# ============================================================
+
+@maneja("reclamo.estado_cambiado", "push")
+async def push_estado_cambiado(db: AsyncSession, payload: Dict[str, Any]) -> None:
+    from services.push_service import notificar_cambio_estado, notificar_reclamo_resuelto
+
+    reclamo = await _reclamo(db, payload)
+    if reclamo is None:
+        return
+    if payload["estado_nuevo"] in ESTADOS_RESUELTO:
+        await notificar_reclamo_resuelto(db, reclamo)
+    else:
+        await notificar_cambio_estado(db, reclamo, payload["estado_anterior"], payload["estado_nuevo"])
+
+
+@maneja("reclamo.recibido", "push")
+async def push_reclamo_recibido(db: AsyncSession, payload: Dict[str, Any]) -> None:
+    """Al vecino y a los usuarios de la dependencia que lo recibio."""
+    from services.push_service import send_push_to_user
+
+    reclamo_id = payload["reclamo_id"]
+    await send_push_to_user(
+        db,
+        payload["creador_id"],
+        "Reclamo Asignado",
+        f"Tu reclamo #{reclamo_id} fue asignado a {payload['dependencia_nombre']}.",
+        f"/reclamos/{reclamo_id}",
+        data={"tipo": "reclamo_asignado", "reclamo_id": reclamo_id},
+    )
+    usuarios_dependencia = (await db.execute(
+        select(User.id).where(User.municipio_dependencia_id == payload["dependencia_id"])
+    )).scalars().all()
+    for user_id in usuarios_dependencia:
+        await send_push_to_user(
+            db,
+            user_id,
+            "Nuevo Reclamo Asignado",
+            f"Se asignó el reclamo #{reclamo_id} a tu dependencia.",
+            f"/reclamos/{reclamo_id}",
+            data={"tipo": "asignacion_empleado", "reclamo_id": reclamo_id},
+        )
+
+
+@maneja("reclamo.iniciado", "push")
+async def push_reclamo_iniciado(db: AsyncSession, payload: Dict[str, Any]) -> None:
+    from services.push_service import send_push_to_user
+
+    reclamo_id = payload["reclamo_id"]
+    await send_push_to_user(
+        db,
+        payload["creador_id"],
+        "Trabajo Iniciado",
+        f"El empleado comenzó a trabajar en tu reclamo #{reclamo_id}.",
+        f"/gestion/reclamos/{reclamo_id}",
+        data={"tipo": "cambio_estado", "reclamo_id": reclamo_id},
+    )
+
+
+@maneja("reclamo.finalizado", "push")
+async def push_reclamo_finalizado(db: AsyncSession, payload: Dict[str, Any]) -> None:
+    from services.push_service import send_push_to_user
+
+    reclamo_id = payload["reclamo_id"]
+    await send_push_to_user(
+        db,
+        payload["creador_id"],
+        "Reclamo Resuelto",
+        f"Tu reclamo #{reclamo_id} ha sido resuelto. ¡Gracias por tu paciencia!",
+        f"/gestion/reclamos/{reclamo_id}",
+        data={"tipo": "reclamo_resuelto", "reclamo_id": reclamo_id},
+    )
+
+
+@maneja("reclamo.finalizado", "gamificacion")
+@maneja("reclamo.confirmado", "gamificacion")
+async def gamificacion_reclamo_resuelto(db: AsyncSession, payload: Dict[str, Any]) -> None:
+    from services.gamificacion_service import GamificacionService
+
+    reclamo = await _reclamo(db, payload)
+    if reclamo is None:
+        return
+    await GamificacionService.procesar_reclamo_resuelto(db, reclamo)
+
+
+# --- Pendiente de confirmacion (lo resolvio un empleado) ---
+
+async def _pendiente_confirmacion(db: AsyncSession, payload: Dict[str, Any], in_app: bool, whatsapp: bool) -> None:
+    from services.notificacion_service import NotificacionService
+
+    reclamo = await _reclamo(db, payload)
+    if reclamo is None:
+        return
+    mensaje_supervisor = NotificacionService.generar_mensaje_pendiente_confirmacion(
+        reclamo_id=reclamo.id,
+        titulo_reclamo=reclamo.titulo,
+        empleado_nombre=payload["empleado_nombre"],
+        resolucion=payload["resolucion"],
+    )
+    await NotificacionService.notificar_supervisores(
+        db=db,
+        municipio_id=payload["municipio_id"],
+        titulo="Trabajo pendiente de confirmación",
+        mensaje=mensaje_supervisor,
+        tipo="warning",
+        reclamo_id=reclamo.id,
+        enviar_whatsapp=whatsapp,
+        enviar_inapp=in_app,
+    )
+    await NotificacionService.notificar_vecino(
+        db=db,
+        reclamo=reclamo,
+        titulo="Tu reclamo está en revisión",
+        mensaje=(
+            f"El trabajo sobre tu reclamo #{reclamo.id} ha sido completado "
+            "y está siendo revisado por un supervisor."
+        ),
+        tipo="info",
+        tipo_whatsapp="cambio_estado",
+        enviar_whatsapp=whatsapp,
+        enviar_inapp=in_app,
+    )
+
+
+@maneja("reclamo.pendiente_confirmacion", "in_app")
+async def inapp_pendiente_confirmacion(db: AsyncSession, payload: Dict[str, Any]) -> None:
+    await _pendiente_confirmacion(db, payload, in_app=True, whatsapp=False)
+
+
+@maneja("reclamo.pendiente_confirmacion", "whatsapp")
+async def whatsapp_pendiente_confirmacion(db: AsyncSession, payload: Dict[str, Any]) -> None:
+    await _pendiente_confirmacion(db, payload, in_app=False, whatsapp=True)
+
+
+# --- Confirmado por el supervisor: aviso al vecino con link de calificacion ---
+
+async def _confirmado(db: AsyncSession, payload: Dict[str, Any], in_app: bool, whatsapp: bool) -> None:
+    from services.notificacion_service import NotificacionService
+
+    reclamo = await _reclamo(db, payload, Reclamo.creador)
+    if reclamo is None or reclamo.creador is None or reclamo.creador.es_anonimo:
+        return
+    mensaje_resuelto = NotificacionService.generar_mensaje_resuelto(
+        nombre_usuario=reclamo.creador.nombre,
+        reclamo_id=reclamo.id,
+        titulo_reclamo=reclamo.titulo,
+        descripcion=reclamo.descripcion,
+        incluir_link_calificacion=True,
+    )
+    await NotificacionService.notificar_vecino(
+        db=db,
+        reclamo=reclamo,
+        titulo="¡Tu reclamo fue resuelto!",
+        mensaje=mensaje_resuelto,
+        tipo="success",
+        tipo_whatsapp="reclamo_resuelto",
+        enviar_whatsapp=whatsapp,
+        enviar_inapp=in_app,
+    )
+
+
+@maneja("reclamo.confirmado", "in_app")
+async def inapp_reclamo_confirmado(db: AsyncSession, payload: Dict[str, Any]) -> None:
+    await _confirmado(db, payload, in_app=True, whatsapp=False)
+
+
+@maneja("reclamo.confirmado", "whatsapp")
+async def whatsapp_reclamo_confirmado(db: AsyncSession, payload: Dict[str, Any]) -> None:
+    await _confirmado(db, payload, in_app=False, whatsapp=True)
+
+
+# --- Websocket: el creador ve el cambio sin refrescar ---
+
+@maneja("reclamo.estado_cambiado", "websocket")
+@maneja("reclamo.recibido", "websocket")
+@maneja("reclamo.iniciado", "websocket")
+@maneja("reclamo.pendiente_confirmacion", "websocket")
+@maneja("reclamo.finalizado", "websocket")
+@maneja("reclamo.confirmado", "websocket")
+async def ws_reclamo_actualizado(db: AsyncSession, payload: Dict[str, Any]) -> None:
+    creador_id = payload.get("creador_id")
+    if creador_id is None:
+        return
+    resuelto = payload.get("estado_nuevo") in ESTADOS_RESUELTO
+    await manager.send_to_user(creador_id, {
+        "type": WSEvents.RECLAMO_RESUELTO if resuelto else WSEvents.RECLAMO_ACTUALIZADO,
+        "data": payload,
+    })
+
+
+# ============================================================
+# solicitud.creada
+# ============================================================
+
+@maneja("solicitud.creada", "push")
+async def push_solicitud_creada(db: AsyncSession, payload: Dict[str, Any]) -> None:
+    """Al vecino (con el link de pago si el tramite cobra al inicio) y a la
+    dependencia."""
+    from models.municipio_dependencia import MunicipioDependencia
+    from models.tramite import Solicitud, Tramite
+    from services.push_service import notificar_dependencia_solicitud_nueva, notificar_solicitud_recibida
+
+    solicitud = (await db.execute(
+        select(Solicitud)
+        .options(
+            selectinload(Solicitud.tramite).selectinload(Tramite.categoria_tramite),
+            selectinload(Solicitud.solicitante),
+            selectinload(Solicitud.dependencia_asignada).selectinload(MunicipioDependencia.dependencia),
+        )
+        .where(Solicitud.id == payload["solicitud_id"])
+    )).scalar_one_or_none()
+    if solicitud is None:
+        return
+    await notificar_solicitud_recibida(db, solicitud, payload.get("tramite_nombre"))
+    await notificar_dependencia_solicitud_nueva(db, solicitud, payload.get("tramite_nombre"))
@@ -0,0 +1,120 @@
+"""Path de confirmacion de un pago aprobado por el provider.
+
+Lo usan el worker de webhooks (services/pagos/webhook_worker.py) y los
+endpoints de api/pagos.py: marca la sesion APPROVED, genera el CUT, deja
+la imputacion PENDIENTE y pasa la Deuda a PAGADA con su registro de Pago.
+No commitea — el caller decide la transaccion.
+"""
+from datetime import datetime
+from secrets import token_hex
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.pago_sesion import (
+    PagoSesion,
+    EstadoSesionPago,
+    EstadoImputacion,
+    MedioPagoGateway,
+)
+from models.tasas import Deuda, EstadoDeuda, Pago, MedioPago as MedioPagoTasa
+from .provider import EstadoPagoExterno
+
+
+# Medio del gateway -> medio de pago de Tasas
+MEDIO_TASA_MAP = {
+    MedioPagoGateway.TARJETA: MedioPagoTasa.TARJETA_CREDITO,
+    MedioPagoGateway.QR: MedioPagoTasa.QR,
+    MedioPagoGateway.EFECTIVO_CUPON: MedioPagoTasa.RAPIPAGO,
+    MedioPagoGateway.TRANSFERENCIA: MedioPagoTasa.TRANSFERENCIA,
+    MedioPagoGateway.DEBITO_AUTOMATICO: MedioPagoTasa.DEBITO_AUTOMATICO,
+}
+
+
+def medio_tasa(medio: Optional[MedioPagoGateway]) -> MedioPagoTasa:
+    return MEDIO_TASA_MAP.get(medio, MedioPagoTasa.TARJETA_CREDITO) if medio else MedioPagoTasa.TARJETA_CREDITO
+
+
+async def generar_cut_unico(db: AsyncSession, intentos: int = 6) -> str:
+    """Genera un CUT corto (CUT-A3F2B1) garantizando unicidad en DB.
+
+    Colision practicamente imposible con 6 chars hex (16M combinaciones), pero
+    reintentamos igual si el UNIQUE INDEX rechaza. Si despues de N intentos
+    no lo logramos, caemos a un CUT largo con timestamp para no fallar.
+    """
+    for _ in range(intentos):
+        candidato = f"CUT-{token_hex(3).upper()}"
+        q = await db.execute(select(PagoSesion.id).where(PagoSesion.codigo_cut_qr == candidato))
+        if q.scalar_one_or_none() is None:
+            return candidato
+    # Fallback — larguisimo, pero garantizado unico
+    return f"CUT-{token_hex(6).upper()}"
+
+
+async def aprobar_sesion(
+    db: AsyncSession,
+    sesion: PagoSesion,
+    medio_pago: Optional[MedioPagoGateway],
+    metadatos: dict,
+) -> None:
+    """Pasa la sesion a APPROVED con su CUT e imputacion PENDIENTE.
+
+    El CUT (Codigo Unico de Tramite) lo escanea el operador de ventanilla
+    para verificar el pago; Contaduria pasa la imputacion a 'imputado'
+    cuando carga el asiento en el sistema tributario (RAFAM).
+    """
+    sesion.estado = EstadoSesionPago.APPROVED
+    sesion.medio_pago = medio_pago or sesion.medio_pago
+    sesion.completed_at = datetime.utcnow()
+    sesion.metadatos = (sesion.metadatos or {}) | metadatos
+    if not sesion.codigo_cut_qr:
+        sesion.codigo_cut_qr = await generar_cut_unico(db)
+    if sesion.imputacion_estado is None:
+        sesion.imputacion_estado = EstadoImputacion.PENDIENTE
+
+
+async def marcar_deuda_pagada(db: AsyncSession, sesion: PagoSesion) -> bool:
+    """Pasa la Deuda de la sesion a PAGADA y crea su registro de Pago.
+    Idempotente: si ya estaba PAGADA no crea otro Pago."""
+    if not sesion.deuda_id:
+        return False
+    dq = await db.execute(select(Deuda).where(Deuda.id == sesion.deuda_id))
+    deuda = dq.scalar_one_or_none()
+    if deuda is None or deuda.estado == EstadoDeuda.PAGADA:
+        return False
+    deuda.estado = EstadoDeuda.PAGADA
+    deuda.fecha_pago = datetime.utcnow()
+    deuda.pago_externo_id = sesion.external_id
+    db.add(Pago(
+        deuda_id=deuda.id,
+        usuario_id=sesion.vecino_user_id,
+        monto=sesion.monto,
+        medio=medio_tasa(sesion.medio_pago),
+        pago_externo_id=sesion.external_id,
+        estado="confirmado",
+        payload_externo=sesion.metadatos,
+    ))
+    return True
+
+
+async def aplicar_aprobacion_externa(
+    db: AsyncSession,
+    sesion: PagoSesion,
+    estado_ext: EstadoPagoExterno,
+    evento: str,
+) -> bool:
+    """Aplica un `consultar_estado` aprobado sobre la sesion y su deuda.
+
+    Idempotente: si la sesion ya estaba APPROVED o la deuda ya PAGADA no
+    vuelve a crear el Pago. Devuelve True si hubo cambios.
+    """
+    if not estado_ext.aprobado or sesion.estado == EstadoSesionPago.APPROVED:
+        return False
+
+    await aprobar_sesion(
+        db, sesion, estado_ext.medio_pago,
+        {"webhook": evento, "mp_payload": estado_ext.payload_raw or {}},
+    )
+    await marcar_deuda_pagada(db, sesion)
+    return True
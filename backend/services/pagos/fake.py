@@ -0,0 +1,67 @@
+"""Provider de pruebas con respuestas programadas — sin red.
+
+A diferencia del mock de GIRE (que siempre aprueba), este deja guionar
+lo que devuelve `consultar_estado` por external_id: aprobar, rechazar,
+tirar una excepcion (MP caido / timeout) o tardar. Sirve para testear el
+worker de webhooks offline y para reproducir incidentes en dev.
+
+    fake = FakeGatewayProvider()
+    fake.programar("MP-1", RuntimeError("503"), RuntimeError("503"), True)
+    # 1er y 2do consultar_estado("MP-1") fallan, el 3ro aprueba
+"""
+import asyncio
+from collections import defaultdict, deque
+from decimal import Decimal
+from secrets import token_hex
+from typing import Deque, Dict, List, Union
+
+from models.pago_sesion import MedioPagoGateway
+from .provider import GatewayPagoProvider, CrearSesionResponse, EstadoPagoExterno
+
+Respuesta = Union[bool, EstadoPagoExterno, BaseException]
+
+
+class FakeGatewayProvider(GatewayPagoProvider):
+
+    def __init__(self, demora_s: float = 0.0, medio_pago: MedioPagoGateway = MedioPagoGateway.TARJETA):
+        self.demora_s = demora_s
+        self.medio_pago = medio_pago
+        self._guion: Dict[str, Deque[Respuesta]] = defaultdict(deque)
+        self.consultas: List[str] = []
+
+    @property
+    def nombre(self) -> str:
+        return "fake"
+
+    def programar(self, external_id: str, *respuestas: Respuesta) -> None:
+        """Encola respuestas para `external_id`. Sin guion: aprobado."""
+        self._guion[external_id].extend(respuestas)
+
+    async def crear_sesion(
+        self,
+        concepto: str,
+        monto: Decimal,
+        sesion_id: str,
+        return_url: str,
+    ) -> CrearSesionResponse:
+        return CrearSesionResponse(
+            external_id=f"FAKE-{token_hex(6).upper()}",
+            checkout_url=f"/pago/checkout/{sesion_id}",
+        )
+
+    async def consultar_estado(self, external_id: str) -> EstadoPagoExterno:
+        self.consultas.append(external_id)
+        if self.demora_s:
+            await asyncio.sleep(self.demora_s)
+        guion = self._guion.get(external_id)
+        respuesta: Respuesta = guion.popleft() if guion else True
+        if isinstance(respuesta, BaseException):
+            raise respuesta
+        if isinstance(respuesta, EstadoPagoExterno):
+            return respuesta
+        return EstadoPagoExterno(
+            external_id=external_id,
+            aprobado=bool(respuesta),
+            medio_pago=self.medio_pago if respuesta else None,
+            payload_raw={"fake": True, "status": "approved" if respuesta else "rejected"},
+        )
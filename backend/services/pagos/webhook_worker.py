@@ -0,0 +1,373 @@
+"""Pool de workers que procesa los webhooks de pago en segundo plano.
+
+`POST /pagos/webhook/mercadopago` solo inserta el `PagoWebhookEvento` y
+responde 200: un MP lento ya no mantiene abierto el webhook (ni provoca
+reentregas), y un `consultar_estado` fallido se reintenta en vez de quedar
+anotado en `error` para siempre.
+
+Cada worker:
+
+  1. Toma hasta `lote` eventos pendientes (no procesados, no fallidos, con
+     `proximo_intento_at` vencido y sin lease vigente). En MySQL el SELECT
+     va con `FOR UPDATE SKIP LOCKED`, asi dos workers (o dos instancias) no
+     se pisan; el UPDATE posterior graba el lease (`tomado_por`,
+     `tomado_hasta`) y suma el intento. Si un worker muere, el lease vence
+     y otro retoma el evento.
+  2. Resuelve la sesion, valida la firma y consulta el estado al provider
+     (fuera de transaccion, con timeout).
+  3. Aplica el path de confirmacion (services/pagos/confirmacion.py).
+  4. Si algo falla: backoff exponencial con jitter hasta
+     PAGOS_WEBHOOK_MAX_INTENTOS; despues `fallido_at` y revision manual.
+
+Corre dentro del proceso de la API (lifespan de main.py), en todas las
+instancias. El webhook despierta al pool con `notificar()`; ademas hace
+polling cada `poll_s` para los reintentos y lo que dejen otras instancias.
+
+    from services.pagos.webhook_worker import webhook_pool
+    webhook_pool.start()
+    ...
+    await webhook_pool.stop()
+"""
+import asyncio
+import hashlib
+import hmac
+import logging
+import random
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta
+from secrets import token_hex
+from typing import Awaitable, Callable, List, Optional
+
+from sqlalchemy import and_, case, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from core.config import settings
+from core.database import AsyncSessionLocal
+from models.municipio_proveedor_pago import MunicipioProveedorPago, PROVEEDOR_MERCADOPAGO
+from models.pago_sesion import PagoSesion
+from models.pago_webhook_evento import PagoWebhookEvento
+from . import get_provider_para_muni
+from .confirmacion import aplicar_aprobacion_externa
+from .provider import GatewayPagoProvider
+
+logger = logging.getLogger(__name__)
+
+ResolverProvider = Callable[[AsyncSession, int], Awaitable[GatewayPagoProvider]]
+
+
+class SesionNoResuelta(Exception):
+    """El external_id del evento no matchea ninguna PagoSesion (todavia)."""
+
+
+def _ahora() -> datetime:
+    return datetime.utcnow()
+
+
+def _naive(dt: Optional[datetime]) -> Optional[datetime]:
+    return dt.replace(tzinfo=None) if dt is not None and dt.tzinfo else dt
+
+
+def _lease() -> timedelta:
+    # Margen sobre el timeout de la consulta para no perder el evento a
+    # mitad de un procesamiento lento
+    return timedelta(seconds=settings.PAGOS_WEBHOOK_TIMEOUT_S + 60)
+
+
+def backoff_segundos(intentos: int) -> float:
+    """base * 2^(intentos-1) con tope, +-10% de jitter para no sincronizar
+    los reintentos de una tanda de eventos que fallaron juntos."""
+    base = settings.PAGOS_WEBHOOK_BACKOFF_BASE_S * (2 ** max(intentos - 1, 0))
+    return min(base, settings.PAGOS_WEBHOOK_BACKOFF_MAX_S) * random.uniform(0.9, 1.1)
+
+
+def validar_firma_mercadopago(
+    signature_header: str,
+    request_id: str,
+    data_id: str,
+    webhook_secret: str,
+) -> bool:
+    """Valida la firma HMAC-SHA256 del webhook de MP.
+
+    MP envia el header `x-signature: ts=<ts>,v1=<hash>` donde el hash
+    se calcula sobre `id:<data_id>;request-id:<req_id>;ts:<ts>;`.
+    Si el muni no tiene webhook_secret configurado, saltamos validacion
+    (y el evento queda con firma_ok=false).
+    """
+    if not webhook_secret or not signature_header:
+        return False
+    try:
+        parts = dict(
+            p.strip().split("=", 1) for p in signature_header.split(",") if "=" in p
+        )
+        ts = parts.get("ts", "")
+        v1 = parts.get("v1", "")
+        if not ts or not v1:
+            return False
+        manifest = f"id:{data_id};request-id:{request_id};ts:{ts};"
+        calc = hmac.new(
+            webhook_secret.encode(),
+            manifest.encode(),
+            hashlib.sha256,
+        ).hexdigest()
+        return hmac.compare_digest(calc, v1)
+    except Exception:
+        return False
+
+
+def _disponible(ahora: datetime):
+    evt = PagoWebhookEvento
+    return and_(
+        evt.procesado_at.is_(None),
+        evt.fallido_at.is_(None),
+        or_(evt.proximo_intento_at.is_(None), evt.proximo_intento_at <= ahora),
+        or_(evt.tomado_hasta.is_(None), evt.tomado_hasta < ahora),
+    )
+
+
+async def reclamar_eventos(db: AsyncSession, worker_id: str, limite: int) -> List[int]:
+    """Toma hasta `limite` eventos pendientes para este worker.
+
+    El UPDATE repite la condicion de disponibilidad y marca un token unico
+    por toma: en motores sin SKIP LOCKED (SQLite) dos workers pueden ver
+    los mismos candidatos, pero solo uno gana cada fila.
+    """
+    ahora = _ahora()
+    token = f"{worker_id}:{token_hex(4)}"
+    candidatos = (await db.execute(
+        select(PagoWebhookEvento.id)
+        .where(_disponible(ahora))
+        .order_by(PagoWebhookEvento.id)
+        .limit(limite)
+        .with_for_update(skip_locked=True)
+    )).scalars().all()
+    if not candidatos:
+        await db.commit()
+        return []
+    await db.execute(
+        update(PagoWebhookEvento)
+        .where(PagoWebhookEvento.id.in_(candidatos), _disponible(ahora))
+        .values(
+            tomado_por=token,
+            tomado_hasta=ahora + _lease(),
+            intentos=PagoWebhookEvento.intentos + 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    tomados = (await db.execute(
+        select(PagoWebhookEvento.id)
+        .where(PagoWebhookEvento.tomado_por == token)
+        .order_by(PagoWebhookEvento.id)
+    )).scalars().all()
+    await db.commit()
+    return list(tomados)
+
+
+async def _firma_ok(db: AsyncSession, evt: PagoWebhookEvento, sesion: PagoSesion) -> bool:
+    if evt.provider != PROVEEDOR_MERCADOPAGO:
+        return bool(evt.firma_ok)
+    cfg = (await db.execute(
+        select(MunicipioProveedorPago).where(
+            MunicipioProveedorPago.municipio_id == sesion.municipio_id,
+            MunicipioProveedorPago.proveedor == PROVEEDOR_MERCADOPAGO,
+            MunicipioProveedorPago.activo == True,  # noqa: E712
+        )
+    )).scalar_one_or_none()
+    if not cfg or not cfg.webhook_secret:
+        return False
+    return validar_firma_mercadopago(
+        evt.firma_header or "", evt.request_id or "", evt.external_id, cfg.webhook_secret
+    )
+
+
+async def _procesar(db: AsyncSession, evt: PagoWebhookEvento, resolver_provider: ResolverProvider) -> None:
+    sesion = await db.get(PagoSesion, evt.session_id) if evt.session_id else None
+    if sesion is None:
+        sesion = (await db.execute(
+            select(PagoSesion).where(PagoSesion.external_id == evt.external_id)
+        )).scalar_one_or_none()
+    if sesion is None:
+        # Puede ser que MP notifique antes de que commiteemos la sesion:
+        # se reintenta como cualquier otro error.
+        raise SesionNoResuelta(f"sin sesion para external_id {evt.external_id}")
+
+    evt.session_id = sesion.id
+    evt.firma_ok = await _firma_ok(db, evt, sesion)
+    provider = await resolver_provider(db, sesion.municipio_id)
+    # Cerrar la transaccion antes de la llamada de red
+    await db.commit()
+
+    estado_ext = await asyncio.wait_for(
+        provider.consultar_estado(evt.external_id),
+        timeout=settings.PAGOS_WEBHOOK_TIMEOUT_S,
+    )
+
+    # Lock de la sesion: dos eventos del mismo pago (created/updated) en
+    # workers distintos no deben generar dos Pagos
+    await db.refresh(sesion, with_for_update=True)
+    await aplicar_aprobacion_externa(db, sesion, estado_ext, evt.evento)
+    evt.procesado_at = _ahora()
+    evt.error = None
+    evt.tomado_por = None
+    evt.tomado_hasta = None
+    await db.commit()
+
+
+async def _registrar_fallo(db: AsyncSession, evento_id: int, error: BaseException) -> bool:
+    """Programa el reintento (o marca fallido). Devuelve True si agotó."""
+    intentos = (await db.execute(
+        select(PagoWebhookEvento.intentos).where(PagoWebhookEvento.id == evento_id)
+    )).scalar_one()
+    ahora = _ahora()
+    valores = {
+        "error": (str(error) or type(error).__name__)[:500],
+        "tomado_por": None,
+        "tomado_hasta": None,
+    }
+    agotado = intentos >= settings.PAGOS_WEBHOOK_MAX_INTENTOS
+    if agotado:
+        valores["fallido_at"] = ahora
+    else:
+        valores["proximo_intento_at"] = ahora + timedelta(seconds=backoff_segundos(intentos))
+    await db.execute(
+        update(PagoWebhookEvento)
+        .where(PagoWebhookEvento.id == evento_id)
+        .values(**valores)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return agotado
+
+
+@dataclass
+class WebhookStats:
+    """Contadores del proceso (se reinician con la instancia)."""
+    procesados: int = 0
+    reintentos: int = 0
+    fallidos: int = 0
+    ultimo_lag_s: Optional[float] = None   # created_at -> procesado del ultimo evento OK
+
+
+class WebhookWorkerPool:
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        resolver_provider: ResolverProvider = get_provider_para_muni,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        lote: int = 10,
+        poll_s: float = 5.0,
+    ):
+        self.workers = workers if workers is not None else settings.PAGOS_WEBHOOK_WORKERS
+        self.resolver_provider = resolver_provider
+        self.session_factory = session_factory
+        self.lote = lote
+        self.poll_s = poll_s
+        self.stats = WebhookStats()
+        self._despertar = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._id = token_hex(3)
+
+    def notificar(self) -> None:
+        """Despierta a los workers (llamado por el webhook tras el INSERT)."""
+        self._despertar.set()
+
+    async def procesar_evento(self, evento_id: int) -> bool:
+        async with self.session_factory() as db:
+            evt = await db.get(PagoWebhookEvento, evento_id)
+            if evt is None or evt.procesado_at is not None:
+                return True
+            creado = evt.created_at
+            try:
+                await _procesar(db, evt, self.resolver_provider)
+            except Exception as e:
+                await db.rollback()
+                agotado = await _registrar_fallo(db, evento_id, e)
+                if agotado:
+                    self.stats.fallidos += 1
+                    logger.error("Webhook %s agotó reintentos: %s", evento_id, e)
+                else:
+                    self.stats.reintentos += 1
+                    logger.warning("Webhook %s falló, se reintenta: %s", evento_id, e)
+                return False
+        self.stats.procesados += 1
+        if creado is not None:
+            self.stats.ultimo_lag_s = (_ahora() - _naive(creado)).total_seconds()
+        return True
+
+    async def _drenar(self, worker_id: str) -> int:
+        """Procesa lotes hasta que no quede nada disponible."""
+        total = 0
+        while True:
+            async with self.session_factory() as db:
+                ids = await reclamar_eventos(db, worker_id, self.lote)
+            if not ids:
+                return total
+            for evento_id in ids:
+                if await self.procesar_evento(evento_id):
+                    total += 1
+
+    async def procesar_pendientes(self) -> int:
+        """Una pasada de todos los workers. Devuelve cuantos procesó OK."""
+        n = max(self.workers, 1)
+        resultados = await asyncio.gather(*(self._drenar(f"{self._id}-{i}") for i in range(n)))
+        return sum(resultados)
+
+    async def _loop(self, worker_id: str) -> None:
+        while True:
+            try:
+                await self._drenar(worker_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("[webhook-worker %s] error: %s", worker_id, e)
+            try:
+                await asyncio.wait_for(self._despertar.wait(), timeout=self.poll_s)
+            except asyncio.TimeoutError:
+                pass
+            self._despertar.clear()
+
+    def start(self) -> None:
+        if self._tasks or self.workers <= 0:
+            return
+        loop = asyncio.get_running_loop()
+        self._tasks = [
+            loop.create_task(self._loop(f"{self._id}-{i}")) for i in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        for t in self._tasks:
+            try:
+                await t
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+
+async def metricas(db: AsyncSession, pool: Optional[WebhookWorkerPool] = None) -> dict:
+    """Estado de la cola (global, todas las instancias) + contadores locales."""
+    evt = PagoWebhookEvento
+    pendiente = and_(evt.procesado_at.is_(None), evt.fallido_at.is_(None))
+    # CASE en vez de FILTER (WHERE ...): MySQL no lo soporta
+    row = (await db.execute(
+        select(
+            func.sum(case((pendiente, 1), else_=0)),
+            func.sum(case((and_(pendiente, evt.intentos > 0), 1), else_=0)),
+            func.sum(case((evt.fallido_at.isnot(None), 1), else_=0)),
+            func.min(case((pendiente, evt.created_at))),
+            func.max(case((pendiente, evt.intentos))),
+        )
+    )).one()
+    pendientes, en_reintento, fallidos, mas_viejo, max_intentos = row
+    lag = (_ahora() - _naive(mas_viejo)).total_seconds() if mas_viejo else 0.0
+    return {
+        "pendientes": pendientes or 0,
+        "en_reintento": en_reintento or 0,
+        "fallidos": fallidos or 0,
+        "lag_segundos": round(max(lag, 0.0), 1),
+        "max_intentos_pendiente": max_intentos or 0,
+        "proceso": asdict((pool or webhook_pool).stats),
+    }
+
+
+webhook_pool = WebhookWorkerPool()
@@ -15,6 +15,9 @@ from reportlab.graphics.charts.piecharts import Pie
 from reportlab.graphics.charts.barcharts import VerticalBarChart
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 
+# Subir cuando cambie el layout: invalida los PDFs cacheados (y sus ETags)
+PLANTILLA_VERSION = 1
+
 
 def hex_to_rgb(hex_color: str) -> tuple:
     """Convierte color hex a RGB normalizado (0-1)"""
@@ -360,3 +363,8 @@ def generate_executive_report(
     buffer.seek(0)
 
     return buffer
+
+
+def render_executive_report(**kwargs) -> bytes:
+    """Igual que generate_executive_report pero devuelve bytes (para el pool de procesos)."""
+    return generate_executive_report(**kwargs).getvalue()
@@ -1,13 +1,14 @@
 """Servicio para enviar Web Push Notifications y Notificaciones In-App"""
 from pywebpush import webpush, WebPushException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.orm import selectinload
 from models import PushSubscription, User
 from models.notificacion import Notificacion
 from models.user import DEFAULT_NOTIFICATION_PREFERENCES
 from core.config import settings
-from typing import Optional, List
+from typing import Optional, List, Tuple
+import asyncio
 import json
 import logging
 
@@ -171,13 +172,113 @@ async def send_push_to_users(
     """
     Envía una notificación push a múltiples usuarios.
 
+    1 SELECT de suscripciones para todos, envíos concurrentes y 1 UPDATE
+    para las suscripciones vencidas (antes: 1 SELECT + envíos en serie por
+    usuario).
+
     Returns:
         int: Número total de notificaciones enviadas exitosamente
     """
-    total_sent = 0
-    for user_id in user_ids:
-        total_sent += await send_push_to_user(db, user_id, title, body, url, icon, data)
-    return total_sent
+    if not settings.VAPID_PRIVATE_KEY or not settings.VAPID_PUBLIC_KEY:
+        logger.warning("VAPID keys no configuradas, no se pueden enviar push notifications")
+        return 0
+
+    subs = await cargar_suscripciones(db, user_ids)
+    enviados, invalidas = await enviar_push_suscripciones(
+        subs, build_push_payload(title, body, url, icon, data)
+    )
+    if invalidas:
+        await desactivar_suscripciones(db, invalidas)
+    return enviados
+
+
+# ============================================
+# Push masivo (lo usa también services/notificacion_fanout)
+# ============================================
+
+# Envíos webpush en paralelo (cada uno es un POST bloqueante -> thread)
+PUSH_CONCURRENCIA = 10
+
+
+def build_push_payload(
+    title: str,
+    body: str,
+    url: Optional[str] = None,
+    icon: Optional[str] = None,
+    data: Optional[dict] = None
+) -> str:
+    return json.dumps({
+        "title": title,
+        "body": body,
+        "icon": icon or "/icon-notification.png",
+        "url": url or "/",
+        "data": data or {}
+    })
+
+
+async def cargar_suscripciones(db: AsyncSession, user_ids: List[int]) -> List[dict]:
+    """Suscripciones activas de todos los usuarios en un solo SELECT."""
+    if not user_ids:
+        return []
+    result = await db.execute(
+        select(
+            PushSubscription.id, PushSubscription.user_id, PushSubscription.endpoint,
+            PushSubscription.p256dh_key, PushSubscription.auth_key,
+        ).where(
+            PushSubscription.user_id.in_(list(set(user_ids))),
+            PushSubscription.activo == True
+        )
+    )
+    return [
+        {"id": sid, "user_id": uid, "endpoint": endpoint, "keys": {"p256dh": p256dh, "auth": auth}}
+        for sid, uid, endpoint, p256dh, auth in result.all()
+    ]
+
+
+def _webpush_sync(sub: dict, payload: str) -> None:
+    webpush(
+        subscription_info={"endpoint": sub["endpoint"], "keys": sub["keys"]},
+        data=payload,
+        vapid_private_key=settings.VAPID_PRIVATE_KEY,
+        vapid_claims={"sub": settings.VAPID_EMAIL}
+    )
+
+
+async def enviar_push_suscripciones(subs: List[dict], payload: str) -> Tuple[int, List[int]]:
+    """
+    Manda `payload` a todas las suscripciones en paralelo. No toca la BD.
+
+    Returns:
+        (enviados, ids de suscripciones con endpoint inválido 404/410)
+    """
+    if not subs:
+        return 0, []
+    sem = asyncio.Semaphore(PUSH_CONCURRENCIA)
+
+    async def _uno(sub: dict):
+        async with sem:
+            try:
+                await asyncio.to_thread(_webpush_sync, sub, payload)
+                return True, None
+            except WebPushException as e:
+                logger.error(f"Error enviando push a usuario {sub['user_id']}: {e}")
+                if e.response is not None and e.response.status_code in [404, 410]:
+                    return False, sub["id"]
+                return False, None
+
+    resultados = await asyncio.gather(*(_uno(s) for s in subs))
+    enviados = sum(1 for ok, _ in resultados if ok)
+    invalidas = [sid for _, sid in resultados if sid is not None]
+    return enviados, invalidas
+
+
+async def desactivar_suscripciones(db: AsyncSession, sub_ids: List[int], commit: bool = True) -> None:
+    await db.execute(
+        update(PushSubscription).where(PushSubscription.id.in_(sub_ids)).values(activo=False)
+    )
+    if commit:
+        await db.commit()
+    logger.info(f"Suscripciones {sub_ids} desactivadas por endpoint inválido")
 
 
 # ============================================
@@ -408,28 +509,22 @@ async def notificar_comentario_vecino_a_dependencia(
     vecino_nombre: str
 ) -> int:
     """
-    Notifica a todos los usuarios de la dependencia asignada cuando un vecino comenta.
+    Notifica a todos los supervisores del municipio cuando un vecino comenta.
     Crea notificación en BD para la campanita + envía push al navegador + envía email.
     """
-    from models import MunicipioDependencia
-    from models.enums import RolUsuario
+    from services.email_service import EmailTemplates
+    from services.notificacion_fanout import EmailFanOut, PushFanOut, fan_out, resolver_destinatarios
 
     if not reclamo.municipio_dependencia_id:
         logger.info(f"Reclamo #{reclamo.id} no tiene dependencia asignada, no se envía notificación")
         return 0
 
-    # Buscar TODOS los supervisores del municipio (no solo de la dependencia específica)
-    result = await db.execute(
-        select(User).where(
-            User.municipio_id == reclamo.municipio_id,
-            User.rol == RolUsuario.SUPERVISOR,
-            User.activo == True
-        )
+    # TODOS los supervisores del municipio (no solo de la dependencia específica)
+    destinatarios = await resolver_destinatarios(
+        db, reclamo.municipio_id, preferencia="comentario_vecino"
     )
-    usuarios_dependencia = result.scalars().all()
-
-    if not usuarios_dependencia:
-        logger.info(f"No hay supervisores en el municipio {reclamo.municipio_id}")
+    if not destinatarios:
+        logger.info(f"No hay supervisores a notificar en el municipio {reclamo.municipio_id}")
         return 0
 
     # Truncar comentario
@@ -437,52 +532,21 @@ async def notificar_comentario_vecino_a_dependencia(
     titulo = f"Comentario de {vecino_nombre}"
     mensaje = f"Reclamo #{reclamo.id}: {comentario_preview}"
 
-    total_enviados = 0
-    for usuario in usuarios_dependencia:
-        if await check_user_notification_preference(db, usuario.id, "comentario_vecino"):
-            # Crear notificación en BD para la campanita
-            await crear_notificacion_db(
-                db=db,
-                usuario_id=usuario.id,
-                titulo=titulo,
-                mensaje=mensaje,
-                tipo="info",
-                reclamo_id=reclamo.id
-            )
-
-            # Enviar email al supervisor
-            if usuario.email:
-                try:
-                    from services.email_service import email_service, EmailTemplates
-                    html_content = EmailTemplates.nuevo_comentario(
-                        reclamo.titulo,
-                        reclamo.id,
-                        vecino_nombre,
-                        comentario
-                    )
-                    await email_service.send_email(
-                        to_email=usuario.email,
-                        subject=f"Comentario de vecino en reclamo #{reclamo.id}",
-                        body_html=html_content
-                    )
-                    logger.info(f"Email de comentario enviado a supervisor {usuario.email}")
-                except Exception as e:
-                    logger.error(f"Error enviando email a supervisor: {e}")
-
-            # Enviar push al navegador
-            enviados = await send_push_to_user(
-                db=db,
-                user_id=usuario.id,
-                title=f"💬 {titulo}",
-                body=mensaje,
-                url=f"/gestion/reclamos/{reclamo.id}",
-                data={"tipo": "comentario_vecino", "reclamo_id": reclamo.id}
-            )
-            total_enviados += enviados
-
-    logger.info(f"Notificación de comentario enviada a {total_enviados} usuarios de la dependencia")
-    return total_enviados
-
+    resultado = await fan_out(
+        db, destinatarios,
+        titulo=titulo, mensaje=mensaje, reclamo_id=reclamo.id,
+        push=PushFanOut(
+            title=f"💬 {titulo}",
+            body=mensaje,
+            url=f"/gestion/reclamos/{reclamo.id}",
+            data={"tipo": "comentario_vecino", "reclamo_id": reclamo.id},
+        ),
+        email=EmailFanOut(
+            subject=f"Comentario de vecino en reclamo #{reclamo.id}",
+            body_html=EmailTemplates.nuevo_comentario(reclamo.titulo, reclamo.id, vecino_nombre, comentario),
+        ),
+    )
+    return resultado.push_enviados
 
 async def notificar_supervisor_reclamo_nuevo(db: AsyncSession, supervisor_user_id: int, reclamo) -> int:
     """Notifica al supervisor que hay un nuevo reclamo"""
@@ -506,31 +570,26 @@ async def notificar_dependencia_reclamo_nuevo(
     categoria_nombre: str = None
 ) -> int:
     """
-    Notifica a todos los usuarios de la dependencia asignada cuando llega un nuevo reclamo.
+    Notifica a todos los supervisores del municipio cuando llega un nuevo reclamo.
     Crea notificación en BD para la campanita + envía push al navegador + envía email.
     """
     from models import MunicipioDependencia
-    from models.enums import RolUsuario
+    from services.email_service import EmailTemplates
+    from services.notificacion_fanout import EmailFanOut, PushFanOut, fan_out, resolver_destinatarios
 
     if not reclamo.municipio_dependencia_id:
         logger.info(f"Reclamo #{reclamo.id} no tiene dependencia asignada, no se envía notificación")
         return 0
 
-    # Buscar TODOS los supervisores del municipio (no solo de la dependencia específica)
-    result = await db.execute(
-        select(User).where(
-            User.municipio_id == reclamo.municipio_id,
-            User.rol == RolUsuario.SUPERVISOR,
-            User.activo == True
-        )
+    # TODOS los supervisores del municipio (no solo de la dependencia específica)
+    destinatarios = await resolver_destinatarios(
+        db, reclamo.municipio_id, preferencia="reclamo_nuevo_supervisor"
     )
-    usuarios_dependencia = result.scalars().all()
-
-    if not usuarios_dependencia:
-        logger.info(f"No hay supervisores en el municipio {reclamo.municipio_id}")
+    if not destinatarios:
+        logger.info(f"No hay supervisores a notificar en el municipio {reclamo.municipio_id}")
         return 0
 
-    # Obtener nombre de la dependencia
+    # Nombre de la dependencia y del creador: una vez por evento, no por supervisor
     dep_result = await db.execute(
         select(MunicipioDependencia).where(
             MunicipioDependencia.id == reclamo.municipio_dependencia_id
@@ -539,67 +598,40 @@ async def notificar_dependencia_reclamo_nuevo(
     muni_dep = dep_result.scalar_one_or_none()
     dep_nombre = muni_dep.dependencia.nombre if muni_dep and muni_dep.dependencia else "tu dependencia"
 
+    creador_nombre = None
+    if reclamo.creador_id:
+        creador = (await db.execute(
+            select(User.nombre, User.apellido, User.email).where(User.id == reclamo.creador_id)
+        )).first()
+        if creador:
+            creador_nombre = f"{creador.nombre} {creador.apellido}".strip() or creador.email
+
     # Preparar mensaje
     titulo = "Nuevo Reclamo Asignado"
     cat_info = f" - {categoria_nombre}" if categoria_nombre else ""
     mensaje = f"Reclamo #{reclamo.id}{cat_info} fue asignado a {dep_nombre}."
 
-    total_enviados = 0
-    for usuario in usuarios_dependencia:
-        if await check_user_notification_preference(db, usuario.id, "reclamo_nuevo_supervisor"):
-            # Crear notificación en BD para la campanita
-            await crear_notificacion_db(
-                db=db,
-                usuario_id=usuario.id,
-                titulo=titulo,
-                mensaje=mensaje,
-                tipo="info",
-                reclamo_id=reclamo.id
-            )
-
-            # Enviar email al supervisor
-            if usuario.email:
-                try:
-                    from services.email_service import email_service, EmailTemplates
-
-                    # Obtener nombre del creador
-                    creador_nombre = None
-                    if reclamo.creador_id:
-                        creador_result = await db.execute(select(User).where(User.id == reclamo.creador_id))
-                        creador = creador_result.scalar_one_or_none()
-                        if creador:
-                            creador_nombre = f"{creador.nombre} {creador.apellido}".strip() or creador.email
-
-                    html_content = EmailTemplates.reclamo_creado(
-                        reclamo.titulo,
-                        reclamo.id,
-                        categoria_nombre or "Sin categoría",
-                        descripcion=reclamo.descripcion,
-                        creador_nombre=creador_nombre
-                    )
-                    await email_service.send_email(
-                        to_email=usuario.email,
-                        subject=f"Nuevo reclamo #{reclamo.id} asignado a tu dependencia",
-                        body_html=html_content
-                    )
-                    logger.info(f"Email de reclamo nuevo enviado a supervisor {usuario.email}")
-                except Exception as e:
-                    logger.error(f"Error enviando email a supervisor: {e}")
-
-            # Enviar push al navegador
-            enviados = await send_push_to_user(
-                db=db,
-                user_id=usuario.id,
-                title=f"📋 {titulo}",
-                body=mensaje,
-                url=f"/gestion/reclamos/{reclamo.id}",
-                data={"tipo": "reclamo_nuevo_supervisor", "reclamo_id": reclamo.id}
-            )
-            total_enviados += enviados
-
-    logger.info(f"Notificación de reclamo nuevo enviada a {len(usuarios_dependencia)} usuarios ({total_enviados} push)")
-    return total_enviados
-
+    resultado = await fan_out(
+        db, destinatarios,
+        titulo=titulo, mensaje=mensaje, reclamo_id=reclamo.id,
+        push=PushFanOut(
+            title=f"📋 {titulo}",
+            body=mensaje,
+            url=f"/gestion/reclamos/{reclamo.id}",
+            data={"tipo": "reclamo_nuevo_supervisor", "reclamo_id": reclamo.id},
+        ),
+        email=EmailFanOut(
+            subject=f"Nuevo reclamo #{reclamo.id} asignado a tu dependencia",
+            body_html=EmailTemplates.reclamo_creado(
+                reclamo.titulo,
+                reclamo.id,
+                categoria_nombre or "Sin categoría",
+                descripcion=reclamo.descripcion,
+                creador_nombre=creador_nombre
+            ),
+        ),
+    )
+    return resultado.push_enviados
 
 async def notificar_supervisor_pendiente_confirmacion(db: AsyncSession, supervisor_user_id: int, reclamo) -> int:
     """Notifica al supervisor que hay un reclamo pendiente de confirmación"""
@@ -795,89 +827,57 @@ async def notificar_dependencia_solicitud_nueva(
     Notifica a todos los supervisores del municipio cuando llega una nueva solicitud.
     Crea notificación en BD para la campanita + envía push al navegador + envía email.
     """
-    from models.enums import RolUsuario
+    from services.email_service import EmailTemplates
+    from services.notificacion_fanout import EmailFanOut, PushFanOut, fan_out, resolver_destinatarios
 
     if not solicitud.municipio_id:
         logger.info(f"Solicitud #{solicitud.id} no tiene municipio_id, no se envía notificación")
         return 0
 
-    # Buscar todos los supervisores del municipio
-    result = await db.execute(
-        select(User).where(
-            User.municipio_id == solicitud.municipio_id,
-            User.rol == RolUsuario.SUPERVISOR,
-            User.activo == True
-        )
+    destinatarios = await resolver_destinatarios(
+        db, solicitud.municipio_id, preferencia="tramite_nuevo_supervisor"
     )
-    supervisores = result.scalars().all()
-
-    if not supervisores:
-        logger.info(f"No hay supervisores en el municipio {solicitud.municipio_id}")
+    if not destinatarios:
+        logger.info(f"No hay supervisores a notificar en el municipio {solicitud.municipio_id}")
         return 0
 
+    # Nombre del solicitante: una vez por evento, no por supervisor
+    solicitante_nombre = None
+    if solicitud.nombre_solicitante:
+        solicitante_nombre = f"{solicitud.nombre_solicitante} {solicitud.apellido_solicitante or ''}".strip()
+    elif solicitud.solicitante_id:
+        solicitante = (await db.execute(
+            select(User.nombre, User.apellido, User.email).where(User.id == solicitud.solicitante_id)
+        )).first()
+        if solicitante:
+            solicitante_nombre = f"{solicitante.nombre} {solicitante.apellido}".strip() or solicitante.email
+
     # Preparar mensaje
     titulo = "Nuevo Trámite Recibido"
     tramite_info = f" - {tramite_nombre}" if tramite_nombre else ""
     mensaje = f"Trámite #{solicitud.numero_tramite}{tramite_info}: {solicitud.asunto or 'Sin asunto'}"
 
-    total_enviados = 0
-    for usuario in supervisores:
-        if await check_user_notification_preference(db, usuario.id, "tramite_nuevo_supervisor"):
-            # Crear notificación en BD para la campanita
-            await crear_notificacion_db(
-                db=db,
-                usuario_id=usuario.id,
-                titulo=titulo,
-                mensaje=mensaje,
-                tipo="info",
-                solicitud_id=solicitud.id
-            )
-
-            # Enviar email al supervisor
-            if usuario.email:
-                try:
-                    from services.email_service import email_service, EmailTemplates
-
-                    # Obtener nombre del solicitante
-                    solicitante_nombre = None
-                    if solicitud.nombre_solicitante:
-                        solicitante_nombre = f"{solicitud.nombre_solicitante} {solicitud.apellido_solicitante or ''}".strip()
-                    elif solicitud.solicitante_id:
-                        sol_result = await db.execute(select(User).where(User.id == solicitud.solicitante_id))
-                        solicitante = sol_result.scalar_one_or_none()
-                        if solicitante:
-                            solicitante_nombre = f"{solicitante.nombre} {solicitante.apellido}".strip() or solicitante.email
-
-                    html_content = EmailTemplates.solicitud_creada(
-                        numero_tramite=solicitud.numero_tramite,
-                        tramite_nombre=tramite_nombre or "Trámite",
-                        asunto=solicitud.asunto or "Sin asunto",
-                        descripcion=solicitud.descripcion,
-                        solicitante_nombre=solicitante_nombre
-                    )
-                    await email_service.send_email(
-                        to_email=usuario.email,
-                        subject=f"Nuevo trámite #{solicitud.numero_tramite} recibido",
-                        body_html=html_content
-                    )
-                    logger.info(f"Email de trámite nuevo enviado a supervisor {usuario.email}")
-                except Exception as e:
-                    logger.error(f"Error enviando email a supervisor: {e}")
-
-            # Enviar push al navegador
-            enviados = await send_push_to_user(
-                db=db,
-                user_id=usuario.id,
-                title=f"📄 {titulo}",
-                body=mensaje,
-                url=f"/gestion/tramites/{solicitud.id}",
-                data={"tipo": "tramite_nuevo_supervisor", "solicitud_id": solicitud.id}
-            )
-            total_enviados += enviados
-
-    logger.info(f"Notificación de trámite nuevo enviada a {len(supervisores)} supervisores ({total_enviados} push)")
-    return total_enviados
-
+    resultado = await fan_out(
+        db, destinatarios,
+        titulo=titulo, mensaje=mensaje, solicitud_id=solicitud.id,
+        push=PushFanOut(
+            title=f"📄 {titulo}",
+            body=mensaje,
+            url=f"/gestion/tramites/{solicitud.id}",
+            data={"tipo": "tramite_nuevo_supervisor", "solicitud_id": solicitud.id},
+        ),
+        email=EmailFanOut(
+            subject=f"Nuevo trámite #{solicitud.numero_tramite} recibido",
+            body_html=EmailTemplates.solicitud_creada(
+                numero_tramite=solicitud.numero_tramite,
+                tramite_nombre=tramite_nombre or "Trámite",
+                asunto=solicitud.asunto or "Sin asunto",
+                descripcion=solicitud.descripcion,
+                solicitante_nombre=solicitante_nombre
+            ),
+        ),
+    )
+    return resultado.push_enviados
 
 async def notificar_cambio_estado_solicitud(
     db: AsyncSession,
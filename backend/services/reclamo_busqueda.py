@@ -0,0 +1,276 @@
+"""
+Buscador de reclamos sobre el documento denormalizado `reclamo_busqueda`.
+
+Antes `GET /api/reclamos?search=` hacía JOIN con creador/categoría/zona/
+dependencia y un OR de 14 `func.lower(col).like('%term%')` (incluyendo
+`CAST(id AS CHAR)`), lo que obliga a escanear todos los reclamos y usuarios
+del municipio en cada tecla del buscador del Kanban.
+
+Ahora:
+
+1. Cada vez que se flushea un Reclamo con cambios en campos buscables (o
+   cambia el nombre/DNI/teléfono de su creador, su categoría o su zona) la
+   denormalización registrada en core/denormalizacion reconstruye sus
+   documentos en la misma transacción (1 SELECT con JOINs + 1 DELETE +
+   1 INSERT multi-row por lote, sin importar cuántos reclamos cambien).
+2. `buscar_ids()` resuelve el texto contra el índice FULLTEXT (con los
+   filtros de visibilidad del caller) y devuelve ids rankeados por
+   relevancia. El endpoint después hidrata sólo la página.
+
+En SQLite (tests/dev) no hay FULLTEXT: se cae a LIKE sobre las dos columnas
+del documento, que sigue siendo una sola tabla sin JOINs.
+"""
+import logging
+import re
+import unicodedata
+from typing import Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, insert, or_, select
+from sqlalchemy.dialects.mysql import match as mysql_match
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.denormalizacion import Cambios, cambio_alguno, registrar
+from models.categoria_reclamo import CategoriaReclamo
+from models.reclamo import Reclamo
+from models.reclamo_busqueda import ReclamoBusqueda
+from models.user import User
+from models.zona import Zona
+
+logger = logging.getLogger(__name__)
+
+# Campos del reclamo que alimentan el documento. Si cambia alguno de estos
+# (o el creador/categoría/zona referenciados) hay que reindexar.
+CAMPOS_BUSCABLES = (
+    "titulo", "descripcion", "direccion", "referencia", "resolucion",
+    "creador_id", "categoria_id", "zona_id", "municipio_id",
+)
+
+# Tope de resultados rankeados. El buscador es para encontrar "ese" reclamo,
+# no para paginar 10k resultados: más allá de esto conviene refinar.
+MAX_RESULTADOS = 500
+
+# innodb_ft_min_token_size default = 3: tokens más cortos no están en el índice
+MIN_TOKEN = 3
+
+_NO_ALNUM = re.compile(r"[^0-9a-z]+")
+_SOLO_DIGITOS = re.compile(r"\D+")
+
+
+def normalizar(texto: Optional[str]) -> str:
+    """Minúsculas, sin acentos, sólo alfanuméricos separados por espacio."""
+    if not texto:
+        return ""
+    sin_acentos = unicodedata.normalize("NFKD", str(texto)).encode("ascii", "ignore").decode()
+    return _NO_ALNUM.sub(" ", sin_acentos.lower()).strip()
+
+
+def sufijos_numericos(valor) -> List[str]:
+    """
+    Sufijos de los dígitos de `valor` de largo >= MIN_TOKEN.
+    "20-12345678" -> ["2012345678", "012345678", ..., "678"].
+    Buscar cualquier substring equivale a buscar prefijo de algún sufijo.
+    """
+    digitos = _SOLO_DIGITOS.sub("", str(valor or ""))
+    return [digitos[i:] for i in range(0, len(digitos) - MIN_TOKEN + 1)]
+
+
+def construir_documento(
+    reclamo_id: int,
+    titulo=None, descripcion=None, direccion=None, referencia=None, resolucion=None,
+    nombre=None, apellido=None, email=None, telefono=None, dni=None,
+    categoria=None, zona=None, zona_codigo=None,
+) -> Tuple[str, str]:
+    """Arma `(documento, ngramas)` para un reclamo a partir de sus campos."""
+    documento = " ".join(
+        p for p in (
+            normalizar(titulo), normalizar(descripcion), normalizar(direccion),
+            normalizar(referencia), normalizar(resolucion),
+            normalizar(nombre), normalizar(apellido), normalizar(email),
+            normalizar(categoria), normalizar(zona), normalizar(zona_codigo),
+        ) if p
+    )
+    ngramas: List[str] = []
+    for valor in (reclamo_id, dni, telefono):
+        ngramas.extend(sufijos_numericos(valor))
+    return documento, " ".join(dict.fromkeys(ngramas))
+
+
+def _select_fuentes(ids: Iterable[int]):
+    """Un SELECT con todos los datos necesarios para armar los documentos."""
+    return (
+        select(
+            Reclamo.id, Reclamo.municipio_id,
+            Reclamo.titulo, Reclamo.descripcion, Reclamo.direccion,
+            Reclamo.referencia, Reclamo.resolucion,
+            User.nombre, User.apellido, User.email, User.telefono, User.dni,
+            CategoriaReclamo.nombre, Zona.nombre, Zona.codigo,
+        )
+        .select_from(Reclamo)
+        .outerjoin(User, User.id == Reclamo.creador_id)
+        .outerjoin(CategoriaReclamo, CategoriaReclamo.id == Reclamo.categoria_id)
+        .outerjoin(Zona, Zona.id == Reclamo.zona_id)
+        .where(Reclamo.id.in_(list(ids)))
+    )
+
+
+def _filas_documento(rows) -> List[dict]:
+    filas = []
+    for (rid, muni, titulo, descripcion, direccion, referencia, resolucion,
+         nombre, apellido, email, telefono, dni, categoria, zona, zona_codigo) in rows:
+        documento, ngramas = construir_documento(
+            rid, titulo, descripcion, direccion, referencia, resolucion,
+            nombre, apellido, email, telefono, dni, categoria, zona, zona_codigo,
+        )
+        filas.append({
+            "reclamo_id": rid, "municipio_id": muni,
+            "documento": documento, "ngramas": ngramas,
+        })
+    return filas
+
+
+# ============================================================
+# Mantenimiento del índice
+# ============================================================
+
+def _reindexar_sync(connection, ids: Set[int], borrados: Set[int]) -> None:
+    todos = ids | borrados
+    if not todos:
+        return
+    connection.execute(delete(ReclamoBusqueda).where(ReclamoBusqueda.reclamo_id.in_(list(todos))))
+    if ids:
+        filas = _filas_documento(connection.execute(_select_fuentes(ids)).all())
+        if filas:
+            connection.execute(insert(ReclamoBusqueda), filas)
+
+
+# Campos de las entidades referenciadas que aparecen en el documento
+CAMPOS_CREADOR = ("nombre", "apellido", "email", "telefono", "dni")
+CAMPOS_CATEGORIA = ("nombre",)
+CAMPOS_ZONA = ("nombre", "codigo")
+# Reclamos por DELETE+INSERT al reindexar por un cambio en cascada
+LOTE_REINDEXAR = 2000
+
+
+def _recolectar(cambios: Cambios) -> Optional[tuple]:
+    """Reclamos a reindexar/borrar y entidades referenciadas que cambiaron."""
+    reclamos = cambios.de(Reclamo)
+    borrados = {obj.id for obj in reclamos.borrados if obj.id is not None}
+    ids = {obj.id for obj in reclamos.nuevos if obj.id is not None}
+    ids |= {
+        obj.id for obj in reclamos.modificados
+        if obj.id is not None and cambio_alguno(obj, CAMPOS_BUSCABLES)
+    }
+    # Renombrar una categoría o editar el DNI de un vecino cambia el texto de
+    # todos sus reclamos
+    creadores = {u.id for u in cambios.de(User).modificados if cambio_alguno(u, CAMPOS_CREADOR)}
+    categorias = {c.id for c in cambios.de(CategoriaReclamo).modificados if cambio_alguno(c, CAMPOS_CATEGORIA)}
+    zonas = {z.id for z in cambios.de(Zona).modificados if cambio_alguno(z, CAMPOS_ZONA)}
+    if not (ids or borrados or creadores or categorias or zonas):
+        return None
+    return ids - borrados, borrados, creadores, categorias, zonas
+
+
+def _aplicar(connection, pendiente: tuple) -> None:
+    ids, borrados, creadores, categorias, zonas = pendiente
+    conds = []
+    if creadores:
+        conds.append(Reclamo.creador_id.in_(list(creadores)))
+    if categorias:
+        conds.append(Reclamo.categoria_id.in_(list(categorias)))
+    if zonas:
+        conds.append(Reclamo.zona_id.in_(list(zonas)))
+    if conds:
+        ids = ids | set(connection.execute(select(Reclamo.id).where(or_(*conds))).scalars().all())
+    _reindexar_sync(connection, set(), borrados)
+    ordenados = sorted(ids)
+    for i in range(0, len(ordenados), LOTE_REINDEXAR):
+        _reindexar_sync(connection, set(ordenados[i:i + LOTE_REINDEXAR]), set())
+
+
+# Si el documento no se puede escribir (ej. reclamo_busqueda sin migrar) el
+# reclamo se guarda igual y sólo queda fuera del buscador hasta correr
+# scripts/migrate_reclamo_busqueda.py.
+registrar(
+    "reclamo_busqueda", (Reclamo, User, CategoriaReclamo, Zona), _recolectar, _aplicar,
+)
+
+
+async def reindexar_municipio(db: AsyncSession, municipio_id: Optional[int], lote: int = 2000) -> int:
+    """Reconstruye los documentos de un municipio (o de todos si es None)."""
+    q = select(Reclamo.id).order_by(Reclamo.id)
+    if municipio_id is not None:
+        q = q.where(Reclamo.municipio_id == municipio_id)
+    ids = list((await db.execute(q)).scalars().all())
+    for i in range(0, len(ids), lote):
+        chunk = set(ids[i:i + lote])
+        await db.run_sync(lambda s, c=chunk: _reindexar_sync(s.connection(), c, set()))
+        await db.commit()
+    return len(ids)
+
+
+# ============================================================
+# Búsqueda
+# ============================================================
+
+def _tokens(texto: str) -> List[str]:
+    return [t for t in normalizar(texto).split() if t]
+
+
+def _es_mysql(db: AsyncSession) -> bool:
+    return db.get_bind().dialect.name == "mysql"
+
+
+async def buscar_ids(
+    db: AsyncSession,
+    municipio_id: Optional[int],
+    texto: str,
+    limite: Optional[int] = None,
+    filtros: Iterable = (),
+) -> List[int]:
+    """
+    Ids de reclamos del municipio que matchean `texto`, del más relevante al
+    menos. Todos los términos son obligatorios y se buscan como prefijo.
+
+    `filtros` son condiciones sobre `Reclamo` (visibilidad por rol, estado,
+    categoría...): se aplican con un JOIN antes del tope de `limite`, así un
+    municipio con muchos matches no le esconde a un vecino los suyos.
+    """
+    tokens = _tokens(texto)
+    if not tokens:
+        return []
+    limite = MAX_RESULTADOS if limite is None else limite
+
+    base_where = [ReclamoBusqueda.municipio_id == municipio_id]
+    filtros = [f for f in filtros if f is not None]
+
+    if _es_mysql(db) and all(len(t) >= MIN_TOKEN for t in tokens):
+        boolean_q = " ".join(f"+{t}*" for t in tokens)
+        match = mysql_match(
+            ReclamoBusqueda.documento, ReclamoBusqueda.ngramas, against=boolean_q,
+        ).in_boolean_mode()
+        q = (
+            select(ReclamoBusqueda.reclamo_id)
+            .where(*base_where)
+            .where(match)
+            .order_by(match.desc(), ReclamoBusqueda.reclamo_id.desc())
+            .limit(limite)
+        )
+    else:
+        # Fallback: LIKE sobre el documento ya normalizado
+        conds = [
+            or_(
+                ReclamoBusqueda.documento.like(f"%{t}%"),
+                ReclamoBusqueda.ngramas.like(f"%{t}%"),
+            )
+            for t in tokens
+        ]
+        q = (
+            select(ReclamoBusqueda.reclamo_id)
+            .where(*base_where, *conds)
+            .order_by(ReclamoBusqueda.reclamo_id.desc())
+            .limit(limite)
+        )
+    if filtros:
+        q = q.join(Reclamo, Reclamo.id == ReclamoBusqueda.reclamo_id).where(*filtros)
+
+    return list((await db.execute(q)).scalars().all())
@@ -0,0 +1,72 @@
+"""Pool de procesos para renderizar PDFs fuera del event loop.
+
+reportlab es CPU puro: un reporte ejecutivo tarda cientos de ms y, corrido
+dentro del handler, frena a todos los requests del worker. Acá se manda a
+un ProcessPoolExecutor compartido (reporte ejecutivo y Orden de Pago).
+
+La función que se manda tiene que ser de módulo (picklable) y devolver
+bytes. Los workers arrancan con "spawn" (no heredan el loop ni las
+conexiones del proceso padre) y precargan reportlab una sola vez.
+
+Con PDF_RENDER_WORKERS=0 o en testing se renderiza en un thread del mismo
+proceso: igual no bloquea el loop, pero sin levantar procesos.
+"""
+import asyncio
+import functools
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _precargar() -> None:
+    """Initializer de cada worker: importa los generadores (y reportlab)."""
+    import services.op_pdf_generator  # noqa: F401
+    import services.pdf_report  # noqa: F401
+
+
+class RenderPool:
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def en_procesos(self) -> bool:
+        return self.workers > 0 and settings.ENVIRONMENT != "testing"
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_precargar,
+            )
+        return self._executor
+
+    async def ejecutar(self, fn: Callable[..., bytes], /, **kwargs) -> bytes:
+        """Corre fn(**kwargs) en el pool y devuelve sus bytes."""
+        llamada = functools.partial(fn, **kwargs)
+        if not self.en_procesos:
+            return await asyncio.to_thread(llamada)
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._pool(), llamada)
+        except BrokenProcessPool:
+            # Un worker murió (OOM, kill): se rehace el pool y se reintenta una vez
+            logger.warning("Pool de render roto, se recrea")
+            self.cerrar()
+            return await loop.run_in_executor(self._pool(), llamada)
+
+    def cerrar(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+render_pool = RenderPool(settings.PDF_RENDER_WORKERS)
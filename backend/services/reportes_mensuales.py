@@ -0,0 +1,321 @@
+"""Reporte ejecutivo mensual: snapshot de métricas + PDF cacheado.
+
+El flujo de GET /reportes/ejecutivo:
+
+  1. `obtener_snapshot`: las métricas del mes salen de la tabla
+     reportes_mensuales. Si no están (o el mes está abierto y el snapshot
+     venció) se calculan con dos queries agregadas (el mes agrupado por
+     estado/categoría/zona/empleado y la tendencia de 6 meses agrupada por
+     mes) y se guardan. Un mes cerrado no se recalcula nunca.
+  2. `etag`: hash de métricas + branding del municipio + versión de la
+     plantilla. Con If-None-Match igual el endpoint contesta 304 sin
+     renderizar nada.
+  3. `renderizar`: LRU en memoria de bytes por (municipio, año, mes,
+     versión de plantilla); si el ETag no coincide se renderiza en el pool
+     de procesos (services/render_pool).
+"""
+import hashlib
+import json
+from calendar import monthrange
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, case, extract, func, literal_column, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from models.calificacion import Calificacion
+from models.categoria_reclamo import CategoriaReclamo as Categoria
+from models.empleado import Empleado
+from models.enums import EstadoReclamo
+from models.municipio import Municipio
+from models.reclamo import Reclamo
+from models.reporte_mensual import ReporteMensual
+from models.zona import Zona
+from services.pdf_report import PLANTILLA_VERSION, render_executive_report
+from services.render_pool import render_pool
+
+ESTADOS_RESUELTOS = (EstadoReclamo.FINALIZADO, EstadoReclamo.RESUELTO)
+ESTADOS_PENDIENTES = (EstadoReclamo.NUEVO, EstadoReclamo.ASIGNADO, EstadoReclamo.EN_CURSO)
+SLA_DEFAULT_HORAS = 48
+MESES_TENDENCIA = 6
+
+ETIQUETAS_ESTADO = {
+    EstadoReclamo.RECIBIDO: "Recibido",
+    EstadoReclamo.EN_CURSO: "En Curso",
+    EstadoReclamo.FINALIZADO: "Finalizado",
+    EstadoReclamo.POSPUESTO: "Pospuesto",
+    EstadoReclamo.RECHAZADO: "Rechazado",
+    # Legacy
+    EstadoReclamo.NUEVO: "Nuevo",
+    EstadoReclamo.ASIGNADO: "Asignado",
+    EstadoReclamo.EN_PROCESO: "En Proceso",
+    EstadoReclamo.PENDIENTE_CONFIRMACION: "Pend. Confirmación",
+    EstadoReclamo.RESUELTO: "Resuelto",
+}
+
+MESES_NOMBRES = [
+    "", "Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio",
+    "Julio", "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre"
+]
+
+
+# ============================================================
+# Fechas
+# ============================================================
+
+def rango_mes(anio: int, mes: int) -> Tuple[datetime, datetime]:
+    """[primer instante del mes, primer instante del mes siguiente)."""
+    desde = datetime(anio, mes, 1)
+    return desde, desde + timedelta(days=monthrange(anio, mes)[1])
+
+
+def mes_cerrado(anio: int, mes: int, hoy: Optional[date] = None) -> bool:
+    return rango_mes(anio, mes)[1].date() <= (hoy or date.today())
+
+
+def _meses_atras(anio: int, mes: int, n: int) -> Tuple[int, int]:
+    total = anio * 12 + (mes - 1) - n
+    return total // 12, total % 12 + 1
+
+
+# ============================================================
+# Cálculo
+# ============================================================
+
+def _horas_resolucion(db: AsyncSession):
+    """Horas entre creación y resolución (float), según el motor."""
+    if db.get_bind().dialect.name == "mysql":
+        segundos = func.timestampdiff(literal_column("SECOND"), Reclamo.created_at, Reclamo.fecha_resolucion)
+        return segundos / 3600.0
+    return (func.julianday(Reclamo.fecha_resolucion) - func.julianday(Reclamo.created_at)) * 24
+
+
+async def calcular_metricas(db: AsyncSession, municipio_id: int, anio: int, mes: int) -> Dict[str, Any]:
+    """Métricas del mes en dos queries agregadas (el detalle se pliega en Python)."""
+    desde, hasta = rango_mes(anio, mes)
+    del_mes = and_(
+        Reclamo.municipio_id == municipio_id,
+        Reclamo.created_at >= desde,
+        Reclamo.created_at < hasta,
+    )
+    horas = _horas_resolucion(db)
+    limite = func.coalesce(Categoria.tiempo_resolucion_estimado, SLA_DEFAULT_HORAS)
+
+    filas = (await db.execute(
+        select(
+            Reclamo.estado,
+            Categoria.nombre,
+            Zona.nombre,
+            Reclamo.empleado_id,
+            Empleado.nombre,
+            Empleado.apellido,
+            func.count(Reclamo.id),
+            func.count(Reclamo.fecha_resolucion),
+            func.sum(horas),
+            func.sum(case((horas <= limite, 1), else_=0)),
+            func.count(Calificacion.puntuacion),
+            func.sum(Calificacion.puntuacion),
+        )
+        .join(Categoria, Categoria.id == Reclamo.categoria_id)
+        .outerjoin(Zona, Zona.id == Reclamo.zona_id)
+        .outerjoin(Empleado, Empleado.id == Reclamo.empleado_id)
+        .outerjoin(Calificacion, Calificacion.reclamo_id == Reclamo.id)
+        .where(del_mes)
+        .group_by(
+            Reclamo.estado, Categoria.nombre, Zona.nombre,
+            Reclamo.empleado_id, Empleado.nombre, Empleado.apellido,
+        )
+    )).all()
+
+    total = resueltos = pendientes = 0
+    con_resolucion = en_tiempo = 0
+    horas_total = 0.0
+    calificaciones = suma_calificaciones = 0
+    por_estado: Dict[str, int] = {}
+    por_categoria: Dict[str, int] = {}
+    por_zona: Dict[str, int] = {}
+    empleados: Dict[int, Dict[str, Any]] = {}
+
+    for (estado, categoria, zona, empleado_id, nombre, apellido,
+         cant, cant_res, horas_sum, cant_tiempo, cant_calif, suma_calif) in filas:
+        total += cant
+        etiqueta = ETIQUETAS_ESTADO.get(estado, str(estado))
+        por_estado[etiqueta] = por_estado.get(etiqueta, 0) + cant
+        por_categoria[categoria] = por_categoria.get(categoria, 0) + cant
+        if zona is not None:
+            por_zona[zona] = por_zona.get(zona, 0) + cant
+        calificaciones += cant_calif
+        suma_calificaciones += suma_calif or 0
+        if estado in ESTADOS_PENDIENTES:
+            pendientes += cant
+        if estado not in ESTADOS_RESUELTOS:
+            continue
+        resueltos += cant
+        con_resolucion += cant_res
+        horas_total += float(horas_sum or 0)
+        en_tiempo += int(cant_tiempo or 0)
+        if empleado_id is not None and nombre is not None:
+            e = empleados.setdefault(empleado_id, {
+                "nombre": f"{nombre} {(apellido or '')[:1]}.".strip(),
+                "resueltos": 0, "_res": 0, "_horas": 0.0, "_calif": 0, "_suma": 0,
+            })
+            e["resueltos"] += cant
+            e["_res"] += cant_res
+            e["_horas"] += float(horas_sum or 0)
+            e["_calif"] += cant_calif
+            e["_suma"] += suma_calif or 0
+
+    top_empleados = [
+        {
+            "nombre": e["nombre"],
+            "resueltos": e["resueltos"],
+            "tiempo_promedio": round(e["_horas"] / e["_res"], 1) if e["_res"] else 0.0,
+            "calificacion": round(e["_suma"] / e["_calif"], 2) if e["_calif"] else 0.0,
+        }
+        for e in sorted(empleados.values(), key=lambda e: -e["resueltos"])[:5]
+    ]
+
+    return {
+        "estadisticas": {"total": total, "resueltos": resueltos, "pendientes": pendientes},
+        "por_estado": por_estado,
+        "por_categoria": por_categoria,
+        "por_zona": por_zona,
+        "tendencia": await _tendencia(db, municipio_id, anio, mes),
+        "top_empleados": top_empleados,
+        "sla_cumplimiento": round(en_tiempo / con_resolucion * 100, 1) if con_resolucion else 0,
+        "tiempo_promedio": round(horas_total / con_resolucion, 1) if con_resolucion else 0,
+        # Sin calificaciones = 0 honesto (nada de defaults inventados)
+        "calificacion_promedio": round(suma_calificaciones / calificaciones, 2) if calificaciones else 0,
+    }
+
+
+async def _tendencia(db: AsyncSession, municipio_id: int, anio: int, mes: int) -> List[List[Any]]:
+    """Reclamos creados por mes en los últimos 6 meses (lista de pares, en orden)."""
+    meses = [_meses_atras(anio, mes, i) for i in range(MESES_TENDENCIA - 1, -1, -1)]
+    anio_col = extract("year", Reclamo.created_at)
+    mes_col = extract("month", Reclamo.created_at)
+    cuentas = {
+        (int(a), int(m)): n
+        for a, m, n in (await db.execute(
+            select(anio_col, mes_col, func.count(Reclamo.id))
+            .where(
+                Reclamo.municipio_id == municipio_id,
+                Reclamo.created_at >= rango_mes(*meses[0])[0],
+                Reclamo.created_at < rango_mes(anio, mes)[1],
+            )
+            .group_by(anio_col, mes_col)
+        )).all()
+    }
+    return [[date(a, m, 1).strftime("%b %Y"), cuentas.get((a, m), 0)] for a, m in meses]
+
+
+# ============================================================
+# Snapshot
+# ============================================================
+
+def _vigente(snapshot: ReporteMensual) -> bool:
+    if snapshot.cerrado:
+        return True
+    edad = (datetime.utcnow() - snapshot.calculado_at).total_seconds()
+    return edad < settings.REPORTES_SNAPSHOT_TTL_S
+
+
+async def obtener_snapshot(db: AsyncSession, municipio_id: int, anio: int, mes: int) -> ReporteMensual:
+    """Snapshot guardado del mes; lo calcula (y lo guarda) si falta o venció."""
+    consulta = select(ReporteMensual).where(
+        ReporteMensual.municipio_id == municipio_id,
+        ReporteMensual.anio == anio,
+        ReporteMensual.mes == mes,
+    )
+    snapshot = (await db.execute(consulta)).scalar_one_or_none()
+    if snapshot is not None and _vigente(snapshot):
+        return snapshot
+
+    # Se decide antes de calcular: si el mes cierra durante el cálculo,
+    # queda abierto y el próximo request lo congela con todo adentro.
+    cerrado = mes_cerrado(anio, mes)
+    metricas = await calcular_metricas(db, municipio_id, anio, mes)
+    if snapshot is None:
+        snapshot = ReporteMensual(municipio_id=municipio_id, anio=anio, mes=mes)
+        db.add(snapshot)
+    snapshot.metricas = metricas
+    snapshot.cerrado = cerrado
+    snapshot.calculado_at = datetime.utcnow()
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Otro request lo guardó primero: vale el suyo
+        await db.rollback()
+        snapshot = (await db.execute(consulta)).scalar_one()
+    return snapshot
+
+
+# ============================================================
+# PDF
+# ============================================================
+
+def etag(municipio: Municipio, snapshot: ReporteMensual) -> str:
+    contenido = json.dumps(
+        [
+            PLANTILLA_VERSION, snapshot.anio, snapshot.mes, snapshot.metricas,
+            municipio.nombre, municipio.codigo, municipio.color_primario, municipio.logo_url,
+        ],
+        sort_keys=True, ensure_ascii=False, default=str,
+    )
+    return '"' + hashlib.sha256(contenido.encode()).hexdigest()[:32] + '"'
+
+
+def etag_coincide(if_none_match: Optional[str], valor: str) -> bool:
+    """If-None-Match: lista separada por comas, admite "*" y prefijo W/."""
+    if not if_none_match:
+        return False
+    candidatos = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidatos or any(c.removeprefix("W/") == valor for c in candidatos)
+
+
+_pdfs: "OrderedDict[Tuple[int, int, int, int], Tuple[str, bytes]]" = OrderedDict()
+
+
+def _parametros_pdf(municipio: Municipio, snapshot: ReporteMensual) -> Dict[str, Any]:
+    m = snapshot.metricas
+    return {
+        "municipio_nombre": municipio.nombre.replace("Municipalidad de ", ""),
+        "municipio_codigo": municipio.codigo,
+        "color_primario": municipio.color_primario or "#3b82f6",
+        "periodo": f"{MESES_NOMBRES[snapshot.mes]} {snapshot.anio}",
+        "estadisticas": m["estadisticas"],
+        "reclamos_por_categoria": m["por_categoria"],
+        "reclamos_por_zona": m["por_zona"],
+        "reclamos_por_estado": m["por_estado"],
+        "tendencia_mensual": dict((etiqueta, n) for etiqueta, n in m["tendencia"]),
+        "top_empleados": m["top_empleados"],
+        "sla_cumplimiento": m["sla_cumplimiento"],
+        "tiempo_promedio_resolucion": float(m["tiempo_promedio"]),
+        "calificacion_promedio": float(m["calificacion_promedio"]),
+        "logo_url": municipio.logo_url,
+    }
+
+
+async def renderizar(municipio: Municipio, snapshot: ReporteMensual, valor_etag: str) -> bytes:
+    """PDF del snapshot: del LRU si el ETag coincide, si no del pool de procesos."""
+    clave = (municipio.id, snapshot.anio, snapshot.mes, PLANTILLA_VERSION)
+    cacheado = _pdfs.get(clave)
+    if cacheado is not None and cacheado[0] == valor_etag:
+        _pdfs.move_to_end(clave)
+        return cacheado[1]
+
+    pdf = await render_pool.ejecutar(render_executive_report, **_parametros_pdf(municipio, snapshot))
+    _pdfs[clave] = (valor_etag, pdf)
+    _pdfs.move_to_end(clave)
+    while len(_pdfs) > settings.REPORTES_PDF_CACHE_SIZE:
+        _pdfs.popitem(last=False)
+    return pdf
+
+
+def invalidar(municipio_id: Optional[int] = None) -> None:
+    """Descarta PDFs en memoria (los snapshots en BD no se tocan)."""
+    for clave in [c for c in _pdfs if municipio_id is None or c[0] == municipio_id]:
+        del _pdfs[clave]
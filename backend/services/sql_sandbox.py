@@ -0,0 +1,493 @@
+"""Sandbox para el SQL que genera la IA (consulta gerencial, consultas guardadas).
+
+Antes el SQL se validaba con regex y se mandaba tal cual por el pool de la
+API: una consulta mala podía tener una conexión tomada varios minutos y
+traer la tabla entera a memoria. Ahora pasa por dos etapas:
+
+  1. `preparar`: tokeniza el SQL (strings, identificadores, comentarios) y
+     lo recorre por niveles de paréntesis. Solo acepta una sentencia
+     SELECT/WITH sin palabras de escritura, locks, variables ni funciones
+     peligrosas, y cada tabla en posición de FROM/JOIN tiene que ser una
+     tabla conocida del modelo (también dentro de paréntesis y de
+     subconsultas en argumentos). Cada una se reemplaza por una tabla derivada
+     con el filtro del municipio (directo, o por la cadena de FKs hasta una
+     tabla con municipio_id) y sin columnas secretas. El LIMIT de nivel
+     superior se saca y lo pone el sandbox.
+  2. `SqlSandbox.ejecutar`: corre en un engine propio con pool chico (las
+     consultas analíticas no le sacan conexiones a la API), con
+     max_execution_time y transacción de solo lectura por sesión en MySQL,
+     rechazo por costo con EXPLAIN, tope duro de filas y lectura con cursor
+     del lado del servidor.
+"""
+import asyncio
+import json
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from core.config import settings
+
+
+class SqlRechazado(ValueError):
+    """El SQL no pasa las reglas del sandbox (el mensaje se muestra al usuario)."""
+
+
+# ============================================================
+# Tokenizer
+# ============================================================
+
+@dataclass
+class Token:
+    tipo: str       # ws | word | ident | str | num | param | op
+    texto: str
+
+    @property
+    def upper(self) -> str:
+        return self.texto.upper() if self.tipo == "word" else ""
+
+
+_TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<comentario>--|\#|/\*)
+  | (?P<str>'(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.|"")*")
+  | (?P<ident>`(?:[^`]|``)+`)
+  | (?P<param>\{municipio_id\})
+  | (?P<num>\d+(?:\.\d+)?(?:[eE][-+]?\d+)?|\.\d+)
+  | (?P<word>[A-Za-z_][A-Za-z0-9_$]*)
+  | (?P<var>@)
+  | (?P<op><=>|<=|>=|<>|!=|\|\||&&|<<|>>|:=|[-+*/%=<>(),.;!~^&|?:{}\[\]])
+""", re.VERBOSE)
+
+
+def tokenizar(sql: str) -> List[Token]:
+    tokens: List[Token] = []
+    pos = 0
+    while pos < len(sql):
+        m = _TOKEN_RE.match(sql, pos)
+        if m is None:
+            raise SqlRechazado(f"Carácter no permitido en la consulta: {sql[pos]!r}")
+        tipo = m.lastgroup
+        if tipo == "comentario":
+            raise SqlRechazado("No se permiten comentarios en la consulta")
+        if tipo == "var":
+            raise SqlRechazado("No se permiten variables en la consulta")
+        if tipo == "op" and m.group() in "{}":
+            raise SqlRechazado("Placeholder no permitido (solo {municipio_id})")
+        tokens.append(Token(tipo, m.group()))
+        pos = m.end()
+    return tokens
+
+
+# ============================================================
+# Reglas
+# ============================================================
+
+# Palabras que no pueden aparecer como tal (sí como función: INSERT(), REPLACE()...)
+PALABRAS_PROHIBIDAS = {
+    "INSERT", "UPDATE", "DELETE", "REPLACE", "DROP", "CREATE", "ALTER", "TRUNCATE",
+    "GRANT", "REVOKE", "RENAME", "CALL", "EXEC", "EXECUTE", "DO", "HANDLER", "LOAD",
+    "INTO", "OUTFILE", "DUMPFILE", "LOCK", "UNLOCK", "PREPARE", "DEALLOCATE", "SET",
+    "SHOW", "KILL", "SHUTDOWN", "FLUSH", "TABLE", "SHARE", "NOWAIT",
+}
+
+FUNCIONES_PROHIBIDAS = {
+    "SLEEP", "BENCHMARK", "LOAD_FILE", "GET_LOCK", "RELEASE_LOCK", "RELEASE_ALL_LOCKS",
+    "IS_FREE_LOCK", "IS_USED_LOCK", "MASTER_POS_WAIT", "SOURCE_POS_WAIT",
+    "WAIT_FOR_EXECUTED_GTID_SET", "WAIT_UNTIL_SQL_THREAD_AFTER_GTIDS", "JSON_TABLE",
+}
+
+# Palabras reservadas seguidas de "(" que NO son llamadas a función
+_NO_FUNCION = {
+    "SELECT", "FROM", "WHERE", "JOIN", "ON", "AND", "OR", "NOT", "IN", "EXISTS", "AS",
+    "UNION", "ALL", "ANY", "SOME", "WITH", "RECURSIVE", "USING", "BY", "HAVING",
+    "WHEN", "THEN", "ELSE", "CASE", "IS", "LIKE", "BETWEEN", "DISTINCT", "LATERAL",
+    "INTERSECT", "EXCEPT", "RLIKE", "REGEXP", "XOR", "DIV", "MOD", "ESCAPE", "LIMIT",
+    "OFFSET", "OVER", "PARTITION", "INNER", "LEFT", "RIGHT", "CROSS", "OUTER",
+    "NATURAL", "STRAIGHT_JOIN", "GROUP", "ORDER", "ASC", "DESC", "WINDOW", "VALUES",
+}
+
+_FIN_FROM = {"WHERE", "GROUP", "HAVING", "ORDER", "LIMIT", "UNION", "WINDOW", "INTERSECT", "EXCEPT"}
+
+# La IA a veces usa nombres que no son los de la tabla
+TABLAS_ALIAS = {"categorias": "categorias_reclamo"}
+
+
+@dataclass
+class Tenencia:
+    """Cómo se filtra una tabla por municipio dentro del sandbox."""
+    columnas: List[str]
+    # FKs desde la tabla hasta una con municipio_id: [(fk, tabla_destino), ...]
+    cadena: List[Tuple[str, str]] = field(default_factory=list)
+    columna_municipio: Optional[str] = "municipio_id"   # None = tabla global
+
+    def derivada(self, tabla: str, municipio_id: int) -> str:
+        cols = ", ".join(f"t0.`{c}`" for c in self.columnas)
+        sql = f"(SELECT {cols} FROM `{tabla}` t0"
+        for i, (fk, destino) in enumerate(self.cadena, start=1):
+            sql += f" JOIN `{destino}` t{i} ON t{i}.`id` = t{i - 1}.`{fk}`"
+        if self.columna_municipio:
+            sql += f" WHERE t{len(self.cadena)}.`{self.columna_municipio}` = {int(municipio_id)}"
+        return sql + ")"
+
+
+@dataclass
+class ConsultaPreparada:
+    sql: str                        # con tenencia inyectada y sin LIMIT de nivel superior
+    limite: Optional[int] = None    # LIMIT que pidió la consulta original
+    offset: int = 0
+    tablas: Set[str] = field(default_factory=set)
+
+
+def _es_palabra(t: Token, *palabras: str) -> bool:
+    return t.tipo == "word" and t.upper in palabras
+
+
+def preparar(sql: str, municipio_id: int, tablas: Dict[str, Tenencia]) -> ConsultaPreparada:
+    """Valida el SQL y lo reescribe con el filtro del municipio en cada tabla."""
+    tokens = tokenizar(sql.strip())
+    while tokens and (tokens[-1].tipo == "ws" or tokens[-1].texto == ";"):
+        tokens.pop()
+    sig = [i for i, t in enumerate(tokens) if t.tipo != "ws"]
+    if not sig or not _es_palabra(tokens[sig[0]], "SELECT", "WITH"):
+        raise SqlRechazado("Solo se permiten consultas SELECT")
+
+    ctes: Set[str] = set()
+    usadas: Set[str] = set()
+    salida: List[str] = [t.texto for t in tokens]
+    # Un marco por paréntesis abierto: [func | sub, dentro de FROM, dentro de WITH]
+    pila: List[List[Any]] = [["sub", False, False]]
+    esperando_tabla = False
+    esperando_cte = False
+    anterior: Optional[Token] = None
+
+    for pos, idx in enumerate(sig):
+        t = tokens[idx]
+        siguiente = tokens[sig[pos + 1]] if pos + 1 < len(sig) else None
+        marco = pila[-1]
+        # "(" en posición de tabla: `FROM ((SELECT ...) x, tabla)`
+        referencia = False
+
+        if t.texto == ";":
+            raise SqlRechazado("Solo se permite una consulta")
+        if t.tipo == "param":
+            salida[idx] = str(int(municipio_id))
+        if t.tipo == "word":
+            es_llamada = siguiente is not None and siguiente.texto == "("
+            if t.upper in PALABRAS_PROHIBIDAS and not es_llamada:
+                raise SqlRechazado(f"Palabra no permitida: {t.texto}")
+            if t.upper in FUNCIONES_PROHIBIDAS:
+                raise SqlRechazado(f"Función no permitida: {t.texto}")
+
+        if esperando_cte and _es_palabra(t, "RECURSIVE"):
+            pass
+        elif esperando_cte:
+            esperando_cte = False
+            nombre = _nombre(t)
+            if nombre is None:
+                raise SqlRechazado("WITH mal formado")
+            nombre = nombre.lower()
+            if nombre in tablas or nombre in TABLAS_ALIAS:
+                raise SqlRechazado(f"El CTE {nombre} tapa una tabla real")
+            ctes.add(nombre)
+        elif esperando_tabla:
+            esperando_tabla = False
+            if t.texto == "(":
+                if siguiente is None or not (_es_palabra(siguiente, "SELECT", "WITH") or siguiente.texto == "("):
+                    raise SqlRechazado("Solo se permiten subconsultas entre paréntesis en FROM/JOIN")
+                referencia = True
+            elif _es_palabra(t, "LATERAL"):
+                esperando_tabla = True
+            else:
+                nombre = _nombre(t)
+                if nombre is None:
+                    raise SqlRechazado("FROM/JOIN mal formado")
+                if siguiente is not None and siguiente.texto == ".":
+                    raise SqlRechazado("No se permiten tablas de otros esquemas")
+                nombre = nombre.lower()
+                if nombre not in ctes:
+                    real = TABLAS_ALIAS.get(nombre, nombre)
+                    if real not in tablas:
+                        raise SqlRechazado(f"Tabla no permitida: {nombre}")
+                    usadas.add(real)
+                    con_alias = siguiente is not None and (
+                        _es_palabra(siguiente, "AS")
+                        or (siguiente.tipo in ("word", "ident") and siguiente.upper not in _NO_FUNCION
+                            and siguiente.upper not in PALABRAS_PROHIBIDAS)
+                    )
+                    salida[idx] = tablas[real].derivada(real, municipio_id)
+                    if not con_alias:
+                        salida[idx] += f" AS `{nombre}`"
+
+        if t.texto == "(" and referencia:
+            # Sigue siendo FROM: la lista de adentro también son tablas, y
+            # un "(" anidado vuelve a pasar por el chequeo de subconsulta
+            pila.append(["sub", True, False])
+            esperando_tabla = siguiente.texto == "("
+        elif t.texto == "(":
+            es_func = (
+                anterior is not None and anterior.tipo == "word"
+                and anterior.upper not in _NO_FUNCION and anterior.upper not in PALABRAS_PROHIBIDAS
+            )
+            pila.append(["func" if es_func else "sub", False, False])
+        elif t.texto == ")":
+            if len(pila) == 1:
+                raise SqlRechazado("Paréntesis desbalanceados")
+            pila.pop()
+        elif _es_palabra(t, "SELECT", "WITH") and marco[0] == "func":
+            # Un SELECT abre su propio FROM aunque esté en los argumentos de
+            # algo que parece función: `INTERVAL (SELECT ... FROM t) DAY`
+            marco[0] = "sub"
+            marco[1] = False
+            marco[2] = t.upper == "WITH"
+            esperando_cte = t.upper == "WITH"
+        elif t.tipo == "word" and marco[0] == "sub":
+            if t.upper == "WITH":
+                marco[2] = True
+                esperando_cte = True
+            elif t.upper == "SELECT":
+                marco[1] = False
+                marco[2] = False
+            elif t.upper == "FROM" or t.upper.endswith("JOIN"):
+                marco[1] = True
+                esperando_tabla = True
+            elif t.upper in _FIN_FROM:
+                marco[1] = False
+        elif t.texto == "," and marco[0] == "sub":
+            if marco[2]:
+                esperando_cte = True
+            elif marco[1]:
+                esperando_tabla = True
+        anterior = t
+
+    if len(pila) != 1:
+        raise SqlRechazado("Paréntesis desbalanceados")
+    if esperando_tabla or esperando_cte:
+        raise SqlRechazado("Consulta incompleta")
+
+    limite, offset = _quitar_limit(tokens, sig, salida)
+    return ConsultaPreparada(sql="".join(salida).strip(), limite=limite, offset=offset, tablas=usadas)
+
+
+def _nombre(t: Token) -> Optional[str]:
+    if t.tipo == "word":
+        return t.texto
+    if t.tipo == "ident":
+        return t.texto[1:-1].replace("``", "`")
+    return None
+
+
+def _quitar_limit(tokens: List[Token], sig: List[int], salida: List[str]) -> Tuple[Optional[int], int]:
+    """Saca el LIMIT de nivel superior; devuelve (cantidad, offset) pedidos."""
+    nivel = 0
+    desde = None
+    for pos, idx in enumerate(sig):
+        texto = tokens[idx].texto
+        if texto == "(":
+            nivel += 1
+        elif texto == ")":
+            nivel -= 1
+        elif nivel == 0 and _es_palabra(tokens[idx], "LIMIT"):
+            desde = pos
+    if desde is None:
+        return None, 0
+    resto = [tokens[i] for i in sig[desde + 1:]]
+    forma = [t.texto if t.tipo != "num" else "n" for t in resto]
+    if any(t.tipo == "num" and not t.texto.isdigit() for t in resto):
+        raise SqlRechazado("LIMIT mal formado")
+    # LIMIT cantidad | LIMIT offset, cantidad | LIMIT cantidad OFFSET offset
+    if forma == ["n"]:
+        limite, offset = int(resto[0].texto), 0
+    elif forma == ["n", ",", "n"]:
+        limite, offset = int(resto[2].texto), int(resto[0].texto)
+    elif len(forma) == 3 and forma[0] == forma[2] == "n" and _es_palabra(resto[1], "OFFSET"):
+        limite, offset = int(resto[0].texto), int(resto[2].texto)
+    else:
+        raise SqlRechazado("LIMIT mal formado")
+    inicio = sig[desde]
+    while inicio > 0 and tokens[inicio - 1].tipo == "ws":
+        inicio -= 1
+    for i in range(inicio, len(salida)):
+        salida[i] = ""
+    return limite, offset
+
+
+# ============================================================
+# Tablas conocidas (desde los modelos)
+# ============================================================
+
+COLUMNAS_SECRETAS = re.compile(r"password|secret|token|auth_key|encriptad|cifrad", re.IGNORECASE)
+
+_tablas: Optional[Dict[str, Tenencia]] = None
+
+
+def tablas_conocidas() -> Dict[str, Tenencia]:
+    """Tenencia de cada tabla del modelo: directa, por cadena de FKs o global."""
+    global _tablas
+    if _tablas is not None:
+        return _tablas
+    from core.database import Base
+    import models  # noqa: F401
+
+    metadata = Base.metadata.tables
+    directas = {n for n, t in metadata.items() if "municipio_id" in t.c}
+
+    def cadena(nombre: str) -> Optional[List[Tuple[str, str]]]:
+        # BFS por FKs hasta la primera tabla con municipio_id
+        cola = [(nombre, [])]
+        vistos = {nombre}
+        while cola:
+            actual, camino = cola.pop(0)
+            for col in metadata[actual].c:
+                for fk in col.foreign_keys:
+                    destino = fk.column.table.name
+                    if destino in vistos or fk.column.name != "id":
+                        continue
+                    paso = camino + [(col.name, destino)]
+                    if destino in directas or destino == "municipios":
+                        return paso
+                    vistos.add(destino)
+                    cola.append((destino, paso))
+        return None
+
+    _tablas = {}
+    for nombre, tabla in metadata.items():
+        columnas = [c.name for c in tabla.c if not COLUMNAS_SECRETAS.search(c.name)]
+        if nombre == "municipios":
+            _tablas[nombre] = Tenencia(columnas, columna_municipio="id")
+        elif nombre in directas:
+            _tablas[nombre] = Tenencia(columnas)
+        else:
+            camino = cadena(nombre)
+            if camino is None:
+                _tablas[nombre] = Tenencia(columnas, columna_municipio=None)
+            else:
+                ultima = camino[-1][1]
+                _tablas[nombre] = Tenencia(
+                    columnas, camino, "id" if ultima == "municipios" else "municipio_id",
+                )
+    return _tablas
+
+
+def preparar_sql(sql: str, municipio_id: int) -> ConsultaPreparada:
+    return preparar(sql, municipio_id, tablas_conocidas())
+
+
+# ============================================================
+# Ejecución
+# ============================================================
+
+@dataclass
+class ResultadoSql:
+    columnas: List[str]
+    filas: List[Dict[str, Any]]
+    sql: str
+    truncado: bool = False
+
+
+def _valor(v: Any) -> Any:
+    return v.strftime('%d/%m/%y %H:%M') if isinstance(v, datetime) else v
+
+
+class SqlSandbox:
+
+    def __init__(self, engine: Optional[AsyncEngine] = None):
+        self._engine_propio = engine is None
+        self._engine = engine
+
+    @property
+    def engine(self) -> AsyncEngine:
+        if self._engine is None:
+            url = settings.SQL_SANDBOX_DATABASE_URL or settings.DATABASE_URL
+            if url.startswith("sqlite"):
+                # SQLite en memoria (dev/tests) no se puede abrir dos veces
+                from core.database import engine
+                self._engine = engine
+                self._engine_propio = False
+            else:
+                self._engine = create_async_engine(
+                    url,
+                    pool_size=settings.SQL_SANDBOX_POOL_SIZE,
+                    max_overflow=0,
+                    pool_timeout=settings.SQL_SANDBOX_POOL_TIMEOUT_S,
+                    pool_pre_ping=True,
+                )
+                event.listen(self._engine.sync_engine, "connect", _configurar_sesion)
+        return self._engine
+
+    async def _correr(self, sql: str, limite: int) -> ResultadoSql:
+        async with self.engine.connect() as conn:
+            if conn.dialect.name == "mysql":
+                await self._verificar_costo(conn, sql)
+            resultado = await conn.stream(text(sql))
+            columnas = list(resultado.keys())
+            filas: List[Dict[str, Any]] = []
+            truncado = False
+            async for fila in resultado:
+                if len(filas) == limite:
+                    truncado = True
+                    break
+                filas.append({c: _valor(v) for c, v in zip(columnas, fila)})
+            await resultado.close()
+        return ResultadoSql(columnas, filas, sql, truncado)
+
+    @staticmethod
+    async def _verificar_costo(conn, sql: str) -> None:
+        plan = (await conn.execute(text(f"EXPLAIN FORMAT=JSON {sql}"))).scalar()
+        try:
+            costo = float(json.loads(plan)["query_block"]["cost_info"]["query_cost"])
+        except (KeyError, TypeError, ValueError):
+            return
+        if costo > settings.SQL_SANDBOX_COSTO_MAX:
+            raise SqlRechazado(
+                "La consulta es demasiado costosa. Probá acotarla (por fecha, estado o categoría)."
+            )
+
+    async def _con_timeout(self, sql: str, limite: int) -> ResultadoSql:
+        # max_execution_time corta la consulta en MySQL; esto corta la espera
+        # si igual se cuelga (o en motores sin ese límite)
+        try:
+            return await asyncio.wait_for(
+                self._correr(sql, limite), settings.SQL_SANDBOX_TIMEOUT_MS / 1000 + 2,
+            )
+        except asyncio.TimeoutError:
+            raise SqlRechazado("La consulta tardó demasiado. Probá acotarla.")
+
+    async def ejecutar(self, consulta: ConsultaPreparada, limite: int, offset: int = 0) -> ResultadoSql:
+        """Hasta `limite` filas (tope SQL_SANDBOX_MAX_FILAS) desde `offset`."""
+        limite = max(0, min(limite, settings.SQL_SANDBOX_MAX_FILAS))
+        # +1 para saber si se truncó sin traer el resto
+        sql = f"{consulta.sql} LIMIT {limite + 1} OFFSET {max(0, offset)}"
+        resultado = await self._con_timeout(sql, limite)
+        resultado.sql = f"{consulta.sql} LIMIT {limite} OFFSET {max(0, offset)}"
+        return resultado
+
+    async def contar(self, consulta: ConsultaPreparada) -> Optional[int]:
+        """COUNT(*) de la consulta completa; None si falla o es muy costoso."""
+        try:
+            resultado = await self._con_timeout(
+                f"SELECT COUNT(*) AS total FROM ({consulta.sql}) AS subquery", 1,
+            )
+        except Exception as e:
+            print(f"[SQL SANDBOX] Count falló: {e}")
+            return None
+        return int(next(iter(resultado.filas[0].values()))) if resultado.filas else 0
+
+    async def cerrar(self) -> None:
+        if self._engine is not None and self._engine_propio:
+            await self._engine.dispose()
+            self._engine = None
+
+
+def _configurar_sesion(dbapi_conn, _record) -> None:
+    """Cada conexión del pool del sandbox: timeout por sentencia y solo lectura."""
+    cursor = dbapi_conn.cursor()
+    cursor.execute(f"SET SESSION max_execution_time = {int(settings.SQL_SANDBOX_TIMEOUT_MS)}")
+    cursor.execute("SET SESSION TRANSACTION READ ONLY")
+    cursor.close()
+
+
+sql_sandbox = SqlSandbox()
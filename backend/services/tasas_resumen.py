@@ -0,0 +1,298 @@
+"""
+Vencimiento de deudas + resumen de deuda por vecino.
+
+1. Barrido de vencimientos (`barrer_vencimientos`): nada pasaba una Deuda de
+   PENDIENTE a VENCIDA. Ahora el scheduler (core/scheduler.py) corre cada
+   hora un UPDATE por lotes: por municipio, se toman hasta `lote` ids con
+   `estado = pendiente AND fecha_vencimiento < hoy` (índice
+   ix_deudas_estado_vto) y se actualizan por PK. Cada lote es una
+   transacción corta, así no se bloquea la tabla con un UPDATE gigante.
+
+2. Resumen por vecino (`VecinoDeudaResumen`): `/vecino/resumen-badges` y
+   `/vecino/recomendaciones` se pollean desde cada sesión de vecino y antes
+   hacían varios COUNT/SUM con JOIN Partida/Deuda (titular_user_id OR dni)
+   por llamada. Ahora leen una fila por PK. La fila se recalcula:
+     - en la misma transacción cuando cambia una Deuda, Partida o el
+       dni/municipio de un User (denormalización registrada en
+       core/denormalizacion),
+     - para todo el municipio después de cada barrido con vencimientos, y
+       para todos una vez por día (proximas_7d depende de la fecha).
+   La lectura (`obtener_resumen`) nunca recalcula: un GET no escribe.
+"""
+import logging
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import and_, case, delete, distinct, func, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.denormalizacion import Cambios, cambio_alguno, registrar, valores
+from models.enums import RolUsuario
+from models.tasas import Deuda, EstadoDeuda, EstadoPartida, Partida, VecinoDeudaResumen
+from models.user import User
+
+logger = logging.getLogger(__name__)
+
+# Ids por UPDATE del barrido
+LOTE_VENCIMIENTOS = 5000
+# Filas por INSERT al reescribir resúmenes
+LOTE_RESUMEN = 1000
+# Ventana de "próximas a vencer" de las recomendaciones
+DIAS_PROXIMAS = 7
+
+
+# ============================================================
+# Barrido de vencimientos
+# ============================================================
+
+async def barrer_vencimientos(
+    db: AsyncSession,
+    hoy: Optional[date] = None,
+    municipio_id: Optional[int] = None,
+    lote: int = LOTE_VENCIMIENTOS,
+) -> Dict[int, int]:
+    """Pasa a VENCIDA las deudas pendientes con vencimiento anterior a `hoy`.
+
+    Devuelve {municipio_id: deudas vencidas} de los municipios que tuvieron
+    cambios.
+    """
+    hoy = hoy or date.today()
+    q_munis = (
+        select(distinct(Partida.municipio_id))
+        .join(Deuda, Deuda.partida_id == Partida.id)
+        .where(Deuda.estado == EstadoDeuda.PENDIENTE, Deuda.fecha_vencimiento < hoy)
+    )
+    if municipio_id is not None:
+        q_munis = q_munis.where(Partida.municipio_id == municipio_id)
+    municipios = list((await db.execute(q_munis)).scalars().all())
+
+    vencidas: Dict[int, int] = {}
+    for muni in municipios:
+        total = 0
+        while True:
+            ids = list((await db.execute(
+                select(Deuda.id)
+                .join(Partida, Partida.id == Deuda.partida_id)
+                .where(
+                    Partida.municipio_id == muni,
+                    Deuda.estado == EstadoDeuda.PENDIENTE,
+                    Deuda.fecha_vencimiento < hoy,
+                )
+                .limit(lote)
+            )).scalars().all())
+            if not ids:
+                break
+            result = await db.execute(
+                update(Deuda)
+                .where(Deuda.id.in_(ids), Deuda.estado == EstadoDeuda.PENDIENTE)
+                .values(estado=EstadoDeuda.VENCIDA)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            total += result.rowcount
+        if total:
+            vencidas[muni] = total
+            logger.info(f"[vencimientos] municipio {muni}: {total} deudas vencidas")
+    return vencidas
+
+
+# ============================================================
+# Resumen por vecino
+# ============================================================
+
+def _select_resumen(hoy: date):
+    """SELECT agregado (user_id, municipio_id, contadores...) por vecino.
+
+    Una partida es del vecino si coincide `titular_user_id` o el DNI (mismo
+    criterio que api/tasas `_partidas_del_vecino`). Las pendientes con
+    vencimiento pasado cuentan como vencidas aunque el barrido todavía no
+    haya corrido.
+    """
+    hasta = hoy + timedelta(days=DIAS_PROXIMAS)
+    pendiente = Deuda.estado == EstadoDeuda.PENDIENTE
+    vencida = or_(
+        Deuda.estado == EstadoDeuda.VENCIDA,
+        and_(pendiente, Deuda.fecha_vencimiento < hoy),
+    )
+    al_dia = and_(pendiente, Deuda.fecha_vencimiento >= hoy)
+    proxima = and_(al_dia, Deuda.fecha_vencimiento <= hasta)
+
+    match = or_(
+        Partida.titular_user_id == User.id,
+        and_(User.dni.isnot(None), User.dni != "", Partida.titular_dni == User.dni),
+    )
+    return (
+        select(
+            User.id,
+            User.municipio_id,
+            func.count(distinct(Partida.id)),
+            func.coalesce(func.sum(case((al_dia, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((al_dia, Deuda.importe), else_=0)), 0),
+            func.coalesce(func.sum(case((vencida, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((vencida, Deuda.importe), else_=0)), 0),
+            func.coalesce(func.sum(case((proxima, 1), else_=0)), 0),
+            func.min(case((al_dia, Deuda.fecha_vencimiento), else_=None)),
+        )
+        .select_from(User)
+        .join(Partida, and_(
+            Partida.municipio_id == User.municipio_id,
+            Partida.estado == EstadoPartida.ACTIVA,
+            match,
+        ))
+        .outerjoin(Deuda, Deuda.partida_id == Partida.id)
+        .where(User.rol == RolUsuario.VECINO, User.municipio_id.isnot(None))
+        .group_by(User.id, User.municipio_id)
+    )
+
+
+def _filas(rows, hoy: date) -> List[dict]:
+    return [
+        {
+            "user_id": uid,
+            "municipio_id": muni,
+            "partidas": int(partidas or 0),
+            "pendientes": int(pend or 0),
+            "monto_pendiente": Decimal(monto_pend or 0),
+            "vencidas": int(venc or 0),
+            "monto_vencido": Decimal(monto_venc or 0),
+            "proximas_7d": int(prox or 0),
+            "proximo_vencimiento": prox_vto,
+            "calculado_para": hoy,
+        }
+        for uid, muni, partidas, pend, monto_pend, venc, monto_venc, prox, prox_vto in rows
+    ]
+
+
+def _insertar(connection, filas: List[dict]) -> None:
+    for i in range(0, len(filas), LOTE_RESUMEN):
+        connection.execute(insert(VecinoDeudaResumen), filas[i:i + LOTE_RESUMEN])
+
+
+def _recalcular_usuarios_sync(connection, user_ids: Set[int], hoy: date) -> None:
+    """Reescribe el resumen de esos usuarios (DELETE + INSERT)."""
+    if not user_ids:
+        return
+    ids = list(user_ids)
+    connection.execute(delete(VecinoDeudaResumen).where(VecinoDeudaResumen.user_id.in_(ids)))
+    rows = connection.execute(_select_resumen(hoy).where(User.id.in_(ids))).all()
+    _insertar(connection, _filas(rows, hoy))
+
+
+def _recalcular_municipio_sync(connection, municipio_id: int, hoy: date) -> int:
+    connection.execute(delete(VecinoDeudaResumen).where(VecinoDeudaResumen.municipio_id == municipio_id))
+    rows = connection.execute(_select_resumen(hoy).where(User.municipio_id == municipio_id)).all()
+    filas = _filas(rows, hoy)
+    _insertar(connection, filas)
+    return len(filas)
+
+
+async def recalcular_municipio(db: AsyncSession, municipio_id: int, hoy: Optional[date] = None) -> int:
+    """Reconstruye los resúmenes de todos los vecinos del municipio."""
+    hoy = hoy or date.today()
+    n = await db.run_sync(lambda s: _recalcular_municipio_sync(s.connection(), municipio_id, hoy))
+    await db.commit()
+    return n
+
+
+async def recalcular_todos(db: AsyncSession, hoy: Optional[date] = None) -> int:
+    hoy = hoy or date.today()
+    munis = (await db.execute(select(distinct(Partida.municipio_id)))).scalars().all()
+    # Municipios que ya no tienen partidas pero conservan filas viejas
+    munis_resumen = (await db.execute(select(distinct(VecinoDeudaResumen.municipio_id)))).scalars().all()
+    total = 0
+    for muni in set(munis) | set(munis_resumen):
+        total += await recalcular_municipio(db, muni, hoy)
+    return total
+
+
+async def obtener_resumen(db: AsyncSession, user: User) -> Optional[VecinoDeudaResumen]:
+    """Resumen precalculado del vecino (1 lectura por PK, nunca escribe).
+    None == sin partidas asociadas. `proximas_7d` puede quedar del día
+    anterior hasta el primer barrido del día (tarea_vencimientos)."""
+    return await db.get(VecinoDeudaResumen, user.id)
+
+
+# ============================================================
+# Tarea programada
+# ============================================================
+
+_ultimo_recalculo_total: Optional[date] = None
+
+
+async def tarea_vencimientos() -> None:
+    """Barrido + recálculo de resúmenes. Corre desde core/scheduler."""
+    global _ultimo_recalculo_total
+    from core.database import AsyncSessionLocal
+
+    hoy = date.today()
+    async with AsyncSessionLocal() as db:
+        vencidas = await barrer_vencimientos(db, hoy)
+        if _ultimo_recalculo_total != hoy:
+            total = await recalcular_todos(db, hoy)
+            _ultimo_recalculo_total = hoy
+            logger.info(f"[vencimientos] resúmenes recalculados: {total} vecinos")
+        else:
+            for muni in vencidas:
+                await recalcular_municipio(db, muni, hoy)
+
+
+# ============================================================
+# Mantenimiento incremental (listener)
+# ============================================================
+
+def _usuarios_afectados(connection, partida_ids: Set[int], titulares: Set[int], dnis: Set[str]) -> Set[int]:
+    if partida_ids:
+        for uid, dni in connection.execute(
+            select(Partida.titular_user_id, Partida.titular_dni).where(Partida.id.in_(list(partida_ids)))
+        ).all():
+            if uid:
+                titulares.add(uid)
+            if dni:
+                dnis.add(dni)
+    conds = []
+    if titulares:
+        conds.append(User.id.in_(list(titulares)))
+    if dnis:
+        conds.append(User.dni.in_(list(dnis)))
+    if not conds:
+        return set()
+    return set(connection.execute(
+        select(User.id).where(or_(*conds), User.rol == RolUsuario.VECINO)
+    ).scalars().all())
+
+
+def _recolectar(cambios: Cambios) -> Optional[tuple]:
+    """Partidas, titulares, DNIs y vecinos tocados por el flush."""
+    partida_ids: Set[int] = set()
+    titulares: Set[int] = set()
+    dnis: Set[str] = set()
+    usuarios: Set[int] = set()
+
+    for obj in cambios.todos():
+        if isinstance(obj, Deuda):
+            partida_ids |= valores(obj, "partida_id")
+        elif isinstance(obj, Partida):
+            titulares |= valores(obj, "titular_user_id")
+            dnis |= valores(obj, "titular_dni")
+            if obj.id is not None and obj not in cambios.borrados:
+                partida_ids.add(obj.id)
+        elif isinstance(obj, User) and obj.id is not None:
+            if cambio_alguno(obj, ("dni", "municipio_id", "rol")):
+                usuarios.add(obj.id)
+
+    if not (partida_ids or titulares or dnis or usuarios):
+        return None
+    return partida_ids, titulares, dnis, usuarios
+
+
+def _aplicar(connection, pendiente: tuple) -> None:
+    partida_ids, titulares, dnis, usuarios = pendiente
+    usuarios = usuarios | _usuarios_afectados(connection, partida_ids, titulares, dnis)
+    _recalcular_usuarios_sync(connection, usuarios, date.today())
+
+
+# Un pago o una importación de padrón que falla al recalcular el resumen
+# (ej. vecino_deuda_resumen sin migrar) se guarda igual: el sweeper de
+# vencimientos o `recalcular_municipio` lo corrigen después.
+registrar("tasas_resumen", (Deuda, Partida, User), _recolectar, _aplicar)
@@ -0,0 +1,100 @@
+"""
+Resolución en lote de los "nombres" que muestran los listados de Tesorería.
+
+Las responses de OP y pagos programados llevan `contacto_nombre`,
+`dependencia_nombre`, `caja_nombre`, `creador_nombre`, etc. Antes cada fila
+hacía hasta 5 SELECT sueltos para resolverlos: un listado de 5000 OPs eran
+~25k round-trips. Acá se juntan las FKs de toda la página y se resuelve
+cada tipo de entidad con un único `IN (...)`: 4 queries como máximo sin
+importar el tamaño de la página.
+
+    nombres = await resolver_nombres(
+        db,
+        contacto_ids=[op.destino_contacto_id for op in ops],
+        usuario_ids=[op.creador_id for op in ops] + [...],
+    )
+    nombres.contacto(op.destino_contacto_id)
+"""
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Contacto, MunicipioDependencia, TesoreriaCaja, User
+from models.dependencia import Dependencia
+
+
+@dataclass
+class NombresTesoreria:
+    contactos: Dict[int, str] = field(default_factory=dict)
+    dependencias: Dict[int, str] = field(default_factory=dict)
+    cajas: Dict[int, str] = field(default_factory=dict)
+    usuarios: Dict[int, str] = field(default_factory=dict)
+
+    def contacto(self, contacto_id: Optional[int]) -> Optional[str]:
+        return self.contactos.get(contacto_id) if contacto_id else None
+
+    def dependencia(self, municipio_dependencia_id: Optional[int]) -> Optional[str]:
+        return self.dependencias.get(municipio_dependencia_id) if municipio_dependencia_id else None
+
+    def caja(self, caja_id: Optional[int]) -> Optional[str]:
+        return self.cajas.get(caja_id) if caja_id else None
+
+    def usuario(self, user_id: Optional[int]) -> Optional[str]:
+        return self.usuarios.get(user_id) if user_id else None
+
+
+def _ids(valores: Iterable[Optional[int]]) -> set:
+    return {v for v in valores if v}
+
+
+async def resolver_nombres(
+    db: AsyncSession,
+    *,
+    contacto_ids: Iterable[Optional[int]] = (),
+    dependencia_ids: Iterable[Optional[int]] = (),
+    caja_ids: Iterable[Optional[int]] = (),
+    usuario_ids: Iterable[Optional[int]] = (),
+) -> NombresTesoreria:
+    """Una query por tipo de entidad (sólo si hay ids de ese tipo).
+
+    `dependencia_ids` son ids de MunicipioDependencia (lo que guardan las
+    OPs en `destino_dependencia_id`), resueltos al nombre de la Dependencia.
+    """
+    nombres = NombresTesoreria()
+
+    ids = _ids(contacto_ids)
+    if ids:
+        rows = (await db.execute(
+            select(Contacto.id, Contacto.nombre, Contacto.apellido).where(Contacto.id.in_(ids))
+        )).all()
+        nombres.contactos = {cid: f"{nom} {ape or ''}".strip() for cid, nom, ape in rows}
+
+    ids = _ids(dependencia_ids)
+    if ids:
+        rows = (await db.execute(
+            select(MunicipioDependencia.id, Dependencia.nombre)
+            .join(Dependencia, Dependencia.id == MunicipioDependencia.dependencia_id)
+            .where(MunicipioDependencia.id.in_(ids))
+        )).all()
+        nombres.dependencias = {mdid: nom for mdid, nom in rows}
+
+    ids = _ids(caja_ids)
+    if ids:
+        rows = (await db.execute(
+            select(TesoreriaCaja.id, TesoreriaCaja.nombre).where(TesoreriaCaja.id.in_(ids))
+        )).all()
+        nombres.cajas = {cid: nom for cid, nom in rows}
+
+    ids = _ids(usuario_ids)
+    if ids:
+        rows = (await db.execute(
+            select(User.id, User.nombre, User.apellido, User.email).where(User.id.in_(ids))
+        )).all()
+        nombres.usuarios = {
+            uid: f"{nom or ''} {ape or ''}".strip() or email
+            for uid, nom, ape, email in rows
+        }
+
+    return nombres
@@ -0,0 +1,238 @@
+"""
+Ejecución masiva de pagos programados (liquidación de sueldos).
+
+`job_ejecutar_pagos_masivo` pagaba de a uno: UPDATE de claim, add del
+Gasto, flush() para conocer el id, add de cuota y movimiento de caja. Una
+liquidación de 1.500 empleados eran miles de round-trips secuenciales
+dentro de una única transacción larga que dejaba la agenda bloqueada.
+
+Ahora se procesa por lotes (settings.TESORERIA_MASIVO_LOTE), cada uno en
+su propia transacción y con una cantidad fija de sentencias:
+
+  1. SELECT ... FOR UPDATE de los programados del lote (una query). Con
+     las filas bloqueadas, la elegibilidad (`ultimo_pago < fecha`) se
+     decide en Python sin carreras.
+  2. Claim + avance de `proximo_pago` + baja por `fecha_fin` en UPDATEs
+     `WHERE id IN (...)` agrupados por valores nuevos: una liquidación
+     mensual (todos con la misma fecha) es un solo UPDATE.
+  3. INSERT multi-fila de los gastos. MySQL no tiene RETURNING y el
+     autoincrement no garantiza ids consecutivos en un INSERT multi-fila,
+     así que los ids se leen con un SELECT MAX(id) GROUP BY
+     pago_programado_id: es el gasto recién insertado porque la fila del
+     programado está bloqueada por esta transacción.
+  4. INSERT multi-fila de cuotas y de movimientos de caja.
+
+Si un lote falla se hace rollback sólo de ese lote y sus pagos quedan
+informados con el error; los lotes anteriores ya quedaron confirmados.
+"""
+import logging
+import time
+from calendar import monthrange
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from models.gasto import DestinoGasto, EstadoGastoCuota, Gasto, GastoCuota, TipoFinanciacion
+from models.tesoreria_extra import (
+    FrecuenciaPago, TesoreriaMovimientoCaja, TesoreriaPagoProgramado, TipoMovimientoCaja,
+)
+
+logger = logging.getLogger(__name__)
+
+ProgresoFn = Callable[[int, str, bool], Awaitable[None]]
+
+
+def calcular_proximo_pago(actual: date, frecuencia: FrecuenciaPago, dia_del_mes: int) -> date:
+    """Avanza al siguiente periodo segun frecuencia."""
+    if frecuencia == FrecuenciaPago.SEMANAL:
+        return actual + timedelta(days=7)
+    if frecuencia == FrecuenciaPago.QUINCENAL:
+        return actual + timedelta(days=14)
+    if frecuencia == FrecuenciaPago.MENSUAL:
+        meses = 1
+    elif frecuencia == FrecuenciaPago.BIMESTRAL:
+        meses = 2
+    elif frecuencia == FrecuenciaPago.TRIMESTRAL:
+        meses = 3
+    else:  # ANUAL
+        meses = 12
+    total = actual.month - 1 + meses
+    year = actual.year + total // 12
+    month = total % 12 + 1
+    last_day = monthrange(year, month)[1]
+    return date(year, month, min(dia_del_mes, last_day))
+
+
+class ConflictoClaim(Exception):
+    """Otro proceso pagó alguno de los programados del lote entre el SELECT
+    y el UPDATE (sólo posible sin FOR UPDATE, ej. SQLite)."""
+
+
+@dataclass
+class ResultadoMasivo:
+    # pago_id -> (ok, gasto_id, error), en el orden pedido
+    items: Dict[int, Tuple[bool, Optional[int], Optional[str]]] = field(default_factory=dict)
+    monto_total: Decimal = Decimal(0)
+    lotes: List[dict] = field(default_factory=list)
+
+    @property
+    def exitosos(self) -> int:
+        return sum(1 for ok, _, _ in self.items.values() if ok)
+
+
+async def _ejecutar_lote(
+    db: AsyncSession,
+    municipio_id: int,
+    creador_id: int,
+    ids: List[int],
+    res: ResultadoMasivo,
+) -> Tuple[int, Decimal]:
+    """Paga un lote (sin commit). Devuelve (pagados, monto)."""
+    P = TesoreriaPagoProgramado
+    pps = (await db.execute(
+        select(
+            P.id, P.contacto_id, P.caja_id, P.concepto, P.descripcion, P.monto_pesos,
+            P.forma_pago, P.frecuencia, P.dia_del_mes, P.fecha_fin, P.proximo_pago, P.ultimo_pago,
+        )
+        .where(P.id.in_(ids), P.municipio_id == municipio_id, P.activo.is_(True))
+        .with_for_update()
+    )).all()
+    por_id = {pp.id: pp for pp in pps}
+
+    hoy = date.today()
+    a_pagar = []
+    # (fecha, proximo_pago nuevo, activo) -> ids: un UPDATE por grupo
+    grupos: Dict[Tuple[date, date, bool], List[int]] = defaultdict(list)
+    for pid in ids:
+        pp = por_id.get(pid)
+        if pp is None:
+            res.items[pid] = (False, None, "No encontrado o inactivo")
+            continue
+        fecha = pp.proximo_pago or hoy
+        if pp.ultimo_pago is not None and pp.ultimo_pago >= fecha:
+            res.items[pid] = (False, None, f"Período ya pagado (último pago: {pp.ultimo_pago})")
+            continue
+        proximo = calcular_proximo_pago(fecha, pp.frecuencia, pp.dia_del_mes)
+        activo = not (pp.fecha_fin and proximo > pp.fecha_fin)
+        grupos[(fecha, proximo, activo)].append(pid)
+        a_pagar.append((pp, fecha))
+
+    if not a_pagar:
+        return 0, Decimal(0)
+
+    # Mismo claim anti doble-ejecución que en /ejecutar, pero por conjunto
+    for (fecha, proximo, activo), grupo in grupos.items():
+        claim = await db.execute(
+            update(P)
+            .where(P.id.in_(grupo), or_(P.ultimo_pago.is_(None), P.ultimo_pago < fecha))
+            .values(ultimo_pago=fecha, proximo_pago=proximo, activo=activo)
+            .execution_options(synchronize_session=False)
+        )
+        if claim.rowcount != len(grupo):
+            raise ConflictoClaim(f"{len(grupo) - claim.rowcount} pagos ya fueron ejecutados por otro proceso")
+
+    await db.execute(insert(Gasto), [
+        {
+            "municipio_id": municipio_id,
+            "creador_id": creador_id,
+            "destino_tipo": DestinoGasto.CONTACTO,
+            "destino_contacto_id": pp.contacto_id,
+            "concepto": pp.concepto,
+            "descripcion": pp.descripcion or None,
+            "monto_pesos": Decimal(str(pp.monto_pesos)),
+            "fecha": fecha,
+            "tipo_financiacion": TipoFinanciacion.CONTADO,
+            "forma_pago": pp.forma_pago,
+            "caja_id": pp.caja_id,
+            "pago_programado_id": pp.id,
+        }
+        for pp, fecha in a_pagar
+    ])
+    gasto_de = dict((await db.execute(
+        select(Gasto.pago_programado_id, func.max(Gasto.id))
+        .where(Gasto.pago_programado_id.in_([pp.id for pp, _ in a_pagar]))
+        .group_by(Gasto.pago_programado_id)
+    )).all())
+
+    await db.execute(insert(GastoCuota), [
+        {
+            "gasto_id": gasto_de[pp.id], "numero": 1, "monto": Decimal(str(pp.monto_pesos)),
+            "fecha_vencimiento": fecha, "fecha_pago": fecha, "estado": EstadoGastoCuota.PAGADA,
+            "forma_pago": pp.forma_pago,
+        }
+        for pp, fecha in a_pagar
+    ])
+    movimientos = [
+        {
+            "municipio_id": municipio_id, "caja_id": pp.caja_id, "gasto_id": gasto_de[pp.id],
+            "tipo": TipoMovimientoCaja.EGRESO, "monto": Decimal(str(pp.monto_pesos)), "fecha": fecha,
+            "concepto": pp.concepto,
+        }
+        for pp, fecha in a_pagar if pp.caja_id
+    ]
+    if movimientos:
+        await db.execute(insert(TesoreriaMovimientoCaja), movimientos)
+
+    monto = Decimal(0)
+    for pp, _ in a_pagar:
+        res.items[pp.id] = (True, gasto_de[pp.id], None)
+        monto += Decimal(str(pp.monto_pesos))
+    return len(a_pagar), monto
+
+
+async def ejecutar_pagos_masivo(
+    db: AsyncSession,
+    municipio_id: int,
+    creador_id: int,
+    pago_ids: List[int],
+    lote: Optional[int] = None,
+    progreso: Optional[ProgresoFn] = None,
+) -> ResultadoMasivo:
+    """Paga los programados `pago_ids` con sus valores por defecto (monto del
+    programado, fecha = proximo_pago, sin premios).
+
+    `lote`: pagos por transacción (default settings.TESORERIA_MASIVO_LOTE;
+    0 = todos en una). `progreso(pct, mensaje, cancelable)` se llama antes
+    de cada lote; después del primer commit ya no se puede cancelar.
+    """
+    ids = list(dict.fromkeys(pago_ids))
+    lote = settings.TESORERIA_MASIVO_LOTE if lote is None else lote
+    tam = lote if lote and lote > 0 else max(len(ids), 1)
+    res = ResultadoMasivo()
+
+    for n, i in enumerate(range(0, len(ids), tam), start=1):
+        chunk = ids[i:i + tam]
+        if progreso is not None:
+            await progreso(100 * i // len(ids), f"Pagando {i + 1}-{i + len(chunk)} de {len(ids)}", n == 1)
+        t0 = time.perf_counter()
+        error = None
+        try:
+            pagados, monto = await _ejecutar_lote(db, municipio_id, creador_id, chunk, res)
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.exception(f"[pagos-masivos] lote {n} de muni {municipio_id} falló")
+            error = str(e) if isinstance(e, ConflictoClaim) else f"Error al registrar el lote: {e}"
+            pagados, monto = 0, Decimal(0)
+            for pid in chunk:
+                res.items[pid] = (False, None, error)
+        res.monto_total += monto
+        res.lotes.append({
+            "numero": n,
+            "pagos": len(chunk),
+            "exitosos": pagados,
+            "fallidos": len(chunk) - pagados,
+            "monto": monto,
+            "ms": int((time.perf_counter() - t0) * 1000),
+            "error": error,
+        })
+
+    # items en el orden pedido
+    res.items = {pid: res.items[pid] for pid in ids}
+    return res
@@ -0,0 +1,24 @@
+"""WhatsApp: cola de mensajes entrantes (ingesta.py) y envío con cliente
+compartido + rate limit por número (envio.py).
+
+    from services.whatsapp import sender, ingesta_pool
+    await sender.enviar(config, "5491112345678", "Hola")
+
+En tests: `WhatsAppSender(provider=FakeWhatsAppProvider())` y un
+`IngestaWorkerPool(session_factory=TestSessionLocal, ...)`.
+"""
+from .envio import EnvioProvider, HttpEnvioProvider, WhatsAppSender, numero_origen, sender
+from .ingesta import IngestaWorkerPool, ingesta_pool, metricas, reclamar_conversaciones, registrar_webhook
+
+__all__ = [
+    "EnvioProvider",
+    "HttpEnvioProvider",
+    "WhatsAppSender",
+    "numero_origen",
+    "sender",
+    "IngestaWorkerPool",
+    "ingesta_pool",
+    "metricas",
+    "reclamar_conversaciones",
+    "registrar_webhook",
+]
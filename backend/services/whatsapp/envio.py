@@ -0,0 +1,157 @@
+"""Envío de mensajes de WhatsApp (Meta Cloud API / Twilio).
+
+Antes `send_via_meta`/`send_via_twilio` abrían un `httpx.AsyncClient` por
+mensaje (handshake TLS cada vez) y nada frenaba una ráfaga: un fan-out o
+un pico de conversaciones terminaba en 429 de Meta.
+
+Ahora todo sale por el singleton `sender`:
+
+  - `HttpEnvioProvider` usa UN cliente compartido con pool de conexiones
+    (keep-alive) para todos los municipios.
+  - `WhatsAppSender` aplica un token bucket por número de origen
+    (phone_number_id de Meta / número de Twilio):
+    settings.WHATSAPP_ENVIO_RPS_POR_NUMERO mensajes/s, con ráfaga corta.
+
+`config=None` usa las variables de entorno (chatbot sin config en BD); si
+tampoco hay credenciales, el mensaje se loguea y no se envía (modo mock).
+En tests: `WhatsAppSender(provider=FakeWhatsAppProvider())`.
+"""
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+
+import httpx
+
+from core.config import settings
+from core.token_bucket import TokenBucket
+from models.whatsapp_config import WhatsAppConfig, WhatsAppProvider
+
+logger = logging.getLogger(__name__)
+
+META_GRAPH_URL = "https://graph.facebook.com/v22.0"
+TWILIO_API_URL = "https://api.twilio.com/2010-04-01"
+
+
+class EnvioProvider(ABC):
+    """Transporte de un mensaje de texto a un número."""
+
+    @abstractmethod
+    async def enviar(self, config: Optional[WhatsAppConfig], to: str, mensaje: str) -> Optional[str]:
+        """Envía y devuelve el id del mensaje en el provider. Levanta
+        ValueError si el provider lo rechaza."""
+
+    async def cerrar(self) -> None:
+        """Libera conexiones (shutdown)."""
+
+
+def numero_origen(config: Optional[WhatsAppConfig]) -> str:
+    """Clave del rate limit: el número desde el que se envía."""
+    if config is None:
+        return f"meta:{settings.WHATSAPP_PHONE_NUMBER_ID or 'mock'}"
+    if config.provider == WhatsAppProvider.TWILIO:
+        return f"twilio:{config.twilio_phone_number}"
+    return f"meta:{config.meta_phone_number_id or settings.WHATSAPP_PHONE_NUMBER_ID}"
+
+
+class HttpEnvioProvider(EnvioProvider):
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=settings.WHATSAPP_HTTP_TIMEOUT_S,
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+            )
+        return self._client
+
+    async def enviar(self, config: Optional[WhatsAppConfig], to: str, mensaje: str) -> Optional[str]:
+        if config is not None and config.provider == WhatsAppProvider.TWILIO:
+            return await self._twilio(config, to, mensaje)
+        phone_number_id = (config.meta_phone_number_id if config else None) or settings.WHATSAPP_PHONE_NUMBER_ID
+        access_token = (config.meta_access_token if config else None) or settings.WHATSAPP_ACCESS_TOKEN
+        if not phone_number_id or not access_token:
+            if config is None:
+                print(f"[WhatsApp Mock] To: {to}\nMessage: {mensaje}\n")
+                return None
+            raise ValueError("Configuración de Meta incompleta. Configure en DB o variables de entorno.")
+        return await self._meta(phone_number_id, access_token, to, mensaje)
+
+    async def _meta(self, phone_number_id: str, access_token: str, to: str, mensaje: str) -> Optional[str]:
+        response = await self._http().post(
+            f"{META_GRAPH_URL}/{phone_number_id}/messages",
+            headers={"Authorization": f"Bearer {access_token}"},
+            json={
+                "messaging_product": "whatsapp",
+                "to": to,
+                "type": "text",
+                "text": {"body": mensaje},
+            },
+        )
+        if response.status_code != 200:
+            error_data = response.json() if response.text else {}
+            raise ValueError(f"Error de Meta API: {error_data}")
+        return response.json().get("messages", [{}])[0].get("id")
+
+    async def _twilio(self, config: WhatsAppConfig, to: str, mensaje: str) -> Optional[str]:
+        if not config.twilio_account_sid or not config.twilio_auth_token or not config.twilio_phone_number:
+            raise ValueError("Configuración de Twilio incompleta")
+
+        # Asegurar formato de número WhatsApp
+        to_whatsapp = to if to.startswith("whatsapp:") else f"whatsapp:{to}"
+        from_whatsapp = (
+            config.twilio_phone_number if config.twilio_phone_number.startswith("whatsapp:")
+            else f"whatsapp:{config.twilio_phone_number}"
+        )
+        response = await self._http().post(
+            f"{TWILIO_API_URL}/Accounts/{config.twilio_account_sid}/Messages.json",
+            auth=(config.twilio_account_sid, config.twilio_auth_token),
+            data={"To": to_whatsapp, "From": from_whatsapp, "Body": mensaje},
+        )
+        if response.status_code not in [200, 201]:
+            error_data = response.json() if response.text else {}
+            raise ValueError(f"Error de Twilio: {error_data}")
+        return response.json().get("sid")
+
+    async def cerrar(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class WhatsAppSender:
+    """Punto único de salida: rate limit por número de origen + provider."""
+
+    def __init__(self, provider: Optional[EnvioProvider] = None, rps_por_numero: Optional[float] = None):
+        self._provider = provider
+        self.rps = rps_por_numero or settings.WHATSAPP_ENVIO_RPS_POR_NUMERO
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    @property
+    def provider(self) -> EnvioProvider:
+        if self._provider is None:
+            self._provider = HttpEnvioProvider()
+        return self._provider
+
+    def _bucket(self, numero: str) -> TokenBucket:
+        bucket = self._buckets.get(numero)
+        if bucket is None:
+            # Ráfaga de 1 s de cupo: un fan-out arranca sin esperar
+            bucket = self._buckets[numero] = TokenBucket(self.rps, capacidad=max(self.rps, 1.0))
+        return bucket
+
+    async def enviar(self, config: Optional[WhatsAppConfig], to: str, mensaje: str) -> Optional[str]:
+        await self._bucket(numero_origen(config)).adquirir()
+        return await self.provider.enviar(config, to, mensaje)
+
+    def metricas(self) -> Dict[str, int]:
+        """Mensajes esperando turno, por número de origen."""
+        return {numero: b.esperando for numero, b in self._buckets.items() if b.esperando}
+
+    async def cerrar(self) -> None:
+        if self._provider is not None:
+            await self._provider.cerrar()
+
+
+sender = WhatsAppSender()
@@ -0,0 +1,40 @@
+"""Provider de WhatsApp de pruebas — sin red.
+
+    fake = FakeWhatsAppProvider()
+    fake.programar_error("5491100000000", ValueError("Error de Meta API"))
+    sender = WhatsAppSender(provider=fake)
+    ...
+    assert fake.enviados == [("5491100000000", "Hola")]
+
+`enviados` registra (to, mensaje) de cada envío exitoso, en orden.
+"""
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+from models.whatsapp_config import WhatsAppConfig
+from .envio import EnvioProvider
+
+
+class FakeWhatsAppProvider(EnvioProvider):
+
+    def __init__(self, demora_s: float = 0.0):
+        self.demora_s = demora_s
+        self.enviados: List[Tuple[str, str]] = []
+        self._errores: Dict[str, List[BaseException]] = {}
+
+    def programar_error(self, to: str, error: BaseException, veces: int = 1) -> None:
+        """Los próximos `veces` envíos a `to` fallan con `error`."""
+        self._errores.setdefault(to, []).extend([error] * veces)
+
+    async def enviar(self, config: Optional[WhatsAppConfig], to: str, mensaje: str) -> Optional[str]:
+        if self.demora_s:
+            await asyncio.sleep(self.demora_s)
+        pendientes = self._errores.get(to)
+        if pendientes:
+            raise pendientes.pop(0)
+        self.enviados.append((to, mensaje))
+        return f"wamid.fake.{len(self.enviados)}"
+
+    def a(self, to: str) -> List[str]:
+        """Mensajes enviados a un número."""
+        return [m for t, m in self.enviados if t == to]
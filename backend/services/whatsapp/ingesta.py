@@ -0,0 +1,408 @@
+"""Ingesta de mensajes entrantes de WhatsApp: webhook -> cola -> chatbot.
+
+Antes `POST /whatsapp/webhook` corría el chatbot adentro del request (BD,
+categorías, alta del reclamo, respuestas por la API de Meta) mensaje por
+mensaje. Con una ráfaga Meta veía el ack lento, reentregaba, y el mismo
+mensaje se procesaba dos veces.
+
+Ahora:
+
+  1. `registrar_webhook()` persiste cada mensaje en `whatsapp_mensajes_entrantes`
+     (UNIQUE provider+message_id: las reentregas se descartan) y asegura la
+     fila de `whatsapp_conversaciones`. El endpoint responde enseguida.
+  2. `IngestaWorkerPool` toma CONVERSACIONES, no mensajes: el UPDATE del
+     lease sobre la fila de la conversación es atómico, así que un teléfono
+     lo procesa un solo worker a la vez y sus mensajes salen en orden de
+     llegada. Teléfonos distintos van en paralelo (WHATSAPP_INGESTA_WORKERS).
+  3. Por mensaje: `procesado_at` se marca ANTES de correr el chatbot, en la
+     misma transacción. Si el handler commitea por su cuenta (alta del
+     reclamo), ese commit ya deja el mensaje procesado y un reintento no
+     duplica el reclamo. Si falla antes, el rollback lo deja pendiente con
+     backoff; la conversación queda frenada en ese mensaje (el orden
+     importa) hasta WHATSAPP_INGESTA_MAX_INTENTOS, y ahí se saltea.
+
+Corre dentro del proceso de la API (lifespan de main.py), como el pool de
+webhooks de pago.
+"""
+import asyncio
+import json
+import hashlib
+import logging
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta
+from secrets import token_hex
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, case, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import aliased
+
+from core.config import settings
+from core.database import AsyncSessionLocal
+from models.whatsapp_mensaje import WhatsAppConversacion, WhatsAppMensajeEntrante, datos_iniciales
+
+logger = logging.getLogger(__name__)
+
+# (db, mensaje crudo de Meta, conversación) -> None
+Procesador = Callable[[AsyncSession, Dict[str, Any], WhatsAppConversacion], Awaitable[None]]
+
+
+def _ahora() -> datetime:
+    return datetime.utcnow()
+
+
+def _naive(dt: Optional[datetime]) -> Optional[datetime]:
+    return dt.replace(tzinfo=None) if dt is not None and dt.tzinfo else dt
+
+
+def _lease() -> timedelta:
+    return timedelta(seconds=settings.WHATSAPP_INGESTA_TIMEOUT_S + 60)
+
+
+def backoff_segundos(intentos: int) -> float:
+    base = settings.WHATSAPP_INGESTA_BACKOFF_BASE_S * (2 ** max(intentos - 1, 0))
+    return min(base, settings.WHATSAPP_INGESTA_BACKOFF_MAX_S)
+
+
+# ============================================================
+# Webhook
+# ============================================================
+
+def extraer_mensajes(body: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Mensajes de un webhook de Meta (ignora los `statuses` de entrega)."""
+    mensajes = []
+    for entry in body.get("entry", []) or []:
+        for change in entry.get("changes", []) or []:
+            for message in (change.get("value") or {}).get("messages", []) or []:
+                if message.get("from"):
+                    mensajes.append(message)
+    return mensajes
+
+
+def _message_id(message: Dict[str, Any]) -> str:
+    if message.get("id"):
+        return str(message["id"])[:128]
+    # Sin id (no debería pasar con Meta): hash del contenido, que igual dedupea
+    crudo = json.dumps(message, sort_keys=True, ensure_ascii=False)
+    return "sha256:" + hashlib.sha256(crudo.encode()).hexdigest()
+
+
+async def registrar_webhook(db: AsyncSession, body: Dict[str, Any], provider: str = "meta") -> Dict[str, int]:
+    """Encola los mensajes del webhook. Devuelve {"nuevos", "duplicados"}."""
+    mensajes = extraer_mensajes(body)
+    if not mensajes:
+        return {"nuevos": 0, "duplicados": 0}
+
+    filas = {}
+    for message in mensajes:
+        filas.setdefault(_message_id(message), message)
+    existentes = set((await db.execute(
+        select(WhatsAppMensajeEntrante.message_id).where(
+            WhatsAppMensajeEntrante.provider == provider,
+            WhatsAppMensajeEntrante.message_id.in_(list(filas)),
+        )
+    )).scalars().all())
+    nuevos = {mid: m for mid, m in filas.items() if mid not in existentes}
+    duplicados = len(mensajes) - len(nuevos)
+    if not nuevos:
+        return {"nuevos": 0, "duplicados": duplicados}
+
+    telefonos = {m["from"] for m in nuevos.values()}
+    conocidos = set((await db.execute(
+        select(WhatsAppConversacion.telefono).where(WhatsAppConversacion.telefono.in_(telefonos))
+    )).scalars().all())
+
+    def _mensaje(mid: str, m: Dict[str, Any]) -> WhatsAppMensajeEntrante:
+        return WhatsAppMensajeEntrante(
+            provider=provider, message_id=mid, telefono=m["from"], tipo=m.get("type"), payload=m,
+        )
+
+    db.add_all([WhatsAppConversacion(telefono=t, step="inicio", data=datos_iniciales()) for t in telefonos - conocidos])
+    db.add_all([_mensaje(mid, m) for mid, m in nuevos.items()])
+    try:
+        await db.commit()
+        return {"nuevos": len(nuevos), "duplicados": duplicados}
+    except IntegrityError:
+        # Reentrega concurrente (u otra conversación creada en paralelo):
+        # de a uno, primero las conversaciones para que ningún mensaje
+        # quede sin su fila.
+        await db.rollback()
+
+    for telefono in telefonos - conocidos:
+        db.add(WhatsAppConversacion(telefono=telefono, step="inicio", data=datos_iniciales()))
+        try:
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+    insertados = 0
+    for mid, m in nuevos.items():
+        db.add(_mensaje(mid, m))
+        try:
+            await db.commit()
+            insertados += 1
+        except IntegrityError:
+            await db.rollback()
+    return {"nuevos": insertados, "duplicados": len(mensajes) - insertados}
+
+
+# ============================================================
+# Worker
+# ============================================================
+
+def _pendiente():
+    msg = WhatsAppMensajeEntrante
+    return and_(msg.procesado_at.is_(None), msg.fallido_at.is_(None))
+
+
+async def reclamar_conversaciones(db: AsyncSession, worker_id: str, limite: int) -> List[Tuple[str, str]]:
+    """Toma el lease de hasta `limite` conversaciones con mensajes listos.
+    Devuelve [(token del lease, telefono)].
+
+    El UPDATE repite la condición del lease: si dos workers eligen el mismo
+    teléfono, sólo uno gana la fila. El que pierde vuelve a elegir entre las
+    que siguen libres; sólo devuelve [] cuando no queda ninguna.
+    """
+    msg, conv = WhatsAppMensajeEntrante, WhatsAppConversacion
+    while True:
+        ahora = _ahora()
+        libre = or_(conv.tomado_hasta.is_(None), conv.tomado_hasta < ahora)
+        # Un mensaje en backoff frena a toda su conversación (los de atrás esperan)
+        en_backoff = aliased(WhatsAppMensajeEntrante)
+        frenada = (
+            select(en_backoff.id)
+            .where(
+                en_backoff.telefono == msg.telefono,
+                en_backoff.procesado_at.is_(None),
+                en_backoff.fallido_at.is_(None),
+                en_backoff.proximo_intento_at > ahora,
+            )
+            .exists()
+        )
+        candidatos = (await db.execute(
+            select(msg.telefono)
+            .join(conv, conv.telefono == msg.telefono)
+            .where(_pendiente(), ~frenada, libre)
+            .group_by(msg.telefono)
+            .order_by(func.min(msg.id))
+            .limit(limite)
+        )).scalars().all()
+        if not candidatos:
+            await db.commit()
+            return []
+        token = f"{worker_id}:{token_hex(4)}"
+        await db.execute(
+            update(conv)
+            .where(conv.telefono.in_(candidatos), libre)
+            .values(tomado_por=token, tomado_hasta=ahora + _lease())
+            .execution_options(synchronize_session=False)
+        )
+        tomadas = (await db.execute(select(conv.telefono).where(conv.tomado_por == token))).scalars().all()
+        await db.commit()
+        if tomadas:
+            return [(token, t) for t in tomadas]
+        # Otro worker ganó todas las candidatas: ya no están libres, reintentar
+
+
+async def _registrar_fallo(db: AsyncSession, mensaje_id: int, error: BaseException) -> bool:
+    """Reintento con backoff, o `fallido_at` si agotó. Devuelve True si la
+    conversación puede seguir con el próximo mensaje."""
+    intentos, procesado_at = (await db.execute(
+        select(WhatsAppMensajeEntrante.intentos, WhatsAppMensajeEntrante.procesado_at)
+        .where(WhatsAppMensajeEntrante.id == mensaje_id)
+    )).one()
+    valores: Dict[str, Any] = {"error": (str(error) or type(error).__name__)[:500]}
+    if procesado_at is not None:
+        # El handler ya había commiteado (ej. alta del reclamo): no se repite
+        seguir = True
+    else:
+        intentos += 1
+        valores["intentos"] = intentos
+        seguir = intentos >= settings.WHATSAPP_INGESTA_MAX_INTENTOS
+        if seguir:
+            valores["fallido_at"] = _ahora()
+        else:
+            valores["proximo_intento_at"] = _ahora() + timedelta(seconds=backoff_segundos(intentos))
+    await db.execute(
+        update(WhatsAppMensajeEntrante)
+        .where(WhatsAppMensajeEntrante.id == mensaje_id)
+        .values(**valores)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return seguir
+
+
+async def _procesador_chatbot(db: AsyncSession, message: Dict[str, Any], conversacion: WhatsAppConversacion) -> None:
+    from api.whatsapp import process_message
+    await process_message(message, db, conversacion)
+
+
+@dataclass
+class IngestaStats:
+    """Contadores del proceso (se reinician con la instancia)."""
+    procesados: int = 0
+    reintentos: int = 0
+    fallidos: int = 0
+    ultimo_lag_s: Optional[float] = None   # recibido -> procesado del último mensaje
+
+
+class IngestaWorkerPool:
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        procesador: Procesador = _procesador_chatbot,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        lote: int = 1,
+        poll_s: float = 5.0,
+    ):
+        self.workers = workers if workers is not None else settings.WHATSAPP_INGESTA_WORKERS
+        self.procesador = procesador
+        self.session_factory = session_factory
+        self.lote = lote
+        self.poll_s = poll_s
+        self.stats = IngestaStats()
+        self._despertar = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._id = token_hex(3)
+
+    def notificar(self) -> None:
+        """Despierta a los workers (llamado por el webhook tras el INSERT)."""
+        self._despertar.set()
+
+    async def procesar_conversacion(self, token: str, telefono: str) -> int:
+        """Procesa en orden los mensajes listos de una conversación tomada
+        con `token` (ver reclamar_conversaciones)."""
+        procesados = 0
+        try:
+            while True:
+                async with self.session_factory() as db:
+                    conv = await db.get(WhatsAppConversacion, telefono)
+                    if conv is None or conv.tomado_por != token:
+                        return procesados   # se venció el lease y la tomó otro
+                    msg = (await db.execute(
+                        select(WhatsAppMensajeEntrante)
+                        .where(WhatsAppMensajeEntrante.telefono == telefono, _pendiente())
+                        .order_by(WhatsAppMensajeEntrante.id)
+                        .limit(1)
+                    )).scalar_one_or_none()
+                    ahora = _ahora()
+                    if msg is None:
+                        return procesados
+                    if msg.proximo_intento_at is not None and _naive(msg.proximo_intento_at) > ahora:
+                        return procesados   # el más viejo está en backoff: los demás esperan
+                    mensaje_id, recibido = msg.id, msg.created_at
+                    msg.intentos += 1
+                    msg.procesado_at = ahora
+                    msg.error = None
+                    conv.tomado_hasta = ahora + _lease()
+                    try:
+                        await asyncio.wait_for(
+                            self.procesador(db, msg.payload or {}, conv),
+                            timeout=settings.WHATSAPP_INGESTA_TIMEOUT_S,
+                        )
+                        await db.commit()
+                    except Exception as e:
+                        await db.rollback()
+                        seguir = await _registrar_fallo(db, mensaje_id, e)
+                        if not seguir:
+                            self.stats.reintentos += 1
+                            logger.warning("WhatsApp %s: mensaje %s falló, se reintenta: %s", telefono, mensaje_id, e)
+                            return procesados
+                        self.stats.fallidos += 1
+                        logger.error("WhatsApp %s: mensaje %s descartado: %s", telefono, mensaje_id, e)
+                        continue
+                procesados += 1
+                self.stats.procesados += 1
+                if recibido is not None:
+                    self.stats.ultimo_lag_s = (_ahora() - _naive(recibido)).total_seconds()
+        finally:
+            async with self.session_factory() as db:
+                await db.execute(
+                    update(WhatsAppConversacion)
+                    .where(WhatsAppConversacion.telefono == telefono, WhatsAppConversacion.tomado_por == token)
+                    .values(tomado_por=None, tomado_hasta=None)
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+
+    async def _drenar(self, worker_id: str) -> int:
+        """Toma conversaciones de a `lote` (1: cada worker es una
+        conversación a la vez) hasta que no quede nada listo."""
+        total = 0
+        while True:
+            async with self.session_factory() as db:
+                leases = await reclamar_conversaciones(db, worker_id, self.lote)
+            if not leases:
+                return total
+            for token, telefono in leases:
+                total += await self.procesar_conversacion(token, telefono)
+
+    async def procesar_pendientes(self) -> int:
+        """Una pasada de todos los workers. Devuelve cuántos mensajes procesó."""
+        n = max(self.workers, 1)
+        resultados = await asyncio.gather(*(self._drenar(f"{self._id}-{i}") for i in range(n)))
+        return sum(resultados)
+
+    async def _loop(self, worker_id: str) -> None:
+        while True:
+            try:
+                await self._drenar(worker_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("[whatsapp-ingesta %s] error: %s", worker_id, e)
+            try:
+                await asyncio.wait_for(self._despertar.wait(), timeout=self.poll_s)
+            except asyncio.TimeoutError:
+                pass
+            self._despertar.clear()
+
+    def start(self) -> None:
+        if self._tasks or self.workers <= 0:
+            return
+        loop = asyncio.get_running_loop()
+        self._tasks = [
+            loop.create_task(self._loop(f"{self._id}-{i}")) for i in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        for t in self._tasks:
+            try:
+                await t
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+
+async def metricas(db: AsyncSession, pool: Optional[IngestaWorkerPool] = None) -> dict:
+    """Estado de la cola (global, todas las instancias) + contadores locales."""
+    from .envio import sender
+
+    msg = WhatsAppMensajeEntrante
+    pendiente = _pendiente()
+    row = (await db.execute(
+        select(
+            func.sum(case((pendiente, 1), else_=0)),
+            func.sum(case((and_(pendiente, msg.intentos > 0), 1), else_=0)),
+            func.sum(case((msg.fallido_at.isnot(None), 1), else_=0)),
+            func.min(case((pendiente, msg.created_at))),
+            func.count(func.distinct(case((pendiente, msg.telefono)))),
+        )
+    )).one()
+    pendientes, en_reintento, fallidos, mas_viejo, conversaciones = row
+    lag = (_ahora() - _naive(mas_viejo)).total_seconds() if mas_viejo else 0.0
+    return {
+        "pendientes": pendientes or 0,
+        "en_reintento": en_reintento or 0,
+        "fallidos": fallidos or 0,
+        "conversaciones_pendientes": conversaciones or 0,
+        "lag_segundos": round(max(lag, 0.0), 1),
+        "envios_en_cola": sender.metricas(),
+        "proceso": asdict((pool or ingesta_pool).stats),
+    }
+
+
+ingesta_pool = IngestaWorkerPool()
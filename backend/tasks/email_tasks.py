@@ -1,29 +1,64 @@
 """
 Tareas de Celery para envío de emails asíncrono.
+
+Las coroutines corren en el loop compartido del worker
+(`core.worker_runtime`), así la conexión SMTP se reusa entre tareas.
+
+Los emails de notificación pasan por `encolar_email()`: se acumulan en una
+lista de Redis y un único `flush_email_batch` (debounced) los manda todos
+juntos sobre la misma conexión, en vez de una tarea + un handshake SMTP
+por email.
+
+Cada tanda se mueve atómicamente (LMOVE) del buffer a una lista de
+procesamiento y recién se borra de ahí cuando el envío terminó: si el
+worker muere a mitad de camino, el próximo flush la devuelve al buffer y la
+manda (at-least-once: un email puede salir dos veces, no perderse).
 """
+import asyncio
+import json
+import logging
+import uuid
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import List, Optional
+
+import redis
+
 from core.celery_app import celery_app
 from core.config import settings
-import aiosmtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-import asyncio
+from core.worker_runtime import run_async, smtp_pool
 
+logger = logging.getLogger(__name__)
 
-def run_async(coro):
-    """Helper para ejecutar coroutines en Celery."""
-    loop = asyncio.new_event_loop()
-    try:
-        return loop.run_until_complete(coro)
-    finally:
-        loop.close()
+# Buffer de emails pendientes de batch
+EMAIL_BATCH_KEY = "emails:pendientes"
+# Flag "ya hay un flush programado" (evita programar uno por email)
+EMAIL_BATCH_FLAG = "emails:flush_programado"
+# Cuánto esperar a que se junten emails antes de mandar
+EMAIL_BATCH_DELAY = 2
+# Máximo de emails por vuelta de flush
+EMAIL_BATCH_MAX = 100
+# Tanda tomada por el flush en curso (se borra al terminar de mandarla)
+EMAIL_BATCH_PROCESANDO = "emails:procesando"
+# Tope para mandar una tanda: SMTP colgado cuenta como tanda fallida
+EMAIL_BATCH_TANDA_TIMEOUT = 240
+# Un solo flush vaciando a la vez (la lista de procesamiento es una sola).
+# El lock se renueva antes de cada tanda y su TTL cubre una tanda entera:
+# un flush lento no lo pierde a mitad de envío y otro no reenvía lo mismo
+EMAIL_BATCH_LOCK = "emails:flush_lock"
+EMAIL_BATCH_LOCK_TTL = EMAIL_BATCH_TANDA_TIMEOUT + 60
 
+_redis_client: Optional[redis.Redis] = None
 
-async def _send_email(to: str, subject: str, body: str, html: str = None):
-    """Enviar email usando aiosmtplib."""
-    if not settings.SMTP_HOST:
-        print(f"[EMAIL] SMTP no configurado. Email a {to} no enviado.")
-        return False
 
+def _redis() -> redis.Redis:
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(settings.REDIS_URL)
+    return _redis_client
+
+
+def _build_message(to: str, subject: str, body: str, html: str = None) -> MIMEMultipart:
     message = MIMEMultipart("alternative")
     message["From"] = f"{settings.SMTP_FROM_NAME} <{settings.SMTP_FROM}>"
     message["To"] = to
@@ -35,22 +70,126 @@ async def _send_email(to: str, subject: str, body: str, html: str = None):
     # Agregar HTML si existe
     if html:
         message.attach(MIMEText(html, "html"))
+    return message
+
+
+async def _send_email(to: str, subject: str, body: str, html: str = None):
+    """Enviar email por la conexión SMTP compartida del worker."""
+    if not settings.SMTP_HOST:
+        print(f"[EMAIL] SMTP no configurado. Email a {to} no enviado.")
+        return False
 
     try:
-        await aiosmtplib.send(
-            message,
-            hostname=settings.SMTP_HOST,
-            port=settings.SMTP_PORT,
-            username=settings.SMTP_USER,
-            password=settings.SMTP_PASSWORD,
-            start_tls=True,
-        )
+        await smtp_pool().send(_build_message(to, subject, body, html))
         return True
     except Exception as e:
         print(f"[EMAIL] Error enviando a {to}: {e}")
         raise
 
 
+async def _send_email_batch(emails: List[dict]) -> list:
+    """Manda varios emails sobre una conexión. Devuelve None/excepción por email."""
+    if not settings.SMTP_HOST:
+        print(f"[EMAIL] SMTP no configurado. {len(emails)} emails no enviados.")
+        return [None] * len(emails)
+    mensajes = [_build_message(e["to"], e["subject"], e["body"], e.get("html")) for e in emails]
+    return await asyncio.wait_for(smtp_pool().send_many(mensajes), EMAIL_BATCH_TANDA_TIMEOUT)
+
+
+def encolar_email(to: str, subject: str, body: str, html: str = None) -> None:
+    """Agrega el email al buffer de Redis y programa un flush si no hay uno."""
+    r = _redis()
+    r.rpush(EMAIL_BATCH_KEY, json.dumps({"to": to, "subject": subject, "body": body, "html": html}))
+    # El TTL del flag cubre el caso de un flush que se perdió (worker caído)
+    if r.set(EMAIL_BATCH_FLAG, "1", nx=True, ex=EMAIL_BATCH_DELAY * 30):
+        flush_email_batch.apply_async(countdown=EMAIL_BATCH_DELAY)
+
+
+def _devolver_al_buffer(r: redis.Redis) -> int:
+    """Pasa lo que quedó en procesamiento a la cabeza del buffer, en orden."""
+    devueltos = 0
+    while r.lmove(EMAIL_BATCH_PROCESANDO, EMAIL_BATCH_KEY, "RIGHT", "LEFT") is not None:
+        devueltos += 1
+    return devueltos
+
+
+def _tomar_tanda(r: redis.Redis) -> List[bytes]:
+    """Mueve hasta EMAIL_BATCH_MAX emails del buffer a procesamiento (MULTI)."""
+    pipe = r.pipeline()
+    for _ in range(EMAIL_BATCH_MAX):
+        pipe.lmove(EMAIL_BATCH_KEY, EMAIL_BATCH_PROCESANDO, "LEFT", "RIGHT")
+    return [c for c in pipe.execute() if c is not None]
+
+
+def _lock_propio(r: redis.Redis, token: str) -> bool:
+    actual = r.get(EMAIL_BATCH_LOCK)
+    if isinstance(actual, bytes):
+        actual = actual.decode()
+    return actual == token
+
+
+def _renovar_lock(r: redis.Redis, token: str) -> bool:
+    """Extiende el lock del flush si sigue siendo nuestro."""
+    return _lock_propio(r, token) and bool(r.expire(EMAIL_BATCH_LOCK, EMAIL_BATCH_LOCK_TTL))
+
+
+def _soltar_lock(r: redis.Redis, token: str) -> None:
+    """Borra el lock sólo si sigue siendo nuestro (no el de otro flush)."""
+    if _lock_propio(r, token):
+        r.delete(EMAIL_BATCH_LOCK)
+
+
+@celery_app.task(bind=True, max_retries=3)
+def flush_email_batch(self):
+    """Vacía el buffer de emails en tandas de EMAIL_BATCH_MAX.
+
+    Los que fallan se reencolan como `send_email_task` individual para
+    aprovechar sus reintentos con backoff. Si falla la tanda entera (SMTP
+    caído) vuelve al buffer y el flush se reintenta.
+    """
+    r = _redis()
+    token = uuid.uuid4().hex
+    if not r.set(EMAIL_BATCH_LOCK, token, nx=True, ex=EMAIL_BATCH_LOCK_TTL):
+        # Hay otro flush vaciando: volver a mirar cuando termine
+        flush_email_batch.apply_async(countdown=EMAIL_BATCH_DELAY)
+        return {"enviados": 0, "fallidos": 0}
+    try:
+        # Borrar el flag primero: lo que llegue mientras vaciamos programa otro flush
+        r.delete(EMAIL_BATCH_FLAG)
+        devueltos = _devolver_al_buffer(r)
+        if devueltos:
+            logger.warning(f"[EMAIL] batch: {devueltos} emails de un flush interrumpido vuelven al buffer")
+        enviados = fallidos = 0
+        while True:
+            # Entre tandas procesamiento está vacío: si el lock venció y lo
+            # tomó otro flush, cortar acá no deja nada a medio mandar
+            if not _renovar_lock(r, token):
+                logger.warning("[EMAIL] batch: se perdió el lock del flush, sigue el otro flush")
+                break
+            crudos = _tomar_tanda(r)
+            if not crudos:
+                break
+            emails = [json.loads(c) for c in crudos]
+            try:
+                errores = run_async(_send_email_batch(emails))
+            except Exception as exc:
+                _devolver_al_buffer(r)
+                logger.warning(f"[EMAIL] batch: fallo la tanda de {len(emails)}, vuelve al buffer: {exc}")
+                raise self.retry(exc=exc, countdown=60)
+            for email, error in zip(emails, errores):
+                if error is None:
+                    enviados += 1
+                    continue
+                fallidos += 1
+                logger.warning(f"[EMAIL] batch: fallo envio a {email['to']}: {error}")
+                send_email_task.delay(email["to"], email["subject"], email["body"], email.get("html"))
+            # Ack: la tanda salió (o quedó en manos de send_email_task)
+            r.delete(EMAIL_BATCH_PROCESANDO)
+        return {"enviados": enviados, "fallidos": fallidos}
+    finally:
+        _soltar_lock(r, token)
+
+
 @celery_app.task(bind=True, max_retries=3)
 def send_email_task(self, to: str, subject: str, body: str, html: str = None):
     """
@@ -90,7 +229,7 @@ Sistema de Reclamos Municipales
 </ul>
 <p>Puedes seguir el estado de tu reclamo ingresando al sistema.</p>
 """
-    return send_email_task.delay(email, subject, body, html)
+    encolar_email(email, subject, body, html)
 
 
 @celery_app.task
@@ -107,7 +246,7 @@ Pronto se pondrán en contacto o realizarán el trabajo.
 Saludos,
 Sistema de Reclamos Municipales
 """
-    return send_email_task.delay(email, subject, body)
+    encolar_email(email, subject, body)
 
 
 @celery_app.task
@@ -126,4 +265,4 @@ Por favor, ingresa al sistema para calificar la atención recibida.
 Saludos,
 Sistema de Reclamos Municipales
 """
-    return send_email_task.delay(email, subject, body)
+    encolar_email(email, subject, body)
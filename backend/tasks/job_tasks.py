@@ -0,0 +1,14 @@
+"""
+Tarea de Celery que ejecuta un BackgroundJob (services/jobs.py).
+"""
+from core.celery_app import celery_app
+from core.worker_runtime import run_async
+
+
+@celery_app.task(acks_late=True)
+def run_job_task(job_id: str):
+    """Corre el handler del job. El claim pendiente -> en_curso es atomico,
+    asi que una re-entrega del mensaje no lo ejecuta dos veces."""
+    from services.jobs import ejecutar_job
+    run_async(ejecutar_job(job_id))
+    return {"job_id": job_id}
@@ -15,7 +15,9 @@ os.environ["SECRET_KEY"] = "test-secret-key-for-testing-only"
 os.environ["ENVIRONMENT"] = "testing"
 
 from core.database import Base, get_db
+from core.perfil_queries import instrumentar
 from main import app
+from tests.plugin_queries import presupuesto_queries  # noqa: F401
 
 
 # Engine de test con SQLite en memoria
@@ -23,6 +25,8 @@ test_engine = create_async_engine(
     "sqlite+aiosqlite:///:memory:",
     echo=False,
 )
+# Perfil de queries (headers X-DB-*, fixture presupuesto_queries)
+instrumentar(test_engine)
 
 TestSessionLocal = async_sessionmaker(
     test_engine,
@@ -0,0 +1,35 @@
+"""
+Plugin de pytest para presupuestos de queries (core/perfil_queries.py).
+
+    async def test_listado(client, presupuesto_queries):
+        with presupuesto_queries(max_queries=4):
+            await client.get("/api/reclamos")
+
+Falla si el bloque ejecuta más de `max_queries` sentencias o, con
+`n_mas_1=False`, si alguna se repite PERFIL_QUERIES_N1_UMBRAL veces. El
+mensaje lista las sentencias más repetidas para encontrar el loop.
+"""
+from contextlib import contextmanager
+from typing import Optional
+
+import pytest
+
+from core.perfil_queries import medir
+
+
+@contextmanager
+def _presupuesto(max_queries: Optional[int] = None, n_mas_1: bool = True, umbral: Optional[int] = None):
+    with medir() as perfil:
+        yield perfil
+    if max_queries is not None and perfil.queries > max_queries:
+        pytest.fail(f"Presupuesto de {max_queries} queries superado: {perfil.resumen()}", pytrace=False)
+    repetidas = perfil.repetidas(umbral)
+    if not n_mas_1 and repetidas:
+        detalle = "\n".join(f"  {n}x {f[:200]}" for f, n in repetidas)
+        pytest.fail(f"Patrón N+1 ({perfil.queries} queries):\n{detalle}", pytrace=False)
+
+
+@pytest.fixture
+def presupuesto_queries():
+    """Context manager que cuenta las queries del bloque y valida el presupuesto."""
+    return _presupuesto
@@ -0,0 +1,140 @@
+"""
+Tests del optimizador de asignaciones (services/asignacion_optimizer):
+costo mínimo global con cupos, urgentes primero cuando falta cupo, y plan
+aplicado con un UPDATE que respeta el municipio y lo ya asignado.
+"""
+from datetime import date, time
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.security import get_password_hash
+from models import CategoriaReclamo, Empleado, EmpleadoHorario, Municipio, Reclamo, User
+from models.empleado_categoria import empleado_categoria
+from models.enums import EstadoReclamo, RolUsuario
+from services import consultas_cache, disponibilidad, mapa_tiles
+from services.asignacion_optimizer import Recurso, Tarea, aplicar_plan, armar_plan, resolver
+
+LUNES = date(2026, 3, 2)
+
+
+class TestSolver:
+
+    def test_optimo_global_no_greedy(self):
+        # Los dos atienden alumbrado (B más ocupado), sólo A atiende baches.
+        # Greedy le da A a la luminaria; el óptimo se lo deja al bache.
+        a = Recurso(1, "A", categoria_ids={1, 2}, cupo=1)
+        b = Recurso(2, "B", categoria_ids={1, 3}, cupo=1, ocupacion=0.5)
+        tareas = [Tarea(10, "luz", categoria_id=1), Tarea(11, "bache", categoria_id=2)]
+
+        elegidos, _ = resolver(tareas, [a, b])
+
+        assert elegidos == [1, 0]
+
+    def test_respeta_cupos(self):
+        recursos = [Recurso(i, f"E{i}", categoria_ids={1}, cupo=2) for i in range(3)]
+        tareas = [Tarea(i, "t", categoria_id=1) for i in range(6)]
+
+        elegidos, _ = resolver(tareas, recursos)
+
+        assert sorted(elegidos) == [0, 0, 1, 1, 2, 2]
+
+    def test_sin_cupo_quedan_afuera_los_menos_urgentes(self):
+        recursos = [Recurso(1, "A", categoria_ids={1}, cupo=2)]
+        tareas = [
+            Tarea(1, "normal", categoria_id=1, prioridad=3),
+            Tarea(2, "urgente", categoria_id=1, prioridad=1),
+            Tarea(3, "baja", categoria_id=1, prioridad=5),
+            Tarea(4, "sla vencido", categoria_id=1, prioridad=3, urgencia=2.0),
+        ]
+
+        elegidos, _ = resolver(tareas, recursos)
+
+        assert [t.reclamo_id for t, j in zip(tareas, elegidos) if j is None] == [1, 3]
+
+
+async def crear_escenario(db: AsyncSession, entrada: time = time(8), salida: time = time(10)):
+    disponibilidad.invalidar()
+    muni = Municipio(nombre="Muni Plan", codigo="muni-plan", latitud=-34.6, longitud=-58.4)
+    otro = Municipio(nombre="Otro", codigo="otro-plan", latitud=-34.6, longitud=-58.4)
+    db.add_all([muni, otro])
+    await db.flush()
+    admin = User(
+        email="admin@plan.com", password_hash=get_password_hash("x"),
+        nombre="Admin", apellido="Plan", rol=RolUsuario.ADMIN, municipio_id=muni.id,
+    )
+    luz = CategoriaReclamo(municipio_id=muni.id, nombre="Alumbrado")
+    ajena = CategoriaReclamo(municipio_id=otro.id, nombre="Ajena")
+    empleado = Empleado(municipio_id=muni.id, nombre="Ana")
+    db.add_all([admin, luz, ajena, empleado])
+    await db.flush()
+    # Dos horas libres: cupo de 2 tareas de 60 minutos
+    db.add(EmpleadoHorario(empleado_id=empleado.id, dia_semana=0, hora_entrada=entrada, hora_salida=salida))
+    await db.execute(empleado_categoria.insert().values(empleado_id=empleado.id, categoria_id=luz.id))
+
+    def reclamo(muni_id, categoria, prioridad=3):
+        return Reclamo(
+            municipio_id=muni_id, creador_id=admin.id, categoria_id=categoria.id,
+            titulo="Luminaria", descripcion="No enciende", direccion="Calle 1",
+            estado=EstadoReclamo.NUEVO, prioridad=prioridad,
+        )
+
+    propios = [reclamo(muni.id, luz, prioridad=p) for p in (3, 1, 5)]
+    ajeno = reclamo(otro.id, ajena, prioridad=1)
+    db.add_all([*propios, ajeno])
+    await db.commit()
+    return muni, empleado, propios, ajeno
+
+
+class TestPlan:
+
+    async def test_plan_del_municipio_y_aplicado(self, db_session: AsyncSession):
+        muni, empleado, propios, ajeno = await crear_escenario(db_session)
+
+        plan = await armar_plan(db_session, muni.id, LUNES)
+
+        asignados = [a.tarea.reclamo_id for a in plan.asignaciones]
+        assert ajeno.id not in asignados and ajeno.id not in [t.reclamo_id for t in plan.sin_asignar]
+        # Cupo de 2: la prioridad 5 queda afuera
+        assert asignados == [propios[1].id, propios[0].id]
+        assert [(a.hora_inicio, a.hora_fin) for a in plan.asignaciones] == [("08:00", "09:00"), ("09:00", "10:00")]
+
+        versiones = (
+            consultas_cache.version_de({"reclamos"}, muni.id), mapa_tiles.version_de(muni.id),
+        )
+        assert await aplicar_plan(db_session, muni.id, plan) == 2
+
+        for r in propios:
+            await db_session.refresh(r)
+        assert propios[1].empleado_id == empleado.id and propios[1].fecha_programada == LUNES
+        assert propios[1].estado == EstadoReclamo.RECIBIDO
+        assert propios[2].empleado_id is None
+        # La disponibilidad ya ve el día lleno
+        dia = await disponibilidad.disponibilidad_dia(db_session, muni.id, LUNES)
+        assert dia.dias[empleado.id].libres == []
+        # ... y el panel de consultas y el mapa ven el cambio
+        assert consultas_cache.version_de({"reclamos"}, muni.id) != versiones[0]
+        assert mapa_tiles.version_de(muni.id) != versiones[1]
+
+    async def test_turno_noche_termina_a_medianoche(self, db_session: AsyncSession):
+        muni, empleado, propios, _ = await crear_escenario(db_session, time(22), time(6))
+
+        plan = await armar_plan(db_session, muni.id, LUNES)
+        assert [(a.hora_inicio, a.hora_fin) for a in plan.asignaciones] == [("22:00", "23:00"), ("23:00", "24:00")]
+
+        assert await aplicar_plan(db_session, muni.id, plan) == 2
+        await db_session.refresh(propios[0])
+        assert propios[0].hora_inicio == time(23) and propios[0].hora_fin == time.max
+
+    async def test_no_pisa_lo_asignado_mientras_tanto(self, db_session: AsyncSession):
+        muni, empleado, propios, _ = await crear_escenario(db_session)
+        plan = await armar_plan(db_session, muni.id, LUNES)
+
+        otro = Empleado(municipio_id=muni.id, nombre="Beto")
+        db_session.add(otro)
+        await db_session.flush()
+        propios[1].empleado_id = otro.id
+        await db_session.commit()
+
+        assert await aplicar_plan(db_session, muni.id, plan) == 1
+        await db_session.refresh(propios[1])
+        assert propios[1].empleado_id == otro.id
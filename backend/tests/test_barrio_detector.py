@@ -0,0 +1,180 @@
+"""
+Tests del detector de barrios (services/barrio_detector): índice por
+municipio con Aho-Corasick sobre nombres/aliases, point-in-polygon con
+grilla e invalidación al guardar barrios.
+"""
+import xml.etree.ElementTree as ET
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.denormalizacion import INFO_POST_COMMIT
+from models import Barrio, Municipio
+from services import barrio_detector
+from services.barrio_detector import (
+    AhoCorasick, IndiceBarrios, detectar_barrio, poligonos_desde_kml, punto_en_poligono,
+)
+
+# Dos barrios pegados a lo largo de lon=-58.40; el centroide de "Norte"
+# queda más cerca del punto de prueba aunque el punto está en "Sur".
+CUADRADO_NORTE = [[[-58.42, -34.60], [-58.38, -34.60], [-58.38, -34.56], [-58.42, -34.56]]]
+RECTANGULO_SUR = [[[-58.42, -34.70], [-58.38, -34.70], [-58.38, -34.6001], [-58.42, -34.6001]]]
+PUNTO_BORDE = (-34.6005, -58.40)
+
+
+async def crear_barrios(db: AsyncSession) -> Municipio:
+    muni = Municipio(nombre="Muni Barrios", codigo="muni-barrios", latitud=-34.6, longitud=-58.4)
+    db.add(muni)
+    await db.flush()
+    db.add_all([
+        Barrio(municipio_id=muni.id, nombre="Centro", latitud=-34.60, longitud=-58.40, validado=True),
+        Barrio(municipio_id=muni.id, nombre="Villa Centro", latitud=-34.61, longitud=-58.41, validado=True),
+        Barrio(municipio_id=muni.id, nombre="San José", aliases=["B° San Jose", "Sanjo"], validado=False),
+        Barrio(municipio_id=muni.id, nombre="Norte", latitud=-34.5999, longitud=-58.40,
+               poligono=CUADRADO_NORTE, validado=True),
+        Barrio(municipio_id=muni.id, nombre="Sur", latitud=-34.65, longitud=-58.40,
+               poligono=RECTANGULO_SUR, validado=True),
+    ])
+    await db.commit()
+    barrio_detector.invalidar_indice()
+    return muni
+
+
+class TestAhoCorasick:
+
+    def test_encuentra_todos_los_patrones_superpuestos(self):
+        ac = AhoCorasick()
+        for p in ("he", "she", "his", "hers"):
+            ac.agregar(p, p)
+        ac.compilar()
+        encontrados = sorted((i, v) for i, _, v in ac.buscar("ushers"))
+        assert encontrados == [(1, "she"), (2, "he"), (2, "hers")]
+
+
+class TestDeteccionPorTexto:
+
+    async def test_nombre_como_palabra_y_gana_el_mas_largo(self, db_session: AsyncSession):
+        muni = await crear_barrios(db_session)
+        indice = await barrio_detector.obtener_indice(db_session, muni.id)
+
+        assert indice.por_texto("Mitre 123, Centro") == await _barrio(db_session, muni, "Centro")
+        assert indice.por_texto("Mitre 123 - Villa Centro") == await _barrio(db_session, muni, "Villa Centro")
+        assert indice.por_texto("Centro comercial 5") == await _barrio(db_session, muni, "Centro")
+
+    async def test_aliases_y_acentos(self, db_session: AsyncSession):
+        muni = await crear_barrios(db_session)
+        san_jose = await _barrio(db_session, muni, "San José")
+
+        assert await detectar_barrio(db_session, muni.id, "Calle 5, b° san josé") == san_jose
+        assert await detectar_barrio(db_session, muni.id, "Calle 5 SANJO") == san_jose
+
+    async def test_substring_solo_para_nombres_largos(self, db_session: AsyncSession):
+        muni = await crear_barrios(db_session)
+        indice = await barrio_detector.obtener_indice(db_session, muni.id)
+
+        assert indice.por_texto("Barriocentro 10") == await _barrio(db_session, muni, "Centro")
+        assert indice.por_texto("Nortenio 10") == await _barrio(db_session, muni, "Norte")
+        assert indice.por_texto("Calle Sol 10") is None
+
+
+class TestDeteccionPorPunto:
+
+    async def test_poligono_le_gana_al_centroide_cercano(self, db_session: AsyncSession):
+        muni = await crear_barrios(db_session)
+        lat, lon = PUNTO_BORDE
+
+        assert await detectar_barrio(db_session, muni.id, "Ruta 5 km 3", lat, lon) == await _barrio(
+            db_session, muni, "Sur"
+        )
+
+    async def test_poligono_antes_que_el_texto(self, db_session: AsyncSession):
+        muni = await crear_barrios(db_session)
+
+        barrio_id = await detectar_barrio(db_session, muni.id, "Mitre 10, Centro", -34.58, -58.40)
+        assert barrio_id == await _barrio(db_session, muni, "Norte")
+
+    async def test_fuera_de_poligonos_cae_al_centroide(self, db_session: AsyncSession):
+        muni = await crear_barrios(db_session)
+
+        barrio_id = await detectar_barrio(db_session, muni.id, "Ruta 5 km 3", -34.611, -58.43)
+        assert barrio_id == await _barrio(db_session, muni, "Villa Centro")
+        assert await detectar_barrio(db_session, muni.id, "Ruta 5 km 3", -35.5, -59.5) is None
+
+    def test_punto_en_poligono_con_hueco(self):
+        exterior = [[0, 0], [10, 0], [10, 10], [0, 10]]
+        hueco = [[4, 4], [6, 4], [6, 6], [4, 6]]
+        assert punto_en_poligono(2, 2, [exterior, hueco])
+        assert not punto_en_poligono(5, 5, [exterior, hueco])
+        assert not punto_en_poligono(11, 5, [exterior, hueco])
+
+    def test_grilla_solo_testea_candidatos_de_la_celda(self):
+        class B:
+            def __init__(self, id, poligono):
+                self.id, self.nombre, self.aliases, self.poligono = id, f"b{id}", None, poligono
+                self.validado, self.latitud, self.longitud = True, None, None
+
+        indice = IndiceBarrios([B(1, CUADRADO_NORTE), B(2, RECTANGULO_SUR)], celda=0.01)
+        celda = indice._celda(-58.40, -34.58)
+        assert [z.barrio_id for z in indice.grilla[celda]] == [1]
+        assert indice.por_poligono(-34.58, -58.40) == 1
+
+
+class TestInvalidacion:
+
+    async def test_guardar_barrio_invalida_el_indice(self, db_session: AsyncSession):
+        muni = await crear_barrios(db_session)
+        assert await detectar_barrio(db_session, muni.id, "Calle 1, Las Flores") is None
+
+        nuevo = Barrio(municipio_id=muni.id, nombre="Las Flores")
+        db_session.add(nuevo)
+        await db_session.commit()
+
+        assert await detectar_barrio(db_session, muni.id, "Calle 1, Las Flores") == nuevo.id
+
+    async def test_rollback_descarta_los_pendientes(self, db_session: AsyncSession):
+        """Un barrio flusheado y revertido no invalida el índice, ni ahora ni
+        en el próximo commit de la sesión."""
+        muni = await crear_barrios(db_session)
+        muni_id, centro = muni.id, await _barrio(db_session, muni, "Centro")  # el rollback expira `muni`
+        indice = await barrio_detector.obtener_indice(db_session, muni_id)
+
+        db_session.add(Barrio(municipio_id=muni_id, nombre="Fantasma"))
+        await db_session.flush()
+        assert db_session.info[INFO_POST_COMMIT]["barrios_indice"] == [{muni_id}]
+        await db_session.rollback()
+
+        assert INFO_POST_COMMIT not in db_session.info
+        await db_session.commit()
+        assert await barrio_detector.obtener_indice(db_session, muni_id) is indice
+        assert await detectar_barrio(db_session, muni_id, "Pasaje 3, Fantasma") is None
+        assert await detectar_barrio(db_session, muni_id, "Calle 1, Centro") == centro
+
+
+class TestImportKml:
+
+    def test_poligonos_desde_kml(self):
+        ns = "{http://www.opengis.net/kml/2.2}"
+        kml = """<kml xmlns="http://www.opengis.net/kml/2.2"><Document>
+          <Placemark><name>Norte</name><Polygon>
+            <outerBoundaryIs><LinearRing><coordinates>
+              -58.42,-34.60,0 -58.38,-34.60,0 -58.38,-34.56,0 -58.42,-34.56,0 -58.42,-34.60,0
+            </coordinates></LinearRing></outerBoundaryIs>
+            <innerBoundaryIs><LinearRing><coordinates>
+              -58.41,-34.59 -58.40,-34.59 -58.40,-34.58
+            </coordinates></LinearRing></innerBoundaryIs>
+          </Polygon></Placemark>
+          <Placemark><name>Escuela 3</name><Point><coordinates>-58.4,-34.6</coordinates></Point></Placemark>
+        </Document></kml>"""
+
+        poligonos = poligonos_desde_kml(ET.fromstring(kml), ns)
+
+        assert list(poligonos) == ["Norte"]
+        exterior, hueco = poligonos["Norte"][0]
+        assert exterior[0] == [-58.42, -34.60] and len(exterior) == 5
+        assert len(hueco) == 3
+
+
+async def _barrio(db: AsyncSession, muni: Municipio, nombre: str) -> int:
+    return (await db.execute(
+        select(Barrio.id).where(Barrio.municipio_id == muni.id, Barrio.nombre == nombre)
+    )).scalar_one()
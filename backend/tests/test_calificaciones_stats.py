@@ -0,0 +1,106 @@
+"""
+Tests de las estadísticas de calificaciones (services/calificaciones_stats):
+el camino crudo y el rollup diario dan los mismos números, scopeados por
+municipio.
+"""
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.security import get_password_hash
+from models import CategoriaReclamo, Empleado, Municipio, Reclamo, User
+from models.calificacion import Calificacion, CalificacionDiaria, CalificacionTag
+from models.enums import EstadoReclamo, RolUsuario
+from services.calificaciones_stats import estadisticas, ranking_empleados, reconstruir_rollup
+
+# (puntuacion, atencion, tags, empleado) por calificación del municipio A
+CALIFICACIONES = [
+    (5, 5, "rapido,amable", 0),
+    (4, None, "rapido", 0),
+    (5, 4, "rapido, profesional", 0),
+    (2, 1, None, 1),
+    (3, None, "lento", 1),
+    (1, 2, "lento,rapido", None),
+]
+
+
+async def crear_muni(db: AsyncSession, codigo: str, n: int):
+    muni = Municipio(nombre=f"Muni {codigo}", codigo=codigo, latitud=-34.6, longitud=-58.4)
+    db.add(muni)
+    await db.flush()
+    cat = CategoriaReclamo(municipio_id=muni.id, nombre="Alumbrado")
+    vecino = User(
+        email=f"vecino@{codigo}.com", password_hash=get_password_hash("x"),
+        nombre="Vecino", apellido=codigo, rol=RolUsuario.VECINO, municipio_id=muni.id,
+    )
+    empleados = [Empleado(municipio_id=muni.id, nombre=f"Empleado{i}", apellido=codigo) for i in range(2)]
+    db.add_all([cat, vecino, *empleados])
+    await db.flush()
+
+    for i, (punt, atencion, tags, emp) in enumerate(CALIFICACIONES[:n]):
+        reclamo = Reclamo(
+            municipio_id=muni.id, titulo=f"R{i}", descripcion="x", direccion="Calle 1",
+            categoria_id=cat.id, creador_id=vecino.id, estado=EstadoReclamo.FINALIZADO,
+            empleado_id=empleados[emp].id if emp is not None else None,
+        )
+        db.add(reclamo)
+        await db.flush()
+        db.add(Calificacion(
+            reclamo_id=reclamo.id, usuario_id=vecino.id, puntuacion=punt,
+            atencion=atencion, tags=tags,
+        ))
+    await db.commit()
+    return muni, empleados
+
+
+class TestEstadisticasCalificaciones:
+
+    async def test_crudo_y_rollup_coinciden(self, db_session: AsyncSession):
+        muni, _ = await crear_muni(db_session, "muni-a", len(CALIFICACIONES))
+        await crear_muni(db_session, "muni-b", 2)  # no debe contar
+
+        crudo = await estadisticas(db_session, muni.id, dias=1)
+        rollup = await estadisticas(db_session, muni.id, dias=30)
+
+        assert crudo == rollup
+        assert crudo["total_calificaciones"] == 6
+        assert crudo["promedio_general"] == round(20 / 6, 2)
+        assert crudo["promedio_atencion"] == 3.0
+        assert crudo["distribucion"] == {1: 1, 2: 1, 3: 1, 4: 1, 5: 2}
+        assert crudo["tags_frecuentes"][:2] == [{"tag": "rapido", "count": 4}, {"tag": "lento", "count": 2}]
+
+    async def test_listener_mantiene_rollup(self, db_session: AsyncSession):
+        muni, _ = await crear_muni(db_session, "muni-a", len(CALIFICACIONES))
+        total = (await db_session.execute(
+            select(func.sum(CalificacionDiaria.total)).where(CalificacionDiaria.municipio_id == muni.id)
+        )).scalar()
+        assert total == 6
+        tags = (await db_session.execute(select(func.count()).select_from(CalificacionTag))).scalar()
+        assert tags == 8
+
+        # Reconstruir desde cero da lo mismo
+        antes = await estadisticas(db_session, muni.id, dias=30)
+        await reconstruir_rollup(db_session)
+        assert await estadisticas(db_session, muni.id, dias=30) == antes
+
+    async def test_sin_calificaciones(self, db_session: AsyncSession):
+        muni, _ = await crear_muni(db_session, "muni-a", 0)
+        stats = await estadisticas(db_session, muni.id, dias=30)
+        assert stats["total_calificaciones"] == 0
+        assert stats["distribucion"] == {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
+        assert stats["tags_frecuentes"] == []
+
+
+class TestRankingEmpleados:
+
+    @pytest.mark.parametrize("dias", [1, 30])
+    async def test_ranking(self, db_session: AsyncSession, dias: int):
+        muni, empleados = await crear_muni(db_session, "muni-a", len(CALIFICACIONES))
+        ranking = await ranking_empleados(db_session, muni.id, dias)
+
+        assert [r["empleado_id"] for r in ranking] == [empleados[0].id, empleados[1].id]
+        assert ranking[0]["promedio_general"] == round(14 / 3, 2)
+        assert ranking[0]["total_calificaciones"] == 3 and ranking[0]["posicion"] == 1
+        assert ranking[1]["nombre"] == "Empleado1 muni-a"
+
+        assert await ranking_empleados(db_session, muni.id, dias, minimo=3) == ranking[:1]
@@ -0,0 +1,143 @@
+"""
+Tests de la cache de consultas guardadas (services/consultas_cache): hit en
+la segunda ejecución, invalidación al commitear cambios en las tablas que
+lee, paginación desde el resultado materializado y refresco de las más
+usadas.
+"""
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.security import get_password_hash
+from models import CategoriaReclamo, Municipio, Reclamo, User
+from models.consulta_guardada import ConsultaGuardada
+from models.enums import EstadoReclamo, RolUsuario
+from services.consultas_cache import ConsultasCache
+from services.sql_sandbox import SqlSandbox
+from tests.conftest import TestSessionLocal, test_engine
+
+
+class StatementCounter:
+    """Cuenta las sentencias enviadas a la BD."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(test_engine.sync_engine, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(test_engine.sync_engine, "before_cursor_execute", self)
+
+
+SQL = "SELECT id, titulo FROM reclamos ORDER BY id"
+
+
+async def crear_datos(db: AsyncSession, n: int = 5):
+    muni = Municipio(nombre="Consultas", codigo="muni-consultas", latitud=-34.6, longitud=-58.4)
+    db.add(muni)
+    await db.flush()
+    admin = User(
+        email="admin@consultas.com", password_hash=get_password_hash("x"),
+        nombre="Admin", apellido="Consultas", rol=RolUsuario.ADMIN, municipio_id=muni.id,
+    )
+    categoria = CategoriaReclamo(municipio_id=muni.id, nombre="Alumbrado")
+    db.add_all([admin, categoria])
+    await db.flush()
+    db.add_all([nuevo_reclamo(muni, admin, categoria, i) for i in range(n)])
+    consulta = ConsultaGuardada(
+        municipio_id=muni.id, usuario_id=admin.id, nombre="Reclamos",
+        pregunta_original="Listado de reclamos", sql_query=SQL, veces_ejecutada=10,
+    )
+    db.add(consulta)
+    await db.commit()
+    return muni, admin, categoria, consulta
+
+
+def nuevo_reclamo(muni, admin, categoria, i):
+    return Reclamo(
+        municipio_id=muni.id, creador_id=admin.id, categoria_id=categoria.id,
+        titulo=f"Reclamo {i}", descripcion="x", direccion="Calle 1", estado=EstadoReclamo.NUEVO,
+    )
+
+
+def crear_cache(**kw) -> ConsultasCache:
+    return ConsultasCache(sandbox=SqlSandbox(engine=test_engine), ttl_s=kw.pop("ttl_s", 600), **kw)
+
+
+class TestCache:
+
+    async def test_segunda_ejecucion_sale_de_cache(self, db_session: AsyncSession):
+        muni, _, _, consulta = await crear_datos(db_session)
+        cache = crear_cache()
+
+        primero = await cache.obtener(consulta.id, muni.id, SQL)
+        with StatementCounter() as contador:
+            segundo = await cache.obtener(consulta.id, muni.id, SQL)
+
+        assert segundo is primero
+        assert contador.count == 0
+        stats = cache.estadisticas(consulta.id)
+        assert (stats["hits"], stats["misses"], stats["ejecuciones"]) == (1, 1, 1)
+        assert stats["hit_ratio"] == 0.5
+        assert stats["en_cache"]
+
+    async def test_commit_en_tabla_leida_invalida(self, db_session: AsyncSession):
+        muni, admin, categoria, consulta = await crear_datos(db_session)
+        cache = crear_cache()
+        assert (await cache.obtener(consulta.id, muni.id, SQL)).total == 5
+
+        db_session.add(nuevo_reclamo(muni, admin, categoria, 99))
+        await db_session.commit()
+
+        assert (await cache.obtener(consulta.id, muni.id, SQL)).total == 6
+        assert cache.estadisticas(consulta.id)["misses"] == 2
+
+    async def test_ttl_vencido_reejecuta(self, db_session: AsyncSession):
+        muni, _, _, consulta = await crear_datos(db_session)
+        cache = crear_cache(ttl_s=0)
+
+        await cache.obtener(consulta.id, muni.id, SQL)
+        await cache.obtener(consulta.id, muni.id, SQL)
+
+        assert cache.estadisticas(consulta.id)["ejecuciones"] == 2
+
+    async def test_paginacion_desde_memoria(self, db_session: AsyncSession):
+        muni, _, _, consulta = await crear_datos(db_session, n=7)
+        cache = crear_cache()
+        resultado = await cache.obtener(consulta.id, muni.id, SQL)
+
+        with StatementCounter() as contador:
+            paginas = [(await cache.obtener(consulta.id, muni.id, SQL)).pagina(p, 3) for p in (1, 2, 3)]
+
+        assert contador.count == 0
+        assert [len(p) for p in paginas] == [3, 3, 1]
+        assert [f["id"] for p in paginas for f in p] == [f["id"] for f in resultado.filas]
+
+    async def test_invalidar_consulta(self, db_session: AsyncSession):
+        muni, _, _, consulta = await crear_datos(db_session)
+        cache = crear_cache()
+        await cache.obtener(consulta.id, muni.id, SQL)
+
+        cache.invalidar(consulta.id)
+
+        assert not cache.estadisticas(consulta.id)["en_cache"]
+
+
+class TestRefresco:
+
+    async def test_precalcula_las_mas_usadas(self, db_session: AsyncSession):
+        muni, _, _, consulta = await crear_datos(db_session)
+        cache = crear_cache()
+
+        assert await cache.refrescar_populares(TestSessionLocal, top=5) == 1
+        # Recién calculada: el siguiente refresco no la vuelve a correr
+        assert await cache.refrescar_populares(TestSessionLocal, top=5) == 0
+
+        with StatementCounter() as contador:
+            resultado = await cache.obtener(consulta.id, muni.id, SQL)
+        assert contador.count == 0
+        assert resultado.total == 5
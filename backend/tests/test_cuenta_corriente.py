@@ -0,0 +1,149 @@
+"""
+Tests de la cuenta corriente de contactos (services/cuenta_corriente):
+totales agregados + snapshot, libro mayor con saldo acumulado y paginas
+keyset.
+"""
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.security import get_password_hash
+from models import Contacto, Gasto, Municipio, OrdenPago, TesoreriaCaja, TesoreriaMovimientoCaja, User
+from models.enums import RolUsuario
+from models.orden_pago import ContactoCuentaCorriente, EstadoOrdenPago, EtapaContable
+from models.tesoreria_extra import TipoMovimientoCaja
+from services import cuenta_corriente
+
+# Libro esperado en orden cronologico: (tipo, fecha, debe, haber, saldo)
+LIBRO = [
+    ("op", "2026-01-05", "1000.00", "0.00", "1000.00"),
+    ("pago", "2026-01-10", "0.00", "900.00", "100.00"),
+    ("retencion", "2026-01-10", "0.00", "100.00", "0.00"),
+    ("op", "2026-02-01", "500.00", "0.00", "500.00"),
+    ("op", "2026-02-15", "300.00", "0.00", "800.00"),
+    ("gasto", "2026-02-20", "150.00", "0.00", "950.00"),
+    ("pago", "2026-02-20", "0.00", "150.00", "800.00"),
+]
+
+
+async def crear_cuenta(db: AsyncSession):
+    """Contacto con una OP pagada (con retenciones), una autorizada devengada,
+    una pendiente, una anulada y un gasto directo pagado por caja."""
+    muni = Municipio(nombre="Muni CC", codigo="muni-cc", latitud=-34.6, longitud=-58.4)
+    db.add(muni)
+    await db.flush()
+    admin = User(
+        email="admin@cc.com", password_hash=get_password_hash("x"),
+        nombre="Admin", apellido="CC", rol=RolUsuario.ADMIN, municipio_id=muni.id,
+    )
+    contacto = Contacto(municipio_id=muni.id, nombre="Proveedor")
+    otro = Contacto(municipio_id=muni.id, nombre="Otro")
+    caja = TesoreriaCaja(municipio_id=muni.id, nombre="Caja", saldo_inicial=0)
+    db.add_all([admin, contacto, otro, caja])
+    await db.flush()
+
+    def op(numero, fecha, monto, estado, etapa=EtapaContable.PREVENTIVO, destino=contacto, **kw):
+        return OrdenPago(
+            municipio_id=muni.id, numero=numero, destino_tipo="contacto",
+            destino_contacto_id=destino.id, concepto=f"Servicio {numero}",
+            monto_pesos=Decimal(monto), fecha_emision=date.fromisoformat(fecha),
+            estado=estado, etapa_contable=etapa, creador_id=admin.id, **kw,
+        )
+
+    def gasto(fecha, monto, concepto):
+        return Gasto(
+            municipio_id=muni.id, creador_id=admin.id, destino_tipo="contacto",
+            destino_contacto_id=contacto.id, concepto=concepto,
+            monto_pesos=Decimal(monto), fecha=date.fromisoformat(fecha), caja_id=caja.id,
+        )
+
+    def egreso(g, fecha, monto):
+        return TesoreriaMovimientoCaja(
+            municipio_id=muni.id, caja_id=caja.id, gasto_id=g.id, tipo=TipoMovimientoCaja.EGRESO,
+            monto=Decimal(monto), fecha=date.fromisoformat(fecha), concepto=g.concepto,
+        )
+
+    gasto_op = gasto("2026-01-10", "900.00", "OP-1")
+    directo = gasto("2026-02-20", "150.00", "Compra directa")
+    db.add_all([gasto_op, directo])
+    await db.flush()
+    db.add_all([
+        egreso(gasto_op, "2026-01-10", "900.00"),
+        egreso(directo, "2026-02-20", "150.00"),
+        op("OP-1", "2026-01-05", "1000.00", EstadoOrdenPago.PAGADA, EtapaContable.PAGADO,
+           monto_neto=Decimal("900.00"), gasto_id=gasto_op.id),
+        op("OP-2", "2026-02-01", "500.00", EstadoOrdenPago.AUTORIZADA, EtapaContable.DEVENGADO),
+        op("OP-3", "2026-02-15", "300.00", EstadoOrdenPago.PENDIENTE),
+        op("OP-4", "2026-03-01", "200.00", EstadoOrdenPago.ANULADA),
+        op("OP-5", "2026-03-01", "999.00", EstadoOrdenPago.PENDIENTE, destino=otro),
+    ])
+    await db.commit()
+    return muni, contacto
+
+
+class TestTotales:
+
+    async def test_totales_y_snapshot(self, db_session: AsyncSession):
+        muni, contacto = await crear_cuenta(db_session)
+        assert await db_session.get(ContactoCuentaCorriente, contacto.id) is not None
+
+        assert await cuenta_corriente.totales(db_session, contacto.id) == {
+            "facturado": "1800.00", "pagado": "1000.00", "pendiente": "800.00",
+            "devengado_no_pagado": "500.00", "cantidad_ops": 3,
+        }
+
+    async def test_listener_actualiza_al_cambiar_estado(self, db_session: AsyncSession):
+        muni, contacto = await crear_cuenta(db_session)
+        op3 = (await cuenta_corriente.pagina_ops(db_session, muni.id, contacto.id))[0][1]
+        assert op3["numero"] == "OP-3"
+
+        orden = await db_session.get(OrdenPago, op3["id"])
+        orden.estado = EstadoOrdenPago.ANULADA
+        await db_session.commit()
+
+        # El snapshot se reescribió por Core: releerlo de la BD, no del identity map
+        fila = (await db_session.execute(
+            select(ContactoCuentaCorriente)
+            .where(ContactoCuentaCorriente.contacto_id == contacto.id)
+            .execution_options(populate_existing=True)
+        )).scalar_one()
+        assert (fila.facturado, fila.pendiente, fila.cantidad_ops) == (Decimal("1500.00"), Decimal("500.00"), 2)
+
+    async def test_sin_snapshot_se_calcula(self, db_session: AsyncSession):
+        muni, contacto = await crear_cuenta(db_session)
+        await cuenta_corriente.reconstruir(db_session, muni.id)
+        fila = await db_session.get(ContactoCuentaCorriente, contacto.id)
+        await db_session.delete(fila)
+        await db_session.commit()
+
+        assert (await cuenta_corriente.totales(db_session, contacto.id))["facturado"] == "1800.00"
+
+
+class TestLibro:
+
+    async def test_saldo_acumulado_paginado(self, db_session: AsyncSession):
+        muni, contacto = await crear_cuenta(db_session)
+
+        items, cursor = [], None
+        while True:
+            pagina, cursor = await cuenta_corriente.movimientos(
+                db_session, muni.id, contacto.id, limite=3, cursor=cursor,
+            )
+            assert len(pagina) <= 3
+            items += pagina
+            if cursor is None:
+                break
+
+        obtenido = [(i["tipo"], i["fecha"], i["debe"], i["haber"], i["saldo"]) for i in items]
+        assert obtenido == LIBRO[::-1]
+        # Saldo final == lo pendiente de pago de las OPs
+        assert items[0]["saldo"] == (await cuenta_corriente.totales(db_session, contacto.id))["pendiente"]
+
+    async def test_pagina_ops(self, db_session: AsyncSession):
+        muni, contacto = await crear_cuenta(db_session)
+        p1, cursor = await cuenta_corriente.pagina_ops(db_session, muni.id, contacto.id, limite=2)
+        p2, fin = await cuenta_corriente.pagina_ops(db_session, muni.id, contacto.id, limite=2, cursor=cursor)
+        assert [o["numero"] for o in p1 + p2] == ["OP-4", "OP-3", "OP-2", "OP-1"]
+        assert fin is None
@@ -0,0 +1,106 @@
+"""
+Tests del listener único de tablas derivadas (core/denormalizacion.py): cada
+denormalización recibe sólo los objetos de sus modelos, un fallo al aplicar
+no arrastra la transacción de negocio y las invalidaciones de cache corren
+recién al commitear.
+"""
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core import denormalizacion
+from core.denormalizacion import Cambios, cambio_alguno, registrar, registrar_invalidacion
+from models import Municipio, Zona
+
+
+@pytest.fixture
+def registro(monkeypatch):
+    """Registro aislado por test: las denormalizaciones reales no corren."""
+    monkeypatch.setattr(denormalizacion, "_registradas", {})
+    monkeypatch.setattr(denormalizacion, "_por_clase", {})
+
+
+class TestDenormalizacion:
+
+    async def test_reparte_por_modelo(self, db_session: AsyncSession, registro):
+        vistos = {}
+
+        def recolectar(nombre):
+            def fn(cambios: Cambios):
+                vistos.setdefault(nombre, []).append(
+                    ([type(o).__name__ for o in cambios.nuevos], len(cambios.modificados))
+                )
+                return None
+            return fn
+
+        registrar("munis", (Municipio,), recolectar("munis"), lambda conn, p: None)
+        registrar("zonas", (Zona,), recolectar("zonas"), lambda conn, p: None)
+
+        muni = Municipio(nombre="Denorm", codigo="denorm", latitud=-34.6, longitud=-58.4)
+        db_session.add(muni)
+        await db_session.commit()
+
+        assert vistos == {"munis": [(["Municipio"], 0)]}
+
+        muni.nombre = "Denorm 2"
+        await db_session.commit()
+        assert vistos["munis"][-1] == ([], 1)
+        assert "zonas" not in vistos
+
+    async def test_fallo_no_arrastra_la_transaccion(self, db_session: AsyncSession, registro):
+        aplicados = []
+
+        def aplicar_roto(conn, pendiente):
+            raise RuntimeError("tabla sin migrar")
+
+        registrar("rota", (Municipio,), lambda c: {m.id for m in c.nuevos}, aplicar_roto)
+        registrar("sana", (Municipio,), lambda c: {m.id for m in c.nuevos}, lambda conn, p: aplicados.append(p))
+
+        db_session.add(Municipio(nombre="Denorm", codigo="denorm", latitud=-34.6, longitud=-58.4))
+        await db_session.commit()
+
+        assert len(aplicados) == 1
+        assert (await db_session.execute(select(func.count()).select_from(Municipio))).scalar() == 1
+
+    async def test_cambio_alguno(self, db_session: AsyncSession, registro):
+        cambiados = []
+        registrar(
+            "codigo", (Municipio,),
+            lambda c: [m.id for m in c.modificados if cambio_alguno(m, ("codigo",))],
+            lambda conn, p: cambiados.extend(p),
+        )
+        muni = Municipio(nombre="Denorm", codigo="denorm", latitud=-34.6, longitud=-58.4)
+        db_session.add(muni)
+        await db_session.commit()
+
+        muni.nombre = "Otro nombre"
+        await db_session.commit()
+        assert cambiados == []
+
+        muni.codigo = "denorm-2"
+        await db_session.commit()
+        assert cambiados == [muni.id]
+
+
+class TestInvalidacion:
+
+    async def test_post_commit_y_rollback(self, db_session: AsyncSession, registro):
+        invalidados = []
+        registrar_invalidacion(
+            "munis", (Municipio,), lambda c: {m.codigo for m in c.todos()}, invalidados.append,
+        )
+
+        db_session.add(Municipio(nombre="A", codigo="inv-a", latitud=-34.6, longitud=-58.4))
+        await db_session.flush()
+        db_session.add(Municipio(nombre="B", codigo="inv-b", latitud=-34.6, longitud=-58.4))
+        await db_session.flush()
+        assert invalidados == []
+        await db_session.commit()
+        # Uno por flush, todos juntos después del commit
+        assert invalidados == [[{"inv-a"}, {"inv-b"}]]
+
+        db_session.add(Municipio(nombre="C", codigo="inv-c", latitud=-34.6, longitud=-58.4))
+        await db_session.flush()
+        await db_session.rollback()
+        await db_session.commit()
+        assert invalidados == [[{"inv-a"}, {"inv-b"}]]
@@ -0,0 +1,209 @@
+"""
+Tests del motor de disponibilidad (services/disponibilidad): jornada de
+EmpleadoHorario menos ausencias aprobadas y reclamos/OTs programados,
+cantidad fija de queries y cache por (municipio, fecha).
+"""
+from datetime import date, time
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.denormalizacion import INFO_POST_COMMIT
+from core.security import get_password_hash
+from models import (
+    CategoriaReclamo, Cuadrilla, Empleado, EmpleadoAusencia, EmpleadoCuadrilla, EmpleadoHorario,
+    Municipio, OrdenTrabajo, Reclamo, User,
+)
+from models.enums import EstadoOrdenTrabajo, EstadoReclamo, RolUsuario
+from services import disponibilidad
+from services.disponibilidad import calcular_disponibilidad, disponibilidad_dia, intersectar, restar, unir
+from tests.conftest import test_engine
+
+LUNES = date(2026, 3, 2)
+SABADO = date(2026, 3, 7)
+
+
+class StatementCounter:
+    """Cuenta las sentencias enviadas a la BD."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(test_engine.sync_engine, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(test_engine.sync_engine, "before_cursor_execute", self)
+
+
+async def crear_muni(db: AsyncSession, empleados: int = 0):
+    disponibilidad.invalidar()
+    muni = Municipio(nombre="Muni Turnos", codigo="muni-turnos", latitud=-34.6, longitud=-58.4)
+    db.add(muni)
+    await db.flush()
+    admin = User(
+        email="admin@turnos.com", password_hash=get_password_hash("x"),
+        nombre="Admin", apellido="Turnos", rol=RolUsuario.ADMIN, municipio_id=muni.id,
+    )
+    categoria = CategoriaReclamo(municipio_id=muni.id, nombre="Alumbrado")
+    db.add_all([admin, categoria])
+    db.add_all([Empleado(municipio_id=muni.id, nombre=f"Empleado {i}") for i in range(empleados)])
+    await db.commit()
+    return muni, admin, categoria
+
+
+def reclamo(muni, admin, categoria, empleado, fecha, inicio, fin, **kw) -> Reclamo:
+    return Reclamo(
+        municipio_id=muni.id, creador_id=admin.id, categoria_id=categoria.id,
+        titulo="Luminaria", descripcion="No enciende", direccion="Calle 1",
+        estado=kw.pop("estado", EstadoReclamo.ASIGNADO), empleado_id=empleado.id,
+        fecha_programada=fecha, hora_inicio=inicio, hora_fin=fin, **kw,
+    )
+
+
+class TestIntervalos:
+
+    def test_restar_e_intersectar(self):
+        jornada = unir([(540, 780), (840, 1080)])
+        ocupado = unir([(600, 660), (650, 700), (770, 850), (1000, 1200)])
+
+        assert ocupado == [(600, 700), (770, 850), (1000, 1200)]
+        assert restar(jornada, ocupado) == [(540, 600), (700, 770), (850, 1000)]
+        assert intersectar(jornada, ocupado) == [(600, 700), (770, 780), (840, 850), (1000, 1080)]
+
+
+class TestMotor:
+
+    async def test_jornada_menos_ausencias_y_tareas(self, db_session: AsyncSession):
+        muni, admin, categoria = await crear_muni(db_session)
+        con_horario = Empleado(municipio_id=muni.id, nombre="Ana")
+        ausente = Empleado(municipio_id=muni.id, nombre="Beto")
+        sin_horario = Empleado(municipio_id=muni.id, nombre="Caro")
+        db_session.add_all([con_horario, ausente, sin_horario])
+        await db_session.flush()
+        db_session.add_all([
+            EmpleadoHorario(empleado_id=con_horario.id, dia_semana=0, hora_entrada=time(8), hora_salida=time(16)),
+            EmpleadoAusencia(empleado_id=ausente.id, tipo="vacaciones", fecha_inicio=LUNES,
+                             fecha_fin=LUNES, aprobado=True),
+            # Pendiente de aprobación: no descuenta
+            EmpleadoAusencia(empleado_id=sin_horario.id, tipo="licencia", fecha_inicio=LUNES,
+                             fecha_fin=LUNES, aprobado=False),
+            reclamo(muni, admin, categoria, con_horario, LUNES, time(10), time(11, 30)),
+            # Finalizado: ya no ocupa
+            reclamo(muni, admin, categoria, con_horario, LUNES, time(14), time(15),
+                    estado=EstadoReclamo.FINALIZADO),
+        ])
+        await db_session.commit()
+
+        dia = await disponibilidad_dia(db_session, muni.id, LUNES)
+
+        ana = dia.dias[con_horario.id]
+        assert ana.jornada == [(480, 960)]
+        assert ana.libres == [(480, 600), (690, 960)]
+        assert ana.minutos_ocupados == 90
+        assert [b.hora_inicio for b in ana.bloques] == ["10:00"]
+        assert dia.dias[ausente.id].ausencia == "vacaciones"
+        assert dia.dias[ausente.id].jornada == [] and not dia.dias[ausente.id].puede_recibir()
+        # Sin horarios cargados: 09:00-18:00 de lunes a viernes
+        assert dia.dias[sin_horario.id].jornada == [(540, 1080)]
+        sabado = await disponibilidad_dia(db_session, muni.id, SABADO)
+        assert sabado.dias[sin_horario.id].jornada == []
+        assert sabado.dias[con_horario.id].jornada == []
+
+    async def test_ot_de_cuadrilla_ocupa_a_sus_miembros(self, db_session: AsyncSession):
+        muni, admin, _ = await crear_muni(db_session)
+        uno = Empleado(municipio_id=muni.id, nombre="Uno")
+        dos = Empleado(municipio_id=muni.id, nombre="Dos")
+        cuadrilla = Cuadrilla(municipio_id=muni.id, nombre="Poda")
+        db_session.add_all([uno, dos, cuadrilla])
+        await db_session.flush()
+        db_session.add_all([
+            EmpleadoCuadrilla(empleado_id=uno.id, cuadrilla_id=cuadrilla.id),
+            OrdenTrabajo(
+                municipio_id=muni.id, numero="OT-2026-0001", titulo="Poda", creador_id=admin.id,
+                estado=EstadoOrdenTrabajo.ASIGNADA, cuadrilla_id=cuadrilla.id,
+                fecha_programada=LUNES, hora_inicio=time(9), hora_fin=time(13),
+            ),
+        ])
+        await db_session.commit()
+
+        dia = await disponibilidad_dia(db_session, muni.id, LUNES)
+
+        assert dia.dias[uno.id].minutos_ocupados == 240
+        assert dia.dias[uno.id].bloques[0].tipo == "ot"
+        assert dia.dias[dos.id].minutos_ocupados == 0
+
+    async def test_queries_constantes(self, db_session: AsyncSession):
+        muni, admin, categoria = await crear_muni(db_session, empleados=3)
+
+        with StatementCounter() as pocos:
+            await calcular_disponibilidad(db_session, muni.id, LUNES, SABADO)
+
+        db_session.add_all([Empleado(municipio_id=muni.id, nombre=f"Extra {i}") for i in range(30)])
+        await db_session.commit()
+        with StatementCounter() as muchos:
+            await calcular_disponibilidad(db_session, muni.id, LUNES, SABADO)
+
+        assert muchos.count == pocos.count
+
+
+class TestCache:
+
+    async def test_reusa_y_se_invalida_al_reasignar(self, db_session: AsyncSession):
+        muni, admin, categoria = await crear_muni(db_session)
+        empleado = Empleado(municipio_id=muni.id, nombre="Ana")
+        db_session.add(empleado)
+        await db_session.flush()
+        tarea = reclamo(muni, admin, categoria, empleado, LUNES, time(10), time(11))
+        db_session.add(tarea)
+        await db_session.commit()
+
+        primero = await disponibilidad_dia(db_session, muni.id, LUNES)
+        with StatementCounter() as contador:
+            segundo = await disponibilidad_dia(db_session, muni.id, LUNES)
+        assert segundo is primero and contador.count == 0
+
+        # Cambiar otro campo no invalida
+        tarea.descripcion = "Sigue sin encender"
+        await db_session.commit()
+        assert await disponibilidad_dia(db_session, muni.id, LUNES) is primero
+
+        # Reprogramar al martes invalida las dos fechas
+        martes = date(2026, 3, 3)
+        await calcular_disponibilidad(db_session, muni.id, LUNES, martes)
+        tarea.fecha_programada = martes
+        await db_session.commit()
+
+        lunes = await disponibilidad_dia(db_session, muni.id, LUNES)
+        assert lunes is not primero
+        assert lunes.dias[empleado.id].minutos_ocupados == 0
+        assert (await disponibilidad_dia(db_session, muni.id, martes)).dias[empleado.id].minutos_ocupados == 60
+
+    async def test_rollback_descarta_la_reprogramacion(self, db_session: AsyncSession):
+        """Una reasignación flusheada y revertida no toca la cache: ni al
+        hacer rollback ni en el próximo commit de la sesión."""
+        muni, admin, categoria = await crear_muni(db_session)
+        empleado = Empleado(municipio_id=muni.id, nombre="Ana")
+        db_session.add(empleado)
+        await db_session.flush()
+        tarea = reclamo(muni, admin, categoria, empleado, LUNES, time(10), time(11))
+        db_session.add(tarea)
+        await db_session.commit()
+        # El rollback expira los objetos: ids en locales
+        muni_id, empleado_id = muni.id, empleado.id
+        primero = await disponibilidad_dia(db_session, muni_id, LUNES)
+
+        tarea.fecha_programada = date(2026, 3, 3)
+        await db_session.flush()
+        assert db_session.info[INFO_POST_COMMIT]["disponibilidad"] == [{muni_id: {LUNES, date(2026, 3, 3)}}]
+        await db_session.rollback()
+
+        assert INFO_POST_COMMIT not in db_session.info
+        await db_session.commit()
+        lunes = await disponibilidad_dia(db_session, muni_id, LUNES)
+        assert lunes is primero
+        assert lunes.dias[empleado_id].minutos_ocupados == 60
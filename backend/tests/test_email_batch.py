@@ -0,0 +1,209 @@
+"""
+Tests del batch de emails (tasks/email_tasks.py): `encolar_email` programa
+un solo flush por ráfaga, el flush manda la tanda por una conexión y sólo la
+borra de la lista de procesamiento después de mandarla; si la tanda falla o
+el worker muere a mitad, los emails vuelven al buffer en orden.
+Redis en memoria y SMTP falso: sin red.
+"""
+import json
+from collections import defaultdict
+
+import pytest
+
+from core.config import settings
+from tasks import email_tasks
+from tasks.email_tasks import (
+    EMAIL_BATCH_FLAG,
+    EMAIL_BATCH_KEY,
+    EMAIL_BATCH_LOCK,
+    EMAIL_BATCH_PROCESANDO,
+    encolar_email,
+    flush_email_batch,
+)
+
+
+class RedisMemoria:
+    """Lo justo de redis.Redis que usa el batch de emails."""
+
+    def __init__(self):
+        self.listas = defaultdict(list)
+        self.claves = {}
+        self.renovaciones = []
+
+    def rpush(self, key, valor):
+        self.listas[key].append(valor.encode() if isinstance(valor, str) else valor)
+
+    def lmove(self, origen, destino, src="LEFT", dest="RIGHT"):
+        if not self.listas[origen]:
+            return None
+        valor = self.listas[origen].pop(0 if src == "LEFT" else -1)
+        if dest == "LEFT":
+            self.listas[destino].insert(0, valor)
+        else:
+            self.listas[destino].append(valor)
+        return valor
+
+    def set(self, key, valor, nx=False, ex=None):
+        if nx and key in self.claves:
+            return None
+        self.claves[key] = valor
+        return True
+
+    def get(self, key):
+        valor = self.claves.get(key)
+        return valor.encode() if isinstance(valor, str) else valor
+
+    def expire(self, key, segundos):
+        self.renovaciones.append(key)
+        return key in self.claves
+
+    def delete(self, key):
+        self.claves.pop(key, None)
+        self.listas.pop(key, None)
+
+    def pipeline(self):
+        return _Pipeline(self)
+
+    def destinatarios(self, key):
+        return [json.loads(c)["to"] for c in self.listas[key]]
+
+
+class _Pipeline:
+    def __init__(self, r):
+        self.r, self.ops = r, []
+
+    def lmove(self, *args):
+        self.ops.append(args)
+
+    def execute(self):
+        return [self.r.lmove(*args) for args in self.ops]
+
+
+class SMTPFalso:
+    """send_many con un resultado programable por destinatario."""
+
+    def __init__(self):
+        self.tandas = []
+        self.falla_todo = None
+        self.rechazados = set()
+
+    async def send_many(self, mensajes):
+        if self.falla_todo:
+            raise self.falla_todo
+        self.tandas.append([m["To"] for m in mensajes])
+        return [RuntimeError("550 rechazado") if m["To"] in self.rechazados else None for m in mensajes]
+
+
+@pytest.fixture
+def entorno(monkeypatch):
+    r, smtp = RedisMemoria(), SMTPFalso()
+    programados, individuales = [], []
+    monkeypatch.setattr(email_tasks, "_redis_client", r)
+    monkeypatch.setattr(email_tasks, "smtp_pool", lambda: smtp)
+    monkeypatch.setattr(settings, "SMTP_HOST", "smtp.test")
+    monkeypatch.setattr(flush_email_batch, "apply_async", lambda **kw: programados.append(kw))
+    monkeypatch.setattr(email_tasks.send_email_task, "delay", lambda *a: individuales.append(a[0]))
+    return r, smtp, programados, individuales
+
+
+def encolar(*destinatarios):
+    for to in destinatarios:
+        encolar_email(to, "Asunto", "Cuerpo")
+
+
+class TestEncolar:
+
+    def test_un_flush_por_rafaga(self, entorno):
+        r, _, programados, _ = entorno
+        encolar("a@x.com", "b@x.com", "c@x.com")
+
+        assert r.destinatarios(EMAIL_BATCH_KEY) == ["a@x.com", "b@x.com", "c@x.com"]
+        assert programados == [{"countdown": email_tasks.EMAIL_BATCH_DELAY}]
+
+
+class TestFlush:
+
+    def test_manda_la_tanda_y_la_borra(self, entorno, monkeypatch):
+        r, smtp, _, individuales = entorno
+        monkeypatch.setattr(email_tasks, "EMAIL_BATCH_MAX", 2)
+        encolar("a@x.com", "b@x.com", "c@x.com")
+
+        assert flush_email_batch() == {"enviados": 3, "fallidos": 0}
+
+        assert smtp.tandas == [["a@x.com", "b@x.com"], ["c@x.com"]]
+        assert not r.listas[EMAIL_BATCH_KEY] and not r.listas[EMAIL_BATCH_PROCESANDO]
+        assert EMAIL_BATCH_FLAG not in r.claves and EMAIL_BATCH_LOCK not in r.claves
+        assert individuales == []
+
+    def test_fallo_individual_pasa_a_send_email_task(self, entorno):
+        r, smtp, _, individuales = entorno
+        smtp.rechazados = {"b@x.com"}
+        encolar("a@x.com", "b@x.com")
+
+        assert flush_email_batch() == {"enviados": 1, "fallidos": 1}
+        assert individuales == ["b@x.com"]
+        assert not r.listas[EMAIL_BATCH_PROCESANDO]
+
+    def test_smtp_caido_devuelve_la_tanda(self, entorno):
+        r, smtp, _, _ = entorno
+        smtp.falla_todo = ConnectionRefusedError("smtp caído")
+        encolar("a@x.com", "b@x.com")
+
+        with pytest.raises(ConnectionRefusedError):
+            flush_email_batch()
+
+        assert r.destinatarios(EMAIL_BATCH_KEY) == ["a@x.com", "b@x.com"]
+        assert not r.listas[EMAIL_BATCH_PROCESANDO]
+        assert EMAIL_BATCH_LOCK not in r.claves
+
+    def test_recupera_tanda_de_un_flush_interrumpido(self, entorno):
+        """Lo que quedó en procesamiento sale primero, antes que lo nuevo."""
+        r, smtp, _, _ = entorno
+        encolar("viejo1@x.com", "viejo2@x.com")
+        r.lmove(EMAIL_BATCH_KEY, EMAIL_BATCH_PROCESANDO)
+        r.lmove(EMAIL_BATCH_KEY, EMAIL_BATCH_PROCESANDO)
+        encolar("nuevo@x.com")
+
+        assert flush_email_batch() == {"enviados": 3, "fallidos": 0}
+        assert smtp.tandas == [["viejo1@x.com", "viejo2@x.com", "nuevo@x.com"]]
+
+    def test_otro_flush_en_curso_reprograma(self, entorno):
+        r, smtp, programados, _ = entorno
+        encolar("a@x.com")
+        programados.clear()
+        r.set(EMAIL_BATCH_LOCK, "1")
+
+        assert flush_email_batch() == {"enviados": 0, "fallidos": 0}
+        assert smtp.tandas == []
+        assert r.destinatarios(EMAIL_BATCH_KEY) == ["a@x.com"]
+        assert programados == [{"countdown": email_tasks.EMAIL_BATCH_DELAY}]
+
+    def test_renueva_el_lock_por_tanda(self, entorno, monkeypatch):
+        r, smtp, _, _ = entorno
+        monkeypatch.setattr(email_tasks, "EMAIL_BATCH_MAX", 2)
+        encolar("a@x.com", "b@x.com", "c@x.com")
+
+        flush_email_batch()
+
+        # Una por tanda más la vuelta que encuentra el buffer vacío
+        assert r.renovaciones == [EMAIL_BATCH_LOCK] * 3
+        assert email_tasks.EMAIL_BATCH_LOCK_TTL > email_tasks.EMAIL_BATCH_TANDA_TIMEOUT
+
+    def test_lock_perdido_corta_sin_reenviar(self, entorno, monkeypatch):
+        """Si el lock venció y lo tomó otro flush, éste no sigue ni borra el ajeno."""
+        r, smtp, _, _ = entorno
+        monkeypatch.setattr(email_tasks, "EMAIL_BATCH_MAX", 1)
+        encolar("a@x.com", "b@x.com")
+        send_many = smtp.send_many
+
+        async def lento(mensajes):
+            r.claves[EMAIL_BATCH_LOCK] = "otro-flush"
+            return await send_many(mensajes)
+
+        monkeypatch.setattr(smtp, "send_many", lento)
+
+        assert flush_email_batch() == {"enviados": 1, "fallidos": 0}
+        assert smtp.tandas == [["a@x.com"]]
+        assert r.destinatarios(EMAIL_BATCH_KEY) == ["b@x.com"]
+        assert not r.listas[EMAIL_BATCH_PROCESANDO]
+        assert r.claves[EMAIL_BATCH_LOCK] == "otro-flush"
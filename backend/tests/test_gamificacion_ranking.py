@@ -0,0 +1,126 @@
+"""
+Tests del ranking materializado de gamificación (services/gamificacion_ranking)
+y del cierre mensual set-wise.
+"""
+import pytest
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.security import get_password_hash
+from models import Municipio, User
+from models.enums import RolUsuario
+from models.gamificacion import BadgeUsuario, LeaderboardMensual, PuntosUsuario, TipoAccion, PUNTOS_POR_ACCION
+from services.gamificacion_ranking import MemoriaRankingBackend, ranking
+from services.gamificacion_service import GamificacionService
+
+VECINOS = 30
+
+
+@pytest.fixture(autouse=True)
+def ranking_limpio(monkeypatch):
+    """Los ids se repiten entre tests (SQLite en memoria): ranking nuevo."""
+    monkeypatch.setattr(ranking, "backend", MemoriaRankingBackend())
+
+
+async def crear_vecinos(db: AsyncSession):
+    """30 vecinos; puntos del mes = (i % 7) * 10 (con empates), totales = i * 5."""
+    muni = Municipio(nombre="Muni Gamif", codigo="muni-gamif", latitud=-34.6, longitud=-58.4)
+    db.add(muni)
+    await db.flush()
+    users = [
+        User(
+            email=f"vecino{i}@test.com", password_hash=get_password_hash("x"),
+            nombre="Vecino", apellido=f"N{i}", rol=RolUsuario.VECINO, municipio_id=muni.id,
+        )
+        for i in range(VECINOS)
+    ]
+    db.add_all(users)
+    await db.flush()
+    await db.execute(insert(PuntosUsuario), [
+        {
+            "user_id": u.id, "municipio_id": muni.id,
+            "puntos_mes_actual": (i % 7) * 10, "puntos_totales": i * 5,
+        }
+        for i, u in enumerate(users)
+    ])
+    await db.commit()
+    return muni, users
+
+
+async def orden_db(db: AsyncSession, municipio_id: int) -> list:
+    return list((await db.execute(
+        select(PuntosUsuario.user_id)
+        .where(PuntosUsuario.municipio_id == municipio_id)
+        .order_by(PuntosUsuario.puntos_mes_actual.desc(), PuntosUsuario.user_id.desc())
+    )).scalars().all())
+
+
+async def orden_db_total(db: AsyncSession, municipio_id: int) -> list:
+    return list((await db.execute(
+        select(PuntosUsuario.user_id)
+        .where(PuntosUsuario.municipio_id == municipio_id)
+        .order_by(PuntosUsuario.puntos_totales.desc(), PuntosUsuario.user_id.desc())
+    )).scalars().all())
+
+
+class TestMemoriaBackend:
+
+    async def test_orden_y_desempate(self):
+        b = MemoriaRankingBackend()
+        await b.reemplazar("k", {1: 10, 2: 30, 3: 10, 4: 20})
+        assert await b.rango("k", 0, 10) == [(2, 30), (4, 20), (3, 10), (1, 10)]
+        assert await b.posicion("k", 1) == 3
+
+        await b.fijar("k", 1, 25)
+        assert await b.rango("k", 0, 2) == [(2, 30), (1, 25)]
+        assert await b.posicion("k", 4) == 2
+        await b.fijar("k", 9, 0)
+        assert await b.cantidad("k") == 5 and await b.posicion("k", 9) == 4
+
+
+class TestRankingGamificacion:
+
+    async def test_paginas_y_posicion_coinciden_con_db(self, db_session: AsyncSession):
+        muni, users = await crear_vecinos(db_session)
+        esperado = await orden_db(db_session, muni.id)
+
+        pagina1 = await GamificacionService.get_leaderboard(db_session, muni.id, limite=10)
+        pagina2 = await GamificacionService.get_leaderboard(db_session, muni.id, limite=10, offset=10)
+        assert [e["user_id"] for e in pagina1 + pagina2] == esperado[:20]
+        assert [e["posicion"] for e in pagina2] == list(range(11, 21))
+
+        for u in users[:5]:
+            pos = await GamificacionService.get_posicion(db_session, u.id, muni.id)
+            assert pos["posicion"] == esperado.index(u.id) + 1
+
+    async def test_agregar_puntos_mueve_la_posicion(self, db_session: AsyncSession):
+        muni, users = await crear_vecinos(db_session)
+        ultimo = (await orden_db(db_session, muni.id))[-1]
+        assert await ranking.posicion(db_session, muni.id, ultimo) == VECINOS
+
+        for _ in range(10):
+            await GamificacionService.agregar_puntos(db_session, ultimo, muni.id, TipoAccion.RECLAMO_CREADO)
+        await db_session.commit()
+
+        assert PUNTOS_POR_ACCION[TipoAccion.RECLAMO_CREADO] * 10 > 60
+        assert await ranking.posicion(db_session, muni.id, ultimo) == 1
+        assert await ranking.posicion(db_session, muni.id, ultimo, "total") == \
+            (await orden_db_total(db_session, muni.id)).index(ultimo) + 1
+
+    async def test_reset_mensual(self, db_session: AsyncSession):
+        muni, _ = await crear_vecinos(db_session)
+        top = (await orden_db(db_session, muni.id))[:10]
+
+        assert await GamificacionService.resetear_puntos_mensuales(db_session, muni.id) is True
+
+        historico = (await db_session.execute(
+            select(LeaderboardMensual.user_id).order_by(LeaderboardMensual.posicion)
+        )).scalars().all()
+        assert historico == top
+        badges = (await db_session.execute(select(func.count()).select_from(BadgeUsuario))).scalar()
+        assert badges == 3
+        assert (await db_session.execute(select(func.max(PuntosUsuario.puntos_mes_actual)))).scalar() == 0
+        assert [p for _, _, p in await ranking.top(db_session, muni.id, "mes", limite=5)] == [0] * 5
+
+        # Segundo cierre del mismo mes: no hace nada
+        assert await GamificacionService.resetear_puntos_mensuales(db_session, muni.id) is False
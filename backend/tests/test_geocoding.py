@@ -0,0 +1,108 @@
+"""
+Tests del geocoder con cache (services/geocoding) contra el FakeGeocoder:
+sin red.
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.geocoding_cache import GeocodingCache
+from services.geocoding import GeocodingService, clave_cache
+from services.geocoding.fake import FakeGeocoder
+from tests.conftest import TestSessionLocal
+
+SAN_MARTIN = [{"lat": "-34.6", "lon": "-58.4", "display_name": "San Martín 100"}]
+
+
+def servicio_con(fake: FakeGeocoder, rps: float = 1000.0) -> GeocodingService:
+    return GeocodingService(provider=fake, session_factory=TestSessionLocal, rps=rps)
+
+
+class TestGeocodingCache:
+
+    async def test_consultas_iguales_concurrentes_un_solo_request(self):
+        fake = FakeGeocoder(demora_s=0.05)
+        fake.programar("San Martín 100", SAN_MARTIN)
+        geo = servicio_con(fake)
+
+        resultados = await asyncio.gather(*[geo.search({"q": "San Martín 100"}) for _ in range(10)])
+
+        assert all(r == SAN_MARTIN for r in resultados)
+        assert len(fake.llamadas) == 1
+        assert geo.stats.coalescidas == 9
+
+    async def test_segunda_consulta_sale_del_lru(self):
+        fake = FakeGeocoder()
+        fake.programar("San Martín 100", SAN_MARTIN)
+        geo = servicio_con(fake)
+
+        await geo.search({"q": "San Martín 100"})
+        await geo.search({"q": "  SAN   MARTÍN 100 "})
+
+        assert len(fake.llamadas) == 1
+        assert geo.stats.lru == 1
+
+    async def test_cache_en_bd_sobrevive_al_proceso(self, db_session: AsyncSession):
+        fake = FakeGeocoder()
+        fake.programar("San Martín 100", SAN_MARTIN)
+        await servicio_con(fake).search({"q": "San Martín 100"})
+
+        # Otra instancia (deploy nuevo / otro worker): LRU vacío, misma BD
+        otro = servicio_con(fake)
+        assert await otro.search({"q": "San Martín 100"}) == SAN_MARTIN
+        assert len(fake.llamadas) == 1
+        assert otro.stats.db == 1
+        assert (await db_session.execute(select(func.count()).select_from(GeocodingCache))).scalar() == 1
+
+    async def test_vencidos_se_vuelven_a_pedir_y_se_purgan(self, db_session: AsyncSession):
+        fake = FakeGeocoder()
+        fake.programar("San Martín 100", SAN_MARTIN)
+        await servicio_con(fake).search({"q": "San Martín 100"})
+        await db_session.execute(
+            update(GeocodingCache).values(expira_at=datetime.utcnow() - timedelta(seconds=1))
+        )
+        await db_session.commit()
+
+        geo = servicio_con(fake)
+        assert await geo.purgar_vencidos() == 1
+        await geo.search({"q": "San Martín 100"})
+        assert len(fake.llamadas) == 2
+
+    async def test_errores_no_se_cachean(self):
+        fake = FakeGeocoder()
+        fake.programar("Cochabamba", RuntimeError("503"))
+        geo = servicio_con(fake)
+
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                await geo.search({"q": "Cochabamba"})
+
+        assert len(fake.llamadas) == 2
+        assert geo.stats.errores == 2
+
+    async def test_rate_limit_espacia_los_requests(self):
+        fake = FakeGeocoder()
+        geo = servicio_con(fake, rps=20.0)
+
+        await asyncio.gather(*[geo.search({"q": f"calle {i}"}) for i in range(4)])
+
+        assert len(fake.instantes) == 4
+        intervalos = [b - a for a, b in zip(fake.instantes, fake.instantes[1:])]
+        assert all(dt >= 0.045 for dt in intervalos)
+
+
+class TestClaveCache:
+
+    def test_normaliza_mayusculas_y_espacios(self):
+        assert clave_cache("search", {"q": "San  Martín 100"}) == clave_cache("search", {"q": "san martín 100 "})
+
+    def test_coordenadas_redondeadas(self):
+        a, _ = clave_cache("reverse", {"lat": -34.6037221, "lon": -58.3815591})
+        b, _ = clave_cache("reverse", {"lat": -34.6037249, "lon": -58.3815612})
+        assert a == b
+
+    def test_tipo_distingue(self):
+        assert clave_cache("search", {"q": "x"})[0] != clave_cache("intersection", {"q": "x"})[0]
@@ -0,0 +1,179 @@
+"""
+Tests del framework de jobs (services/jobs.py): encolado y executor local,
+progreso y cancelación vía JobContext, registro de errores y el barrido de
+jobs huérfanos (en_curso sin latido). Handlers de prueba registrados en
+HANDLERS apuntando a este módulo.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from models.background_job import BackgroundJob, EstadoJob
+from services import jobs
+from services.jobs import cancelar_job, encolar_job, rescatar_huerfanos
+from tests.conftest import TestSessionLocal
+
+# Lo que los handlers de prueba observan mientras corren
+observado = {}
+continuar = asyncio.Event()
+
+
+async def handler_ok(db, ctx, valor, archivo=None):
+    return {"doble": valor * 2, "archivo": len(archivo or b"")}
+
+
+async def handler_progreso(db, ctx):
+    await ctx.progreso(40, "Procesando hoja 1", forzar=True)
+    await ctx.progreso(90, "Throttled")  # < 1s desde el anterior: no escribe
+    async with TestSessionLocal() as s:
+        observado["progreso"] = (await s.execute(
+            select(BackgroundJob.progreso, BackgroundJob.mensaje).where(BackgroundJob.id == ctx.job_id)
+        )).one()
+    return None
+
+
+async def handler_cancelable(db, ctx):
+    await ctx.progreso(10, forzar=True)
+    await continuar.wait()
+    await ctx.progreso(50, forzar=True)
+    observado["siguio"] = True
+
+
+async def handler_falla(db, ctx, http=False):
+    if http:
+        raise HTTPException(status_code=400, detail="Padrón inválido")
+    raise ValueError("boom")
+
+
+async def handler_lento(db, ctx):
+    await asyncio.sleep(0.1)
+    async with TestSessionLocal() as s:
+        observado["latido"] = (await s.execute(
+            select(BackgroundJob.started_at, BackgroundJob.heartbeat_at).where(BackgroundJob.id == ctx.job_id)
+        )).one()
+
+
+@pytest.fixture(autouse=True)
+def executor_local(monkeypatch):
+    """Executor local sobre la BD de test con los handlers de este módulo."""
+    monkeypatch.setattr(settings, "JOBS_EXECUTOR", "local")
+    monkeypatch.setattr(jobs, "AsyncSessionLocal", TestSessionLocal)
+    for nombre in ("ok", "progreso", "cancelable", "falla", "lento"):
+        monkeypatch.setitem(jobs.HANDLERS, f"test.{nombre}", f"tests.test_jobs:handler_{nombre}")
+    observado.clear()
+    continuar.clear()
+
+
+async def esperar_executor() -> None:
+    await asyncio.gather(*list(jobs._tareas_locales))
+
+
+async def leer(job_id: str) -> BackgroundJob:
+    async with TestSessionLocal() as s:
+        return (await s.execute(select(BackgroundJob).where(BackgroundJob.id == job_id))).scalar_one()
+
+
+class TestEjecucion:
+
+    async def test_encola_y_completa(self, db_session: AsyncSession):
+        job = await encolar_job(db_session, "test.ok", {"valor": 21}, archivo=b"abc")
+        assert job.estado == EstadoJob.PENDIENTE
+        await esperar_executor()
+
+        job = await leer(job.id)
+        assert job.estado == EstadoJob.COMPLETADO
+        assert job.resultado == {"doble": 42, "archivo": 3}
+        assert job.progreso == 100 and job.archivo is None
+        assert job.started_at is not None and job.finished_at is not None
+
+    async def test_tipo_desconocido(self, db_session: AsyncSession):
+        with pytest.raises(ValueError):
+            await encolar_job(db_session, "test.no_existe")
+
+    async def test_progreso_visible_y_throttled(self, db_session: AsyncSession):
+        job = await encolar_job(db_session, "test.progreso")
+        await esperar_executor()
+
+        assert tuple(observado["progreso"]) == (40, "Procesando hoja 1")
+        assert (await leer(job.id)).estado == EstadoJob.COMPLETADO
+
+    async def test_cancelacion_en_curso(self, db_session: AsyncSession):
+        job = await encolar_job(db_session, "test.cancelable")
+        while (await leer(job.id)).progreso < 10:
+            await asyncio.sleep(0.01)
+
+        await cancelar_job(db_session, await db_session.get(BackgroundJob, job.id))
+        continuar.set()
+        await esperar_executor()
+
+        job = await leer(job.id)
+        assert job.estado == EstadoJob.CANCELADO
+        assert job.mensaje == "Cancelado por el usuario"
+        assert "siguio" not in observado
+
+    async def test_cancelar_pendiente_no_corre(self, db_session: AsyncSession):
+        await db_session.execute(insert(BackgroundJob).values(
+            id="JOB-pendiente", tipo="test.ok", estado=EstadoJob.PENDIENTE, params={"valor": 1},
+        ))
+        await db_session.commit()
+        await cancelar_job(db_session, await db_session.get(BackgroundJob, "JOB-pendiente"))
+
+        await jobs.ejecutar_job("JOB-pendiente")
+
+        job = await leer("JOB-pendiente")
+        assert job.estado == EstadoJob.CANCELADO and job.resultado is None
+
+    @pytest.mark.parametrize("http, error", [(False, "ValueError: boom"), (True, "Padrón inválido")])
+    async def test_error_queda_registrado(self, db_session: AsyncSession, http, error):
+        job = await encolar_job(db_session, "test.falla", {"http": http})
+        await esperar_executor()
+
+        job = await leer(job.id)
+        assert job.estado == EstadoJob.ERROR
+        assert job.error == error
+        assert job.finished_at is not None
+
+    async def test_latido_mientras_corre(self, db_session: AsyncSession, monkeypatch):
+        monkeypatch.setattr(settings, "JOBS_HEARTBEAT_S", 0.02)
+        job = await encolar_job(db_session, "test.lento")
+        await esperar_executor()
+
+        started_at, heartbeat_at = observado["latido"]
+        assert heartbeat_at > started_at
+        assert (await leer(job.id)).estado == EstadoJob.COMPLETADO
+
+
+class TestHuerfanos:
+
+    async def test_barrido_cierra_solo_los_sin_latido(self, db_session: AsyncSession):
+        ahora = datetime.now(timezone.utc)
+        viejo = ahora - timedelta(minutes=10)
+        await db_session.execute(insert(BackgroundJob), [
+            {"id": "JOB-muerto", "tipo": "test.ok", "estado": EstadoJob.EN_CURSO,
+             "started_at": viejo, "heartbeat_at": viejo},
+            {"id": "JOB-sin-latido", "tipo": "test.ok", "estado": EstadoJob.EN_CURSO,
+             "started_at": viejo, "heartbeat_at": None},
+            {"id": "JOB-vivo", "tipo": "test.ok", "estado": EstadoJob.EN_CURSO,
+             "started_at": viejo, "heartbeat_at": ahora},
+            {"id": "JOB-pendiente", "tipo": "test.ok", "estado": EstadoJob.PENDIENTE},
+        ])
+        await db_session.commit()
+
+        assert await rescatar_huerfanos(db_session, lease_s=300) == 2
+
+        estados = dict((await db_session.execute(
+            select(BackgroundJob.id, BackgroundJob.estado)
+        )).all())
+        assert estados == {
+            "JOB-muerto": EstadoJob.ERROR,
+            "JOB-sin-latido": EstadoJob.ERROR,
+            "JOB-vivo": EstadoJob.EN_CURSO,
+            "JOB-pendiente": EstadoJob.PENDIENTE,
+        }
+        assert "huerfano" in (await leer("JOB-muerto")).error
+        assert await rescatar_huerfanos(db_session, lease_s=300) == 0
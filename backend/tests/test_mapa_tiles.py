@@ -0,0 +1,152 @@
+"""
+Tests de la agregación por tiles del mapa y el heatmap (services/mapa_tiles):
+clusters por celda, tamaño acotado, puntos crudos en zoom alto y cache por
+tile invalidada al crear reclamos.
+"""
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.security import get_password_hash
+from models import CategoriaReclamo, Municipio, Reclamo, User
+from models.enums import EstadoReclamo, RolUsuario
+from services import mapa_tiles
+from services.mapa_tiles import Bbox, Capa, agregar, ajustar_zoom, tiles_de
+from tests.conftest import test_engine
+
+
+class StatementCounter:
+    """Cuenta las sentencias enviadas a la BD."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(test_engine.sync_engine, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(test_engine.sync_engine, "before_cursor_execute", self)
+
+
+@pytest.fixture(autouse=True)
+def cache_limpia():
+    mapa_tiles.invalidar()
+    yield
+    mapa_tiles.invalidar()
+
+
+# Plaza central de un municipio ficticio y un punto a ~20 km
+CENTRO = (-34.60, -58.40)
+LEJOS = (-34.78, -58.55)
+AREA = Bbox(oeste=-58.60, sur=-34.80, este=-58.30, norte=-34.50)
+
+
+async def crear_escenario(db: AsyncSession):
+    muni = Municipio(nombre="Mapa", codigo="muni-mapa", latitud=CENTRO[0], longitud=CENTRO[1])
+    otro = Municipio(nombre="Otro", codigo="otro-mapa", latitud=CENTRO[0], longitud=CENTRO[1])
+    db.add_all([muni, otro])
+    await db.flush()
+    vecino = User(
+        email="vecino@mapa.com", password_hash=get_password_hash("x"),
+        nombre="Vecino", apellido="Mapa", rol=RolUsuario.VECINO, municipio_id=muni.id,
+    )
+    categoria = CategoriaReclamo(municipio_id=muni.id, nombre="Alumbrado")
+    db.add_all([vecino, categoria])
+    await db.flush()
+
+    def reclamo(lat, lng, muni_id=muni.id):
+        return Reclamo(
+            municipio_id=muni_id, creador_id=vecino.id, categoria_id=categoria.id,
+            titulo="Luminaria", descripcion="x", direccion="Calle 1",
+            estado=EstadoReclamo.NUEVO, latitud=lat, longitud=lng,
+        )
+
+    # 40 reclamos en la misma cuadra, 2 lejos y 5 de otro municipio
+    db.add_all([reclamo(CENTRO[0] + i * 1e-5, CENTRO[1] + i * 1e-5) for i in range(40)])
+    db.add_all([reclamo(LEJOS[0], LEJOS[1]), reclamo(LEJOS[0] + 1e-4, LEJOS[1])])
+    db.add_all([reclamo(CENTRO[0], CENTRO[1], muni_id=otro.id) for _ in range(5)])
+    await db.commit()
+    return muni, vecino, categoria, reclamo
+
+
+def capa_de(muni) -> Capa:
+    return Capa(
+        nombre="test", municipio_id=muni.id, filtros=(), condiciones=[],
+        columnas_punto=(Reclamo.id,), punto=lambda r: {"id": r.id, "lat": r.latitud, "lng": r.longitud},
+    )
+
+
+class TestGrilla:
+
+    def test_zoom_se_ajusta_al_limite_de_tiles(self):
+        zoom = ajustar_zoom(AREA, 18)
+        assert len(tiles_de(AREA, zoom)) <= settings.MAPA_MAX_TILES
+        assert len(tiles_de(AREA, zoom + 1)) > settings.MAPA_MAX_TILES
+
+    def test_bbox_invalido(self):
+        with pytest.raises(ValueError):
+            Bbox.parsear("-58.6,-34.8,-58.3")
+        with pytest.raises(ValueError):
+            Bbox.parsear("-58.3,-34.8,-58.6,-34.5")
+
+
+class TestAgregacion:
+
+    async def test_clusters_por_celda(self, db_session: AsyncSession):
+        muni, *_ = await crear_escenario(db_session)
+
+        resultado = await agregar(db_session, capa_de(muni), 10, AREA)
+
+        assert resultado["zoom"] == 10
+        assert resultado["total"] == 42
+        assert resultado["puntos"] == []
+        cantidades = sorted(c["cantidad"] for c in resultado["clusters"])
+        assert cantidades == [2, 40]
+        denso = max(resultado["clusters"], key=lambda c: c["cantidad"])
+        assert denso["lat"] == pytest.approx(CENTRO[0], abs=1e-3)
+        assert denso["lng"] == pytest.approx(CENTRO[1], abs=1e-3)
+
+    async def test_sin_bbox_usa_la_extension(self, db_session: AsyncSession):
+        muni, *_ = await crear_escenario(db_session)
+
+        resultado = await agregar(db_session, capa_de(muni), None, None)
+
+        assert resultado["total"] == 42
+        assert len(resultado["clusters"]) + len(resultado["puntos"]) <= (
+            settings.MAPA_MAX_TILES * settings.MAPA_CELDAS_POR_TILE ** 2
+        )
+
+    async def test_zoom_alto_devuelve_puntos_crudos(self, db_session: AsyncSession, monkeypatch):
+        muni, *_ = await crear_escenario(db_session)
+        monkeypatch.setattr(settings, "MAPA_MAX_PUNTOS_TILE", 10)
+        cerca_lejos = Bbox(oeste=LEJOS[1] - 0.001, sur=LEJOS[0] - 0.001, este=LEJOS[1] + 0.001, norte=LEJOS[0] + 0.001)
+        cerca_centro = Bbox(oeste=CENTRO[1] - 0.001, sur=CENTRO[0] - 0.001, este=CENTRO[1] + 0.001, norte=CENTRO[0] + 0.001)
+
+        ralo = await agregar(db_session, capa_de(muni), settings.MAPA_ZOOM_PUNTOS, cerca_lejos)
+        denso = await agregar(db_session, capa_de(muni), settings.MAPA_ZOOM_PUNTOS, cerca_centro)
+
+        assert len(ralo["puntos"]) == 2 and ralo["clusters"] == []
+        # 40 reclamos en un tile: sigue agregado
+        assert denso["puntos"] == [] and sum(c["cantidad"] for c in denso["clusters"]) == 40
+
+
+class TestCache:
+
+    async def test_tiles_cacheados_hasta_nuevo_reclamo(self, db_session: AsyncSession):
+        muni, _, _, reclamo = await crear_escenario(db_session)
+        capa = capa_de(muni)
+        await agregar(db_session, capa, 10, AREA)
+
+        with StatementCounter() as contador:
+            assert (await agregar(db_session, capa, 10, AREA))["total"] == 42
+        assert contador.count == 0
+
+        db_session.add(reclamo(LEJOS[0], LEJOS[1]))
+        await db_session.commit()
+
+        assert (await agregar(db_session, capa, 10, AREA))["total"] == 43
@@ -0,0 +1,168 @@
+"""
+Tests del localizador de municipios (services/municipio_locator): el KD-tree
+da lo mismo que la búsqueda lineal, los límites ganan al centroide y el
+endpoint público sale del índice en memoria sin queries.
+"""
+import random
+from math import asin, cos, radians, sin, sqrt
+from types import SimpleNamespace
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Municipio
+from services import municipio_locator
+from services.municipio_locator import IndiceMunicipios, poligonos_de_geojson
+from tests.conftest import test_engine
+
+
+class StatementCounter:
+    """Cuenta las sentencias enviadas a la BD."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(test_engine.sync_engine, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(test_engine.sync_engine, "before_cursor_execute", self)
+
+
+@pytest.fixture(autouse=True)
+def indice_limpio():
+    municipio_locator.invalidar_indice()
+    yield
+    municipio_locator.invalidar_indice()
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
+    a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return 2 * asin(sqrt(a)) * 6371
+
+
+def muni(id, lat, lon, limites=None, radio_km=10.0):
+    return SimpleNamespace(
+        id=id, nombre=f"M{id}", codigo=f"m{id}", latitud=lat, longitud=lon, radio_km=radio_km,
+        logo_url=None, color_primario="#3B82F6", activo=True, abm_en_sidebar=True, es_demo=False,
+        limites_geojson=limites,
+    )
+
+
+def cuadrado(lat, lon, lado):
+    m = lado / 2
+    return {"type": "Polygon", "coordinates": [[
+        [lon - m, lat - m], [lon + m, lat - m], [lon + m, lat + m], [lon - m, lat + m], [lon - m, lat - m],
+    ]]}
+
+
+class TestIndice:
+
+    def test_coincide_con_busqueda_lineal(self):
+        r = random.Random(1)
+        munis = [muni(i, r.uniform(-55, -22), r.uniform(-73, -53)) for i in range(500)]
+        indice = IndiceMunicipios(munis)
+
+        for _ in range(200):
+            lat, lon = r.uniform(-56, -21), r.uniform(-74, -52)
+            lineal = sorted((haversine(lat, lon, m.latitud, m.longitud), m.id) for m in munis)
+
+            assert [x.municipio.id for x in indice.k_cercanos(lat, lon, 5)] == [i for _, i in lineal[:5]]
+            assert indice.localizar(lat, lon).municipio.id == lineal[0][1]
+            assert indice.k_cercanos(lat, lon, 1)[0].distancia_km == pytest.approx(lineal[0][0], abs=1e-6)
+            en_radio = [x.municipio.id for x in indice.en_radio(lat, lon, 150)]
+            assert en_radio == [i for d, i in lineal if d <= 150]
+
+    def test_limite_gana_al_centroide_mas_cercano(self):
+        # El punto está a 2 km del centroide de A pero dentro del límite de B
+        a = muni(1, -34.60, -58.40)
+        b = muni(2, -34.60, -58.50, limites=cuadrado(-34.60, -58.45, 0.09))
+        indice = IndiceMunicipios([a, b])
+
+        r = indice.localizar(-34.60, -58.42)
+
+        assert r.municipio.id == 2 and r.en_cobertura
+        assert indice.k_cercanos(-34.60, -58.42, 1)[0].municipio.id == 1
+
+    def test_fuera_de_cobertura(self):
+        indice = IndiceMunicipios([muni(1, -34.6, -58.4, radio_km=5)])
+
+        r = indice.localizar(-31.4, -64.2)
+
+        assert r.municipio.id == 1 and not r.en_cobertura and r.distancia_km > 500
+
+    def test_geojson_tolerante(self):
+        pol = cuadrado(0, 0, 1)
+        assert len(poligonos_de_geojson({"type": "Feature", "geometry": pol})) == 1
+        assert len(poligonos_de_geojson(pol["coordinates"])) == 1
+        assert poligonos_de_geojson({"type": "Point", "coordinates": [0, 0]}) == []
+        assert poligonos_de_geojson("basura") == []
+
+
+class TestEndpoint:
+
+    async def test_cercano_desde_cache_e_invalidacion(self, client: AsyncClient, db_session: AsyncSession):
+        db_session.add_all([
+            Municipio(nombre="Centro", codigo="centro", latitud=-34.60, longitud=-58.40),
+            Municipio(nombre="Norte", codigo="norte", latitud=-34.40, longitud=-58.60),
+        ])
+        await db_session.commit()
+
+        response = await client.get("/api/municipios/public/cercano", params={"lat": -34.41, "lng": -58.59})
+        assert response.status_code == 200
+        assert response.json()["codigo"] == "norte" and response.json()["en_cobertura"] is True
+
+        with StatementCounter() as contador:
+            response = await client.get("/api/municipios/public/cercano", params={"lat": -34.61, "lng": -58.41})
+        assert response.json()["codigo"] == "centro"
+        assert contador.count == 0
+
+        # Alta de un municipio: el commit descarta el índice
+        db_session.add(Municipio(nombre="Sur", codigo="sur", latitud=-34.80, longitud=-58.40))
+        await db_session.commit()
+        response = await client.get("/api/municipios/public/cercano", params={"lat": -34.79, "lng": -58.40})
+        assert response.json()["codigo"] == "sur"
+
+    async def test_armado_viejo_no_pisa_la_invalidacion(self, db_session: AsyncSession):
+        db_session.add(Municipio(nombre="Centro", codigo="centro", latitud=-34.60, longitud=-58.40))
+        await db_session.commit()
+
+        class CommitEnElMedio:
+            """Otro request commitea un municipio mientras este arma el índice."""
+
+            async def execute(self, consulta):
+                result = await db_session.execute(consulta)
+                municipio_locator.invalidar_indice()
+                return result
+
+        viejo = await municipio_locator.obtener_indice(CommitEnElMedio())
+
+        assert len(viejo) == 1
+        assert municipio_locator._indice is None
+        assert await municipio_locator.obtener_indice(db_session) is not viejo
+        assert municipio_locator._indice is not None
+
+    async def test_cercanos_k_y_radio(self, client: AsyncClient, db_session: AsyncSession):
+        db_session.add_all([
+            Municipio(nombre=f"M{i}", codigo=f"m{i}", latitud=-34.0 - i * 0.5, longitud=-58.4)
+            for i in range(6)
+        ])
+        await db_session.commit()
+
+        response = await client.get("/api/municipios/public/cercanos", params={"lat": -34.0, "lng": -58.4, "k": 3})
+        assert [m["codigo"] for m in response.json()] == ["m0", "m1", "m2"]
+
+        response = await client.get(
+            "/api/municipios/public/cercanos", params={"lat": -34.0, "lng": -58.4, "k": 10, "radio_km": 60},
+        )
+        assert [m["codigo"] for m in response.json()] == ["m0", "m1"]
+
+        response = await client.get("/api/municipios/public/cercanos", params={"lat": 95, "lng": 0})
+        assert response.status_code == 422
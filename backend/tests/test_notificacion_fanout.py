@@ -0,0 +1,168 @@
+"""
+Tests del fan-out de notificaciones (services/notificacion_fanout.py):
+cantidad fija de queries sin importar cuántos supervisores haya, un canal
+caído no corta a los otros, y las escrituras quedan en la transacción del
+caller (fan_out no commitea). Push, email y WhatsApp falsos: sin red.
+"""
+from types import SimpleNamespace
+
+import pytest
+from pywebpush import WebPushException
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.security import get_password_hash
+from models import Municipio, Notificacion, User
+from models.enums import RolUsuario
+from models.push_subscription import PushSubscription
+from models.whatsapp_config import WhatsAppConfig, WhatsAppLog
+from services import push_service
+from services.email_service import email_service
+from services.notificacion_fanout import (
+    EmailFanOut,
+    PushFanOut,
+    WhatsAppFanOut,
+    fan_out,
+    resolver_destinatarios,
+)
+
+
+class Canales:
+    """Registra lo que sale por cada canal; `caidos` hace fallar canales enteros."""
+
+    def __init__(self):
+        self.push, self.emails, self.whatsapp = [], [], []
+        self.caidos = set()
+        self.push_vencidos = set()
+
+    def webpush(self, sub, payload):
+        if "push" in self.caidos:
+            raise RuntimeError("push caído")
+        if sub["endpoint"] in self.push_vencidos:
+            raise WebPushException("Gone", response=SimpleNamespace(status_code=410))
+        self.push.append(sub["endpoint"])
+
+    async def send_bulk_email(self, emails, subject, body_html, body_text=None):
+        if "email" in self.caidos:
+            raise ConnectionRefusedError("smtp caído")
+        self.emails += emails
+        return {"sent": len(emails)}
+
+    async def enviar(self, config, telefono, mensaje):
+        if "whatsapp" in self.caidos:
+            raise RuntimeError("whatsapp caído")
+        self.whatsapp.append(telefono)
+        return f"wamid.{len(self.whatsapp)}"
+
+
+@pytest.fixture
+def canales(monkeypatch):
+    c = Canales()
+    monkeypatch.setattr(settings, "VAPID_PRIVATE_KEY", "privada")
+    monkeypatch.setattr(settings, "VAPID_PUBLIC_KEY", "publica")
+    monkeypatch.setattr(push_service, "_webpush_sync", c.webpush)
+    monkeypatch.setattr(email_service, "send_bulk_email", c.send_bulk_email)
+    monkeypatch.setattr("services.whatsapp.sender", c)
+    return c
+
+
+async def crear_supervisores(db: AsyncSession, n: int) -> Municipio:
+    muni = Municipio(nombre="Fanout", codigo="muni-fanout", latitud=-34.6, longitud=-58.4)
+    db.add(muni)
+    await db.flush()
+    password_hash = get_password_hash("x")
+    supervisores = [
+        User(
+            email=f"sup{i}@fanout.com", password_hash=password_hash,
+            nombre=f"Sup{i}", apellido="Fanout", telefono=f"11400000{i:02d}",
+            rol=RolUsuario.SUPERVISOR, municipio_id=muni.id,
+        )
+        for i in range(n)
+    ]
+    db.add_all(supervisores)
+    db.add(WhatsAppConfig(municipio_id=muni.id, habilitado=True))
+    await db.flush()
+    db.add_all([
+        PushSubscription(
+            user_id=u.id, endpoint=f"https://push.test/{u.id}", p256dh_key="k", auth_key="a",
+        )
+        for u in supervisores
+    ])
+    await db.commit()
+    return muni
+
+
+async def notificar(db: AsyncSession, muni: Municipio):
+    destinatarios = await resolver_destinatarios(db, muni.id)
+    return await fan_out(
+        db, destinatarios,
+        titulo="Nuevo reclamo", mensaje="Reclamo #1",
+        push=PushFanOut(title="Nuevo reclamo", body="Reclamo #1"),
+        email=EmailFanOut(subject="Nuevo reclamo", body_html="<p>Reclamo #1</p>"),
+        whatsapp=WhatsAppFanOut(municipio_id=muni.id, mensaje="Reclamo #1", tipo_mensaje="supervisor"),
+    )
+
+
+async def contar(db: AsyncSession, modelo) -> int:
+    return (await db.execute(select(func.count()).select_from(modelo))).scalar()
+
+
+class TestQueries:
+
+    @pytest.mark.parametrize("supervisores", [3, 40])
+    async def test_queries_fijas(self, db_session: AsyncSession, canales, presupuesto_queries, supervisores):
+        muni = await crear_supervisores(db_session, supervisores)
+        canales.push_vencidos = {"https://push.test/1"}
+
+        # resolver + INSERT notificaciones + SELECT subs + SELECT config
+        # + UPDATE subs vencidas + INSERT logs WhatsApp
+        with presupuesto_queries(max_queries=6, n_mas_1=False):
+            resultado = await notificar(db_session, muni)
+        await db_session.commit()
+
+        assert len(resultado.notificados) == supervisores
+        assert resultado.push_enviados == supervisores - 1
+        assert resultado.emails_enviados == resultado.whatsapp_enviados == supervisores
+        assert await contar(db_session, Notificacion) == supervisores
+        assert await contar(db_session, WhatsAppLog) == supervisores
+        activas = (await db_session.execute(
+            select(func.count()).select_from(PushSubscription).where(PushSubscription.activo == True)
+        )).scalar()
+        assert activas == supervisores - 1
+
+
+class TestAislamientoDeCanales:
+
+    @pytest.mark.parametrize("caido", ["push", "email", "whatsapp"])
+    async def test_un_canal_caido_no_corta_los_otros(self, db_session: AsyncSession, canales, caido):
+        muni = await crear_supervisores(db_session, 3)
+        canales.caidos = {caido}
+
+        resultado = await notificar(db_session, muni)
+        await db_session.commit()
+
+        esperados = {"push": 3, "email": 3, "whatsapp": 3, caido: 0}
+        assert resultado.push_enviados == esperados["push"]
+        assert resultado.emails_enviados == esperados["email"]
+        assert resultado.whatsapp_enviados == esperados["whatsapp"]
+        # La campanita sale siempre
+        assert await contar(db_session, Notificacion) == 3
+        # Un WhatsApp que falla por destinatario queda logueado con el error
+        logs = (await db_session.execute(select(WhatsAppLog.enviado, WhatsAppLog.error))).all()
+        assert len(logs) == 3
+        if caido == "whatsapp":
+            assert all(not enviado and "caído" in error for enviado, error in logs)
+
+
+class TestTransaccion:
+
+    async def test_no_commitea_la_sesion_del_caller(self, db_session: AsyncSession, canales):
+        muni = await crear_supervisores(db_session, 2)
+
+        await notificar(db_session, muni)
+
+        assert db_session.in_transaction()
+        await db_session.rollback()
+        assert await contar(db_session, Notificacion) == 0
+        assert await contar(db_session, WhatsAppLog) == 0
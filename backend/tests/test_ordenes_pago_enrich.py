@@ -0,0 +1,114 @@
+"""
+Tests del enrich en lote de ordenes de pago: la cantidad de queries no
+depende del tamaño de la pagina.
+"""
+import json
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.ordenes_pago import _COLUMNAS_LISTADO, _enrich_many, _listado_rapido
+from core.respuestas import dumps
+from core.security import get_password_hash
+from models import Contacto, Municipio, OrdenPago, TesoreriaCaja, User
+from models.enums import RolUsuario
+from tests.conftest import test_engine
+
+
+class QueryCounter:
+    """Cuenta los SELECT ejecutados contra el engine de test."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            self.count += 1
+
+    def __enter__(self):
+        event.listen(test_engine.sync_engine, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(test_engine.sync_engine, "before_cursor_execute", self)
+
+
+async def crear_ops(db: AsyncSession, cantidad: int) -> list:
+    """Crea `cantidad` OPs, cada una con su contacto, caja y usuarios propios
+    (el peor caso para un enrich por fila)."""
+    muni = Municipio(nombre="Muni OP", codigo="muni-op", latitud=-34.6, longitud=-58.4)
+    db.add(muni)
+    await db.flush()
+
+    for i in range(cantidad):
+        creador = User(
+            email=f"creador{i}@test.com", password_hash=get_password_hash("x"),
+            nombre="Creador", apellido=str(i), rol=RolUsuario.ADMIN, municipio_id=muni.id,
+        )
+        autorizador = User(
+            email=f"autoriza{i}@test.com", password_hash=get_password_hash("x"),
+            nombre="Autoriza", apellido=str(i), rol=RolUsuario.SUPERVISOR, municipio_id=muni.id,
+        )
+        contacto = Contacto(municipio_id=muni.id, nombre=f"Proveedor {i}")
+        caja = TesoreriaCaja(municipio_id=muni.id, nombre=f"Caja {i}", saldo_inicial=0)
+        db.add_all([creador, autorizador, contacto, caja])
+        await db.flush()
+        db.add(OrdenPago(
+            municipio_id=muni.id,
+            numero=f"OP-2026-{i:04d}",
+            destino_tipo="contacto",
+            destino_contacto_id=contacto.id,
+            concepto=f"Servicio {i}",
+            monto_pesos=Decimal("1000.00"),
+            fecha_emision=date(2026, 1, 1),
+            caja_id=caja.id,
+            creador_id=creador.id,
+            autorizado_por_id=autorizador.id,
+        ))
+    await db.commit()
+    return list((await db.execute(select(OrdenPago).order_by(OrdenPago.id))).scalars().all())
+
+
+class TestEnrichOrdenesPago:
+    """`_enrich_many` resuelve los nombres con queries fijas."""
+
+    @pytest.mark.parametrize("cantidad", [1, 5, 40])
+    async def test_queries_constantes(self, db_session: AsyncSession, cantidad: int):
+        ops = await crear_ops(db_session, cantidad)
+
+        with QueryCounter() as counter:
+            responses = await _enrich_many(db_session, ops)
+
+        # contactos + cajas + usuarios (sin dependencias en estas OPs)
+        assert counter.count == 3
+        assert len(responses) == cantidad
+        for i, resp in enumerate(responses):
+            assert resp.contacto_nombre == f"Proveedor {i}"
+            assert resp.caja_nombre == f"Caja {i}"
+            assert resp.creador_nombre == f"Creador {i}"
+            assert resp.autorizado_por_nombre == f"Autoriza {i}"
+
+    async def test_pagina_vacia_sin_queries(self, db_session: AsyncSession):
+        with QueryCounter() as counter:
+            assert await _enrich_many(db_session, []) == []
+        assert counter.count == 0
+
+
+class TestListadoRapido:
+    """El fast path del listado devuelve lo mismo que OrdenPagoResponse."""
+
+    async def test_igual_al_response_model(self, db_session: AsyncSession):
+        ops = await crear_ops(db_session, 3)
+        filas = (await db_session.execute(
+            select(OrdenPago).order_by(OrdenPago.id).with_only_columns(*_COLUMNAS_LISTADO)
+        )).mappings().all()
+
+        with QueryCounter() as counter:
+            rapido = json.loads(dumps(await _listado_rapido(db_session, filas)))
+        esperado = [r.model_dump(mode="json") for r in await _enrich_many(db_session, ops)]
+
+        assert counter.count == 3
+        assert rapido == esperado
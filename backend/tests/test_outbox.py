@@ -0,0 +1,241 @@
+"""
+Tests del outbox transaccional (services/outbox/): los eventos se graban con
+el cambio de dominio, el dispatcher los ejecuta con reintentos y dead letter
+y respeta el límite de concurrencia por handler. Handlers de prueba: sin red.
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.security import get_password_hash
+from models import CategoriaReclamo, Municipio, OutboxEvento, Reclamo, User
+from models.enums import EstadoReclamo, RolUsuario
+from services import outbox
+from services.outbox import OutboxDispatcher, metricas, publicar, reintentar_fallidos
+from tests.conftest import TestSessionLocal
+
+
+@pytest.fixture
+def registro(monkeypatch):
+    """HANDLERS aislado por test: los reales no se ejecutan."""
+    handlers = {}
+    monkeypatch.setattr(outbox.dispatcher, "HANDLERS", handlers)
+    return handlers
+
+
+def dispatcher(workers: int = 1, lote: int = 10) -> OutboxDispatcher:
+    return OutboxDispatcher(workers=workers, session_factory=TestSessionLocal, lote=lote)
+
+
+async def liberar_backoff(db: AsyncSession) -> None:
+    """Adelanta el reloj: los reintentos programados quedan disponibles."""
+    await db.execute(update(OutboxEvento).values(proximo_intento_at=None))
+    await db.commit()
+
+
+async def crear_reclamo(db: AsyncSession) -> Reclamo:
+    muni = Municipio(nombre="Outbox", codigo="muni-outbox", latitud=-34.6, longitud=-58.4)
+    db.add(muni)
+    await db.flush()
+    vecino = User(
+        email="vecino@outbox.com", password_hash=get_password_hash("x"),
+        nombre="Vecino", apellido="Outbox", rol=RolUsuario.VECINO, municipio_id=muni.id,
+    )
+    categoria = CategoriaReclamo(municipio_id=muni.id, nombre="Alumbrado")
+    db.add_all([vecino, categoria])
+    await db.flush()
+    reclamo = Reclamo(
+        municipio_id=muni.id, creador_id=vecino.id, categoria_id=categoria.id,
+        titulo="Luminaria", descripcion="x", direccion="Calle 1", estado=EstadoReclamo.NUEVO,
+    )
+    db.add(reclamo)
+    await db.flush()
+    return reclamo
+
+
+async def contar(db: AsyncSession) -> int:
+    return (await db.execute(select(func.count()).select_from(OutboxEvento))).scalar()
+
+
+class TestPublicar:
+
+    async def test_un_evento_por_handler_en_la_misma_transaccion(self, db_session: AsyncSession):
+        reclamo = await crear_reclamo(db_session)
+
+        publicar(db_session, "reclamo.creado", {"reclamo_id": reclamo.id}, municipio_id=reclamo.municipio_id)
+        await db_session.commit()
+
+        handlers = (await db_session.execute(
+            select(OutboxEvento.handler).where(OutboxEvento.tipo == "reclamo.creado")
+        )).scalars().all()
+        assert sorted(handlers) == ["email", "gamificacion", "push", "websocket"]
+
+    async def test_rollback_descarta_los_eventos(self, db_session: AsyncSession):
+        reclamo = await crear_reclamo(db_session)
+        publicar(db_session, "reclamo.creado", {"reclamo_id": reclamo.id})
+
+        await db_session.rollback()
+
+        assert await contar(db_session) == 0
+        assert (await db_session.execute(select(func.count()).select_from(Reclamo))).scalar() == 0
+
+    async def test_tipo_sin_handlers(self, db_session: AsyncSession):
+        with pytest.raises(ValueError):
+            publicar(db_session, "reclamo.inexistente", {})
+
+
+class TestDispatcher:
+
+    async def test_ejecuta_y_marca_procesado(self, db_session: AsyncSession, registro):
+        recibidos = []
+
+        async def push(db, payload):
+            recibidos.append(payload)
+
+        registro["test.evento"] = {"push": push}
+        publicar(db_session, "test.evento", {"reclamo_id": 7})
+        await db_session.commit()
+
+        assert await dispatcher().procesar_pendientes() == 1
+
+        assert recibidos == [{"reclamo_id": 7}]
+        evt = (await db_session.execute(select(OutboxEvento))).scalar_one()
+        await db_session.refresh(evt)
+        assert evt.procesado_at is not None and evt.intentos == 1 and evt.tomado_por is None
+        # Ya procesado: una segunda pasada no lo repite
+        assert await dispatcher().procesar_pendientes() == 0
+
+    async def test_fallo_de_un_handler_no_reenvia_los_otros(self, db_session: AsyncSession, registro):
+        llamadas = {"push": 0, "email": 0}
+
+        async def push(db, payload):
+            llamadas["push"] += 1
+
+        async def email(db, payload):
+            llamadas["email"] += 1
+            if llamadas["email"] == 1:
+                raise RuntimeError("SMTP caído")
+
+        registro["test.evento"] = {"push": push, "email": email}
+        publicar(db_session, "test.evento", {})
+        await db_session.commit()
+        d = dispatcher()
+
+        assert await d.procesar_pendientes() == 1
+        await liberar_backoff(db_session)
+        assert await d.procesar_pendientes() == 1
+
+        assert llamadas == {"push": 1, "email": 2}
+        assert d.stats.reintentos == 1 and d.stats.procesados == 2
+
+    async def test_backoff_y_dead_letter(self, db_session: AsyncSession, registro, monkeypatch):
+        monkeypatch.setattr(settings, "OUTBOX_MAX_INTENTOS", 2)
+
+        async def whatsapp(db, payload):
+            raise RuntimeError("Meta 503")
+
+        registro["test.evento"] = {"whatsapp": whatsapp}
+        publicar(db_session, "test.evento", {})
+        await db_session.commit()
+        d = dispatcher()
+
+        await d.procesar_pendientes()
+        evt = (await db_session.execute(select(OutboxEvento))).scalar_one()
+        assert evt.error == "Meta 503" and evt.proximo_intento_at is not None
+        # Con backoff pendiente nadie lo toma
+        assert await d.procesar_pendientes() == 0
+        await liberar_backoff(db_session)
+        await d.procesar_pendientes()
+
+        await db_session.refresh(evt)
+        assert evt.fallido_at is not None and evt.intentos == 2
+        m = await metricas(db_session, d)
+        assert m["fallidos"] == 1 and m["pendientes"] == 0
+        assert m["handlers"]["whatsapp"]["fallidos"] == 1
+        assert m["proceso"]["fallidos"] == 1
+
+        # Reintento manual desde dead letter
+        registro["test.evento"]["whatsapp"] = lambda db, payload: asyncio.sleep(0)
+        assert await reintentar_fallidos(db_session) == 1
+        assert await d.procesar_pendientes() == 1
+
+    async def test_handler_desconocido_va_a_reintento(self, db_session: AsyncSession, registro):
+        registro["test.evento"] = {"push": lambda db, payload: asyncio.sleep(0)}
+        publicar(db_session, "test.evento", {})
+        await db_session.commit()
+        # El handler se borró del código antes de procesarlo
+        registro.clear()
+
+        assert await dispatcher().procesar_pendientes() == 0
+        evt = (await db_session.execute(select(OutboxEvento))).scalar_one()
+        assert "test.evento/push" in evt.error
+
+    async def test_limite_de_concurrencia_por_handler(self, db_session: AsyncSession, registro, monkeypatch):
+        monkeypatch.setattr(settings, "OUTBOX_CONCURRENCIA", {"email": 2})
+        activos = {"email": 0, "push": 0}
+        maximo = {"email": 0, "push": 0}
+
+        def handler(nombre):
+            async def fn(db, payload):
+                activos[nombre] += 1
+                maximo[nombre] = max(maximo[nombre], activos[nombre])
+                await asyncio.sleep(0.01)
+                activos[nombre] -= 1
+            return fn
+
+        registro["test.evento"] = {"email": handler("email"), "push": handler("push")}
+        for i in range(6):
+            publicar(db_session, "test.evento", {"n": i})
+        await db_session.commit()
+
+        assert await dispatcher(lote=20).procesar_pendientes() == 12
+
+        assert maximo["email"] == 2
+        # push usa OUTBOX_CONCURRENCIA_DEFAULT: no lo frena el límite del email
+        assert maximo["push"] > 2
+
+
+class TestLease:
+
+    async def test_lease_vencido_en_la_espera_no_se_reenvia(self, db_session: AsyncSession, registro):
+        enviados = []
+
+        async def email(db, payload):
+            enviados.append(payload["n"])
+
+        registro["test.evento"] = {"email": email}
+        publicar(db_session, "test.evento", {"n": 1})
+        await db_session.commit()
+
+        # El worker A toma el evento, pero queda esperando el semaforo del
+        # handler hasta que vence su lease y el worker B lo retoma
+        async with TestSessionLocal() as db:
+            (tomado_por_a,) = await outbox.dispatcher.reclamar_eventos(db, "a", 10)
+        await db_session.execute(update(OutboxEvento).values(tomado_hasta=None))
+        await db_session.commit()
+        async with TestSessionLocal() as db:
+            (tomado_por_b,) = await outbox.dispatcher.reclamar_eventos(db, "b", 10)
+        d = dispatcher()
+
+        assert await d.procesar_evento(tomado_por_a) is False
+        assert enviados == []
+        assert await d.procesar_evento(tomado_por_b) is True
+        assert enviados == [1]
+
+    async def test_cierre_exige_el_token_de_la_toma(self, db_session: AsyncSession, registro):
+        registro["test.evento"] = {"push": lambda db, payload: asyncio.sleep(0)}
+        publicar(db_session, "test.evento", {})
+        await db_session.commit()
+        async with TestSessionLocal() as db:
+            (evt,) = await outbox.dispatcher.reclamar_eventos(db, "a", 10)
+
+        async with TestSessionLocal() as db:
+            assert await outbox.dispatcher._marcar_procesado(db, evt.id, "otro:token") is False
+            assert await outbox.dispatcher._registrar_fallo(db, evt.id, "otro:token", 99, RuntimeError("x")) is False
+        fila = (await db_session.execute(
+            select(OutboxEvento).execution_options(populate_existing=True)
+        )).scalar_one()
+        assert fila.procesado_at is None and fila.fallido_at is None and fila.tomado_por == evt.tomado_por
@@ -0,0 +1,211 @@
+"""
+Tests de la paginación keyset (core/pagination): cursores inválidos dan 400,
+el orden `created_at DESC, id DESC` desempata por id y deja los NULL al
+final, y recorrer un listado siguiendo `X-Next-Cursor` devuelve cada fila
+exactamente una vez (reclamos, solicitudes y notificaciones).
+"""
+import base64
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException, Response
+from httpx import AsyncClient
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.pagination import (
+    NEXT_CURSOR_HEADER,
+    apply_keyset,
+    decode_cursor,
+    decode_payload,
+    encode_cursor,
+    encode_payload,
+    fetch_keyset_page,
+)
+from core.security import get_password_hash
+from models import CategoriaReclamo, Municipio, Notificacion, Reclamo, User
+from models.enums import EstadoReclamo, RolUsuario
+from models.tramite import Solicitud
+
+BASE = datetime(2026, 3, 1, 12, 0, 0)
+
+
+async def crear_escenario(db: AsyncSession):
+    muni = Municipio(nombre="Paginado", codigo="muni-paginado", latitud=-34.6, longitud=-58.4)
+    db.add(muni)
+    await db.flush()
+    vecino = User(
+        email="vecino@paginado.com", password_hash=get_password_hash("password123"),
+        nombre="Vecino", apellido="Paginado", rol=RolUsuario.VECINO, municipio_id=muni.id,
+    )
+    admin = User(
+        email="admin@paginado.com", password_hash=get_password_hash("password123"),
+        nombre="Admin", apellido="Paginado", rol=RolUsuario.ADMIN, municipio_id=muni.id,
+    )
+    categoria = CategoriaReclamo(municipio_id=muni.id, nombre="Baches")
+    db.add_all([vecino, admin, categoria])
+    await db.commit()
+    return muni, vecino, admin, categoria
+
+
+def fechas(n: int):
+    """Fechas con empates: de a 3 filas comparten el mismo created_at."""
+    return [BASE - timedelta(minutes=i // 3) for i in range(n)]
+
+
+async def token(client: AsyncClient, email: str) -> str:
+    response = await client.post("/api/auth/login", data={"username": email, "password": "password123"})
+    return response.json()["access_token"]
+
+
+async def recorrer(client: AsyncClient, url: str, headers: dict, params: dict, limit: int):
+    """Sigue X-Next-Cursor hasta el final. Devuelve (ids en orden, páginas)."""
+    vistos, cursor, paginas = [], None, 0
+    while True:
+        query = {**params, "limit": limit}
+        if cursor:
+            query["cursor"] = cursor
+        response = await client.get(url, params=query, headers=headers)
+        assert response.status_code == 200, response.text
+        vistos += [r["id"] for r in response.json()]
+        paginas += 1
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            return vistos, paginas
+
+
+def esperado(filas):
+    """Orden de referencia: created_at DESC, id DESC, NULLs al final."""
+    con_fecha = sorted((f for f in filas if f[1] is not None), key=lambda f: (f[1], f[0]), reverse=True)
+    sin_fecha = sorted((f for f in filas if f[1] is None), key=lambda f: f[0], reverse=True)
+    return [f[0] for f in con_fecha + sin_fecha]
+
+
+class TestCursor:
+
+    def test_roundtrip(self):
+        assert decode_cursor(encode_cursor(BASE, 42)) == (BASE, 42)
+        assert decode_cursor(encode_cursor(None, 7)) == (None, 7)
+        assert decode_payload(encode_payload({"b": 3, "p": 9})) == {"b": 3, "p": 9}
+
+    @pytest.mark.parametrize("cursor", [
+        "basura!!",
+        base64.urlsafe_b64encode(b"[1, 2]").decode(),
+        encode_payload({"c": "2026-03-01T12:00:00"}),
+        encode_payload({"c": "no-es-fecha", "i": 1}),
+        encode_payload({"c": None, "i": "x"}),
+    ])
+    def test_cursor_invalido_da_400(self, cursor):
+        with pytest.raises(HTTPException) as exc:
+            decode_cursor(cursor)
+        assert exc.value.status_code == 400
+
+
+class TestKeyset:
+
+    async def test_empates_y_nulos(self, db_session: AsyncSession):
+        """Empates en created_at se ordenan por id y los NULL van al final."""
+        _, vecino, _, _ = await crear_escenario(db_session)
+        creados = [*fechas(7), BASE, BASE, BASE - timedelta(minutes=1)]
+        await db_session.execute(insert(Notificacion), [
+            {"usuario_id": vecino.id, "titulo": f"N{i}", "mensaje": "x", "tipo": "info", "created_at": c}
+            for i, c in enumerate(creados)
+        ])
+        # Con None en el INSERT aplica el server_default: se anulan después
+        await db_session.execute(
+            update(Notificacion).where(Notificacion.titulo.in_(["N7", "N8"])).values(created_at=None)
+        )
+        await db_session.commit()
+        filas = (await db_session.execute(select(Notificacion.id, Notificacion.created_at))).all()
+
+        vistos, cursor, ultima = [], None, None
+        while True:
+            response = Response()
+            query = apply_keyset(
+                select(Notificacion), Notificacion.created_at, Notificacion.id, cursor,
+            )
+            pagina = await fetch_keyset_page(db_session, query, 3, response)
+            vistos += [n.id for n in pagina]
+            cursor = response.headers.get(NEXT_CURSOR_HEADER)
+            if not cursor:
+                ultima = pagina
+                break
+
+        assert vistos == esperado(filas)
+        assert [n.titulo for n in ultima] == ["N7"]  # NULLs al final, por id DESC
+
+    async def test_ultima_pagina_sin_header(self, db_session: AsyncSession):
+        _, vecino, _, _ = await crear_escenario(db_session)
+        await db_session.execute(insert(Notificacion), [
+            {"usuario_id": vecino.id, "titulo": f"N{i}", "mensaje": "x", "tipo": "info", "created_at": BASE}
+            for i in range(4)
+        ])
+        await db_session.commit()
+
+        response = Response()
+        query = apply_keyset(select(Notificacion), Notificacion.created_at, Notificacion.id, None)
+        assert len(await fetch_keyset_page(db_session, query, 4, response)) == 4
+        assert NEXT_CURSOR_HEADER not in response.headers
+
+
+class TestEndpoints:
+
+    async def test_notificaciones(self, client: AsyncClient, db_session: AsyncSession):
+        _, vecino, _, _ = await crear_escenario(db_session)
+        await db_session.execute(insert(Notificacion), [
+            {"usuario_id": vecino.id, "titulo": f"N{i}", "mensaje": "x", "tipo": "info", "created_at": c}
+            for i, c in enumerate(fechas(11))
+        ])
+        await db_session.commit()
+        filas = (await db_session.execute(select(Notificacion.id, Notificacion.created_at))).all()
+        headers = {"Authorization": f"Bearer {await token(client, 'vecino@paginado.com')}"}
+
+        vistos, paginas = await recorrer(client, "/api/notificaciones", headers, {}, 4)
+
+        assert vistos == esperado(filas)
+        assert paginas == 3
+
+        response = await client.get(
+            "/api/notificaciones", params={"cursor": "basura!!"}, headers=headers,
+        )
+        assert response.status_code == 400
+
+    async def test_reclamos(self, client: AsyncClient, db_session: AsyncSession):
+        muni, vecino, _, categoria = await crear_escenario(db_session)
+        await db_session.execute(insert(Reclamo), [
+            {
+                "municipio_id": muni.id, "creador_id": vecino.id, "categoria_id": categoria.id,
+                "titulo": f"Bache {i}", "descripcion": "x", "direccion": "Calle 1",
+                "estado": EstadoReclamo.NUEVO, "created_at": c,
+            }
+            for i, c in enumerate(fechas(9))
+        ])
+        await db_session.commit()
+        filas = (await db_session.execute(select(Reclamo.id, Reclamo.created_at))).all()
+        headers = {"Authorization": f"Bearer {await token(client, 'vecino@paginado.com')}"}
+
+        vistos, paginas = await recorrer(client, "/api/reclamos", headers, {}, 3)
+
+        # 9 filas en páginas de 3: la tercera es la última y no trae cursor
+        assert vistos == esperado(filas)
+        assert paginas == 3
+
+    async def test_solicitudes(self, client: AsyncClient, db_session: AsyncSession):
+        muni, _, _, _ = await crear_escenario(db_session)
+        await db_session.execute(insert(Solicitud), [
+            {
+                "municipio_id": muni.id, "numero_tramite": f"SOL-2026-{i:05d}",
+                "asunto": f"Solicitud {i}", "created_at": c,
+            }
+            for i, c in enumerate(fechas(8))
+        ])
+        await db_session.commit()
+        filas = (await db_session.execute(select(Solicitud.id, Solicitud.created_at))).all()
+        headers = {"Authorization": f"Bearer {await token(client, 'admin@paginado.com')}"}
+
+        vistos, _ = await recorrer(
+            client, "/api/tramites/gestion/solicitudes", headers, {"municipio_id": muni.id}, 3,
+        )
+
+        assert vistos == esperado(filas)
+        assert len(vistos) == len(set(vistos)) == 8
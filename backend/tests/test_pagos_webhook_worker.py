@@ -0,0 +1,192 @@
+"""
+Tests del worker de webhooks de pago (services/pagos/webhook_worker.py)
+contra el FakeGatewayProvider: sin red.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from httpx import AsyncClient
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.security import get_password_hash
+from models import Municipio, User
+from models.enums import RolUsuario
+from models.pago_sesion import EstadoImputacion, EstadoSesionPago, PagoSesion
+from models.pago_webhook_evento import PagoWebhookEvento
+from models.tasas import Deuda, EstadoDeuda, MedioPago, Pago, Partida, TipoTasa
+from services.pagos.fake import FakeGatewayProvider
+from services.pagos.webhook_worker import WebhookWorkerPool, metricas, reclamar_eventos
+from tests.conftest import TestSessionLocal
+
+
+async def crear_sesion(db: AsyncSession, external_id: str = "MP-1") -> PagoSesion:
+    muni = Municipio(nombre="Muni Pagos", codigo="muni-pagos", latitud=-34.6, longitud=-58.4)
+    tipo = TipoTasa(codigo="abl", nombre="ABL")
+    db.add_all([muni, tipo])
+    await db.flush()
+    vecino = User(
+        email="vecino.pago@test.com", password_hash=get_password_hash("x"),
+        nombre="Vecino", apellido="Pago", rol=RolUsuario.VECINO, municipio_id=muni.id,
+    )
+    partida = Partida(municipio_id=muni.id, tipo_tasa_id=tipo.id, identificador="ABL-1")
+    db.add_all([vecino, partida])
+    await db.flush()
+    deuda = Deuda(
+        partida_id=partida.id, periodo="2026-01", importe=Decimal("1500.00"),
+        fecha_emision=date.today(), fecha_vencimiento=date.today() + timedelta(days=10),
+        estado=EstadoDeuda.PENDIENTE,
+    )
+    db.add(deuda)
+    await db.flush()
+    sesion = PagoSesion(
+        id="PB-TEST0000001", deuda_id=deuda.id, municipio_id=muni.id,
+        vecino_user_id=vecino.id, concepto="ABL - 2026-01", monto=deuda.importe,
+        estado=EstadoSesionPago.PENDING, provider="mercadopago", external_id=external_id,
+    )
+    db.add(sesion)
+    await db.commit()
+    return sesion
+
+
+def pool_con(fake: FakeGatewayProvider, workers: int = 1) -> WebhookWorkerPool:
+    async def resolver(db, municipio_id):
+        return fake
+    return WebhookWorkerPool(workers=workers, resolver_provider=resolver, session_factory=TestSessionLocal)
+
+
+async def encolar(db: AsyncSession, external_id: str, evento: str = "payment.updated") -> int:
+    evt = PagoWebhookEvento(provider="mercadopago", external_id=external_id, evento=evento, payload={})
+    db.add(evt)
+    await db.commit()
+    return evt.id
+
+
+async def recargar(db: AsyncSession, modelo, pk):
+    return (await db.execute(
+        select(modelo).where(modelo.id == pk).execution_options(populate_existing=True)
+    )).scalar_one()
+
+
+async def contar_pagos(db: AsyncSession, deuda_id: int) -> int:
+    return (await db.execute(
+        select(func.count()).select_from(Pago).where(Pago.deuda_id == deuda_id)
+    )).scalar()
+
+
+async def liberar_backoff(db: AsyncSession) -> None:
+    """Adelanta el reloj: los reintentos programados quedan disponibles."""
+    await db.execute(update(PagoWebhookEvento).values(proximo_intento_at=None))
+    await db.commit()
+
+
+class TestWebhookWorker:
+
+    async def test_aprobado_marca_deuda_pagada(self, db_session: AsyncSession):
+        sesion = await crear_sesion(db_session)
+        sesion_id, deuda_id = sesion.id, sesion.deuda_id
+        evento_id = await encolar(db_session, "MP-1")
+        fake = FakeGatewayProvider()
+
+        assert await pool_con(fake).procesar_pendientes() == 1
+
+        # El worker escribe en su propia sesion: releer de la BD
+        evt = await recargar(db_session, PagoWebhookEvento, evento_id)
+        assert evt.procesado_at is not None and evt.intentos == 1
+        assert evt.session_id == sesion_id
+        ses = await recargar(db_session, PagoSesion, sesion_id)
+        assert ses.estado == EstadoSesionPago.APPROVED and ses.codigo_cut_qr
+        deuda = await recargar(db_session, Deuda, deuda_id)
+        assert deuda.estado == EstadoDeuda.PAGADA
+        assert fake.consultas == ["MP-1"]
+
+    async def test_reintenta_con_backoff(self, db_session: AsyncSession):
+        await crear_sesion(db_session)
+        evento_id = await encolar(db_session, "MP-1")
+        fake = FakeGatewayProvider()
+        fake.programar("MP-1", RuntimeError("MP 503"), RuntimeError("MP 503"), True)
+        pool = pool_con(fake)
+
+        assert await pool.procesar_pendientes() == 0
+        db_session.expire_all()
+        evt = await db_session.get(PagoWebhookEvento, evento_id)
+        assert evt.procesado_at is None and evt.error == "MP 503"
+        assert evt.proximo_intento_at is not None and evt.tomado_por is None
+        # Con backoff pendiente nadie lo toma
+        assert await pool.procesar_pendientes() == 0
+        assert len(fake.consultas) == 1
+
+        await liberar_backoff(db_session)
+        assert await pool.procesar_pendientes() == 0
+        await liberar_backoff(db_session)
+        assert await pool.procesar_pendientes() == 1
+
+        db_session.expire_all()
+        evt = await db_session.get(PagoWebhookEvento, evento_id)
+        assert evt.procesado_at is not None and evt.intentos == 3 and evt.error is None
+        assert pool.stats.reintentos == 2 and pool.stats.procesados == 1
+
+    async def test_agota_reintentos(self, db_session: AsyncSession, monkeypatch):
+        monkeypatch.setattr(settings, "PAGOS_WEBHOOK_MAX_INTENTOS", 2)
+        evento_id = await encolar(db_session, "MP-DESCONOCIDO")  # sin sesion
+        pool = pool_con(FakeGatewayProvider())
+
+        await pool.procesar_pendientes()
+        await liberar_backoff(db_session)
+        await pool.procesar_pendientes()
+
+        db_session.expire_all()
+        evt = await db_session.get(PagoWebhookEvento, evento_id)
+        assert evt.fallido_at is not None and evt.intentos == 2
+        m = await metricas(db_session, pool)
+        assert m["fallidos"] == 1 and m["pendientes"] == 0
+        assert m["proceso"]["fallidos"] == 1
+
+    async def test_dos_eventos_mismo_pago_un_solo_pago(self, db_session: AsyncSession):
+        sesion = await crear_sesion(db_session)
+        await encolar(db_session, "MP-1", "payment.created")
+        await encolar(db_session, "MP-1", "payment.updated")
+
+        assert await pool_con(FakeGatewayProvider()).procesar_pendientes() == 2
+        assert await contar_pagos(db_session, sesion.deuda_id) == 1
+
+    async def test_claim_no_repite_eventos(self, db_session: AsyncSession):
+        for i in range(5):
+            await encolar(db_session, f"MP-{i}")
+        async with TestSessionLocal() as a, TestSessionLocal() as b:
+            primeros = await reclamar_eventos(a, "w1", 3)
+            resto = await reclamar_eventos(b, "w2", 10)
+        assert len(primeros) == 3 and len(resto) == 2
+        assert not set(primeros) & set(resto)
+
+        m = await metricas(db_session, pool_con(FakeGatewayProvider()))
+        assert m["pendientes"] == 5 and m["en_reintento"] == 5
+
+
+class TestConfirmarEndpoint:
+
+    async def test_confirmar_y_webhook_comparten_el_path(self, client: AsyncClient, db_session: AsyncSession):
+        """/confirmar deja la sesion y la deuda igual que el worker, y el
+        webhook que llega despues no crea otro Pago."""
+        sesion = await crear_sesion(db_session)
+        sesion_id, deuda_id = sesion.id, sesion.deuda_id
+
+        response = await client.post(
+            f"/api/pagos/sesiones/{sesion_id}/confirmar", json={"medio_pago": "qr"},
+        )
+        assert response.status_code == 200, response.text
+        assert response.json()["codigo_cut_qr"]
+
+        ses = await recargar(db_session, PagoSesion, sesion_id)
+        assert ses.estado == EstadoSesionPago.APPROVED
+        assert ses.imputacion_estado == EstadoImputacion.PENDIENTE
+        assert ses.metadatos["simulado"] is True
+        deuda = await recargar(db_session, Deuda, deuda_id)
+        assert deuda.estado == EstadoDeuda.PAGADA and deuda.pago_externo_id == "MP-1"
+        pago = (await db_session.execute(select(Pago).where(Pago.deuda_id == deuda_id))).scalar_one()
+        assert pago.medio == MedioPago.QR
+
+        await encolar(db_session, "MP-1")
+        assert await pool_con(FakeGatewayProvider()).procesar_pendientes() == 1
+        assert await contar_pagos(db_session, deuda_id) == 1
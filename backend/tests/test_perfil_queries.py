@@ -0,0 +1,146 @@
+"""
+Tests del perfil de queries por request (core/perfil_queries.py): conteo,
+formas repetidas (N+1), headers X-DB-*, fixture presupuesto_queries y el
+ranking por ruta de /admin/queries/rutas.
+"""
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core import perfil_queries
+from core.perfil_queries import forma_sql, medir
+from core.security import get_password_hash
+from models import Municipio, User
+from models.enums import RolUsuario
+
+
+@pytest.fixture(autouse=True)
+def rutas_limpias():
+    perfil_queries.reiniciar_rutas()
+    yield
+    perfil_queries.reiniciar_rutas()
+
+
+async def crear_municipios(db: AsyncSession, n: int) -> list:
+    munis = [
+        Municipio(nombre=f"M{i}", codigo=f"perfil-{i}", latitud=-34.6, longitud=-58.4, es_demo=True)
+        for i in range(n)
+    ]
+    db.add_all(munis)
+    await db.commit()
+    return munis
+
+
+async def token_super_admin(client: AsyncClient, db: AsyncSession, municipio_id=None) -> str:
+    db.add(User(
+        email="super@perfil.com", password_hash=get_password_hash("password123"),
+        nombre="Super", apellido="Admin", rol=RolUsuario.ADMIN, municipio_id=municipio_id,
+    ))
+    await db.commit()
+    response = await client.post("/api/auth/login", data={"username": "super@perfil.com", "password": "password123"})
+    return response.json()["access_token"]
+
+
+class TestFormas:
+
+    def test_agrupa_por_parametros(self):
+        a = forma_sql("SELECT * FROM reclamos WHERE id = 10 AND estado = 'nuevo'")
+        b = forma_sql("SELECT *  FROM reclamos\n WHERE id = 11 AND estado = 'asignado'")
+        assert a == b
+
+    def test_colapsa_listas_in(self):
+        assert forma_sql("SELECT x FROM t WHERE id IN (?, ?, ?)") == forma_sql("SELECT x FROM t WHERE id IN (?)")
+        assert forma_sql("SELECT x FROM t WHERE id IN (%s,%s)") == "SELECT x FROM t WHERE id IN (?)"
+
+    def test_no_toca_identificadores(self):
+        assert forma_sql("SELECT anon_1.id FROM t1") == "SELECT anon_1.id FROM t1"
+
+
+class TestMedir:
+
+    async def test_cuenta_y_detecta_n_mas_1(self, db_session: AsyncSession):
+        munis = await crear_municipios(db_session, 6)
+
+        with medir() as perfil:
+            for m in munis:
+                await db_session.execute(select(Municipio.nombre).where(Municipio.id == m.id))
+
+        assert perfil.queries == 6 and perfil.tiempo_ms > 0
+        [(forma, veces)] = perfil.repetidas()
+        assert veces == 6 and "FROM municipios" in forma
+
+    async def test_anidado_suma_afuera_y_cerrado_no_cuenta(self, db_session: AsyncSession):
+        with medir() as externo:
+            await db_session.execute(select(Municipio.id))
+            with medir() as interno:
+                await db_session.execute(select(Municipio.id))
+            await db_session.execute(select(Municipio.id))
+
+        assert interno.queries == 1 and externo.queries == 3
+        await db_session.execute(select(Municipio.id))
+        assert externo.queries == 3
+
+    async def test_sin_perfil_no_cuenta(self, db_session: AsyncSession):
+        assert perfil_queries.perfil_actual() is None
+        await db_session.execute(select(Municipio.id))
+
+
+class TestMiddleware:
+
+    async def test_headers(self, client: AsyncClient, db_session: AsyncSession):
+        await crear_municipios(db_session, 2)
+
+        response = await client.get("/api/municipios/public")
+
+        assert response.status_code == 200
+        assert int(response.headers["X-DB-Queries"]) == 1
+        assert float(response.headers["X-DB-Tiempo-Ms"]) >= 0
+        assert "X-DB-N1" not in response.headers
+
+    async def test_presupuesto_queries(self, client: AsyncClient, db_session: AsyncSession, presupuesto_queries):
+        munis = await crear_municipios(db_session, 6)
+
+        with presupuesto_queries(max_queries=1) as perfil:
+            await client.get("/api/municipios/public")
+        assert perfil.queries == 1
+
+        with pytest.raises(pytest.fail.Exception, match="Presupuesto de 1 queries"):
+            with presupuesto_queries(max_queries=1):
+                await client.get("/api/municipios/public")
+                await client.get("/api/municipios/public")
+
+        with pytest.raises(pytest.fail.Exception, match="N\\+1"):
+            with presupuesto_queries(n_mas_1=False):
+                for m in munis:
+                    await db_session.get(Municipio, m.id, populate_existing=True)
+
+    async def test_ranking_por_ruta(self, client: AsyncClient, db_session: AsyncSession):
+        await crear_municipios(db_session, 1)
+        token = await token_super_admin(client, db_session)
+        for _ in range(3):
+            await client.get("/api/municipios/public")
+        await client.get("/api/municipios/public/perfil-0")
+
+        response = await client.get(
+            "/api/admin/queries/rutas", headers={"Authorization": f"Bearer {token}"},
+        )
+
+        assert response.status_code == 200
+        rutas = {r["ruta"]: r for r in response.json()}
+        assert rutas["GET /api/municipios/public"]["requests"] == 3
+        assert rutas["GET /api/municipios/public"]["queries_por_request"] == 1
+        # Template de la ruta, no el path con el código
+        assert "GET /api/municipios/public/{codigo}" in rutas
+        queries = [r["queries_por_request"] for r in response.json()]
+        assert queries == sorted(queries, reverse=True)
+
+    async def test_ranking_solo_super_admin(self, client: AsyncClient, db_session: AsyncSession):
+        [muni] = await crear_municipios(db_session, 1)
+        token = await token_super_admin(client, db_session, municipio_id=muni.id)
+
+        response = await client.get(
+            "/api/admin/queries/rutas", headers={"Authorization": f"Bearer {token}"},
+        )
+
+        assert response.status_code == 403
@@ -0,0 +1,173 @@
+"""
+Tests del buscador de reclamos (services/reclamo_busqueda): el documento
+se mantiene en el flush (también al editar creador/categoría/zona),
+`buscar_ids` respeta municipio y términos, y GET /reclamos?search= filtra por
+visibilidad y pagina con cursor sobre el ranking.
+"""
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.pagination import NEXT_CURSOR_HEADER
+from core.security import get_password_hash
+from models import CategoriaReclamo, Municipio, Reclamo, User, Zona
+from models.enums import EstadoReclamo, RolUsuario
+from models.reclamo_busqueda import ReclamoBusqueda
+from services import reclamo_busqueda
+from services.reclamo_busqueda import buscar_ids
+
+
+async def crear_escenario(db: AsyncSession):
+    muni = Municipio(nombre="Busqueda", codigo="muni-busqueda", latitud=-34.6, longitud=-58.4)
+    otro = Municipio(nombre="Otro", codigo="muni-otro", latitud=-34.7, longitud=-58.5)
+    db.add_all([muni, otro])
+    await db.flush()
+    vecinos = [
+        User(
+            email=f"vecino{i}@busqueda.com", password_hash=get_password_hash("password123"),
+            nombre=f"Vecino{i}", apellido="Perez", dni=f"3011122{i}", rol=RolUsuario.VECINO,
+            municipio_id=muni.id,
+        )
+        for i in range(2)
+    ]
+    categoria = CategoriaReclamo(municipio_id=muni.id, nombre="Alumbrado")
+    zona = Zona(nombre="Centro", codigo="ZC", municipio_id=muni.id)
+    db.add_all([*vecinos, categoria, zona])
+    await db.flush()
+    await db.commit()
+    return muni, otro, vecinos, categoria, zona
+
+
+def reclamo(muni_id, creador, categoria, titulo, zona=None) -> Reclamo:
+    return Reclamo(
+        municipio_id=muni_id, creador_id=creador.id, categoria_id=categoria.id,
+        zona_id=zona.id if zona else None, titulo=titulo, descripcion="x",
+        direccion="Calle 1", estado=EstadoReclamo.NUEVO,
+    )
+
+
+async def documento(db: AsyncSession, reclamo_id: int) -> str:
+    return (await db.execute(
+        select(ReclamoBusqueda.documento).where(ReclamoBusqueda.reclamo_id == reclamo_id)
+    )).scalar_one()
+
+
+async def token(client: AsyncClient, email: str) -> str:
+    response = await client.post("/api/auth/login", data={"username": email, "password": "password123"})
+    return response.json()["access_token"]
+
+
+class TestIndice:
+
+    async def test_documento_en_el_mismo_flush(self, db_session: AsyncSession):
+        muni, _, vecinos, categoria, zona = await crear_escenario(db_session)
+        r = reclamo(muni.id, vecinos[0], categoria, "Luminaria quemada", zona)
+        db_session.add(r)
+        await db_session.commit()
+
+        doc = await documento(db_session, r.id)
+        assert "luminaria quemada" in doc and "vecino0" in doc and "alumbrado" in doc and "centro" in doc
+
+        r.titulo = "Bache profundo"
+        await db_session.commit()
+        assert "bache profundo" in await documento(db_session, r.id)
+
+        await db_session.delete(r)
+        await db_session.commit()
+        assert (await db_session.execute(select(ReclamoBusqueda))).first() is None
+
+    async def test_editar_entidades_referenciadas_reindexa(self, db_session: AsyncSession):
+        muni, _, vecinos, categoria, zona = await crear_escenario(db_session)
+        r = reclamo(muni.id, vecinos[0], categoria, "Luminaria", zona)
+        db_session.add(r)
+        await db_session.commit()
+
+        categoria.nombre = "Iluminación pública"
+        zona.nombre = "Microcentro"
+        vecinos[0].apellido = "Gómez"
+        await db_session.commit()
+
+        doc = await documento(db_session, r.id)
+        assert "iluminacion publica" in doc and "microcentro" in doc and "gomez" in doc
+        assert "alumbrado" not in doc and "perez" not in doc
+        assert await buscar_ids(db_session, muni.id, "gomez") == [r.id]
+
+
+class TestBuscarIds:
+
+    async def test_terminos_obligatorios_y_municipio(self, db_session: AsyncSession):
+        muni, otro, vecinos, categoria, _ = await crear_escenario(db_session)
+        a = reclamo(muni.id, vecinos[0], categoria, "Luminaria quemada")
+        b = reclamo(muni.id, vecinos[1], categoria, "Luminaria rota")
+        c = reclamo(otro.id, vecinos[0], categoria, "Luminaria quemada")
+        db_session.add_all([a, b, c])
+        await db_session.commit()
+
+        # Más relevante primero; en SQLite (sin FULLTEXT) empata y desempata por id
+        assert await buscar_ids(db_session, muni.id, "luminaria") == [b.id, a.id]
+        assert await buscar_ids(db_session, muni.id, "luminaria quemada") == [a.id]
+        # DNI parcial por los sufijos numéricos
+        assert await buscar_ids(db_session, muni.id, "1221") == [b.id]
+        assert await buscar_ids(db_session, muni.id, "  ") == []
+
+    async def test_filtros_antes_del_tope(self, db_session: AsyncSession):
+        muni, _, vecinos, categoria, _ = await crear_escenario(db_session)
+        propio = reclamo(muni.id, vecinos[0], categoria, "Bache propio")
+        db_session.add(propio)
+        await db_session.flush()
+        db_session.add_all([reclamo(muni.id, vecinos[1], categoria, f"Bache ajeno {i}") for i in range(3)])
+        await db_session.commit()
+
+        # Sin filtros el tope se llena con los ajenos (más nuevos)
+        assert propio.id not in await buscar_ids(db_session, muni.id, "bache", limite=2)
+        assert await buscar_ids(
+            db_session, muni.id, "bache", limite=2, filtros=[Reclamo.creador_id == vecinos[0].id],
+        ) == [propio.id]
+
+
+class TestEndpoint:
+
+    async def test_visibilidad_y_cursor(self, client: AsyncClient, db_session: AsyncSession):
+        muni, _, vecinos, categoria, _ = await crear_escenario(db_session)
+        propios = [reclamo(muni.id, vecinos[0], categoria, f"Bache {i}") for i in range(5)]
+        ajenos = [reclamo(muni.id, vecinos[1], categoria, f"Bache ajeno {i}") for i in range(3)]
+        db_session.add_all(propios + ajenos)
+        await db_session.commit()
+        headers = {"Authorization": f"Bearer {await token(client, 'vecino0@busqueda.com')}"}
+
+        vistos, cursor, paginas = [], None, 0
+        while True:
+            params = {"search": "bache", "limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            response = await client.get("/api/reclamos", params=params, headers=headers)
+            assert response.status_code == 200
+            vistos += [r["id"] for r in response.json()]
+            paginas += 1
+            cursor = response.headers.get(NEXT_CURSOR_HEADER)
+            if not cursor:
+                break
+
+        # Sólo los suyos, sin repetidos ni faltantes, en páginas llenas
+        assert sorted(vistos) == sorted(r.id for r in propios)
+        assert len(vistos) == len(set(vistos)) and paginas == 3
+
+        response = await client.get(
+            "/api/reclamos", params={"search": "bache", "cursor": "basura"}, headers=headers,
+        )
+        assert response.status_code == 400
+
+    async def test_tope_no_esconde_los_visibles(self, client: AsyncClient, db_session: AsyncSession, monkeypatch):
+        muni, _, vecinos, categoria, _ = await crear_escenario(db_session)
+        propios = [reclamo(muni.id, vecinos[0], categoria, f"Bache {i}") for i in range(2)]
+        db_session.add_all(propios)
+        await db_session.flush()
+        db_session.add_all([reclamo(muni.id, vecinos[1], categoria, f"Bache ajeno {i}") for i in range(4)])
+        await db_session.commit()
+        monkeypatch.setattr(reclamo_busqueda, "MAX_RESULTADOS", 3)
+        headers = {"Authorization": f"Bearer {await token(client, 'vecino0@busqueda.com')}"}
+
+        response = await client.get("/api/reclamos", params={"search": "bache"}, headers=headers)
+
+        assert response.status_code == 200
+        assert sorted(r["id"] for r in response.json()) == sorted(r.id for r in propios)
@@ -0,0 +1,187 @@
+"""
+Tests del reporte ejecutivo mensual (services/reportes_mensuales): métricas
+en una pasada agregada, meses cerrados congelados, mes en curso con TTL y
+PDF cacheado por ETag.
+"""
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.security import get_password_hash
+from models import Calificacion, CategoriaReclamo, Empleado, Municipio, Reclamo, ReporteMensual, User, Zona
+from models.enums import EstadoReclamo, RolUsuario
+from services import reportes_mensuales
+from services.reportes_mensuales import etag, etag_coincide, mes_cerrado, obtener_snapshot, renderizar
+from tests.conftest import test_engine
+
+
+class StatementCounter:
+    """Cuenta las sentencias enviadas a la BD."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(test_engine.sync_engine, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(test_engine.sync_engine, "before_cursor_execute", self)
+
+
+async def crear_escenario(db: AsyncSession):
+    muni = Municipio(nombre="Municipalidad de Reportes", codigo="muni-reportes", latitud=-34.6, longitud=-58.4)
+    otro = Municipio(nombre="Otro", codigo="otro-reportes", latitud=-34.6, longitud=-58.4)
+    db.add_all([muni, otro])
+    await db.flush()
+    vecino = User(
+        email="vecino@reportes.com", password_hash=get_password_hash("x"),
+        nombre="Vecino", apellido="Uno", rol=RolUsuario.VECINO, municipio_id=muni.id,
+    )
+    luz = CategoriaReclamo(municipio_id=muni.id, nombre="Alumbrado", tiempo_resolucion_estimado=48)
+    baches = CategoriaReclamo(municipio_id=muni.id, nombre="Baches", tiempo_resolucion_estimado=24)
+    ajena = CategoriaReclamo(municipio_id=otro.id, nombre="Ajena")
+    centro = Zona(municipio_id=muni.id, nombre="Centro")
+    ana = Empleado(municipio_id=muni.id, nombre="Ana", apellido="Gómez")
+    db.add_all([vecino, luz, baches, ajena, centro, ana])
+    await db.flush()
+
+    def reclamo(categoria, creado, estado=EstadoReclamo.NUEVO, muni_id=muni.id, **kw):
+        return Reclamo(
+            municipio_id=muni_id, creador_id=vecino.id, categoria_id=categoria.id,
+            titulo="Reclamo", descripcion="Descripción", direccion="Calle 1",
+            estado=estado, created_at=creado, **kw,
+        )
+
+    rapido = reclamo(luz, datetime(2025, 3, 2, 10), EstadoReclamo.FINALIZADO, zona_id=centro.id,
+                     empleado_id=ana.id, fecha_resolucion=datetime(2025, 3, 3, 10))
+    lento = reclamo(luz, datetime(2025, 3, 5, 10), EstadoReclamo.RESUELTO,
+                    empleado_id=ana.id, fecha_resolucion=datetime(2025, 3, 9, 10))
+    db.add_all([
+        rapido, lento,
+        reclamo(baches, datetime(2025, 3, 20, 8), zona_id=centro.id),
+        reclamo(baches, datetime(2025, 2, 14, 8)),
+        reclamo(ajena, datetime(2025, 3, 10, 8), muni_id=otro.id),
+    ])
+    await db.flush()
+    db.add_all([
+        Calificacion(reclamo_id=rapido.id, usuario_id=vecino.id, puntuacion=4),
+        Calificacion(reclamo_id=lento.id, usuario_id=vecino.id, puntuacion=2),
+    ])
+    await db.commit()
+    return muni, vecino, baches
+
+
+class TestMetricas:
+
+    async def test_una_pasada_agregada(self, db_session: AsyncSession):
+        muni, _, _ = await crear_escenario(db_session)
+
+        with StatementCounter() as contador:
+            snapshot = await obtener_snapshot(db_session, muni.id, 2025, 3)
+        m = snapshot.metricas
+
+        assert m["estadisticas"] == {"total": 3, "resueltos": 2, "pendientes": 1}
+        assert m["por_categoria"] == {"Alumbrado": 2, "Baches": 1}
+        assert m["por_zona"] == {"Centro": 2}
+        assert m["por_estado"] == {"Finalizado": 1, "Resuelto": 1, "Nuevo": 1}
+        # 24 h dentro de las 48 de la categoría, 96 h fuera
+        assert m["sla_cumplimiento"] == 50.0
+        assert m["tiempo_promedio"] == 60.0
+        assert m["calificacion_promedio"] == 3.0
+        assert m["top_empleados"] == [
+            {"nombre": "Ana G.", "resueltos": 2, "tiempo_promedio": 60.0, "calificacion": 3.0}
+        ]
+        assert m["tendencia"][-2:] == [["Feb 2025", 1], ["Mar 2025", 3]]
+        assert len(m["tendencia"]) == 6
+        assert snapshot.cerrado
+        # Lectura del snapshot + 2 agregadas + INSERT
+        assert contador.count == 4
+
+
+class TestSnapshot:
+
+    async def test_mes_cerrado_no_se_recalcula(self, db_session: AsyncSession):
+        muni, vecino, baches = await crear_escenario(db_session)
+        await obtener_snapshot(db_session, muni.id, 2025, 3)
+
+        db_session.add(Reclamo(
+            municipio_id=muni.id, creador_id=vecino.id, categoria_id=baches.id,
+            titulo="Tardío", descripcion="x", direccion="Calle 2", estado=EstadoReclamo.NUEVO,
+            created_at=datetime(2025, 3, 30, 8),
+        ))
+        await db_session.commit()
+
+        with StatementCounter() as contador:
+            segundo = await obtener_snapshot(db_session, muni.id, 2025, 3)
+        assert segundo.metricas["estadisticas"]["total"] == 3
+        assert contador.count == 1
+
+    async def test_mes_en_curso_se_recalcula_al_vencer(self, db_session: AsyncSession):
+        muni, vecino, baches = await crear_escenario(db_session)
+        muni_id, hoy = muni.id, date.today()
+        assert not mes_cerrado(hoy.year, hoy.month)
+
+        snapshot = await obtener_snapshot(db_session, muni_id, hoy.year, hoy.month)
+        assert not snapshot.cerrado and snapshot.metricas["estadisticas"]["total"] == 0
+
+        db_session.add(Reclamo(
+            municipio_id=muni_id, creador_id=vecino.id, categoria_id=baches.id,
+            titulo="Nuevo", descripcion="x", direccion="Calle 2", estado=EstadoReclamo.NUEVO,
+            created_at=datetime(hoy.year, hoy.month, 1, 12),
+        ))
+        await db_session.commit()
+        # Dentro del TTL sigue el snapshot guardado
+        assert (await obtener_snapshot(db_session, muni_id, hoy.year, hoy.month)).metricas["estadisticas"]["total"] == 0
+
+        await db_session.execute(
+            update(ReporteMensual).values(calculado_at=datetime.utcnow() - timedelta(days=1))
+        )
+        await db_session.commit()
+        # El UPDATE masivo no sincroniza la sesion: releer el snapshot
+        await db_session.refresh(snapshot)
+        assert snapshot.calculado_at < datetime.utcnow() - timedelta(hours=1)
+
+        recalculado = await obtener_snapshot(db_session, muni_id, hoy.year, hoy.month)
+        assert recalculado.id == snapshot.id and not recalculado.cerrado
+        assert recalculado.metricas["estadisticas"]["total"] == 1
+        assert recalculado.calculado_at > datetime.utcnow() - timedelta(minutes=1)
+
+
+class TestPDF:
+
+    def test_etag_coincide(self):
+        assert etag_coincide('"abc"', '"abc"')
+        assert etag_coincide('W/"abc", "def"', '"abc"')
+        assert etag_coincide("*", '"abc"')
+        assert not etag_coincide(None, '"abc"')
+        assert not etag_coincide('"def"', '"abc"')
+
+    async def test_pdf_cacheado_por_etag(self, db_session: AsyncSession, monkeypatch):
+        muni, _, _ = await crear_escenario(db_session)
+        renders = []
+
+        def render_falso(**kwargs):
+            renders.append(kwargs)
+            return b"%PDF-" + str(len(renders)).encode()
+
+        monkeypatch.setattr(reportes_mensuales, "render_executive_report", render_falso)
+        reportes_mensuales.invalidar()
+        snapshot = await obtener_snapshot(db_session, muni.id, 2025, 3)
+        valor = etag(muni, snapshot)
+
+        assert await renderizar(muni, snapshot, valor) == b"%PDF-1"
+        assert await renderizar(muni, snapshot, valor) == b"%PDF-1"
+        assert len(renders) == 1
+        assert renders[0]["municipio_nombre"] == "Reportes"
+        assert renders[0]["periodo"] == "Marzo 2025"
+
+        # Cambia el branding: otro ETag, se vuelve a renderizar
+        muni.color_primario = "#ff0000"
+        nuevo = etag(muni, snapshot)
+        assert nuevo != valor
+        assert await renderizar(muni, snapshot, nuevo) == b"%PDF-2"
@@ -0,0 +1,116 @@
+"""
+Tests de la capa de serialización (core/respuestas) y de la compresión de
+responses (core/compresion).
+"""
+import gzip
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from fastapi import Response
+
+from core.compresion import CompresionMiddleware, brotli, elegir_codificacion
+from core.respuestas import dumps, respuesta_json
+from models.enums import EstadoReclamo
+
+
+class TestDumps:
+
+    def test_tipos_como_pydantic(self):
+        datos = {
+            "monto": Decimal("1500.50"),
+            "estado": EstadoReclamo.NUEVO,
+            "creado": datetime(2026, 3, 1, 10, 30, tzinfo=timezone.utc),
+            1: "clave numérica",
+        }
+        assert json.loads(dumps(datos)) == {
+            "monto": "1500.50",
+            "estado": "nuevo",
+            "creado": "2026-03-01T10:30:00Z",
+            "1": "clave numérica",
+        }
+
+    def test_respuesta_json_conserva_headers(self):
+        response = Response()
+        del response.headers["content-length"]
+        response.headers["X-Total-Count"] = "3"
+
+        r = respuesta_json([1, 2, 3], response)
+
+        assert r.headers["x-total-count"] == "3"
+        assert r.headers["content-length"] == str(len(r.body))
+        assert r.body == b"[1,2,3]"
+
+
+def app_de_prueba(cuerpos, tipo=b"application/json"):
+    async def app(scope, receive, send):
+        await send({
+            "type": "http.response.start", "status": 200,
+            "headers": [(b"content-type", tipo), (b"content-length", str(sum(map(len, cuerpos))).encode())],
+        })
+        for i, cuerpo in enumerate(cuerpos):
+            await send({"type": "http.response.body", "body": cuerpo, "more_body": i < len(cuerpos) - 1})
+    return app
+
+
+async def pedir(app, accept_encoding="gzip, br"):
+    enviados = []
+
+    async def send(message):
+        enviados.append(message)
+
+    scope = {"type": "http", "headers": [(b"accept-encoding", accept_encoding.encode())]}
+    await CompresionMiddleware(app, minimo_bytes=500)(scope, None, send)
+    headers = {k.decode(): v.decode() for k, v in enviados[0]["headers"]}
+    cuerpo = b"".join(m.get("body", b"") for m in enviados[1:])
+    return headers, cuerpo
+
+
+class TestCompresion:
+
+    def test_negociacion(self):
+        assert elegir_codificacion("gzip, deflate, br", con_brotli=True) == "br"
+        assert elegir_codificacion("gzip, deflate, br", con_brotli=False) == "gzip"
+        assert elegir_codificacion("br;q=0, gzip;q=0.5", con_brotli=True) == "gzip"
+        assert elegir_codificacion("*", con_brotli=False) == "gzip"
+        assert elegir_codificacion("gzip;q=0, identity") is None
+        assert elegir_codificacion("") is None
+
+    async def test_json_grande_se_comprime(self):
+        cuerpo = dumps([{"id": i, "estado": "nuevo"} for i in range(200)])
+
+        headers, recibido = await pedir(app_de_prueba([cuerpo]), "gzip")
+
+        assert headers["content-encoding"] == "gzip"
+        assert "content-length" not in headers
+        assert headers["vary"] == "Accept-Encoding"
+        assert gzip.decompress(recibido) == cuerpo
+
+    async def test_chico_o_binario_sale_tal_cual(self):
+        headers, recibido = await pedir(app_de_prueba([b'{"ok":true}']))
+        assert "content-encoding" not in headers
+        assert recibido == b'{"ok":true}'
+
+        pdf = b"%PDF-" + b"x" * 5000
+        headers, recibido = await pedir(app_de_prueba([pdf], tipo=b"application/pdf"))
+        assert "content-encoding" not in headers
+        assert recibido == pdf
+
+    async def test_streaming_por_bloques(self):
+        bloques = [b"a" * 100, b"b" * 100, b"c" * 100]
+
+        headers, recibido = await pedir(app_de_prueba(bloques, tipo=b"text/csv"), "gzip")
+
+        # Varios bloques: se comprime aunque cada uno sea menor al umbral
+        assert headers["content-encoding"] == "gzip"
+        assert gzip.decompress(recibido) == b"".join(bloques)
+
+    @pytest.mark.skipif(brotli is None, reason="Brotli no instalado")
+    async def test_brotli(self):
+        cuerpo = dumps([{"id": i} for i in range(500)])
+
+        headers, recibido = await pedir(app_de_prueba([cuerpo]), "gzip, br")
+
+        assert headers["content-encoding"] == "br"
+        assert brotli.decompress(recibido) == cuerpo
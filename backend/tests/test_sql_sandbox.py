@@ -0,0 +1,126 @@
+"""
+Tests del sandbox de SQL generado por la IA (services/sql_sandbox): solo
+lectura, filtro de municipio inyectado en cada tabla, columnas secretas
+fuera y tope de filas.
+"""
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.security import get_password_hash
+from models import CategoriaReclamo, Municipio, Reclamo, User
+from models.enums import EstadoReclamo, RolUsuario
+from services.sql_sandbox import SqlRechazado, SqlSandbox, preparar_sql, tablas_conocidas
+from tests.conftest import test_engine
+
+
+class TestPreparar:
+
+    @pytest.mark.parametrize("sql", [
+        "DELETE FROM reclamos",
+        "SELECT * FROM reclamos; DROP TABLE usuarios",
+        "SELECT * FROM reclamos -- comentario",
+        "SELECT * FROM mysql.user",
+        "SELECT SLEEP(5)",
+        "SELECT * FROM reclamos FOR UPDATE",
+        "SELECT @@version",
+        "SELECT id INTO OUTFILE '/tmp/x' FROM reclamos",
+        "SELECT * FROM tabla_inexistente",
+        "WITH reclamos AS (SELECT * FROM reclamos) SELECT * FROM reclamos",
+        "SELECT * FROM ((usuarios))",
+        "SELECT * FROM (((usuarios)))",
+        "SELECT * FROM reclamos r JOIN ((usuarios)) u ON u.id = r.creador_id",
+    ])
+    def test_rechaza(self, sql):
+        with pytest.raises(SqlRechazado):
+            preparar_sql(sql, 1)
+
+    def test_inyecta_municipio_en_cada_tabla(self):
+        consulta = preparar_sql(
+            "SELECT r.id, c.nombre FROM reclamos r JOIN categorias c ON c.id = r.categoria_id "
+            "WHERE r.id IN (SELECT reclamo_id FROM historial_reclamos) LIMIT 10",
+            7,
+        )
+
+        assert consulta.tablas == {"reclamos", "categorias_reclamo", "historial_reclamos"}
+        assert consulta.limite == 10
+        assert "LIMIT" not in consulta.sql
+        assert consulta.sql.count("`municipio_id` = 7") == 3
+
+    @pytest.mark.parametrize("sql", [
+        "SELECT NOW() - INTERVAL (SELECT COUNT(*) FROM usuarios) DAY",
+        "SELECT COALESCE((SELECT MAX(id) FROM usuarios), 0)",
+        "SELECT * FROM ((SELECT id FROM reclamos) r, usuarios)",
+        "SELECT * FROM ((SELECT id FROM reclamos) r JOIN usuarios u ON u.id = r.id)",
+    ])
+    def test_tablas_anidadas_tambien_se_filtran(self, sql):
+        consulta = preparar_sql(sql, 7)
+
+        assert "usuarios" in consulta.tablas
+        assert "FROM `usuarios` t0 WHERE t0.`municipio_id` = 7" in consulta.sql
+        assert "password_hash" not in consulta.sql
+
+    def test_columnas_secretas_afuera(self):
+        assert "password_hash" not in tablas_conocidas()["usuarios"].columnas
+        consulta = preparar_sql("SELECT * FROM usuarios", 1)
+        assert "password_hash" not in consulta.sql
+
+
+async def crear_datos(db: AsyncSession):
+    propio = Municipio(nombre="Propio", codigo="sandbox-propio", latitud=-34.6, longitud=-58.4)
+    ajeno = Municipio(nombre="Ajeno", codigo="sandbox-ajeno", latitud=-34.6, longitud=-58.4)
+    db.add_all([propio, ajeno])
+    await db.flush()
+    admin = User(
+        email="admin@sandbox.com", password_hash=get_password_hash("x"),
+        nombre="Admin", apellido="Sandbox", rol=RolUsuario.ADMIN, municipio_id=propio.id,
+    )
+    cat_propia = CategoriaReclamo(municipio_id=propio.id, nombre="Alumbrado")
+    cat_ajena = CategoriaReclamo(municipio_id=ajeno.id, nombre="Alumbrado")
+    db.add_all([admin, cat_propia, cat_ajena])
+    await db.flush()
+    for muni, categoria, n in ((propio, cat_propia, 5), (ajeno, cat_ajena, 3)):
+        db.add_all([
+            Reclamo(
+                municipio_id=muni.id, creador_id=admin.id, categoria_id=categoria.id,
+                titulo=f"Reclamo {i}", descripcion="x", direccion="Calle 1", estado=EstadoReclamo.NUEVO,
+            )
+            for i in range(n)
+        ])
+    await db.commit()
+    return propio
+
+
+class TestEjecucion:
+
+    async def test_no_ve_otro_municipio_aunque_no_filtre(self, db_session: AsyncSession):
+        propio = await crear_datos(db_session)
+        sandbox = SqlSandbox(engine=test_engine)
+
+        consulta = preparar_sql(
+            "SELECT COUNT(*) AS total FROM reclamos r JOIN categorias c ON c.id = r.categoria_id", propio.id,
+        )
+        resultado = await sandbox.ejecutar(consulta, 10)
+
+        assert resultado.filas == [{"total": 5}]
+        assert await sandbox.contar(preparar_sql("SELECT id FROM reclamos", propio.id)) == 5
+
+    async def test_tabla_entre_parentesis_no_saltea_el_filtro(self, db_session: AsyncSession):
+        propio = await crear_datos(db_session)
+        sandbox = SqlSandbox(engine=test_engine)
+
+        consulta = preparar_sql("SELECT COUNT(*) AS total FROM ((SELECT id FROM reclamos) r, reclamos)", propio.id)
+        resultado = await sandbox.ejecutar(consulta, 10)
+
+        assert resultado.filas == [{"total": 25}]
+
+    async def test_tope_de_filas(self, db_session: AsyncSession, monkeypatch):
+        propio = await crear_datos(db_session)
+        monkeypatch.setattr(settings, "SQL_SANDBOX_MAX_FILAS", 3)
+        sandbox = SqlSandbox(engine=test_engine)
+
+        resultado = await sandbox.ejecutar(preparar_sql("SELECT id, titulo FROM reclamos", propio.id), 100)
+
+        assert len(resultado.filas) == 3
+        assert resultado.truncado
+        assert resultado.columnas == ["id", "titulo"]
@@ -0,0 +1,146 @@
+"""
+Tests del barrido de vencimientos y del resumen de deuda por vecino
+(services/tasas_resumen.py) sobre 100k deudas.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.security import get_password_hash
+from models import Municipio, User
+from models.enums import RolUsuario
+from models.tasas import Deuda, EstadoDeuda, Partida, TipoTasa, VecinoDeudaResumen
+from services.tasas_resumen import barrer_vencimientos, obtener_resumen, recalcular_municipio
+
+HOY = date.today()  # el listener recalcula con la fecha real
+PARTIDAS = 1000
+DEUDAS_POR_PARTIDA = 100          # 100k deudas en total
+VENCIDAS_POR_PARTIDA = 60         # j < 60: vencimiento en el pasado
+PROXIMAS_POR_PARTIDA = 8          # j in 60..67: vencen entre hoy y hoy+7
+IMPORTE = Decimal("100.00")
+
+
+async def crear_padron(db: AsyncSession):
+    """1000 partidas (mitad por user_id, mitad por DNI) x 100 deudas pendientes."""
+    muni = Municipio(nombre="Muni Tasas", codigo="muni-tasas", latitud=-34.6, longitud=-58.4)
+    tipo = TipoTasa(codigo="abl", nombre="ABL")
+    db.add_all([muni, tipo])
+    await db.flush()
+
+    por_id = User(
+        email="vecino.id@test.com", password_hash=get_password_hash("x"),
+        nombre="Vecino", apellido="Id", rol=RolUsuario.VECINO, municipio_id=muni.id,
+    )
+    por_dni = User(
+        email="vecino.dni@test.com", password_hash=get_password_hash("x"),
+        nombre="Vecino", apellido="Dni", dni="30111222", rol=RolUsuario.VECINO, municipio_id=muni.id,
+    )
+    db.add_all([por_id, por_dni])
+    await db.commit()
+
+    await db.execute(insert(Partida), [
+        {
+            "municipio_id": muni.id,
+            "tipo_tasa_id": tipo.id,
+            "identificador": f"ABL-{i:05d}",
+            "titular_user_id": por_id.id if i < PARTIDAS // 2 else None,
+            "titular_dni": None if i < PARTIDAS // 2 else "30111222",
+        }
+        for i in range(PARTIDAS)
+    ])
+    partida_ids = list((await db.execute(select(Partida.id).order_by(Partida.id))).scalars().all())
+
+    filas = []
+    for pid in partida_ids:
+        for j in range(DEUDAS_POR_PARTIDA):
+            if j < VENCIDAS_POR_PARTIDA:
+                vto = HOY - timedelta(days=1 + j)
+            else:
+                vto = HOY + timedelta(days=j - VENCIDAS_POR_PARTIDA)
+            filas.append({
+                "partida_id": pid,
+                "periodo": f"P{j:03d}",
+                "importe": IMPORTE,
+                "fecha_emision": HOY - timedelta(days=200),
+                "fecha_vencimiento": vto,
+                "estado": EstadoDeuda.PENDIENTE,
+            })
+    for i in range(0, len(filas), 10000):
+        await db.execute(insert(Deuda), filas[i:i + 10000])
+    await db.commit()
+    return muni, por_id, por_dni
+
+
+class TestBarridoVencimientos:
+    """El barrido pasa a VENCIDA exactamente las pendientes atrasadas."""
+
+    async def test_barrido_100k(self, db_session: AsyncSession):
+        muni, _, _ = await crear_padron(db_session)
+        esperadas = PARTIDAS * VENCIDAS_POR_PARTIDA
+
+        vencidas = await barrer_vencimientos(db_session, HOY, lote=5000)
+        assert vencidas == {muni.id: esperadas}
+
+        conteo = dict((await db_session.execute(
+            select(Deuda.estado, func.count()).group_by(Deuda.estado)
+        )).all())
+        assert conteo[EstadoDeuda.VENCIDA] == esperadas
+        assert conteo[EstadoDeuda.PENDIENTE] == PARTIDAS * (DEUDAS_POR_PARTIDA - VENCIDAS_POR_PARTIDA)
+
+        # Idempotente: un segundo barrido no encuentra nada
+        assert await barrer_vencimientos(db_session, HOY, lote=5000) == {}
+
+
+class TestResumenVecino:
+    """El resumen por vecino coincide con el detalle de sus deudas."""
+
+    async def test_resumen_por_user_id_y_por_dni(self, db_session: AsyncSession):
+        muni, por_id, por_dni = await crear_padron(db_session)
+        await barrer_vencimientos(db_session, HOY)
+        assert await recalcular_municipio(db_session, muni.id, HOY) == 2
+
+        mitad = PARTIDAS // 2
+        for user in (por_id, por_dni):
+            r = await db_session.get(VecinoDeudaResumen, user.id)
+            assert r.partidas == mitad
+            assert r.vencidas == mitad * VENCIDAS_POR_PARTIDA
+            assert r.monto_vencido == IMPORTE * mitad * VENCIDAS_POR_PARTIDA
+            assert r.pendientes == mitad * (DEUDAS_POR_PARTIDA - VENCIDAS_POR_PARTIDA)
+            assert r.proximas_7d == mitad * PROXIMAS_POR_PARTIDA
+            assert r.proximo_vencimiento == HOY
+
+    async def test_pago_actualiza_resumen(self, db_session: AsyncSession):
+        """Pagar una deuda por el ORM recalcula el resumen en el mismo flush."""
+        muni, por_id, _ = await crear_padron(db_session)
+        await barrer_vencimientos(db_session, HOY)
+
+        deuda = (await db_session.execute(
+            select(Deuda)
+            .join(Partida, Partida.id == Deuda.partida_id)
+            .where(Partida.titular_user_id == por_id.id, Deuda.estado == EstadoDeuda.VENCIDA)
+            .limit(1)
+        )).scalar_one()
+        deuda.estado = EstadoDeuda.PAGADA
+        await db_session.commit()
+
+        r = (await db_session.execute(
+            select(VecinoDeudaResumen).where(VecinoDeudaResumen.user_id == por_id.id)
+        )).scalar_one()
+        assert r.vencidas == (PARTIDAS // 2) * VENCIDAS_POR_PARTIDA - 1
+
+    async def test_obtener_resumen_no_escribe(self, db_session: AsyncSession):
+        """La lectura sirve la fila precalculada aunque sea de otro día."""
+        muni, por_id, _ = await crear_padron(db_session)
+        ayer = HOY - timedelta(days=1)
+        await recalcular_municipio(db_session, muni.id, ayer)
+
+        r = await obtener_resumen(db_session, por_id)
+
+        assert r.calculado_para == ayer
+        db_session.expunge_all()
+        fila = (await db_session.execute(
+            select(VecinoDeudaResumen.calculado_para).where(VecinoDeudaResumen.user_id == por_id.id)
+        )).scalar_one()
+        assert fila == ayer
@@ -0,0 +1,144 @@
+"""
+Tests del pago masivo de la agenda de tesoreria
+(services/tesoreria_pagos_masivos): lotes con sentencias set-based, misma
+semantica que el pago de a uno.
+"""
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.security import get_password_hash
+from models import (
+    Contacto, FrecuenciaPago, Gasto, GastoCuota, Municipio, TesoreriaCaja, TesoreriaMovimientoCaja,
+    TesoreriaPagoProgramado, User,
+)
+from models.enums import RolUsuario
+from services.tesoreria_pagos_masivos import ejecutar_pagos_masivo
+from tests.conftest import test_engine
+
+FECHA = date(2026, 1, 10)
+
+
+class StatementCounter:
+    """Cuenta las sentencias enviadas a la BD (un INSERT multi-fila = 1)."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(test_engine.sync_engine, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(test_engine.sync_engine, "before_cursor_execute", self)
+
+
+async def crear_agenda(db: AsyncSession, cantidad: int):
+    """`cantidad` sueldos mensuales de $1000 con proximo_pago FECHA."""
+    muni = Municipio(nombre="Muni Agenda", codigo="muni-agenda", latitud=-34.6, longitud=-58.4)
+    db.add(muni)
+    await db.flush()
+    admin = User(
+        email="admin@agenda.com", password_hash=get_password_hash("x"),
+        nombre="Admin", apellido="Agenda", rol=RolUsuario.ADMIN, municipio_id=muni.id,
+    )
+    caja = TesoreriaCaja(municipio_id=muni.id, nombre="Caja", saldo_inicial=0)
+    contactos = [Contacto(municipio_id=muni.id, nombre=f"Empleado {i}") for i in range(cantidad)]
+    db.add_all([admin, caja, *contactos])
+    await db.flush()
+    pps = [
+        TesoreriaPagoProgramado(
+            municipio_id=muni.id, contacto_id=c.id, caja_id=caja.id, concepto=f"Sueldo {i}",
+            monto_pesos=Decimal("1000.00"), frecuencia=FrecuenciaPago.MENSUAL, dia_del_mes=10,
+            fecha_inicio=FECHA, proximo_pago=FECHA,
+        )
+        for i, c in enumerate(contactos)
+    ]
+    db.add_all(pps)
+    await db.commit()
+    return muni, admin, pps
+
+
+async def recargar(db: AsyncSession, pp_id: int) -> TesoreriaPagoProgramado:
+    return (await db.execute(
+        select(TesoreriaPagoProgramado)
+        .where(TesoreriaPagoProgramado.id == pp_id)
+        .execution_options(populate_existing=True)
+    )).scalar_one()
+
+
+async def contar(db: AsyncSession, modelo) -> int:
+    return (await db.execute(select(func.count()).select_from(modelo))).scalar()
+
+
+class TestPagosMasivos:
+
+    async def test_paga_por_lotes(self, db_session: AsyncSession):
+        muni, admin, pps = await crear_agenda(db_session, 25)
+        pps[0].ultimo_pago = FECHA            # ya pagado este periodo
+        pps[1].activo = False                 # inactivo
+        pps[2].fecha_fin = date(2026, 1, 31)  # ultimo periodo
+        await db_session.commit()
+        ids = [pp.id for pp in pps] + [999999]
+
+        res = await ejecutar_pagos_masivo(db_session, muni.id, admin.id, ids, lote=10)
+
+        assert [l["pagos"] for l in res.lotes] == [10, 10, 6]
+        assert res.exitosos == 23 and res.monto_total == Decimal("23000.00")
+        assert list(res.items) == ids
+        assert res.items[ids[0]][2].startswith("Período ya pagado")
+        assert res.items[ids[1]] == (False, None, "No encontrado o inactivo")
+        assert res.items[999999][0] is False
+
+        assert await contar(db_session, Gasto) == 23
+        assert await contar(db_session, GastoCuota) == 23
+        assert await contar(db_session, TesoreriaMovimientoCaja) == 23
+        # Cada item apunta al gasto de su programado, con su cuota y egreso
+        for pid, (ok, gasto_id, _) in res.items.items():
+            if not ok:
+                continue
+            gasto = await db_session.get(Gasto, gasto_id)
+            assert gasto.pago_programado_id == pid and gasto.fecha == FECHA
+            mov = (await db_session.execute(
+                select(TesoreriaMovimientoCaja).where(TesoreriaMovimientoCaja.gasto_id == gasto_id)
+            )).scalar_one()
+            assert mov.monto == Decimal("1000.00")
+
+        # El UPDATE masivo no sincroniza la sesion: releer de la BD
+        pp = await recargar(db_session, ids[5])
+        assert (pp.ultimo_pago, pp.proximo_pago, pp.activo) == (FECHA, date(2026, 2, 10), True)
+        assert (await recargar(db_session, ids[2])).activo is False
+
+    async def test_no_paga_dos_veces_el_periodo(self, db_session: AsyncSession):
+        muni, admin, pps = await crear_agenda(db_session, 3)
+        ids = [pp.id for pp in pps]
+        await ejecutar_pagos_masivo(db_session, muni.id, admin.id, ids)
+
+        # Simula un segundo pedido con la agenda vuelta atras (doble click
+        # con la pantalla vieja): solo ultimo_pago frena el doble pago
+        await db_session.execute(
+            update(TesoreriaPagoProgramado)
+            .where(TesoreriaPagoProgramado.id.in_(ids))
+            .values(proximo_pago=FECHA)
+        )
+        await db_session.commit()
+        assert [(await recargar(db_session, pid)).proximo_pago for pid in ids] == [FECHA] * 3
+
+        res = await ejecutar_pagos_masivo(db_session, muni.id, admin.id, ids)
+        assert res.exitosos == 0
+        assert all(res.items[pid][2].startswith("Período ya pagado") for pid in ids)
+        assert await contar(db_session, Gasto) == 3
+
+    @pytest.mark.parametrize("cantidad", [5, 60])
+    async def test_sentencias_constantes(self, db_session: AsyncSession, cantidad: int):
+        muni, admin, pps = await crear_agenda(db_session, cantidad)
+        with StatementCounter() as counter:
+            await ejecutar_pagos_masivo(db_session, muni.id, admin.id, [pp.id for pp in pps], lote=0)
+        # SELECT + UPDATE + INSERT gastos + SELECT ids + INSERT cuotas + INSERT movimientos
+        assert counter.count == 6
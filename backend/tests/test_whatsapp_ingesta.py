@@ -0,0 +1,202 @@
+"""
+Tests de la ingesta de WhatsApp (services/whatsapp): webhook idempotente,
+orden por conversación, reintentos y envío con rate limit por número,
+contra el FakeWhatsAppProvider: sin red.
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from core.config import settings
+from models.whatsapp_mensaje import WhatsAppConversacion, WhatsAppMensajeEntrante
+from services.whatsapp import IngestaWorkerPool, WhatsAppSender, registrar_webhook
+from services.whatsapp.fake import FakeWhatsAppProvider
+from tests.conftest import TestSessionLocal, test_engine
+
+VECINO_A = "5491100000001"
+VECINO_B = "5491100000002"
+
+
+def webhook(*mensajes: Tuple[str, str, str]) -> dict:
+    """Body de Meta con (message_id, telefono, texto)."""
+    return {"entry": [{"changes": [{"value": {"messages": [
+        {"id": mid, "from": tel, "type": "text", "text": {"body": texto}}
+        for mid, tel, texto in mensajes
+    ]}}]}]}
+
+
+class Registro:
+    """Procesador de prueba: anota (telefono, texto) y puede fallar a pedido."""
+
+    def __init__(self, demora_s: float = 0.0, juntos: int = 0):
+        self.demora_s = demora_s
+        # Cuántos procesadores esperar activos a la vez (no depender de que
+        # una demora fija se superponga con la suite cargada)
+        self.juntos = juntos
+        self._todos_activos = asyncio.Event()
+        self.vistos: List[Tuple[str, str]] = []
+        self.fallar = set()
+        self.activos = 0
+        self.max_activos = 0
+
+    async def __call__(self, db, message, conversacion):
+        texto = message["text"]["body"]
+        if texto in self.fallar:
+            self.fallar.discard(texto)
+            raise RuntimeError(f"falla {texto}")
+        self.activos += 1
+        self.max_activos = max(self.max_activos, self.activos)
+        if self.juntos and self.activos >= self.juntos:
+            self._todos_activos.set()
+        try:
+            if self.juntos:
+                try:
+                    await asyncio.wait_for(self._todos_activos.wait(), timeout=5)
+                except asyncio.TimeoutError:
+                    pass
+            if self.demora_s:
+                await asyncio.sleep(self.demora_s)
+        finally:
+            self.activos -= 1
+        self.vistos.append((message["from"], texto))
+
+    def de(self, telefono: str) -> List[str]:
+        return [t for tel, t in self.vistos if tel == telefono]
+
+
+_sin_pisarse = asyncio.Lock()
+
+
+class SesionSerializada(AsyncSession):
+    """En la BD de test (una sola conexión en memoria) el rollback con que
+    se cierra una sesión puede caer entre el flush y el COMMIT de otra y
+    descartarlo. Commit, rollback y cierre no se pisan; el procesador de
+    cada worker sí corre en paralelo."""
+
+    async def commit(self):
+        async with _sin_pisarse:
+            await super().commit()
+
+    async def rollback(self):
+        async with _sin_pisarse:
+            await super().rollback()
+
+    async def close(self):
+        async with _sin_pisarse:
+            await super().close()
+
+
+SesionesSerializadas = async_sessionmaker(test_engine, class_=SesionSerializada, expire_on_commit=False)
+
+
+def pool_con(procesador, workers: int = 2) -> IngestaWorkerPool:
+    return IngestaWorkerPool(workers=workers, procesador=procesador, session_factory=SesionesSerializadas)
+
+
+class TestWebhook:
+
+    async def test_reentrega_no_duplica(self, db_session: AsyncSession):
+        body = webhook(("wamid.1", VECINO_A, "hola"), ("wamid.2", VECINO_A, "1"))
+
+        primero = await registrar_webhook(db_session, body)
+        segundo = await registrar_webhook(db_session, body)
+
+        assert primero == {"nuevos": 2, "duplicados": 0}
+        assert segundo == {"nuevos": 0, "duplicados": 2}
+        total = (await db_session.execute(select(func.count()).select_from(WhatsAppMensajeEntrante))).scalar()
+        assert total == 2
+        assert await db_session.get(WhatsAppConversacion, VECINO_A) is not None
+
+    async def test_ignora_statuses(self, db_session: AsyncSession):
+        body = {"entry": [{"changes": [{"value": {"statuses": [{"id": "wamid.9", "status": "read"}]}}]}]}
+        assert await registrar_webhook(db_session, body) == {"nuevos": 0, "duplicados": 0}
+
+
+class TestWorkers:
+
+    async def test_orden_por_conversacion_y_paralelo_entre_conversaciones(self, db_session: AsyncSession):
+        await registrar_webhook(db_session, webhook(
+            ("a1", VECINO_A, "A1"), ("b1", VECINO_B, "B1"), ("a2", VECINO_A, "A2"),
+            ("b2", VECINO_B, "B2"), ("a3", VECINO_A, "A3"),
+        ))
+        registro = Registro(juntos=2)
+        pool = pool_con(registro, workers=2)
+
+        assert await pool.procesar_pendientes() == 5
+
+        assert registro.de(VECINO_A) == ["A1", "A2", "A3"]
+        assert registro.de(VECINO_B) == ["B1", "B2"]
+        # Las dos conversaciones corrieron a la vez, cada una en su worker
+        assert registro.max_activos == 2
+        leases = (await db_session.execute(select(WhatsAppConversacion.tomado_por))).scalars().all()
+        assert leases == [None, None]
+
+    async def test_falla_frena_la_conversacion_hasta_el_reintento(self, db_session: AsyncSession):
+        await registrar_webhook(db_session, webhook(
+            ("a1", VECINO_A, "A1"), ("a2", VECINO_A, "A2"), ("b1", VECINO_B, "B1"),
+        ))
+        registro = Registro()
+        registro.fallar.add("A1")
+        # Un worker: en la BD de test (una sola conexión en memoria) el
+        # rollback del que falla descartaría el flush en curso del otro
+        pool = pool_con(registro, workers=1)
+
+        await pool.procesar_pendientes()
+        assert registro.de(VECINO_A) == []
+        assert registro.de(VECINO_B) == ["B1"]
+
+        # Vence el backoff
+        await db_session.execute(
+            update(WhatsAppMensajeEntrante).values(proximo_intento_at=datetime.utcnow() - timedelta(seconds=1))
+        )
+        await db_session.commit()
+        await pool.procesar_pendientes()
+
+        assert registro.de(VECINO_A) == ["A1", "A2"]
+        assert pool.stats.reintentos == 1
+
+    async def test_agota_reintentos_y_sigue_con_el_siguiente(self, db_session: AsyncSession, monkeypatch):
+        monkeypatch.setattr(settings, "WHATSAPP_INGESTA_MAX_INTENTOS", 1)
+        await registrar_webhook(db_session, webhook(("a1", VECINO_A, "A1"), ("a2", VECINO_A, "A2")))
+        registro = Registro()
+        registro.fallar.add("A1")
+
+        await pool_con(registro).procesar_pendientes()
+
+        assert registro.de(VECINO_A) == ["A2"]
+        fallido = (await db_session.execute(
+            select(WhatsAppMensajeEntrante).where(WhatsAppMensajeEntrante.message_id == "a1")
+        )).scalar_one()
+        assert fallido.fallido_at is not None and "falla A1" in fallido.error
+
+    async def test_chatbot_guarda_el_paso_en_la_bd(self, db_session: AsyncSession, monkeypatch):
+        fake = FakeWhatsAppProvider()
+        monkeypatch.setattr("api.whatsapp.sender", WhatsAppSender(provider=fake))
+        await registrar_webhook(db_session, webhook(("a1", VECINO_A, "hola"), ("a2", VECINO_A, "1")))
+
+        await IngestaWorkerPool(workers=1, session_factory=TestSessionLocal).procesar_pendientes()
+
+        respuestas = fake.a(VECINO_A)
+        assert len(respuestas) == 2 and "Nuevo Reclamo" in respuestas[1]
+        async with TestSessionLocal() as db:
+            conv = await db.get(WhatsAppConversacion, VECINO_A)
+            assert conv.step == "titulo"
+
+
+class TestEnvio:
+
+    async def test_rate_limit_por_numero_de_origen(self):
+        fake = FakeWhatsAppProvider()
+        sender = WhatsAppSender(provider=fake, rps_por_numero=10)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*[sender.enviar(None, VECINO_A, f"m{i}") for i in range(12)])
+        transcurrido = time.perf_counter() - t0
+
+        # 10 de ráfaga y 2 más a 10/s
+        assert len(fake.enviados) == 12
+        assert transcurrido >= 0.15
@@ -0,0 +1,150 @@
+"""
+Tests del runtime async de los workers (core/worker_runtime.py): un loop de
+larga vida en su propio thread donde viven los recursos compartidos, y el
+SMTPPool que reusa una conexión y la reabre si el server la cortó.
+SMTP falso: sin red.
+"""
+import asyncio
+import threading
+
+import aiosmtplib
+import pytest
+
+from core import worker_runtime
+from core.config import settings
+from core.worker_runtime import SMTPPool, WorkerRuntime
+
+
+class TestRuntime:
+
+    def test_un_loop_en_su_thread_para_todas_las_tareas(self):
+        rt = WorkerRuntime().start()
+        try:
+            async def donde():
+                return asyncio.get_running_loop(), threading.current_thread().name
+
+            (loop1, thread1), (loop2, _) = rt.run(donde()), rt.run(donde())
+            assert loop1 is loop2 is rt.loop
+            assert thread1 == "celery-async-runtime" != threading.current_thread().name
+
+            async def recursos():
+                return rt.http_client(), rt.smtp_pool()
+
+            assert rt.run(recursos()) == rt.run(recursos())
+        finally:
+            rt.stop()
+        assert not rt._thread.is_alive()
+        assert rt._http.is_closed
+
+    def test_excepcion_de_la_coroutine_llega_al_caller(self):
+        rt = WorkerRuntime().start()
+        try:
+            async def falla():
+                raise ValueError("boom")
+
+            with pytest.raises(ValueError, match="boom"):
+                rt.run(falla())
+            # El loop sigue vivo para la próxima tarea
+            assert rt.run(asyncio.sleep(0, result=7)) == 7
+        finally:
+            rt.stop()
+
+    def test_runtime_por_proceso(self):
+        worker_runtime.shutdown_worker_runtime()
+        primero = worker_runtime.get_runtime()
+        assert worker_runtime.get_runtime() is primero
+        assert worker_runtime.run_async(asyncio.sleep(0, result="ok")) == "ok"
+
+        worker_runtime.shutdown_worker_runtime()
+        assert not primero._thread.is_alive()
+        assert worker_runtime.get_runtime() is not primero
+
+
+class SMTPFalso:
+    """Imita aiosmtplib.SMTP y cuenta conexiones en la clase."""
+    conexiones = 0
+    enviados = []
+    cortar_en = set()    # destinatarios cuyo envío encuentra la conexión cortada
+    rechazar = set()     # destinatarios que el server rechaza
+
+    def __init__(self, **kwargs):
+        self.is_connected = False
+
+    async def connect(self):
+        SMTPFalso.conexiones += 1
+        self.is_connected = True
+
+    async def login(self, user, password):
+        pass
+
+    async def noop(self):
+        if not self.is_connected:
+            raise aiosmtplib.SMTPServerDisconnected("cerrada")
+
+    async def send_message(self, message):
+        to = message["To"]
+        if to in SMTPFalso.cortar_en:
+            SMTPFalso.cortar_en.discard(to)
+            self.is_connected = False
+            raise aiosmtplib.SMTPServerDisconnected("timeout por inactividad")
+        if to in SMTPFalso.rechazar:
+            raise aiosmtplib.SMTPRecipientsRefused([])
+        SMTPFalso.enviados.append(to)
+
+    async def quit(self):
+        self.is_connected = False
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    monkeypatch.setattr(worker_runtime.aiosmtplib, "SMTP", SMTPFalso)
+    monkeypatch.setattr(settings, "SMTP_USER", "")
+    SMTPFalso.conexiones, SMTPFalso.enviados = 0, []
+    SMTPFalso.cortar_en, SMTPFalso.rechazar = set(), set()
+    return SMTPFalso
+
+
+def mensaje(to: str) -> dict:
+    return {"To": to}
+
+
+class TestSMTPPool:
+
+    async def test_una_conexion_para_toda_la_tanda(self, smtp):
+        pool = SMTPPool()
+        errores = await pool.send_many([mensaje(f"{i}@x.com") for i in range(5)])
+        await pool.send(mensaje("otro@x.com"))
+
+        assert errores == [None] * 5
+        assert smtp.conexiones == 1
+        assert len(smtp.enviados) == 6
+
+    async def test_reconecta_si_el_server_corto(self, smtp):
+        pool = SMTPPool()
+        smtp.cortar_en = {"b@x.com"}
+        errores = await pool.send_many([mensaje("a@x.com"), mensaje("b@x.com"), mensaje("c@x.com")])
+
+        assert errores == [None, None, None]
+        assert smtp.enviados == ["a@x.com", "b@x.com", "c@x.com"]
+        assert smtp.conexiones == 2
+
+    async def test_error_por_mensaje_no_corta_la_tanda(self, smtp):
+        pool = SMTPPool()
+        smtp.rechazar = {"b@x.com"}
+        errores = await pool.send_many([mensaje("a@x.com"), mensaje("b@x.com"), mensaje("c@x.com")])
+
+        assert errores[0] is None and errores[2] is None
+        assert isinstance(errores[1], aiosmtplib.SMTPRecipientsRefused)
+        assert smtp.enviados == ["a@x.com", "c@x.com"]
+        with pytest.raises(aiosmtplib.SMTPRecipientsRefused):
+            await pool.send(mensaje("b@x.com"))
+
+    async def test_conexion_ociosa_cerrada_se_reabre(self, smtp):
+        pool = SMTPPool()
+        await pool.send(mensaje("a@x.com"))
+        pool._smtp.is_connected = False  # el server la cerró por inactividad
+
+        await pool.send(mensaje("b@x.com"))
+        assert smtp.conexiones == 2
+        await pool.close()
+        assert pool._smtp is None
@@ -256,6 +256,58 @@ export const apiRaw = {
 
 export default api;
 
+// ============================================
+// Jobs en segundo plano (operaciones largas)
+// ============================================
+// Los endpoints pesados (crear/borrar demo, importar Excel/padrón, pago
+// masivo, auto-asignar con IA) responden 202 con `job_id` y siguen
+// corriendo en el backend. `esperarJob` hace polling a /jobs/{id} y
+// resuelve con un AxiosResponse cuyo `data` es el resultado del job, así
+// los call sites siguen usando `const { data } = await xxxApi.algo()`.
+
+export type EstadoJob = 'pendiente' | 'en_curso' | 'completado' | 'error' | 'cancelado';
+
+export interface BackgroundJob<T = unknown> {
+  id: string;
+  tipo: string;
+  estado: EstadoJob;
+  progreso: number;
+  mensaje: string | null;
+  resultado: T | null;
+  error: string | null;
+}
+
+export const jobsApi = {
+  // Sin caché ni dedup: cada poll tiene que ir al backend
+  get: <T = unknown>(jobId: string) => apiRaw.get<BackgroundJob<T>>(`/jobs/${jobId}`),
+  misJobs: () => apiRaw.get<BackgroundJob[]>('/jobs'),
+  cancelar: (jobId: string) => api.post<BackgroundJob>(`/jobs/${jobId}/cancelar`),
+};
+
+export const esperarJob = async <T = unknown>(
+  encolado: Promise<AxiosResponse<{ job_id: string }>>,
+  onProgreso?: (job: BackgroundJob<T>) => void,
+): Promise<AxiosResponse<T>> => {
+  const resp = await encolado;
+  const jobId = resp.data.job_id;
+  let espera = 700;
+  for (;;) {
+    await new Promise((r) => setTimeout(r, espera));
+    espera = Math.min(espera * 1.5, 3000);
+    const { data: job } = await jobsApi.get<T>(jobId);
+    onProgreso?.(job);
+    if (job.estado === 'completado') {
+      return { ...resp, status: 200, data: job.resultado as T };
+    }
+    if (job.estado === 'error' || job.estado === 'cancelado') {
+      const detail = job.error || (job.estado === 'cancelado' ? 'Operación cancelada' : 'La operación falló');
+      import('sonner').then(({ toast }) => toast.error(detail, { duration: 5000 }));
+      // Mismo shape que un error de axios para los catch existentes
+      throw Object.assign(new Error(detail), { response: { status: 400, data: { detail } }, job });
+    }
+  }
+};
+
 // Auth
 export const authApi = {
   login: (email: string, password: string) => {
@@ -509,7 +561,9 @@ export const dependenciasApi = {
 
   // Auto-asignar categorías de reclamo a dependencias usando IA
   autoAsignarCategoriasIA: (categorias: Array<{id: number; nombre: string}>, dependencias: Array<{id: number; nombre: string; descripcion?: string}>) =>
-    api.post('/dependencias/municipio/categorias/auto-asignar', { categorias, dependencias })
+    esperarJob<{ message: string; asignaciones: Record<string, number[]>; total: number }>(
+      api.post('/dependencias/municipio/categorias/auto-asignar', { categorias, dependencias }),
+    )
       .then(res => { invalidateCache('/dependencias'); invalidateCache('/categorias-reclamo'); return res; }),
 
   // Auto-asignar categorías de trámite a dependencias usando IA (cada categoría
@@ -694,19 +748,20 @@ export const municipiosApi = {
   // Arma todo el seed mínimo (categorías + dep General + 2 users demo) y
   // devuelve la URL de redirección a la landing del muni nuevo.
   crearDemo: (nombre: string, geo?: { lat: number; lng: number; provincia?: string }) =>
-    api.post<{
+    esperarJob<{
       id: number;
       nombre: string;
       codigo: string;
       redirect_path: string;
-    }>('/municipios/crear-demo', { nombre, ...(geo || {}) }),
+    }>(api.post('/municipios/crear-demo', { nombre, ...(geo || {}) })),
   // Autocomplete del catálogo OFICIAL de municipios argentinos (tabla local
   // municipios_argentina, cargada una vez desde georef — sin API externa en runtime).
   buscarArgentina: (q: string) =>
     api.get<Array<{ id: string; nombre: string; provincia: string; lat: number; lng: number }>>(
       '/municipios/argentina', { params: { q } },
     ),
-  eliminarDemo: (codigo: string) => api.delete(`/municipios/demo/${codigo}`),
+  eliminarDemo: (codigo: string) =>
+    esperarJob<{ message: string }>(api.delete(`/municipios/demo/${codigo}`)),
   update: (id: number, data: object) => api.put(`/municipios/${id}`, data),
   delete: (id: number) => api.delete(`/municipios/${id}`),
   // Barrios (se cargan automáticamente)
@@ -1580,7 +1635,7 @@ export const tasasApi = {
   importarPadronPreview: (url: string) =>
     api.post('/tasas/importar-padron/preview', { url }),
   importarPadronConfirmar: (url: string, mappings: { codigo_local: string; tipo_tasa_codigo: string | null }[]) =>
-    api.post('/tasas/importar-padron/confirmar', { url, mappings }),
+    esperarJob(api.post('/tasas/importar-padron/confirmar', { url, mappings })),
 };
 
 // Gateway de pagos externo (PayBridge / Aura / Mercado Pago — provider-agnostic)
@@ -2249,10 +2304,10 @@ export const agendaPagosApi = {
    *  valores por defecto (monto del programado, fecha = su proximo_pago, sin
    *  premios). Devuelve cuantos OK / fallidos. */
   ejecutarMasivo: (pago_ids: number[]) =>
-    api.post<{
+    esperarJob<{
       total: number; exitosos: number; fallidos: number; monto_total: string;
       items: { pago_id: number; ok: boolean; gasto_id?: number; error?: string }[];
-    }>('/tesoreria/agenda/ejecutar-masivo', { pago_ids }),
+    }>(api.post('/tesoreria/agenda/ejecutar-masivo', { pago_ids })),
 };
 
 /** Catalogo de conceptos para pagos programados (Sueldo, Presentismo,
@@ -2372,10 +2427,10 @@ export const tesoreriaImportApi = {
   excelMatriz: (archivo: File, anio?: number) => {
     const fd = new FormData();
     fd.append('archivo', archivo);
-    return api.post('/tesoreria/import/excel-matriz', fd, {
+    return esperarJob(api.post('/tesoreria/import/excel-matriz', fd, {
       params: anio ? { anio } : undefined,
       headers: { 'Content-Type': 'multipart/form-data' },
-    });
+    }));
   },
   kmz: (archivo: File) => {
     const fd = new FormData();